@@ -64,6 +64,7 @@ from services.bot_protocol_service import approve_pending_correction, reject_pen
 from services.bot_inbound_pipeline_service import is_protocol_auto_advance_enabled, process_inbound_ai_pipeline
 from services.bot_decision_service import register_decision
 from services.bot_identity_service import find_candidate_phone_duplicates
+from services.outbound_http_service import outbound_http_metrics
 from services.phone_identity_service import normalize_phone_to_e164
 from services.bot_candidate_summary_service import (
     build_candidate_summary,
@@ -97,7 +98,8 @@ from services.bot_candidate_intake_service import (
     ensure_intake_fields,
     set_intake_status,
 )
-from services.bot_observability_service import bot_timing, log_bot_blocked, log_bot_event
+from services.bot_observability_service import bot_timing, cache_metrics_snapshot, log_bot_blocked, log_bot_event
+from services.bot_outbound_sender_service import outbound_sender_enabled
 from services.bot_rate_limit_service import allow_action
 from services.bot_practice_ai_reply_service import get_practice_reply_with_ai_fallback
 from services.bot_sandbox_service import (
@@ -2348,9 +2350,13 @@ def bot_sandbox_webhook_inbound():
         if is_sandbox_auto_reply_active():
             try:
                 auto_approve_review_in_sandbox(review=review)
-                stats = run_sandbox_worker_once(batch_size=1, review_id=int(review.id))
-                db.session.flush()
-                auto_reply = {"enabled": True, "sent": int(stats.get("sent") or 0) == 1, "blocked_reason": ""}
+                if outbound_sender_enabled():
+                    db.session.flush()
+                    auto_reply = {"enabled": True, "sent": False, "queued": True, "blocked_reason": ""}
+                else:
+                    stats = run_sandbox_worker_once(batch_size=1, review_id=int(review.id))
+                    db.session.flush()
+                    auto_reply = {"enabled": True, "sent": int(stats.get("sent") or 0) == 1, "blocked_reason": ""}
             except Exception as exc:
                 auto_reply = {"enabled": True, "sent": False, "blocked_reason": str(exc)}
         else:
@@ -2999,6 +3005,8 @@ def bot_sandbox_assistant_metrics_json():
             "ok": True,
             "review_stats": review_stats,
             "sandbox_metrics": sandbox_metrics_snapshot(),
+            "outbound_http": outbound_http_metrics(),
+            "caches": cache_metrics_snapshot(),
             "outbound_real_count": int(outbound_real_count),
             "whatsapp_real_count": int(whatsapp_real_count),
             "outbound_real": False,
@@ -10,6 +10,7 @@ import traceback
 import hashlib
 import secrets
 import ipaddress
+import threading
 from types import SimpleNamespace
 from contextlib import contextmanager
 from urllib.parse import parse_qs, urlparse, quote_plus
@@ -103,7 +104,8 @@ from admin.forms import (
     AdminReemplazoFinForm,  # 🔹 NUEVO FORM PARA FINALIZAR REEMPLAZO
 )
 from utils.codigo_solicitud import compose_codigo_solicitud
-from utils.compat_engine import compute_match, format_compat_result
+from utils.compat_cache import compute_match_cached
+from utils.compat_engine import format_compat_result
 from utils.guards import (
     assert_candidata_no_descalificada,
     candidata_esta_descalificada,
@@ -208,6 +210,9 @@ from utils.modalidad import (
 )
 from utils.admin_async import payload as shared_admin_async_payload, wants_json as shared_admin_async_wants_json
 from utils.outbox_relay import OUTBOX_RELAY_ALLOWED_EVENT_TYPES, _redis_client as relay_redis_client, _redis_stream_key as relay_redis_stream_key
+from utils.live_stream_reader import register_stream_normalizer, shared_stream_reader, stream_id_key
+from utils.monitoreo_aggregator import MonitoreoAggregator, MonitoreoChannel
+from utils.audit_log_tail import audit_log_tailer, entity_key
 from services.candidata_invariants import (
     InvariantConflictError,
     change_candidate_state as invariant_change_candidate_state,
@@ -223,6 +228,7 @@ from services.solicitud_estado import (
     resolve_solicitud_estado_priority_anchor,
     set_solicitud_estado,
 )
+from services.solicitud_matching_suggestions import load_matching_suggestions
 from services.solicitud_recommendation_service import SolicitudRecommendationService
 from services.solicitud_recommendation_snapshot import build_candidate_guard, build_solicitud_fingerprint
 from services.payment_rules import (
@@ -338,6 +344,8 @@ from utils.staff_mfa import (
     verify_totp_code,
 )
 from core.services.search import search_candidatas_limited
+from core.services.candidata_search_index import get_candidata_search_index
+from core.services.candidata_documentos import candidata_document_mimes
 
 from . import admin_bp
 from .decorators import admin_required, staff_required
@@ -2005,6 +2013,81 @@ def _normalize_live_invalidation_from_outbox(row: DomainOutbox) -> dict | None:
     return _normalize_live_invalidation_event(event)
 
 
+register_stream_normalizer("staff", _normalize_live_invalidation_event)
+
+
+def _live_shared_reader(*, wait_seconds: float = 0.0):
+    """Lector compartido del stream del relay si está sano; None para degradar a DB/heartbeat."""
+    try:
+        reader = shared_stream_reader(current_app._get_current_object())
+    except Exception:
+        return None
+    if wait_seconds > 0:
+        reader.wait_ready(timeout=wait_seconds)
+    return reader if reader.healthy else None
+
+
+def _live_invalidation_poll_from_memory(after_stream_id: str, *, limit: int):
+    reader = _live_shared_reader()
+    if reader is None:
+        return None
+    result = reader.buffer.read_after(after_stream_id, limit=limit)
+    if result is None:
+        bump_operational_counter("live:poll:memory_buffer_gap_count")
+        return None
+    entries, cursor = result
+    items = [entry.normalized.get("staff") for entry in entries]
+    return [item for item in items if item is not None], cursor
+
+
+# El relay hace XADD antes de marcar published_at; pasado este margen ya está marcado.
+_LIVE_POLL_PUBLISH_GRACE_MS = 30000
+
+
+def _live_poll_stream_cursor(reader, cursor_before: str, rows, *, after_id: int) -> str | None:
+    """Cursor de stream que no salta nada de lo que la página de outbox no devolvió.
+
+    ``cursor_before`` se toma antes de la consulta. Un evento reciente que ya
+    está en el buffer pero no salió en la página (aún sin ``published_at``)
+    detiene el cursor justo antes, para que el siguiente poll desde memoria lo
+    entregue. ``None`` si no se puede asegurar.
+    """
+    buffer = reader.buffer
+    window_start = f"{max(0, int(time.time() * 1000) - _LIVE_POLL_PUBLISH_GRACE_MS)}-0"
+    if stream_id_key(window_start) < stream_id_key(buffer.floor_id):
+        window_start = buffer.floor_id
+    result = buffer.read_after(window_start, limit=buffer.maxlen)
+    if result is None:
+        return None
+    until = stream_id_key(cursor_before)
+    recent = [entry for entry in result[0] if stream_id_key(entry.stream_id) <= until]
+    delivered = {str(getattr(row, "event_id", "") or "") for row in (rows or [])}
+    pending = {
+        str(entry.envelope.get("event_id") or "")
+        for entry in recent
+        if str(entry.envelope.get("event_type") or "").strip().upper() in _F4_LIVE_ALLOWED_EVENT_TYPES
+        and str(entry.envelope.get("event_id") or "") not in delivered
+    }
+    pending.discard("")
+    if len(pending) > 500:
+        return None
+    missed = set()
+    if pending:
+        missed = {
+            str(event_id)
+            for (event_id,) in db.session.query(DomainOutbox.event_id)
+            .filter(DomainOutbox.event_id.in_(sorted(pending)))
+            .filter(DomainOutbox.id > int(after_id))
+            .all()
+        }
+    previous = window_start
+    for entry in recent:
+        if str(entry.envelope.get("event_id") or "") in missed:
+            return previous
+        previous = entry.stream_id
+    return cursor_before
+
+
 @admin_bp.route('/live/invalidation/poll', methods=['GET'])
 @login_required
 @staff_required
@@ -2043,6 +2126,32 @@ def live_invalidation_poll():
         limit = min(80, max(1, _safe_int(request.args.get("limit"), default=25)))
         mode = "poll_only" if not _live_invalidation_stream_enabled() else _LIVE_INVALIDATION_MODE_RELAY
 
+        after_stream_id = str(request.args.get("after_stream_id") or "").strip()[:64]
+        memory_result = (
+            _live_invalidation_poll_from_memory(after_stream_id, limit=limit)
+            if after_stream_id and mode == _LIVE_INVALIDATION_MODE_RELAY
+            else None
+        )
+        if memory_result is not None:
+            items, next_stream_id = memory_result
+            response = jsonify({
+                "ok": True,
+                "items": items,
+                "next_after_id": int(after_id),
+                "next_after_stream_id": next_stream_id,
+                "count": len(items),
+                "mode": mode,
+                "ts": iso_utc_z(),
+            })
+            response.headers["X-Live-Invalidation-Mode"] = mode
+            response.headers["X-Live-Invalidation-Source"] = "memory"
+            return perf_done(
+                response,
+                extra={"count": len(items), "view": requested_view or None, "mode": mode, "source": "memory"},
+            )
+
+        reader = _live_shared_reader() if mode == _LIVE_INVALIDATION_MODE_RELAY else None
+        stream_cursor_before = reader.buffer.last_stream_id if reader is not None else ""
         rows = (
             DomainOutbox.query
             .filter(DomainOutbox.id > after_id)
@@ -2078,14 +2187,22 @@ def live_invalidation_poll():
             if normalized is not None:
                 items.append(normalized)
 
-        response = jsonify({
+        body = {
             "ok": True,
             "items": items,
             "next_after_id": int(cursor),
             "count": len(items),
             "mode": mode,
             "ts": iso_utc_z(),
-        })
+        }
+        if reader is not None and mode == _LIVE_INVALIDATION_MODE_RELAY and len(rows or []) < limit:
+            # Página completa: el cliente ya tiene todo hasta el cursor tomado antes de
+            # la consulta y el siguiente poll se puede responder desde memoria. Con la
+            # página truncada sigue paginando por id.
+            next_stream_id = _live_poll_stream_cursor(reader, stream_cursor_before, rows, after_id=after_id)
+            if next_stream_id:
+                body["next_after_stream_id"] = next_stream_id
+        response = jsonify(body)
         response.headers["X-Live-Invalidation-Mode"] = mode
         return perf_done(
             response,
@@ -2196,65 +2313,53 @@ def live_invalidation_stream():
                 yield _sse("heartbeat", {"ts": iso_utc_z()})
                 return
 
-            last_stream_id = (request.args.get("last_stream_id") or "").strip() or "$"
+            last_stream_id = (request.args.get("last_stream_id") or "").strip()[:64] or "$"
             heartbeat_every_sec = 15.0
             last_heartbeat_at = 0.0
 
-            try:
-                redis_client = relay_redis_client()
-                stream_key = relay_redis_stream_key()
-            except Exception as exc:
-                redis_client = None
-                stream_key = ""
-                dedupe_key = f"f4_live_warn_boot:{type(exc).__name__}"
+            # Un solo XREAD por proceso: cada conexión lee del ring buffer compartido.
+            reader = _live_shared_reader(wait_seconds=2.0)
+            if reader is None:
+                dedupe_key = "f4_live_warn_boot:shared_reader_unavailable"
                 if not bp_get(dedupe_key, default=0, context="f4_live_warn_boot_get"):
                     current_app.logger.warning(
-                        "[f4-live] redis stream unavailable; using heartbeat-only mode (%s: %s)",
-                        type(exc).__name__,
-                        str(exc),
+                        "[f4-live] redis stream unavailable; using heartbeat-only mode (%s)",
+                        "shared reader unhealthy",
                     )
                     bp_set(dedupe_key, 1, timeout=120, context="f4_live_warn_boot_set")
+            else:
+                last_stream_id = reader.buffer.resolve_cursor(last_stream_id)
 
             while True:
                 now_ts = time.time()
                 emitted = False
 
-                if redis_client is not None and stream_key:
-                    try:
-                        # block_ms debe ser menor que socket_timeout del cliente Redis
-                        # para evitar falsos degradados a heartbeat-only.
-                        messages = redis_client.xread({stream_key: last_stream_id}, count=25, block=1500) or []
-                        for _stream_name, entries in (messages or []):
-                            for entry_id, fields in (entries or []):
-                                last_stream_id = str(entry_id or last_stream_id)
-                                raw = None
-                                if isinstance(fields, dict):
-                                    raw = fields.get("event")
-                                if not raw:
-                                    continue
-                                try:
-                                    envelope = json.loads(raw)
-                                except Exception:
-                                    continue
-                                normalized = _normalize_live_invalidation_event(envelope, stream_id=last_stream_id)
-                                if normalized is None:
-                                    continue
-                                yield _sse("invalidation", normalized)
-                                emitted = True
-                    except Exception as exc:
-                        if type(exc).__name__ == "TimeoutError":
-                            # Timeout de lectura bloqueante: fallback normal, no desactivar stream.
-                            pass
+                if reader is not None and not reader.healthy:
+                    reader = None
+                    dedupe_key = "f4_live_warn_read:shared_reader_unhealthy"
+                    if not bp_get(dedupe_key, default=0, context="f4_live_warn_read_get"):
+                        current_app.logger.warning(
+                            "[f4-live] stream read failed; switching to heartbeat-only mode (%s)",
+                            "shared reader unhealthy",
+                        )
+                        bp_set(dedupe_key, 1, timeout=120, context="f4_live_warn_read_set")
+
+                if reader is not None:
+                    result = reader.buffer.read_after(last_stream_id, limit=25)
+                    if result is None:
+                        # El cursor quedó fuera del buffer: el cliente recarga y sigue desde la cola actual.
+                        bump_operational_counter("live:stream:memory_buffer_gap_count")
+                        last_stream_id = reader.buffer.last_stream_id
+                        result = ([], last_stream_id)
+                        yield _sse("resync", {"reason": "cursor_expired", "last_stream_id": last_stream_id})
+                        emitted = True
+                    entries, last_stream_id = result
+                    for entry in entries:
+                        normalized = entry.normalized.get("staff")
+                        if normalized is None:
                             continue
-                        redis_client = None
-                        dedupe_key = f"f4_live_warn_read:{type(exc).__name__}"
-                        if not bp_get(dedupe_key, default=0, context="f4_live_warn_read_get"):
-                            current_app.logger.warning(
-                                "[f4-live] stream read failed; switching to heartbeat-only mode (%s: %s)",
-                                type(exc).__name__,
-                                str(exc),
-                            )
-                            bp_set(dedupe_key, 1, timeout=120, context="f4_live_warn_read_set")
+                        yield _sse("invalidation", normalized)
+                        emitted = True
 
                 if (now_ts - last_heartbeat_at) >= heartbeat_every_sec:
                     _live_stream_refresh(stream_slot_id)
@@ -2263,14 +2368,17 @@ def live_invalidation_stream():
                         {
                             "ts": iso_utc_z(),
                             "last_stream_id": last_stream_id,
-                            "mode": "streaming" if redis_client is not None else "heartbeat_only",
+                            "mode": "streaming" if reader is not None else "heartbeat_only",
                         },
                     )
                     last_heartbeat_at = now_ts
                     emitted = True
 
                 if not emitted:
-                    time.sleep(0.2)
+                    if reader is not None:
+                        reader.buffer.wait_after(last_stream_id, timeout=1.5)
+                    else:
+                        time.sleep(0.2)
         except (GeneratorExit, ConnectionError, OSError):
             return
         finally:
@@ -6473,6 +6581,82 @@ def _stream_active_presence_for_operations(latest_active_presence: list[dict] |
     return _presence_active_rows()
 
 
+def _monitoreo_presence_channel_payload() -> dict:
+    presence = _presence_rows()
+    active = _presence_active_rows(presence)
+    return {
+        "items": presence,
+        "active_count": len(active),
+        "conflicts": _build_presence_conflicts(active),
+        "interval_sec": 1,
+    }
+
+
+def _monitoreo_summary_channel_payload() -> dict:
+    summary = _build_monitoreo_summary_payload(
+        include_presence=False,
+        include_activity_stream=False,
+    )
+    summary.pop("presence", None)
+    summary.pop("activity_stream", None)
+    return summary
+
+
+def _monitoreo_operations_channel_payload() -> dict:
+    # Reutiliza la presencia ya agregada en vez de volver a consultarla.
+    presence = _monitoreo_aggregator().peek("presence")
+    cached_active = _presence_active_rows(presence.get("items")) if isinstance(presence, dict) else None
+    active_for_operations = _stream_active_presence_for_operations(cached_active)
+    return {"metrics": _build_operations_metrics_payload(active_for_operations)}
+
+
+def _monitoreo_activity_channel_payload() -> dict:
+    return {"items": _build_activity_stream_payload(limit=20)}
+
+
+def _monitoreo_stream_logs_after(last_id: int) -> list[tuple[int, dict]]:
+    new_logs = (
+        StaffAuditLog.query
+        .filter(StaffAuditLog.id > int(last_id))
+        .order_by(StaffAuditLog.id.asc())
+        .limit(100)
+        .all()
+    )
+    if not new_logs:
+        return []
+    actor_ids = sorted({int(l.actor_user_id) for l in new_logs if l.actor_user_id is not None})
+    username_map = {}
+    if actor_ids:
+        users = StaffUser.query.filter(StaffUser.id.in_(actor_ids)).all()
+        username_map = {int(u.id): u.username for u in users}
+    entity_display_map = _build_entity_display_map(new_logs)
+    return [
+        (int(log.id), _serialize_log_item(log, username_map=username_map, entity_display_map=entity_display_map))
+        for log in new_logs
+    ]
+
+
+_MONITOREO_AGGREGATOR: MonitoreoAggregator | None = None
+_MONITOREO_AGGREGATOR_LOCK = threading.Lock()
+
+
+def _monitoreo_aggregator() -> MonitoreoAggregator:
+    """Agregador por proceso compartido por todos los viewers de /monitoreo/stream."""
+    global _MONITOREO_AGGREGATOR
+    if _MONITOREO_AGGREGATOR is None:
+        with _MONITOREO_AGGREGATOR_LOCK:
+            if _MONITOREO_AGGREGATOR is None:
+                _MONITOREO_AGGREGATOR = MonitoreoAggregator(
+                    [
+                        MonitoreoChannel("presence", 1.0, _monitoreo_presence_channel_payload),
+                        MonitoreoChannel("summary", 5.0, _monitoreo_summary_channel_payload),
+                        MonitoreoChannel("operations", 2.0, _monitoreo_operations_channel_payload),
+                        MonitoreoChannel("activity", 2.0, _monitoreo_activity_channel_payload),
+                    ]
+                )
+    return _MONITOREO_AGGREGATOR
+
+
 def _resolve_candidata_from_entity_id(entity_id: str):
     val = (entity_id or "").strip()
     if not val:
@@ -6924,6 +7108,91 @@ def monitoreo_candidata_logs_json(candidata_entity_id: str):
     return jsonify({"items": items, "last_id": int(last_id)})
 
 
+class _MonitoreoStreamViewer:
+    """Cursor de un viewer de ``/monitoreo/stream``: último log enviado y versión vista por canal.
+
+    ``poll`` devuelve los frames ``(evento, payload)`` pendientes. Los payloads
+    salen del agregador compartido (un cálculo por intervalo), así que lo
+    usan tanto el generador Flask como el gateway SSE (``utils.live_sse_gateway``).
+    """
+
+    channels = ("presence", "summary", "operations", "activity")
+
+    def __init__(self, last_id: int = 0):
+        last_id = int(last_id or 0)
+        if last_id <= 0:
+            last_id = int(db.session.query(func.max(StaffAuditLog.id)).scalar() or 0)
+        self.last_id = last_id
+        self.seen_versions: dict[str, int] = {}
+
+    def poll(self, *, now: float | None = None) -> list[tuple[str, dict]]:
+        aggregator = _monitoreo_aggregator()
+        now_ts = time.time() if now is None else float(now)
+        frames: list[tuple[str, dict]] = []
+
+        log_rows = aggregator.logs_after(self.last_id, fetch_after=_monitoreo_stream_logs_after)
+        if log_rows is None:
+            log_rows = _monitoreo_stream_logs_after(self.last_id)
+        for row_id, item in log_rows:
+            frames.append(("log", item))
+            self.last_id = max(self.last_id, int(row_id))
+
+        for channel, payload in aggregator.changes_since(self.seen_versions, list(self.channels), now=now_ts):
+            if channel == "presence":
+                # Emit both event names for backwards-compatible listeners.
+                frames.append(("active_snapshot", payload))
+                frames.append(("presence", payload))
+            else:
+                frames.append((channel, payload))
+        return frames
+
+
+class _MonitoreoCandidataStreamViewer:
+    """Cursor de un viewer del historial en vivo de una candidata.
+
+    ``poll`` lee hasta ``batch_size`` logs nuevos; si devuelve un lote lleno
+    hay más pendientes y conviene volver a llamar sin esperar aviso.
+    """
+
+    batch_size = 100
+
+    def __init__(self, candidata_entity_id: str, last_id: int = 0):
+        self.candidata_entity_id = str(candidata_entity_id)
+        last_id = int(last_id or 0)
+        if last_id <= 0:
+            max_id = (
+                _candidata_logs_query(self.candidata_entity_id)
+                .with_entities(func.max(StaffAuditLog.id))
+                .scalar()
+            )
+            last_id = int(max_id or 0)
+        self.last_id = last_id
+
+    def poll(self) -> list[tuple[str, dict]]:
+        new_logs = (
+            _candidata_logs_query(self.candidata_entity_id)
+            .filter(StaffAuditLog.id > self.last_id)
+            .order_by(StaffAuditLog.id.asc())
+            .limit(self.batch_size)
+            .all()
+        )
+        if not new_logs:
+            return []
+        actor_ids = sorted({int(l.actor_user_id) for l in new_logs if l.actor_user_id is not None})
+        username_map = {}
+        if actor_ids:
+            users = StaffUser.query.filter(StaffUser.id.in_(actor_ids)).all()
+            username_map = {int(u.id): u.username for u in users}
+        entity_display_map = _build_entity_display_map(new_logs)
+        frames: list[tuple[str, dict]] = []
+        for log in new_logs:
+            item = _serialize_log_item(log, username_map=username_map, entity_display_map=entity_display_map)
+            item["metadata_json"] = _sanitize_monitoreo_metadata(item.get("metadata_json"))
+            frames.append(("candidatelog", item))
+            self.last_id = max(self.last_id, int(log.id))
+        return frames
+
+
 @admin_bp.route('/monitoreo/stream', methods=['GET'])
 @login_required
 @admin_required
@@ -6959,79 +7228,24 @@ def monitoreo_stream():
                 yield _sse("heartbeat", {"ts": iso_utc_z()})
                 return
 
-            last_id = request.args.get("last_id", type=int) or 0
-            if last_id <= 0:
-                max_id = db.session.query(func.max(StaffAuditLog.id)).scalar()
-                last_id = int(max_id or 0)
-
-            last_summary_at = 0.0
-            last_presence_at = 0.0
-            last_operations_at = 0.0
-            last_activity_at = 0.0
+            viewer = _MonitoreoStreamViewer(request.args.get("last_id", type=int) or 0)
+            aggregator = _monitoreo_aggregator()
+            aggregator.viewer_opened()
+            opened_at = time.time()
             last_heartbeat_at = 0.0
-            latest_active_presence = None
-            while True:
-                now_ts = time.time()
-
-                new_logs = (
-                    StaffAuditLog.query
-                    .filter(StaffAuditLog.id > last_id)
-                    .order_by(StaffAuditLog.id.asc())
-                    .limit(100)
-                    .all()
-                )
-                if new_logs:
-                    actor_ids = sorted({int(l.actor_user_id) for l in new_logs if l.actor_user_id is not None})
-                    username_map = {}
-                    if actor_ids:
-                        users = StaffUser.query.filter(StaffUser.id.in_(actor_ids)).all()
-                        username_map = {int(u.id): u.username for u in users}
-                    entity_display_map = _build_entity_display_map(new_logs)
-                    for log in new_logs:
-                        item = _serialize_log_item(log, username_map=username_map, entity_display_map=entity_display_map)
-                        yield _sse("log", item)
-                        last_id = max(last_id, int(log.id))
-
-                if (now_ts - last_presence_at) >= 1.0:
-                    presence = _presence_rows()
-                    active = _presence_active_rows(presence)
-                    latest_active_presence = active
-                    conflicts = _build_presence_conflicts(active)
-                    payload = {
-                        "items": presence,
-                        "active_count": len(active),
-                        "conflicts": conflicts,
-                        "interval_sec": 1,
-                    }
-                    # Emit both event names for backwards-compatible listeners.
-                    yield _sse("active_snapshot", payload)
-                    yield _sse("presence", payload)
-                    last_presence_at = now_ts
-
-                if (now_ts - last_summary_at) >= 5.0:
-                    summary = _build_monitoreo_summary_payload(
-                        include_presence=False,
-                        include_activity_stream=False,
-                    )
-                    summary.pop("presence", None)
-                    summary.pop("activity_stream", None)
-                    yield _sse("summary", summary)
-                    last_summary_at = now_ts
-
-                if (now_ts - last_operations_at) >= 2.0:
-                    active_for_operations = _stream_active_presence_for_operations(latest_active_presence)
-                    yield _sse("operations", {"metrics": _build_operations_metrics_payload(active_for_operations)})
-                    last_operations_at = now_ts
-
-                if (now_ts - last_activity_at) >= 2.0:
-                    yield _sse("activity", {"items": _build_activity_stream_payload(limit=20)})
-                    last_activity_at = now_ts
-
-                if (now_ts - last_heartbeat_at) >= 15.0:
-                    yield _sse("heartbeat", {"ts": iso_utc_z()})
-                    last_heartbeat_at = now_ts
-
-                time.sleep(1.0)
+            try:
+                while True:
+                    now_ts = time.time()
+                    for event_name, payload in viewer.poll(now=now_ts):
+                        yield _sse(event_name, payload)
+
+                    if (now_ts - last_heartbeat_at) >= 15.0:
+                        yield _sse("heartbeat", {"ts": iso_utc_z()})
+                        last_heartbeat_at = now_ts
+
+                    time.sleep(1.0)
+            finally:
+                aggregator.viewer_closed(connected_seconds=time.time() - opened_at)
         except (GeneratorExit, ConnectionError, OSError):
             return
 
@@ -7044,6 +7258,13 @@ def monitoreo_stream():
     return Response(generate(), mimetype="text/event-stream", headers=headers)
 
 
+@admin_bp.route('/monitoreo/stream/stats.json', methods=['GET'])
+@login_required
+@admin_required
+def monitoreo_stream_stats_json():
+    return jsonify(_monitoreo_aggregator().snapshot())
+
+
 @admin_bp.route('/monitoreo/candidatas/<candidata_entity_id>/stream', methods=['GET'])
 @login_required
 @admin_required
@@ -7057,42 +7278,33 @@ def monitoreo_candidata_stream(candidata_entity_id: str):
             yield _sse("heartbeat", {"ts": iso_utc_z()})
             return
 
-        last_id = request.args.get("last_id", type=int) or 0
-        if last_id <= 0:
-            max_id = (
-                _candidata_logs_query(candidata_entity_id)
-                .with_entities(func.max(StaffAuditLog.id))
-                .scalar()
-            )
-            last_id = int(max_id or 0)
+        viewer = _MonitoreoCandidataStreamViewer(candidata_entity_id, request.args.get("last_id", type=int) or 0)
 
-        last_heartbeat_at = 0.0
-        while True:
-            now_ts = time.time()
-            new_logs = (
-                _candidata_logs_query(candidata_entity_id)
-                .filter(StaffAuditLog.id > last_id)
-                .order_by(StaffAuditLog.id.asc())
-                .limit(100)
-                .all()
-            )
-            if new_logs:
-                actor_ids = sorted({int(l.actor_user_id) for l in new_logs if l.actor_user_id is not None})
-                username_map = {}
-                if actor_ids:
-                    users = StaffUser.query.filter(StaffUser.id.in_(actor_ids)).all()
-                    username_map = {int(u.id): u.username for u in users}
-                entity_display_map = _build_entity_display_map(new_logs)
-                for log in new_logs:
-                    item = _serialize_log_item(log, username_map=username_map, entity_display_map=entity_display_map)
-                    item["metadata_json"] = _sanitize_monitoreo_metadata(item.get("metadata_json"))
-                    yield _sse("candidatelog", item)
-                    last_id = max(last_id, int(log.id))
-
-            if (now_ts - last_heartbeat_at) >= 15.0:
-                yield _sse("heartbeat", {"ts": iso_utc_z()})
-                last_heartbeat_at = now_ts
-            time.sleep(2.0)
+        # Solo se consulta la tabla cuando llega un aviso de log para esta candidata
+        # (LISTEN/NOTIFY); en modo poll (SQLite) se despierta cada 2s como antes.
+        tailer = audit_log_tailer(current_app._get_current_object(), engine=db.engine)
+        subscription = tailer.subscribe(entity_key("candidata", candidata_entity_id))
+        try:
+            should_query = True
+            last_heartbeat_at = 0.0
+            while True:
+                now_ts = time.time()
+                if should_query:
+                    frames = viewer.poll()
+                    for event_name, payload in frames:
+                        yield _sse(event_name, payload)
+                    # El lote pudo quedar truncado: seguir leyendo sin esperar aviso.
+                    if len(frames) >= _MonitoreoCandidataStreamViewer.batch_size:
+                        continue
+                    db.session.remove()
+
+                if (now_ts - last_heartbeat_at) >= 15.0:
+                    yield _sse("heartbeat", {"ts": iso_utc_z()})
+                    last_heartbeat_at = now_ts
+                wait_for = max(0.1, 15.0 - (time.time() - last_heartbeat_at))
+                should_query = subscription.wait(timeout=wait_for)
+        finally:
+            subscription.close()
 
     headers = {
         "Cache-Control": "no-cache",
@@ -17891,6 +18103,9 @@ def solicitudes_prioridad_responsables_fragment():
 from flask import request, jsonify
 from sqlalchemy import or_, and_
 
+_API_CANDIDATAS_INDEX_MAX_IDS = 500
+
+
 @admin_bp.route('/api/candidatas', methods=['GET'])
 @login_required
 @admin_required
@@ -17960,12 +18175,28 @@ def api_candidatas():
 
         query = query.filter(and_(*filters))
 
-    candidatas = (
-        query
-        .order_by(Candidata.nombre_completo.asc(), Candidata.fila.asc())
-        .limit(50)
-        .all()
-    )
+    candidatas = None
+    if term:
+        # Con el índice listo, SQL solo ordena un IN acotado; los mismos filtros
+        # siguen aplicados, así que el resultado es idéntico al camino completo.
+        search_index = get_candidata_search_index()
+        ids = search_index.match_all_tokens(term, max_ids=_API_CANDIDATAS_INDEX_MAX_IDS) if search_index is not None else None
+        if ids is not None:
+            candidatas = (
+                query
+                .filter(Candidata.fila.in_(ids))
+                .options(load_only(Candidata.fila, Candidata.nombre_completo, Candidata.cedula, Candidata.numero_telefono, Candidata.codigo))
+                .order_by(Candidata.nombre_completo.asc(), Candidata.fila.asc())
+                .limit(50)
+                .all()
+            ) if ids else []
+    if candidatas is None:
+        candidatas = (
+            query
+            .order_by(Candidata.nombre_completo.asc(), Candidata.fila.asc())
+            .limit(50)
+            .all()
+        )
 
     results = [{"id": int(c.fila), "text": _label(c)} for c in candidatas]
 
@@ -21130,6 +21361,15 @@ def _matching_store_ranking_cache(*, solicitud: Solicitud, ranking_map: dict[int
         return
 
 
+def _matching_materialized_ranking(*, solicitud: Solicitud, top_k: int) -> list[dict] | None:
+    if bool(current_app.config.get("TESTING")):
+        return None
+    try:
+        return load_matching_suggestions(solicitud, top_k=top_k)
+    except Exception:
+        return None
+
+
 def _matching_cached_ranking_map(
     *,
     solicitud: Solicitud,
@@ -21572,7 +21812,9 @@ def matching_detalle_solicitud(solicitud_id: int):
         .first_or_404()
     )
     has_reemplazo_activo = _active_reemplazo_for_solicitud(solicitud) is not None
-    ranked_candidates = rank_candidates(solicitud, top_k=30)
+    ranked_candidates = _matching_materialized_ranking(solicitud=solicitud, top_k=30)
+    if ranked_candidates is None:
+        ranked_candidates = rank_candidates(solicitud, top_k=30)
     _matching_store_ranking_cache(solicitud=solicitud, ranking_map=_matching_build_ranking_map(ranked_candidates))
     ranked_candidate_ids = []
     for item in ranked_candidates:
@@ -26681,7 +26923,7 @@ def calc_score_compat(solicitud: Solicitud, candidata: Candidata):
     """
     DEPRECATED: conservar alias local mientras todo el sistema consume el engine único.
     """
-    return format_compat_result(compute_match(solicitud, candidata))
+    return format_compat_result(compute_match_cached(solicitud, candidata))
 
 # ---------------------------------
 # VISTA: resumen HTML de compatibilidad
@@ -26700,7 +26942,7 @@ def ver_compatibilidad(cliente_id, candidata_id):
         return redirect(url_for('admin.detalle_cliente', cliente_id=cliente_id))
 
     candidata = Candidata.query.get_or_404(candidata_id)
-    res = format_compat_result(compute_match(solicitud, candidata))
+    res = format_compat_result(compute_match_cached(solicitud, candidata))
 
     return render_template(
         'admin/compat_resumen.html',
@@ -26727,7 +26969,7 @@ def pdf_compatibilidad(cliente_id, candidata_id):
         return redirect(url_for('admin.detalle_cliente', cliente_id=cliente_id))
 
     candidata = Candidata.query.get_or_404(candidata_id)
-    res = format_compat_result(compute_match(solicitud, candidata))
+    res = format_compat_result(compute_match_cached(solicitud, candidata))
 
     html_str = render_template(
         'admin/compat_pdf.html',
@@ -27534,12 +27776,8 @@ def _chat_staff_global_badge_payload() -> dict:
 
 def _admin_live_boot_after_id() -> int:
     try:
-        return int(
-            db.session.query(db.func.max(DomainOutbox.id))
-            .filter(DomainOutbox.event_type.in_(sorted(_F4_LIVE_ALLOWED_EVENT_TYPES)))
-            .scalar()
-            or 0
-        )
+        # Cursor: los ids de tipos no-live nunca se entregan, así que basta el máximo global (solo índice de PK).
+        return int(db.session.query(db.func.max(DomainOutbox.id)).scalar() or 0)
     except Exception:
         return 0
 
@@ -29417,8 +29655,11 @@ def _cw_parse_tags(value: str | None) -> list[str]:
 
 
 def _cw_has_profile_photo(candidata: Candidata) -> bool:
-    blob = getattr(candidata, "perfil", None)
-    return isinstance(blob, (bytes, bytearray, memoryview)) and len(blob) > 0
+    loaded = getattr(candidata, "__dict__", {}) or {}
+    if "perfil" in loaded:
+        blob = loaded.get("perfil")
+        return isinstance(blob, (bytes, bytearray, memoryview)) and len(blob) > 0
+    return bool(candidata_document_mimes([int(candidata.fila)], "perfil"))
 
 
 def _cw_has_interview(candidata: Candidata) -> bool:
@@ -21,22 +21,16 @@ from services.bot_constants import (
 )
 from services.bot_conversation_service import get_or_create_manual_conversation
 from services.bot_decision_service import register_decision
-from services.bot_inbound_pipeline_service import process_inbound_ai_pipeline
+from services.bot_inbound_queue_service import (
+    enqueue_inbound_job,
+    inbound_async_enabled,
+    process_inbound_message,
+    run_sandbox_auto_replies,
+    warn_if_backlogged,
+)
 from services.bot_identity_service import get_or_create_identity
 from services.bot_observability_service import log_bot_event
-from services.bot_sandbox_review_service import (
-    ReviewTransitionError,
-    approve_review,
-    auto_approve_review_in_sandbox,
-    reject_review,
-)
-from services.bot_sandbox_service import (
-    is_sandbox_assistant_allowed,
-    is_sandbox_auto_reply_active,
-    is_sandbox_auto_reply_enabled,
-    is_sandbox_auto_reply_paused,
-    run_sandbox_worker_once,
-)
+from services.bot_sandbox_review_service import ReviewTransitionError, approve_review, reject_review
 from services.phone_identity_service import normalize_phone_to_e164
 from services.whatsapp_cloud_service import send_text_message
 from services.whatsapp_payload_parser import epoch_to_datetime_utc, parse_webhook_payload
@@ -62,28 +56,6 @@ def _allowed_real_numbers() -> set[str]:
     return {r for r in rows if r.startswith("+") and len(r) >= 8}
 
 
-def _sandbox_auto_reply_skip_reason(*, enabled: bool, paused: bool, owner_only: bool, provider: str, whatsapp_enabled: bool, dry_run: bool, simulate: bool, allowlisted: bool, app_env: str) -> str:
-    if not enabled:
-        return "disabled"
-    if paused:
-        return "paused"
-    if not owner_only:
-        return "owner_only_false"
-    if provider != "meta_sandbox":
-        return "provider_not_meta_sandbox"
-    if not whatsapp_enabled:
-        return "whatsapp_disabled"
-    if dry_run:
-        return "dry_run_true"
-    if simulate:
-        return "simulate_true"
-    if not allowlisted:
-        return "allowlist_blocked"
-    if app_env in {"production", "prod"}:
-        return "production_blocked"
-    return "guard_not_active"
-
-
 @bot_bp.route("/whatsapp/webhook", methods=["GET"])
 def whatsapp_webhook_verify():
     ok, challenge = verify_webhook_token(
@@ -128,6 +100,8 @@ def whatsapp_webhook_receive():
         },
     )
     pending_auto_reply: list[dict[str, int | str | None]] = []
+    async_inbound = inbound_async_enabled() if parsed.get("messages") else False
+    enqueued = 0
     for msg in parsed.get("messages", []):
         try:
             with db.session.begin_nested():
@@ -242,12 +216,25 @@ def whatsapp_webhook_receive():
                     autocommit=False,
                 )
 
-                process_inbound_ai_pipeline(
+                job_kwargs = dict(
                     conversation=conversation,
-                    inbound_message=inbound,
+                    inbound=inbound,
                     identity_status=str(resolution.get("identity_status") or ""),
                     message_type=(msg.get("message_type") or "text"),
                     phone_e164=phone_e164,
+                    allowlisted=allowlisted,
+                    wa_message_id=wa_message_id,
+                )
+                if async_inbound:
+                    job = enqueue_inbound_job(**job_kwargs)
+                    enqueued += 1
+                    log_bot_event(
+                        "whatsapp_webhook_inbound_enqueued",
+                        metadata={"wa_message_id": wa_message_id, "job_id": int(job.id), "conversation_id": int(conversation.id)},
+                    )
+                    continue
+                pending = process_inbound_message(
+                    **job_kwargs,
                     allow_autoreply_send=True,
                     classify_intent_fn=classify_intent,
                     generate_safe_reply_fn=generate_safe_reply,
@@ -255,99 +242,8 @@ def whatsapp_webhook_receive():
                     is_autoreply_enabled_fn=is_autoreply_enabled,
                     send_text_message_fn=send_text_message,
                 )
-                review_created = False
-                review_reason = "sandbox_assistant_disabled"
-                review = None
-                try:
-                    if is_sandbox_assistant_allowed():
-                        from services.bot_sandbox_review_service import create_review_from_inbound
-
-                        review = create_review_from_inbound(
-                            conversation=conversation,
-                            inbound_message=inbound,
-                            identity_status=str(resolution.get("identity_status") or ""),
-                        )
-                        review_created = review is not None
-                        review_reason = "created" if review_created else "unknown"
-                        log_bot_event(
-                            "whatsapp_webhook_review_created",
-                            metadata={
-                                "wa_message_id": wa_message_id,
-                                "review_id": int(review.id) if review else None,
-                                "conversation_id": int(conversation.id),
-                                "inbound_message_id": int(inbound.id),
-                            },
-                        )
-                    else:
-                        review_reason = "sandbox_assistant_disabled"
-                except Exception as exc:
-                    review_reason = f"create_failed:{exc.__class__.__name__}"
-                    current_app.logger.exception("BOT_WHATSAPP_REVIEW_CREATE_FAILED")
-                if not review_created:
-                    log_bot_event(
-                        "whatsapp_webhook_review_skipped",
-                        level="warning",
-                        metadata={
-                            "wa_message_id": wa_message_id,
-                            "conversation_id": int(conversation.id),
-                            "inbound_message_id": int(inbound.id),
-                            "reason": review_reason,
-                            "allowlisted": bool(allowlisted),
-                            "wa_id": phone_e164,
-                        },
-                    )
-                if review_created and review is not None:
-                    env = str(os.getenv("APP_ENV", "development") or "development").strip().lower()
-                    provider = str(os.getenv("BOT_REAL_WHATSAPP_PROVIDER", "fake") or "fake").strip().lower().replace("-", "_")
-                    owner_only = _is_true(os.getenv("BOT_REAL_WHATSAPP_OWNER_ONLY"), default=True)
-                    whatsapp_enabled = _is_true(os.getenv("WHATSAPP_ENABLED"), default=False)
-                    dry_run = _is_true(os.getenv("BOT_DRY_RUN"), default=True)
-                    simulate = _is_true(os.getenv("BOT_REAL_WHATSAPP_SIMULATE"), default=True)
-                    enabled = bool(is_sandbox_auto_reply_enabled())
-                    paused = bool(is_sandbox_auto_reply_paused())
-                    active = bool(is_sandbox_auto_reply_active())
-                    log_bot_event(
-                        "sandbox_auto_reply_guard_checked",
-                        metadata={
-                            "enabled": bool(enabled),
-                            "paused": bool(paused),
-                            "owner_only": bool(owner_only),
-                            "provider": provider,
-                            "whatsapp_enabled": bool(whatsapp_enabled),
-                            "dry_run": bool(dry_run),
-                            "simulate": bool(simulate),
-                            "allowlisted": bool(allowlisted),
-                            "app_env": env,
-                        },
-                    )
-                    if not active or not allowlisted:
-                        log_bot_event(
-                            "sandbox_auto_reply_skipped",
-                            metadata={
-                                "wa_message_id": wa_message_id,
-                                "conversation_id": int(conversation.id),
-                                "review_id": int(review.id),
-                                "reason": _sandbox_auto_reply_skip_reason(
-                                    enabled=bool(enabled),
-                                    paused=bool(paused),
-                                    owner_only=bool(owner_only),
-                                    provider=provider,
-                                    whatsapp_enabled=bool(whatsapp_enabled),
-                                    dry_run=bool(dry_run),
-                                    simulate=bool(simulate),
-                                    allowlisted=bool(allowlisted),
-                                    app_env=env,
-                                ),
-                            },
-                        )
-                    else:
-                        pending_auto_reply.append(
-                            {
-                                "review_id": int(review.id),
-                                "conversation_id": int(conversation.id),
-                                "wa_message_id": str(wa_message_id or ""),
-                            }
-                        )
+                if pending:
+                    pending_auto_reply.append(pending)
         except SQLAlchemyError:
             current_app.logger.exception("BOT_WHATSAPP_INBOUND_STORE_FAILED")
         except Exception:
@@ -389,86 +285,9 @@ def whatsapp_webhook_receive():
         return jsonify({"ok": False, "error": "store_failed"}), 200
 
     if pending_auto_reply:
-        from models import BotSandboxOutbound
-
-        for item in pending_auto_reply:
-            review_id = int(item.get("review_id") or 0)
-            if review_id <= 0:
-                continue
-            try:
-                review = BotSandboxReviewQueue.query.get(review_id)
-                if review is None:
-                    continue
-                log_bot_event(
-                    "sandbox_auto_reply_started",
-                    metadata={
-                        "wa_message_id": str(item.get("wa_message_id") or ""),
-                        "conversation_id": int(item.get("conversation_id") or 0),
-                        "review_id": review_id,
-                    },
-                )
-                _, outbound = auto_approve_review_in_sandbox(review=review)
-                db.session.flush()
-                outbox = None
-                if outbound is not None:
-                    outbox = BotSandboxOutbound.query.filter_by(bot_message_id=int(outbound.id)).first()
-                log_bot_event(
-                    "sandbox_auto_reply_outbox_created",
-                    metadata={
-                        "outbox_id": int(outbox.id) if outbox else None,
-                        "outbound_message_id": int(outbound.id) if outbound else None,
-                    },
-                )
-                log_bot_event(
-                    "sandbox_auto_reply_meta_send_attempt",
-                    metadata={"review_id": review_id, "outbox_id": int(outbox.id) if outbox else None},
-                )
-                stats = run_sandbox_worker_once(batch_size=1, review_id=review_id, outbox_id=(int(outbox.id) if outbox else None))
-                if outbox is not None:
-                    db.session.refresh(outbox)
-                if outbound is not None:
-                    db.session.refresh(outbound)
-                raw_body = (outbox.outbound_response_raw if outbox is not None else None) or {}
-                wamid = str((getattr(outbound, "wa_message_id", "") or "")) or str((dict((outbox.payload_json or {}).get("audit") or {}).get("provider_message_id") or ""))
-                log_bot_event(
-                    "sandbox_auto_reply_meta_send_response",
-                    metadata={
-                        "http_status": (int(outbox.outbound_http_status) if (outbox is not None and outbox.outbound_http_status is not None) else None),
-                        "wamid": wamid or None,
-                        "raw_body": raw_body,
-                    },
-                )
-                if int(stats.get("sent", 0)) >= 1 and wamid:
-                    log_bot_event(
-                        "sandbox_auto_reply_sent",
-                        metadata={"review_id": review_id, "outbox_id": int(outbox.id) if outbox else None, "wamid": wamid},
-                    )
-                else:
-                    log_bot_event(
-                        "sandbox_auto_reply_failed",
-                        level="warning",
-                        metadata={
-                            "review_id": review_id,
-                            "outbox_id": int(outbox.id) if outbox else None,
-                            "stats": dict(stats or {}),
-                            "state": str(outbox.state or "") if outbox is not None else "",
-                            "failure_reason": str(outbox.failure_reason or "") if outbox is not None else "",
-                        },
-                    )
-                db.session.commit()
-            except Exception as exc:
-                db.session.rollback()
-                log_bot_event(
-                    "sandbox_auto_reply_failed",
-                    level="warning",
-                    metadata={
-                        "wa_message_id": str(item.get("wa_message_id") or ""),
-                        "conversation_id": int(item.get("conversation_id") or 0),
-                        "review_id": review_id,
-                        "error": f"{exc.__class__.__name__}:{exc}",
-                    },
-                )
-                current_app.logger.exception("BOT_SANDBOX_AUTO_REPLY_FAILED")
+        run_sandbox_auto_replies(pending_auto_reply)
+    if enqueued:
+        warn_if_backlogged()
 
     return jsonify({"ok": True}), 200
 
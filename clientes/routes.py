@@ -14,7 +14,7 @@ from typing import Optional, Union  # ✅ PARA PYTHON 3.9
 
 from flask import (
     render_template, redirect, url_for, flash,
-    request, abort, g, session, current_app, jsonify, make_response, send_file, Response, stream_with_context, has_request_context
+    request, abort, g, session, current_app, jsonify, make_response, Response, stream_with_context, has_request_context
 )
 from flask_login import (
     login_required, current_user, login_user, logout_user
@@ -147,13 +147,13 @@ from utils.compat_engine import (
     HORARIO_OPTIONS,
     MASCOTAS_CHOICES,
     MASCOTAS_IMPORTANCIA_CHOICES,
-    compute_match,
     format_compat_result,
     normalize_mascotas_importancia,
     normalize_mascotas_token,
     normalize_horarios_tokens,
     persist_result_to_solicitud,
 )
+from utils.compat_cache import compute_match_cached
 
 
 def _format_rd_money(value) -> str:
@@ -5080,7 +5080,7 @@ def detalle_solicitud(id):
     compat_result = None
     if getattr(s, 'candidata_id', None) and getattr(s, 'candidata', None):
         if getattr(s, 'compat_test_cliente_json', None) or getattr(s, 'compat_test_cliente', None):
-            compat_result = format_compat_result(compute_match(s, s.candidata))
+            compat_result = format_compat_result(compute_match_cached(s, s.candidata))
 
     candidatas_enviadas = []
     candidatas_enviadas_cards = []
@@ -7650,7 +7650,7 @@ def compat_test_cliente(solicitud_id):
         destino = _save_compat_cliente(s, payload)
 
         if getattr(s, 'candidata_id', None) and getattr(s, 'candidata', None):
-            result = compute_match(s, s.candidata)
+            result = compute_match_cached(s, s.candidata)
             ok = persist_result_to_solicitud(s, result)
             if ok:
                 flash(f"Test guardado y compatibilidad recalculada ({result.get('score', 0)}%).", 'success')
@@ -7699,7 +7699,7 @@ def compat_recalcular(solicitud_id):
         flash('No hay candidata asignada todavía. No se puede calcular el match.', 'info')
         return redirect(url_for('clientes.detalle_solicitud', id=solicitud_id))
 
-    result = compute_match(s, s.candidata)
+    result = compute_match_cached(s, s.candidata)
     ok = persist_result_to_solicitud(s, result)
     if ok:
         flash(f"Compatibilidad recalculada: {result.get('score', 0)}%.", 'success')
@@ -8949,14 +8949,26 @@ def banco_domesticas():
     has_next = page < pages
 
     domesticas = []
+    try:
+        from core.services.candidata_documentos import candidata_document_mimes, candidata_document_versions
+
+        filas_items = [cand.fila for cand, _ficha in (items or [])]
+        fotos_perfil = candidata_document_mimes(filas_items, 'foto_perfil')
+        fotos_version = candidata_document_versions(filas_items, 'foto_perfil')
+    except Exception:
+        fotos_perfil, fotos_version = {}, {}
+    fotos_card = {}
     for cand, ficha in (items or []):
+        try:
+            if int(cand.fila) in fotos_perfil:
+                fotos_card[int(cand.fila)] = _domestica_foto_url(
+                    cand.fila, fotos_version.get(int(cand.fila)), size='card'
+                )
+        except Exception:
+            pass
         foto_url = (getattr(ficha, 'foto_url_publica', None) or getattr(ficha, 'foto', None) or '').strip()
         if not foto_url:
-            try:
-                if getattr(cand, 'foto_perfil', None):
-                    foto_url = url_for('clientes.domestica_foto_perfil', fila=cand.fila)
-            except Exception:
-                foto_url = ''
+            foto_url = fotos_card.get(int(cand.fila), '')
 
         domesticas.append({
             'foto': foto_url or None,
@@ -9013,6 +9025,7 @@ def banco_domesticas():
         prev_num=page-1 if has_prev else 1,
         next_num=page+1 if has_next else pages,
         domesticas=domesticas,
+        fotos_card=fotos_card,
         ciudades_disponibles=ciudades_disponibles,
         modalidades_disponibles=modalidades_disponibles,
     )
@@ -9044,13 +9057,19 @@ def domestica_detalle(fila: int):
     )
     tags_txt = _to_tags_text(raw_tags)
 
+    foto_detalle_url, foto_original_url = '', ''
+    try:
+        from core.services.candidata_documentos import candidata_document_mimes, candidata_document_versions
+
+        if candidata_document_mimes([cand.fila], 'foto_perfil'):
+            version = candidata_document_versions([cand.fila], 'foto_perfil').get(int(cand.fila))
+            foto_detalle_url = _domestica_foto_url(cand.fila, version, size='detail')
+            foto_original_url = _domestica_foto_url(cand.fila, version)
+    except Exception:
+        foto_detalle_url, foto_original_url = '', ''
     foto_url = (getattr(ficha, 'foto_url_publica', None) or getattr(ficha, 'foto', None) or '').strip()
     if not foto_url:
-        try:
-            if getattr(cand, 'foto_perfil', None):
-                foto_url = url_for('clientes.domestica_foto_perfil', fila=cand.fila)
-        except Exception:
-            foto_url = ''
+        foto_url = foto_detalle_url
 
     disponible_inmediato = bool(getattr(ficha, 'disponible_inmediato', False))
     disponible_msg = (getattr(ficha, 'disponible_inmediato_msg', None) or '').strip() or None
@@ -9081,9 +9100,24 @@ def domestica_detalle(fila: int):
         cand=cand,
         ficha=ficha,
         candidata=candidata,
+        foto_detalle_url=foto_detalle_url,
+        foto_original_url=foto_original_url,
     )
 
 
+def _domestica_foto_url(fila: int, sha256: Optional[str], size: Optional[str] = None) -> str:
+    from core.services.candidata_thumbnails import VARIANT_PARAM
+    from utils.media_serving import VERSION_PARAM, media_version
+
+    params = {}
+    if size:
+        params[VARIANT_PARAM] = size
+    version = media_version(sha256)
+    if version:
+        params[VERSION_PARAM] = version
+    return url_for('clientes.domestica_foto_perfil', fila=fila, **params)
+
+
 @clientes_bp.route('/domesticas/<int:fila>/foto_perfil', methods=['GET'])
 @login_required
 @cliente_required
@@ -9092,9 +9126,6 @@ def domestica_foto_perfil(fila: int):
     if Candidata is None or CandidataWeb is None:
         abort(404)
 
-    from io import BytesIO
-    import imghdr
-
     cand = Candidata.query.filter_by(fila=fila).first_or_404()
     if candidata_esta_descalificada(cand):
         abort(404)
@@ -9102,29 +9133,15 @@ def domestica_foto_perfil(fila: int):
     if not ficha or not bool(getattr(ficha, 'visible', False)) or (getattr(ficha, 'estado_publico', '') != 'disponible'):
         abort(404)
 
-    blob = getattr(cand, 'foto_perfil', None)
-    if not blob:
-        abort(404)
+    from core.services.candidata_thumbnails import VARIANT_PARAM, serve_candidata_photo
 
-    kind = imghdr.what(None, h=blob)
-    if kind == 'jpeg':
-        mimetype, ext = 'image/jpeg', 'jpg'
-    elif kind == 'png':
-        mimetype, ext = 'image/png', 'png'
-    elif kind == 'gif':
-        mimetype, ext = 'image/gif', 'gif'
-    elif kind == 'webp':
-        mimetype, ext = 'image/webp', 'webp'
-    else:
-        mimetype, ext = 'application/octet-stream', 'bin'
-
-    response = send_file(
-        BytesIO(blob),
-        mimetype=mimetype,
-        as_attachment=False,
-        download_name=f"candidata_{fila}_perfil.{ext}",
-        max_age=3600,
+    response = serve_candidata_photo(
+        cand,
+        'foto_perfil',
+        (request.args.get(VARIANT_PARAM) or '').strip() or None,
+        require_image=False,
+        download_stem=f"candidata_{fila}_perfil",
     )
-    response.headers['Cache-Control'] = 'private, max-age=3600'
-    response.headers['Pragma'] = 'private'
+    if response is None:
+        abort(404)
     return response
@@ -1065,6 +1065,39 @@ def create_app():
     from utils.outbox_relay import outbox_relay_cli
     app.cli.add_command(outbox_relay_cli)
 
+    from utils.outbox_retention import outbox_retention_cli
+    app.cli.add_command(outbox_retention_cli)
+
+    from utils.live_sse_gateway import live_sse_gateway_cli
+    app.cli.add_command(live_sse_gateway_cli)
+
+    from core.services.candidata_search_index import candidata_search_index_cli
+    app.cli.add_command(candidata_search_index_cli)
+
+    from core.services.candidata_documentos import candidata_blobs_cli
+    app.cli.add_command(candidata_blobs_cli)
+
+    from core.services.candidata_thumbnails import candidata_thumbnails_cli
+    app.cli.add_command(candidata_thumbnails_cli)
+
+    from core.services.store_facets import store_facets_cli
+    app.cli.add_command(store_facets_cli)
+
+    from services.solicitud_recommendation_queue import recommendation_queue_cli
+    app.cli.add_command(recommendation_queue_cli)
+
+    from services.bot_inbound_queue_service import bot_inbound_cli
+    app.cli.add_command(bot_inbound_cli)
+
+    from services.bot_outbound_sender_service import bot_outbound_cli
+    app.cli.add_command(bot_outbound_cli)
+
+    from utils.candidata_match_profiles import candidata_match_profiles_cli
+    app.cli.add_command(candidata_match_profiles_cli)
+
+    from services.solicitud_matching_suggestions import matching_suggestions_cli
+    app.cli.add_command(matching_suggestions_cli)
+
     @app.cli.group("operational-snapshots")
     def operational_snapshots_group():
         """Snapshots operativos O2 (retención mínima y tendencias básicas)."""
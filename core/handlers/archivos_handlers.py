@@ -1,10 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-import io
 import re
 
-from flask import Response, abort, current_app, flash, redirect, render_template, request, send_file, session, url_for
+from flask import abort, current_app, flash, redirect, render_template, request, session, url_for
 from flask_login import current_user
 from sqlalchemy.exc import DBAPIError, OperationalError
 
@@ -15,9 +14,22 @@ from utils.audit_entity import log_candidata_action
 from utils.candidata_readiness import maybe_update_estado_por_completitud
 from utils.robust_save import binary_has_content, execute_robust_save, safe_bytes_length
 from utils.upload_limits import MAX_FILE_BYTES, file_too_large, get_filestorage_size, human_size
+from utils.media_serving import extension_for_mime, media_response
 from utils.upload_security import validate_upload_file
 
 from core import legacy_handlers as legacy_h
+from core.services.candidata_documentos import (
+    describe_candidata_document,
+    iter_candidata_document,
+    serve_candidata_document,
+)
+from core.services.candidata_thumbnails import (
+    PHOTO_KINDS,
+    VARIANT_PARAM,
+    ThumbnailError,
+    serve_candidata_photo,
+    store_candidata_thumbnails,
+)
 from core.services.search import apply_search_to_candidata_query
 
 
@@ -110,34 +122,6 @@ def _current_staff_actor() -> str:
     )
 
 
-def _to_bytes(data):
-    if data is None:
-        return None
-    if isinstance(data, memoryview):
-        return data.tobytes()
-    if isinstance(data, (bytes, bytearray)):
-        return bytes(data)
-    try:
-        return bytes(data)
-    except Exception:
-        return None
-
-
-def _detect_mimetype_and_ext(data: bytes):
-    if not data:
-        return ("application/octet-stream", "bin")
-    head = data[:12]
-    if head.startswith(b"\x89PNG"):
-        return ("image/png", "png")
-    if head.startswith(b"\xFF\xD8\xFF"):
-        return ("image/jpeg", "jpg")
-    if head[:4] == b"GIF8":
-        return ("image/gif", "gif")
-    if head[:4] == b"%PDF":
-        return ("application/pdf", "pdf")
-    return ("application/octet-stream", "bin")
-
-
 @roles_required("admin", "secretaria")
 def subir_fotos():
     accion = (request.args.get("accion") or "buscar").strip()
@@ -360,6 +344,7 @@ def subir_fotos():
                     **_upload_limits_view_context(),
                 )
 
+            _generate_upload_thumbnails(int(fila_id), payload_bytes)
             log_candidata_action(
                 action_type="CANDIDATA_UPLOAD_DOCS_SAVE_OK",
                 candidata=candidata,
@@ -413,6 +398,19 @@ def subir_fotos():
     return redirect(url_for("subir_fotos.subir_fotos", accion="buscar", next=next_url or None))
 
 
+def _generate_upload_thumbnails(fila_id: int, payload_bytes: dict) -> None:
+    """Miniaturas de las fotos recién guardadas; un fallo no invalida la subida."""
+    for campo, data in payload_bytes.items():
+        if campo not in PHOTO_KINDS:
+            continue
+        try:
+            store_candidata_thumbnails(fila_id, campo, data)
+        except ThumbnailError as exc:
+            current_app.logger.warning("⚠️ Miniatura no generada fila=%s campo=%s: %s", fila_id, campo, exc)
+        except Exception:
+            current_app.logger.exception("❌ Error generando miniaturas fila=%s campo=%s", fila_id, campo)
+
+
 @roles_required("admin", "secretaria")
 def ver_imagen(fila, campo):
     if campo not in ALLOWED_IMG_FIELDS:
@@ -422,15 +420,13 @@ def ver_imagen(fila, campo):
     if not cand:
         abort(404)
 
-    data = _to_bytes(getattr(cand, campo, None))
-    if not data:
-        abort(404)
-
-    mt, _ext = _detect_mimetype_and_ext(data)
-    if not mt.startswith("image/"):
+    if campo in PHOTO_KINDS:
+        resp = serve_candidata_photo(cand, campo, (request.args.get(VARIANT_PARAM) or "").strip() or None)
+    else:
+        resp = serve_candidata_document(cand, campo, require_image=True)
+    if resp is None:
         abort(404)
-
-    return Response(data, mimetype=mt)
+    return resp
 
 
 @roles_required("admin", "secretaria")
@@ -442,7 +438,11 @@ def descargar_uno_db():
         return "Error: parámetros inválidos", 400
 
     def _load():
-        return db.session.get(Candidata, cid)
+        return (
+            db.session.query(Candidata.fila, Candidata.nombre_completo)
+            .filter(Candidata.fila == cid)
+            .first()
+        )
 
     try:
         candidata = _retry_query(_load, retries=1, swallow=False)
@@ -453,31 +453,16 @@ def descargar_uno_db():
     if not candidata:
         return "Candidata no encontrada", 404
 
-    data = getattr(candidata, doc, None)
-    if not data:
+    try:
+        meta = _retry_query(lambda: describe_candidata_document(cid, doc), retries=1, swallow=False)
+    except Exception:
+        current_app.logger.exception("❌ Error leyendo documento en descargar_uno_db")
+        return "No se pudo leer el archivo.", 500
+    if meta is None:
         return f"No hay archivo para {doc}", 404
 
-    if isinstance(data, memoryview):
-        data = data.tobytes()
-    elif isinstance(data, bytearray):
-        data = bytes(data)
-    elif not isinstance(data, (bytes,)):
-        try:
-            data = bytes(data)
-        except Exception:
-            return "Formato de archivo inválido.", 400
-
-    head = data[:12]
-    if head.startswith(b"\x89PNG"):
-        mt, ext = "image/png", "png"
-    elif head.startswith(b"\xFF\xD8\xFF"):
-        mt, ext = "image/jpeg", "jpg"
-    elif head.startswith(b"GIF87a") or head.startswith(b"GIF89a"):
-        mt, ext = "image/gif", "gif"
-    elif head.startswith(b"%PDF"):
-        mt, ext = "application/pdf", "pdf"
-    else:
-        mt, ext = "application/octet-stream", "bin"
+    mt = meta.mime_type if meta.mime_type in {"image/png", "image/jpeg", "image/gif", "application/pdf"} else "application/octet-stream"
+    ext = extension_for_mime(mt)
 
     nombre = (getattr(candidata, "nombre_completo", "") or "").strip()
     if not nombre:
@@ -486,14 +471,13 @@ def descargar_uno_db():
     safe_name = re.sub(r"[^a-zA-Z0-9_-]+", "_", nombre)[:60].strip("_")
     filename = f"{doc}_{safe_name}_{cid}.{ext}"
 
-    bio = io.BytesIO(data)
-    bio.seek(0)
-
     current_app.logger.info("⬇️ Descargando doc=%s fila=%s nombre=%s", doc, cid, nombre)
 
-    return send_file(
-        bio,
-        mimetype=mt,
-        as_attachment=True,
+    return media_response(
+        sha256=meta.sha256,
+        size=meta.size_bytes,
+        mime_type=mt,
+        read_range=lambda start, end: iter_candidata_document(meta, start=start, end=end),
         download_name=filename,
+        as_attachment=True,
     )
@@ -2,10 +2,13 @@
 from __future__ import annotations
 
 from flask import current_app, jsonify
+from sqlalchemy.orm import undefer_group
 
 from config_app import db
 from decorators import roles_required
 from services.candidata_invariants import InvariantConflictError, change_candidate_state as invariant_change_candidate_state
+from utils.candidata_readiness import DOCUMENT_FACT_KINDS, candidata_document_present
+from utils.matching_service import document_facts_enabled, fill_missing_document_facts
 from utils.timezone import utc_now_naive
 
 from core import legacy_handlers as legacy_h
@@ -18,7 +21,12 @@ def auto_actualizar_estados():
     si ya tienen todos los documentos/datos requeridos.
     """
     try:
-        pendientes = legacy_h.Candidata.query.filter_by(estado="inscrita_incompleta").all()
+        query = legacy_h.Candidata.query.filter_by(estado="inscrita_incompleta")
+        if not document_facts_enabled():
+            # Sin hechos ``has_<kind>`` los blobs se leen: una sola query en vez de una por fila.
+            query = query.options(undefer_group("documentos"))
+        pendientes = query.all()
+        fill_missing_document_facts(pendientes)
         actualizadas = []
 
         for c in pendientes:
@@ -27,10 +35,7 @@ def auto_actualizar_estados():
                 and c.entrevista
                 and c.referencias_laboral
                 and c.referencias_familiares
-                and c.perfil
-                and c.cedula1
-                and c.cedula2
-                and c.depuracion
+                and all(candidata_document_present(c, kind) for kind in DOCUMENT_FACT_KINDS)
             ):
                 try:
                     invariant_change_candidate_state(
@@ -0,0 +1,602 @@
+# -*- coding: utf-8 -*-
+"""Documentos de candidata (foto/depuración/perfil/cédulas) en el blob store.
+
+- Escritura: cualquier flush de ``db.session`` que cambie un blob legado de
+  ``Candidata`` lo sube al store (clave = sha256) en ``before_flush``, fuera de
+  las sentencias SQL, y actualiza ``candidata_documentos`` en la misma
+  transacción. Los blobs diferidos que no se cargaron no se leen. Un blob
+  subido de una transacción revertida queda huérfano pero es inofensivo
+  (direccionado por contenido). Sin store (o si falla) el metadato queda con
+  ``storage_backend="db"``: el hash/tamaño/MIME se conocen igual y los bytes se
+  leen de la columna. Las columnas ``LargeBinary`` se siguen escribiendo como
+  respaldo mientras dure la transición.
+- Lectura: ``load_candidata_document`` sirve desde el store cuando hay fila de
+  metadatos y, si no, lee *solo* esa columna de esa candidata. Las listas usan
+  ``candidata_document_mimes`` (metadatos o los primeros bytes), nunca el blob.
+- ``flask candidatas-blobs backfill`` copia los blobs existentes por lotes.
+- ``flask candidatas-blobs facts-backfill`` rellena ``has_<kind>``/``<kind>_size_bytes``
+  (presencia de documentos requeridos para readiness/matching, sin leer blobs).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import attributes, object_session
+
+from config_app import db
+from models import Candidata, CandidataDocumento
+from utils.blob_store import (
+    DEFAULT_CHUNK_SIZE,
+    BlobNotFoundError,
+    BlobRef,
+    get_blob_store,
+    sha256_hex,
+    sniff_mime,
+    to_bytes,
+)
+from utils.candidata_readiness import DOCUMENT_FACT_KINDS
+from utils.runtime_config import table_ready
+from utils.timezone import utc_now_naive
+
+
+DOCUMENT_KINDS = ("foto_perfil", "depuracion", "perfil", "cedula1", "cedula2")
+STORAGE_DB = "db"
+_HEAD_BYTES = 32
+_PENDING_REFS_KEY = "candidata_documentos_refs"
+
+
+@dataclass(frozen=True)
+class CandidataDocumentBlob:
+    data: bytes
+    mime_type: str
+    sha256: str
+    size_bytes: int
+    source: str
+
+
+@dataclass(frozen=True)
+class CandidataDocumentMeta:
+    candidata_id: int
+    kind: str
+    sha256: str
+    size_bytes: int
+    mime_type: str
+    storage_backend: str
+
+
+def _documentos_table_ready(bind) -> bool:
+    return table_ready(CandidataDocumento.__tablename__, bind=bind)
+
+
+def _blob_column(kind: str):
+    if kind not in DOCUMENT_KINDS:
+        raise ValueError(f"Documento de candidata desconocido: {kind}")
+    return getattr(Candidata, kind)
+
+
+def _write_documento_row(connection, *, candidata_id: int, kind: str, ref, backend: str) -> None:
+    table = CandidataDocumento.__table__
+    now = utc_now_naive()
+    updated = connection.execute(
+        table.update()
+        .where(table.c.candidata_id == int(candidata_id), table.c.kind == kind)
+        .values(
+            sha256=ref.sha256,
+            size_bytes=int(ref.size_bytes),
+            mime_type=ref.mime_type,
+            storage_backend=backend,
+            updated_at=now,
+        )
+    )
+    if not updated.rowcount:
+        connection.execute(
+            table.insert().values(
+                candidata_id=int(candidata_id),
+                kind=kind,
+                sha256=ref.sha256,
+                size_bytes=int(ref.size_bytes),
+                mime_type=ref.mime_type,
+                storage_backend=backend,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+
+
+def _delete_documento_row(connection, *, candidata_id: int, kind: str) -> None:
+    table = CandidataDocumento.__table__
+    connection.execute(
+        table.delete().where(table.c.candidata_id == int(candidata_id), table.c.kind == kind)
+    )
+
+
+def _changed_documents(target) -> dict[str, bytes]:
+    out: dict[str, bytes] = {}
+    for kind in DOCUMENT_KINDS:
+        # Sin inicializar: un blob diferido no cargado no cambió y no se debe leer de la BD.
+        hist = attributes.get_history(target, kind, passive=attributes.PASSIVE_NO_INITIALIZE)
+        if hist.has_changes():
+            out[kind] = to_bytes(hist.added[0]) if hist.added else b""
+    return out
+
+
+def _log_warning(message: str, *args) -> None:
+    try:
+        current_app.logger.warning(message, *args)
+    except Exception:
+        pass
+
+
+def _put_documents(session) -> None:
+    """Sube al store los blobs cambiados *antes* del flush (sin I/O dentro de la transacción SQL)."""
+    changed = []
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Candidata):
+            docs = _changed_documents(obj)
+            if any(docs.values()):
+                changed.append((obj, docs))
+    if not changed or not _documentos_table_ready(session.get_bind()):
+        return
+    try:
+        store = get_blob_store()
+    except Exception as exc:
+        # Store mal configurado: el flush no falla, los bytes quedan en la columna legada.
+        _log_warning("[candidata-documentos] store unavailable (%s: %s)", type(exc).__name__, exc)
+        return
+    if store is None:
+        return
+    refs = session.info.setdefault(_PENDING_REFS_KEY, {})
+    for obj, docs in changed:
+        for kind, payload in docs.items():
+            if not payload:
+                continue
+            try:
+                refs[(id(obj), kind)] = (store.put(payload), store.backend)
+            except Exception as exc:
+                # Sin copia en el store el metadato apunta a la columna legada.
+                _log_warning(
+                    "[candidata-documentos] store put failed fila=%s kind=%s (%s: %s)",
+                    getattr(obj, "fila", None), kind, type(exc).__name__, exc,
+                )
+
+
+def _sync_documents_to_store(connection, target, refs: dict | None = None) -> None:
+    fila = int(getattr(target, "fila", 0) or 0)
+    if fila <= 0 or not _documentos_table_ready(connection):
+        return
+    refs = refs or {}
+    for kind, payload in _changed_documents(target).items():
+        if not payload:
+            _delete_documento_row(connection, candidata_id=fila, kind=kind)
+            continue
+        ref, backend = refs.get((id(target), kind), (None, STORAGE_DB))
+        digest = sha256_hex(payload)
+        if ref is None or ref.sha256 != digest:
+            ref = BlobRef(sha256=digest, size_bytes=len(payload), mime_type=sniff_mime(payload[:16]))
+            backend = STORAGE_DB
+        _write_documento_row(connection, candidata_id=fila, kind=kind, ref=ref, backend=backend)
+
+
+@event.listens_for(db.session, "before_flush")
+def _candidata_documentos_before_flush(session, _flush_context, _instances) -> None:
+    _put_documents(session)
+
+
+@event.listens_for(Candidata, "after_insert")
+@event.listens_for(Candidata, "after_update")
+def _candidata_documentos_after_write(_mapper, connection, target):
+    session = object_session(target)
+    _sync_documents_to_store(connection, target, session.info.get(_PENDING_REFS_KEY) if session is not None else None)
+
+
+@event.listens_for(db.session, "after_flush_postexec")
+def _candidata_documentos_after_flush(session, _flush_context) -> None:
+    session.info.pop(_PENDING_REFS_KEY, None)
+
+
+def load_candidata_document(candidata_id: int, kind: str) -> CandidataDocumentBlob | None:
+    """Bytes de un documento (store primero, columna legada como fallback)."""
+    column = _blob_column(kind)
+    cid = int(candidata_id or 0)
+    if cid <= 0:
+        return None
+    store = get_blob_store()
+    if store is not None and _documentos_table_ready(db.session.get_bind()):
+        meta = (
+            db.session.query(
+                CandidataDocumento.sha256,
+                CandidataDocumento.mime_type,
+                CandidataDocumento.size_bytes,
+                CandidataDocumento.storage_backend,
+            )
+            .filter(CandidataDocumento.candidata_id == cid, CandidataDocumento.kind == kind)
+            .first()
+        )
+        if meta is not None and meta.storage_backend != STORAGE_DB:
+            try:
+                data = store.get(meta.sha256)
+                return CandidataDocumentBlob(
+                    data=data,
+                    mime_type=meta.mime_type or sniff_mime(data[:16]),
+                    sha256=meta.sha256,
+                    size_bytes=len(data),
+                    source="store",
+                )
+            except BlobNotFoundError:
+                current_app.logger.warning(
+                    "[candidata-documentos] blob missing in store fila=%s kind=%s sha=%s", cid, kind, meta.sha256
+                )
+    data = to_bytes(db.session.query(column).filter(Candidata.fila == cid).scalar())
+    if not data:
+        return None
+    return CandidataDocumentBlob(
+        data=data,
+        mime_type=sniff_mime(data[:16]),
+        sha256=sha256_hex(data),
+        size_bytes=len(data),
+        source="db",
+    )
+
+
+def candidata_document_for(candidata, kind: str) -> CandidataDocumentBlob | None:
+    """Como ``load_candidata_document`` pero reutiliza el blob si la instancia ya lo tiene cargado."""
+    _blob_column(kind)
+    if candidata is None:
+        return None
+    loaded = getattr(candidata, "__dict__", {}) or {}
+    if kind in loaded:
+        data = to_bytes(loaded.get(kind))
+        if not data:
+            return None
+        return CandidataDocumentBlob(
+            data=data,
+            mime_type=sniff_mime(data[:16]),
+            sha256=sha256_hex(data),
+            size_bytes=len(data),
+            source="instance",
+        )
+    return load_candidata_document(int(getattr(candidata, "fila", 0) or 0), kind)
+
+
+def candidata_document_mimes(candidata_ids: Iterable[int], kind: str) -> dict[int, str]:
+    """``{fila: mime}`` de las candidatas que tienen ese documento, sin leer el blob."""
+    column = _blob_column(kind)
+    ids = sorted({int(x) for x in (candidata_ids or []) if int(x or 0) > 0})
+    if not ids:
+        return {}
+    out: dict[int, str] = {}
+    if _documentos_table_ready(db.session.get_bind()):
+        rows = (
+            db.session.query(CandidataDocumento.candidata_id, CandidataDocumento.mime_type)
+            .filter(CandidataDocumento.kind == kind, CandidataDocumento.candidata_id.in_(ids))
+            .all()
+        )
+        out.update({int(r[0]): str(r[1] or "") for r in rows})
+    missing = [fid for fid in ids if fid not in out]
+    if missing:
+        rows = (
+            db.session.query(Candidata.fila, func.substr(column, 1, _HEAD_BYTES))
+            .filter(Candidata.fila.in_(missing), column.isnot(None))
+            .all()
+        )
+        for fila, head in rows:
+            head_bytes = to_bytes(head)
+            if head_bytes:
+                out[int(fila)] = sniff_mime(head_bytes)
+    return out
+
+
+def _meta_from_row(row) -> CandidataDocumentMeta:
+    return CandidataDocumentMeta(
+        candidata_id=int(row.candidata_id),
+        kind=str(row.kind),
+        sha256=str(row.sha256),
+        size_bytes=int(row.size_bytes or 0),
+        mime_type=str(row.mime_type or "application/octet-stream"),
+        storage_backend=str(row.storage_backend or STORAGE_DB),
+    )
+
+
+def describe_candidata_document(candidata_id: int, kind: str, *, persist: bool = True) -> CandidataDocumentMeta | None:
+    """Hash/tamaño/MIME de un documento sin traer el blob cuando ya hay metadatos.
+
+    Si la candidata todavía no tiene fila en ``candidata_documentos`` se calcula
+    una sola vez desde la columna y (con ``persist``) se guarda como ``db``.
+    """
+    column = _blob_column(kind)
+    cid = int(candidata_id or 0)
+    if cid <= 0:
+        return None
+    table_ready = _documentos_table_ready(db.session.get_bind())
+    if table_ready:
+        row = (
+            db.session.query(
+                CandidataDocumento.candidata_id,
+                CandidataDocumento.kind,
+                CandidataDocumento.sha256,
+                CandidataDocumento.size_bytes,
+                CandidataDocumento.mime_type,
+                CandidataDocumento.storage_backend,
+            )
+            .filter(CandidataDocumento.candidata_id == cid, CandidataDocumento.kind == kind)
+            .first()
+        )
+        if row is not None:
+            return _meta_from_row(row)
+    data = to_bytes(db.session.query(column).filter(Candidata.fila == cid).scalar())
+    if not data:
+        return None
+    ref = BlobRef(sha256=sha256_hex(data), size_bytes=len(data), mime_type=sniff_mime(data[:16]))
+    if persist and table_ready:
+        # Transacción propia: no arrastra ni confirma lo pendiente en la sesión del request.
+        try:
+            with db.engine.begin() as conn:
+                _write_documento_row(conn, candidata_id=cid, kind=kind, ref=ref, backend=STORAGE_DB)
+        except Exception:
+            pass
+    return CandidataDocumentMeta(
+        candidata_id=cid,
+        kind=kind,
+        sha256=ref.sha256,
+        size_bytes=ref.size_bytes,
+        mime_type=ref.mime_type,
+        storage_backend=STORAGE_DB,
+    )
+
+
+def iter_candidata_document(
+    meta: CandidataDocumentMeta,
+    *,
+    start: int = 0,
+    end: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+    """Bytes ``[start, end]`` del documento en trozos (store o ``substr`` sobre la columna)."""
+    last = int(meta.size_bytes) - 1 if end is None else min(int(end), int(meta.size_bytes) - 1)
+    first = max(0, int(start))
+    if last < first:
+        return
+    store = get_blob_store() if meta.storage_backend != STORAGE_DB else None
+    if store is not None:
+        try:
+            yield from store.iter_chunks(meta.sha256, start=first, end=last, chunk_size=chunk_size)
+            return
+        except BlobNotFoundError:
+            current_app.logger.warning(
+                "[candidata-documentos] blob missing in store fila=%s kind=%s sha=%s",
+                meta.candidata_id, meta.kind, meta.sha256,
+            )
+    column = _blob_column(meta.kind)
+    pos = first
+    while pos <= last:
+        n = min(int(chunk_size), last - pos + 1)
+        chunk = to_bytes(
+            db.session.query(func.substr(column, pos + 1, n)).filter(Candidata.fila == meta.candidata_id).scalar()
+        )
+        if not chunk:
+            break
+        yield chunk
+        pos += len(chunk)
+
+
+def serve_candidata_document(
+    candidata,
+    kind: str,
+    *,
+    require_image: bool = False,
+    private: bool = True,
+    download_stem: str | None = None,
+    as_attachment: bool = False,
+):
+    """Respuesta con ETag/Range para un documento, o ``None`` si no existe (o no es imagen).
+
+    ``download_stem`` se completa con la extensión según el MIME detectado.
+    """
+    from utils.media_serving import extension_for_mime, media_response
+
+    if candidata is None:
+        return None
+    loaded = getattr(candidata, "__dict__", {}) or {}
+    if kind in loaded:
+        data = to_bytes(loaded.get(kind))
+        if not data:
+            return None
+        meta = CandidataDocumentMeta(
+            candidata_id=int(getattr(candidata, "fila", 0) or 0),
+            kind=kind,
+            sha256=sha256_hex(data),
+            size_bytes=len(data),
+            mime_type=sniff_mime(data[:16]),
+            storage_backend="instance",
+        )
+
+        def _read(start: int, end: int):
+            yield data[start:end + 1]
+    else:
+        meta = describe_candidata_document(int(getattr(candidata, "fila", 0) or 0), kind)
+        if meta is None:
+            return None
+
+        def _read(start: int, end: int):
+            return iter_candidata_document(meta, start=start, end=end)
+
+    if require_image and not meta.mime_type.startswith("image/"):
+        return None
+    return media_response(
+        sha256=meta.sha256,
+        size=meta.size_bytes,
+        mime_type=meta.mime_type,
+        read_range=_read,
+        private=private,
+        download_name=f"{download_stem}.{extension_for_mime(meta.mime_type)}" if download_stem else None,
+        as_attachment=as_attachment,
+    )
+
+
+def candidata_document_versions(candidata_ids: Iterable[int], kind: str) -> dict[int, str]:
+    """``{fila: sha256}`` desde metadatos (para URLs versionadas); no calcula hashes faltantes."""
+    _blob_column(kind)
+    ids = sorted({int(x) for x in (candidata_ids or []) if int(x or 0) > 0})
+    if not ids or not _documentos_table_ready(db.session.get_bind()):
+        return {}
+    rows = (
+        db.session.query(CandidataDocumento.candidata_id, CandidataDocumento.sha256)
+        .filter(CandidataDocumento.kind == kind, CandidataDocumento.candidata_id.in_(ids))
+        .all()
+    )
+    return {int(r[0]): str(r[1]) for r in rows}
+
+
+def backfill_candidata_documentos(
+    *,
+    kinds: Iterable[str] = DOCUMENT_KINDS,
+    batch_size: int = 25,
+    limit: int = 0,
+) -> dict[str, int]:
+    """Copia blobs legados al store por lotes pequeños; reanudable (salta lo ya migrado)."""
+    store = get_blob_store()
+    if store is None:
+        raise click.ClickException("BLOB_STORE_BACKEND no está configurado.")
+    if not _documentos_table_ready(db.session.get_bind()):
+        raise click.ClickException("Falta la tabla candidata_documentos (aplique migraciones).")
+
+    stats = {"copied": 0, "bytes": 0, "skipped": 0}
+    batch = max(1, min(int(batch_size or 25), 500))
+    for kind in kinds:
+        column = _blob_column(kind)
+        last_fila = 0
+        while True:
+            if limit and stats["copied"] >= int(limit):
+                return stats
+            already = (
+                db.session.query(CandidataDocumento.id)
+                .filter(
+                    CandidataDocumento.candidata_id == Candidata.fila,
+                    CandidataDocumento.kind == kind,
+                    CandidataDocumento.storage_backend != STORAGE_DB,
+                )
+                .exists()
+            )
+            rows = (
+                db.session.query(Candidata.fila, column)
+                .filter(Candidata.fila > last_fila, column.isnot(None), ~already)
+                .order_by(Candidata.fila.asc())
+                .limit(batch)
+                .all()
+            )
+            if not rows:
+                break
+            conn = db.session.connection()
+            for fila, raw in rows:
+                last_fila = int(fila)
+                payload = to_bytes(raw)
+                if not payload:
+                    stats["skipped"] += 1
+                    continue
+                ref = store.put(payload)
+                _write_documento_row(conn, candidata_id=int(fila), kind=kind, ref=ref, backend=store.backend)
+                stats["copied"] += 1
+                stats["bytes"] += ref.size_bytes
+            db.session.commit()
+            # Suelta las filas del lote (y sus bytes) antes del siguiente.
+            db.session.expunge_all()
+            del rows
+    return stats
+
+
+def backfill_candidata_document_facts(*, batch_size: int = 2000, recompute: bool = False) -> dict[str, int]:
+    """Calcula ``has_<kind>``/``<kind>_size_bytes`` con ``length()`` en la BD (los blobs no viajan).
+
+    Por defecto solo filas con algún hecho en NULL; ``recompute`` repasa todas
+    (p. ej. tras cambios hechos por SQL directo que no pasan por los eventos).
+    """
+    table = Candidata.__table__
+    values = {}
+    for kind in DOCUMENT_FACT_KINDS:
+        size = func.coalesce(func.length(table.c[kind]), 0)
+        values[f"{kind}_size_bytes"] = size
+        values[f"has_{kind}"] = size > 0
+    pending = or_(*[table.c[f"has_{kind}"].is_(None) for kind in DOCUMENT_FACT_KINDS])
+
+    stats = {"updated": 0, "batches": 0}
+    batch = max(1, min(int(batch_size or 2000), 20000))
+    last_fila = 0
+    while True:
+        ids_q = select(table.c.fila).where(table.c.fila > last_fila)
+        if not recompute:
+            ids_q = ids_q.where(pending)
+        ids = [int(r[0]) for r in db.session.execute(ids_q.order_by(table.c.fila.asc()).limit(batch))]
+        if not ids:
+            break
+        result = db.session.execute(table.update().where(table.c.fila.in_(ids)).values(**values))
+        db.session.commit()
+        stats["updated"] += int(result.rowcount or 0)
+        stats["batches"] += 1
+        last_fila = ids[-1]
+    return stats
+
+
+def verify_candidata_documentos(*, sample: int = 200) -> dict[str, int]:
+    """Comprueba que los metadatos apuntan a blobs existentes y que coinciden con la columna legada."""
+    store = get_blob_store()
+    if store is None:
+        raise click.ClickException("BLOB_STORE_BACKEND no está configurado.")
+    rows = (
+        db.session.query(CandidataDocumento.candidata_id, CandidataDocumento.kind, CandidataDocumento.sha256)
+        .filter(CandidataDocumento.storage_backend != STORAGE_DB)
+        .order_by(func.random())
+        .limit(max(1, int(sample)))
+        .all()
+    )
+    out = {"checked": 0, "missing": 0, "mismatch": 0}
+    for cid, kind, sha in rows:
+        out["checked"] += 1
+        if not store.exists(sha):
+            out["missing"] += 1
+            continue
+        legacy = to_bytes(db.session.query(_blob_column(kind)).filter(Candidata.fila == int(cid)).scalar())
+        if legacy and sha256_hex(legacy) != sha:
+            out["mismatch"] += 1
+    return out
+
+
+@click.group("candidatas-blobs")
+def candidata_blobs_cli():
+    """Documentos de candidatas en el blob store."""
+
+
+@candidata_blobs_cli.command("backfill")
+@click.option("--kind", "kinds", multiple=True, type=click.Choice(DOCUMENT_KINDS), help="Documento a copiar (repetible).")
+@click.option("--batch-size", default=25, show_default=True, type=int, help="Candidatas por lote/commit.")
+@click.option("--limit", default=0, show_default=True, type=int, help="Máximo de blobs a copiar (0 = todos).")
+@with_appcontext
+def candidata_blobs_backfill_command(kinds: tuple[str, ...], batch_size: int, limit: int):
+    """Copia los blobs legados de ``candidatas`` al store y crea sus metadatos."""
+    stats = backfill_candidata_documentos(kinds=kinds or DOCUMENT_KINDS, batch_size=batch_size, limit=limit)
+    click.echo(f"copied={stats['copied']} bytes={stats['bytes']} skipped={stats['skipped']}")
+
+
+@candidata_blobs_cli.command("facts-backfill")
+@click.option("--batch-size", default=2000, show_default=True, type=int, help="Candidatas por lote/commit.")
+@click.option("--recompute", is_flag=True, default=False, help="Recalcula todas las filas, no solo las pendientes.")
+@with_appcontext
+def candidata_blobs_facts_backfill_command(batch_size: int, recompute: bool):
+    """Rellena los hechos de presencia/tamaño de documentos que usan readiness y matching."""
+    stats = backfill_candidata_document_facts(batch_size=batch_size, recompute=recompute)
+    click.echo(f"updated={stats['updated']} batches={stats['batches']}")
+
+
+@candidata_blobs_cli.command("verify")
+@click.option("--sample", default=200, show_default=True, type=int)
+@with_appcontext
+def candidata_blobs_verify_command(sample: int):
+    """Muestra de metadatos: blob presente en el store y mismo sha256 que la columna."""
+    out = verify_candidata_documentos(sample=sample)
+    click.echo(f"checked={out['checked']} missing={out['missing']} mismatch={out['mismatch']}")
+    if out["missing"] or out["mismatch"]:
+        raise SystemExit(1)
@@ -0,0 +1,703 @@
+# -*- coding: utf-8 -*-
+"""Índice invertido en memoria (por proceso) para la búsqueda de candidatas.
+
+Opcional (``CANDIDATA_SEARCH_INDEX_ENABLED=1``). Se construye en segundo
+plano desde una query angosta (``load_only`` de fila/nombre/cédula/teléfono/
+código) y resuelve la misma semántica que ``build_flexible_search_filters``
+sin ir a la BD: devuelve ids ordenados y el llamador hidrata solo la página
+de filas que necesita.
+
+- Nombre: vocabulario de tokens normalizados con trigramas para coincidencia
+  por subcadena (prefijo incluido) y una capa tolerante a un error de tipeo
+  (tokens de 4+ letras) que se ordena después de las coincidencias exactas.
+- Cédula/teléfono: 4-gramas de dígitos para ``%digitos%``.
+- Código: mapa exacto para ``AAA-000000``.
+
+``match_all_tokens`` cubre además la semántica del autocomplete
+(``/admin/api/candidatas``): cada palabra debe aparecer, sin distinguir
+mayúsculas, en el nombre, la cédula, el teléfono o el código crudos.
+
+Se mantiene al día con eventos del ORM (mismo proceso), avisos de
+``staff_audit_logs``/outbox para ``candidata:<fila>`` (otros procesos) y un
+chequeo periódico de filas nuevas. Para lo que se escribe fuera del ORM sin
+aviso, el índice se reconstruye completo en segundo plano cada
+``CANDIDATA_SEARCH_INDEX_REBUILD_SECONDS`` (1h por defecto). Si la tabla supera
+``CANDIDATA_SEARCH_INDEX_MAX_DOCS`` el índice no se construye y todo sigue
+por SQL.
+"""
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.orm import load_only
+
+from config_app import db
+from models import Candidata
+from utils.candidata_search_norm import digits_only, normalize_search_text
+from utils.runtime_config import env_float, env_int, is_true
+
+
+_DIGIT_GRAM = 4
+_NAME_GRAM = 3
+_TAIL_CHECK_SECONDS = 30.0
+_DIRTY_BATCH = 500
+_RAW_GRAM = 3
+_LIKE_WILDCARDS = ("%", "_", "\\")
+
+TIER_EXACT = 0
+TIER_TYPO = 1
+
+_INDEX_LOCK = threading.Lock()
+_INDEX: "CandidataSearchIndex | None" = None
+
+
+def candidata_search_index_enabled() -> bool:
+    return is_true(os.getenv("CANDIDATA_SEARCH_INDEX_ENABLED"))
+
+
+def _max_docs() -> int:
+    return env_int("CANDIDATA_SEARCH_INDEX_MAX_DOCS", 400000, min_value=1000)
+
+
+def _rebuild_seconds() -> float:
+    return env_float("CANDIDATA_SEARCH_INDEX_REBUILD_SECONDS", 3600.0, min_value=60.0)
+
+
+def _grams(value: str, n: int) -> set[str]:
+    if len(value) < n:
+        return set()
+    return {value[i:i + n] for i in range(len(value) - n + 1)}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Distancia de edición <= 1 (sustitución, inserción, borrado o trasposición adyacente)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def _discard(buckets: dict[str, set], key: str, value) -> None:
+    """Quita ``value`` del bucket y borra el bucket si queda vacío."""
+    bucket = buckets.get(key)
+    if bucket is not None:
+        bucket.discard(value)
+        if not bucket:
+            buckets.pop(key, None)
+
+
+@dataclass(frozen=True)
+class _Doc:
+    fila: int
+    nombre: str
+    tokens: tuple[str, ...]
+    cedula_digits: str
+    telefono_digits: str
+    codigo: str
+    # Campos crudos en minúsculas (nombre, cédula, teléfono, código) para emular ILIKE.
+    raw_lower: tuple[str, ...] = ()
+
+
+@dataclass
+class SearchHits:
+    ids: list[int]
+    tiers: dict[int, int]
+
+    def exact_ids(self) -> list[int]:
+        return [fid for fid in self.ids if self.tiers.get(fid) == TIER_EXACT]
+
+
+class CandidataSearchIndex:
+    def __init__(self, *, max_docs: int | None = None):
+        self.max_docs = int(max_docs or _max_docs())
+        self._lock = threading.RLock()
+        self._docs: dict[int, _Doc] = {}
+        self._token_docs: dict[str, set[int]] = {}
+        self._vocab_grams: dict[str, set[str]] = {}
+        self._sorted_vocab: list[str] = []
+        self._vocab_dirty = False
+        self._digit_grams: dict[str, set[int]] = {}
+        self._codigo: dict[str, int] = {}
+        self._raw_grams: dict[str, set[int]] = {}
+        self._dirty: set[int] = set()
+        self.max_fila = 0
+        self.state = "empty"
+        self.last_tail_check = 0.0
+        self.built_at = 0.0
+        self.rebuilding = False
+        self.stats = {"builds": 0, "searches": 0, "refreshed": 0, "tail_rows": 0, "build_ms": 0.0}
+
+    # ── mantenimiento ───────────────────────────────────────────────
+    def _add_locked(self, doc: _Doc) -> None:
+        self._docs[doc.fila] = doc
+        for tok in set(doc.tokens):
+            bucket = self._token_docs.get(tok)
+            if bucket is None:
+                bucket = self._token_docs[tok] = set()
+                for gram in _grams(tok, _NAME_GRAM):
+                    self._vocab_grams.setdefault(gram, set()).add(tok)
+                self._vocab_dirty = True
+            bucket.add(doc.fila)
+        for digits in {doc.cedula_digits, doc.telefono_digits}:
+            for gram in _grams(digits, _DIGIT_GRAM):
+                self._digit_grams.setdefault(gram, set()).add(doc.fila)
+        if doc.codigo:
+            self._codigo[doc.codigo] = doc.fila
+        for gram in self._raw_field_grams(doc):
+            self._raw_grams.setdefault(gram, set()).add(doc.fila)
+        self.max_fila = max(self.max_fila, doc.fila)
+
+    def _remove_locked(self, fila: int) -> None:
+        doc = self._docs.pop(int(fila), None)
+        if doc is None:
+            return
+        for tok in set(doc.tokens):
+            bucket = self._token_docs.get(tok)
+            if bucket is not None:
+                bucket.discard(doc.fila)
+                if not bucket:
+                    self._token_docs.pop(tok, None)
+                    for gram in _grams(tok, _NAME_GRAM):
+                        _discard(self._vocab_grams, gram, tok)
+                    self._vocab_dirty = True
+        for digits in {doc.cedula_digits, doc.telefono_digits}:
+            for gram in _grams(digits, _DIGIT_GRAM):
+                _discard(self._digit_grams, gram, doc.fila)
+        if doc.codigo and self._codigo.get(doc.codigo) == doc.fila:
+            self._codigo.pop(doc.codigo, None)
+        for gram in self._raw_field_grams(doc):
+            _discard(self._raw_grams, gram, doc.fila)
+
+    @staticmethod
+    def _raw_field_grams(doc: _Doc) -> set[str]:
+        # Cédula, teléfono y código tal como están guardados (el nombre va por el vocabulario).
+        out: set[str] = set()
+        for value in doc.raw_lower[1:]:
+            out |= _grams(value, _RAW_GRAM)
+        return out
+
+    @staticmethod
+    def make_doc(fila: int, nombre: str | None, cedula: str | None, telefono: str | None, codigo: str | None) -> _Doc:
+        nombre_norm = normalize_search_text(nombre)
+        return _Doc(
+            fila=int(fila),
+            nombre=str(nombre or ""),
+            tokens=tuple(t for t in nombre_norm.split(" ") if t),
+            cedula_digits=digits_only(cedula),
+            telefono_digits=digits_only(telefono),
+            codigo="".join(str(codigo or "").split()).upper(),
+            raw_lower=tuple(str(v or "").lower() for v in (nombre, cedula, telefono, codigo)),
+        )
+
+    def upsert(self, doc: _Doc) -> None:
+        with self._lock:
+            self._remove_locked(doc.fila)
+            self._add_locked(doc)
+
+    def remove(self, fila: int) -> None:
+        with self._lock:
+            self._remove_locked(fila)
+
+    def load(self, docs: Iterable[_Doc]) -> bool:
+        """Carga completa; ``False`` si se supera el límite de memoria configurado."""
+        with self._lock:
+            for doc in docs:
+                if len(self._docs) >= self.max_docs:
+                    self.state = "over_limit"
+                    self._docs.clear()
+                    self._token_docs.clear()
+                    self._vocab_grams.clear()
+                    self._digit_grams.clear()
+                    self._codigo.clear()
+                    self._raw_grams.clear()
+                    return False
+                self._add_locked(doc)
+            self.state = "ready"
+            self.built_at = time.time()
+            self.stats["builds"] += 1
+            return True
+
+    def mark_dirty(self, fila: int) -> None:
+        try:
+            fid = int(fila)
+        except Exception:
+            return
+        if fid > 0:
+            with self._lock:
+                self._dirty.add(fid)
+
+    def pop_dirty(self, limit: int = _DIRTY_BATCH) -> list[int]:
+        with self._lock:
+            out = []
+            while self._dirty and len(out) < limit:
+                out.append(self._dirty.pop())
+            return out
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ── búsqueda ────────────────────────────────────────────────────
+    def _vocab(self) -> list[str]:
+        if self._vocab_dirty:
+            self._sorted_vocab = sorted(self._token_docs)
+            self._vocab_dirty = False
+        return self._sorted_vocab
+
+    def _vocab_matching(self, token: str) -> set[str]:
+        if len(token) < _NAME_GRAM:
+            vocab = self._vocab()
+            # Prefijo por bisect y subcadena corta sobre el vocabulario (acotado a nombres).
+            start = bisect.bisect_left(vocab, token)
+            out = set()
+            for tok in vocab[start:]:
+                if not tok.startswith(token):
+                    break
+                out.add(tok)
+            out.update(tok for tok in vocab if token in tok)
+            return out
+        candidates: set[str] | None = None
+        for gram in _grams(token, _NAME_GRAM):
+            bucket = self._vocab_grams.get(gram)
+            if not bucket:
+                return set()
+            candidates = set(bucket) if candidates is None else (candidates & bucket)
+            if not candidates:
+                return set()
+        return {tok for tok in (candidates or ()) if token in tok}
+
+    def _vocab_typos(self, token: str) -> set[str]:
+        if len(token) < 4:
+            return set()
+        seen: set[str] = set()
+        for gram in _grams(token, _NAME_GRAM):
+            seen.update(self._vocab_grams.get(gram) or ())
+        return {tok for tok in seen if token not in tok and _within_one_edit(token, tok)}
+
+    def _docs_for_tokens(self, vocab_tokens: set[str]) -> set[int]:
+        out: set[int] = set()
+        for tok in vocab_tokens:
+            out.update(self._token_docs.get(tok) or ())
+        return out
+
+    def _digit_docs(self, q_digits: str) -> set[int]:
+        if len(q_digits) < _DIGIT_GRAM:
+            return {
+                d.fila for d in self._docs.values()
+                if q_digits in d.cedula_digits or q_digits in d.telefono_digits
+            }
+        candidates: set[int] | None = None
+        for gram in _grams(q_digits, _DIGIT_GRAM):
+            bucket = self._digit_grams.get(gram)
+            if not bucket:
+                return set()
+            candidates = set(bucket) if candidates is None else (candidates & bucket)
+            if not candidates:
+                return set()
+        return {
+            fid for fid in (candidates or ())
+            if q_digits in self._docs[fid].cedula_digits or q_digits in self._docs[fid].telefono_digits
+        }
+
+    def search(self, q: str, *, order_mode: str = "nombre_asc", typo_tolerant: bool = True) -> SearchHits | None:
+        """Ids que cumplen la semántica de ``build_flexible_search_filters``.
+
+        Devuelve ``None`` cuando la consulta cae en el fallback ILIKE crudo (sin
+        texto ni dígitos utilizables) y debe resolverse por SQL.
+        """
+        from core.services.search import CODIGO_PATTERN, normalize_code
+
+        q = (q or "").strip()[:128]
+        if not q:
+            return SearchHits(ids=[], tiers={})
+        with self._lock:
+            self.stats["searches"] += 1
+            q_code = normalize_code(q)
+            if CODIGO_PATTERN.fullmatch(q_code):
+                fid = self._codigo.get(q_code)
+                return SearchHits(ids=[fid] if fid else [], tiers={fid: TIER_EXACT} if fid else {})
+
+            q_text = normalize_search_text(q)
+            q_digits = digits_only(q)
+            tokens = [t for t in q_text.split(" ") if t]
+            if not tokens and not q_digits:
+                return None
+
+            tiers: dict[int, int] = {}
+            if tokens:
+                exact: set[int] | None = None
+                loose: set[int] | None = None
+                for tok in tokens:
+                    tok_exact = self._docs_for_tokens(self._vocab_matching(tok))
+                    tok_loose = tok_exact
+                    if typo_tolerant:
+                        tok_loose = tok_exact | self._docs_for_tokens(self._vocab_typos(tok))
+                    exact = tok_exact if exact is None else (exact & tok_exact)
+                    loose = tok_loose if loose is None else (loose & tok_loose)
+                for fid in (loose or ()):
+                    tiers[fid] = TIER_TYPO
+                for fid in (exact or ()):
+                    tiers[fid] = TIER_EXACT
+            if q_digits:
+                for fid in self._digit_docs(q_digits):
+                    tiers[fid] = TIER_EXACT
+
+            if order_mode == "id_desc":
+                ids = sorted(tiers, key=lambda fid: (tiers[fid], -fid))
+            else:
+                ids = sorted(tiers, key=lambda fid: (tiers[fid], self._docs[fid].nombre, fid))
+            return SearchHits(ids=ids, tiers=tiers)
+
+    def _raw_token_candidates(self, token: str) -> set[int] | None:
+        """Superconjunto de filas donde ``token`` (ya en minúsculas) puede estar en algún campo crudo.
+
+        ``None`` si la palabra es muy corta para los gramas o no deja texto normalizado.
+        """
+        words = [w for w in normalize_search_text(token).split(" ") if w]
+        if not words or len(token) < _RAW_GRAM:
+            return None
+        by_name: set[int] | None = None
+        for word in words:
+            docs = self._docs_for_tokens(self._vocab_matching(word))
+            by_name = docs if by_name is None else (by_name & docs)
+        by_raw: set[int] | None = None
+        for gram in _grams(token, _RAW_GRAM):
+            bucket = self._raw_grams.get(gram) or set()
+            by_raw = set(bucket) if by_raw is None else (by_raw & bucket)
+            if not by_raw:
+                break
+        return (by_name or set()) | (by_raw or set())
+
+    def match_all_tokens(self, term: str, *, max_ids: int = 500) -> list[int] | None:
+        """Filas donde cada palabra de ``term`` aparece (ILIKE) en nombre, cédula, teléfono o código.
+
+        Es la semántica del autocomplete de candidatas. Los candidatos salen del
+        vocabulario de nombres y de los gramas crudos, y se confirman contra los
+        campos crudos; ``None`` si la consulta usa comodines de LIKE, si ninguna
+        palabra sirve para el índice o si hay más de ``max_ids`` filas (el llamador
+        sigue por SQL).
+        """
+        lowered = [w.lower() for w in (term or "").strip().split() if w]
+        if not lowered or any(ch in w for w in lowered for ch in _LIKE_WILDCARDS):
+            return None
+        with self._lock:
+            self.stats["searches"] += 1
+            candidates: set[int] | None = None
+            for word in lowered:
+                # Las palabras cortas no generan candidatos; solo se verifican al final.
+                docs = self._raw_token_candidates(word)
+                if docs is None:
+                    continue
+                candidates = docs if candidates is None else (candidates & docs)
+                if not candidates:
+                    return []
+            if candidates is None:
+                return None
+            out = [
+                fid for fid in sorted(candidates or ())
+                if all(any(w in field for field in self._docs[fid].raw_lower) for w in lowered)
+            ]
+        if len(out) > int(max_ids):
+            return None
+        return out
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "docs": len(self._docs),
+                "vocab": len(self._token_docs),
+                "digit_grams": len(self._digit_grams),
+                "raw_grams": len(self._raw_grams),
+                "dirty": len(self._dirty),
+                "max_fila": int(self.max_fila),
+                "built_at": float(self.built_at),
+                **self.stats,
+            }
+
+
+# ── carga desde BD ──────────────────────────────────────────────────────
+def _narrow_query():
+    return Candidata.query.options(
+        load_only(
+            Candidata.fila,
+            Candidata.nombre_completo,
+            Candidata.cedula,
+            Candidata.numero_telefono,
+            Candidata.codigo,
+        )
+    )
+
+
+def _docs_from_rows(rows) -> Iterable[_Doc]:
+    for row in rows:
+        yield CandidataSearchIndex.make_doc(row.fila, row.nombre_completo, row.cedula, row.numero_telefono, row.codigo)
+
+
+def build_index_from_db(index: CandidataSearchIndex, *, batch_size: int = 5000) -> bool:
+    t0 = time.perf_counter()
+    total = db.session.query(db.func.count(Candidata.fila)).scalar() or 0
+    if int(total) > index.max_docs:
+        index.state = "over_limit"
+        return False
+    rows = _narrow_query().order_by(Candidata.fila.asc()).yield_per(int(batch_size))
+    ok = index.load(_docs_from_rows(rows))
+    index.stats["build_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+    index.last_tail_check = time.time()
+    db.session.remove()
+    return ok
+
+
+def sync_index_with_db(index: CandidataSearchIndex, *, force_tail: bool = False) -> None:
+    """Aplica filas marcadas como sucias y, cada 30s, trae filas nuevas por ``fila > max``."""
+    dirty = index.pop_dirty()
+    if dirty:
+        found = {int(r.fila): r for r in _narrow_query().filter(Candidata.fila.in_(dirty)).all()}
+        for fid in dirty:
+            row = found.get(fid)
+            if row is None:
+                index.remove(fid)
+            else:
+                index.upsert(CandidataSearchIndex.make_doc(row.fila, row.nombre_completo, row.cedula, row.numero_telefono, row.codigo))
+        index.stats["refreshed"] += len(dirty)
+    now = time.time()
+    if force_tail or (now - index.last_tail_check) >= _TAIL_CHECK_SECONDS:
+        index.last_tail_check = now
+        rows = _narrow_query().filter(Candidata.fila > int(index.max_fila)).order_by(Candidata.fila.asc()).limit(2000).all()
+        for doc in _docs_from_rows(rows):
+            index.upsert(doc)
+        index.stats["tail_rows"] += len(rows)
+
+
+def _mark_from_audit(key: str, _log_id: int) -> None:
+    index = _INDEX
+    if index is None or not key.startswith("candidata:"):
+        return
+    entity_id = key.split(":", 1)[1]
+    if entity_id.isdigit():
+        index.mark_dirty(int(entity_id))
+
+
+def _mark_from_stream(entries) -> None:
+    index = _INDEX
+    if index is None:
+        return
+    for entry in entries:
+        envelope = getattr(entry, "envelope", None) or {}
+        aggregate = envelope.get("aggregate") or {}
+        payload = envelope.get("payload") or {}
+        if str(aggregate.get("type") or "").lower() == "candidata":
+            index.mark_dirty(aggregate.get("id"))
+        if payload.get("candidata_id"):
+            index.mark_dirty(payload.get("candidata_id"))
+
+
+@event.listens_for(Candidata, "after_insert")
+@event.listens_for(Candidata, "after_update")
+@event.listens_for(Candidata, "after_delete")
+def _candidata_search_index_touch(_mapper, _connection, target):
+    index = _INDEX
+    if index is not None:
+        index.mark_dirty(getattr(target, "fila", 0))
+
+
+def _build_in_background(app_obj, index: CandidataSearchIndex) -> None:
+    index.state = "building"
+    try:
+        with app_obj.app_context():
+            build_index_from_db(index)
+            from utils.audit_log_tail import audit_log_tailer, register_audit_log_listener
+            from utils.live_stream_reader import register_stream_listener
+
+            register_audit_log_listener(_mark_from_audit)
+            register_stream_listener(_mark_from_stream)
+            audit_log_tailer(app_obj, engine=db.engine)
+    except Exception as exc:
+        index.state = "error"
+        try:
+            app_obj.logger.warning("[candidata-search-index] build failed (%s: %s)", type(exc).__name__, exc)
+        except Exception:
+            pass
+
+
+def _rebuild_in_background(app_obj, old: CandidataSearchIndex) -> None:
+    """Reconstruye desde cero y reemplaza el índice vivo; las marcas sucias pendientes se conservan."""
+    global _INDEX
+    try:
+        with app_obj.app_context():
+            fresh = CandidataSearchIndex(max_docs=old.max_docs)
+            build_index_from_db(fresh)
+        with _INDEX_LOCK:
+            if _INDEX is old:
+                with old._lock:
+                    fresh._dirty |= old._dirty
+                _INDEX = fresh
+    except Exception as exc:
+        try:
+            app_obj.logger.warning("[candidata-search-index] rebuild failed (%s: %s)", type(exc).__name__, exc)
+        except Exception:
+            pass
+    finally:
+        old.rebuilding = False
+
+
+def _maybe_schedule_rebuild(index: CandidataSearchIndex) -> None:
+    if index.rebuilding or (time.time() - index.built_at) < _rebuild_seconds():
+        return
+    with _INDEX_LOCK:
+        if index.rebuilding or _INDEX is not index:
+            return
+        index.rebuilding = True
+    threading.Thread(
+        target=_rebuild_in_background,
+        args=(current_app._get_current_object(), index),
+        name="candidata-search-index-rebuild",
+        daemon=True,
+    ).start()
+
+
+def get_candidata_search_index(*, wait: bool = False) -> CandidataSearchIndex | None:
+    """Índice listo del proceso o ``None`` (deshabilitado, construyéndose o sobre el límite)."""
+    global _INDEX
+    if not candidata_search_index_enabled():
+        return None
+    index = _INDEX
+    if index is None:
+        with _INDEX_LOCK:
+            index = _INDEX
+            if index is None:
+                index = CandidataSearchIndex()
+                _INDEX = index
+                app_obj = current_app._get_current_object()
+                if wait:
+                    _build_in_background(app_obj, index)
+                else:
+                    threading.Thread(
+                        target=_build_in_background,
+                        args=(app_obj, index),
+                        name="candidata-search-index",
+                        daemon=True,
+                    ).start()
+    if index.state != "ready":
+        return None
+    # El índice viejo sigue atendiendo mientras se construye el nuevo.
+    _maybe_schedule_rebuild(index)
+    try:
+        sync_index_with_db(index)
+    except Exception:
+        return None
+    return index
+
+
+def reset_candidata_search_index() -> None:
+    global _INDEX
+    with _INDEX_LOCK:
+        _INDEX = None
+
+
+def hydrate_in_order(ids: list[int], *, base_query=None, fields=None) -> list:
+    """Carga solo las filas de ``ids`` y respeta el orden del índice."""
+    if not ids:
+        return []
+    query = base_query if base_query is not None else Candidata.query
+    if fields:
+        query = query.options(load_only(*fields))
+    rows = query.filter(Candidata.fila.in_(list(ids))).all()
+    by_id = {int(r.fila): r for r in rows}
+    return [by_id[fid] for fid in ids if fid in by_id]
+
+
+# ── consistencia vs SQL ─────────────────────────────────────────────────
+def _sample_queries(limit: int) -> list[str]:
+    rows = _narrow_query().order_by(db.func.random()).limit(max(1, int(limit))).all()
+    out: list[str] = []
+    for i, row in enumerate(rows):
+        doc = CandidataSearchIndex.make_doc(row.fila, row.nombre_completo, row.cedula, row.numero_telefono, row.codigo)
+        kind = i % 5
+        if kind == 0 and doc.tokens:
+            out.append(doc.tokens[-1][:4])
+        elif kind == 1 and len(doc.tokens) >= 2:
+            out.append(f"{doc.tokens[0]} {doc.tokens[-1]}")
+        elif kind == 2 and len(doc.cedula_digits) >= 6:
+            out.append(doc.cedula_digits[2:8])
+        elif kind == 3 and len(doc.telefono_digits) >= 7:
+            out.append(doc.telefono_digits[-7:])
+        elif doc.codigo:
+            out.append(doc.codigo)
+    return [q for q in out if q]
+
+
+def check_index_consistency(index: CandidataSearchIndex, queries: list[str], *, sql_limit: int = 500) -> dict[str, Any]:
+    """Compara ids exactos del índice contra ``search_candidatas_limited`` por SQL."""
+    from core.services.search import search_candidatas_limited
+
+    mismatches: list[dict[str, Any]] = []
+    compared = skipped = 0
+    for q in queries:
+        hits = index.search(q, typo_tolerant=False)
+        if hits is None:
+            skipped += 1
+            continue
+        sql_rows = search_candidatas_limited(q, limit=sql_limit, minimal_fields=True, use_index=False, log_label="index_check")
+        if len(sql_rows) >= sql_limit:
+            skipped += 1
+            continue
+        compared += 1
+        sql_ids = {int(r.fila) for r in sql_rows}
+        idx_ids = set(hits.exact_ids())
+        if sql_ids != idx_ids:
+            mismatches.append(
+                {
+                    "q": q,
+                    "only_sql": sorted(sql_ids - idx_ids)[:10],
+                    "only_index": sorted(idx_ids - sql_ids)[:10],
+                }
+            )
+    return {"compared": compared, "skipped": skipped, "mismatches": mismatches}
+
+
+@click.group("candidatas-search-index")
+def candidata_search_index_cli():
+    """Índice en memoria de búsqueda de candidatas."""
+
+
+@candidata_search_index_cli.command("check")
+@click.option("--sample", default=200, show_default=True, type=int, help="Candidatas muestreadas para generar consultas.")
+@click.option("--query", "queries", multiple=True, help="Consulta explícita (repetible).")
+@with_appcontext
+def candidata_search_index_check_command(sample: int, queries: tuple[str, ...]):
+    """Construye el índice y compara sus resultados contra el camino SQL."""
+    index = CandidataSearchIndex()
+    if not build_index_from_db(index):
+        click.echo(f"index_state={index.state} docs={len(index)}")
+        raise SystemExit(2)
+    qs = list(queries) or _sample_queries(max(1, min(int(sample), 5000)))
+    out = check_index_consistency(index, qs)
+    click.echo(
+        f"docs={len(index)} build_ms={index.stats['build_ms']} compared={out['compared']} "
+        f"skipped={out['skipped']} mismatches={len(out['mismatches'])}"
+    )
+    for item in out["mismatches"][:20]:
+        click.echo(f"- q={item['q']!r} only_sql={item['only_sql']} only_index={item['only_index']}")
+    if out["mismatches"]:
+        raise SystemExit(1)
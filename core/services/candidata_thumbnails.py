@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""Miniaturas de las fotos de candidata para listados (tienda pública/privada, clientes).
+
+- Tamaños fijos (``VARIANTS``, lado mayor en px) en WebP y JPEG; se generan al
+  subir la foto (``subir_fotos``) y con ``flask candidatas-thumbnails backfill``.
+  Si un GET pide una que falta se sirve el original y la generación se encola
+  en un hilo del proceso (un job por candidata/foto); el GET nunca renderiza.
+- Cada miniatura recuerda el sha256 del original: si la foto cambia, la fila
+  queda obsoleta y se regenera. La escritura es un upsert por variante, así
+  que dos generaciones concurrentes no chocan con la restricción única. Los bytes van al blob store si está activo; si
+  no, a la columna ``data`` (son unos pocos KB).
+- ``serve_candidata_photo`` elige WebP o JPEG según ``Accept`` y responde con
+  ETag/Range vía ``utils.media_serving``; sin miniatura sirve el original.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+import click
+from flask import current_app, request
+from flask.cli import with_appcontext
+from sqlalchemy import tuple_
+
+from config_app import db
+from core.services.candidata_documentos import (
+    describe_candidata_document,
+    load_candidata_document,
+    serve_candidata_document,
+)
+from models import Candidata, CandidataFotoDerivada
+from utils.blob_store import BlobNotFoundError, get_blob_store, sha256_hex
+from utils.image_thumbnails import FORMATS, VARIANTS, ThumbnailError, render_thumbnails
+from utils.runtime_config import table_ready
+from utils.timezone import utc_now_naive
+
+
+PHOTO_KINDS = ("perfil", "foto_perfil")
+VARIANT_PARAM = "size"
+STORAGE_DB = "db"
+
+_RENDER_LOCK = threading.Lock()
+_RENDER_PENDING: set[tuple[int, str]] = set()
+_RENDER_POOL: ThreadPoolExecutor | None = None
+_RENDER_MAX_PENDING = 256
+
+
+def _derivadas_table_ready(bind) -> bool:
+    return table_ready(CandidataFotoDerivada.__tablename__, bind=bind)
+
+
+def _photo_kind(kind: str) -> str:
+    if kind not in PHOTO_KINDS:
+        raise ValueError(f"Foto de candidata sin miniaturas: {kind}")
+    return kind
+
+
+def _fresh_variants(candidata_id: int, kind: str, source_sha256: str) -> set[tuple[str, str]]:
+    rows = (
+        db.session.query(CandidataFotoDerivada.variant, CandidataFotoDerivada.format)
+        .filter(
+            CandidataFotoDerivada.candidata_id == int(candidata_id),
+            CandidataFotoDerivada.source_kind == kind,
+            CandidataFotoDerivada.source_sha256 == source_sha256,
+        )
+        .all()
+    )
+    return {(str(r[0]), str(r[1])) for r in rows}
+
+
+def store_candidata_thumbnails(candidata_id: int, kind: str, data: bytes) -> int:
+    """Genera y guarda todas las miniaturas de ``data`` (reemplaza las anteriores)."""
+    _photo_kind(kind)
+    cid = int(candidata_id or 0)
+    if cid <= 0 or not data or not _derivadas_table_ready(db.session.get_bind()):
+        return 0
+    source_sha = sha256_hex(data)
+    rendered = render_thumbnails(data)
+    store = get_blob_store()
+    table = CandidataFotoDerivada.__table__
+    now = utc_now_naive()
+    rows = []
+    for thumb in rendered:
+        backend, inline = STORAGE_DB, thumb.data
+        if store is not None:
+            try:
+                store.put(thumb.data, mime_type=thumb.mime_type)
+                backend, inline = store.backend, None
+            except Exception as exc:
+                current_app.logger.warning(
+                    "[candidata-thumbnails] store put failed fila=%s kind=%s (%s: %s)",
+                    cid, kind, type(exc).__name__, exc,
+                )
+        rows.append(
+            {
+                "candidata_id": cid,
+                "source_kind": kind,
+                "source_sha256": source_sha,
+                "variant": thumb.variant,
+                "format": thumb.format,
+                "width": thumb.width,
+                "height": thumb.height,
+                "sha256": sha256_hex(thumb.data),
+                "size_bytes": len(thumb.data),
+                "mime_type": thumb.mime_type,
+                "storage_backend": backend,
+                "data": inline,
+                "created_at": now,
+            }
+        )
+    # Transacción propia: se llama tras confirmar la subida o desde el hilo de fondo.
+    with db.engine.begin() as conn:
+        _upsert_thumbnails(conn, rows)
+        keep = [(r["variant"], r["format"]) for r in rows]
+        stale = table.delete().where(table.c.candidata_id == cid, table.c.source_kind == kind)
+        if keep:
+            stale = stale.where(~tuple_(table.c.variant, table.c.format).in_(keep))
+        conn.execute(stale)
+    return len(rows)
+
+
+def _upsert_thumbnails(connection, rows: list[dict]) -> None:
+    if not rows:
+        return
+    table = CandidataFotoDerivada.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.candidata_id, table.c.source_kind, table.c.variant, table.c.format],
+            set_={
+                name: getattr(stmt.excluded, name)
+                for name in (
+                    "source_sha256", "width", "height", "sha256", "size_bytes",
+                    "mime_type", "storage_backend", "data", "created_at",
+                )
+            },
+        )
+        connection.execute(stmt)
+        return
+    for row in rows:
+        connection.execute(
+            table.delete().where(
+                table.c.candidata_id == row["candidata_id"],
+                table.c.source_kind == row["source_kind"],
+                table.c.variant == row["variant"],
+                table.c.format == row["format"],
+            )
+        )
+    connection.execute(table.insert(), rows)
+
+
+def ensure_candidata_thumbnails(candidata_id: int, kind: str, *, data: bytes | None = None) -> int:
+    """Genera las miniaturas si faltan o quedaron obsoletas; devuelve cuántas escribió."""
+    _photo_kind(kind)
+    cid = int(candidata_id or 0)
+    if cid <= 0 or not _derivadas_table_ready(db.session.get_bind()):
+        return 0
+    if data is None:
+        meta = describe_candidata_document(cid, kind)
+        if meta is None or not meta.mime_type.startswith("image/"):
+            return 0
+        expected = {(v, f) for v in VARIANTS for f in FORMATS}
+        if _fresh_variants(cid, kind, meta.sha256) >= expected:
+            return 0
+        doc = load_candidata_document(cid, kind)
+        data = doc.data if doc is not None else b""
+    if not data:
+        return 0
+    return store_candidata_thumbnails(cid, kind, data)
+
+
+def _render_job(app_obj, candidata_id: int, kind: str) -> None:
+    try:
+        with app_obj.app_context():
+            try:
+                ensure_candidata_thumbnails(candidata_id, kind)
+            except Exception as exc:
+                app_obj.logger.warning(
+                    "[candidata-thumbnails] background render failed fila=%s kind=%s (%s: %s)",
+                    candidata_id, kind, type(exc).__name__, exc,
+                )
+            finally:
+                db.session.remove()
+    finally:
+        with _RENDER_LOCK:
+            _RENDER_PENDING.discard((int(candidata_id), kind))
+
+
+def enqueue_candidata_thumbnails(candidata_id: int, kind: str) -> bool:
+    """Encola la generación en segundo plano; ``False`` si ya estaba pendiente o la cola está llena.
+
+    Lo que no entra lo completa ``flask candidatas-thumbnails backfill``.
+    """
+    global _RENDER_POOL
+    _photo_kind(kind)
+    key = (int(candidata_id or 0), kind)
+    if key[0] <= 0:
+        return False
+    with _RENDER_LOCK:
+        if key in _RENDER_PENDING or len(_RENDER_PENDING) >= _RENDER_MAX_PENDING:
+            return False
+        _RENDER_PENDING.add(key)
+        if _RENDER_POOL is None:
+            _RENDER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="candidata-thumbnails")
+        pool = _RENDER_POOL
+    try:
+        pool.submit(_render_job, current_app._get_current_object(), key[0], kind)
+    except Exception:
+        with _RENDER_LOCK:
+            _RENDER_PENDING.discard(key)
+        return False
+    return True
+
+
+def pick_thumbnail_format(accept_header: str | None) -> str:
+    return "webp" if "image/webp" in str(accept_header or "").lower() else "jpeg"
+
+
+def _thumbnail_row(candidata_id: int, kind: str, variant: str, fmt: str, source_sha256: str):
+    return (
+        db.session.query(
+            CandidataFotoDerivada.id,
+            CandidataFotoDerivada.sha256,
+            CandidataFotoDerivada.size_bytes,
+            CandidataFotoDerivada.mime_type,
+            CandidataFotoDerivada.storage_backend,
+        )
+        .filter(
+            CandidataFotoDerivada.candidata_id == int(candidata_id),
+            CandidataFotoDerivada.source_kind == kind,
+            CandidataFotoDerivada.variant == variant,
+            CandidataFotoDerivada.format == fmt,
+            CandidataFotoDerivada.source_sha256 == source_sha256,
+        )
+        .first()
+    )
+
+
+def _thumbnail_bytes(row) -> bytes:
+    if row.storage_backend != STORAGE_DB:
+        store = get_blob_store()
+        if store is not None:
+            try:
+                return store.get(row.sha256)
+            except BlobNotFoundError:
+                pass
+    data = db.session.query(CandidataFotoDerivada.data).filter(CandidataFotoDerivada.id == int(row.id)).scalar()
+    return bytes(data or b"")
+
+
+def serve_candidata_photo(
+    candidata,
+    kind: str,
+    variant: str | None,
+    *,
+    require_image: bool = True,
+    private: bool = True,
+    download_stem: str | None = None,
+):
+    """Miniatura ``variant`` (WebP/JPEG según ``Accept``) o el original si no aplica/no existe."""
+    _photo_kind(kind)
+    if candidata is None:
+        return None
+
+    def _original():
+        return serve_candidata_document(
+            candidata, kind, require_image=require_image, private=private, download_stem=download_stem
+        )
+
+    loaded = getattr(candidata, "__dict__", {}) or {}
+    if variant not in VARIANTS or kind in loaded or not _derivadas_table_ready(db.session.get_bind()):
+        return _original()
+
+    from utils.media_serving import extension_for_mime, media_response
+
+    fila = int(getattr(candidata, "fila", 0) or 0)
+    source = describe_candidata_document(fila, kind)
+    if source is None:
+        return None
+    if not source.mime_type.startswith("image/"):
+        return _original()
+    fmt = pick_thumbnail_format(request.headers.get("Accept"))
+    row = _thumbnail_row(fila, kind, variant, fmt, source.sha256)
+    if row is None:
+        # Nada de renderizar en el GET: se sirve el original y se genera en segundo plano.
+        enqueue_candidata_thumbnails(fila, kind)
+        return _original()
+
+    def _read(start: int, end: int):
+        yield _thumbnail_bytes(row)[start:end + 1]
+
+    return media_response(
+        sha256=row.sha256,
+        size=int(row.size_bytes or 0),
+        mime_type=row.mime_type,
+        read_range=_read,
+        private=private,
+        download_name=f"{download_stem}_{variant}.{extension_for_mime(row.mime_type)}" if download_stem else None,
+        version_sha256=source.sha256,
+        vary="Accept",
+    )
+
+
+def backfill_candidata_thumbnails(
+    *,
+    kinds: Iterable[str] = PHOTO_KINDS,
+    batch_size: int = 20,
+    limit: int = 0,
+) -> dict[str, int]:
+    """Genera miniaturas de las fotos existentes por lotes; reanudable (salta las vigentes)."""
+    if not _derivadas_table_ready(db.session.get_bind()):
+        raise click.ClickException("Falta la tabla candidata_fotos_derivadas (aplique migraciones).")
+    stats = {"generated": 0, "fresh": 0, "failed": 0}
+    batch = max(1, min(int(batch_size or 20), 200))
+    for kind in kinds:
+        _photo_kind(kind)
+        column = getattr(Candidata, kind)
+        last_fila = 0
+        while True:
+            if limit and stats["generated"] >= int(limit):
+                return stats
+            filas = [
+                int(r[0])
+                for r in db.session.query(Candidata.fila)
+                .filter(Candidata.fila > last_fila, column.isnot(None))
+                .order_by(Candidata.fila.asc())
+                .limit(batch)
+                .all()
+            ]
+            if not filas:
+                break
+            for fila in filas:
+                last_fila = fila
+                try:
+                    written = ensure_candidata_thumbnails(fila, kind)
+                except ThumbnailError as exc:
+                    stats["failed"] += 1
+                    click.echo(f"fila={fila} kind={kind} error={exc}", err=True)
+                    continue
+                stats["generated" if written else "fresh"] += 1
+            db.session.commit()
+            db.session.expunge_all()
+    return stats
+
+
+@click.group("candidatas-thumbnails")
+def candidata_thumbnails_cli():
+    """Miniaturas de fotos de candidatas."""
+
+
+@candidata_thumbnails_cli.command("backfill")
+@click.option("--kind", "kinds", multiple=True, type=click.Choice(PHOTO_KINDS), help="Foto a procesar (repetible).")
+@click.option("--batch-size", default=20, show_default=True, type=int, help="Candidatas por lote.")
+@click.option("--limit", default=0, show_default=True, type=int, help="Máximo de fotos a generar (0 = todas).")
+@with_appcontext
+def candidata_thumbnails_backfill_command(kinds: tuple[str, ...], batch_size: int, limit: int):
+    """Genera las miniaturas que faltan o quedaron obsoletas."""
+    stats = backfill_candidata_thumbnails(kinds=kinds or PHOTO_KINDS, batch_size=batch_size, limit=limit)
+    click.echo(f"generated={stats['generated']} fresh={stats['fresh']} failed={stats['failed']}")
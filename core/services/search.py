@@ -1,7 +1,7 @@
 from __future__ import annotations
 
+import os
 import re
-import unicodedata
 from time import perf_counter
 from typing import Optional
 
@@ -9,36 +9,29 @@ from flask import current_app
 from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import load_only
 
+from config_app import db
 from models import Candidata
+from utils.candidata_search_norm import digits_only, normalize_search_text, strip_accents
+from utils.runtime_config import columns_ready
 
 
 CODIGO_PATTERN = re.compile(r"^[A-Z]{3}-\d{6}$")
+_SEARCH_NORM_COLUMNS = ("nombre_norm", "cedula_digits", "telefono_digits")
 
 
 def _strip_accents_py(s: str) -> str:
     """Quita acentos en Python (para normalizar el texto de busqueda)."""
-    if not s:
-        return ""
-    nfkd = unicodedata.normalize("NFKD", s)
-    return "".join(c for c in nfkd if unicodedata.category(c) != "Mn")
+    return strip_accents(s)
 
 
 def normalize_query_text(raw: str) -> str:
     """Normaliza texto para busquedas flexibles (nombre, etc.)."""
-    s = (raw or "").strip()
-    if not s:
-        return ""
-    s = s.replace(",", " ").replace(".", " ").replace(";", " ").replace(":", " ")
-    s = s.replace("\n", " ").replace("\t", " ")
-    s = _strip_accents_py(s).lower()
-    s = re.sub(r"[^a-z0-9\s\-]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return normalize_search_text(raw)
 
 
 def normalize_digits(raw: str) -> str:
     """Deja solo digitos (para cedula/telefono)."""
-    return re.sub(r"\D", "", raw or "").strip()
+    return digits_only(raw)
 
 
 def normalize_code(raw: str) -> str:
@@ -64,6 +57,45 @@ def _sql_digits(col):
     return func.regexp_replace(col, r"\D", "", "g")
 
 
+def search_norm_columns_enabled() -> bool:
+    """True si ``candidatas`` ya tiene las columnas normalizadas (migración aplicada).
+
+    Mientras falte la migración se reintenta cada ``SCHEMA_RETRY_SECONDS`` para que
+    los procesos vivos la detecten sin reiniciar.
+    ``CANDIDATA_SEARCH_NORM_COLUMNS=0`` fuerza el camino anterior.
+    """
+    raw = (os.getenv("CANDIDATA_SEARCH_NORM_COLUMNS") or "").strip().lower()
+    if raw in {"0", "false", "no", "off"}:
+        return False
+    return columns_ready(Candidata.__tablename__, _SEARCH_NORM_COLUMNS)
+
+
+def _query_time_dialect() -> str:
+    try:
+        return str(db.engine.dialect.name or "")
+    except Exception:
+        return ""
+
+
+def _name_token_filter(token: str, *, use_norm: bool, dialect: str):
+    if use_norm:
+        # nombre_norm ya está en minúsculas: LIKE usa el índice trigram sin lower() por fila.
+        return Candidata.nombre_norm.like(f"%{token}%")
+    if dialect == "postgresql":
+        return _sql_name_norm(Candidata.nombre_completo).ilike(f"%{token}%")
+    # Fallback SQLite/local: sin regexp_replace ni translate.
+    return func.lower(Candidata.nombre_completo).like(f"%{token}%")
+
+
+def _digits_filter(q_digits: str, *, use_norm: bool, dialect: str):
+    like = f"%{q_digits}%"
+    if use_norm:
+        return or_(Candidata.cedula_digits.like(like), Candidata.telefono_digits.like(like))
+    if dialect == "postgresql":
+        return or_(_sql_digits(Candidata.cedula).ilike(like), _sql_digits(Candidata.numero_telefono).ilike(like))
+    return or_(Candidata.cedula.like(like), Candidata.numero_telefono.like(like))
+
+
 def build_flexible_search_filters(q: str):
     """Construye filtros flexibles para nombre/cedula/telefono."""
     q = (q or "").strip()
@@ -79,19 +111,17 @@ def build_flexible_search_filters(q: str):
         strict_code = func.trim(func.upper(Candidata.codigo)) == q_code
 
     filters = []
+    use_norm = search_norm_columns_enabled()
+    dialect = "" if use_norm else _query_time_dialect()
 
     if q_text:
         tokens = [t for t in q_text.split(" ") if t]
-        name_norm = _sql_name_norm(Candidata.nombre_completo)
-
         if tokens:
-            name_and = and_(*[name_norm.ilike(f"%{t}%") for t in tokens])
+            name_and = and_(*[_name_token_filter(t, use_norm=use_norm, dialect=dialect) for t in tokens])
             filters.append(name_and)
 
     if q_digits:
-        ced_digits = _sql_digits(Candidata.cedula).ilike(f"%{q_digits}%")
-        tel_digits = _sql_digits(Candidata.numero_telefono).ilike(f"%{q_digits}%")
-        filters.append(or_(ced_digits, tel_digits))
+        filters.append(_digits_filter(q_digits, use_norm=use_norm, dialect=dialect))
 
     if not filters:
         like = f"%{q}%"
@@ -128,12 +158,31 @@ def search_candidatas_limited(
     fields=None,
     order_mode: str = "nombre_asc",
     log_label: str = "default",
+    use_index: bool = True,
 ):
-    """Ejecuta la busqueda estandar de candidatas con limite y orden consistentes."""
+    """Ejecuta la busqueda estandar de candidatas con limite y orden consistentes.
+
+    Con ``CANDIDATA_SEARCH_INDEX_ENABLED=1`` resuelve los ids en el indice en
+    memoria y solo hidrata la pagina; si el indice no esta listo o la consulta
+    no aplica, sigue por SQL.
+    """
     q = (q or "").strip()[:128]
     if not q:
         return []
 
+    if use_index:
+        rows = _search_candidatas_via_index(
+            q,
+            limit=limit,
+            base_query=base_query,
+            minimal_fields=minimal_fields,
+            fields=fields,
+            order_mode=order_mode,
+            log_label=log_label,
+        )
+        if rows is not None:
+            return rows
+
     query = base_query if base_query is not None else Candidata.query
     if fields:
         query = query.options(load_only(*fields))
@@ -166,6 +215,50 @@ def search_candidatas_limited(
     return rows
 
 
+_INDEX_BASE_QUERY_MAX_IDS = 2000
+
+
+def _search_candidatas_via_index(q, *, limit, base_query, minimal_fields, fields, order_mode, log_label):
+    from core.services.candidata_search_index import get_candidata_search_index, hydrate_in_order
+
+    index = get_candidata_search_index()
+    if index is None:
+        return None
+    t0 = perf_counter()
+    hits = index.search(q, order_mode=order_mode)
+    if hits is None:
+        return None
+    safe_limit = max(1, min(int(limit or 300), 500))
+    if fields:
+        load_fields = fields
+    elif minimal_fields:
+        load_fields = (
+            Candidata.fila,
+            Candidata.nombre_completo,
+            Candidata.cedula,
+            Candidata.numero_telefono,
+            Candidata.codigo,
+        )
+    else:
+        load_fields = None
+    if base_query is None:
+        rows = hydrate_in_order(hits.ids[:safe_limit], fields=load_fields)
+    else:
+        # El filtro extra del llamador se resuelve en SQL sobre un IN acotado.
+        if len(hits.ids) > _INDEX_BASE_QUERY_MAX_IDS:
+            return None
+        rows = hydrate_in_order(hits.ids, base_query=base_query, fields=load_fields)[:safe_limit]
+    dt_ms = round((perf_counter() - t0) * 1000, 2)
+    current_app.logger.info(
+        "search_candidatas_limited[%s] q=%r rows=%s dt_ms=%s source=index",
+        log_label,
+        q,
+        len(rows),
+        dt_ms,
+    )
+    return rows
+
+
 def _prioritize_candidata_result(rows: list, prioritized_fila: Optional[int]) -> list:
     """Mueve al inicio la fila indicada, si esta en la lista de resultados."""
     if not rows:
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Snapshot de facetas de la tienda pública (ciudad/modalidad/tags) en el backplane.
+
+``domesticas_store_list`` ya no recorre ``candidatas_web`` dos veces por vista
+ni hace ``count()``: lee un snapshot compacto (una tupla por perfil visible y
+disponible) y calcula total, ids de la página y conteos en memoria.
+
+- El snapshot vive en el backplane bajo ``store_facets:snapshot:<versión>``;
+  cada proceso además lo memoriza unos segundos.
+- Cualquier commit que inserte/borre una ``CandidataWeb`` o cambie un campo
+  relevante (visibilidad, estado, ciudad, tags, orden...) sube la versión.
+- Si el backplane no está, cada proceso reconstruye con TTL corto.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes, object_session
+
+from config_app import db
+from models import CandidataWeb
+from utils.distributed_backplane import bp_get, bp_incr, bp_set
+from utils.store_facets import StoreFacetIndex, StoreFacetRow, StoreFilters, StoreListing
+
+
+VERSION_KEY = "store_facets:version"
+SNAPSHOT_KEY_PREFIX = "store_facets:snapshot:"
+SNAPSHOT_TTL_SECONDS = 600
+VERSION_TTL_SECONDS = 30 * 24 * 3600
+LOCAL_TTL_SECONDS = 30.0
+
+_FACET_FIELDS = (
+    "visible",
+    "estado_publico",
+    "nombre_publico",
+    "ciudad_publica",
+    "sector_publico",
+    "modalidad_publica",
+    "tags_publicos",
+    "disponible_inmediato",
+    "orden_lista",
+    "fecha_ultima_actualizacion",
+    "candidata_id",
+)
+_DIRTY_FLAG = "store_facets_dirty"
+
+_LOCAL_LOCK = threading.Lock()
+_LOCAL: dict[str, object] = {"key": None, "index": None, "at": 0.0}
+_LOCAL_GENERATION = 0
+
+
+def _ts(value) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value.timestamp())
+    except Exception:
+        return None
+
+
+def load_store_facet_rows_from_db() -> list[StoreFacetRow]:
+    """Una sola consulta de columnas (sin entidades ORM) de los perfiles visibles y disponibles."""
+    rows = (
+        db.session.query(
+            CandidataWeb.candidata_id,
+            CandidataWeb.nombre_publico,
+            CandidataWeb.ciudad_publica,
+            CandidataWeb.sector_publico,
+            CandidataWeb.modalidad_publica,
+            CandidataWeb.tags_publicos,
+            CandidataWeb.disponible_inmediato,
+            CandidataWeb.orden_lista,
+            CandidataWeb.fecha_ultima_actualizacion,
+        )
+        .filter(CandidataWeb.visible.is_(True))
+        .filter(CandidataWeb.estado_publico == "disponible")
+        .all()
+    )
+    return [
+        StoreFacetRow(
+            fila=int(r[0]),
+            nombre=str(r[1] or ""),
+            ciudad=str(r[2] or ""),
+            sector=str(r[3] or ""),
+            modalidad=str(r[4] or ""),
+            tags_raw=str(r[5] or ""),
+            disponible_inmediato=bool(r[6]),
+            orden_lista=int(r[7]) if r[7] is not None else None,
+            actualizado_ts=_ts(r[8]),
+        )
+        for r in rows
+    ]
+
+
+def store_facets_version() -> int:
+    return int(bp_get(VERSION_KEY, default=0, context="store_facets_version_get") or 0)
+
+
+def bump_store_facets_version() -> int:
+    """Invalida el snapshot en todos los procesos (y el memo local de este)."""
+    global _LOCAL_GENERATION
+    with _LOCAL_LOCK:
+        _LOCAL_GENERATION += 1
+        _LOCAL.update({"key": None, "index": None, "at": 0.0})
+    return bp_incr(VERSION_KEY, timeout=VERSION_TTL_SECONDS, context="store_facets_version_incr")
+
+
+def store_facet_index() -> StoreFacetIndex:
+    version = store_facets_version()
+    local_key = (version, _LOCAL_GENERATION)
+    now = time.monotonic()
+    with _LOCAL_LOCK:
+        if _LOCAL["key"] == local_key and now - float(_LOCAL["at"] or 0.0) < LOCAL_TTL_SECONDS:
+            return _LOCAL["index"]  # type: ignore[return-value]
+
+    snapshot_key = f"{SNAPSHOT_KEY_PREFIX}{version}"
+    rows = bp_get(snapshot_key, default=None, context="store_facets_snapshot_get")
+    if not isinstance(rows, list):
+        # Tuplas planas en el backplane: baratas de (de)serializar y estables entre despliegues.
+        rows = [tuple(r) for r in load_store_facet_rows_from_db()]
+        bp_set(snapshot_key, rows, timeout=SNAPSHOT_TTL_SECONDS, context="store_facets_snapshot_set")
+    index = StoreFacetIndex(rows)
+    with _LOCAL_LOCK:
+        _LOCAL.update({"key": local_key, "index": index, "at": now})
+    return index
+
+
+def store_listing(filters: StoreFilters, *, page: int = 1, per_page: int = 12) -> StoreListing:
+    return store_facet_index().listing(filters, page=page, per_page=per_page)
+
+
+def reset_store_facets_cache() -> None:
+    with _LOCAL_LOCK:
+        _LOCAL.update({"key": None, "index": None, "at": 0.0})
+
+
+def _mark_dirty(target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_DIRTY_FLAG] = True
+
+
+@event.listens_for(CandidataWeb, "after_insert")
+@event.listens_for(CandidataWeb, "after_delete")
+def _candidata_web_inserted_or_deleted(_mapper, _connection, target):
+    _mark_dirty(target)
+
+
+@event.listens_for(CandidataWeb, "after_update")
+def _candidata_web_updated(_mapper, _connection, target):
+    if any(attributes.get_history(target, name).has_changes() for name in _FACET_FIELDS):
+        _mark_dirty(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _store_facets_after_commit(session):
+    if session.info.pop(_DIRTY_FLAG, False):
+        try:
+            bump_store_facets_version()
+        except Exception as exc:
+            try:
+                current_app.logger.warning("[store-facets] version bump failed (%s: %s)", type(exc).__name__, exc)
+            except Exception:
+                pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _store_facets_after_rollback(session):
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+@click.group("store-facets")
+def store_facets_cli():
+    """Facetas de la tienda pública."""
+
+
+@store_facets_cli.command("invalidate")
+@with_appcontext
+def store_facets_invalidate_command():
+    """Sube la versión del snapshot (tras cambios masivos hechos por SQL)."""
+    click.echo(f"version={bump_store_facets_version()}")
+
+
+@store_facets_cli.command("show")
+@click.option("--limit", default=10, show_default=True, type=int)
+@with_appcontext
+def store_facets_show_command(limit: int):
+    """Total y conteos principales del snapshot actual."""
+    listing = store_listing(StoreFilters(), per_page=1)
+    click.echo(f"version={store_facets_version()} total={listing.total} disponible_inmediato={listing.disponible_inmediato}")
+    for label, values in (("ciudad", listing.ciudades), ("modalidad", listing.modalidades), ("tag", listing.tags)):
+        for value, count in values[: max(1, int(limit))]:
+            click.echo(f"{label}\t{count}\t{value}")
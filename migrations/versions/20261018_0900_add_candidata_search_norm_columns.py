@@ -0,0 +1,122 @@
+"""add candidata normalized search columns and trigram indexes
+
+Revision ID: 20261018_0900
+Revises: 20260601_1545
+Create Date: 2026-10-18 09:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_0900"
+down_revision = "20260601_1545"
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_BATCH = 2000
+
+TRGM_INDEXES = (
+    ("ix_candidatas_nombre_norm_trgm", "nombre_norm"),
+    ("ix_candidatas_cedula_digits_trgm", "cedula_digits"),
+    ("ix_candidatas_telefono_digits_trgm", "telefono_digits"),
+)
+
+
+def _cols(bind) -> set[str]:
+    return {c["name"] for c in inspect(bind).get_columns("candidatas")}
+
+
+def _search_text(value: str | None) -> str | None:
+    # Copia de utils/candidata_search_norm.normalize_search_text (mismo resultado que los eventos del modelo).
+    import re
+    import unicodedata
+
+    s = (value or "").strip()
+    if not s:
+        return None
+    s = s.replace(",", " ").replace(".", " ").replace(";", " ").replace(":", " ")
+    s = s.replace("\n", " ").replace("\t", " ")
+    s = "".join(c for c in unicodedata.normalize("NFKD", s) if unicodedata.category(c) != "Mn").lower()
+    s = re.sub(r"[^a-z0-9\s\-]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s[:200] or None
+
+
+def _digits(value: str | None) -> str | None:
+    import re
+
+    return re.sub(r"\D", "", value or "")[:50] or None
+
+
+def _backfill(bind) -> None:
+    last_fila = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT fila, nombre_completo, cedula, numero_telefono FROM candidatas "
+                "WHERE fila > :last ORDER BY fila LIMIT :lim"
+            ),
+            {"last": last_fila, "lim": BACKFILL_BATCH},
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            sa.text(
+                "UPDATE candidatas SET nombre_norm = :nombre_norm, cedula_digits = :cedula_digits, "
+                "telefono_digits = :telefono_digits WHERE fila = :fila"
+            ),
+            [
+                {
+                    "fila": int(row[0]),
+                    "nombre_norm": _search_text(row[1]),
+                    "cedula_digits": _digits(row[2]),
+                    "telefono_digits": _digits(row[3]),
+                }
+                for row in rows
+            ],
+        )
+        last_fila = int(rows[-1][0])
+
+
+def upgrade():
+    bind = op.get_bind()
+    cols = _cols(bind)
+    if "nombre_norm" not in cols:
+        op.add_column("candidatas", sa.Column("nombre_norm", sa.String(length=200), nullable=True))
+    if "cedula_digits" not in cols:
+        op.add_column("candidatas", sa.Column("cedula_digits", sa.String(length=50), nullable=True))
+    if "telefono_digits" not in cols:
+        op.add_column("candidatas", sa.Column("telefono_digits", sa.String(length=50), nullable=True))
+
+    _backfill(bind)
+
+    # La búsqueda hace LIKE '%texto%' sobre estas columnas; solo trigram GIN evita el seq scan.
+    if bind.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.get_context().autocommit_block():
+            for index_name, column in TRGM_INDEXES:
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                    f"ON candidatas USING GIN ({column} gin_trgm_ops)"
+                )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for index_name, _column in reversed(TRGM_INDEXES):
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    cols = _cols(bind)
+    if "telefono_digits" in cols:
+        op.drop_column("candidatas", "telefono_digits")
+    if "cedula_digits" in cols:
+        op.drop_column("candidatas", "cedula_digits")
+    if "nombre_norm" in cols:
+        op.drop_column("candidatas", "nombre_norm")
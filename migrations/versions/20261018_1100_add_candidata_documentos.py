@@ -0,0 +1,57 @@
+"""add candidata_documentos (blob store metadata)
+
+Revision ID: 20261018_1100
+Revises: 20261018_0900
+Create Date: 2026-10-18 11:00:00
+
+Solo crea la tabla de metadatos. Mover los bytes al blob store se hace fuera de
+la migración con ``flask candidatas-blobs backfill`` (lotes, reanudable), porque
+leer todos los ``LargeBinary`` dentro de una transacción de Alembic no escala.
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1100"
+down_revision = "20261018_0900"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "candidata_documentos" in inspect(bind).get_table_names():
+        return
+    op.create_table(
+        "candidata_documentos",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "candidata_id",
+            sa.Integer(),
+            sa.ForeignKey("candidatas.fila", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("mime_type", sa.String(length=80), nullable=False),
+        sa.Column("storage_backend", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("candidata_id", "kind", name="uq_candidata_documentos_candidata_kind"),
+    )
+    op.create_index("ix_candidata_documentos_candidata_id", "candidata_documentos", ["candidata_id"])
+    op.create_index("ix_candidata_documentos_sha256", "candidata_documentos", ["sha256"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "candidata_documentos" not in inspect(bind).get_table_names():
+        return
+    op.drop_index("ix_candidata_documentos_sha256", table_name="candidata_documentos")
+    op.drop_index("ix_candidata_documentos_candidata_id", table_name="candidata_documentos")
+    op.drop_table("candidata_documentos")
@@ -0,0 +1,62 @@
+"""add candidata_fotos_derivadas (miniaturas de fotos de perfil)
+
+Revision ID: 20261018_1300
+Revises: 20261018_1100
+Create Date: 2026-10-18 13:00:00
+
+Solo crea la tabla. Las miniaturas de las fotos existentes se generan fuera de
+la migración con ``flask candidatas-thumbnails backfill`` (por lotes).
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1300"
+down_revision = "20261018_1100"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "candidata_fotos_derivadas" in inspect(bind).get_table_names():
+        return
+    op.create_table(
+        "candidata_fotos_derivadas",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "candidata_id",
+            sa.Integer(),
+            sa.ForeignKey("candidatas.fila", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("source_kind", sa.String(length=20), nullable=False),
+        sa.Column("source_sha256", sa.String(length=64), nullable=False),
+        sa.Column("variant", sa.String(length=20), nullable=False),
+        sa.Column("format", sa.String(length=10), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("mime_type", sa.String(length=40), nullable=False),
+        sa.Column("storage_backend", sa.String(length=20), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint(
+            "candidata_id", "source_kind", "variant", "format",
+            name="uq_candidata_fotos_derivadas_variant",
+        ),
+    )
+    op.create_index("ix_candidata_fotos_derivadas_candidata_id", "candidata_fotos_derivadas", ["candidata_id"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "candidata_fotos_derivadas" not in inspect(bind).get_table_names():
+        return
+    op.drop_index("ix_candidata_fotos_derivadas_candidata_id", table_name="candidata_fotos_derivadas")
+    op.drop_table("candidata_fotos_derivadas")
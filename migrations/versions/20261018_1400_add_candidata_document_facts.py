@@ -0,0 +1,72 @@
+"""add candidata document presence facts (has_* / *_size_bytes)
+
+Revision ID: 20261018_1400
+Revises: 20261018_1300
+Create Date: 2026-10-18 14:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1400"
+down_revision = "20261018_1300"
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_BATCH = 2000
+KINDS = ("depuracion", "perfil", "cedula1", "cedula2")
+
+
+def _cols(bind) -> set[str]:
+    return {c["name"] for c in inspect(bind).get_columns("candidatas")}
+
+
+def _backfill(bind) -> None:
+    # length() en el servidor: los blobs no viajan a la migración.
+    sets = ", ".join(
+        f"{kind}_size_bytes = COALESCE(length({kind}), 0), has_{kind} = COALESCE(length({kind}), 0) > 0"
+        for kind in KINDS
+    )
+    last_fila = 0
+    while True:
+        upto = bind.execute(
+            sa.text(
+                "SELECT max(fila) FROM (SELECT fila FROM candidatas WHERE fila > :last "
+                "ORDER BY fila LIMIT :lim) AS batch"
+            ),
+            {"last": last_fila, "lim": BACKFILL_BATCH},
+        ).scalar()
+        if upto is None:
+            break
+        bind.execute(
+            sa.text(f"UPDATE candidatas SET {sets} WHERE fila > :last AND fila <= :upto"),
+            {"last": last_fila, "upto": int(upto)},
+        )
+        last_fila = int(upto)
+
+
+def upgrade():
+    bind = op.get_bind()
+    cols = _cols(bind)
+    for kind in KINDS:
+        if f"has_{kind}" not in cols:
+            op.add_column("candidatas", sa.Column(f"has_{kind}", sa.Boolean(), nullable=True))
+        if f"{kind}_size_bytes" not in cols:
+            op.add_column("candidatas", sa.Column(f"{kind}_size_bytes", sa.Integer(), nullable=True))
+
+    _backfill(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    cols = _cols(bind)
+    for kind in reversed(KINDS):
+        if f"{kind}_size_bytes" in cols:
+            op.drop_column("candidatas", f"{kind}_size_bytes")
+        if f"has_{kind}" in cols:
+            op.drop_column("candidatas", f"has_{kind}")
@@ -0,0 +1,65 @@
+"""add solicitud_recommendation_jobs (cola durable de snapshots de recomendaciones)
+
+Revision ID: 20261018_1500
+Revises: 20261018_1400
+Create Date: 2026-10-18 15:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1500"
+down_revision = "20261018_1400"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "solicitud_recommendation_jobs" in inspect(bind).get_table_names():
+        return
+    op.create_table(
+        "solicitud_recommendation_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "run_id",
+            sa.Integer(),
+            sa.ForeignKey("solicitud_recommendation_runs.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("solicitud_id", sa.Integer(), nullable=False),
+        sa.Column("lane", sa.String(length=20), nullable=False, server_default=sa.text("'interactive'")),
+        sa.Column("priority", sa.SmallInteger(), nullable=False, server_default=sa.text("0")),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default=sa.text("'queued'")),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_by", sa.String(length=80), nullable=True),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("run_id", name="uq_sol_rec_jobs_run"),
+        sa.CheckConstraint("status IN ('queued','running','done','dead')", name="ck_sol_rec_jobs_status"),
+        sa.CheckConstraint("lane IN ('interactive','backfill')", name="ck_sol_rec_jobs_lane"),
+    )
+    op.create_index(
+        "ix_sol_rec_jobs_claim",
+        "solicitud_recommendation_jobs",
+        ["status", "priority", "available_at", "id"],
+    )
+    op.create_index("ix_solicitud_recommendation_jobs_solicitud_id", "solicitud_recommendation_jobs", ["solicitud_id"])
+    op.create_index("ix_solicitud_recommendation_jobs_created_at", "solicitud_recommendation_jobs", ["created_at"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "solicitud_recommendation_jobs" not in inspect(bind).get_table_names():
+        return
+    op.drop_index("ix_solicitud_recommendation_jobs_created_at", table_name="solicitud_recommendation_jobs")
+    op.drop_index("ix_solicitud_recommendation_jobs_solicitud_id", table_name="solicitud_recommendation_jobs")
+    op.drop_index("ix_sol_rec_jobs_claim", table_name="solicitud_recommendation_jobs")
+    op.drop_table("solicitud_recommendation_jobs")
@@ -0,0 +1,46 @@
+"""add candidata_match_profiles (rasgos de matching precalculados)
+
+Revision ID: 20261018_1600
+Revises: 20261018_1500
+Create Date: 2026-10-18 16:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1600"
+down_revision = "20261018_1500"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "candidata_match_profiles" in inspect(bind).get_table_names():
+        return
+    # Se llena con `flask candidatas-match-profiles rebuild` (y al vuelo desde el ranking).
+    op.create_table(
+        "candidata_match_profiles",
+        sa.Column(
+            "candidata_id",
+            sa.Integer(),
+            sa.ForeignKey("candidatas.fila", ondelete="CASCADE"),
+            primary_key=True,
+            autoincrement=False,
+        ),
+        sa.Column("profile_version", sa.SmallInteger(), nullable=False, server_default=sa.text("1")),
+        sa.Column("features", sa.JSON(), nullable=False),
+        sa.Column("compat_profile", sa.JSON(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "candidata_match_profiles" not in inspect(bind).get_table_names():
+        return
+    op.drop_table("candidata_match_profiles")
@@ -0,0 +1,54 @@
+"""add solicitud_matching_suggestions (top-k de matching materializado)
+
+Revision ID: 20261018_1700
+Revises: 20261018_1600
+Create Date: 2026-10-18 17:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1700"
+down_revision = "20261018_1600"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "solicitud_matching_suggestions" in inspect(bind).get_table_names():
+        return
+    # Se llena con `flask matching-suggestions precompute` (cron nocturno).
+    op.create_table(
+        "solicitud_matching_suggestions",
+        sa.Column(
+            "solicitud_id",
+            sa.Integer(),
+            sa.ForeignKey("solicitudes.id", ondelete="CASCADE"),
+            primary_key=True,
+            autoincrement=False,
+        ),
+        sa.Column("solicitud_fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("pool_bucket", sa.String(length=40), nullable=False),
+        sa.Column("pool_version", sa.BigInteger(), nullable=True),
+        sa.Column("top_k", sa.SmallInteger(), nullable=False),
+        sa.Column("items", sa.JSON(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_solicitud_matching_suggestions_computed_at",
+        "solicitud_matching_suggestions",
+        ["computed_at"],
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "solicitud_matching_suggestions" not in inspect(bind).get_table_names():
+        return
+    op.drop_index("ix_solicitud_matching_suggestions_computed_at", table_name="solicitud_matching_suggestions")
+    op.drop_table("solicitud_matching_suggestions")
@@ -0,0 +1,68 @@
+"""add domain_outbox.relay_partition (relay particionado por agregado)
+
+Revision ID: 20261018_1800
+Revises: 20261018_1700
+Create Date: 2026-10-18 18:00:00
+"""
+
+from __future__ import annotations
+
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1800"
+down_revision = "20261018_1700"
+branch_labels = None
+depends_on = None
+
+# Igual que models.DOMAIN_OUTBOX_PARTITIONS / domain_outbox_partition (no se importa el modelo aquí).
+_PARTITIONS = 64
+
+
+def _partition(aggregate_type, aggregate_id) -> int:
+    key = f"{aggregate_type or ''}:{aggregate_id if aggregate_id is not None else ''}"
+    return zlib.crc32(key.encode("utf-8")) % _PARTITIONS
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {c["name"] for c in inspect(bind).get_columns("domain_outbox")}
+    if "relay_partition" not in columns:
+        with op.batch_alter_table("domain_outbox", schema=None) as batch_op:
+            batch_op.add_column(sa.Column("relay_partition", sa.SmallInteger(), nullable=True))
+        op.create_index(
+            "ix_domain_outbox_partition_pending",
+            "domain_outbox",
+            ["relay_partition", "published_at", "created_at"],
+        )
+
+    # Solo las filas sin publicar necesitan partición; las publicadas quedan en NULL.
+    table = sa.table(
+        "domain_outbox",
+        sa.column("id", sa.BigInteger()),
+        sa.column("aggregate_type", sa.String()),
+        sa.column("aggregate_id", sa.String()),
+        sa.column("published_at", sa.DateTime()),
+        sa.column("relay_partition", sa.SmallInteger()),
+    )
+    rows = bind.execute(
+        sa.select(table.c.id, table.c.aggregate_type, table.c.aggregate_id)
+        .where(table.c.published_at.is_(None))
+        .where(table.c.relay_partition.is_(None))
+    ).fetchall()
+    for start in range(0, len(rows), 1000):
+        chunk = rows[start:start + 1000]
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam("row_id")).values(relay_partition=sa.bindparam("part")),
+            [{"row_id": r.id, "part": _partition(r.aggregate_type, r.aggregate_id)} for r in chunk],
+        )
+
+
+def downgrade():
+    op.drop_index("ix_domain_outbox_partition_pending", table_name="domain_outbox")
+    with op.batch_alter_table("domain_outbox", schema=None) as batch_op:
+        batch_op.drop_column("relay_partition")
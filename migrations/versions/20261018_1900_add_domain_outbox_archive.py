@@ -0,0 +1,71 @@
+"""add domain_outbox_archive (retención de domain_outbox)
+
+Revision ID: 20261018_1900
+Revises: 20261018_1800
+Create Date: 2026-10-18 19:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_1900"
+down_revision = "20261018_1800"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "domain_outbox_archive" not in inspect(bind).get_table_names():
+        if bind.dialect.name == "postgresql":
+            # Particionada por mes de published_at: la purga del archivo es un DROP de partición.
+            # `flask outbox-retention run` crea las particiones mensuales antes de archivar.
+            op.execute(
+                """
+                CREATE TABLE domain_outbox_archive (
+                    id BIGINT NOT NULL,
+                    published_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                    event_id VARCHAR(64) NOT NULL,
+                    event_type VARCHAR(80) NOT NULL,
+                    aggregate_type VARCHAR(80) NOT NULL,
+                    aggregate_id VARCHAR(64) NOT NULL,
+                    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                    archived_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                    record_gz BYTEA NOT NULL,
+                    PRIMARY KEY (id, published_at)
+                ) PARTITION BY RANGE (published_at)
+                """
+            )
+            op.execute("CREATE TABLE domain_outbox_archive_default PARTITION OF domain_outbox_archive DEFAULT")
+        else:
+            op.create_table(
+                "domain_outbox_archive",
+                sa.Column("id", sa.BigInteger(), nullable=False, autoincrement=False),
+                sa.Column("published_at", sa.DateTime(), nullable=False),
+                sa.Column("event_id", sa.String(length=64), nullable=False),
+                sa.Column("event_type", sa.String(length=80), nullable=False),
+                sa.Column("aggregate_type", sa.String(length=80), nullable=False),
+                sa.Column("aggregate_id", sa.String(length=64), nullable=False),
+                sa.Column("created_at", sa.DateTime(), nullable=False),
+                sa.Column("archived_at", sa.DateTime(), nullable=False),
+                sa.Column("record_gz", sa.LargeBinary(), nullable=False),
+                sa.PrimaryKeyConstraint("id", "published_at"),
+            )
+        op.create_index("ix_domain_outbox_archive_event_id", "domain_outbox_archive", ["event_id"])
+        op.create_index("ix_domain_outbox_archive_event_type", "domain_outbox_archive", ["event_type"])
+        op.create_index(
+            "ix_domain_outbox_archive_aggregate",
+            "domain_outbox_archive",
+            ["aggregate_type", "aggregate_id"],
+        )
+
+
+def downgrade():
+    op.drop_index("ix_domain_outbox_archive_aggregate", table_name="domain_outbox_archive")
+    op.drop_index("ix_domain_outbox_archive_event_type", table_name="domain_outbox_archive")
+    op.drop_index("ix_domain_outbox_archive_event_id", table_name="domain_outbox_archive")
+    op.drop_table("domain_outbox_archive")
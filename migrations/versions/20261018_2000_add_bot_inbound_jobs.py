@@ -0,0 +1,68 @@
+"""add bot_inbound_jobs (procesamiento diferido del webhook de WhatsApp)
+
+Revision ID: 20261018_2000
+Revises: 20261018_1900
+Create Date: 2026-10-18 20:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = "20261018_2000"
+down_revision = "20261018_1900"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "bot_inbound_jobs" in inspect(bind).get_table_names():
+        return
+    op.create_table(
+        "bot_inbound_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "inbound_message_id",
+            sa.Integer(),
+            sa.ForeignKey("bot_messages.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "conversation_id",
+            sa.Integer(),
+            sa.ForeignKey("bot_conversations.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default=sa.text("'queued'")),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("payload_json", sa.JSON(), nullable=False, server_default=sa.text("'{}'")),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_by", sa.String(length=80), nullable=True),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("inbound_message_id", name="uq_bot_inbound_jobs_message"),
+        sa.CheckConstraint("status IN ('queued','running','done','dead')", name="ck_bot_inbound_jobs_status"),
+    )
+    op.create_index("ix_bot_inbound_jobs_claim", "bot_inbound_jobs", ["status", "available_at", "id"])
+    op.create_index(
+        "ix_bot_inbound_jobs_conversation_status",
+        "bot_inbound_jobs",
+        ["conversation_id", "status", "id"],
+    )
+    op.create_index("ix_bot_inbound_jobs_created_at", "bot_inbound_jobs", ["created_at"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "bot_inbound_jobs" not in inspect(bind).get_table_names():
+        return
+    op.drop_index("ix_bot_inbound_jobs_created_at", table_name="bot_inbound_jobs")
+    op.drop_index("ix_bot_inbound_jobs_conversation_status", table_name="bot_inbound_jobs")
+    op.drop_index("ix_bot_inbound_jobs_claim", table_name="bot_inbound_jobs")
+    op.drop_table("bot_inbound_jobs")
@@ -2,19 +2,22 @@ import hashlib
 import os
 import re
 import uuid
+import zlib
 from datetime import datetime
 from typing import Optional, Dict
 
 from flask_login import UserMixin
 from sqlalchemy import CheckConstraint, Enum as SAEnum, LargeBinary, event, inspect as sa_inspect, text
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
-from sqlalchemy.orm import synonym
+from sqlalchemy.orm import attributes, deferred, synonym
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from config_app import db
 from utils.secrets_manager import get_secret
 from utils.timezone import utc_now_naive
 from utils.client_contact_norm import nullable_norm_email, nullable_norm_phone_rd
+from utils.candidata_search_norm import nullable_digits, nullable_search_text
+from utils.candidata_readiness import DOCUMENT_FACT_KINDS, blob_size
 from services.phone_identity_service import normalize_phone_to_e164
 
 
@@ -52,6 +55,21 @@ class Candidata(db.Model):
         comment="solo dígitos; usada para prevenir duplicados en nuevas altas"
     )
     codigo                          = db.Column(db.String(50), unique=True, index=True)
+    nombre_norm                     = db.Column(
+        db.String(200),
+        nullable=True,
+        comment="nombre_completo en minúsculas, sin acentos ni puntuación; mantenido por eventos del modelo"
+    )
+    cedula_digits                   = db.Column(
+        db.String(50),
+        nullable=True,
+        comment="solo dígitos de cedula para búsqueda parcial"
+    )
+    telefono_digits                 = db.Column(
+        db.String(50),
+        nullable=True,
+        comment="solo dígitos de numero_telefono para búsqueda parcial"
+    )
     medio_inscripcion               = db.Column(db.String(100))
     origen_registro                 = db.Column(
         db.String(32),
@@ -78,11 +96,23 @@ class Candidata(db.Model):
     porciento                       = db.Column(db.Numeric(8, 2))
     calificacion                    = db.Column(db.String(100))
     entrevista                      = db.Column(db.Text)
-    foto_perfil                     = db.Column(LargeBinary, nullable=True, comment="Foto de la candidata para su perfil")
-    depuracion                      = db.Column(LargeBinary)
-    perfil                          = db.Column(LargeBinary)
-    cedula1                         = db.Column(LargeBinary)
-    cedula2                         = db.Column(LargeBinary)
+    # Blobs legados: diferidos para que cargar una Candidata completa no arrastre
+    # los archivos; el contenido servido vive en ``candidata_documentos`` + blob store.
+    foto_perfil                     = deferred(db.Column(LargeBinary, nullable=True, comment="Foto de la candidata para su perfil"), group="documentos")
+    depuracion                      = deferred(db.Column(LargeBinary), group="documentos")
+    perfil                          = deferred(db.Column(LargeBinary), group="documentos")
+    cedula1                         = deferred(db.Column(LargeBinary), group="documentos")
+    cedula2                         = deferred(db.Column(LargeBinary), group="documentos")
+    # Hechos de presencia/tamaño de los documentos requeridos: readiness y matching
+    # los leen sin tocar los blobs. NULL = aún sin calcular (ver ``candidatas-blobs facts-backfill``).
+    has_depuracion                  = db.Column(db.Boolean, nullable=True)
+    has_perfil                      = db.Column(db.Boolean, nullable=True)
+    has_cedula1                     = db.Column(db.Boolean, nullable=True)
+    has_cedula2                     = db.Column(db.Boolean, nullable=True)
+    depuracion_size_bytes           = db.Column(db.Integer, nullable=True)
+    perfil_size_bytes               = db.Column(db.Integer, nullable=True)
+    cedula1_size_bytes              = db.Column(db.Integer, nullable=True)
+    cedula2_size_bytes              = db.Column(db.Integer, nullable=True)
     referencias_laboral             = db.Column(db.Text)
     referencias_familiares          = db.Column(db.Text)
     disponibilidad_inicio           = db.Column(db.String(80), nullable=True)
@@ -276,16 +306,115 @@ def _sync_cedula_norm_digits(target: "Candidata") -> None:
     digits = _cedula_digits_only(getattr(target, "cedula", None))
     target.cedula_norm_digits = digits if len(digits) == 11 else None
     target.telefono_e164 = normalize_phone_to_e164(getattr(target, "numero_telefono", None), default_country="DO")
+    target.nombre_norm = nullable_search_text(getattr(target, "nombre_completo", None))
+    target.cedula_digits = nullable_digits(getattr(target, "cedula", None))
+    target.telefono_digits = nullable_digits(getattr(target, "numero_telefono", None))
+
+
+def _sync_document_facts(target: "Candidata", *, inserting: bool) -> None:
+    for kind in DOCUMENT_FACT_KINDS:
+        # Sin inicializar: un blob diferido no cargado no cambió y no se debe leer de la BD.
+        hist = attributes.get_history(target, kind, passive=attributes.PASSIVE_NO_INITIALIZE)
+        if hist.added:
+            value = hist.added[0]
+        elif inserting or hist.deleted:
+            value = target.__dict__.get(kind)
+        else:
+            continue
+        size = blob_size(value)
+        setattr(target, f"has_{kind}", size > 0)
+        setattr(target, f"{kind}_size_bytes", size)
 
 
 @event.listens_for(Candidata, "before_insert")
 def _candidata_before_insert(mapper, connection, target):  # pragma: no cover
     _sync_cedula_norm_digits(target)
+    _sync_document_facts(target, inserting=True)
 
 
 @event.listens_for(Candidata, "before_update")
 def _candidata_before_update(mapper, connection, target):  # pragma: no cover
     _sync_cedula_norm_digits(target)
+    _sync_document_facts(target, inserting=False)
+
+
+class CandidataDocumento(db.Model):
+    """Metadatos de un documento de candidata guardado en el blob store (clave = sha256)."""
+    __tablename__ = "candidata_documentos"
+    __table_args__ = (
+        db.UniqueConstraint("candidata_id", "kind", name="uq_candidata_documentos_candidata_kind"),
+        db.Index("ix_candidata_documentos_sha256", "sha256"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    candidata_id = db.Column(
+        db.Integer,
+        db.ForeignKey("candidatas.fila", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    kind = db.Column(db.String(20), nullable=False, comment="foto_perfil|depuracion|perfil|cedula1|cedula2")
+    sha256 = db.Column(db.String(64), nullable=False)
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0, server_default=text("0"))
+    mime_type = db.Column(db.String(80), nullable=False, default="application/octet-stream")
+    storage_backend = db.Column(db.String(20), nullable=False, default="local")
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive, onupdate=utc_now_naive)
+
+
+class CandidataFotoDerivada(db.Model):
+    """Miniatura (WebP/JPEG, tamaño fijo) derivada de una foto de candidata.
+
+    ``source_sha256`` es el hash del original: si cambia la foto, la miniatura
+    queda obsoleta y se regenera. ``data`` solo se usa cuando no hay blob store.
+    """
+    __tablename__ = "candidata_fotos_derivadas"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "candidata_id", "source_kind", "variant", "format",
+            name="uq_candidata_fotos_derivadas_variant",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    candidata_id = db.Column(
+        db.Integer,
+        db.ForeignKey("candidatas.fila", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    source_kind = db.Column(db.String(20), nullable=False, comment="perfil|foto_perfil")
+    source_sha256 = db.Column(db.String(64), nullable=False)
+    variant = db.Column(db.String(20), nullable=False, comment="thumb|card|detail")
+    format = db.Column(db.String(10), nullable=False, comment="webp|jpeg")
+    width = db.Column(db.Integer, nullable=False, default=0)
+    height = db.Column(db.Integer, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    mime_type = db.Column(db.String(40), nullable=False)
+    storage_backend = db.Column(db.String(20), nullable=False, default="db")
+    data = deferred(db.Column(db.LargeBinary, nullable=True))
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
+
+
+class CandidataMatchProfile(db.Model):
+    """Rasgos de matching ya normalizados de una candidata (tokens, edad, años, perfil del test).
+
+    Lo mantiene ``utils.candidata_match_profiles``: se recalcula al editar la
+    candidata y ``profile_version`` distinta de la actual cuenta como ausente.
+    """
+    __tablename__ = "candidata_match_profiles"
+
+    candidata_id = db.Column(
+        db.Integer,
+        db.ForeignKey("candidatas.fila", ondelete="CASCADE"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    profile_version = db.Column(db.SmallInteger, nullable=False, default=1, server_default=text("1"))
+    features = db.Column(db.JSON, nullable=False, default=dict)
+    compat_profile = db.Column(db.JSON, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
 # ─────────────────────────────────────────────────────────────
 # ENTREVISTAS ESTRUCTURADAS (NUEVO – NO ROMPE LO EXISTENTE)
 # ─────────────────────────────────────────────────────────────
@@ -2566,6 +2695,60 @@ class SolicitudRecommendationSelection(db.Model):
     candidata = db.relationship("Candidata", lazy="joined")
 
 
+class SolicitudRecommendationJob(db.Model):
+    """Cola durable de generación de snapshots (un job por run; lo consume ``flask recommendation-queue run``)."""
+    __tablename__ = "solicitud_recommendation_jobs"
+    __table_args__ = (
+        db.UniqueConstraint("run_id", name="uq_sol_rec_jobs_run"),
+        CheckConstraint(
+            "status IN ('queued','running','done','dead')",
+            name="ck_sol_rec_jobs_status",
+        ),
+        CheckConstraint("lane IN ('interactive','backfill')", name="ck_sol_rec_jobs_lane"),
+        db.Index("ix_sol_rec_jobs_claim", "status", "priority", "available_at", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    run_id = db.Column(
+        db.Integer,
+        db.ForeignKey("solicitud_recommendation_runs.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    solicitud_id = db.Column(db.Integer, nullable=False, index=True)
+    lane = db.Column(db.String(20), nullable=False, default="interactive", server_default=text("'interactive'"))
+    priority = db.Column(db.SmallInteger, nullable=False, default=0, server_default=text("0"))
+    status = db.Column(db.String(20), nullable=False, default="queued", server_default=text("'queued'"))
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    available_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
+    locked_by = db.Column(db.String(80), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+class SolicitudMatchingSuggestion(db.Model):
+    """Top-k de matching materializado por solicitud (``flask matching-suggestions precompute``).
+
+    Solo se sirve si ``solicitud_fingerprint`` y ``pool_version`` siguen
+    coincidiendo; si no, las pantallas recalculan en vivo.
+    """
+    __tablename__ = "solicitud_matching_suggestions"
+
+    solicitud_id = db.Column(
+        db.Integer,
+        db.ForeignKey("solicitudes.id", ondelete="CASCADE"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    solicitud_fingerprint = db.Column(db.String(64), nullable=False)
+    pool_bucket = db.Column(db.String(40), nullable=False)
+    pool_version = db.Column(db.BigInteger, nullable=True)
+    top_k = db.Column(db.SmallInteger, nullable=False)
+    items = db.Column(db.JSON, nullable=False, default=list)
+    computed_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive, index=True)
+
+
 class ChatConversation(db.Model):
     __tablename__ = "chat_conversations"
     __table_args__ = (
@@ -2878,6 +3061,33 @@ class BotSandboxOutbound(db.Model):
     message = db.relationship("BotMessage", lazy="select")
 
 
+class BotInboundJob(db.Model):
+    """Procesamiento diferido de un mensaje entrante ya guardado por el webhook (``flask bot-inbound run``)."""
+    __tablename__ = "bot_inbound_jobs"
+    __table_args__ = (
+        db.UniqueConstraint("inbound_message_id", name="uq_bot_inbound_jobs_message"),
+        CheckConstraint(
+            "status IN ('queued','running','done','dead')",
+            name="ck_bot_inbound_jobs_status",
+        ),
+        db.Index("ix_bot_inbound_jobs_claim", "status", "available_at", "id"),
+        db.Index("ix_bot_inbound_jobs_conversation_status", "conversation_id", "status", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    inbound_message_id = db.Column(db.Integer, db.ForeignKey("bot_messages.id", ondelete="CASCADE"), nullable=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey("bot_conversations.id", ondelete="CASCADE"), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued", server_default=text("'queued'"))
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    payload_json = db.Column(db.JSON, nullable=False, default=dict, server_default=text("'{}'"))
+    available_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
+    locked_by = db.Column(db.String(80), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
 class BotSandboxReviewQueue(db.Model):
     __tablename__ = "bot_sandbox_review_queue"
     __table_args__ = (
@@ -2983,11 +3193,26 @@ class RequestIdempotencyKey(db.Model):
     last_seen_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive, index=True)
 
 
+DOMAIN_OUTBOX_PARTITIONS = 64
+
+
+def domain_outbox_partition(aggregate_type: Optional[str], aggregate_id) -> int:
+    """Partición fija del relay para ``aggregate_type:aggregate_id`` (todas las versiones del agregado juntas)."""
+    key = f"{aggregate_type or ''}:{aggregate_id if aggregate_id is not None else ''}"
+    return zlib.crc32(key.encode("utf-8")) % DOMAIN_OUTBOX_PARTITIONS
+
+
+def _domain_outbox_partition_default(context) -> int:
+    params = context.get_current_parameters()
+    return domain_outbox_partition(params.get("aggregate_type"), params.get("aggregate_id"))
+
+
 class DomainOutbox(db.Model):
     __tablename__ = "domain_outbox"
     __table_args__ = (
         db.Index("ix_domain_outbox_published_created", "published_at", "created_at"),
         db.Index("ix_domain_outbox_aggregate", "aggregate_type", "aggregate_id"),
+        db.Index("ix_domain_outbox_partition_pending", "relay_partition", "published_at", "created_at"),
     )
 
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
@@ -3012,9 +3237,30 @@ class DomainOutbox(db.Model):
     quarantined_at = db.Column(db.DateTime, nullable=True, index=True)
     quarantine_reason = db.Column(db.String(80), nullable=True)
     published_at = db.Column(db.DateTime, nullable=True, index=True)
+    relay_partition = db.Column(db.SmallInteger, nullable=True, default=_domain_outbox_partition_default)
     created_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive, index=True)
 
 
+class DomainOutboxArchive(db.Model):
+    """Eventos publicados que salieron de ``domain_outbox`` por retención (fila completa comprimida)."""
+
+    __tablename__ = "domain_outbox_archive"
+    __table_args__ = (
+        db.Index("ix_domain_outbox_archive_aggregate", "aggregate_type", "aggregate_id"),
+    )
+
+    # En Postgres la tabla está particionada por mes de ``published_at``: la PK debe incluirla.
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    published_at = db.Column(db.DateTime, primary_key=True)
+    event_id = db.Column(db.String(64), nullable=False, index=True)
+    event_type = db.Column(db.String(80), nullable=False, index=True)
+    aggregate_type = db.Column(db.String(80), nullable=False)
+    aggregate_id = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=utc_now_naive)
+    record_gz = db.Column(LargeBinary, nullable=False)
+
+
 class OutboxConsumerReceipt(db.Model):
     __tablename__ = "outbox_consumer_receipts"
     __table_args__ = (
@@ -298,6 +298,71 @@ def _binary_image_mimetype(blob) -> Optional[str]:
     return None
 
 
+def _perfil_image_mimetype(candidata, perfil_mimes: Optional[dict] = None) -> Optional[str]:
+    """MIME de la foto ``perfil`` sin leer el blob (metadatos o primeros bytes)."""
+    loaded = getattr(candidata, "__dict__", {}) or {}
+    if perfil_mimes is None and "perfil" in loaded:
+        return _binary_image_mimetype(loaded.get("perfil"))
+    fila = int(getattr(candidata, "fila", 0) or 0)
+    if perfil_mimes is None:
+        from core.services.candidata_documentos import candidata_document_mimes
+
+        try:
+            perfil_mimes = candidata_document_mimes([fila], "perfil")
+        except Exception:
+            return None
+    mimetype = str(perfil_mimes.get(fila) or "")
+    return mimetype if mimetype.startswith("image/") else None
+
+
+def _perfil_mimes_for_rows(rows) -> dict:
+    from core.services.candidata_documentos import candidata_document_mimes
+
+    try:
+        return candidata_document_mimes([int(getattr(cand, "fila", 0) or 0) for cand, _ficha in (rows or [])], "perfil")
+    except Exception:
+        return {}
+
+
+def _perfil_image_url(
+    candidata,
+    *,
+    token: str,
+    perfil_versions: Optional[dict] = None,
+    size: Optional[str] = None,
+) -> str:
+    """URL de la foto con ``v=<hash>`` cuando se conoce (cache immutable en el navegador).
+
+    ``size`` pide una miniatura (``thumb``/``card``/``detail``) en vez del original.
+    """
+    from core.services.candidata_documentos import candidata_document_versions
+    from core.services.candidata_thumbnails import VARIANT_PARAM
+    from utils.media_serving import VERSION_PARAM, media_version
+
+    fila = int(getattr(candidata, "fila", 0) or 0)
+    if perfil_versions is None:
+        try:
+            perfil_versions = candidata_document_versions([fila], "perfil")
+        except Exception:
+            perfil_versions = {}
+    params = {"token": token, "candidata_id": fila}
+    if size:
+        params[VARIANT_PARAM] = size
+    version = media_version(perfil_versions.get(fila))
+    if version:
+        params[VERSION_PARAM] = version
+    return url_for("public.private_store_profile_image", **params)
+
+
+def _perfil_versions_for_rows(rows) -> dict:
+    from core.services.candidata_documentos import candidata_document_versions
+
+    try:
+        return candidata_document_versions([int(getattr(cand, "fila", 0) or 0) for cand, _ficha in (rows or [])], "perfil")
+    except Exception:
+        return {}
+
+
 def _private_store_detail_payload(candidata, ficha_web, *, token: str):
     payload = _domesticas_store_public_payload(candidata, ficha_web=ficha_web)
     estado_publico = (payload.get("estado_publico") or "disponible").strip().lower()
@@ -308,10 +373,9 @@ def _private_store_detail_payload(candidata, ficha_web, *, token: str):
     tags_publicos = [x.strip() for x in tags_publicos_raw.split(",") if x and x.strip()]
     disponibilidad_texto = "Disponible inmediata" if bool(payload.get("disponible_inmediato")) else "Disponibilidad sujeta a coordinación"
     ciudad_sector = " · ".join([x for x in [(payload.get("ciudad_publica") or "").strip(), (payload.get("sector_publico") or "").strip()] if x]).strip()
-    perfil_blob = getattr(candidata, "perfil", None)
     perfil_url = None
-    if _binary_image_mimetype(perfil_blob):
-        perfil_url = url_for("public.private_store_profile_image", token=token, candidata_id=int(getattr(candidata, "fila", 0) or 0))
+    if _perfil_image_mimetype(candidata):
+        perfil_url = _perfil_image_url(candidata, token=token, size="detail")
     foto_display_url = perfil_url
     payload.update({
         "edad_publica": payload.get("edad_publica") or "No especificada",
@@ -332,16 +396,18 @@ def _private_store_detail_payload(candidata, ficha_web, *, token: str):
     return payload
 
 
-def _private_store_card_payload(candidata, ficha_web, *, token: str):
+def _private_store_card_payload(
+    candidata,
+    ficha_web,
+    *,
+    token: str,
+    perfil_mimes: Optional[dict] = None,
+    perfil_versions: Optional[dict] = None,
+):
     payload = _domesticas_store_public_payload(candidata, ficha_web=ficha_web)
-    perfil_blob = getattr(candidata, "perfil", None)
     perfil_url = None
-    if _binary_image_mimetype(perfil_blob):
-        perfil_url = url_for(
-            "public.private_store_profile_image",
-            token=token,
-            candidata_id=int(getattr(candidata, "fila", 0) or 0),
-        )
+    if _perfil_image_mimetype(candidata, perfil_mimes):
+        perfil_url = _perfil_image_url(candidata, token=token, perfil_versions=perfil_versions, size="card")
     payload["foto_publica_url"] = perfil_url
     return payload
 
@@ -1060,46 +1126,38 @@ def domesticas_store_list():
     per_page = request.args.get("per_page", 12, type=int)
     per_page = per_page if per_page in (12, 24, 36) else 12
 
-    query = (
-        db.session.query(Candidata, CandidataWeb)
-        .join(CandidataWeb, Candidata.fila == CandidataWeb.candidata_id)
-        .filter(CandidataWeb.visible.is_(True))
-        .filter(CandidataWeb.estado_publico == "disponible")
-        .order_by(
-            db.case((CandidataWeb.orden_lista.is_(None), 1), else_=0).asc(),
-            CandidataWeb.orden_lista.asc(),
-            CandidataWeb.fecha_ultima_actualizacion.desc(),
-            Candidata.fila.desc(),
-        )
+    from core.services.store_facets import store_listing
+    from utils.store_facets import StoreFilters
+
+    # Total, página y facetas salen del snapshot en backplane; solo se leen de
+    # la BD las filas de la página (revalidando visibilidad por si el snapshot
+    # quedó atrasado).
+    listing = store_listing(
+        StoreFilters(
+            q=q,
+            ciudad=ciudad,
+            modalidad=modalidad,
+            tag=tag,
+            disponible_inmediato=disponible_inmediato in {"1", "true", "si", "sí", "yes"},
+        ),
+        page=page,
+        per_page=per_page,
     )
-
-    if q:
-        like = f"%{q}%"
-        query = query.filter(
-            db.or_(
-                CandidataWeb.nombre_publico.ilike(like),
-                CandidataWeb.tags_publicos.ilike(like),
-                CandidataWeb.ciudad_publica.ilike(like),
-                CandidataWeb.sector_publico.ilike(like),
-                CandidataWeb.modalidad_publica.ilike(like),
+    total = listing.total
+    items = []
+    if listing.page_ids:
+        by_id = {
+            int(cand.fila): (cand, ficha)
+            for cand, ficha in (
+                db.session.query(Candidata, CandidataWeb)
+                .join(CandidataWeb, Candidata.fila == CandidataWeb.candidata_id)
+                .filter(Candidata.fila.in_(listing.page_ids))
+                .filter(CandidataWeb.visible.is_(True))
+                .filter(CandidataWeb.estado_publico == "disponible")
+                .all()
             )
-        )
-    if ciudad:
-        query = query.filter(CandidataWeb.ciudad_publica.ilike(f"%{ciudad}%"))
-    if modalidad:
-        query = query.filter(CandidataWeb.modalidad_publica.ilike(f"%{modalidad}%"))
-    if tag:
-        query = query.filter(CandidataWeb.tags_publicos.ilike(f"%{tag}%"))
-    if disponible_inmediato in {"1", "true", "si", "sí", "yes"}:
-        query = query.filter(CandidataWeb.disponible_inmediato.is_(True))
-
-    total = query.count()
-    items = (
-        query
-        .limit(per_page)
-        .offset((page - 1) * per_page)
-        .all()
-    )
+        }
+        items = [by_id[fid] for fid in listing.page_ids if fid in by_id]
 
     pages = (total + per_page - 1) // per_page if per_page else 1
     pages = max(1, pages)
@@ -1110,18 +1168,11 @@ def domesticas_store_list():
     selected_set = set(selected_ids)
     cards = []
     for cand, ficha in (items or []):
-        payload = _private_store_card_payload(cand, ficha_web=ficha, token=token)
+        # Tienda abierta: solo la foto pública de la ficha (la de perfil va por token).
+        payload = _domesticas_store_public_payload(cand, ficha_web=ficha)
         payload["is_selected"] = int(payload["id"]) in selected_set
         cards.append(payload)
 
-    base_options_q = (
-        db.session.query(CandidataWeb)
-        .filter(CandidataWeb.visible.is_(True))
-        .filter(CandidataWeb.estado_publico == "disponible")
-    )
-    ciudades = sorted({(row.ciudad_publica or "").strip() for row in base_options_q if (row.ciudad_publica or "").strip()})
-    modalidades = sorted({(row.modalidad_publica or "").strip() for row in base_options_q if (row.modalidad_publica or "").strip()})
-
     return render_template(
         "public/domesticas_store_list.html",
         cards=cards,
@@ -1139,8 +1190,14 @@ def domesticas_store_list():
         modalidad=modalidad,
         tag=tag,
         disponible_inmediato=disponible_inmediato,
-        ciudades=ciudades,
-        modalidades=modalidades,
+        ciudades=listing.opciones_ciudades,
+        modalidades=listing.opciones_modalidades,
+        facetas={
+            "ciudades": listing.ciudades,
+            "modalidades": listing.modalidades,
+            "tags": listing.tags,
+            "disponible_inmediato": listing.disponible_inmediato,
+        },
     )
 
 
@@ -1186,7 +1243,18 @@ def mi_seleccion_list():
     valid_ids = [int(getattr(cand, "fila", 0) or 0) for cand, _ficha in rows]
     if valid_ids != selected_ids:
         _mi_seleccion_set_ids(valid_ids)
-    cards = [_private_store_card_payload(cand, ficha_web=ficha, token=token) for cand, ficha in rows]
+    perfil_mimes = _perfil_mimes_for_rows(rows)
+    perfil_versions = _perfil_versions_for_rows(rows)
+    cards = [
+        _private_store_card_payload(
+            cand,
+            ficha_web=ficha,
+            token=token,
+            perfil_mimes=perfil_mimes,
+            perfil_versions=perfil_versions,
+        )
+        for cand, ficha in rows
+    ]
     return render_template(
         "public/mi_seleccion.html",
         cards=cards,
@@ -1380,8 +1448,16 @@ def private_store_list(token: str):
     selected_ids = _private_store_get_ids(int(catalogo.id))
     selected_set = set(selected_ids)
     cards = []
+    perfil_mimes = _perfil_mimes_for_rows(items)
+    perfil_versions = _perfil_versions_for_rows(items)
     for cand, ficha in (items or []):
-        payload = _private_store_card_payload(cand, ficha_web=ficha, token=token)
+        payload = _private_store_card_payload(
+            cand,
+            ficha_web=ficha,
+            token=token,
+            perfil_mimes=perfil_mimes,
+            perfil_versions=perfil_versions,
+        )
         payload["is_selected"] = int(payload["id"]) in selected_set
         cards.append(payload)
 
@@ -1482,15 +1558,11 @@ def private_store_profile_image(token: str, candidata_id: int):
     if not row:
         abort(404)
     candidata, _ficha = row
-    blob = getattr(candidata, "perfil", None)
-    mimetype = _binary_image_mimetype(blob)
-    if not mimetype:
-        abort(404)
+    from core.services.candidata_thumbnails import VARIANT_PARAM, serve_candidata_photo
 
-    resp = make_response(bytes(blob))
-    resp.headers["Content-Type"] = mimetype
-    resp.headers["Cache-Control"] = "private, max-age=300"
-    resp.headers["X-Content-Type-Options"] = "nosniff"
+    resp = serve_candidata_photo(candidata, "perfil", (request.args.get(VARIANT_PARAM) or "").strip() or None)
+    if resp is None:
+        abort(404)
     return resp
 
 
@@ -1547,7 +1619,18 @@ def private_store_selection_list(token: str):
     valid_ids = [int(getattr(cand, "fila", 0) or 0) for cand, _ficha in rows]
     if valid_ids != selected_ids:
         _private_store_set_ids(int(catalogo.id), valid_ids)
-    cards = [_private_store_card_payload(cand, ficha_web=ficha, token=token) for cand, ficha in rows]
+    perfil_mimes = _perfil_mimes_for_rows(rows)
+    perfil_versions = _perfil_versions_for_rows(rows)
+    cards = [
+        _private_store_card_payload(
+            cand,
+            ficha_web=ficha,
+            token=token,
+            perfil_mimes=perfil_mimes,
+            perfil_versions=perfil_versions,
+        )
+        for cand, ficha in rows
+    ]
     return render_template(
         "private_store/store_selection.html",
         catalogo=catalogo,
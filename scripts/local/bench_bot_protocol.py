@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark del motor de protocolo del bot (services/bot_protocol_service.py).
+
+Corre ``detect_expected_answer`` + ``extract_step_entities`` para cada texto
+del corpus contra cada etapa del protocolo y reporta mensajes/segundo.
+
+Corpus:
+- ``--from-db``: textos entrantes grabados en ``bot_messages`` (inbound);
+- ``--corpus archivo``: un texto por línea (``STEP_CODE<TAB>texto`` fija la etapa);
+- por defecto, una muestra fija de respuestas reales típicas.
+
+``--baseline-rev`` carga la versión del servicio en esa revisión de git y la
+mide con el mismo corpus para comparar.
+
+Uso:
+  venv/bin/python scripts/local/bench_bot_protocol.py
+  venv/bin/python scripts/local/bench_bot_protocol.py --from-db --limit 5000 --baseline-rev HEAD~1
+  venv/bin/python scripts/local/bench_bot_protocol.py --protocol /ruta/protocolo.json --rounds 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SAMPLE_TEXTS = (
+    "hola",
+    "buenas tardes",
+    "si soy yo",
+    "Sí, quiero trabajar",
+    "no soy yo, numero equivocado",
+    "me llamo carmen rosario y tengo 32 años",
+    "yulisa 28 santiago salida diaria",
+    "tengo veinticinco anos",
+    "mi cedula es 031-1234567-8",
+    "vivo en gurabo, santiago",
+    "soy de puerto plata centro",
+    "prefiero salida diaria",
+    "dormida si",
+    "voy en concho, ruta k",
+    "mi ruta es la a",
+    "se cocinar, limpiar y cuidar niños",
+    "no tengo experiencia",
+    "mi jefa anterior doña marta 8095551234",
+    "no quiero dar referencias",
+    "si acepto 25%",
+    "ta bien",
+    "si acepto, pero no el 25",
+    "que es esto?",
+    "no entiendo, explicame",
+    "vendo tenis baratos promo",
+    "perdon, tengo 29",
+)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark del motor de protocolo del bot")
+    parser.add_argument("--corpus", default="", help="Archivo con un texto por línea (opcional STEP_CODE<TAB>texto).")
+    parser.add_argument("--from-db", action="store_true", help="Usa textos entrantes de bot_messages.")
+    parser.add_argument("--limit", type=int, default=5000, help="Máximo de textos leídos de la BD.")
+    parser.add_argument("--rounds", type=int, default=5, help="Repeticiones del corpus completo.")
+    parser.add_argument("--protocol", default="", help="Ruta del JSON de protocolo (default DATA_PATH).")
+    parser.add_argument("--baseline-rev", default="", help="Revisión git del servicio a comparar (p. ej. HEAD~1).")
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+def _load_corpus(args: argparse.Namespace) -> list[tuple[str | None, str]]:
+    if args.corpus:
+        out = []
+        for line in Path(args.corpus).read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            step, sep, text = line.partition("\t")
+            out.append((step.strip().upper(), text) if sep else (None, line))
+        return out
+    if args.from_db:
+        from app import app as flask_app  # noqa: E402
+        from models import BotMessage  # noqa: E402
+
+        with flask_app.app_context():
+            rows = (
+                BotMessage.query
+                .with_entities(BotMessage.text_body)
+                .filter(BotMessage.direction == "inbound", BotMessage.text_body.isnot(None))
+                .order_by(BotMessage.id.desc())
+                .limit(max(1, int(args.limit)))
+                .all()
+            )
+        return [(None, str(text)) for (text,) in rows if str(text or "").strip()]
+    return [(None, text) for text in SAMPLE_TEXTS]
+
+
+def _load_module(name: str, path: Path, protocol: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    if protocol:
+        module.DATA_PATH = Path(protocol)
+    return module
+
+
+def _baseline_module(rev: str, protocol: str):
+    source = subprocess.run(
+        ["git", "show", f"{rev}:services/bot_protocol_service.py"],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    tmp = Path(tempfile.mkdtemp(prefix="bench_bot_protocol_")) / "bot_protocol_service_baseline.py"
+    tmp.write_text(source, encoding="utf-8")
+    return _load_module("bot_protocol_service_baseline", tmp, protocol)
+
+
+def _run(module, corpus: list[tuple[str | None, str]], rounds: int) -> dict:
+    step_codes = [str(step["step_code"]) for step in module.load_protocol()["steps"]]
+    pairs = [(step, text) for fixed, text in corpus for step in ([fixed] if fixed else step_codes)]
+    matched = 0
+    started = time.perf_counter()
+    for _ in range(max(1, rounds)):
+        for step, text in pairs:
+            if module.detect_expected_answer(step, text).get("matched"):
+                matched += 1
+            module.extract_step_entities(step, text)
+    elapsed = max(1e-9, time.perf_counter() - started)
+    calls = len(pairs) * max(1, rounds)
+    return {
+        "texts": len(corpus),
+        "pairs": len(pairs),
+        "calls": calls,
+        "matched": matched,
+        "elapsed_s": round(elapsed, 3),
+        "msgs_per_sec": round(calls / elapsed, 1),
+        "us_per_msg": round(elapsed / calls * 1e6, 1),
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    corpus = _load_corpus(args)
+    if not corpus:
+        print("corpus vacío")
+        return 1
+    results = {}
+    if args.baseline_rev:
+        results["baseline"] = _run(_baseline_module(args.baseline_rev, args.protocol), corpus, args.rounds)
+    results["current"] = _run(
+        _load_module("bot_protocol_service_current", ROOT / "services" / "bot_protocol_service.py", args.protocol),
+        corpus,
+        args.rounds,
+    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    for mode, row in results.items():
+        print(
+            f"  {mode:8s} texts={row['texts']} pairs={row['pairs']} calls={row['calls']} "
+            f"elapsed={row['elapsed_s']}s msgs_per_sec={row['msgs_per_sec']} us_per_msg={row['us_per_msg']} "
+            f"matched={row['matched']}"
+        )
+    if "baseline" in results:
+        ratio = results["current"]["msgs_per_sec"] / max(1e-9, results["baseline"]["msgs_per_sec"])
+        print(f"  speedup={ratio:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark local del gateway SSE asíncrono (utils/live_sse_gateway.py).
+
+Abre N conexiones SSE reales (sockets TCP locales, repartidas en varios
+procesos cliente) contra un único proceso gateway, publica M eventos en el
+hub y mide la latencia de entrega por evento y conexión (p50/p95/p99). La
+autorización se reemplaza por una que acepta todo para medir solo el fan-out.
+
+Uso:
+  venv/bin/python scripts/local/bench_live_sse_gateway.py --connections 2000 --events 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils.live_sse_gateway import ADMIN_STREAM_PATH, AUDIENCE_STAFF, GatewayGrant, LiveSseGateway  # noqa: E402
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark del gateway SSE asíncrono")
+    parser.add_argument("--connections", type=int, default=1000, help="Conexiones SSE simultáneas.")
+    parser.add_argument("--events", type=int, default=40, help="Eventos a publicar.")
+    parser.add_argument("--interval-ms", type=float, default=50.0, help="Pausa entre eventos.")
+    parser.add_argument("--client-procs", type=int, default=4, help="Procesos cliente que abren las conexiones.")
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+def _raise_fd_limit(wanted: int) -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = min(hard, max(soft, wanted))
+    if target > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    return target
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round((pct / 100.0) * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _allow_all(_app_obj, **_kwargs) -> GatewayGrant:
+    return GatewayGrant(ok=True, audience=AUDIENCE_STAFF)
+
+
+class _ServerThread(threading.Thread):
+    def __init__(self):
+        super().__init__(name="bench-gateway", daemon=True)
+        self.gateway = LiveSseGateway(app_obj=None, authorizers={ADMIN_STREAM_PATH: _allow_all}, heartbeat_seconds=60)
+        self.gateway.max_connections = 10**6
+        self.ready = threading.Event()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.port = 0
+
+    def run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(
+            asyncio.start_server(self.gateway.handle_connection, host="127.0.0.1", port=0, backlog=4096)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    def publish(self, seq: int) -> None:
+        payload = {"seq": int(seq), "sent_at": time.time()}
+        self.loop.call_soon_threadsafe(
+            lambda: self.gateway.hub.dispatch("invalidation", payload, audience=AUDIENCE_STAFF)
+        )
+
+
+async def _client(port: int, expected: int, latencies: list[float]):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {ADMIN_STREAM_PATH} HTTP/1.1\r\nHost: bench\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    await reader.readuntil(b"\n\n")  # heartbeat inicial
+    received = 0
+    while received < expected:
+        frame = await reader.readuntil(b"\n\n")
+        now = time.time()
+        if not frame.startswith(b"event: invalidation"):
+            continue
+        data = json.loads(frame.split(b"data: ", 1)[1])
+        latencies.append((now - float(data["sent_at"])) * 1000.0)
+        received += 1
+    writer.close()
+
+
+def _client_proc(port: int, connections: int, expected: int, fd_limit: int, out_queue) -> None:
+    _raise_fd_limit(fd_limit)
+
+    async def _all():
+        latencies: list[float] = []
+        tasks = [asyncio.create_task(_client(port, expected, latencies)) for _ in range(connections)]
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=600)
+        return latencies
+
+    out_queue.put(asyncio.run(_all()))
+
+
+def _run(args: argparse.Namespace) -> dict:
+    server = _ServerThread()
+    server.start()
+    server.ready.wait(10)
+
+    procs_n = max(1, int(args.client_procs))
+    per_proc = [int(args.connections) // procs_n] * procs_n
+    for i in range(int(args.connections) % procs_n):
+        per_proc[i] += 1
+    ctx = multiprocessing.get_context("fork")
+    out_queue = ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_client_proc,
+            args=(server.port, n, int(args.events), n * 2 + 256, out_queue),
+            daemon=True,
+        )
+        for n in per_proc
+        if n > 0
+    ]
+    t0 = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    deadline = time.time() + 120
+    while len(server.gateway.hub.subscribers) < int(args.connections) and time.time() < deadline:
+        time.sleep(0.05)
+    connect_seconds = time.perf_counter() - t0
+    connected = len(server.gateway.hub.subscribers)
+
+    t_pub = time.perf_counter()
+    for seq in range(int(args.events)):
+        server.publish(seq)
+        time.sleep(max(0.0, float(args.interval_ms)) / 1000.0)
+    latencies: list[float] = []
+    for _ in procs:
+        latencies.extend(out_queue.get(timeout=600))
+    publish_seconds = time.perf_counter() - t_pub
+    for proc in procs:
+        proc.join(timeout=5)
+
+    stats = server.gateway.hub.snapshot()
+    return {
+        "connections": int(args.connections),
+        "connected": int(connected),
+        "events": int(args.events),
+        "deliveries": len(latencies),
+        "connect_seconds": round(connect_seconds, 3),
+        "deliveries_per_sec": round(len(latencies) / publish_seconds, 1) if publish_seconds > 0 else 0.0,
+        "latency_ms_p50": round(_percentile(latencies, 50), 3),
+        "latency_ms_p95": round(_percentile(latencies, 95), 3),
+        "latency_ms_p99": round(_percentile(latencies, 99), 3),
+        "latency_ms_max": round(max(latencies) if latencies else 0.0, 3),
+        "dropped_slow": int(stats.get("dropped_slow", 0)),
+        "gateway_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    _raise_fd_limit(int(args.connections) * 2 + 256)
+    result = _run(args)
+    if args.json:
+        print(json.dumps(result, sort_keys=True))
+    else:
+        for key, value in result.items():
+            print(f"{key}={value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
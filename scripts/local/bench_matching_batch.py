@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark local del scoring de matching: ``_score_candidate`` candidata por
+candidata vs el scorer por lotes de ``utils.matching_batch``.
+
+Sin BD: genera candidatas sintéticas en memoria (direcciones, horarios,
+funciones, edades variadas) y mide, por tamaño de pool:
+
+- ``scalar``: ``_score_candidate`` para todo el pool + sort (lo que hacía
+  ``rank_candidates``);
+- ``batch``: codificar el pool + puntos de todo el pool + filas solo del top-k
+  (lo que hace ahora);
+- ``batch_warm``: lo mismo con el pool ya codificado (pool reutilizado entre
+  solicitudes).
+
+Uso:
+  venv/bin/python scripts/local/bench_matching_batch.py
+  venv/bin/python scripts/local/bench_matching_batch.py --pools 250,2000,10000 --runs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils import matching_service  # noqa: E402
+from utils.matching_batch import encode_pool, rank_order, score_pool, score_rows  # noqa: E402
+
+_SECTORES = ["Villa Maria", "Cienfuegos", "Gurabo", "Pueblo Nuevo", "Los Jardines", "Bella Vista", "Cerros de Gurabo"]
+_CIUDADES = ["Santiago", "Santo Domingo", "La Vega", "Moca", "Puerto Plata", ""]
+_MODALIDADES = ["salida diaria", "dormida", "con dormida lunes a viernes", "medio tiempo", "fin de semana", ""]
+_HORARIOS = ["8am-5pm", "9am-6pm", "medio_tiempo", "noche", "", "8:00 a.m. - 5:00 p.m."]
+_AREAS = ["limpieza, cocina", "niños", "cuidado de ancianos", "enfermería", "todas las anteriores", "lavar y planchar", ""]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de scoring de matching: escalar vs lotes")
+    parser.add_argument("--pools", default="250,2000,10000", help="Tamaños de pool separados por coma.")
+    parser.add_argument("--runs", type=int, default=3, help="Corridas por modo.")
+    parser.add_argument("--top-k", type=int, default=matching_service.DEFAULT_TOP_K)
+    parser.add_argument("--seed", type=int, default=14)
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+def _solicitud() -> SimpleNamespace:
+    return SimpleNamespace(
+        id=0,
+        cliente_id=0,
+        horario="8:00 a.m. - 5:00 p.m.",
+        modalidad_trabajo="salida diaria - lunes a viernes",
+        ciudad_sector="Villa Maria, Santiago",
+        rutas_cercanas="Cienfuegos / Gurabo",
+        funciones=["limpieza", "cocina", "cuidar_ninos"],
+        funciones_otro="",
+        tipo_servicio="DOMESTICA_LIMPIEZA",
+        detalles_servicio={},
+        experiencia="Minimo 2 anos",
+        edad_requerida=["25 a 45 años"],
+        mascota="si",
+        compat_test_cliente_json=None,
+    )
+
+
+def _pool(size: int, rng: random.Random) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            fila=i + 1,
+            nombre_completo=f"Candidata {i}",
+            codigo=f"C-{i}",
+            direccion_completa=f"{rng.choice(_SECTORES)}, {rng.choice(_CIUDADES)}",
+            rutas_cercanas=" / ".join(rng.sample(_SECTORES, rng.randrange(0, 3))),
+            modalidad_trabajo_preferida=rng.choice(_MODALIDADES),
+            compat_disponibilidad_horario=rng.choice(_HORARIOS),
+            areas_experiencia=rng.choice(_AREAS),
+            compat_fortalezas=rng.sample(["cocinar", "limpiar", "cuidar niños"], rng.randrange(0, 3)),
+            sabe_planchar=rng.random() < 0.3,
+            compat_limites_no_negociables=["no mascotas"] if rng.random() < 0.1 else [],
+            edad=str(rng.randrange(18, 65)),
+            anos_experiencia=str(rng.randrange(0, 15)),
+            compat_test_candidata_json=None,
+        )
+        for i in range(size)
+    ]
+
+
+def _context(pool) -> dict:
+    readiness = {"ready": True, "reasons": [], "docs": {}, "referencias": {}, "has_interview": True}
+    return {
+        "readiness_by_id": {c.fila: readiness for c in pool},
+        "history_by_id": {c.fila: {"blocked_other_client": False, "rejected_same_client": False} for c in pool},
+    }
+
+
+def _scalar(solicitud, pool, context, top_k: int):
+    profile = matching_service.build_solicitud_profile(solicitud)
+    ranked = [
+        matching_service._score_candidate(solicitud, cand, sol_profile=profile, scoring_context=context)
+        for cand in pool
+    ]
+    ranked.sort(
+        key=lambda item: (item["score"], item["operational_score"], (item["candidate"].nombre_completo or "").lower()),
+        reverse=True,
+    )
+    return ranked[:top_k]
+
+
+def _batch(solicitud, encoded, context, top_k: int):
+    scores = score_pool(solicitud, encoded)
+    return score_rows(solicitud, encoded, scores, indices=rank_order(encoded, scores)[:top_k], scoring_context=context)
+
+
+def _timed(fn, runs: int) -> float:
+    timings = []
+    for _ in range(max(1, runs)):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return round(statistics.median(timings), 1)
+
+
+def main() -> int:
+    args = _parse_args()
+    rng = random.Random(args.seed)
+    solicitud = _solicitud()
+    results = []
+    for size in [int(x) for x in str(args.pools).split(",") if x.strip()]:
+        pool = _pool(size, rng)
+        context = _context(pool)
+        encoded = encode_pool(pool)
+        want = [row["candidate"].fila for row in _scalar(solicitud, pool, context, args.top_k)]
+        got = [row["candidate"].fila for row in _batch(solicitud, encoded, context, args.top_k)]
+        if want != got:
+            raise SystemExit(f"top-{args.top_k} distinto para pool={size}")
+        results.append(
+            {
+                "pool": size,
+                "scalar_ms": _timed(lambda: _scalar(solicitud, pool, context, args.top_k), args.runs),
+                "batch_ms": _timed(lambda: _batch(solicitud, encode_pool(pool), context, args.top_k), args.runs),
+                "batch_warm_ms": _timed(lambda: _batch(solicitud, encoded, context, args.top_k), args.runs),
+            }
+        )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"scoring top_k={args.top_k} runs={args.runs}")
+    for row in results:
+        print(
+            f"  pool={row['pool']:6d} scalar={row['scalar_ms']}ms batch={row['batch_ms']}ms "
+            f"batch_pool_codificado={row['batch_warm_ms']}ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
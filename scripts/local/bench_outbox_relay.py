@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark local del relay de outbox (utils/outbox_relay.py).
+
+Siembra N eventos en ``domain_outbox`` (SQLite temporal por defecto) y los
+drena con ``relay_pending_once`` contra un Redis falso que simula el
+round-trip de red (``--rtt-ms``) por cada comando o pipeline. Mide:
+
+- ``batched``: el relay actual (pipeline por lote + un UPDATE por lote) sobre
+  los N eventos;
+- ``per_row``: un cliente sin ``pipeline`` y ``batch_size=1`` (un XADD y un
+  commit por evento, como antes) sobre una muestra (``--baseline-events``),
+  para extrapolar.
+
+Incluye el consumidor interno (recibo + notificación por evento) igual que en
+producción.
+
+Uso:
+  venv/bin/python scripts/local/bench_outbox_relay.py --events 100000
+  venv/bin/python scripts/local/bench_outbox_relay.py --events 100000 --batch-size 500 --rtt-ms 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark del relay de outbox con Redis falso")
+    parser.add_argument("--events", type=int, default=100000, help="Eventos a sembrar y relayar.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Filas por ciclo del relay.")
+    parser.add_argument("--baseline-events", type=int, default=2000, help="Muestra para el modo per_row (0 = omitir).")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="Round-trip simulado por comando/pipeline Redis.")
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+class _FakePipeline:
+    def __init__(self, redis: "_FakeRedis"):
+        self.redis = redis
+        self.queued: list[tuple[str, dict]] = []
+
+    def xadd(self, stream, fields):
+        self.queued.append((stream, fields))
+        return self
+
+    def execute(self, raise_on_error=True):
+        self.redis.round_trip()
+        out = [self.redis.append(stream, fields) for stream, fields in self.queued]
+        self.queued = []
+        return out
+
+
+class _FakeRedis:
+    def __init__(self, rtt_ms: float):
+        self.rtt = max(0.0, float(rtt_ms)) / 1000.0
+        self.entries = 0
+        self.round_trips = 0
+
+    def round_trip(self) -> None:
+        self.round_trips += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def append(self, stream, fields) -> str:
+        self.entries += 1
+        return f"{self.entries}-0"
+
+    def xadd(self, stream, fields):
+        self.round_trip()
+        return self.append(stream, fields)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakeRedisNoPipeline:
+    """Sin ``pipeline``: el relay cae a un XADD por evento."""
+
+    def __init__(self, rtt_ms: float):
+        self._inner = _FakeRedis(rtt_ms)
+
+    @property
+    def entries(self) -> int:
+        return self._inner.entries
+
+    @property
+    def round_trips(self) -> int:
+        return self._inner.round_trips
+
+    def xadd(self, stream, fields):
+        return self._inner.xadd(stream, fields)
+
+
+def _reset_tables(db, models) -> None:
+    for model in models:
+        model.__table__.drop(bind=db.engine, checkfirst=True)
+    for model in models:
+        model.__table__.create(bind=db.engine, checkfirst=True)
+
+
+def _seed(db, DomainOutbox, count: int, utc_now_naive) -> None:
+    table = DomainOutbox.__table__
+    now = utc_now_naive()
+    chunk = 5000
+    for start in range(0, count, chunk):
+        rows = []
+        for i in range(start, min(count, start + chunk)):
+            rows.append(
+                {
+                    "id": i + 1,
+                    "event_id": f"bench_{i + 1:08d}",
+                    "event_type": "SOLICITUD_ESTADO_CAMBIADO",
+                    "aggregate_type": "Solicitud",
+                    "aggregate_id": str((i % 5000) + 1),
+                    "aggregate_version": 1,
+                    "occurred_at": now,
+                    "actor_id": "staff:1",
+                    "region": "admin",
+                    "payload": {"solicitud_id": (i % 5000) + 1, "from": "proceso", "to": "activa"},
+                    "schema_version": 1,
+                    "published_attempts": 0,
+                    "relay_status": "pending",
+                    "created_at": now,
+                }
+            )
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+
+def _drain(relay_pending_once, client, *, batch_size: int) -> dict:
+    cycles = []
+    totals = {"published": 0, "failed": 0, "lag_ms_sum": 0, "lag_ms_max": 0}
+    started = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        stats = relay_pending_once(batch_size=batch_size, redis_client=client, stream_key="sys:bench:v1")
+        if not stats["picked"]:
+            break
+        cycles.append((time.perf_counter() - t0) * 1000.0)
+        totals["published"] += stats["published"]
+        totals["failed"] += stats["failed"]
+        totals["lag_ms_sum"] += stats["lag_ms_sum"]
+        totals["lag_ms_max"] = max(totals["lag_ms_max"], stats["lag_ms_max"])
+    elapsed = max(1e-6, time.perf_counter() - started)
+    return {
+        "events": totals["published"],
+        "failed": totals["failed"],
+        "cycles": len(cycles),
+        "elapsed_s": round(elapsed, 2),
+        "events_per_sec": round(totals["published"] / elapsed, 1),
+        "cycle_ms_p50": round(statistics.median(cycles), 1) if cycles else 0.0,
+        "lag_ms_avg": int(totals["lag_ms_sum"] / totals["published"]) if totals["published"] else 0,
+        "lag_ms_max": totals["lag_ms_max"],
+        "redis_round_trips": client.round_trips,
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    if not os.getenv("DATABASE_URL_TEST"):
+        tmp_db = Path(tempfile.mkdtemp(prefix="bench_outbox_")) / "relay.db"
+        os.environ["DATABASE_URL_TEST"] = f"sqlite:///{tmp_db}"
+    os.environ.setdefault("APP_ENV", "test")
+
+    from app import app as flask_app  # noqa: E402
+    from config_app import db  # noqa: E402
+    from models import DomainOutbox, OutboxConsumerReceipt, StaffNotificacion  # noqa: E402
+    from utils.outbox_relay import relay_pending_once  # noqa: E402
+    from utils.timezone import utc_now_naive  # noqa: E402
+
+    models = [DomainOutbox, OutboxConsumerReceipt, StaffNotificacion]
+    results = {}
+    with flask_app.app_context():
+        _reset_tables(db, models)
+        t0 = time.perf_counter()
+        _seed(db, DomainOutbox, max(1, int(args.events)), utc_now_naive)
+        seed_s = round(time.perf_counter() - t0, 2)
+        results["batched"] = _drain(relay_pending_once, _FakeRedis(args.rtt_ms), batch_size=max(1, args.batch_size))
+
+        if args.baseline_events > 0:
+            _reset_tables(db, models)
+            _seed(db, DomainOutbox, int(args.baseline_events), utc_now_naive)
+            results["per_row"] = _drain(relay_pending_once, _FakeRedisNoPipeline(args.rtt_ms), batch_size=1)
+        _reset_tables(db, models)
+
+    if args.json:
+        print(json.dumps({"seed_s": seed_s, **results}, indent=2))
+        return 0
+    print(
+        f"outbox relay db={os.environ['DATABASE_URL_TEST'].split(':', 1)[0]} "
+        f"batch_size={args.batch_size} rtt_ms={args.rtt_ms} seed={seed_s}s"
+    )
+    for mode, row in results.items():
+        print(
+            f"  {mode:8s} events={row['events']} cycles={row['cycles']} elapsed={row['elapsed_s']}s "
+            f"events_per_sec={row['events_per_sec']} cycle_p50={row['cycle_ms_p50']}ms "
+            f"lag_avg={row['lag_ms_avg']}ms lag_max={row['lag_ms_max']}ms redis_round_trips={row['redis_round_trips']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
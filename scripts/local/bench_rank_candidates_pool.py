@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark local de ``rank_candidates`` con pool lleno (250): memoria y latencia
+cargando los blobs de documentos (camino anterior, ``CANDIDATA_DOCUMENT_FACTS=0``)
+vs leyendo solo los hechos ``has_<kind>`` persistidos.
+
+Usa siempre una BD SQLite temporal propia (APP_ENV=test): siembra N candidatas
+listas con cuatro documentos de ``--doc-kb`` KB cada uno y corre el ranking
+varias veces por modo con la sesión limpia (sin identity map caliente).
+
+Uso:
+  venv/bin/python scripts/local/bench_rank_candidates_pool.py
+  venv/bin/python scripts/local/bench_rank_candidates_pool.py --pool 250 --doc-kb 400 --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_TMPDIR = tempfile.TemporaryDirectory()
+os.environ["APP_ENV"] = "test"
+os.environ["DATABASE_URL_TEST"] = f"sqlite:///{Path(_TMPDIR.name) / 'rank_bench.sqlite'}"
+
+from app import app as flask_app  # noqa: E402
+from config_app import db  # noqa: E402
+from models import Candidata, Entrevista, Solicitud, SolicitudCandidata  # noqa: E402
+from tests.t1_testkit import ensure_sqlite_compat_tables  # noqa: E402
+from utils import matching_service  # noqa: E402
+
+_KINDS = ("depuracion", "perfil", "cedula1", "cedula2")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de rank_candidates: blobs vs hechos de documentos")
+    parser.add_argument("--pool", type=int, default=matching_service.DEFAULT_PREFILTER_LIMIT)
+    parser.add_argument("--doc-kb", type=int, default=200, help="Tamaño de cada documento sembrado.")
+    parser.add_argument("--runs", type=int, default=5, help="Corridas por modo.")
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+def _solicitud() -> SimpleNamespace:
+    return SimpleNamespace(
+        id=0,
+        cliente_id=0,
+        horario="8:00 a.m. - 5:00 p.m.",
+        modalidad_trabajo="salida diaria",
+        ciudad_sector="Santiago",
+        rutas_cercanas="",
+        funciones=["limpieza"],
+        funciones_otro="",
+        tipo_servicio="DOMESTICA_LIMPIEZA",
+        detalles_servicio={},
+        experiencia="",
+        edad_requerida=[],
+        mascota="no",
+        compat_test_cliente_json=None,
+    )
+
+
+def _seed(pool: int, doc_kb: int) -> None:
+    ensure_sqlite_compat_tables([Candidata, Entrevista, Solicitud, SolicitudCandidata], reset=False)
+    blob = os.urandom(max(1, doc_kb) * 1024)
+    for i in range(pool):
+        fila = 1000 + i
+        db.session.add(
+            Candidata(
+                fila=fila,
+                nombre_completo=f"Bench {i}",
+                cedula=f"{fila:011d}",
+                codigo=f"BEN-{i:06d}",
+                estado="lista_para_trabajar",
+                entrevista="Entrevista legacy",
+                referencias_laboral="Referencia laboral válida con datos",
+                referencias_familiares="Referencia familiar válida con datos",
+                direccion_completa="Santiago, Cienfuegos",
+                modalidad_trabajo_preferida="salida diaria",
+                **{kind: blob for kind in _KINDS},
+            )
+        )
+        if i % 25 == 24:
+            db.session.commit()
+            db.session.expunge_all()
+    db.session.commit()
+    db.session.remove()
+
+
+def _run(mode: str, runs: int) -> dict[str, float]:
+    os.environ["CANDIDATA_DOCUMENT_FACTS"] = "0" if mode == "blobs" else "1"
+    timings: list[float] = []
+    peaks: list[float] = []
+    pool_size = 0
+    for _ in range(max(1, runs)):
+        db.session.remove()
+        tracemalloc.start()
+        started = time.perf_counter()
+        ranked = matching_service.rank_candidates(_solicitud(), top_k=30)
+        timings.append((time.perf_counter() - started) * 1000.0)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak / (1024 * 1024))
+        pool_size = int((ranked[0].get("meta") or {}).get("pool_size") or 0) if ranked else 0
+        del ranked
+    return {
+        "pool_size": pool_size,
+        "p50_ms": round(statistics.median(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "peak_mb": round(statistics.median(peaks), 1),
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    try:
+        with flask_app.app_context():
+            _seed(int(args.pool), int(args.doc_kb))
+            result = {
+                "pool": int(args.pool),
+                "doc_kb": int(args.doc_kb),
+                "runs": int(args.runs),
+                "blobs": _run("blobs", int(args.runs)),
+                "facts": _run("facts", int(args.runs)),
+            }
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        os.environ.pop("CANDIDATA_DOCUMENT_FACTS", None)
+        _TMPDIR.cleanup()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"rank_candidates pool={result['pool']} documentos=4x{result['doc_kb']} KB runs={result['runs']}")
+    for mode in ("blobs", "facts"):
+        row = result[mode]
+        print(
+            f"  {mode:6s} pool_size={row['pool_size']} p50={row['p50_ms']}ms max={row['max_ms']}ms "
+            f"pico_memoria={row['peak_mb']} MB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark local de una página de 36 tarjetas de la tienda: fotos originales
+(tipo teléfono, varios MB) vs miniaturas ``card`` en WebP y JPEG.
+
+Genera N fotos sintéticas con textura (para que el JPEG pese como una foto
+real), calcula sus miniaturas con ``utils.image_thumbnails`` y reporta:
+
+- bytes por página (36 imágenes) por variante;
+- tiempo de generación de miniaturas por foto (p50/p95), el costo que paga la
+  subida o el backfill una sola vez;
+- tiempo de decodificar las 36 imágenes de la página, como aproximación del
+  costo de render en el navegador.
+
+No toca la base de datos ni la app.
+
+Uso:
+  venv/bin/python scripts/local/bench_store_thumbnails.py
+  venv/bin/python scripts/local/bench_store_thumbnails.py --cards 36 --width 3024 --height 4032 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from utils.image_thumbnails import render_thumbnails  # noqa: E402
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de miniaturas para la página de 36 tarjetas")
+    parser.add_argument("--cards", type=int, default=36, help="Tarjetas por página.")
+    parser.add_argument("--distinct", type=int, default=6, help="Fotos distintas a generar (se repiten en la página).")
+    parser.add_argument("--width", type=int, default=3024)
+    parser.add_argument("--height", type=int, default=4032)
+    parser.add_argument("--quality", type=int, default=92, help="Calidad JPEG de la foto original.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+def _synthetic_photo(rng: random.Random, width: int, height: int, quality: int) -> bytes:
+    # Ruido a baja resolución escalado + formas: textura parecida a una foto de teléfono.
+    small = Image.effect_noise((max(1, width // 8), max(1, height // 8)), 64).convert("RGB")
+    base = small.resize((width, height), Image.BICUBIC)
+    draw = ImageDraw.Draw(base)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(50, width // 2), y0 + rng.randrange(50, height // 2)
+        draw.ellipse((x0, y0, x1, y1), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    base = base.filter(ImageFilter.GaussianBlur(1))
+    grain = Image.effect_noise((width, height), 24).convert("RGB")
+    base = Image.blend(base, grain, 0.15)
+    buf = io.BytesIO()
+    base.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _decode_ms(blobs: list[bytes]) -> float:
+    started = time.perf_counter()
+    for data in blobs:
+        with Image.open(io.BytesIO(data)) as im:
+            im.load()
+    return (time.perf_counter() - started) * 1000.0
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main() -> int:
+    args = _parse_args()
+    rng = random.Random(args.seed)
+    distinct = max(1, int(args.distinct))
+    originals = [_synthetic_photo(rng, args.width, args.height, args.quality) for _ in range(distinct)]
+
+    render_ms: list[float] = []
+    cards: dict[str, list[bytes]] = {"webp": [], "jpeg": []}
+    for data in originals:
+        started = time.perf_counter()
+        thumbs = render_thumbnails(data)
+        render_ms.append((time.perf_counter() - started) * 1000.0)
+        for thumb in thumbs:
+            if thumb.variant == "card":
+                cards[thumb.format].append(thumb.data)
+
+    page = [i % distinct for i in range(max(1, int(args.cards)))]
+    variants = {
+        "original": [originals[i] for i in page],
+        "card_webp": [cards["webp"][i] for i in page],
+        "card_jpeg": [cards["jpeg"][i] for i in page],
+    }
+    result = {
+        "cards": len(page),
+        "source": f"{args.width}x{args.height} q{args.quality}",
+        "render_thumbnails_ms": {
+            "p50": round(statistics.median(render_ms), 1),
+            "p95": round(_pct(render_ms, 0.95), 1),
+        },
+        "page": {
+            name: {
+                "bytes": sum(len(b) for b in blobs),
+                "avg_kb": round(sum(len(b) for b in blobs) / len(blobs) / 1024.0, 1),
+                "decode_ms": round(_decode_ms(blobs), 1),
+            }
+            for name, blobs in variants.items()
+        },
+    }
+    original_bytes = result["page"]["original"]["bytes"] or 1
+    for name in ("card_webp", "card_jpeg"):
+        result["page"][name]["vs_original"] = round(result["page"][name]["bytes"] / original_bytes, 4)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"Página de {result['cards']} tarjetas, fotos {result['source']}")
+    print(
+        f"  generar miniaturas por foto: p50={result['render_thumbnails_ms']['p50']}ms "
+        f"p95={result['render_thumbnails_ms']['p95']}ms"
+    )
+    for name, row in result["page"].items():
+        ratio = f" ({row['vs_original'] * 100:.1f}% del original)" if "vs_original" in row else ""
+        print(
+            f"  {name:10s} bytes/página={row['bytes'] / (1024 * 1024):.2f} MB "
+            f"promedio={row['avg_kb']} KB decode={row['decode_ms']}ms{ratio}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga local del webhook de WhatsApp (bot/whatsapp_routes.py).
+
+Levanta un servidor HTTP falso que responde como OpenAI (``/v1/chat/completions``)
+y Graph (``/<version>/<phone_id>/messages``) con latencia configurable, y
+reproduce una ráfaga de payloads de webhook con el test client de Flask
+(SQLite temporal por defecto). Mide:
+
+- ``inline``: el webhook corre IA + envío dentro del request (``BOT_INBOUND_ASYNC=false``)
+  sobre una muestra (``--inline-messages``);
+- ``async``: el webhook solo guarda y encola; luego ``run_inbound_loop`` drena la
+  cola con ``--workers`` hilos y se mide throughput y lag de punta a punta.
+
+Sin ``data/bot_protocol_domesticas_v1.json`` el pipeline falla en cada mensaje;
+usa ``--protocol`` para apuntar a una copia.
+
+Uso:
+  venv/bin/python scripts/local/load_whatsapp_webhook_burst.py --messages 500 --conversations 50
+  venv/bin/python scripts/local/load_whatsapp_webhook_burst.py --ai-latency-ms 800 --graph-latency-ms 200 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SAMPLE_TEXTS = (
+    "hola",
+    "buenas, quiero trabajar",
+    "a que hora abren?",
+    "donde queda la oficina",
+    "me llamo ana y tengo 30 años",
+    "vivo en santiago",
+    "que requisitos piden",
+)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ráfaga de webhooks de WhatsApp contra IA/Graph falsos")
+    parser.add_argument("--messages", type=int, default=500, help="Mensajes del modo async.")
+    parser.add_argument("--inline-messages", type=int, default=100, help="Muestra del modo inline (0 = omitir).")
+    parser.add_argument("--conversations", type=int, default=50, help="Teléfonos distintos en la ráfaga.")
+    parser.add_argument("--ai-latency-ms", type=float, default=400.0, help="Latencia simulada de OpenAI.")
+    parser.add_argument("--graph-latency-ms", type=float, default=150.0, help="Latencia simulada de Graph.")
+    parser.add_argument("--workers", type=int, default=1, help="Hilos del worker en el modo async.")
+    parser.add_argument("--batch-size", type=int, default=10, help="Jobs por ciclo de claim.")
+    parser.add_argument("--protocol", default="", help="Ruta del JSON de protocolo del bot.")
+    parser.add_argument("--json", action="store_true", help="Imprime resultado como JSON.")
+    return parser.parse_args()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    ai_latency = 0.0
+    graph_latency = 0.0
+    counts = {"ai": 0, "graph": 0}
+    lock = threading.Lock()
+
+    def log_message(self, *args):  # silencio
+        return
+
+    def _reply(self, body: dict) -> None:
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path.endswith("/chat/completions"):
+            time.sleep(self.ai_latency)
+            with self.lock:
+                self.counts["ai"] += 1
+            content = json.dumps({"intent": "FAQ_HORARIOS", "answer_text": "Atendemos de 8 a 5.", "confidence": 0.95})
+            self._reply({"choices": [{"message": {"content": content}}]})
+            return
+        if self.path.endswith("/messages"):
+            time.sleep(self.graph_latency)
+            with self.lock:
+                self.counts["graph"] += 1
+                n = self.counts["graph"]
+            self._reply({"messaging_product": "whatsapp", "messages": [{"id": f"wamid.stub.{n}"}]})
+            return
+        self.send_response(404)
+        self.end_headers()
+
+
+def _start_stub(ai_latency_ms: float, graph_latency_ms: float) -> tuple[ThreadingHTTPServer, str]:
+    _StubHandler.ai_latency = max(0.0, ai_latency_ms) / 1000.0
+    _StubHandler.graph_latency = max(0.0, graph_latency_ms) / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _payload(seq: int, conversations: int, prefix: str) -> dict:
+    phone = f"1809555{(seq % max(1, conversations)):04d}"
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": phone, "profile": {"name": f"Carga {seq % conversations}"}}],
+                            "messages": [
+                                {
+                                    "id": f"wamid-{prefix}-{seq}",
+                                    "from": phone,
+                                    "timestamp": str(1715000000 + seq),
+                                    "type": "text",
+                                    "text": {"body": SAMPLE_TEXTS[seq % len(SAMPLE_TEXTS)]},
+                                }
+                            ],
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def _burst(client, count: int, conversations: int, prefix: str) -> dict:
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for seq in range(count):
+        t0 = time.perf_counter()
+        resp = client.post("/bot/whatsapp/webhook", json=_payload(seq, conversations, prefix))
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        if resp.status_code != 200:
+            errors += 1
+    elapsed = max(1e-6, time.perf_counter() - started)
+    return {
+        "requests": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "req_per_sec": round(count / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else 0.0,
+        "p99_ms": _pct(latencies, 0.99),
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+    }
+
+
+def _drain(flask_app, run_inbound_loop, *, workers: int, batch_size: int) -> dict:
+    totals = {"done": 0, "retried": 0, "dead": 0}
+    lock = threading.Lock()
+
+    def _worker():
+        with flask_app.app_context():
+            stats = run_inbound_loop(batch_size=batch_size, until_empty=True)
+        with lock:
+            for key in totals:
+                totals[key] += int(stats.get(key) or 0)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_worker) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(1e-6, time.perf_counter() - started)
+    return {**totals, "elapsed_s": round(elapsed, 2), "jobs_per_sec": round(totals["done"] / elapsed, 1)}
+
+
+def _reset_tables(db, models) -> None:
+    for model in reversed(models):
+        model.__table__.drop(bind=db.engine, checkfirst=True)
+    for model in models:
+        model.__table__.create(bind=db.engine, checkfirst=True)
+
+
+def main() -> int:
+    args = _parse_args()
+    if not os.getenv("DATABASE_URL_TEST"):
+        tmp_db = Path(tempfile.mkdtemp(prefix="load_webhook_")) / "bot.db"
+        os.environ["DATABASE_URL_TEST"] = f"sqlite:///{tmp_db}"
+    os.environ.setdefault("APP_ENV", "test")
+    server, base_url = _start_stub(args.ai_latency_ms, args.graph_latency_ms)
+    os.environ.update(
+        {
+            "WHATSAPP_VALIDATE_SIGNATURE": "false",
+            "BOT_AI_ENABLED": "true",
+            "BOT_AUTOREPLY_ENABLED": "true",
+            "BOT_AI_API_KEY": "stub",
+            "BOT_AI_BASE_URL": f"{base_url}/v1",
+            "WHATSAPP_ENABLED": "true",
+            "BOT_DRY_RUN": "false",
+            "WHATSAPP_GRAPH_BASE_URL": base_url,
+            "WHATSAPP_ACCESS_TOKEN": "stub",
+            "WHATSAPP_PHONE_NUMBER_ID": "100000000000001",
+            "BOT_INBOUND_BACKLOG_WARN_DEPTH": str(10**9),
+        }
+    )
+
+    from app import app as flask_app  # noqa: E402
+    from config_app import db  # noqa: E402
+    import models as m  # noqa: E402
+    import services.bot_inbound_queue_service as inbound_queue  # noqa: E402
+    import services.bot_protocol_service as protocol_service  # noqa: E402
+    from utils.runtime_config import reset_schema_cache  # noqa: E402
+
+    if args.protocol:
+        protocol_service.DATA_PATH = Path(args.protocol)
+        protocol_service.load_protocol.cache_clear()
+    try:
+        protocol_service.load_protocol()
+    except Exception as exc:
+        print(f"aviso: protocolo no disponible ({exc}); el pipeline fallará por mensaje")
+
+    tables = [
+        m.BotContactIdentity,
+        m.BotConversation,
+        m.BotMessage,
+        m.BotInboundJob,
+        m.BotSandboxReviewQueue,
+        m.BotSandboxOutbound,
+        m.BotDecisionLog,
+        m.BotSetting,
+        m.BotEscalation,
+    ]
+    flask_app.config["TESTING"] = True
+    flask_app.logger.setLevel(logging.ERROR)
+    client = flask_app.test_client()
+    results = {}
+    with flask_app.app_context():
+        _reset_tables(db, tables)
+
+    if args.inline_messages > 0:
+        os.environ["BOT_INBOUND_ASYNC"] = "false"
+        results["inline"] = {"webhook": _burst(client, int(args.inline_messages), args.conversations, "inline")}
+
+    os.environ["BOT_INBOUND_ASYNC"] = "true"
+    reset_schema_cache()
+    results["async"] = {"webhook": _burst(client, max(1, int(args.messages)), args.conversations, "async")}
+    with flask_app.app_context():
+        results["async"]["queued"] = inbound_queue.inbound_queue_stats()["counts"].get("queued", 0)
+    results["async"]["drain"] = _drain(
+        flask_app,
+        inbound_queue.run_inbound_loop,
+        workers=int(args.workers),
+        batch_size=max(1, int(args.batch_size)),
+    )
+    with flask_app.app_context():
+        lags = [
+            (finished - created).total_seconds() * 1000.0
+            for created, finished in db.session.query(m.BotInboundJob.created_at, m.BotInboundJob.finished_at)
+            .filter(m.BotInboundJob.status == "done")
+            .all()
+            if created is not None and finished is not None
+        ]
+        results["async"]["drain"]["lag_p50_ms"] = round(statistics.median(lags), 1) if lags else 0.0
+        results["async"]["drain"]["lag_max_ms"] = round(max(lags), 1) if lags else 0.0
+        _reset_tables(db, tables)
+    results["stub_calls"] = dict(_StubHandler.counts)
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(
+        f"webhook burst db={os.environ['DATABASE_URL_TEST'].split(':', 1)[0]} conversations={args.conversations} "
+        f"ai_latency={args.ai_latency_ms}ms graph_latency={args.graph_latency_ms}ms workers={args.workers}"
+    )
+    for mode in ("inline", "async"):
+        if mode not in results:
+            continue
+        row = results[mode]["webhook"]
+        print(
+            f"  {mode:7s} webhook requests={row['requests']} errors={row['errors']} req_per_sec={row['req_per_sec']} "
+            f"p50={row['p50_ms']}ms p99={row['p99_ms']}ms max={row['max_ms']}ms"
+        )
+    drain = results["async"]["drain"]
+    print(
+        f"  drain   done={drain['done']} retried={drain['retried']} dead={drain['dead']} elapsed={drain['elapsed_s']}s "
+        f"jobs_per_sec={drain['jobs_per_sec']} lag_p50={drain['lag_p50_ms']}ms lag_max={drain['lag_max_ms']}ms"
+    )
+    print(f"  stub    ai_calls={results['stub_calls']['ai']} graph_calls={results['stub_calls']['graph']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
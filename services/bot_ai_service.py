@@ -7,11 +7,11 @@ import os
 import re
 from typing import Any
 
-import requests
 from requests import HTTPError, RequestException
 from requests.exceptions import ConnectionError as RequestsConnectionError
 from requests.exceptions import SSLError, Timeout
 
+from services import outbound_http_service as outbound_http
 from services.bot_constants import (
     INTENT_FAQ_CONTACTO,
     INTENT_FAQ_ESTADO_GENERAL,
@@ -188,7 +188,8 @@ def _user_prompt(safe_context: dict[str, Any]) -> str:
 
 
 def _openai_chat_completion(*, model: str, api_key: str, timeout_seconds: int, max_tokens: int, temperature: float, safe_context: dict[str, Any]) -> dict[str, Any]:
-    url = "https://api.openai.com/v1/chat/completions"
+    base = (os.getenv("BOT_AI_BASE_URL") or "https://api.openai.com/v1").strip().rstrip("/")
+    url = f"{base}/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -203,7 +204,14 @@ def _openai_chat_completion(*, model: str, api_key: str, timeout_seconds: int, m
             {"role": "user", "content": _user_prompt(safe_context)},
         ],
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=timeout_seconds)
+    resp = outbound_http.post(
+        outbound_http.PROVIDER_OPENAI,
+        url,
+        endpoint="chat_completions",
+        headers=headers,
+        json=payload,
+        timeout=timeout_seconds,
+    )
     resp.raise_for_status()
     body = resp.json() if resp.content else {}
     choices = body.get("choices") if isinstance(body, dict) else None
@@ -19,6 +19,7 @@ from services.environment_guard_service import (
     get_sensitive_flags_snapshot,
 )
 from services.bot_sandbox_service import is_staging_offline_active
+from utils.candidata_search_norm import nullable_digits, nullable_search_text
 from utils.cedula_normalizer import normalize_cedula_for_store, normalize_cedula_for_compare
 from utils.timezone import utc_now_naive
 
@@ -239,6 +240,10 @@ def create_candidate_from_draft(draft: BotCandidateDraft, *, actor_id: int | Non
         "marca_temporal": utc_now_naive(),
         "fecha_cambio_estado": utc_now_naive(),
         "estado": "en_proceso",
+        # INSERT directo: los eventos del modelo no corren, así que las columnas de búsqueda van aquí.
+        "nombre_norm": nullable_search_text(payload["nombre_completo"]),
+        "cedula_digits": nullable_digits(payload["cedula"]),
+        "telefono_digits": nullable_digits(payload["numero_telefono"]),
     }
     filtered = {k: v for k, v in insert_payload.items() if k in cols}
     names = list(filtered.keys())
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""Cache de estado por conversación para el pipeline inbound del bot.
+
+Cada mensaje entrante necesitaba la ventana de historial para la IA (consulta
+de las últimas 8 filas de ``bot_messages``) y el estado/contexto de protocolo
+derivado de ``metadata_json``. Aquí se guardan por conversación:
+
+- Historial: LRU en proceso + backplane (Redis), versionado por
+  ``BotConversation.updated_at``. Todo mensaje nuevo toca la conversación
+  (``last_message_at``/``unread_count_admin``), así que la versión cambia con
+  cada mensaje.
+- Actualización incremental: hooks de sesión registran los ``BotMessage``
+  insertados y la versión previa/nueva de la conversación; al hacer commit la
+  entrada avanza solo si estaba en la versión previa, si no se descarta. Un
+  rollback nunca toca el cache.
+- Lectura: si la versión coincide (contando lo pendiente de la transacción
+  actual) no hay consulta; si no, se consulta como antes y se guarda solo lo ya
+  confirmado.
+- Protocolo: estado y contexto de IA por conversación en el LRU, con clave por
+  hash del protocolo compilado + paso/versión de la metadata (solo CPU, no va
+  al backplane).
+
+Hit rate por tier en ``bot_observability_service.cache_metrics_snapshot()``.
+``BOT_CONVERSATION_CACHE_ENABLED=false`` vuelve a consultar siempre.
+"""
+from __future__ import annotations
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm.util import identity_key
+
+from config_app import db
+from models import BotConversation, BotMessage
+from services.bot_conversation_service import get_protocol_state
+from services.bot_observability_service import record_cache_lookup
+from services.bot_protocol_service import compiled_protocol
+from utils.distributed_backplane import bp_delete, bp_get, bp_set
+from utils.runtime_config import env_int, is_true
+
+
+CACHE_NAME = "bot_conversation_state"
+HISTORY_WINDOW = 8
+KEY_PREFIX = "bot_conv_state:v1:"
+_PENDING_KEY = "bot_conv_state_pending"
+
+_LRU: OrderedDict[int, dict[str, Any]] = OrderedDict()
+_LRU_LOCK = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return is_true(os.getenv("BOT_CONVERSATION_CACHE_ENABLED"), default=True)
+
+
+def _ttl_seconds() -> int:
+    return env_int("BOT_CONVERSATION_CACHE_TTL_SECONDS", 600)
+
+
+def _max_entries() -> int:
+    return env_int("BOT_CONVERSATION_CACHE_MAX_ENTRIES", 2000)
+
+
+def _version(value: datetime | None) -> str | None:
+    return value.isoformat(timespec="microseconds") if value is not None else None
+
+
+def _row(msg: BotMessage) -> dict[str, Any]:
+    return {
+        "id": int(msg.id),
+        "created_at": _version(msg.created_at) or "",
+        "direction": str(msg.direction or ""),
+        "source": str(msg.source or ""),
+        "text": str(msg.text_body or ""),
+    }
+
+
+def _window(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Mismo orden y límite que la consulta (``created_at``, ``id``), de más viejo a más nuevo."""
+    unique = {int(r["id"]): r for r in rows}
+    ordered = sorted(unique.values(), key=lambda r: (r["created_at"], r["id"]))
+    return ordered[-HISTORY_WINDOW:]
+
+
+# --- tiers -------------------------------------------------------------------
+
+
+def _lru_get(conversation_id: int) -> dict[str, Any] | None:
+    with _LRU_LOCK:
+        record = _LRU.get(conversation_id)
+        if record is not None:
+            _LRU.move_to_end(conversation_id)
+        return record
+
+
+def _lru_put(conversation_id: int, record: dict[str, Any]) -> None:
+    with _LRU_LOCK:
+        _LRU[conversation_id] = record
+        _LRU.move_to_end(conversation_id)
+        limit = _max_entries()
+        while len(_LRU) > limit:
+            _LRU.popitem(last=False)
+
+
+def _lru_history(conversation_id: int) -> dict[str, Any] | None:
+    record = _lru_get(conversation_id)
+    return record.get("history") if record else None
+
+
+def _load_history(conversation_id: int, version: str) -> tuple[dict[str, Any] | None, str]:
+    history = _lru_history(conversation_id)
+    if history is not None and history.get("version") == version:
+        return history, "lru"
+    try:
+        shared = bp_get(f"{KEY_PREFIX}{conversation_id}", default=None, context="bot_conv_state_get")
+    except Exception:
+        shared = None
+    if isinstance(shared, dict) and shared.get("version") == version:
+        _store_history(conversation_id, shared, shared_tier=False)
+        return shared, "backplane"
+    return None, "miss"
+
+
+def _store_history(conversation_id: int, history: dict[str, Any], *, shared_tier: bool = True) -> None:
+    record = dict(_lru_get(conversation_id) or {})
+    record["history"] = history
+    _lru_put(conversation_id, record)
+    if shared_tier:
+        try:
+            bp_set(f"{KEY_PREFIX}{conversation_id}", history, timeout=_ttl_seconds(), context="bot_conv_state_set")
+        except Exception:
+            return
+
+
+def _drop_history(conversation_id: int) -> None:
+    record = _lru_get(conversation_id)
+    if record is not None and record.get("history") is not None:
+        record = dict(record)
+        record["history"] = None
+        _lru_put(conversation_id, record)
+    try:
+        bp_delete(f"{KEY_PREFIX}{conversation_id}", context="bot_conv_state_delete")
+    except Exception:
+        return
+
+
+def reset_conversation_state_cache() -> None:
+    with _LRU_LOCK:
+        _LRU.clear()
+
+
+# --- mantenimiento incremental (hooks de sesión) ------------------------------
+
+
+def _pending(session, *, create: bool = False) -> dict[int, dict[str, Any]] | None:
+    pending = session.info.get(_PENDING_KEY)
+    if pending is None and create:
+        pending = session.info[_PENDING_KEY] = {}
+    return pending
+
+
+def _committed_updated_at(conversation: BotConversation) -> str | None:
+    state = sa_inspect(conversation)
+    if state.pending or state.transient or "updated_at" in state.unloaded:
+        return None
+    hist = state.attrs.updated_at.history
+    if hist.deleted:
+        return _version(hist.deleted[0])
+    if hist.unchanged:
+        return _version(hist.unchanged[0])
+    return None
+
+
+def _touch(pending: dict[int, dict[str, Any]], session, conversation_id: int, conversation: BotConversation | None = None) -> dict[str, Any]:
+    item = pending.get(conversation_id)
+    if item is None:
+        if conversation is None:
+            conversation = session.identity_map.get(identity_key(BotConversation, conversation_id))
+        base = _committed_updated_at(conversation) if conversation is not None else None
+        item = pending[conversation_id] = {"base": base, "head": None, "messages": [], "invalid": base is None}
+    return item
+
+
+@event.listens_for(db.session, "before_flush")
+def _before_flush(session, flush_context, instances) -> None:
+    pending = None
+    for obj in session.new:
+        if isinstance(obj, BotMessage) and obj.conversation_id:
+            pending = pending if pending is not None else _pending(session, create=True)
+            _touch(pending, session, int(obj.conversation_id))
+    for obj in session.dirty:
+        if isinstance(obj, BotConversation) and obj.id and session.is_modified(obj, include_collections=False):
+            pending = pending if pending is not None else _pending(session, create=True)
+            _touch(pending, session, int(obj.id), obj)
+    for obj in session.deleted:
+        if isinstance(obj, (BotMessage, BotConversation)):
+            conversation_id = int(obj.conversation_id if isinstance(obj, BotMessage) else obj.id or 0)
+            if conversation_id:
+                pending = pending if pending is not None else _pending(session, create=True)
+                _touch(pending, session, conversation_id)["invalid"] = True
+
+
+@event.listens_for(db.session, "after_flush")
+def _after_flush(session, flush_context) -> None:
+    pending = _pending(session)
+    if not pending:
+        return
+    for obj in session.new:
+        if isinstance(obj, BotMessage) and int(obj.conversation_id or 0) in pending:
+            pending[int(obj.conversation_id)]["messages"].append(_row(obj))
+
+
+@event.listens_for(db.session, "after_flush_postexec")
+def _after_flush_postexec(session, flush_context) -> None:
+    pending = _pending(session)
+    if not pending:
+        return
+    for conversation_id, item in pending.items():
+        conversation = session.identity_map.get(identity_key(BotConversation, conversation_id))
+        if conversation is None or "updated_at" in sa_inspect(conversation).unloaded:
+            item["invalid"] = True
+            continue
+        item["head"] = _version(conversation.updated_at)
+
+
+@event.listens_for(db.session, "after_commit")
+def _after_commit(session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not cache_enabled():
+        return
+    for conversation_id, item in pending.items():
+        try:
+            _apply_committed(conversation_id, item)
+        except Exception:
+            continue
+
+
+@event.listens_for(db.session, "after_rollback")
+def _after_rollback(session) -> None:
+    # Savepoint revertido: lo pendiente ya no es confiable para esta transacción.
+    for item in (_pending(session) or {}).values():
+        item["invalid"] = True
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def _after_transaction_end(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _apply_committed(conversation_id: int, item: dict[str, Any]) -> None:
+    history, _ = (None, "") if item["invalid"] or not item["head"] else _load_history(conversation_id, item["base"])
+    if history is None:
+        _drop_history(conversation_id)
+        return
+    _store_history(
+        conversation_id,
+        {"version": item["head"], "rows": _window(list(history.get("rows") or []) + list(item["messages"]))},
+    )
+
+
+# --- lectura -----------------------------------------------------------------
+
+
+def _query_rows(conversation_id: int, limit: int) -> list[dict[str, Any]]:
+    rows = (
+        BotMessage.query.filter_by(conversation_id=conversation_id)
+        .order_by(BotMessage.created_at.desc(), BotMessage.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [_row(r) for r in reversed(rows)]
+
+
+def history_rows(conversation: BotConversation) -> list[dict[str, Any]]:
+    """Últimos ``HISTORY_WINDOW`` mensajes (``id``, ``direction``, ``source``, ``text``), del más viejo al más nuevo."""
+    conversation_id = int(conversation.id)
+    if not cache_enabled():
+        record_cache_lookup(CACHE_NAME, "bypass")
+        return _query_rows(conversation_id, HISTORY_WINDOW)
+
+    session = db.session()
+    if any(isinstance(obj, (BotMessage, BotConversation)) for obj in session.new) or any(
+        isinstance(obj, BotConversation) and session.is_modified(obj, include_collections=False) for obj in session.dirty
+    ):
+        session.flush()
+    item = (_pending(session) or {}).get(conversation_id)
+    if item is not None and item["invalid"]:
+        record_cache_lookup(CACHE_NAME, "bypass")
+        return _query_rows(conversation_id, HISTORY_WINDOW)
+
+    version = item["base"] if item is not None else _version(conversation.updated_at)
+    uncommitted = list(item["messages"]) if item is not None else []
+    history, tier = _load_history(conversation_id, version) if version else (None, "miss")
+    if history is not None:
+        record_cache_lookup(CACHE_NAME, tier)
+        return _window(list(history.get("rows") or []) + uncommitted)
+
+    record_cache_lookup(CACHE_NAME, "miss")
+    rows = _query_rows(conversation_id, HISTORY_WINDOW + len(uncommitted))
+    if version:
+        uncommitted_ids = {int(r["id"]) for r in uncommitted}
+        committed = [r for r in rows if int(r["id"]) not in uncommitted_ids]
+        _store_history(conversation_id, {"version": version, "rows": committed[-HISTORY_WINDOW:]})
+    return rows[-HISTORY_WINDOW:]
+
+
+def _protocol_fingerprint(conversation: BotConversation) -> str:
+    metadata = dict(getattr(conversation, "metadata_json", {}) or {})
+    try:
+        digest = compiled_protocol().sha256
+    except Exception:
+        digest = ""
+    return "|".join(
+        [
+            digest,
+            str(metadata.get("current_step_code") or ""),
+            str(metadata.get("last_completed_step") or ""),
+            str(metadata.get("protocol_version") or ""),
+        ]
+    )
+
+
+def _protocol_entry(conversation: BotConversation) -> dict[str, Any]:
+    conversation_id = int(conversation.id or 0)
+    fingerprint = _protocol_fingerprint(conversation)
+    record = _lru_get(conversation_id) if conversation_id else None
+    entry = (record or {}).get("protocol")
+    if entry is not None and entry.get("fingerprint") == fingerprint:
+        return entry
+    entry = {"fingerprint": fingerprint, "state": get_protocol_state(conversation), "context": None}
+    if conversation_id:
+        record = dict(record or {})
+        record["protocol"] = entry
+        _lru_put(conversation_id, record)
+    return entry
+
+
+def protocol_state(conversation: BotConversation) -> dict[str, Any]:
+    """``get_protocol_state`` memorizado por conversación."""
+    return dict(_protocol_entry(conversation)["state"])
+
+
+def protocol_context(conversation: BotConversation, build: Callable[[dict[str, Any]], dict[str, Any]]) -> dict[str, Any]:
+    """Contexto de protocolo para la IA, construido con ``build(state)`` una vez por paso."""
+    entry = _protocol_entry(conversation)
+    if entry["context"] is None:
+        entry["context"] = build(dict(entry["state"]))
+        record_cache_lookup(f"{CACHE_NAME}.protocol", "miss")
+    else:
+        record_cache_lookup(f"{CACHE_NAME}.protocol", "lru")
+    return copy.deepcopy(entry["context"])
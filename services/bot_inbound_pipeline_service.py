@@ -35,7 +35,8 @@ from services.bot_constants import (
 )
 from services.bot_decision_service import register_decision
 from services.bot_ai_limits_service import get_ai_daily_usage_summary
-from services.bot_conversation_service import get_protocol_state, set_current_step
+import services.bot_conversation_state_cache as conversation_state_cache
+from services.bot_conversation_service import set_current_step
 from services.bot_protocol_service import (
     upsert_pending_correction,
     build_step_prompt,
@@ -67,7 +68,7 @@ def is_protocol_auto_advance_enabled() -> bool:
 
 
 def _process_protocol_auto_advance(*, conversation: BotConversation, inbound_message: BotMessage, message_type: str) -> dict[str, Any]:
-    current_state = get_protocol_state(conversation)
+    current_state = conversation_state_cache.protocol_state(conversation)
     current_step_code = str(current_state.get("current_step_code") or "").strip().upper()
     protocol_version = str(current_state.get("protocol_version") or "")
     old_step = current_step_code
@@ -610,21 +611,14 @@ def _build_missing_fields_prompt(validation: dict[str, Any]) -> str:
     return f"Perfecto. Ahora necesito {needed}."
 
 
-def _build_ai_history(conversation_id: int, *, current_inbound_message_id: int | None = None) -> list[dict]:
-    rows = (
-        BotMessage.query.filter_by(conversation_id=conversation_id)
-        .order_by(BotMessage.created_at.desc(), BotMessage.id.desc())
-        .limit(8)
-        .all()
-    )
-    rows = list(reversed(rows))
+def _build_ai_history(conversation: BotConversation, *, current_inbound_message_id: int | None = None) -> list[dict]:
     out = []
-    for row in rows:
-        if current_inbound_message_id and int(row.id or 0) == int(current_inbound_message_id):
+    for row in conversation_state_cache.history_rows(conversation):
+        if current_inbound_message_id and int(row["id"]) == int(current_inbound_message_id):
             continue
-        if row.source in {MESSAGE_SOURCE_ADMIN_MANUAL, MESSAGE_SOURCE_SYSTEM}:
+        if row["source"] in {MESSAGE_SOURCE_ADMIN_MANUAL, MESSAGE_SOURCE_SYSTEM}:
             continue
-        out.append({"role": "assistant" if row.direction == MESSAGE_DIRECTION_OUTBOUND else "user", "text": row.text_body or ""})
+        out.append({"role": "assistant" if row["direction"] == MESSAGE_DIRECTION_OUTBOUND else "user", "text": row["text"]})
     return out[-3:]
 
 
@@ -639,7 +633,10 @@ def _safe_autoreply_intents() -> set[str]:
 
 
 def _build_protocol_ai_context(conversation: BotConversation) -> dict[str, Any]:
-    state = get_protocol_state(conversation)
+    return conversation_state_cache.protocol_context(conversation, _protocol_ai_context_from_state)
+
+
+def _protocol_ai_context_from_state(state: dict[str, Any]) -> dict[str, Any]:
     current_step_code = str(state.get("current_step_code") or "").strip().upper()
     step = get_step(current_step_code) or {}
     step_prompt = build_step_prompt(current_step_code) if current_step_code else "Etapa no encontrada."
@@ -729,7 +726,7 @@ def process_inbound_ai_pipeline(
             inbound_message.text_body or "",
             context={
                 "identity_role": identity_status_norm or "unknown",
-                "history": _build_ai_history(conversation.id, current_inbound_message_id=inbound_message.id),
+                "history": _build_ai_history(conversation, current_inbound_message_id=inbound_message.id),
                 "protocol_context": protocol_ctx,
             },
         )
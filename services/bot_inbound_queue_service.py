@@ -0,0 +1,734 @@
+# -*- coding: utf-8 -*-
+"""Procesamiento de mensajes entrantes de WhatsApp fuera del request del webhook.
+
+El webhook valida firma, guarda ``BotMessage``/conversación/decisión de
+identidad y encola un ``BotInboundJob`` en la misma transacción; responde 200
+en milisegundos. ``flask bot-inbound run`` corre la IA (``process_inbound_ai_pipeline``),
+la revisión sandbox y los envíos salientes en su propio proceso.
+
+- Orden por conversación: solo es reclamable el job más viejo vivo
+  (``queued``/``running``) de cada conversación; los siguientes esperan.
+- Claim: ``FOR UPDATE SKIP LOCKED`` en PostgreSQL y ``UPDATE ... WHERE
+  status='queued'`` condicional en cualquier motor.
+- Reintentos con backoff; un job que agota intentos queda ``dead`` (el mensaje
+  sigue guardado y visible para staff). Un lease vencido vuelve a la cola.
+  Mientras procesa, el worker renueva ``locked_at`` cada tercio del lease; el
+  desenlace solo se escribe si el job sigue siendo suyo (mismo ``locked_by`` e
+  intento). Si no, se revierte su trabajo y no auto-responde.
+- Un reintento nunca vuelve a auto-responder (el envío pudo haber salido
+  antes del fallo) y, con cola atrasada, tampoco un mensaje más viejo que
+  ``BOT_INBOUND_AUTOREPLY_MAX_AGE_SECONDS``: se deja sugerencia para staff.
+
+Con ``BOT_INBOUND_ASYNC`` apagado (default fuera de producción) el webhook
+procesa en línea como antes, con las mismas funciones.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Any, Callable
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, exists, func
+from sqlalchemy.orm import aliased
+
+from config_app import db
+from models import BotConversation, BotInboundJob, BotMessage, BotSandboxReviewQueue
+from services.bot_ai_service import classify_intent, generate_safe_reply, is_ai_enabled, is_autoreply_enabled
+from services.bot_inbound_pipeline_service import process_inbound_ai_pipeline
+from services.bot_observability_service import log_bot_event
+from services.bot_outbound_sender_service import outbound_sender_enabled
+from services.bot_sandbox_review_service import auto_approve_review_in_sandbox
+from services.bot_sandbox_service import (
+    is_sandbox_assistant_allowed,
+    is_sandbox_auto_reply_active,
+    is_sandbox_auto_reply_enabled,
+    is_sandbox_auto_reply_paused,
+    run_sandbox_worker_once,
+)
+from services.whatsapp_cloud_service import send_text_message
+from utils.job_lease import LeaseHeartbeat, owned_job_clauses
+from utils.runtime_config import env_int, is_true, table_ready
+from utils.timezone import utc_now_naive
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+_LIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+
+def _max_attempts() -> int:
+    return env_int("BOT_INBOUND_MAX_ATTEMPTS", 5)
+
+
+def _lease_seconds() -> int:
+    return env_int("BOT_INBOUND_LEASE_SECONDS", 120, min_value=30)
+
+
+def _autoreply_max_age_seconds() -> int:
+    return env_int("BOT_INBOUND_AUTOREPLY_MAX_AGE_SECONDS", 300, min_value=0)
+
+
+def _backlog_warn_depth() -> int:
+    return env_int("BOT_INBOUND_BACKLOG_WARN_DEPTH", 200)
+
+
+def _retry_delay_seconds(attempts: int, max_backoff_seconds: int = 120) -> int:
+    exp = 2 * (2 ** max(0, int(attempts) - 1))
+    return max(2, min(int(max_backoff_seconds), int(exp)))
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"[:80]
+
+
+def _dialect() -> str:
+    try:
+        return str(db.session.get_bind().dialect.name or "").strip().lower()
+    except Exception:
+        return ""
+
+
+def _is_production_env() -> bool:
+    env = (os.getenv("APP_ENV") or os.getenv("FLASK_ENV") or "").strip().lower()
+    return env in {"production", "prod"}
+
+
+def jobs_table_ready() -> bool:
+    return table_ready(BotInboundJob.__tablename__)
+
+
+def inbound_async_enabled() -> bool:
+    """``BOT_INBOUND_ASYNC`` (default: solo en producción) y la tabla de jobs existe."""
+    if not is_true(os.getenv("BOT_INBOUND_ASYNC"), default=_is_production_env()):
+        return False
+    return jobs_table_ready()
+
+
+def sandbox_auto_reply_skip_reason(*, enabled: bool, paused: bool, owner_only: bool, provider: str, whatsapp_enabled: bool, dry_run: bool, simulate: bool, allowlisted: bool, app_env: str) -> str:
+    if not enabled:
+        return "disabled"
+    if paused:
+        return "paused"
+    if not owner_only:
+        return "owner_only_false"
+    if provider != "meta_sandbox":
+        return "provider_not_meta_sandbox"
+    if not whatsapp_enabled:
+        return "whatsapp_disabled"
+    if dry_run:
+        return "dry_run_true"
+    if simulate:
+        return "simulate_true"
+    if not allowlisted:
+        return "allowlist_blocked"
+    if app_env in {"production", "prod"}:
+        return "production_blocked"
+    return "guard_not_active"
+
+
+def process_inbound_message(
+    *,
+    conversation: BotConversation,
+    inbound: BotMessage,
+    identity_status: str,
+    message_type: str,
+    phone_e164: str,
+    allowlisted: bool,
+    wa_message_id: str | None,
+    allow_autoreply_send: bool = True,
+    classify_intent_fn: Callable[..., dict[str, Any]] = classify_intent,
+    generate_safe_reply_fn: Callable[[str], str] = generate_safe_reply,
+    is_ai_enabled_fn: Callable[[], bool] = is_ai_enabled,
+    is_autoreply_enabled_fn: Callable[[], bool] = is_autoreply_enabled,
+    send_text_message_fn: Callable[[str, str], dict[str, Any]] = send_text_message,
+) -> dict[str, Any] | None:
+    """IA + revisión sandbox de un mensaje guardado. No hace commit.
+
+    Devuelve el item de auto-respuesta sandbox pendiente (para
+    ``run_sandbox_auto_replies`` después del commit) o ``None``.
+    """
+    process_inbound_ai_pipeline(
+        conversation=conversation,
+        inbound_message=inbound,
+        identity_status=identity_status,
+        message_type=message_type,
+        phone_e164=phone_e164,
+        allow_autoreply_send=allow_autoreply_send,
+        classify_intent_fn=classify_intent_fn,
+        generate_safe_reply_fn=generate_safe_reply_fn,
+        is_ai_enabled_fn=is_ai_enabled_fn,
+        is_autoreply_enabled_fn=is_autoreply_enabled_fn,
+        send_text_message_fn=send_text_message_fn,
+    )
+    review_created = False
+    review_reason = "sandbox_assistant_disabled"
+    review = None
+    try:
+        if is_sandbox_assistant_allowed():
+            from services.bot_sandbox_review_service import create_review_from_inbound
+
+            review = create_review_from_inbound(
+                conversation=conversation,
+                inbound_message=inbound,
+                identity_status=identity_status,
+            )
+            review_created = review is not None
+            review_reason = "created" if review_created else "unknown"
+            log_bot_event(
+                "whatsapp_webhook_review_created",
+                metadata={
+                    "wa_message_id": wa_message_id,
+                    "review_id": int(review.id) if review else None,
+                    "conversation_id": int(conversation.id),
+                    "inbound_message_id": int(inbound.id),
+                },
+            )
+        else:
+            review_reason = "sandbox_assistant_disabled"
+    except Exception as exc:
+        review_reason = f"create_failed:{exc.__class__.__name__}"
+        current_app.logger.exception("BOT_WHATSAPP_REVIEW_CREATE_FAILED")
+    if not review_created:
+        log_bot_event(
+            "whatsapp_webhook_review_skipped",
+            level="warning",
+            metadata={
+                "wa_message_id": wa_message_id,
+                "conversation_id": int(conversation.id),
+                "inbound_message_id": int(inbound.id),
+                "reason": review_reason,
+                "allowlisted": bool(allowlisted),
+                "wa_id": phone_e164,
+            },
+        )
+    if not (review_created and review is not None):
+        return None
+    env = str(os.getenv("APP_ENV", "development") or "development").strip().lower()
+    provider = str(os.getenv("BOT_REAL_WHATSAPP_PROVIDER", "fake") or "fake").strip().lower().replace("-", "_")
+    owner_only = is_true(os.getenv("BOT_REAL_WHATSAPP_OWNER_ONLY"), default=True)
+    whatsapp_enabled = is_true(os.getenv("WHATSAPP_ENABLED"), default=False)
+    dry_run = is_true(os.getenv("BOT_DRY_RUN"), default=True)
+    simulate = is_true(os.getenv("BOT_REAL_WHATSAPP_SIMULATE"), default=True)
+    enabled = bool(is_sandbox_auto_reply_enabled())
+    paused = bool(is_sandbox_auto_reply_paused())
+    active = bool(is_sandbox_auto_reply_active())
+    log_bot_event(
+        "sandbox_auto_reply_guard_checked",
+        metadata={
+            "enabled": bool(enabled),
+            "paused": bool(paused),
+            "owner_only": bool(owner_only),
+            "provider": provider,
+            "whatsapp_enabled": bool(whatsapp_enabled),
+            "dry_run": bool(dry_run),
+            "simulate": bool(simulate),
+            "allowlisted": bool(allowlisted),
+            "app_env": env,
+        },
+    )
+    if not active or not allowlisted or not allow_autoreply_send:
+        reason = "autoreply_not_allowed" if (active and allowlisted) else sandbox_auto_reply_skip_reason(
+            enabled=bool(enabled),
+            paused=bool(paused),
+            owner_only=bool(owner_only),
+            provider=provider,
+            whatsapp_enabled=bool(whatsapp_enabled),
+            dry_run=bool(dry_run),
+            simulate=bool(simulate),
+            allowlisted=bool(allowlisted),
+            app_env=env,
+        )
+        log_bot_event(
+            "sandbox_auto_reply_skipped",
+            metadata={
+                "wa_message_id": wa_message_id,
+                "conversation_id": int(conversation.id),
+                "review_id": int(review.id),
+                "reason": reason,
+            },
+        )
+        return None
+    return {
+        "review_id": int(review.id),
+        "conversation_id": int(conversation.id),
+        "wa_message_id": str(wa_message_id or ""),
+    }
+
+
+def run_sandbox_auto_replies(items: list[dict[str, Any]]) -> None:
+    """Aprueba y envía las auto-respuestas sandbox pendientes; un commit por item.
+
+    Con ``BOT_OUTBOUND_SENDER_ASYNC`` solo se aprueban: el envío lo hace ``bot-outbound``.
+    """
+    from models import BotSandboxOutbound
+
+    for item in items:
+        review_id = int(item.get("review_id") or 0)
+        if review_id <= 0:
+            continue
+        try:
+            review = BotSandboxReviewQueue.query.get(review_id)
+            if review is None:
+                continue
+            log_bot_event(
+                "sandbox_auto_reply_started",
+                metadata={
+                    "wa_message_id": str(item.get("wa_message_id") or ""),
+                    "conversation_id": int(item.get("conversation_id") or 0),
+                    "review_id": review_id,
+                },
+            )
+            _, outbound = auto_approve_review_in_sandbox(review=review)
+            db.session.flush()
+            outbox = None
+            if outbound is not None:
+                outbox = BotSandboxOutbound.query.filter_by(bot_message_id=int(outbound.id)).first()
+            log_bot_event(
+                "sandbox_auto_reply_outbox_created",
+                metadata={
+                    "outbox_id": int(outbox.id) if outbox else None,
+                    "outbound_message_id": int(outbound.id) if outbound else None,
+                },
+            )
+            if outbound_sender_enabled():
+                log_bot_event(
+                    "sandbox_auto_reply_queued_for_sender",
+                    metadata={"review_id": review_id, "outbox_id": int(outbox.id) if outbox else None},
+                )
+                db.session.commit()
+                continue
+            log_bot_event(
+                "sandbox_auto_reply_meta_send_attempt",
+                metadata={"review_id": review_id, "outbox_id": int(outbox.id) if outbox else None},
+            )
+            stats = run_sandbox_worker_once(batch_size=1, review_id=review_id, outbox_id=(int(outbox.id) if outbox else None))
+            if outbox is not None:
+                db.session.refresh(outbox)
+            if outbound is not None:
+                db.session.refresh(outbound)
+            raw_body = (outbox.outbound_response_raw if outbox is not None else None) or {}
+            wamid = str((getattr(outbound, "wa_message_id", "") or "")) or str((dict((outbox.payload_json or {}).get("audit") or {}).get("provider_message_id") or ""))
+            log_bot_event(
+                "sandbox_auto_reply_meta_send_response",
+                metadata={
+                    "http_status": (int(outbox.outbound_http_status) if (outbox is not None and outbox.outbound_http_status is not None) else None),
+                    "wamid": wamid or None,
+                    "raw_body": raw_body,
+                },
+            )
+            if int(stats.get("sent", 0)) >= 1 and wamid:
+                log_bot_event(
+                    "sandbox_auto_reply_sent",
+                    metadata={"review_id": review_id, "outbox_id": int(outbox.id) if outbox else None, "wamid": wamid},
+                )
+            else:
+                log_bot_event(
+                    "sandbox_auto_reply_failed",
+                    level="warning",
+                    metadata={
+                        "review_id": review_id,
+                        "outbox_id": int(outbox.id) if outbox else None,
+                        "stats": dict(stats or {}),
+                        "state": str(outbox.state or "") if outbox is not None else "",
+                        "failure_reason": str(outbox.failure_reason or "") if outbox is not None else "",
+                    },
+                )
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            log_bot_event(
+                "sandbox_auto_reply_failed",
+                level="warning",
+                metadata={
+                    "wa_message_id": str(item.get("wa_message_id") or ""),
+                    "conversation_id": int(item.get("conversation_id") or 0),
+                    "review_id": review_id,
+                    "error": f"{exc.__class__.__name__}:{exc}",
+                },
+            )
+            current_app.logger.exception("BOT_SANDBOX_AUTO_REPLY_FAILED")
+
+
+def enqueue_inbound_job(
+    *,
+    conversation: BotConversation,
+    inbound: BotMessage,
+    identity_status: str,
+    message_type: str,
+    phone_e164: str,
+    allowlisted: bool,
+    wa_message_id: str | None,
+) -> BotInboundJob:
+    """Agrega el job a la sesión (sin commit): se confirma junto con el mensaje."""
+    now = utc_now_naive()
+    job = BotInboundJob(
+        inbound_message_id=int(inbound.id),
+        conversation_id=int(conversation.id),
+        status=STATUS_QUEUED,
+        attempts=0,
+        payload_json={
+            "identity_status": str(identity_status or ""),
+            "message_type": str(message_type or "text"),
+            "phone_e164": str(phone_e164 or ""),
+            "allowlisted": bool(allowlisted),
+            "wa_message_id": str(wa_message_id or ""),
+        },
+        available_at=now,
+        created_at=now,
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def queue_depth() -> int:
+    return int(
+        db.session.query(func.count(BotInboundJob.id))
+        .filter(BotInboundJob.status == STATUS_QUEUED)
+        .scalar()
+        or 0
+    )
+
+
+def warn_if_backlogged() -> int:
+    """Log de contrapresión cuando la cola supera ``BOT_INBOUND_BACKLOG_WARN_DEPTH``."""
+    depth = queue_depth()
+    if depth >= _backlog_warn_depth():
+        log_bot_event("whatsapp_inbound_queue_backlog", level="warning", metadata={"queued": depth})
+    return depth
+
+
+def reap_expired_leases(*, lease_seconds: int | None = None, max_attempts: int | None = None) -> int:
+    """Devuelve a la cola los jobs ``running`` de workers que murieron."""
+    now = utc_now_naive()
+    cutoff = now - timedelta(seconds=int(lease_seconds or _lease_seconds()))
+    max_attempts = int(max_attempts or _max_attempts())
+    base = BotInboundJob.query.filter(
+        BotInboundJob.status == STATUS_RUNNING,
+        BotInboundJob.locked_at < cutoff,
+    )
+    dead = base.filter(BotInboundJob.attempts >= max_attempts).update(
+        {"status": STATUS_DEAD, "finished_at": now, "last_error": "lease_expired", "locked_by": None},
+        synchronize_session=False,
+    )
+    requeued = base.filter(BotInboundJob.attempts < max_attempts).update(
+        {"status": STATUS_QUEUED, "available_at": now, "locked_by": None, "locked_at": None},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return int(dead or 0) + int(requeued or 0)
+
+
+def _conversation_head_clause():
+    """Sin otro job vivo anterior de la misma conversación (orden por conversación)."""
+    earlier = aliased(BotInboundJob)
+    return ~exists().where(
+        and_(
+            earlier.conversation_id == BotInboundJob.conversation_id,
+            earlier.id < BotInboundJob.id,
+            earlier.status.in_(_LIVE_STATUSES),
+        )
+    )
+
+
+def claim_jobs(*, batch_size: int = 10, worker_id: str | None = None) -> list[int]:
+    now = utc_now_naive()
+    query = (
+        db.session.query(BotInboundJob.id)
+        .filter(BotInboundJob.status == STATUS_QUEUED)
+        .filter(BotInboundJob.available_at <= now)
+        .filter(_conversation_head_clause())
+        .order_by(BotInboundJob.id.asc())
+        .limit(max(1, int(batch_size)))
+    )
+    if _dialect() == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    claimed: list[int] = []
+    owner = (worker_id or _worker_id())[:80]
+    for (job_id,) in query.all():
+        rows = (
+            BotInboundJob.query
+            .filter(BotInboundJob.id == int(job_id), BotInboundJob.status == STATUS_QUEUED)
+            .update(
+                {
+                    "status": STATUS_RUNNING,
+                    "locked_by": owner,
+                    "locked_at": now,
+                    "attempts": BotInboundJob.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        if int(rows or 0) > 0:
+            claimed.append(int(job_id))
+    db.session.commit()
+    return claimed
+
+
+def _finish_owned_job(job_id: int, *, owner: str, attempt: int, values: dict[str, Any]) -> bool:
+    """Escribe el desenlace solo si el job sigue siendo de este worker e intento. No hace commit."""
+    rows = (
+        BotInboundJob.query
+        .filter(*owned_job_clauses(BotInboundJob.__table__, job_id=job_id, owner=owner, attempt=attempt))
+        .update(values, synchronize_session=False)
+    )
+    return int(rows or 0) > 0
+
+
+def _log_fenced(job_id: int, *, owner: str, attempt: int) -> str:
+    log_bot_event(
+        "whatsapp_inbound_job_fenced",
+        level="warning",
+        metadata={"job_id": int(job_id), "owner": owner, "attempts": attempt},
+    )
+    return "fenced"
+
+
+def _process_job(job_id: int, *, max_attempts: int, max_backoff_seconds: int, lease_seconds: float | None = None) -> str:
+    job = db.session.get(BotInboundJob, int(job_id))
+    if job is None:
+        return "missing"
+    payload = dict(job.payload_json or {})
+    attempts = int(job.attempts or 0)
+    owner = str(job.locked_by or "")
+    inbound = db.session.get(BotMessage, int(job.inbound_message_id))
+    conversation = db.session.get(BotConversation, int(job.conversation_id))
+    if inbound is None or conversation is None:
+        values = {
+            "status": STATUS_DEAD,
+            "finished_at": utc_now_naive(),
+            "locked_by": None,
+            "last_error": "inbound_or_conversation_missing",
+        }
+        owned = _finish_owned_job(job_id, owner=owner, attempt=attempts, values=values)
+        db.session.commit()
+        return STATUS_DEAD if owned else _log_fenced(job_id, owner=owner, attempt=attempts)
+
+    max_age = _autoreply_max_age_seconds()
+    age_seconds = max(0, int((utc_now_naive() - job.created_at).total_seconds())) if job.created_at else 0
+    # Un job re-encolado a mano ya pudo haber respondido en un intento anterior.
+    requeued = bool(payload.get("requeued"))
+    allow_send = not requeued and attempts <= 1 and (max_age <= 0 or age_seconds <= max_age)
+    if not allow_send:
+        log_bot_event(
+            "whatsapp_inbound_autoreply_shed",
+            level="warning",
+            metadata={"job_id": int(job_id), "attempts": attempts, "age_seconds": age_seconds, "requeued": requeued},
+        )
+    lease = float(lease_seconds or _lease_seconds())
+    heartbeat = LeaseHeartbeat(
+        db.engine,
+        BotInboundJob.__table__,
+        job_id=int(job_id),
+        owner=owner,
+        attempt=attempts,
+        interval_seconds=lease / 3.0,
+    )
+    try:
+        with heartbeat:
+            pending = process_inbound_message(
+                conversation=conversation,
+                inbound=inbound,
+                identity_status=str(payload.get("identity_status") or ""),
+                message_type=str(payload.get("message_type") or "text"),
+                phone_e164=str(payload.get("phone_e164") or conversation.phone_e164 or ""),
+                allowlisted=bool(payload.get("allowlisted")),
+                wa_message_id=(payload.get("wa_message_id") or None),
+                allow_autoreply_send=allow_send,
+            )
+        values = {"status": STATUS_DONE, "finished_at": utc_now_naive(), "locked_by": None, "last_error": None}
+        if not _finish_owned_job(job_id, owner=owner, attempt=attempts, values=values):
+            # Otro worker ya tiene el job: se descarta lo de este intento, sin auto-respuesta.
+            db.session.rollback()
+            return _log_fenced(job_id, owner=owner, attempt=attempts)
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        logger.exception("bot_inbound.job_failed job_id=%s", int(job_id))
+        now = utc_now_naive()
+        values = {
+            "last_error": f"{type(exc).__name__}: {exc}"[:500],
+            "locked_by": None,
+            "locked_at": None,
+        }
+        if attempts >= max_attempts:
+            status = STATUS_DEAD
+            values.update(status=STATUS_DEAD, finished_at=now)
+        else:
+            status = STATUS_QUEUED
+            values.update(
+                status=STATUS_QUEUED,
+                available_at=now + timedelta(seconds=_retry_delay_seconds(attempts, max_backoff_seconds)),
+            )
+        owned = _finish_owned_job(job_id, owner=owner, attempt=attempts, values=values)
+        db.session.commit()
+        return status if owned else _log_fenced(job_id, owner=owner, attempt=attempts)
+    if pending:
+        run_sandbox_auto_replies([pending])
+    return STATUS_DONE
+
+
+def run_inbound_once(
+    *,
+    batch_size: int = 10,
+    max_attempts: int | None = None,
+    max_backoff_seconds: int = 120,
+) -> dict[str, int]:
+    stats = {"reaped": 0, "picked": 0, "done": 0, "retried": 0, "dead": 0, "fenced": 0}
+    if not jobs_table_ready():
+        return stats
+    max_attempts = int(max_attempts or _max_attempts())
+    stats["reaped"] = reap_expired_leases(max_attempts=max_attempts)
+    job_ids = claim_jobs(batch_size=batch_size)
+    stats["picked"] = len(job_ids)
+    for job_id in job_ids:
+        outcome = _process_job(job_id, max_attempts=max_attempts, max_backoff_seconds=max_backoff_seconds)
+        if outcome == STATUS_DONE:
+            stats["done"] += 1
+        elif outcome == STATUS_QUEUED:
+            stats["retried"] += 1
+        elif outcome == STATUS_DEAD:
+            stats["dead"] += 1
+        elif outcome == "fenced":
+            stats["fenced"] += 1
+        db.session.remove()
+    return stats
+
+
+def run_inbound_loop(
+    *,
+    batch_size: int = 10,
+    poll_seconds: float = 0.3,
+    once: bool = False,
+    until_empty: bool = False,
+    max_attempts: int | None = None,
+) -> dict[str, int]:
+    summary = {"cycles": 0, "reaped": 0, "picked": 0, "done": 0, "retried": 0, "dead": 0, "fenced": 0}
+    while True:
+        stats = run_inbound_once(batch_size=batch_size, max_attempts=max_attempts)
+        summary["cycles"] += 1
+        for key, value in stats.items():
+            summary[key] += int(value or 0)
+        if once or (until_empty and not stats["picked"]):
+            return summary
+        if not stats["picked"]:
+            time.sleep(max(0.05, float(poll_seconds)))
+
+
+def inbound_queue_stats() -> dict[str, Any]:
+    rows = (
+        db.session.query(BotInboundJob.status, func.count(BotInboundJob.id), func.min(BotInboundJob.created_at))
+        .group_by(BotInboundJob.status)
+        .all()
+    )
+    now = utc_now_naive()
+    counts = {str(status): int(count or 0) for status, count, _ in rows}
+    oldest = next((first for status, _, first in rows if status == STATUS_QUEUED and first is not None), None)
+    blocked_conversations = int(
+        db.session.query(func.count(func.distinct(BotInboundJob.conversation_id)))
+        .filter(BotInboundJob.status == STATUS_QUEUED)
+        .scalar()
+        or 0
+    )
+    return {
+        "counts": counts,
+        "oldest_queued_seconds": max(0, int((now - oldest).total_seconds())) if oldest is not None else None,
+        "conversations_waiting": blocked_conversations,
+    }
+
+
+def requeue_jobs(*, job_id: int | None = None, all_dead: bool = False) -> int:
+    """Re-encola a mano; el job reprocesa el mensaje pero nunca vuelve a auto-responder.
+
+    ``attempts`` vuelve a 0 para darle su presupuesto de reintentos; los
+    intentos previos y el último error quedan en ``payload_json``.
+    """
+    query = BotInboundJob.query
+    if job_id:
+        query = query.filter(BotInboundJob.id == int(job_id))
+    elif all_dead:
+        query = query.filter(BotInboundJob.status == STATUS_DEAD)
+    else:
+        return 0
+    now = utc_now_naive()
+    jobs = query.filter(BotInboundJob.status != STATUS_RUNNING).all()
+    for job in jobs:
+        payload = dict(job.payload_json or {})
+        payload["requeued"] = True
+        payload["requeue_count"] = int(payload.get("requeue_count") or 0) + 1
+        payload["attempts_before_requeue"] = int(payload.get("attempts_before_requeue") or 0) + int(job.attempts or 0)
+        if job.last_error:
+            payload["last_error_before_requeue"] = str(job.last_error)[:500]
+        job.payload_json = payload
+        job.status = STATUS_QUEUED
+        job.attempts = 0
+        job.available_at = now
+        job.locked_by = None
+        job.locked_at = None
+        job.finished_at = None
+    db.session.commit()
+    return len(jobs)
+
+
+@click.group("bot-inbound")
+def bot_inbound_cli():
+    """Worker de mensajes entrantes de WhatsApp (IA + envíos fuera del webhook)."""
+
+
+@bot_inbound_cli.command("run")
+@click.option("--once", is_flag=True, default=False, help="Ejecuta un solo ciclo.")
+@click.option("--batch-size", default=10, show_default=True, type=int, help="Jobs reclamados por ciclo.")
+@click.option("--poll-seconds", default=0.3, show_default=True, type=float, help="Pausa con la cola vacía.")
+@click.option("--max-attempts", default=0, type=int, help="0 = BOT_INBOUND_MAX_ATTEMPTS (5).")
+@with_appcontext
+def bot_inbound_run_command(once: bool, batch_size: int, poll_seconds: float, max_attempts: int):
+    stats = run_inbound_loop(
+        batch_size=max(1, int(batch_size)),
+        poll_seconds=max(0.05, float(poll_seconds)),
+        once=bool(once),
+        max_attempts=int(max_attempts) or None,
+    )
+    click.echo(" ".join(f"{key}={int(value)}" for key, value in stats.items()))
+
+
+@bot_inbound_cli.command("drain")
+@click.option("--batch-size", default=20, show_default=True, type=int)
+@with_appcontext
+def bot_inbound_drain_command(batch_size: int):
+    """Procesa en este proceso hasta vaciar la cola (jobs disponibles ya)."""
+    stats = run_inbound_loop(batch_size=max(1, int(batch_size)), until_empty=True)
+    click.echo(" ".join(f"{key}={int(value)}" for key, value in stats.items()))
+
+
+@bot_inbound_cli.command("stats")
+@with_appcontext
+def bot_inbound_stats_command():
+    """Conteo por estado, antigüedad del job en cola más viejo y conversaciones esperando."""
+    stats = inbound_queue_stats()
+    parts = " ".join(f"{status}={stats['counts'].get(status, 0)}" for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_DEAD))
+    oldest = stats["oldest_queued_seconds"]
+    click.echo(
+        f"{parts} oldest_queued_s={oldest if oldest is not None else '-'} "
+        f"conversations_waiting={stats['conversations_waiting']}"
+    )
+
+
+@bot_inbound_cli.command("requeue")
+@click.option("--id", "job_id", default=0, type=int, help="ID del job.")
+@click.option("--all-dead", is_flag=True, default=False, help="Re-encola todos los jobs muertos.")
+@with_appcontext
+def bot_inbound_requeue_command(job_id: int, all_dead: bool):
+    if bool(job_id) == bool(all_dead):
+        raise click.ClickException("Debes indicar exactamente uno: --id o --all-dead.")
+    click.echo(f"requeued={requeue_jobs(job_id=job_id or None, all_dead=all_dead)}")
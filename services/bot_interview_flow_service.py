@@ -5,8 +5,8 @@ import os
 import re
 from typing import Any
 
-import requests
 from models import BotConversation
+from services import outbound_http_service as outbound_http
 from services.bot_candidate_draft_service import get_or_create_interview_flow_draft
 from services.bot_observability_service import log_bot_event
 from utils.timezone import utc_now_naive
@@ -419,8 +419,11 @@ def _openai_chat_json(*, system_prompt: str, user_payload: dict[str, Any]) -> di
     max_tokens = int(str(os.getenv("BOT_AI_MAX_TOKENS") or "180").strip() or "180")
     if not api_key:
         raise ValueError("missing_api_key")
-    resp = requests.post(
-        "https://api.openai.com/v1/chat/completions",
+    base = (os.getenv("BOT_AI_BASE_URL") or "https://api.openai.com/v1").strip().rstrip("/")
+    resp = outbound_http.post(
+        outbound_http.PROVIDER_OPENAI,
+        f"{base}/chat/completions",
+        endpoint="interview_chat_completions",
         headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
         json={
             "model": model,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 import time
 from contextlib import contextmanager
 from typing import Any
@@ -7,6 +8,15 @@ from typing import Any
 from flask import current_app
 
 from utils.audit_logger import log_action
+from utils.process_metrics import ProcessMetricsPublisher
+
+
+CACHE_OUTCOMES = ("lru", "backplane", "miss", "bypass")
+CACHE_METRICS_INDEX_KEY = "bot_obs:cache_metrics:index:v1"
+CACHE_METRICS_KEY_PREFIX = "bot_obs:cache_metrics:v1:"
+
+_CACHE_COUNTERS: dict[str, dict[str, int]] = {}
+_CACHE_LOCK = threading.Lock()
 
 
 def _logger():
@@ -64,3 +74,46 @@ def bot_timing(event: str, *, metadata: dict[str, Any] | None = None):
         payload = dict(metadata or {})
         payload["elapsed_ms"] = elapsed_ms
         log_bot_event(f"{event}.ok", metadata=payload)
+
+
+def record_cache_lookup(cache_name: str, outcome: str) -> None:
+    """Cuenta una consulta a un cache del bot: ``lru``/``backplane`` (hit), ``miss`` o ``bypass``."""
+    with _CACHE_LOCK:
+        counters = _CACHE_COUNTERS.setdefault(str(cache_name), {key: 0 for key in CACHE_OUTCOMES})
+        counters[outcome] = int(counters.get(outcome) or 0) + 1
+    _CACHE_METRICS.maybe_publish()
+
+
+def local_cache_counters() -> dict[str, dict[str, int]]:
+    with _CACHE_LOCK:
+        return {name: dict(counters) for name, counters in _CACHE_COUNTERS.items()}
+
+
+_CACHE_METRICS = ProcessMetricsPublisher(
+    index_key=CACHE_METRICS_INDEX_KEY,
+    key_prefix=CACHE_METRICS_KEY_PREFIX,
+    collect=local_cache_counters,
+    context="bot_cache_metrics",
+)
+
+
+def reset_cache_metrics() -> None:
+    with _CACHE_LOCK:
+        _CACHE_COUNTERS.clear()
+    _CACHE_METRICS.reset()
+
+
+def cache_metrics_snapshot() -> dict[str, Any]:
+    """Hits por tier, misses y hit rate de los caches del bot, sumado entre procesos (backplane)."""
+    snapshots = _CACHE_METRICS.snapshots()
+    merged: dict[str, dict[str, Any]] = {}
+    for snap in snapshots:
+        for name, counters in (snap or {}).items():
+            out = merged.setdefault(name, {key: 0 for key in CACHE_OUTCOMES})
+            for key in CACHE_OUTCOMES:
+                out[key] += int((counters or {}).get(key) or 0)
+    for out in merged.values():
+        lookups = sum(out[key] for key in CACHE_OUTCOMES)
+        out["lookups"] = lookups
+        out["hit_rate"] = round((out["lru"] + out["backplane"]) / lookups, 4) if lookups else None
+    return {"processes": sum(1 for snap in snapshots if snap), "caches": merged}
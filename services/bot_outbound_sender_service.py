@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""Sender de salidas WhatsApp: drena ``bot_sandbox_outbox`` en su propio proceso.
+
+Las auto-respuestas sandbox y las aprobaciones de revisión solo encolan
+(``enqueue_sandbox_outbound``); ``flask bot-outbound run`` las envía por lotes:
+
+- Mismas guardas que ``run_sandbox_worker_once`` (kill switch, allowlist,
+  revisión, duplicados ya enviados): se comparten las funciones.
+- Un mensaje por destinatario por ciclo, para no desordenar respuestas
+  seguidas a la misma persona: el reclamo solo trae la fila más vieja de cada
+  número, así un número con muchas filas no deja sin lugar a los demás.
+- Coalescencia: mismo texto al mismo número ya enviado hace menos de
+  ``BOT_OUTBOUND_COALESCE_SECONDS`` se bloquea como ``coalesced_duplicate:<id>``.
+- Token bucket por phone-number-id (``BOT_OUTBOUND_RATE_PER_SECOND`` /
+  ``BOT_OUTBOUND_RATE_BURST``); sin ficha la fila queda en cola. La ficha se
+  toma después de las guardas, así una fila bloqueada no gasta cupo. Un 429 o
+  error de throttling de Meta vacía el bucket por ``BOT_OUTBOUND_THROTTLE_PAUSE_SECONDS``.
+- Los envíos reales de un lote salen en paralelo (hilos con app context,
+  acotados por el tope de ``outbound_http``); los resultados se aplican y se
+  confirman en el hilo principal.
+
+Con ``BOT_OUTBOUND_SENDER_ASYNC`` apagado (default) el webhook y el admin
+siguen enviando en línea con ``run_sandbox_worker_once``. Los dos reclaman
+con ``FOR UPDATE SKIP LOCKED``: si conviven, nunca envían la misma fila.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from config_app import db
+from models import BotSandboxOutbound
+import services.outbound_http_service as outbound_http
+from services.bot_observability_service import log_bot_event
+from services.bot_sandbox_service import (
+    OUTBOX_STATUS_BLOCKED,
+    OUTBOX_STATUS_QUEUED,
+    OUTBOX_STATUS_SIMULATED_SENT,
+    _mask_phone,
+    _provider_send,
+    _set_state,
+    _state_transition_allowed,
+    apply_offline_send,
+    apply_provider_result,
+    claim_due_outbox_rows,
+    max_outbox_retries,
+    outbox_row_mode,
+    outbox_row_text,
+    prepare_outbox_row,
+    provider_timeout_seconds,
+    recover_orphan_processing_rows,
+    sandbox_metrics_snapshot,
+    sandbox_outbound_active,
+)
+from utils.runtime_config import env_float, is_true
+from utils.timezone import utc_now_naive
+
+
+_THROTTLE_ERROR_CODES = {"429", "4", "80007", "130429", "131056"}
+
+_BUCKETS: dict[str, "TokenBucket"] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def outbound_sender_enabled() -> bool:
+    return is_true(os.getenv("BOT_OUTBOUND_SENDER_ASYNC"))
+
+
+class TokenBucket:
+    """Token bucket simple: ``rate`` fichas por segundo, hasta ``burst`` acumuladas."""
+
+    def __init__(self, rate: float, burst: float, *, clock=time.monotonic):
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, amount: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens < amount:
+                return False
+            self._tokens -= amount
+            return True
+
+    def penalize(self, seconds: float) -> None:
+        """Deja el bucket en negativo: no entrega fichas durante ``seconds``."""
+        with self._lock:
+            self._refill()
+            self._tokens = -max(0.0, float(seconds)) * self.rate
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+def get_bucket(key: str) -> TokenBucket:
+    rate = env_float("BOT_OUTBOUND_RATE_PER_SECOND", 20.0, min_value=0.001)
+    burst = env_float("BOT_OUTBOUND_RATE_BURST", rate, min_value=1.0)
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None or bucket.rate != rate or bucket.burst != burst:
+            bucket = TokenBucket(rate, burst)
+            _BUCKETS[key] = bucket
+        return bucket
+
+
+def reset_buckets() -> None:
+    with _BUCKETS_LOCK:
+        _BUCKETS.clear()
+
+
+def phone_number_id_for(row: BotSandboxOutbound) -> str:
+    metadata = dict((dict(row.payload_json or {}).get("metadata") or {}))
+    return (
+        str(metadata.get("phone_number_id") or "").strip()
+        or (os.getenv("WHATSAPP_PHONE_NUMBER_ID") or "").strip()
+        or str(row.provider or "fake")
+    )
+
+
+def _is_throttled(result: dict[str, Any]) -> bool:
+    raw = dict(result.get("raw") or {})
+    return str(raw.get("http_status") or "") == "429" or str(result.get("error_code") or "") in _THROTTLE_ERROR_CODES
+
+
+def _recently_sent_by_key(phones: set[str], *, window_seconds: float) -> dict[tuple[str, str], int]:
+    if not phones or window_seconds <= 0:
+        return {}
+    threshold = utc_now_naive() - timedelta(seconds=window_seconds)
+    rows = (
+        BotSandboxOutbound.query.filter(BotSandboxOutbound.state == OUTBOX_STATUS_SIMULATED_SENT)
+        .filter(BotSandboxOutbound.phone_e164.in_(sorted(phones)))
+        .filter(BotSandboxOutbound.simulated_sent_at >= threshold)
+        .order_by(BotSandboxOutbound.id.asc())
+        .all()
+    )
+    return {(str(r.phone_e164 or ""), outbox_row_text(r)): int(r.id) for r in rows}
+
+
+def _send_concurrently(app, rows: list[BotSandboxOutbound]) -> list[dict[str, Any]]:
+    timeout_seconds = provider_timeout_seconds()
+    calls = [(str(r.provider or "fake"), str(r.phone_e164 or ""), outbox_row_text(r)) for r in rows]
+
+    def _one(call: tuple[str, str, str]) -> dict[str, Any]:
+        provider, to_phone, text = call
+        with app.app_context():
+            try:
+                return _provider_send(provider, to_phone=to_phone, text=text, timeout_seconds=timeout_seconds)
+            except Exception as exc:
+                return {"ok": False, "status": "failed", "error_code": "provider_exception", "error_message": f"{exc.__class__.__name__}:{exc}"[:255]}
+
+    if len(calls) == 1:
+        return [_one(calls[0])]
+    workers = max(1, min(len(calls), outbound_http.get_client(outbound_http.PROVIDER_WHATSAPP).max_concurrency))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot-outbound") as pool:
+        return list(pool.map(_one, calls))
+
+
+def run_outbound_sender_once(*, batch_size: int = 50) -> dict[str, int]:
+    stats = {
+        "picked": 0,
+        "sent": 0,
+        "failed": 0,
+        "blocked": 0,
+        "retried": 0,
+        "recovered": 0,
+        "skipped": 0,
+        "coalesced": 0,
+        "deferred": 0,
+        "throttled": 0,
+    }
+    if not sandbox_outbound_active():
+        return stats
+
+    stats["recovered"] = recover_orphan_processing_rows()
+    rows = claim_due_outbox_rows(batch_size=batch_size, skip_locked=True, first_per_phone=True)
+    stats["picked"] = len(rows)
+    if not rows:
+        db.session.commit()
+        return stats
+
+    coalesce_seconds = env_float("BOT_OUTBOUND_COALESCE_SECONDS", 30.0)
+    recent = _recently_sent_by_key({str(r.phone_e164 or "") for r in rows}, window_seconds=coalesce_seconds)
+    max_retries = max_outbox_retries()
+    phones_in_batch: set[str] = set()
+    exhausted_keys: set[str] = set()
+    to_send: list[BotSandboxOutbound] = []
+
+    for row in rows:
+        phone = str(row.phone_e164 or "")
+        original_id = recent.get((phone, outbox_row_text(row)))
+        if original_id and _state_transition_allowed(str(row.state), OUTBOX_STATUS_BLOCKED):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason=f"coalesced_duplicate:{original_id}")
+            stats["coalesced"] += 1
+            log_bot_event("outbound_sender_coalesced", metadata={"outbox_id": int(row.id), "original_outbox_id": original_id})
+            continue
+        if phone in phones_in_batch:
+            stats["deferred"] += 1
+            continue
+        real = outbox_row_mode(row) == "real_sandbox"
+        key = phone_number_id_for(row) if real else ""
+        if real and (key in exhausted_keys or get_bucket(key).tokens < 1.0):
+            exhausted_keys.add(key)
+            stats["deferred"] += 1
+            continue
+        phones_in_batch.add(phone)
+        if not prepare_outbox_row(row, stats, max_retries=max_retries):
+            continue
+        if not real:
+            apply_offline_send(row, stats)
+            continue
+        if not get_bucket(key).try_take():
+            # Otro hilo se llevó la última ficha entre la consulta y las guardas.
+            exhausted_keys.add(key)
+            _set_state(row, OUTBOX_STATUS_QUEUED)
+            stats["deferred"] += 1
+            continue
+        to_send.append(row)
+
+    if to_send:
+        for row in to_send:
+            log_bot_event("real_sandbox_outbound_attempt", metadata={"outbox_id": row.id, "provider": row.provider, "to": _mask_phone(row.phone_e164)})
+        results = _send_concurrently(current_app._get_current_object(), to_send)
+        pause_seconds = env_float("BOT_OUTBOUND_THROTTLE_PAUSE_SECONDS", 5.0)
+        for row, result in zip(to_send, results):
+            apply_provider_result(row, result, stats)
+            if not bool(result.get("ok")) and _is_throttled(result):
+                stats["throttled"] += 1
+                get_bucket(phone_number_id_for(row)).penalize(pause_seconds)
+
+    db.session.commit()
+    log_bot_event("outbound_sender.cycle", metadata=stats)
+    return stats
+
+
+def run_outbound_sender_loop(
+    *,
+    batch_size: int = 50,
+    poll_seconds: float = 0.3,
+    once: bool = False,
+    until_empty: bool = False,
+) -> dict[str, int]:
+    summary: dict[str, int] = {}
+    cycles = 0
+    while True:
+        stats = run_outbound_sender_once(batch_size=batch_size)
+        cycles += 1
+        for key, value in stats.items():
+            summary[key] = summary.get(key, 0) + int(value or 0)
+        progressed = stats["picked"] > stats["deferred"]
+        if once or (until_empty and not progressed):
+            summary["cycles"] = cycles
+            return summary
+        if not progressed:
+            time.sleep(max(0.05, float(poll_seconds)))
+
+
+@click.group("bot-outbound")
+def bot_outbound_cli():
+    """Sender de salidas WhatsApp (bot_sandbox_outbox) por lotes y con rate limit."""
+
+
+@bot_outbound_cli.command("run")
+@click.option("--once", is_flag=True, default=False, help="Ejecuta un solo ciclo.")
+@click.option("--batch-size", default=50, show_default=True, type=int, help="Filas reclamadas por ciclo.")
+@click.option("--poll-seconds", default=0.3, show_default=True, type=float, help="Pausa sin trabajo disponible.")
+@with_appcontext
+def bot_outbound_run_command(once: bool, batch_size: int, poll_seconds: float):
+    stats = run_outbound_sender_loop(
+        batch_size=max(1, int(batch_size)),
+        poll_seconds=max(0.05, float(poll_seconds)),
+        once=bool(once),
+    )
+    click.echo(" ".join(f"{key}={int(value)}" for key, value in stats.items()))
+
+
+@bot_outbound_cli.command("stats")
+@with_appcontext
+def bot_outbound_stats_command():
+    """Profundidad de cola y latencias cola->envío / envío->entregado (p50/p95)."""
+    metrics = sandbox_metrics_snapshot()
+    latency = metrics["delivery_latency"]
+    click.echo(
+        f"queued={metrics['queued']} processing={metrics['processing']} failed={metrics['failed']} "
+        f"oldest_queued_s={metrics['queue_oldest_age_seconds']:.1f} "
+        f"queue_to_sent_ms_p50={latency['queue_to_sent_ms']['p50']} queue_to_sent_ms_p95={latency['queue_to_sent_ms']['p95']} "
+        f"sent_to_delivered_ms_p50={latency['sent_to_delivered_ms']['p50']} sent_to_delivered_ms_p95={latency['sent_to_delivered_ms']['p95']}"
+    )
@@ -7,6 +7,7 @@ from typing import Any
 
 import requests
 
+from services import outbound_http_service as outbound_http
 from services.whatsapp_cloud_service import is_whatsapp_enabled
 
 _MAX_REPLY_CHARS = 250
@@ -123,8 +124,11 @@ def _call_provider(*, prompt: str, timeout_seconds: int, max_tokens: int) -> str
     if not api_key:
         raise PracticeAIReplyError("provider_not_configured")
 
-    response = requests.post(
-        "https://api.openai.com/v1/chat/completions",
+    base = (os.getenv("BOT_AI_BASE_URL") or "https://api.openai.com/v1").strip().rstrip("/")
+    response = outbound_http.post(
+        outbound_http.PROVIDER_OPENAI,
+        f"{base}/chat/completions",
+        endpoint="practice_chat_completions",
         headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
         json={
             "model": model,
@@ -2,13 +2,21 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import logging
 import re
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+from utils.runtime_config import env_float
+
+logger = logging.getLogger(__name__)
+
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "bot_protocol_domesticas_v1.json"
 SUPPORTED_CITIES = ("santiago", "puerto plata")
 YES_WORDS = ("si", "sí", "yes", "ok", "claro")
@@ -146,15 +154,134 @@ SKILL_EXPERIENCE_HINTS = ("se ", "trabaje", "trabajé", "experiencia", "hago", "
 CEDULA_CONTEXT_HINTS = ("cedula", "cédula", "documento", "identidad")
 
 
-@lru_cache(maxsize=1)
-def load_protocol() -> dict[str, Any]:
-    try:
-        with DATA_PATH.open("r", encoding="utf-8") as fh:
-            payload = json.load(fh)
-    except FileNotFoundError as exc:
-        raise ValueError(f"Protocolo no encontrado: {DATA_PATH}") from exc
-    except json.JSONDecodeError as exc:
-        raise ValueError(f"Protocolo inválido (JSON): {exc}") from exc
+def _normalize_text(value: str) -> str:
+    txt = (value or "").strip().lower()
+    txt = txt.replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u")
+    return _RE_WHITESPACE.sub(" ", txt)
+
+
+class _PhraseMatcher:
+    """Conjunto de frases compilado en una sola regex (alternancia de literales).
+
+    ``word_bounded=True``: frases normalizadas, palabras sueltas con ``\\b`` y
+    frases de varias palabras como substring.
+    Sin él replica ``any(h in text for h in phrases)``.
+    """
+
+    __slots__ = ("_regex",)
+
+    def __init__(self, phrases: Any, *, word_bounded: bool = False):
+        terms: set[str] = set()
+        for phrase in phrases or ():
+            term = _normalize_text(str(phrase)) if word_bounded else str(phrase)
+            if term:
+                terms.add(term)
+        parts = []
+        for term in sorted(terms, key=lambda t: (-len(t), t)):
+            escaped = re.escape(term)
+            parts.append(rf"\b{escaped}\b" if (word_bounded and " " not in term) else escaped)
+        self._regex = re.compile("|".join(parts)) if parts else None
+
+    def search(self, text: str) -> bool:
+        return bool(self._regex is not None and text and self._regex.search(text))
+
+
+# Patrones y conjuntos de frases compilados una vez por proceso (camino caliente por mensaje).
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_SHORT_ACK = re.compile(r"\b(ta bien|okey|okay|aja|ok)\b")
+_RE_SHORT_ACK_NO_OK = re.compile(r"\b(ta bien|okey|okay|aja)\b")
+_RE_ACCEPT = re.compile(r"\b(acepto|aceptar|aceptado)\b")
+_RE_NO = re.compile(r"\bno\b")
+_RE_SI = re.compile(r"\b(si|sí)\b")
+_RE_REJECT_25 = re.compile(r"\b(no acepto|no voy a aceptar|no quiero aceptar|no el 25|no 25|no al 25)\b")
+_RE_25 = re.compile(r"\b25\b|\b25\s*por\s*ciento\b|\bveinti\s*cinco\b|\bveinticinco\b")
+_RE_TWO_DIGITS = re.compile(r"\b([1-9][0-9])\b")
+_RE_CEDULA = re.compile(r"\b(\d{3})[-\s]?(\d{7})[-\s]?(\d)\b")
+_RE_PHONE_DIGITS = re.compile(r"\b\d{7,11}\b")
+_RE_NON_DIGIT_SPACE = re.compile(r"[^0-9 ]")
+_RE_NON_DIGIT = re.compile(r"\D")
+_RE_ROUTE = re.compile(r"\bruta\s+([a-z0-9]+)\b")
+_RE_MY_ROUTE = re.compile(r"\bmi\s+ruta\s+es\s+(?:la\s+)?([a-z0-9]+)\b")
+_RE_GOING = re.compile(r"\b(voy|llego|transporte)\b")
+_RE_PHONE_CONTINUATION = re.compile(r"\b(su|el)\s+numero\s+es\b")
+_RE_ALNUM_TOKENS = re.compile(r"[a-z0-9]+")
+_RE_NAME_TOKENS = re.compile(r"[a-zñ]+")
+_RE_AGE_PATTERNS = (
+    re.compile(r"\btengo\s+([1-9][0-9])\s*(?:anos|año|años)?\b"),
+    re.compile(r"\b([1-9][0-9])\s*(?:anos|año|años)\b"),
+    re.compile(r"\bedad\s*(?:es|:)?\s*([1-9][0-9])\b"),
+)
+_RE_NAME_PATTERNS = (
+    re.compile(r"\bme\s+(?:llamo|yamo)\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})(?=\s+tengo\b|\s+edad\b|$)"),
+    re.compile(r"\bme llamo\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})"),
+    re.compile(r"\bmi nombre es\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})"),
+    re.compile(r"\bsoy\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})"),
+)
+_RE_AGE_WORDS = re.compile(
+    r"\b(?:tengo|edad\s*(?:es|:)?\s*)?((?:dieciocho|diecinueve|veinte|veinti[a-z]+|treinta(?:\s+y\s+[a-z]+)?"
+    r"|cuarenta(?:\s+y\s+[a-z]+)?|cincuenta|sesenta|setenta))(?:\s+anos|\s+ano|\s+años)?\b"
+)
+_RE_NOISE = re.compile(r"[\s\W_]+", flags=re.UNICODE)
+_RE_GREETING_TOKENS = re.compile(r"[a-z0-9?]+")
+_RE_CORRECTION_CUE = re.compile(r"^(?:no|nop|perdon|corrijo|quise\s+decir|digo|realmente|me\s+equivoque|mejor)\b")
+_RE_CORRECTION_PREFIX = re.compile(
+    r"^(?:no|nop|perdon|corrijo|quise\s+decir|digo|realmente|me\s+equivoque)\b(?:[\s,:-]+)?",
+)
+_RE_NAME_AGE_COMPACT = re.compile(r"\s*([a-zñ]+(?:\s+[a-zñ]+){0,2})\s+([1-9][0-9])(?:\s+|$)")
+
+_PERSONAL_POSITIVE_MATCHER = _PhraseMatcher(
+    [h for h in PERSONAL_CONFIRMATION_POSITIVE if h not in {"si", "sí", "sii"}], word_bounded=True
+)
+_PERSONAL_NEGATIVE_MATCHER = _PhraseMatcher([h for h in PERSONAL_CONFIRMATION_NEGATIVE if h != "no"], word_bounded=True)
+_CONFUSION_MATCHER = _PhraseMatcher(CONFUSION_PATTERNS, word_bounded=True)
+_WELCOME_DENY_MATCHER = _PhraseMatcher(WELCOME_FASTPATH_DENY_PATTERNS, word_bounded=True)
+_PERSONAL_DATA_HINTS_MATCHER = _PhraseMatcher(
+    ("me llamo", "mi nombre", "tengo", "anos", "año", "años", "edad", "cedula", "cédula", "telefono", "teléfono")
+)
+_POSITIVE_CONTINUE_MATCHER = _PhraseMatcher(POSITIVE_CONTINUE_HINTS)
+_WORK_TYPE_MATCHER = _PhraseMatcher(WORK_TYPE_HINTS + ("salida diaria",))
+_TRANSPORT_MATCHER = _PhraseMatcher(TRANSPORT_HINTS)
+_CITY_MATCHER = _PhraseMatcher(SUPPORTED_CITIES)
+_CITY_OR_SECTOR_MATCHER = _PhraseMatcher(SUPPORTED_CITIES + COMMON_SECTORS)
+_REFERENCE_MATCHER = _PhraseMatcher(REFERENCE_HINTS)
+_SKILL_MATCHER = _PhraseMatcher(SKILL_HINTS)
+_SKILL_EXPERIENCE_MATCHER = _PhraseMatcher(SKILL_EXPERIENCE_HINTS)
+_CEDULA_CONTEXT_MATCHER = _PhraseMatcher(CEDULA_CONTEXT_HINTS)
+_THIRD_PARTY_ADDRESS_MATCHER = _PhraseMatcher(("mi hermana vive", "mi mama vive", "mi madre vive", "mi hijo vive"))
+_ADDRESS_CUE_MATCHER = _PhraseMatcher(("vivo", "bibo", "soy de", "estoy en", "resido", "direccion", "dirección"))
+_REFERENCE_MISSING_PHONE_MATCHER = _PhraseMatcher(
+    ("no tengo numero", "no tengo telefono", "no se el numero", "no se su numero", "sin numero")
+)
+_REFERENCE_REFUSAL_MATCHER = _PhraseMatcher(
+    (
+        "no quiero dar referencia",
+        "no quiero dar referencias",
+        "no tengo referencia",
+        "no tengo referencias",
+        "prefiero no dar referencia",
+    )
+)
+
+
+@dataclass(frozen=True)
+class CompiledProtocol:
+    """Protocolo validado con índices por ``step_code`` y prompts ya armados."""
+
+    payload: dict[str, Any]
+    path: Path
+    sha256: str
+    steps_by_code: dict[str, dict[str, Any]]
+    next_by_code: dict[str, dict[str, Any] | None]
+    prompts_by_code: dict[str, str]
+    validations_by_code: dict[str, tuple[str, ...]]
+
+
+_PROTOCOL_LOCK = threading.Lock()
+_protocol_state: dict[str, Any] = {"compiled": None, "stat": None, "next_check_at": 0.0}
+PROTOCOL_RELOAD_CHECK_SECONDS = env_float("BOT_PROTOCOL_RELOAD_CHECK_SECONDS", 2.0)
+
+
+def _validate_protocol(payload: Any) -> dict[str, Any]:
     if not isinstance(payload, dict):
         raise ValueError("Protocolo inválido: raíz debe ser objeto")
     steps = payload.get("steps")
@@ -185,41 +312,128 @@ def load_protocol() -> dict[str, Any]:
     return payload
 
 
+def _render_step_prompt(step: dict[str, Any]) -> str:
+    messages = step.get("messages") or {}
+    primary = [str(x).strip() for x in (messages.get("primary") or []) if str(x).strip()]
+    secondary = [str(x).strip() for x in (messages.get("secondary") or []) if str(x).strip()]
+    warnings = [str(x).strip() for x in (messages.get("warnings") or []) if str(x).strip()]
+
+    lines: list[str] = []
+    lines.extend(primary)
+    lines.extend(secondary)
+    if warnings:
+        lines.append("Advertencia: " + " ".join(warnings))
+    return "\n".join(lines).strip() or "Sin mensaje configurado para esta etapa."
+
+
+def compile_protocol(payload: Any, *, path: Path | None = None, sha256: str = "") -> CompiledProtocol:
+    payload = _validate_protocol(payload)
+    steps = payload["steps"]
+    steps_by_code: dict[str, dict[str, Any]] = {}
+    next_by_code: dict[str, dict[str, Any] | None] = {}
+    for idx, step in enumerate(steps):
+        code = str(step.get("step_code") or "").upper()
+        # Igual que el recorrido lineal anterior: ante códigos repetidos gana el primero.
+        if code in steps_by_code:
+            continue
+        steps_by_code[code] = step
+        next_by_code[code] = steps[idx + 1] if idx + 1 < len(steps) else None
+    return CompiledProtocol(
+        payload=payload,
+        path=Path(path or DATA_PATH),
+        sha256=sha256,
+        steps_by_code=steps_by_code,
+        next_by_code=next_by_code,
+        prompts_by_code={code: _render_step_prompt(step) for code, step in steps_by_code.items()},
+        validations_by_code={
+            code: tuple(str(x).strip().lower() for x in (step.get("validations") or []))
+            for code, step in steps_by_code.items()
+        },
+    )
+
+
+def _read_compiled_protocol(path: Path, previous: CompiledProtocol | None) -> CompiledProtocol:
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError as exc:
+        raise ValueError(f"Protocolo no encontrado: {path}") from exc
+    digest = hashlib.sha256(raw).hexdigest()
+    if previous is not None and previous.path == path and previous.sha256 == digest:
+        return previous
+    try:
+        payload = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Protocolo inválido (JSON): {exc}") from exc
+    return compile_protocol(payload, path=path, sha256=digest)
+
+
+def compiled_protocol() -> CompiledProtocol:
+    """Protocolo compilado del proceso; se recompila solo si cambia el archivo (mtime/tamaño y hash).
+
+    El ``stat`` se revisa como mucho cada ``PROTOCOL_RELOAD_CHECK_SECONDS``. Si
+    una edición deja el archivo inválido se sigue sirviendo la última versión
+    buena de esa misma ruta.
+    """
+    state = _protocol_state
+    current: CompiledProtocol | None = state["compiled"]
+    path = DATA_PATH
+    if current is not None and current.path == path and time.monotonic() < state["next_check_at"]:
+        return current
+    with _PROTOCOL_LOCK:
+        current = state["compiled"]
+        try:
+            st = path.stat()
+            stat_key = (str(path), st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat_key = None
+        if current is not None and current.path == path and stat_key is not None and stat_key == state["stat"]:
+            state["next_check_at"] = time.monotonic() + PROTOCOL_RELOAD_CHECK_SECONDS
+            return current
+        try:
+            compiled = _read_compiled_protocol(path, current)
+        except ValueError:
+            if current is None or current.path != path:
+                raise
+            logger.warning("bot_protocol.reload_failed path=%s; se mantiene sha256=%s", path, current.sha256[:12], exc_info=True)
+            compiled = current
+        if compiled is not current and current is not None:
+            logger.info("bot_protocol.reloaded path=%s sha256=%s", path, compiled.sha256[:12])
+        state["compiled"] = compiled
+        state["stat"] = stat_key
+        state["next_check_at"] = time.monotonic() + PROTOCOL_RELOAD_CHECK_SECONDS
+        return compiled
+
+
+def _clear_compiled_protocol() -> None:
+    with _PROTOCOL_LOCK:
+        _protocol_state.update({"compiled": None, "stat": None, "next_check_at": 0.0})
+
+
+def load_protocol() -> dict[str, Any]:
+    return compiled_protocol().payload
+
+
+load_protocol.cache_clear = _clear_compiled_protocol  # type: ignore[attr-defined]
+
+
 def get_step(step_code: str) -> dict[str, Any] | None:
     normalized = (step_code or "").strip().upper()
     if not normalized:
         return None
-    for step in load_protocol()["steps"]:
-        if str(step.get("step_code") or "").upper() == normalized:
-            return step
-    return None
+    return compiled_protocol().steps_by_code.get(normalized)
 
 
 def get_next_step(step_code: str) -> dict[str, Any] | None:
     normalized = (step_code or "").strip().upper()
-    steps = load_protocol()["steps"]
-    for idx, step in enumerate(steps):
-        if str(step.get("step_code") or "").upper() == normalized:
-            next_idx = idx + 1
-            return steps[next_idx] if next_idx < len(steps) else None
-    return None
+    return compiled_protocol().next_by_code.get(normalized)
 
 
 def build_step_prompt(step_code: str) -> str:
-    step = get_step(step_code)
-    if not step:
+    normalized = (step_code or "").strip().upper()
+    if not normalized:
         return "Etapa no encontrada."
-    messages = step.get("messages") or {}
-    primary = [str(x).strip() for x in (messages.get("primary") or []) if str(x).strip()]
-    secondary = [str(x).strip() for x in (messages.get("secondary") or []) if str(x).strip()]
-    warnings = [str(x).strip() for x in (messages.get("warnings") or []) if str(x).strip()]
-
-    lines: list[str] = []
-    lines.extend(primary)
-    lines.extend(secondary)
-    if warnings:
-        lines.append("Advertencia: " + " ".join(warnings))
-    return "\n".join(lines).strip() or "Sin mensaje configurado para esta etapa."
+    prompt = compiled_protocol().prompts_by_code.get(normalized)
+    return "Etapa no encontrada." if prompt is None else prompt
 
 
 def detect_expected_answer(step_code: str, user_text: str) -> dict[str, Any]:
@@ -250,17 +464,17 @@ def detect_expected_answer(step_code: str, user_text: str) -> dict[str, Any]:
             "out_of_step": out_of_step,
         }
 
-    validations = [str(x).strip().lower() for x in (step.get("validations") or [])]
+    validations = list(compiled_protocol().validations_by_code.get((step_code or "").strip().upper(), ()))
     if (step_code or "").strip().upper() == "TRANSPORT_ROUTE" and "transport_route" not in validations:
         validations = ["transport_route"]
     checks: dict[str, bool] = {}
 
     for rule in validations:
         if (step_code or "").strip().upper() == "PERCENTAGE_ACCEPTANCE" and rule == "yes_no":
-            if re.search(r"\b(ta bien|okey|okay|aja|ok)\b", text):
+            if _RE_SHORT_ACK.search(text):
                 checks[rule] = True
                 continue
-            if re.search(r"\b(acepto|aceptar|aceptado)\b", text) and (not re.search(r"\bno\b", text)):
+            if _RE_ACCEPT.search(text) and (not _RE_NO.search(text)):
                 checks[rule] = True
                 continue
         checks[rule] = _run_validation(rule, text)
@@ -278,7 +492,7 @@ def detect_out_of_step_answer(step_code: str, user_text: str) -> dict[str, Any]:
     normalized = (step_code or "").strip().upper()
     text = _normalize_text(user_text)
     has_work_type = _has_work_type(text)
-    has_address = any(city in text for city in SUPPORTED_CITIES)
+    has_address = _CITY_MATCHER.search(text)
     has_age = _extract_age(text) is not None
     if normalized == "TRANSPORT_ROUTE" and has_work_type and not _has_transport_route(text):
         return {
@@ -442,8 +656,8 @@ def extract_step_entities(step_code: str, user_text: str, existing_entities: dic
     if normalized in {"LABOR_REFERENCES", "FAMILY_REFERENCES"}:
         relation_key = "work_references" if normalized == "LABOR_REFERENCES" else "family_references"
         has_phone = _extract_phone_like(text) is not None
-        has_reference = any(h in text for h in REFERENCE_HINTS)
-        continuation_with_phone = has_phone and bool(re.search(r"\b(su|el)\s+numero\s+es\b", text))
+        has_reference = _REFERENCE_MATCHER.search(text)
+        continuation_with_phone = has_phone and bool(_RE_PHONE_CONTINUATION.search(text))
         refused = _is_reference_refusal(text)
         missing_phone = _is_reference_missing_phone(text)
         if refused or (has_reference and not has_phone) or missing_phone:
@@ -552,7 +766,7 @@ def detect_pending_correction(step_code: str, user_text: str, protocol_entities:
 
     new_age = _extract_age(text)
     if new_age is None and correction_cue:
-        bare_age = re.search(r"\b([1-9][0-9])\b", text)
+        bare_age = _RE_TWO_DIGITS.search(text)
         if bare_age:
             maybe_age = int(bare_age.group(1))
             if 18 <= maybe_age <= 75:
@@ -773,25 +987,11 @@ def normalize_correction_text(user_text: str) -> dict[str, Any]:
     original_text = str(user_text or "").strip()
     normalized_text = _normalize_text(original_text)
     text = normalized_text
-    cue_patterns = [
-        r"^no\b",
-        r"^nop\b",
-        r"^perdon\b",
-        r"^corrijo\b",
-        r"^quise\s+decir\b",
-        r"^digo\b",
-        r"^realmente\b",
-        r"^me\s+equivoque\b",
-        r"^mejor\b",
-    ]
-    has_cue = any(re.search(pattern, text) for pattern in cue_patterns)
+    has_cue = bool(_RE_CORRECTION_CUE.search(text))
     # Limpiamos prefijos conversacionales al inicio para analizar el contenido real.
-    prefix_re = re.compile(
-        r"^(?:no|nop|perdon|corrijo|quise\s+decir|digo|realmente|me\s+equivoque)\b(?:[\s,:-]+)?",
-    )
     analysis_text = text
     while True:
-        new_text = re.sub(prefix_re, "", analysis_text, count=1).strip()
+        new_text = _RE_CORRECTION_PREFIX.sub("", analysis_text, count=1).strip()
         if new_text == analysis_text:
             break
         analysis_text = new_text
@@ -868,27 +1068,22 @@ def _build_correction_item(
 
 
 def mask_sensitive_cedula(raw_value: str) -> str:
-    digits = re.sub(r"\D", "", str(raw_value or ""))
+    digits = _RE_NON_DIGIT.sub("", str(raw_value or ""))
     if len(digits) < 6:
         return "***"
     return f"{digits[:3]}-2***-***" if len(digits) >= 11 else f"{digits[:3]}***"
 
 
 def _extract_cedula(text: str) -> str | None:
-    m = re.search(r"\b(\d{3})[-\s]?(\d{7})[-\s]?(\d)\b", text)
+    m = _RE_CEDULA.search(text)
     if not m:
         return None
     return "".join(m.groups())
 
 
 def _extract_age(text: str) -> int | None:
-    patterns = [
-        r"\btengo\s+([1-9][0-9])\s*(?:anos|año|años)?\b",
-        r"\b([1-9][0-9])\s*(?:anos|año|años)\b",
-        r"\bedad\s*(?:es|:)?\s*([1-9][0-9])\b",
-    ]
-    for pattern in patterns:
-        m = re.search(pattern, text)
+    for pattern in _RE_AGE_PATTERNS:
+        m = pattern.search(text)
         if m:
             try:
                 value = int(m.group(1))
@@ -903,17 +1098,11 @@ def _extract_age(text: str) -> int | None:
 
 
 def _extract_name(text: str) -> str | None:
-    patterns = [
-        r"\bme\s+(?:llamo|yamo)\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})(?=\s+tengo\b|\s+edad\b|$)",
-        r"\bme llamo\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})",
-        r"\bmi nombre es\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})",
-        r"\bsoy\s+([a-zñ]+(?:\s+[a-zñ]+){0,3})",
-    ]
-    for pattern in patterns:
-        m = re.search(pattern, text)
+    for pattern in _RE_NAME_PATTERNS:
+        m = pattern.search(text)
         if m:
             return _clean_name(m.group(1))
-    tokens = [tok for tok in re.findall(r"[a-zñ]+", text) if tok not in STOPWORDS_NAME and tok not in SUPPORTED_CITIES]
+    tokens = [tok for tok in _RE_NAME_TOKENS.findall(text) if tok not in STOPWORDS_NAME and tok not in SUPPORTED_CITIES]
     # Evita tomar modalidad/rutas/transportes como nombre en respuestas cortas.
     tokens = [tok for tok in tokens if tok not in WORK_TYPE_HINTS and tok not in TRANSPORT_HINTS and tok != "ruta"]
     tokens = [tok for tok in tokens if tok not in GREETING_TOKENS]
@@ -923,16 +1112,10 @@ def _extract_name(text: str) -> str | None:
 
 
 def _clean_name(name: str) -> str:
-    parts = [p for p in re.findall(r"[a-zñ]+", name or "") if p and p not in STOPWORDS_NAME]
+    parts = [p for p in _RE_NAME_TOKENS.findall(name or "") if p and p not in STOPWORDS_NAME]
     return " ".join(parts[:3]).strip()
 
 
-def _normalize_text(value: str) -> str:
-    txt = (value or "").strip().lower()
-    txt = txt.replace("á", "a").replace("é", "e").replace("í", "i").replace("ó", "o").replace("ú", "u")
-    return re.sub(r"\s+", " ", txt)
-
-
 def _is_yes_no(text: str) -> bool:
     return _yes_no_value(text) is not None
 
@@ -940,17 +1123,17 @@ def _is_yes_no(text: str) -> bool:
 def _yes_no_value(text: str) -> bool | None:
     if not text:
         return None
-    if re.search(r"\b(si|sí)\b", text) and re.search(r"\b(no)\b", text):
+    if _RE_SI.search(text) and _RE_NO.search(text):
         return None
     normalized_for_typos = (
         text.replace("kiero", "quiero")
         .replace("sii", "si")
         .replace("hazme", "hasme")
     )
-    tokens = set(re.findall(r"[a-z0-9]+", normalized_for_typos))
+    tokens = set(_RE_ALNUM_TOKENS.findall(normalized_for_typos))
     has_yes = any(w in tokens for w in YES_WORDS)
     has_no = any(w in tokens for w in NO_WORDS)
-    if (not has_no) and any(h in normalized_for_typos for h in POSITIVE_CONTINUE_HINTS):
+    if (not has_no) and _POSITIVE_CONTINUE_MATCHER.search(normalized_for_typos):
         has_yes = True
     if has_yes and not has_no:
         return True
@@ -965,9 +1148,9 @@ def is_greeting_only(text: str) -> bool:
         return True
     if normalized in GREETING_ONLY_PATTERNS:
         return True
-    if re.sub(r"[\s\W_]+", "", str(text or ""), flags=re.UNICODE) == "":
+    if _RE_NOISE.sub("", str(text or "")) == "":
         return True
-    tokens = re.findall(r"[a-z0-9?]+", normalized)
+    tokens = _RE_GREETING_TOKENS.findall(normalized)
     if not tokens:
         return True
     if len(tokens) == 1 and tokens[0] in GREETING_ONLY_PATTERNS:
@@ -984,7 +1167,7 @@ def is_positive_confirmation(text: str, step_code: str = "") -> bool:
         normalized_for_typos = normalized.replace("kiero", "quiero").replace("hazme", "hasme")
         if normalized_for_typos in {"si", "sii"}:
             return True
-        return any(_contains_phrase(normalized_for_typos, h) for h in PERSONAL_CONFIRMATION_POSITIVE if h not in {"si", "sí", "sii"})
+        return _PERSONAL_POSITIVE_MATCHER.search(normalized_for_typos)
     return _yes_no_value(normalized) is True
 
 
@@ -994,7 +1177,7 @@ def is_negative_confirmation(text: str) -> bool:
         return False
     if normalized in {"no", "nop", "negativo"}:
         return True
-    return any(_contains_phrase(normalized, h) for h in PERSONAL_CONFIRMATION_NEGATIVE if h != "no")
+    return _PERSONAL_NEGATIVE_MATCHER.search(normalized)
 
 
 def has_personal_data_signal(text: str) -> bool:
@@ -1007,12 +1190,9 @@ def has_personal_data_signal(text: str) -> bool:
         return False
     if any(normalized.startswith(prefix + " ") or normalized == prefix for prefix in CONFUSION_PREFIXES):
         return False
-    if any(_contains_phrase(normalized, p) for p in CONFUSION_PATTERNS):
+    if _CONFUSION_MATCHER.search(normalized):
         return False
-    if any(
-        hint in normalized
-        for hint in ("me llamo", "mi nombre", "tengo", "anos", "año", "años", "edad", "cedula", "cédula", "telefono", "teléfono")
-    ):
+    if _PERSONAL_DATA_HINTS_MATCHER.search(normalized):
         return True
     if _extract_age(normalized) is not None:
         return True
@@ -1029,11 +1209,11 @@ def is_welcome_fastpath_denied(text: str) -> bool:
     normalized = _normalize_text(text)
     if not normalized:
         return True
-    return any(_contains_phrase(normalized, p) for p in WELCOME_FASTPATH_DENY_PATTERNS)
+    return _WELCOME_DENY_MATCHER.search(normalized)
 
 
 def _looks_like_name_phrase(text: str) -> bool:
-    tokens = [tok for tok in re.findall(r"[a-zñ]+", _normalize_text(text)) if tok]
+    tokens = [tok for tok in _RE_NAME_TOKENS.findall(_normalize_text(text)) if tok]
     tokens = [tok for tok in tokens if tok not in STOPWORDS_NAME and tok not in GREETING_TOKENS]
     if len(tokens) < 2:
         return False
@@ -1046,15 +1226,6 @@ def _looks_like_name_phrase(text: str) -> bool:
     return True
 
 
-def _contains_phrase(text: str, phrase: str) -> bool:
-    p = _normalize_text(phrase)
-    if not p:
-        return False
-    if " " in p:
-        return p in text
-    return bool(re.search(rf"\b{re.escape(p)}\b", text))
-
-
 def _run_validation(rule: str, text: str) -> bool:
     if rule == "non_empty":
         return bool(text)
@@ -1063,44 +1234,36 @@ def _run_validation(rule: str, text: str) -> bool:
     if rule == "contains_name":
         return len([x for x in text.split() if x.isalpha()]) >= 2
     if rule == "contains_age":
-        return bool(re.search(r"\b([1-9][0-9])\b", text))
+        return bool(_RE_TWO_DIGITS.search(text))
     if rule == "cedula_like":
-        return bool(re.search(r"\b\d{3}[-\s]?\d{7}[-\s]?\d\b", text))
+        return bool(_RE_CEDULA.search(text))
     if rule == "city_supported":
         if not _has_address_context(text):
             return False
-        if any(city in text for city in SUPPORTED_CITIES):
-            return True
-        return any(sector in text for sector in COMMON_SECTORS)
+        return _CITY_OR_SECTOR_MATCHER.search(text)
     if rule == "work_modality":
         return _has_work_type(text)
     if rule == "transport_route":
         return _has_transport_route(text) and (not _has_work_type(text))
     if rule == "percentage_acceptance":
         yn = _yes_no_value(text)
-        if yn is None and re.search(r"\b(ta bien|okey|okay|aja)\b", text):
+        if yn is None and _RE_SHORT_ACK_NO_OK.search(text):
             yn = True
-        if yn is None and re.search(r"\b(acepto|aceptar|aceptado)\b", text):
+        if yn is None and _RE_ACCEPT.search(text):
             yn = True
-        if re.search(r"\b(no acepto|no voy a aceptar|no quiero aceptar|no el 25|no 25|no al 25)\b", text):
+        if _RE_REJECT_25.search(text):
             yn = False
-        has_25 = bool(
-            re.search(r"\b25\b", text)
-            or "25%" in text
-            or re.search(r"\b25\s*por\s*ciento\b", text)
-            or re.search(r"\bveinti\s*cinco\b", text)
-            or re.search(r"\bveinticinco\b", text)
-        )
+        has_25 = bool("25%" in text or _RE_25.search(text))
         # Aceptamos confirmaciones cortas solo en la etapa de porcentaje.
         if yn is True and has_25:
             return True
-        if yn is True and re.search(r"\b(ta bien|okey|okay|aja|ok)\b", text):
+        if yn is True and _RE_SHORT_ACK.search(text):
             return True
         return False
     if rule == "references_not_empty":
         return len(text) >= 12 and ("-" in text or "," in text)
     if rule == "phone_like":
-        return bool(re.search(r"\b\d{7,11}\b", re.sub(r"[^0-9 ]", " ", text)))
+        return bool(_RE_PHONE_DIGITS.search(_RE_NON_DIGIT_SPACE.sub(" ", text)))
     if rule == "mentions_cedula":
         return "cedula" in text
     if rule == "mentions_photo":
@@ -1109,9 +1272,7 @@ def _run_validation(rule: str, text: str) -> bool:
 
 
 def _has_work_type(text: str) -> bool:
-    if "salida diaria" in text:
-        return True
-    return any(h in text for h in WORK_TYPE_HINTS)
+    return _WORK_TYPE_MATCHER.search(text)
 
 
 def _has_transport_route(text: str) -> bool:
@@ -1120,11 +1281,11 @@ def _has_transport_route(text: str) -> bool:
         return False
     if _has_work_type(text):
         return False
-    if any(h in text for h in TRANSPORT_HINTS):
+    if _TRANSPORT_MATCHER.search(text):
         return True
-    if re.search(r"\bruta\s+[a-z0-9]+\b", text):
+    if _RE_ROUTE.search(text):
         return True
-    return bool(re.search(r"\b(voy|llego|transporte)\b", text))
+    return bool(_RE_GOING.search(text))
 
 
 def _extract_city(text: str) -> str | None:
@@ -1138,7 +1299,7 @@ def _extract_city(text: str) -> str | None:
 
 
 def _extract_phone_like(text: str) -> str | None:
-    digits = re.sub(r"\D", "", text or "")
+    digits = _RE_NON_DIGIT.sub("", text or "")
     if len(digits) < 10:
         return None
     for prefix in ("809", "829", "849"):
@@ -1149,21 +1310,21 @@ def _extract_phone_like(text: str) -> str | None:
 
 
 def _has_cedula_context(text: str) -> bool:
-    return any(h in text for h in CEDULA_CONTEXT_HINTS)
+    return _CEDULA_CONTEXT_MATCHER.search(text)
 
 
 def _has_skill_experience_signal(text: str) -> bool:
-    if not any(h in text for h in SKILL_HINTS):
+    if not _SKILL_MATCHER.search(text):
         return False
-    return any(h in text for h in SKILL_EXPERIENCE_HINTS)
+    return _SKILL_EXPERIENCE_MATCHER.search(text)
 
 
 def _has_address_context(text: str) -> bool:
-    if any(x in text for x in ("mi hermana vive", "mi mama vive", "mi madre vive", "mi hijo vive")):
+    if _THIRD_PARTY_ADDRESS_MATCHER.search(text):
         return False
-    if any(city in text for city in SUPPORTED_CITIES):
+    if _CITY_MATCHER.search(text):
         return True
-    if any(x in text for x in ("vivo", "bibo", "soy de", "estoy en", "resido", "direccion", "dirección")):
+    if _ADDRESS_CUE_MATCHER.search(text):
         return True
     txt = text.strip()
     if txt in SUPPORTED_CITIES:
@@ -1174,25 +1335,11 @@ def _has_address_context(text: str) -> bool:
 
 
 def _is_reference_missing_phone(text: str) -> bool:
-    patterns = (
-        "no tengo numero",
-        "no tengo telefono",
-        "no se el numero",
-        "no se su numero",
-        "sin numero",
-    )
-    return any(p in text for p in patterns)
+    return _REFERENCE_MISSING_PHONE_MATCHER.search(text)
 
 
 def _is_reference_refusal(text: str) -> bool:
-    patterns = (
-        "no quiero dar referencia",
-        "no quiero dar referencias",
-        "no tengo referencia",
-        "no tengo referencias",
-        "prefiero no dar referencia",
-    )
-    return any(p in text for p in patterns)
+    return _REFERENCE_REFUSAL_MATCHER.search(text)
 
 
 def parse_spanish_age_words(text: str) -> int | None:
@@ -1229,7 +1376,7 @@ def parse_spanish_age_words(text: str) -> int | None:
     txt = _normalize_text(text)
     txt = txt.replace("treintai ", "treinta y ")
     txt = txt.replace("cuarentai ", "cuarenta y ")
-    m = re.search(r"\b(?:tengo|edad\s*(?:es|:)?\s*)?((?:dieciocho|diecinueve|veinte|veinti[a-z]+|treinta(?:\s+y\s+[a-z]+)?|cuarenta(?:\s+y\s+[a-z]+)?|cincuenta|sesenta|setenta))(?:\s+anos|\s+ano|\s+años)?\b", txt)
+    m = _RE_AGE_WORDS.search(txt)
     if not m:
         return None
     phrase = m.group(1).strip()
@@ -1249,7 +1396,7 @@ def parse_spanish_age_words(text: str) -> int | None:
 
 def _extract_name_age_compact(text: str) -> dict[str, Any]:
     # Casos: "yulisa 28", "juana perez 32", "yulisa 28 santiago salida diaria"
-    m = re.match(r"\s*([a-zñ]+(?:\s+[a-zñ]+){0,2})\s+([1-9][0-9])(?:\s+|$)", text)
+    m = _RE_NAME_AGE_COMPACT.match(text)
     if not m:
         return {}
     raw_name = _clean_name(m.group(1))
@@ -1274,10 +1421,10 @@ def _extract_work_type(text: str) -> str | None:
 
 
 def _extract_route(text: str) -> str | None:
-    m2 = re.search(r"\bmi\s+ruta\s+es\s+(?:la\s+)?([a-z0-9]+)\b", text)
+    m2 = _RE_MY_ROUTE.search(text)
     if m2:
         return f"ruta {m2.group(1).upper()}"
-    m = re.search(r"\bruta\s+([a-z0-9]+)\b", text)
+    m = _RE_ROUTE.search(text)
     if m:
         return f"ruta {m.group(1).upper()}"
     if "parada" in text:
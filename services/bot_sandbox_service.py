@@ -578,6 +578,8 @@ def apply_delivery_webhook_update(
         updates.append({"status": status, "ts": stamp, "duplicate": duplicate, "payload": dict(payload or {})})
         delivery["status"] = status
         delivery["updates"] = updates[-50:]
+        if status == "delivered" and row.simulated_sent_at is not None and "sent_to_delivered_ms" not in delivery:
+            delivery["sent_to_delivered_ms"] = max(0, int((utc_now_naive() - row.simulated_sent_at).total_seconds() * 1000))
         delivery["last_webhook"] = stamp
         audit["delivery"] = delivery
         row.payload_json = dict(row.payload_json or {})
@@ -596,234 +598,284 @@ def apply_delivery_webhook_update(
     return {"ok": True, "updated": updated}
 
 
-def run_sandbox_worker_once(
+def claim_due_outbox_rows(
     *,
-    batch_size: int = 20,
+    batch_size: int,
     review_id: int | None = None,
     outbox_id: int | None = None,
-) -> dict[str, int]:
-    stats = {"picked": 0, "sent": 0, "failed": 0, "blocked": 0, "retried": 0, "recovered": 0, "skipped": 0}
-    log_bot_event("outbound_worker_started", metadata={"batch_size": int(batch_size)})
-
-    active_real = is_real_whatsapp_sandbox_enabled() and not is_staging_offline_active()
-    if not is_staging_offline_active() and not active_real:
-        return stats
-
-    stats["recovered"] = recover_orphan_processing_rows()
+    skip_locked: bool = False,
+    first_per_phone: bool = False,
+) -> list[BotSandboxOutbound]:
+    """Filas pendientes y vencidas, más viejas primero.
+
+    ``skip_locked`` (PostgreSQL) salta filas que otro envío tiene tomadas en su
+    transacción. ``first_per_phone`` solo trae la fila pendiente más vieja de
+    cada número, así un destinatario con muchas filas no llena el lote.
+    """
     now = utc_now_naive()
-    q = BotSandboxOutbound.query.filter(BotSandboxOutbound.state.in_([OUTBOX_STATUS_QUEUED, OUTBOX_STATUS_FAILED])).filter(
+    pending_states = [OUTBOX_STATUS_QUEUED, OUTBOX_STATUS_FAILED]
+    q = BotSandboxOutbound.query.filter(BotSandboxOutbound.state.in_(pending_states)).filter(
         (BotSandboxOutbound.next_retry_at.is_(None)) | (BotSandboxOutbound.next_retry_at <= now)
     )
     if outbox_id and int(outbox_id) > 0:
         q = q.filter(BotSandboxOutbound.id == int(outbox_id))
+    if first_per_phone:
+        heads = (
+            db.session.query(func.min(BotSandboxOutbound.id))
+            .filter(BotSandboxOutbound.state.in_(pending_states))
+            .group_by(BotSandboxOutbound.phone_e164)
+        )
+        q = q.filter(BotSandboxOutbound.id.in_(heads.scalar_subquery()))
     q = q.order_by(BotSandboxOutbound.id.asc()).limit(max(1, int(batch_size)))
+    if skip_locked and db.session.get_bind().dialect.name == "postgresql":
+        q = q.with_for_update(skip_locked=True)
     rows = q.all()
     if review_id and int(review_id) > 0:
         rid = int(review_id)
         rows = [r for r in rows if int((dict(r.payload_json or {}).get("metadata") or {}).get("review_id") or 0) == rid]
-    stats["picked"] = len(rows)
-    log_bot_event("outbound_worker_loaded_item", metadata={"picked": int(stats["picked"])})
+    return rows
 
-    max_retries = _safe_int_env("BOT_SANDBOX_MAX_RETRIES", 4, minimum=1, maximum=100)
-    fail_rate = _safe_float_env("BOT_SANDBOX_FAIL_RATE", 0.0)
-    timeout_rate = _safe_float_env("BOT_SANDBOX_TIMEOUT_RATE", 0.0)
-    malformed_rate = _safe_float_env("BOT_SANDBOX_MALFORMED_RATE", 0.0)
-    timeout_seconds = _safe_int_env("BOT_REAL_WHATSAPP_PROVIDER_TIMEOUT_SECONDS", 8, minimum=1, maximum=60)
 
-    for row in rows:
-        if _normalize_corrupt_row(row):
-            db.session.flush()
-        if row.state == OUTBOX_STATUS_FAILED and int(row.retry_count or 0) >= max_retries:
-            if _state_transition_allowed(row.state, OUTBOX_STATUS_BLOCKED):
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="max_retries_exhausted")
-                stats["blocked"] += 1
-            continue
+def outbox_row_mode(row: BotSandboxOutbound) -> str:
+    return str((dict(row.payload_json or {}).get("metadata") or {}).get("mode") or "offline")
+
+
+def outbox_row_text(row: BotSandboxOutbound) -> str:
+    return str((dict(row.payload_json or {}).get("text") or "")).strip()
+
 
-        if row.state == OUTBOX_STATUS_FAILED:
-            _set_state(row, OUTBOX_STATUS_QUEUED)
-            stats["retried"] += 1
+def prepare_outbox_row(row: BotSandboxOutbound, stats: dict[str, int], *, max_retries: int) -> bool:
+    """Guardas previas al envio. True si la fila quedo ``processing`` y lista para el proveedor."""
+    if _normalize_corrupt_row(row):
+        db.session.flush()
+    if row.state == OUTBOX_STATUS_FAILED and int(row.retry_count or 0) >= max_retries:
+        if _state_transition_allowed(row.state, OUTBOX_STATUS_BLOCKED):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="max_retries_exhausted")
+            stats["blocked"] += 1
+        return False
 
-        _set_state(row, OUTBOX_STATUS_PROCESSING)
+    if row.state == OUTBOX_STATUS_FAILED:
+        _set_state(row, OUTBOX_STATUS_QUEUED)
+        stats["retried"] += 1
+
+    _set_state(row, OUTBOX_STATUS_PROCESSING)
+    log_bot_event(
+        "outbound_worker_dispatching",
+        metadata={"outbox_id": int(row.id), "provider": str(row.provider or ""), "phone_e164": str(row.phone_e164 or "")},
+    )
+    msg = BotMessage.query.get(int(row.bot_message_id))
+    if msg is not None and (
+        str(msg.status or "") == MESSAGE_STATUS_OUTBOUND_SENT
+        or msg.sent_at is not None
+        or bool(str(msg.wa_message_id or "").strip())
+    ):
+        _set_state(row, OUTBOX_STATUS_SIMULATED_SENT)
+        row.next_retry_at = None
+        stats["skipped"] += 1
         log_bot_event(
-            "outbound_worker_dispatching",
-            metadata={"outbox_id": int(row.id), "provider": str(row.provider or ""), "phone_e164": str(row.phone_e164 or "")},
+            "sandbox_duplicate_send_prevented",
+            metadata={
+                "outbox_id": int(row.id),
+                "outbound_message_id": int(row.bot_message_id),
+                "provider_message_id": str(msg.wa_message_id or ""),
+                "review_id": int((dict(row.payload_json or {}).get("metadata") or {}).get("review_id") or 0),
+            },
         )
-        msg = BotMessage.query.get(int(row.bot_message_id))
-        if msg is not None and (
-            str(msg.status or "") == MESSAGE_STATUS_OUTBOUND_SENT
-            or msg.sent_at is not None
-            or bool(str(msg.wa_message_id or "").strip())
-        ):
-            _set_state(row, OUTBOX_STATUS_SIMULATED_SENT)
-            row.next_retry_at = None
-            stats["skipped"] += 1
-            log_bot_event(
-                "sandbox_duplicate_send_prevented",
-                metadata={
-                    "outbox_id": int(row.id),
-                    "outbound_message_id": int(row.bot_message_id),
-                    "provider_message_id": str(msg.wa_message_id or ""),
-                    "review_id": int((dict(row.payload_json or {}).get("metadata") or {}).get("review_id") or 0),
-                },
-            )
-            continue
+        return False
+
+    mode = outbox_row_mode(row)
+    if mode != "real_sandbox" and not _safe_phone(row.phone_e164):
+        _set_state(row, OUTBOX_STATUS_BLOCKED, reason="real_phone_detected")
+        stats["blocked"] += 1
+        return False
 
-        mode = str((dict(row.payload_json or {}).get("metadata") or {}).get("mode") or "offline")
-        if mode != "real_sandbox" and not _safe_phone(row.phone_e164):
-            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="real_phone_detected")
+    if mode == "real_sandbox":
+        metadata = dict((dict(row.payload_json or {}).get("metadata") or {}))
+        auto_send_allowed = bool(metadata.get("auto_send_allowed", False))
+        reason = _kill_switch_reason()
+        if reason:
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason=f"kill_switch:{reason}")
             stats["blocked"] += 1
-            continue
+            log_bot_event("real_sandbox_outbound_blocked", metadata={"outbox_id": row.id, "reason": reason})
+            return False
+        if not _is_allowlisted_real_number(row.phone_e164):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="allowlist_blocked")
+            stats["blocked"] += 1
+            log_bot_event("real_sandbox_outbound_blocked", metadata={"outbox_id": row.id, "reason": "allowlist_blocked"})
+            return False
+        if not outbox_row_text(row):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="empty_message")
+            stats["blocked"] += 1
+            return False
+        if (not auto_send_allowed) and (not bool(metadata.get("review_approved", False)) or int(metadata.get("review_id") or 0) <= 0):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="review_required")
+            stats["blocked"] += 1
+            return False
+        if (not auto_send_allowed) and (int(metadata.get("approved_by") or 0) <= 0 or int(metadata.get("reviewer") or 0) <= 0):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="reviewer_required")
+            stats["blocked"] += 1
+            return False
+        if (not auto_send_allowed) and (not bool(metadata.get("manual_review_required", False))):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="manual_review_required")
+            stats["blocked"] += 1
+            return False
+        if not bool(metadata.get("owner_only", False)):
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="owner_only_required")
+            stats["blocked"] += 1
+            return False
+        if auto_send_allowed and not is_sandbox_auto_reply_active():
+            _set_state(row, OUTBOX_STATUS_BLOCKED, reason="auto_send_guard_blocked")
+            stats["blocked"] += 1
+            return False
+    return True
 
-        if mode == "real_sandbox":
-            metadata = dict((dict(row.payload_json or {}).get("metadata") or {}))
-            auto_send_allowed = bool(metadata.get("auto_send_allowed", False))
-            reason = _kill_switch_reason()
-            if reason:
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason=f"kill_switch:{reason}")
-                stats["blocked"] += 1
-                log_bot_event("real_sandbox_outbound_blocked", metadata={"outbox_id": row.id, "reason": reason})
-                continue
-            if not _is_allowlisted_real_number(row.phone_e164):
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="allowlist_blocked")
-                stats["blocked"] += 1
-                log_bot_event("real_sandbox_outbound_blocked", metadata={"outbox_id": row.id, "reason": "allowlist_blocked"})
-                continue
-            text = str((dict(row.payload_json or {}).get("text") or "")).strip()
-            if not text:
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="empty_message")
-                stats["blocked"] += 1
-                continue
-            if (not auto_send_allowed) and (not bool(metadata.get("review_approved", False)) or int(metadata.get("review_id") or 0) <= 0):
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="review_required")
-                stats["blocked"] += 1
-                continue
-            if (not auto_send_allowed) and (int(metadata.get("approved_by") or 0) <= 0 or int(metadata.get("reviewer") or 0) <= 0):
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="reviewer_required")
-                stats["blocked"] += 1
-                continue
-            if (not auto_send_allowed) and (not bool(metadata.get("manual_review_required", False))):
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="manual_review_required")
-                stats["blocked"] += 1
-                continue
-            if not bool(metadata.get("owner_only", False)):
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="owner_only_required")
-                stats["blocked"] += 1
-                continue
-            if auto_send_allowed and not is_sandbox_auto_reply_active():
-                _set_state(row, OUTBOX_STATUS_BLOCKED, reason="auto_send_guard_blocked")
-                stats["blocked"] += 1
-                continue
 
-            log_bot_event("real_sandbox_outbound_attempt", metadata={"outbox_id": row.id, "provider": row.provider, "to": _mask_phone(row.phone_e164)})
-            result = _provider_send(str(row.provider or "fake"), to_phone=row.phone_e164, text=text, timeout_seconds=timeout_seconds)
-            audit = _payload_audit(row)
-            audit["response_payload"] = dict(result)
-            audit["request_payload"] = {"to_masked": _mask_phone(row.phone_e164), "text": text}
-            raw_blob = dict(result.get("raw") or {})
-            meta_resp = dict(raw_blob.get("response") or {})
-            meta_err = dict(meta_resp.get("error") or {}) if isinstance(meta_resp, dict) else {}
-            row.outbound_http_status = raw_blob.get("http_status")
-            row.outbound_response_raw = raw_blob
-            row.outbound_meta_error_code = str(result.get("error_code") or meta_err.get("code") or "") or None
-            row.outbound_meta_error_message = str(result.get("error_message") or meta_err.get("message") or "")[:255] or None
-            log_bot_event(
-                "real_sandbox_provider_response",
-                metadata={
-                    "outbox_id": row.id,
-                    "provider": row.provider,
-                    "ok": bool(result.get("ok")),
-                    "status": str(result.get("status") or ""),
-                    "error_code": str(result.get("error_code") or ""),
-                    "http_status": (dict(result.get("raw") or {}).get("http_status")),
-                    "raw": dict(result.get("raw") or {}),
-                },
-            )
-            if bool(result.get("ok")):
-                audit["provider_message_id"] = str(result.get("provider_message_id") or "")
-                delivery = dict(audit.get("delivery") or {})
-                delivery["status"] = "sent"
-                delivery["last_webhook"] = delivery.get("last_webhook")
-                audit["delivery"] = delivery
-                row.payload_json = dict(row.payload_json or {})
-                row.payload_json["audit"] = audit
-                _set_state(row, OUTBOX_STATUS_SIMULATED_SENT)
-                row.next_retry_at = None
-                msg = BotMessage.query.get(int(row.bot_message_id))
-                if msg is not None:
-                    msg.status = MESSAGE_STATUS_OUTBOUND_SENT
-                    msg.sent_at = row.simulated_sent_at
-                    msg.wa_message_id = str(result.get("provider_message_id") or "") or msg.wa_message_id
-                    msg.error_code = None
-                    msg.error_message = None
-                    try:
-                        from services.bot_sandbox_review_service import mark_review_simulated_sent
-
-                        mark_review_simulated_sent(outbound_message_id=int(msg.id))
-                    except Exception:
-                        pass
-                row.outbound_meta_error_code = None
-                row.outbound_meta_error_message = None
-                log_bot_event(
-                    "real_sandbox_outbound_sent",
-                    metadata={
-                        "review_id": int((dict(row.payload_json or {}).get("metadata") or {}).get("review_id") or 0),
-                        "outbox_id": int(row.id),
-                        "outbound_message_id": int(row.bot_message_id),
-                        "provider_message_id": str(msg.wa_message_id if msg is not None else ""),
-                        "provider": row.provider,
-                    },
-                )
-                stats["sent"] += 1
-            else:
-                err = str(result.get("error_code") or "provider_failed")
-                err_kind = str(result.get("error_kind") or "")
-                if err_kind:
-                    log_bot_event(err_kind, level="warning", metadata={"outbox_id": int(row.id), "error_code": err})
-                row.retry_count = int(row.retry_count or 0) + 1
-                audit["fail_reason"] = err
-                row.payload_json = dict(row.payload_json or {})
-                row.payload_json["audit"] = audit
-                _set_state(row, OUTBOX_STATUS_FAILED, reason=err)
-                row.next_retry_at = utc_now_naive() + timedelta(seconds=_retry_backoff_seconds())
-                log_bot_event("real_sandbox_outbound_blocked", metadata={"outbox_id": row.id, "reason": err})
-                stats["failed"] += 1
-            continue
+def _mark_outbox_message_sent(row: BotSandboxOutbound, *, provider_message_id: str | None = None) -> BotMessage | None:
+    _set_state(row, OUTBOX_STATUS_SIMULATED_SENT)
+    row.next_retry_at = None
+    msg = BotMessage.query.get(int(row.bot_message_id))
+    if msg is not None:
+        msg.status = MESSAGE_STATUS_OUTBOUND_SENT
+        msg.sent_at = row.simulated_sent_at
+        if provider_message_id is not None:
+            msg.wa_message_id = provider_message_id or msg.wa_message_id
+        msg.error_code = None
+        msg.error_message = None
+        try:
+            from services.bot_sandbox_review_service import mark_review_simulated_sent
+
+            mark_review_simulated_sent(outbound_message_id=int(msg.id))
+        except Exception:
+            pass
+    return msg
+
+
+def apply_provider_result(row: BotSandboxOutbound, result: dict[str, Any], stats: dict[str, int]) -> None:
+    text = outbox_row_text(row)
+    audit = _payload_audit(row)
+    audit["response_payload"] = dict(result)
+    audit["request_payload"] = {"to_masked": _mask_phone(row.phone_e164), "text": text}
+    raw_blob = dict(result.get("raw") or {})
+    meta_resp = dict(raw_blob.get("response") or {})
+    meta_err = dict(meta_resp.get("error") or {}) if isinstance(meta_resp, dict) else {}
+    row.outbound_http_status = raw_blob.get("http_status")
+    row.outbound_response_raw = raw_blob
+    row.outbound_meta_error_code = str(result.get("error_code") or meta_err.get("code") or "") or None
+    row.outbound_meta_error_message = str(result.get("error_message") or meta_err.get("message") or "")[:255] or None
+    log_bot_event(
+        "real_sandbox_provider_response",
+        metadata={
+            "outbox_id": row.id,
+            "provider": row.provider,
+            "ok": bool(result.get("ok")),
+            "status": str(result.get("status") or ""),
+            "error_code": str(result.get("error_code") or ""),
+            "http_status": (dict(result.get("raw") or {}).get("http_status")),
+            "raw": dict(result.get("raw") or {}),
+        },
+    )
+    if bool(result.get("ok")):
+        audit["provider_message_id"] = str(result.get("provider_message_id") or "")
+        delivery = dict(audit.get("delivery") or {})
+        delivery["status"] = "sent"
+        delivery["last_webhook"] = delivery.get("last_webhook")
+        audit["delivery"] = delivery
+        row.payload_json = dict(row.payload_json or {})
+        row.payload_json["audit"] = audit
+        msg = _mark_outbox_message_sent(row, provider_message_id=str(result.get("provider_message_id") or ""))
+        row.outbound_meta_error_code = None
+        row.outbound_meta_error_message = None
+        log_bot_event(
+            "real_sandbox_outbound_sent",
+            metadata={
+                "review_id": int((dict(row.payload_json or {}).get("metadata") or {}).get("review_id") or 0),
+                "outbox_id": int(row.id),
+                "outbound_message_id": int(row.bot_message_id),
+                "provider_message_id": str(msg.wa_message_id if msg is not None else ""),
+                "provider": row.provider,
+            },
+        )
+        stats["sent"] += 1
+        return
+    err = str(result.get("error_code") or "provider_failed")
+    err_kind = str(result.get("error_kind") or "")
+    if err_kind:
+        log_bot_event(err_kind, level="warning", metadata={"outbox_id": int(row.id), "error_code": err})
+    row.retry_count = int(row.retry_count or 0) + 1
+    audit["fail_reason"] = err
+    row.payload_json = dict(row.payload_json or {})
+    row.payload_json["audit"] = audit
+    _set_state(row, OUTBOX_STATUS_FAILED, reason=err)
+    row.next_retry_at = utc_now_naive() + timedelta(seconds=_retry_backoff_seconds())
+    log_bot_event("real_sandbox_outbound_blocked", metadata={"outbox_id": row.id, "reason": err})
+    stats["failed"] += 1
 
-        p = random.random()
-        if p < timeout_rate:
-            row.retry_count = int(row.retry_count or 0) + 1
-            _set_state(row, OUTBOX_STATUS_FAILED, reason="simulated_provider_timeout")
-            row.next_retry_at = utc_now_naive() + timedelta(seconds=_retry_backoff_seconds())
-            stats["failed"] += 1
-            continue
-        if p < timeout_rate + fail_rate:
-            row.retry_count = int(row.retry_count or 0) + 1
-            _set_state(row, OUTBOX_STATUS_FAILED, reason="simulated_provider_malformed_response")
-            row.next_retry_at = utc_now_naive() + timedelta(seconds=_retry_backoff_seconds())
-            stats["failed"] += 1
+
+def apply_offline_send(row: BotSandboxOutbound, stats: dict[str, int]) -> None:
+    fail_rate = _safe_float_env("BOT_SANDBOX_FAIL_RATE", 0.0)
+    timeout_rate = _safe_float_env("BOT_SANDBOX_TIMEOUT_RATE", 0.0)
+    malformed_rate = _safe_float_env("BOT_SANDBOX_MALFORMED_RATE", 0.0)
+    p = random.random()
+    simulated_failure = ""
+    if p < timeout_rate:
+        simulated_failure = "simulated_provider_timeout"
+    elif p < timeout_rate + fail_rate:
+        simulated_failure = "simulated_provider_malformed_response"
+    elif p < timeout_rate + fail_rate + malformed_rate:
+        simulated_failure = "simulated_provider_no_response"
+    if simulated_failure:
+        row.retry_count = int(row.retry_count or 0) + 1
+        _set_state(row, OUTBOX_STATUS_FAILED, reason=simulated_failure)
+        row.next_retry_at = utc_now_naive() + timedelta(seconds=_retry_backoff_seconds())
+        stats["failed"] += 1
+        return
+    _mark_outbox_message_sent(row)
+    stats["sent"] += 1
+
+
+def provider_timeout_seconds() -> int:
+    return _safe_int_env("BOT_REAL_WHATSAPP_PROVIDER_TIMEOUT_SECONDS", 8, minimum=1, maximum=60)
+
+
+def max_outbox_retries() -> int:
+    return _safe_int_env("BOT_SANDBOX_MAX_RETRIES", 4, minimum=1, maximum=100)
+
+
+def sandbox_outbound_active() -> bool:
+    return is_staging_offline_active() or is_real_whatsapp_sandbox_enabled()
+
+
+def run_sandbox_worker_once(
+    *,
+    batch_size: int = 20,
+    review_id: int | None = None,
+    outbox_id: int | None = None,
+) -> dict[str, int]:
+    stats = {"picked": 0, "sent": 0, "failed": 0, "blocked": 0, "retried": 0, "recovered": 0, "skipped": 0}
+    log_bot_event("outbound_worker_started", metadata={"batch_size": int(batch_size)})
+
+    if not sandbox_outbound_active():
+        return stats
+
+    stats["recovered"] = recover_orphan_processing_rows()
+    # SKIP LOCKED: con BOT_OUTBOUND_SENDER_ASYNC el sender puede tener estas filas tomadas (aún ``queued``
+    # para esta transacción); sin saltarlas, el admin y el sender enviarían la misma fila.
+    rows = claim_due_outbox_rows(batch_size=batch_size, review_id=review_id, outbox_id=outbox_id, skip_locked=True)
+    stats["picked"] = len(rows)
+    log_bot_event("outbound_worker_loaded_item", metadata={"picked": int(stats["picked"])})
+
+    max_retries = max_outbox_retries()
+    timeout_seconds = provider_timeout_seconds()
+
+    for row in rows:
+        if not prepare_outbox_row(row, stats, max_retries=max_retries):
             continue
-        if p < timeout_rate + fail_rate + malformed_rate:
-            row.retry_count = int(row.retry_count or 0) + 1
-            _set_state(row, OUTBOX_STATUS_FAILED, reason="simulated_provider_no_response")
-            row.next_retry_at = utc_now_naive() + timedelta(seconds=_retry_backoff_seconds())
-            stats["failed"] += 1
+        if outbox_row_mode(row) == "real_sandbox":
+            log_bot_event("real_sandbox_outbound_attempt", metadata={"outbox_id": row.id, "provider": row.provider, "to": _mask_phone(row.phone_e164)})
+            result = _provider_send(str(row.provider or "fake"), to_phone=row.phone_e164, text=outbox_row_text(row), timeout_seconds=timeout_seconds)
+            apply_provider_result(row, result, stats)
             continue
-
-        _set_state(row, OUTBOX_STATUS_SIMULATED_SENT)
-        row.next_retry_at = None
-        msg = BotMessage.query.get(int(row.bot_message_id))
-        if msg is not None:
-            msg.status = MESSAGE_STATUS_OUTBOUND_SENT
-            msg.sent_at = row.simulated_sent_at
-            msg.error_code = None
-            msg.error_message = None
-            try:
-                from services.bot_sandbox_review_service import mark_review_simulated_sent
-
-                mark_review_simulated_sent(outbound_message_id=int(msg.id))
-            except Exception:
-                pass
-        stats["sent"] += 1
+        apply_offline_send(row, stats)
 
     db.session.commit()
     log_bot_event("sandbox_worker.cycle", metadata=stats)
@@ -866,6 +918,42 @@ def cleanup_sandbox_outbox_terminal(*, older_than_days: int = 7, limit: int = 10
     return {"deleted": int(deleted)}
 
 
+def _percentile(values: list[int], pct: float) -> int | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct * (len(ordered) - 1)))))
+    return int(ordered[idx])
+
+
+def outbound_latency_snapshot(*, limit: int = 500) -> dict[str, Any]:
+    """p50/p95 de cola->envio y envio->entregado sobre los ultimos envios."""
+    rows = (
+        BotSandboxOutbound.query.filter(BotSandboxOutbound.state == OUTBOX_STATUS_SIMULATED_SENT)
+        .filter(BotSandboxOutbound.simulated_sent_at.isnot(None))
+        .order_by(BotSandboxOutbound.id.desc())
+        .limit(max(1, int(limit)))
+        .all()
+    )
+    queue_to_sent: list[int] = []
+    sent_to_delivered: list[int] = []
+    for row in rows:
+        if row.queued_at is not None:
+            queue_to_sent.append(max(0, int((row.simulated_sent_at - row.queued_at).total_seconds() * 1000)))
+        delivered_ms = (dict((dict(row.payload_json or {}).get("audit") or {}).get("delivery") or {})).get("sent_to_delivered_ms")
+        if delivered_ms is not None:
+            sent_to_delivered.append(int(delivered_ms))
+    return {
+        "samples": len(rows),
+        "queue_to_sent_ms": {"p50": _percentile(queue_to_sent, 0.5), "p95": _percentile(queue_to_sent, 0.95)},
+        "sent_to_delivered_ms": {
+            "samples": len(sent_to_delivered),
+            "p50": _percentile(sent_to_delivered, 0.5),
+            "p95": _percentile(sent_to_delivered, 0.95),
+        },
+    }
+
+
 def sandbox_metrics_snapshot() -> dict[str, Any]:
     total = db.session.query(func.count(BotSandboxOutbound.id)).scalar() or 0
     queued = db.session.query(func.count(BotSandboxOutbound.id)).filter(BotSandboxOutbound.state == OUTBOX_STATUS_QUEUED).scalar() or 0
@@ -919,6 +1007,7 @@ def sandbox_metrics_snapshot() -> dict[str, Any]:
         "queue_oldest_age_seconds": queue_latency,
         "throughput_fake_per_min": throughput_per_min,
         "avg_processing_seconds": float(avg_duration),
+        "delivery_latency": outbound_latency_snapshot(),
         "real_sandbox_enabled": is_real_whatsapp_sandbox_enabled(),
         "real_sandbox_paused": is_real_sandbox_paused(),
         "real_provider": _provider_name(),
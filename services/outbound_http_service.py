@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""Cliente HTTP saliente compartido para proveedores externos del bot (OpenAI, Graph).
+
+Cada proveedor tiene:
+
+- una ``requests.Session`` por proceso con pool keep-alive (sin pagar TCP+TLS
+  por mensaje);
+- un tope de concurrencia (``OUTBOUND_HTTP_<PROVIDER>_MAX_CONCURRENCY``): si no
+  hay cupo en ``OUTBOUND_HTTP_<PROVIDER>_QUEUE_WAIT_SECONDS`` (2s, nunca más
+  que el ``timeout``) la llamada falla con ``ProviderBusyError``; lo que se
+  esperó se descuenta del ``timeout`` de la petición;
+- un circuit breaker: tras ``OUTBOUND_HTTP_BREAKER_FAILURES`` fallos seguidos
+  (timeout, red, 5xx o 429) falla rápido con ``CircuitOpenError`` durante
+  ``OUTBOUND_HTTP_BREAKER_COOLDOWN_SECONDS``; después deja pasar una prueba;
+- histograma de latencia por endpoint (``outbound_http_metrics``), publicado en
+  el backplane por proceso para verlo agregado desde el admin.
+
+Los errores propios heredan de ``requests.ConnectionError``: quien ya mapea
+errores de red no necesita cambios. ``post_concurrently`` reparte un lote de
+llamadas en hilos sobre el mismo pool (para envíos en lote).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.process_metrics import ProcessMetricsPublisher
+from utils.runtime_config import env_float, env_int
+
+
+PROVIDER_OPENAI = "openai"
+PROVIDER_WHATSAPP = "whatsapp"
+
+_DEFAULT_CONCURRENCY = {PROVIDER_OPENAI: 8, PROVIDER_WHATSAPP: 16}
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS_INDEX_KEY = "outbound_http:metrics:index:v1"
+METRICS_KEY_PREFIX = "outbound_http:metrics:v1:"
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """El proveedor está degradado; se falla sin llamar."""
+
+
+class ProviderBusyError(requests.ConnectionError):
+    """Se agotó la espera por un cupo de concurrencia del proveedor."""
+
+
+class _CircuitBreaker:
+    def __init__(self, *, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = int(failure_threshold)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.probe_in_flight = False
+        self.opened_total = 0
+        self.rejected_total = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.rejected_total += 1
+            return False
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            was_probe = self.probe_in_flight
+            self.probe_in_flight = False
+            if was_probe or self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None or was_probe:
+                    self.opened_total += 1
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class _Histogram:
+    counts: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    total: int = 0
+    errors: int = 0
+    sum_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def observe(self, elapsed_ms: float, *, ok: bool) -> None:
+        idx = len(LATENCY_BUCKETS_MS)
+        for pos, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                idx = pos
+                break
+        self.counts[idx] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if not ok:
+            self.errors += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "buckets_ms": list(LATENCY_BUCKETS_MS),
+            "counts": list(self.counts),
+            "total": self.total,
+            "errors": self.errors,
+            "sum_ms": round(self.sum_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class ProviderClient:
+    def __init__(self, provider: str):
+        self.provider = provider
+        key = provider.upper()
+        self.max_concurrency = env_int(f"OUTBOUND_HTTP_{key}_MAX_CONCURRENCY", _DEFAULT_CONCURRENCY.get(provider, 8))
+        self.queue_wait_seconds = env_float(f"OUTBOUND_HTTP_{key}_QUEUE_WAIT_SECONDS", 2.0, min_value=0.01)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.breaker = _CircuitBreaker(
+            failure_threshold=env_int("OUTBOUND_HTTP_BREAKER_FAILURES", 5),
+            cooldown_seconds=env_float("OUTBOUND_HTTP_BREAKER_COOLDOWN_SECONDS", 30.0),
+        )
+        self.histograms: dict[str, _Histogram] = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _observe(self, endpoint: str, elapsed_ms: float, *, ok: bool) -> None:
+        with self._lock:
+            self.histograms.setdefault(endpoint, _Histogram()).observe(elapsed_ms, ok=ok)
+
+    def post(self, url: str, *, endpoint: str, timeout: float, **kwargs) -> requests.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.provider}: circuit open")
+        # La espera por cupo tiene su propio presupuesto y sale del timeout total de la llamada.
+        wait_started = time.monotonic()
+        if not self.slots.acquire(timeout=max(0.01, min(self.queue_wait_seconds, float(timeout)))):
+            self.breaker.release_probe()
+            raise ProviderBusyError(f"{self.provider}: max concurrency {self.max_concurrency} reached")
+        timeout = max(0.1, float(timeout) - (time.monotonic() - wait_started))
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            resp = self.session.post(url, timeout=timeout, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            self._observe(endpoint, (time.perf_counter() - started) * 1000.0, ok=False)
+            self.breaker.record_failure()
+            raise
+        except requests.HTTPError as exc:
+            self._settle(endpoint, started, getattr(exc.response, "status_code", 0))
+            raise
+        except Exception:
+            self.breaker.release_probe()
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self.slots.release()
+        self._settle(endpoint, started, getattr(resp, "status_code", 0))
+        return resp
+
+    def _settle(self, endpoint: str, started: float, status_code: Any) -> None:
+        try:
+            status = int(status_code or 0)
+        except Exception:
+            status = 0
+        degraded = status >= 500 or status == 429
+        self._observe(endpoint, (time.perf_counter() - started) * 1000.0, ok=not degraded and status < 400)
+        if degraded:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            endpoints = {name: hist.as_dict() for name, hist in self.histograms.items()}
+            in_flight = self.in_flight
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": in_flight,
+            "breaker_state": self.breaker.state,
+            "breaker_opened_total": self.breaker.opened_total,
+            "breaker_rejected_total": self.breaker.rejected_total,
+            "endpoints": endpoints,
+        }
+
+
+_CLIENTS: dict[str, ProviderClient] = {}
+_CLIENTS_PID: int | None = None
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(provider: str) -> ProviderClient:
+    """Cliente del proveedor en este proceso (se recrea tras un fork)."""
+    global _CLIENTS_PID
+    pid = os.getpid()
+    client = _CLIENTS.get(provider) if _CLIENTS_PID == pid else None
+    if client is not None:
+        return client
+    with _CLIENTS_LOCK:
+        if _CLIENTS_PID != pid:
+            _CLIENTS.clear()
+            _CLIENTS_PID = pid
+        client = _CLIENTS.get(provider)
+        if client is None:
+            client = ProviderClient(provider)
+            _CLIENTS[provider] = client
+    return client
+
+
+def reset_clients() -> None:
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            client.session.close()
+        _CLIENTS.clear()
+    _METRICS.reset()
+
+
+def post(provider: str, url: str, *, endpoint: str, timeout: float, **kwargs) -> requests.Response:
+    """``POST`` por el pool del proveedor. Mismas excepciones que ``requests.post``."""
+    try:
+        return get_client(provider).post(url, endpoint=endpoint, timeout=timeout, **kwargs)
+    finally:
+        _METRICS.maybe_publish()
+
+
+def post_concurrently(
+    provider: str,
+    calls: list[dict[str, Any]],
+    *,
+    max_workers: int | None = None,
+) -> list[requests.Response | Exception]:
+    """Ejecuta varios ``post`` en paralelo (hasta el tope del proveedor).
+
+    Cada item de ``calls`` son los kwargs de ``post`` (``url``, ``endpoint``,
+    ``timeout``, ``json``, ``headers``...). Devuelve, en el mismo orden, la
+    respuesta o la excepción de cada llamada.
+    """
+    if not calls:
+        return []
+    client = get_client(provider)
+    workers = max(1, min(len(calls), int(max_workers or client.max_concurrency)))
+
+    def _one(call: dict[str, Any]):
+        kwargs = dict(call)
+        url = kwargs.pop("url")
+        try:
+            return client.post(url, **kwargs)
+        except Exception as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"outbound-{provider}") as pool:
+        results = list(pool.map(_one, calls))
+    _METRICS.maybe_publish()
+    return results
+
+
+def local_metrics() -> dict[str, Any]:
+    with _CLIENTS_LOCK:
+        clients = dict(_CLIENTS) if _CLIENTS_PID == os.getpid() else {}
+    return {name: client.snapshot() for name, client in clients.items()}
+
+
+_METRICS = ProcessMetricsPublisher(
+    index_key=METRICS_INDEX_KEY,
+    key_prefix=METRICS_KEY_PREFIX,
+    collect=local_metrics,
+    context="outbound_http_metrics",
+)
+
+
+def _merge_histogram(into: dict[str, Any], other: dict[str, Any]) -> None:
+    into["counts"] = [a + b for a, b in zip(into["counts"], other.get("counts") or [])]
+    into["total"] += int(other.get("total") or 0)
+    into["errors"] += int(other.get("errors") or 0)
+    into["sum_ms"] = round(into["sum_ms"] + float(other.get("sum_ms") or 0), 1)
+    into["max_ms"] = max(into["max_ms"], float(other.get("max_ms") or 0))
+
+
+def outbound_http_metrics() -> dict[str, Any]:
+    """Latencia por endpoint y estado del breaker, sumado entre procesos (backplane)."""
+    snapshots = _METRICS.snapshots()
+    merged: dict[str, Any] = {}
+    processes = 0
+    for snap in snapshots:
+        if not snap:
+            continue
+        processes += 1
+        for provider, row in snap.items():
+            out = merged.setdefault(
+                provider,
+                {"in_flight": 0, "breaker_open_processes": 0, "breaker_opened_total": 0, "breaker_rejected_total": 0, "endpoints": {}},
+            )
+            out["in_flight"] += int(row.get("in_flight") or 0)
+            out["breaker_open_processes"] += 1 if row.get("breaker_state") == "open" else 0
+            out["breaker_opened_total"] += int(row.get("breaker_opened_total") or 0)
+            out["breaker_rejected_total"] += int(row.get("breaker_rejected_total") or 0)
+            for endpoint, hist in (row.get("endpoints") or {}).items():
+                if endpoint not in out["endpoints"]:
+                    out["endpoints"][endpoint] = {**hist, "counts": list(hist.get("counts") or [])}
+                else:
+                    _merge_histogram(out["endpoints"][endpoint], hist)
+    return {"processes": processes, "providers": merged}
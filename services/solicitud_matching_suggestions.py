@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Top-k de matching materializado por solicitud (``solicitud_matching_suggestions``).
+
+``/admin/matching/solicitudes/<id>`` y las sugerencias inteligentes rankeaban
+en vivo al abrir la pantalla. ``flask matching-suggestions precompute`` (cron
+nocturno) rankea todas las solicitudes activas con ``rank_candidates_batch``
+—un prefiltro por ciudad y un contexto de scoring compartido— y guarda el
+top-k de cada una; las pantallas lo leen con ``load_matching_suggestions``.
+
+- Se guardan las filas de ``rank_candidates`` sin la instancia ``candidate``;
+  al leer se recargan las candidatas en una consulta.
+- Una fila solo se sirve si la solicitud no cambió (fingerprint), la versión
+  del pool de su bucket sigue igual y no pasó ``MATCHING_SUGGESTIONS_MAX_AGE_SECONDS``.
+  Si no, la pantalla recalcula en vivo como antes.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Any, Iterable
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+
+from config_app import db
+from models import Candidata, Solicitud, SolicitudMatchingSuggestion
+from services.solicitud_recommendation_pool_version import current_pool_version, pool_bucket
+from services.solicitud_recommendation_snapshot import build_solicitud_fingerprint
+from utils.matching_service import DEFAULT_TOP_K, build_solicitud_profile, rank_candidates_batch
+from utils.runtime_config import env_int, table_ready
+from utils.timezone import utc_now_naive
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_SOLICITUD_STATES = ("activa", "reemplazo")
+
+
+def _max_age_seconds() -> int:
+    return env_int("MATCHING_SUGGESTIONS_MAX_AGE_SECONDS", 36 * 3600, min_value=60)
+
+
+def suggestions_table_ready() -> bool:
+    return table_ready(SolicitudMatchingSuggestion.__tablename__)
+
+
+def _solicitud_bucket(solicitud) -> str:
+    try:
+        return pool_bucket(build_solicitud_profile(solicitud).get("city"))
+    except Exception:
+        return pool_bucket(None)
+
+
+def _serialize_row(row: dict[str, Any]) -> dict[str, Any]:
+    out = {key: value for key, value in row.items() if key != "candidate"}
+    out["candidata_id"] = int(getattr(row.get("candidate"), "fila", 0) or 0)
+    return out
+
+
+def _store_suggestions(
+    solicitudes: Iterable[Solicitud],
+    ranked_by_id: dict[int, list[dict[str, Any]]],
+    *,
+    versions: dict[str, int | None],
+    top_k: int,
+) -> int:
+    table = SolicitudMatchingSuggestion.__table__
+    now_value = utc_now_naive()
+    rows = []
+    for solicitud in solicitudes:
+        sol_id = int(getattr(solicitud, "id", 0) or 0)
+        if sol_id not in ranked_by_id:
+            continue
+        bucket = _solicitud_bucket(solicitud)
+        rows.append(
+            {
+                "solicitud_id": sol_id,
+                "solicitud_fingerprint": build_solicitud_fingerprint(solicitud),
+                "pool_bucket": bucket,
+                "pool_version": versions.get(bucket),
+                "top_k": int(top_k),
+                "items": [_serialize_row(row) for row in ranked_by_id[sol_id]],
+                "computed_at": now_value,
+            }
+        )
+    if not rows:
+        return 0
+    connection = db.session.connection()
+    connection.execute(table.delete().where(table.c.solicitud_id.in_([r["solicitud_id"] for r in rows])))
+    connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def precompute_matching_suggestions(
+    *,
+    solicitud_ids: Iterable[int] | None = None,
+    top_k: int = DEFAULT_TOP_K,
+    batch_size: int = 200,
+) -> dict[str, int]:
+    """Materializa el top-k de las solicitudes activas (o de ``solicitud_ids``).
+
+    Cada lote de solicitudes se rankea con ``rank_candidates_batch`` y se guarda
+    en una transacción. Sin ``solicitud_ids`` también borra las filas de
+    solicitudes que ya no están activas.
+    """
+    if not suggestions_table_ready():
+        raise click.ClickException("La tabla solicitud_matching_suggestions no existe (falta migrar).")
+    top_k = max(1, min(int(top_k or DEFAULT_TOP_K), 100))
+    batch = max(1, min(int(batch_size or 200), 1000))
+    ids_filter = sorted({int(x) for x in (solicitud_ids or ()) if int(x or 0) > 0}) if solicitud_ids is not None else None
+    stats = {"solicitudes": 0, "written": 0, "batches": 0, "pruned": 0}
+    last_id = 0
+    while True:
+        q = Solicitud.query.filter(Solicitud.id > last_id)
+        if ids_filter is not None:
+            q = q.filter(Solicitud.id.in_(ids_filter))
+        else:
+            q = q.filter(Solicitud.estado.in_(ACTIVE_SOLICITUD_STATES))
+        solicitudes = q.order_by(Solicitud.id.asc()).limit(batch).all()
+        if not solicitudes:
+            break
+        # Leídas antes del prefiltro: un cambio concurrente deja la fila como vieja, nunca al revés.
+        versions = {bucket: current_pool_version(bucket) for bucket in {_solicitud_bucket(s) for s in solicitudes}}
+        ranked_by_id = rank_candidates_batch(solicitudes, top_k=top_k)
+        stats["written"] += _store_suggestions(solicitudes, ranked_by_id, versions=versions, top_k=top_k)
+        db.session.commit()
+        stats["solicitudes"] += len(solicitudes)
+        stats["batches"] += 1
+        last_id = int(solicitudes[-1].id)
+        db.session.expunge_all()
+
+    if ids_filter is None:
+        table = SolicitudMatchingSuggestion.__table__
+        active_ids = db.session.query(Solicitud.id).filter(Solicitud.estado.in_(ACTIVE_SOLICITUD_STATES))
+        result = db.session.execute(table.delete().where(table.c.solicitud_id.notin_(active_ids.scalar_subquery())))
+        stats["pruned"] = int(result.rowcount or 0)
+        db.session.commit()
+    logger.info(
+        "matching.suggestions_precompute solicitudes=%s written=%s batches=%s pruned=%s",
+        stats["solicitudes"],
+        stats["written"],
+        stats["batches"],
+        stats["pruned"],
+    )
+    return stats
+
+
+def load_matching_suggestions(solicitud, *, top_k: int = DEFAULT_TOP_K) -> list[dict[str, Any]] | None:
+    """Top-k materializado con la forma de ``rank_candidates``; ``None`` si no hay o está viejo."""
+    sol_id = int(getattr(solicitud, "id", 0) or 0)
+    if sol_id <= 0 or not suggestions_table_ready():
+        return None
+    try:
+        row = db.session.get(SolicitudMatchingSuggestion, sol_id)
+    except Exception:
+        logger.warning("matching.suggestions lookup failed solicitud_id=%s", sol_id, exc_info=True)
+        return None
+    if row is None:
+        return None
+
+    items = list(row.items or [])
+    if int(row.top_k or 0) < int(top_k) and len(items) >= int(row.top_k or 0):
+        return None
+    if row.computed_at is None or row.computed_at < utc_now_naive() - timedelta(seconds=_max_age_seconds()):
+        return None
+    if str(row.solicitud_fingerprint or "") != build_solicitud_fingerprint(solicitud):
+        return None
+    if row.pool_version is None or current_pool_version(str(row.pool_bucket or "")) != int(row.pool_version):
+        return None
+
+    items = items[: max(1, int(top_k))]
+    ids = [int(item.get("candidata_id") or 0) for item in items]
+    candidates = {int(c.fila): c for c in Candidata.query.filter(Candidata.fila.in_(ids)).all()} if ids else {}
+    if any(cand_id not in candidates for cand_id in ids):
+        return None
+    return [{**item, "candidate": candidates[cand_id]} for item, cand_id in zip(items, ids)]
+
+
+def matching_suggestion_stats() -> dict[str, Any]:
+    table = SolicitudMatchingSuggestion.__table__
+    total = int(db.session.execute(select(func.count()).select_from(table)).scalar() or 0)
+    oldest, newest = db.session.execute(select(func.min(table.c.computed_at), func.max(table.c.computed_at))).one()
+    active = int(Solicitud.query.filter(Solicitud.estado.in_(ACTIVE_SOLICITUD_STATES)).count())
+    return {"rows": total, "active_solicitudes": active, "oldest": oldest, "newest": newest}
+
+
+@click.group("matching-suggestions")
+def matching_suggestions_cli():
+    """Top-k de matching materializado por solicitud."""
+
+
+@matching_suggestions_cli.command("precompute")
+@click.option("--solicitud-id", "solicitud_ids", multiple=True, type=int, help="Solo estas solicitudes (repetible).")
+@click.option("--top-k", default=DEFAULT_TOP_K, show_default=True, type=int)
+@click.option("--batch-size", default=200, show_default=True, type=int, help="Solicitudes por lote/commit.")
+@with_appcontext
+def matching_suggestions_precompute_command(solicitud_ids: tuple[int, ...], top_k: int, batch_size: int):
+    """Rankea las solicitudes activas por lotes y guarda su top-k."""
+    stats = precompute_matching_suggestions(
+        solicitud_ids=list(solicitud_ids) if solicitud_ids else None,
+        top_k=top_k,
+        batch_size=batch_size,
+    )
+    click.echo(
+        f"solicitudes={stats['solicitudes']} written={stats['written']} "
+        f"batches={stats['batches']} pruned={stats['pruned']}"
+    )
+
+
+@matching_suggestions_cli.command("stats")
+@with_appcontext
+def matching_suggestions_stats_command():
+    """Filas materializadas frente a solicitudes activas."""
+    out = matching_suggestion_stats()
+    click.echo(
+        f"rows={out['rows']} active_solicitudes={out['active_solicitudes']} "
+        f"oldest={out['oldest']} newest={out['newest']}"
+    )
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Versión del pool de candidatas para la frescura de recomendaciones.
+
+``_run_pool_guard_is_stale`` antes re-ejecutaba el prefiltro + ``Entrevista``
+en cada apertura del shortlist. Ahora cada run guarda la versión del pool con
+la que se generó y la comprobación es una lectura del backplane; el hash
+completo de guards solo se recalcula cuando la versión se movió.
+
+- Buckets: ``*`` (solicitudes sin ciudad) y una por ciudad conocida del
+  matching (mismo ``ILIKE '%ciudad%'`` sobre dirección/rutas que el prefiltro).
+- Suben al hacer commit de cambios en ``Candidata`` que está (o estaba) en un
+  estado del pool, al crear/borrar una ``Entrevista`` y al escribir una
+  ``SolicitudCandidata`` (las banderas ``blocked_other_client``,
+  ``rejected_same_client`` y asignación activa salen de esas filas). Un
+  ``query.update/delete`` masivo sobre ``SolicitudCandidata`` sube todos los buckets.
+- Sin backplane, ``current_pool_version`` devuelve ``None`` y el servicio
+  vuelve al hash completo con TTL corto.
+"""
+from __future__ import annotations
+
+import time
+from typing import Iterable
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, attributes, object_session
+
+from models import Candidata, Entrevista, SolicitudCandidata
+from utils.distributed_backplane import bp_add, bp_get, bp_incr
+from utils.text_normalizer import _CITY_PATTERNS
+
+
+KEY_PREFIX = "solrec:poolver:v1:"
+ALL_BUCKET = "*"
+VERSION_TTL_SECONDS = 30 * 24 * 3600
+POOL_STATES = frozenset({"lista_para_trabajar", "inscrita"})
+CITY_BUCKETS = tuple(_CITY_PATTERNS.keys())
+
+_PENDING_FLAG = "solrec_pool_buckets"
+_UNKNOWN = object()
+
+
+def pool_bucket(city: str | None) -> str:
+    city = (city or "").strip().lower()
+    return city if city in CITY_BUCKETS else ALL_BUCKET
+
+
+def _key(bucket: str) -> str:
+    return f"{KEY_PREFIX}{bucket}"
+
+
+def _initial_version() -> int:
+    # Tras un desalojo la clave renace en "ahora" (ms): nunca repite un valor ya guardado en un run.
+    return int(time.time() * 1000)
+
+
+def current_pool_version(bucket: str) -> int | None:
+    """Versión actual del bucket; ``None`` si el backplane no responde."""
+    key = _key(bucket)
+    value = bp_get(key, default=None, context="solrec_pool_version_get")
+    if value is None:
+        bp_add(key, _initial_version(), timeout=VERSION_TTL_SECONDS, context="solrec_pool_version_init")
+        value = bp_get(key, default=None, context="solrec_pool_version_get")
+    try:
+        return int(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def bump_pool_versions(buckets: Iterable[str]) -> None:
+    for bucket in sorted(set(buckets)):
+        key = _key(bucket)
+        bp_add(key, _initial_version(), timeout=VERSION_TTL_SECONDS, context="solrec_pool_version_init")
+        bp_incr(key, timeout=VERSION_TTL_SECONDS, context="solrec_pool_version_incr")
+
+
+def buckets_for(*, estado, direccion, rutas) -> set[str]:
+    """Buckets a los que pertenece una candidata; ``_UNKNOWN`` = suponer el peor caso."""
+    if estado is not _UNKNOWN and (str(estado or "").strip().lower() not in POOL_STATES):
+        return set()
+    if direccion is _UNKNOWN or rutas is _UNKNOWN:
+        return {ALL_BUCKET, *CITY_BUCKETS}
+    text = f"{direccion or ''}\n{rutas or ''}".lower()
+    return {ALL_BUCKET, *(city for city in CITY_BUCKETS if city in text)}
+
+
+def _value(target, name: str, *, old: bool, inserting: bool = False):
+    if inserting:
+        # Columna nunca asignada en un insert = NULL.
+        return target.__dict__.get(name)
+    hist = attributes.get_history(target, name, passive=attributes.PASSIVE_NO_INITIALIZE)
+    if old and hist.deleted:
+        return hist.deleted[0]
+    if old and hist.added:
+        # Expirada y reasignada: el valor previo no se conoce.
+        return _UNKNOWN
+    if not old and hist.added:
+        return hist.added[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    if name in target.__dict__:
+        return target.__dict__[name]
+    return _UNKNOWN
+
+
+def _candidata_buckets(target, *, old: bool, inserting: bool = False) -> set[str]:
+    return buckets_for(
+        estado=_value(target, "estado", old=old, inserting=inserting),
+        direccion=_value(target, "direccion_completa", old=old, inserting=inserting),
+        rutas=_value(target, "rutas_cercanas", old=old, inserting=inserting),
+    )
+
+
+def _mark(session, buckets: set[str]) -> None:
+    if session is None or not buckets:
+        return
+    pending = session.info.setdefault(_PENDING_FLAG, set())
+    pending.update(buckets)
+
+
+@event.listens_for(Candidata, "after_insert")
+def _pool_candidata_inserted(_mapper, _connection, target):
+    _mark(object_session(target), _candidata_buckets(target, old=False, inserting=True))
+
+
+@event.listens_for(Candidata, "after_delete")
+def _pool_candidata_deleted(_mapper, _connection, target):
+    _mark(object_session(target), _candidata_buckets(target, old=True))
+
+
+@event.listens_for(Candidata, "after_update")
+def _pool_candidata_updated(mapper, _connection, target):
+    changed = any(
+        attributes.get_history(target, prop.key, passive=attributes.PASSIVE_NO_INITIALIZE).has_changes()
+        for prop in mapper.column_attrs
+    )
+    if changed:
+        _mark(
+            object_session(target),
+            _candidata_buckets(target, old=True) | _candidata_buckets(target, old=False),
+        )
+
+
+def _candidata_id_changed(connection, target, cid) -> None:
+    cid = int(cid or 0)
+    if cid <= 0:
+        return
+    table = Candidata.__table__
+    row = connection.execute(
+        select(table.c.estado, table.c.direccion_completa, table.c.rutas_cercanas).where(table.c.fila == cid)
+    ).first()
+    if row is None:
+        return
+    _mark(object_session(target), buckets_for(estado=row[0], direccion=row[1], rutas=row[2]))
+
+
+def _entrevista_changed(connection, target) -> None:
+    _candidata_id_changed(connection, target, getattr(target, "candidata_id", 0))
+
+
+@event.listens_for(Entrevista, "after_insert")
+@event.listens_for(Entrevista, "after_delete")
+def _pool_entrevista_written(_mapper, connection, target):
+    _entrevista_changed(connection, target)
+
+
+@event.listens_for(SolicitudCandidata, "after_insert")
+@event.listens_for(SolicitudCandidata, "after_delete")
+def _pool_solicitud_candidata_written(_mapper, connection, target):
+    _candidata_id_changed(connection, target, getattr(target, "candidata_id", 0))
+
+
+@event.listens_for(SolicitudCandidata, "after_update")
+def _pool_solicitud_candidata_updated(_mapper, connection, target):
+    cids: set[int] = set()
+    for name in ("candidata_id", "solicitud_id", "status"):
+        hist = attributes.get_history(target, name, passive=attributes.PASSIVE_NO_INITIALIZE)
+        if not hist.has_changes():
+            continue
+        cids.add(int(getattr(target, "candidata_id", 0) or 0))
+        if name == "candidata_id":
+            cids.update(int(v or 0) for v in hist.deleted)
+    for cid in cids:
+        _candidata_id_changed(connection, target, cid)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _pool_solicitud_candidata_bulk(state):
+    if not (state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    if mapper is None or mapper.class_ is not SolicitudCandidata:
+        return
+    # Sin filas concretas no se sabe qué candidatas toca: se invalidan todos los buckets.
+    _mark(state.session, {ALL_BUCKET, *CITY_BUCKETS})
+
+
+@event.listens_for(Session, "after_commit")
+def _pool_versions_after_commit(session):
+    buckets = session.info.pop(_PENDING_FLAG, None)
+    if not buckets:
+        return
+    try:
+        bump_pool_versions(buckets)
+    except Exception as exc:
+        try:
+            current_app.logger.warning("[solrec-pool-version] bump failed (%s: %s)", type(exc).__name__, exc)
+        except Exception:
+            pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _pool_versions_after_rollback(session):
+    session.info.pop(_PENDING_FLAG, None)
@@ -86,7 +86,17 @@ def _detect_image_mimetype(data: bytes) -> str:
 def _safe_perfil_photo_data_url(cand) -> str | None:
     if cand is None:
         return None
-    blob = _to_blob_bytes(getattr(cand, "perfil", None))
+    loaded = getattr(cand, "__dict__", {}) or {}
+    if "perfil" in loaded:
+        blob = _to_blob_bytes(loaded.get("perfil"))
+    else:
+        from core.services.candidata_documentos import load_candidata_document
+
+        try:
+            doc = load_candidata_document(int(getattr(cand, "fila", 0) or 0), "perfil")
+        except Exception:
+            doc = None
+        blob = doc.data if doc is not None else b""
     if not blob:
         return None
     mimetype = _detect_image_mimetype(blob)
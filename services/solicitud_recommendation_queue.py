@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""Cola durable de generación de recomendaciones (``solicitud_recommendation_jobs``).
+
+Reemplaza el ``ThreadPoolExecutor`` en proceso: el web solo encola (un job por
+run) y ``flask recommendation-queue run`` genera los snapshots en su propio
+proceso. Un deploy o reinicio del web ya no pierde trabajo encolado.
+
+- Dos carriles: ``interactive`` (portal/admin, prioridad 0) y ``backfill``
+  (precálculos nocturnos/masivos, prioridad 10). Se toma siempre el de menor
+  prioridad primero; ``--lane`` permite dedicar un worker a un carril.
+- Dedupe por run: ``run_id`` es único; re-encolar un job vivo no hace nada.
+- Claim: ``FOR UPDATE SKIP LOCKED`` en PostgreSQL y, en cualquier motor, un
+  ``UPDATE ... WHERE status='queued'`` condicional (solo un worker gana).
+- Un job ``running`` con el lease vencido (worker muerto) vuelve a la cola.
+  Mientras genera, el worker renueva ``locked_at`` cada tercio del lease desde
+  un hilo propio; al terminar solo escribe el resultado si el job sigue siendo
+  suyo (mismo ``locked_by`` e intento), así un job reaped no se cierra dos veces.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import Any
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from config_app import db
+from models import SolicitudRecommendationJob, SolicitudRecommendationRun
+from utils.job_lease import LeaseHeartbeat, owned_job_clauses
+from utils.runtime_config import env_int, table_ready
+from utils.timezone import utc_now_naive
+
+
+logger = logging.getLogger(__name__)
+
+LANE_INTERACTIVE = "interactive"
+LANE_BACKFILL = "backfill"
+LANES = (LANE_INTERACTIVE, LANE_BACKFILL)
+LANE_PRIORITY = {LANE_INTERACTIVE: 0, LANE_BACKFILL: 10}
+BACKFILL_TRIGGER_PREFIXES = ("backfill", "nightly", "precompute", "batch")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+
+def _max_attempts() -> int:
+    return env_int("SOL_REC_QUEUE_MAX_ATTEMPTS", 5)
+
+
+def _lease_seconds() -> int:
+    return env_int("SOL_REC_QUEUE_LEASE_SECONDS", 300, min_value=30)
+
+
+def _retry_delay_seconds(attempts: int, max_backoff_seconds: int = 300) -> int:
+    exp = 5 * (2 ** max(0, int(attempts) - 1))
+    return max(5, min(int(max_backoff_seconds), int(exp)))
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"[:80]
+
+
+def _dialect() -> str:
+    try:
+        return str(db.session.get_bind().dialect.name or "").strip().lower()
+    except Exception:
+        return ""
+
+
+def jobs_table_ready() -> bool:
+    return table_ready(SolicitudRecommendationJob.__tablename__)
+
+
+def lane_for_trigger(trigger_source: str | None) -> str:
+    source = str(trigger_source or "").strip().lower()
+    return LANE_BACKFILL if source.startswith(BACKFILL_TRIGGER_PREFIXES) else LANE_INTERACTIVE
+
+
+def enqueue_recommendation_run(run_id: int, *, lane: str | None = None) -> bool:
+    """Encola (o re-encola si ya terminó) el job de un run.
+
+    Devuelve ``True`` si el run queda en cola tras la llamada. Solo hace flush
+    dentro de un savepoint: el commit (y con él la visibilidad del job para los
+    workers) es del llamador, en la misma transacción que el run.
+    """
+    run_id = int(run_id or 0)
+    if run_id <= 0 or not jobs_table_ready():
+        return False
+    run = db.session.get(SolicitudRecommendationRun, run_id)
+    if run is None:
+        return False
+    lane = lane if lane in LANES else lane_for_trigger(getattr(run, "trigger_source", None))
+    now = utc_now_naive()
+
+    job = SolicitudRecommendationJob.query.filter_by(run_id=run_id).first()
+    if job is not None:
+        if job.status in {STATUS_QUEUED, STATUS_RUNNING}:
+            return True
+        job.status = STATUS_QUEUED
+        job.lane = lane
+        job.priority = LANE_PRIORITY[lane]
+        job.attempts = 0
+        job.available_at = now
+        job.locked_by = None
+        job.locked_at = None
+        job.last_error = None
+        job.finished_at = None
+        db.session.flush()
+        return True
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(
+                SolicitudRecommendationJob(
+                    run_id=run_id,
+                    solicitud_id=int(run.solicitud_id),
+                    lane=lane,
+                    priority=LANE_PRIORITY[lane],
+                    status=STATUS_QUEUED,
+                    attempts=0,
+                    available_at=now,
+                    created_at=now,
+                )
+            )
+    except IntegrityError:
+        # Otro proceso lo encoló entre el SELECT y el INSERT; solo se deshace el savepoint.
+        pass
+    return True
+
+
+def reap_expired_leases(*, lease_seconds: int | None = None, max_attempts: int | None = None) -> int:
+    """Devuelve a la cola los jobs ``running`` de workers que murieron."""
+    if not jobs_table_ready():
+        return 0
+    now = utc_now_naive()
+    cutoff = now - timedelta(seconds=int(lease_seconds or _lease_seconds()))
+    max_attempts = int(max_attempts or _max_attempts())
+    base = SolicitudRecommendationJob.query.filter(
+        SolicitudRecommendationJob.status == STATUS_RUNNING,
+        SolicitudRecommendationJob.locked_at < cutoff,
+    )
+    dead = base.filter(SolicitudRecommendationJob.attempts >= max_attempts).update(
+        {"status": STATUS_DEAD, "finished_at": now, "last_error": "lease_expired", "locked_by": None},
+        synchronize_session=False,
+    )
+    requeued = base.filter(SolicitudRecommendationJob.attempts < max_attempts).update(
+        {"status": STATUS_QUEUED, "available_at": now, "locked_by": None, "locked_at": None},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return int(dead or 0) + int(requeued or 0)
+
+
+def claim_jobs(*, batch_size: int = 5, lane: str | None = None, worker_id: str | None = None) -> list[int]:
+    now = utc_now_naive()
+    query = (
+        db.session.query(SolicitudRecommendationJob.id)
+        .filter(SolicitudRecommendationJob.status == STATUS_QUEUED)
+        .filter(SolicitudRecommendationJob.available_at <= now)
+    )
+    if lane:
+        query = query.filter(SolicitudRecommendationJob.lane == lane)
+    query = query.order_by(SolicitudRecommendationJob.priority.asc(), SolicitudRecommendationJob.id.asc())
+    query = query.limit(max(1, int(batch_size)))
+    if _dialect() == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+
+    claimed: list[int] = []
+    owner = (worker_id or _worker_id())[:80]
+    for (job_id,) in query.all():
+        rows = (
+            SolicitudRecommendationJob.query
+            .filter(SolicitudRecommendationJob.id == int(job_id), SolicitudRecommendationJob.status == STATUS_QUEUED)
+            .update(
+                {
+                    "status": STATUS_RUNNING,
+                    "locked_by": owner,
+                    "locked_at": now,
+                    "attempts": SolicitudRecommendationJob.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        if int(rows or 0) > 0:
+            claimed.append(int(job_id))
+    db.session.commit()
+    return claimed
+
+
+def _finish_owned_job(job_id: int, *, owner: str, attempt: int, values: dict[str, Any]) -> bool:
+    """Escribe el desenlace solo si el job sigue siendo de este worker e intento."""
+    rows = (
+        SolicitudRecommendationJob.query
+        .filter(*owned_job_clauses(SolicitudRecommendationJob.__table__, job_id=job_id, owner=owner, attempt=attempt))
+        .update(values, synchronize_session=False)
+    )
+    db.session.commit()
+    return int(rows or 0) > 0
+
+
+def _process_job(job_id: int, *, max_attempts: int, max_backoff_seconds: int, lease_seconds: float | None = None) -> str:
+    from services.solicitud_recommendation_service import SolicitudRecommendationService
+
+    job = db.session.get(SolicitudRecommendationJob, int(job_id))
+    if job is None:
+        return "missing"
+    run_id = int(job.run_id)
+    owner = str(job.locked_by or "")
+    attempt = int(job.attempts or 0)
+    lease = float(lease_seconds or _lease_seconds())
+    heartbeat = LeaseHeartbeat(
+        db.engine,
+        SolicitudRecommendationJob.__table__,
+        job_id=int(job_id),
+        owner=owner,
+        attempt=attempt,
+        interval_seconds=lease / 3.0,
+    )
+    try:
+        with heartbeat:
+            SolicitudRecommendationService().generate_snapshot(run_id=run_id, commit=True)
+        owned = _finish_owned_job(
+            job_id,
+            owner=owner,
+            attempt=attempt,
+            values={"status": STATUS_DONE, "finished_at": utc_now_naive(), "locked_by": None, "last_error": None},
+        )
+        return STATUS_DONE if owned else "fenced"
+    except Exception as exc:
+        db.session.rollback()
+        logger.exception("solicitud_recommendation.queue_job_failed job_id=%s run_id=%s", int(job_id), run_id)
+        now = utc_now_naive()
+        values: dict[str, Any] = {
+            "last_error": f"{type(exc).__name__}: {exc}"[:500],
+            "locked_by": None,
+            "locked_at": None,
+        }
+        if attempt >= max_attempts:
+            status = STATUS_DEAD
+            values.update(status=STATUS_DEAD, finished_at=now)
+        else:
+            status = STATUS_QUEUED
+            values.update(
+                status=STATUS_QUEUED,
+                available_at=now + timedelta(seconds=_retry_delay_seconds(attempt, max_backoff_seconds)),
+            )
+        if not _finish_owned_job(job_id, owner=owner, attempt=attempt, values=values):
+            return "fenced"
+        return status
+
+
+def run_queue_once(
+    *,
+    batch_size: int = 5,
+    lane: str | None = None,
+    max_attempts: int | None = None,
+    max_backoff_seconds: int = 300,
+) -> dict[str, int]:
+    stats = {"reaped": 0, "picked": 0, "done": 0, "retried": 0, "dead": 0, "fenced": 0}
+    if not jobs_table_ready():
+        return stats
+    max_attempts = int(max_attempts or _max_attempts())
+    stats["reaped"] = reap_expired_leases(max_attempts=max_attempts)
+    job_ids = claim_jobs(batch_size=batch_size, lane=lane)
+    stats["picked"] = len(job_ids)
+    for job_id in job_ids:
+        outcome = _process_job(job_id, max_attempts=max_attempts, max_backoff_seconds=max_backoff_seconds)
+        if outcome == STATUS_DONE:
+            stats["done"] += 1
+        elif outcome == STATUS_QUEUED:
+            stats["retried"] += 1
+        elif outcome == STATUS_DEAD:
+            stats["dead"] += 1
+        elif outcome == "fenced":
+            stats["fenced"] += 1
+        db.session.remove()
+    return stats
+
+
+def run_queue_loop(
+    *,
+    batch_size: int = 5,
+    poll_seconds: float = 0.5,
+    lane: str | None = None,
+    once: bool = False,
+    until_empty: bool = False,
+    max_attempts: int | None = None,
+) -> dict[str, int]:
+    summary = {"cycles": 0, "reaped": 0, "picked": 0, "done": 0, "retried": 0, "dead": 0, "fenced": 0}
+    while True:
+        stats = run_queue_once(batch_size=batch_size, lane=lane, max_attempts=max_attempts)
+        summary["cycles"] += 1
+        for key, value in stats.items():
+            summary[key] += int(value or 0)
+        if once or (until_empty and not stats["picked"]):
+            return summary
+        if not stats["picked"]:
+            time.sleep(max(0.1, float(poll_seconds)))
+
+
+def queue_stats() -> dict[str, Any]:
+    rows = (
+        db.session.query(
+            SolicitudRecommendationJob.lane,
+            SolicitudRecommendationJob.status,
+            func.count(SolicitudRecommendationJob.id),
+            func.min(SolicitudRecommendationJob.created_at),
+        )
+        .group_by(SolicitudRecommendationJob.lane, SolicitudRecommendationJob.status)
+        .all()
+    )
+    now = utc_now_naive()
+    counts: dict[str, dict[str, int]] = {lane: {} for lane in LANES}
+    oldest_queued_seconds: dict[str, int] = {}
+    for lane, status, count, oldest in rows:
+        counts.setdefault(str(lane), {})[str(status)] = int(count or 0)
+        if status == STATUS_QUEUED and oldest is not None:
+            oldest_queued_seconds[str(lane)] = max(0, int((now - oldest).total_seconds()))
+    return {"counts": counts, "oldest_queued_seconds": oldest_queued_seconds}
+
+
+def requeue_jobs(*, job_id: int | None = None, all_dead: bool = False) -> int:
+    query = SolicitudRecommendationJob.query
+    if job_id:
+        query = query.filter(SolicitudRecommendationJob.id == int(job_id))
+    elif all_dead:
+        query = query.filter(SolicitudRecommendationJob.status == STATUS_DEAD)
+    else:
+        return 0
+    rows = query.filter(SolicitudRecommendationJob.status != STATUS_RUNNING).update(
+        {
+            "status": STATUS_QUEUED,
+            "attempts": 0,
+            "available_at": utc_now_naive(),
+            "locked_by": None,
+            "locked_at": None,
+            "finished_at": None,
+        },
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return int(rows or 0)
+
+
+@click.group("recommendation-queue")
+def recommendation_queue_cli():
+    """Cola durable de snapshots de recomendaciones."""
+
+
+@recommendation_queue_cli.command("run")
+@click.option("--once", is_flag=True, default=False, help="Ejecuta un solo ciclo.")
+@click.option("--lane", type=click.Choice(LANES), default=None, help="Solo consume este carril.")
+@click.option("--batch-size", default=5, show_default=True, type=int, help="Jobs reclamados por ciclo.")
+@click.option("--poll-seconds", default=0.5, show_default=True, type=float, help="Pausa con la cola vacía.")
+@click.option("--max-attempts", default=0, type=int, help="0 = SOL_REC_QUEUE_MAX_ATTEMPTS (5).")
+@with_appcontext
+def recommendation_queue_run_command(once: bool, lane: str | None, batch_size: int, poll_seconds: float, max_attempts: int):
+    stats = run_queue_loop(
+        batch_size=max(1, int(batch_size)),
+        poll_seconds=max(0.1, float(poll_seconds)),
+        lane=lane,
+        once=bool(once),
+        max_attempts=int(max_attempts) or None,
+    )
+    click.echo(" ".join(f"{key}={int(value)}" for key, value in stats.items()))
+
+
+@recommendation_queue_cli.command("drain")
+@click.option("--lane", type=click.Choice(LANES), default=None, help="Solo drena este carril.")
+@click.option("--batch-size", default=20, show_default=True, type=int)
+@with_appcontext
+def recommendation_queue_drain_command(lane: str | None, batch_size: int):
+    """Procesa en este proceso hasta vaciar la cola (jobs disponibles ya)."""
+    stats = run_queue_loop(batch_size=max(1, int(batch_size)), lane=lane, until_empty=True)
+    click.echo(" ".join(f"{key}={int(value)}" for key, value in stats.items()))
+
+
+@recommendation_queue_cli.command("stats")
+@with_appcontext
+def recommendation_queue_stats_command():
+    """Conteo por carril/estado y antigüedad del job en cola más viejo."""
+    stats = queue_stats()
+    for lane, counts in stats["counts"].items():
+        parts = " ".join(f"{status}={counts.get(status, 0)}" for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_DEAD))
+        oldest = stats["oldest_queued_seconds"].get(lane)
+        click.echo(f"lane={lane} {parts} oldest_queued_s={oldest if oldest is not None else '-'}")
+
+
+@recommendation_queue_cli.command("list")
+@click.option("--status", type=click.Choice((STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_DEAD)), default=STATUS_DEAD, show_default=True)
+@click.option("--limit", default=25, show_default=True, type=int)
+@with_appcontext
+def recommendation_queue_list_command(status: str, limit: int):
+    rows = (
+        SolicitudRecommendationJob.query
+        .filter(SolicitudRecommendationJob.status == status)
+        .order_by(SolicitudRecommendationJob.id.desc())
+        .limit(max(1, int(limit)))
+        .all()
+    )
+    click.echo(f"{status}_count={len(rows)}")
+    for row in rows:
+        click.echo(
+            f"id={row.id} run_id={row.run_id} solicitud_id={row.solicitud_id} lane={row.lane} "
+            f"attempts={row.attempts} locked_by={row.locked_by or '-'} "
+            f"available_at={row.available_at} last_error={(row.last_error or '-')[:120]}"
+        )
+
+
+@recommendation_queue_cli.command("requeue")
+@click.option("--id", "job_id", default=0, type=int, help="ID del job.")
+@click.option("--all-dead", is_flag=True, default=False, help="Re-encola todos los jobs muertos.")
+@with_appcontext
+def recommendation_queue_requeue_command(job_id: int, all_dead: bool):
+    if bool(job_id) == bool(all_dead):
+        raise click.ClickException("Debes indicar exactamente uno: --id o --all-dead.")
+    click.echo(f"requeued={requeue_jobs(job_id=job_id or None, all_dead=all_dead)}")
@@ -2,16 +2,13 @@
 from __future__ import annotations
 
 import logging
-import os
-import threading
 import time
 import json
 import inspect
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Any
 
-from flask import current_app, has_app_context
+from flask import current_app
 from sqlalchemy.orm import joinedload
 
 from config_app import cache, db
@@ -24,7 +21,9 @@ from models import (
     SolicitudRecommendationSelection,
 )
 from services.solicitud_recommendation_policy import SolicitudRecommendationPolicy
+from services.solicitud_recommendation_pool_version import current_pool_version, pool_bucket
 from services.solicitud_recommendation_presenter import present_shortlist_payload
+from services.solicitud_recommendation_queue import enqueue_recommendation_run
 from services.solicitud_recommendation_snapshot import (
     MODEL_VERSION,
     POLICY_VERSION,
@@ -41,36 +40,21 @@ from utils.matching_service import (
     build_scoring_context,
     candidate_query_prefilter,
 )
+from utils.runtime_config import env_int
 from utils.timezone import utc_now_naive
 
 logger = logging.getLogger(__name__)
 
 
-def _env_int(name: str, default: int, *, min_value: int | None = None, max_value: int | None = None) -> int:
-    raw = str(os.getenv(name, str(default)) or str(default)).strip()
-    try:
-        value = int(raw)
-    except Exception:
-        value = int(default)
-    if min_value is not None:
-        value = max(min_value, value)
-    if max_value is not None:
-        value = min(max_value, value)
-    return value
-
-
-_ASYNC_WORKERS = _env_int("SOL_REC_ASYNC_WORKERS", 2, min_value=1, max_value=8)
-_ASYNC_EXECUTOR = ThreadPoolExecutor(max_workers=_ASYNC_WORKERS, thread_name_prefix="sol-rec")
-_ASYNC_IN_FLIGHT: set[int] = set()
-_ASYNC_LOCK = threading.Lock()
-
-_DTO_CACHE_TTL_SECONDS = _env_int("SOL_REC_DTO_CACHE_TTL_SECONDS", 120, min_value=20, max_value=900)
-_RECOVERY_TIMEOUT_SECONDS = _env_int("SOL_REC_RECOVERY_TIMEOUT_SECONDS", 120, min_value=30, max_value=900)
-_RECOVERY_COOLDOWN_SECONDS = _env_int("SOL_REC_RECOVERY_COOLDOWN_SECONDS", 30, min_value=10, max_value=300)
-_AUTO_RETRY_COOLDOWN_SECONDS = _env_int("SOL_REC_AUTO_RETRY_COOLDOWN_SECONDS", 120, min_value=30, max_value=1800)
-_AUTO_RETRY_MAX_ATTEMPTS = _env_int("SOL_REC_AUTO_RETRY_MAX_ATTEMPTS", 2, min_value=0, max_value=8)
-_POOL_GUARD_CHECK_TTL_SECONDS = _env_int("SOL_REC_POOL_GUARD_CHECK_TTL_SECONDS", 20, min_value=5, max_value=120)
-_PREFILTER_LIMIT = _env_int(
+_DTO_CACHE_TTL_SECONDS = env_int("SOL_REC_DTO_CACHE_TTL_SECONDS", 120, min_value=20, max_value=900)
+_RECOVERY_TIMEOUT_SECONDS = env_int("SOL_REC_RECOVERY_TIMEOUT_SECONDS", 120, min_value=30, max_value=900)
+_RECOVERY_COOLDOWN_SECONDS = env_int("SOL_REC_RECOVERY_COOLDOWN_SECONDS", 30, min_value=10, max_value=300)
+_AUTO_RETRY_COOLDOWN_SECONDS = env_int("SOL_REC_AUTO_RETRY_COOLDOWN_SECONDS", 120, min_value=30, max_value=1800)
+_AUTO_RETRY_MAX_ATTEMPTS = env_int("SOL_REC_AUTO_RETRY_MAX_ATTEMPTS", 2, min_value=0, max_value=8)
+_POOL_GUARD_CHECK_TTL_SECONDS = env_int("SOL_REC_POOL_GUARD_CHECK_TTL_SECONDS", 20, min_value=5, max_value=120)
+# Con versión de pool el resultado del hash es exacto para esa versión: puede vivir más.
+_POOL_GUARD_VERSIONED_TTL_SECONDS = env_int("SOL_REC_POOL_GUARD_VERSIONED_TTL_SECONDS", 900, min_value=60, max_value=3600)
+_PREFILTER_LIMIT = env_int(
     "SOL_REC_PREFILTER_LIMIT",
     DEFAULT_PREFILTER_LIMIT,
     min_value=25,
@@ -125,10 +109,11 @@ class SolicitudRecommendationService:
         )
 
         if not synchronous:
-            if commit:
-                db.session.commit()
+            # El job se encola en la misma transacción que el run.
             if dispatch_async:
                 self._dispatch_async_run(int(getattr(run, "id", 0) or 0))
+            if commit:
+                db.session.commit()
             return run
 
         if commit:
@@ -199,11 +184,14 @@ class SolicitudRecommendationService:
             run.error_message = None
             run.failed_at = None
 
+            # Leída antes del prefiltro: un cambio concurrente deja el run como "posiblemente viejo".
+            pool_bucket_key = self._pool_bucket(solicitud)
+            pool_version = current_pool_version(pool_bucket_key)
             pool = list(candidate_query_prefilter(solicitud))
             if len(pool) > _PREFILTER_LIMIT:
                 pool = pool[:_PREFILTER_LIMIT]
             run.pool_size = int(len(pool))
-            scoring_context = build_scoring_context(solicitud, pool)
+            scoring_context = build_scoring_context(solicitud, pool, with_scores=True)
             policy_facts_by_id = dict(scoring_context.get("policy_facts_by_id") or {})
             sol_profile = build_solicitud_profile(solicitud)
 
@@ -318,6 +306,8 @@ class SolicitudRecommendationService:
                 "prefilter_limit": int(_PREFILTER_LIMIT),
                 "pool_guard_hash": build_pool_guard_hash(pool_guard_by_id),
                 "pool_guard_count": int(len(pool_guard_by_id)),
+                "pool_bucket": pool_bucket_key,
+                "pool_version": pool_version,
             }
             latency_ms = self._latency_ms(
                 requested_at=getattr(run, "requested_at", None),
@@ -796,11 +786,28 @@ class SolicitudRecommendationService:
         if not expected_hash or expected_count <= 0:
             return False
 
+        bucket = self._pool_bucket(solicitud)
+        live_version = current_pool_version(bucket)
+        run_version = meta.get("pool_version")
+        if (
+            live_version is not None
+            and run_version is not None
+            and str(meta.get("pool_bucket") or "") == bucket
+            and int(run_version) == int(live_version)
+        ):
+            self._obs_counter("rec:poolguard:version_hit_count")
+            return False
+        self._obs_counter("rec:poolguard:full_check_count")
+
         check_key = (
             f"solrec:poolguard:v1:run:{int(getattr(run, 'id', 0) or 0)}"
             f":sol:{int(getattr(solicitud, 'id', 0) or 0)}"
             f":exp:{expected_hash[:16]}"
         )
+        check_ttl = _POOL_GUARD_CHECK_TTL_SECONDS
+        if live_version is not None:
+            check_key = f"{check_key}:ver:{bucket}:{int(live_version)}"
+            check_ttl = _POOL_GUARD_VERSIONED_TTL_SECONDS
         use_cache = not bool(current_app.config.get("TESTING"))
         if use_cache:
             cached = self._cache_get(check_key)
@@ -823,10 +830,17 @@ class SolicitudRecommendationService:
             self._cache_set(
                 check_key,
                 {"stale": bool(stale), "count": int(live_count or 0), "hash": str(live_hash or "")},
-                timeout=_POOL_GUARD_CHECK_TTL_SECONDS,
+                timeout=check_ttl,
             )
         return bool(stale)
 
+    @staticmethod
+    def _pool_bucket(solicitud) -> str:
+        try:
+            return pool_bucket(build_solicitud_profile(solicitud).get("city"))
+        except Exception:
+            return pool_bucket(None)
+
     @staticmethod
     def _live_pool_guard_snapshot(*, solicitud) -> tuple[str, int]:
         pool = list(candidate_query_prefilter(solicitud))
@@ -1268,7 +1282,9 @@ class SolicitudRecommendationService:
         if self._cache_get(throttle_key):
             return
         self._cache_set(throttle_key, 1, timeout=_RECOVERY_COOLDOWN_SECONDS)
-        self._dispatch_async_run(int(getattr(run, "id", 0) or 0))
+        if self._dispatch_async_run(int(getattr(run, "id", 0) or 0)):
+            # Como ``_mark_run_error`` en la rama de timeout: la recuperación confirma su propio encolado.
+            db.session.commit()
 
     def _schedule_generation_if_allowed(self, *, solicitud, fingerprint: str, reason: str) -> bool:
         if _AUTO_RETRY_MAX_ATTEMPTS <= 0:
@@ -1327,34 +1343,13 @@ class SolicitudRecommendationService:
 
     @staticmethod
     def _dispatch_async_run(run_id: int) -> bool:
+        """Encola el run en ``solicitud_recommendation_jobs`` (flush); lo genera el worker de la cola."""
         run_id = int(run_id or 0)
         if run_id <= 0:
             return False
-
-        app = current_app._get_current_object() if has_app_context() else None
-        if app is None:
-            return False
-
-        with _ASYNC_LOCK:
-            if run_id in _ASYNC_IN_FLIGHT:
-                return False
-            _ASYNC_IN_FLIGHT.add(run_id)
-
-        def _worker(target_run_id: int):
-            try:
-                with app.app_context():
-                    SolicitudRecommendationService().generate_snapshot(run_id=int(target_run_id), commit=True)
-            except Exception:
-                logger.exception("solicitud_recommendation.async_failed run_id=%s", int(target_run_id))
-            finally:
-                with _ASYNC_LOCK:
-                    _ASYNC_IN_FLIGHT.discard(int(target_run_id))
-
         try:
-            _ASYNC_EXECUTOR.submit(_worker, run_id)
-            return True
+            return enqueue_recommendation_run(run_id)
         except Exception:
-            with _ASYNC_LOCK:
-                _ASYNC_IN_FLIGHT.discard(run_id)
-            logger.exception("solicitud_recommendation.async_submit_failed run_id=%s", run_id)
+            # El fallo queda en el savepoint del encolado; la transacción del llamador sigue viva.
+            logger.exception("solicitud_recommendation.enqueue_failed run_id=%s", run_id)
             return False
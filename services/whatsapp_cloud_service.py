@@ -6,6 +6,7 @@ import os
 from typing import Any
 
 import requests
+from services import outbound_http_service as outbound_http
 from services.bot_sandbox_service import SandboxSafetyError, assert_no_real_outbound_allowed, is_staging_offline_active
 from services.bot_observability_service import log_bot_event
 
@@ -121,7 +122,14 @@ def send_text_message(to_phone_e164: str, text: str, *, timeout_seconds: int = 8
         },
     )
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=timeout_seconds)
+        resp = outbound_http.post(
+            outbound_http.PROVIDER_WHATSAPP,
+            url,
+            endpoint="messages",
+            headers=headers,
+            json=payload,
+            timeout=timeout_seconds,
+        )
     except requests.Timeout:
         log_bot_event("network_exception", level="warning", metadata={"exception": "Timeout", "endpoint": url})
         return {"ok": False, "status": "failed", "error_code": "timeout", "error_message": "Timeout al llamar Graph API", "http_status": None}
@@ -69,6 +69,7 @@
     let sseRetryTimer = null;
     let streamModeProbe = null;
     let afterId = 0;
+    let afterStreamId = "";
     let fallbackMode = false;
     let sseDisabledByMode = false;
     let stopped = false;
@@ -433,6 +434,9 @@
       if (!pollUrlBase) return;
       const url = new URL(pollUrlBase, window.location.origin);
       url.searchParams.set("after_id", String(afterId || 0));
+      if (afterStreamId) {
+        url.searchParams.set("after_stream_id", afterStreamId);
+      }
       url.searchParams.set("limit", "25");
       if (view) {
         url.searchParams.set("view", view);
@@ -460,6 +464,21 @@
       if (Number.isFinite(nextAfterId) && nextAfterId > afterId) {
         afterId = Math.floor(nextAfterId);
       }
+      rememberStreamId(data && data.next_after_stream_id);
+    }
+
+    function rememberStreamId(value) {
+      const txt = String(value || "").trim();
+      if (/^\d+-\d+$/.test(txt)) {
+        afterStreamId = txt;
+      }
+    }
+
+    function streamUrlWithCursor() {
+      if (!afterStreamId) return streamUrl;
+      const url = new URL(streamUrl, window.location.origin);
+      url.searchParams.set("last_stream_id", afterStreamId);
+      return url.toString();
     }
 
     async function probePollOnlyOrUnauthorized() {
@@ -560,7 +579,7 @@
         stopSseRetry();
 
         try {
-          eventSource = new EventSource(streamUrl, { withCredentials: true });
+          eventSource = new EventSource(streamUrlWithCursor(), { withCredentials: true });
         } catch (_) {
           startPolling();
           return;
@@ -568,19 +587,32 @@
 
         eventSource.addEventListener("invalidation", function (ev) {
           try {
-            processInvalidationPayload(JSON.parse(ev.data || "{}"));
+            const payload = JSON.parse(ev.data || "{}");
+            rememberStreamId(payload && payload.stream_id);
+            processInvalidationPayload(payload);
           } catch (_) {}
         });
 
         eventSource.addEventListener("heartbeat", function (ev) {
           try {
             const payload = JSON.parse(ev.data || "{}");
+            rememberStreamId(payload && payload.last_stream_id);
             if (String((payload && payload.mode) || "") === "heartbeat_only") {
               startPolling();
             }
           } catch (_) {}
         });
 
+        eventSource.addEventListener("resync", function (ev) {
+          try {
+            const payload = JSON.parse(ev.data || "{}");
+            rememberStreamId(payload && payload.last_stream_id);
+          } catch (_) {}
+          regionMap.forEach(function (_url, selector) {
+            scheduleRegionRefresh(selector);
+          });
+        });
+
         eventSource.addEventListener("poll_only", function (_ev) {
           markPollOnlyMode();
           closeSSE();
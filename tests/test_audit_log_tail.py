@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+
+import utils.audit_log_tail as audit_log_tail
+from app import app as flask_app
+from config_app import db
+from utils.audit_log_tail import AuditLogTailer, entity_key, notify_audit_log_inserted
+from utils.audit_logger import log_action
+
+
+def test_log_action_wakes_only_subscribers_of_that_entity(monkeypatch):
+    tailer = AuditLogTailer()
+    tailer.mode = "notify"
+    monkeypatch.setattr(audit_log_tail, "_TAILER", tailer)
+    watched = tailer.subscribe(entity_key("Candidata", 4321))
+    other = tailer.subscribe(entity_key("candidata", 9999))
+
+    with flask_app.test_request_context("/admin/monitoreo"):
+        log_action(
+            action_type="CANDIDATA_EDIT",
+            entity_type="candidata",
+            entity_id=4321,
+            summary="edit de prueba",
+            actor_user_id=1,
+            actor_role="admin",
+        )
+
+    assert watched.wait(timeout=0.5) is True
+    assert watched.max_id > 0
+    assert other.wait(timeout=0.01) is False
+    watched.close()
+    other.close()
+    assert tailer.snapshot()["subscriptions"] == 0
+
+
+def test_notify_mode_idle_wait_does_not_request_queries():
+    tailer = AuditLogTailer()
+    tailer.mode = "notify"
+    sub = tailer.subscribe("candidata:1")
+    assert sub.wait(timeout=0.05) is False
+
+
+def test_poll_mode_falls_back_to_interval_queries():
+    tailer = AuditLogTailer(poll_interval=0.05)
+    assert tailer.mode == "poll"
+    sub = tailer.subscribe("candidata:1")
+    assert sub.wait(timeout=15.0) is True
+
+
+def test_listen_payload_dispatches_to_entity_subscribers():
+    tailer = AuditLogTailer()
+    tailer.mode = "notify"
+    sub = tailer.subscribe("candidata:77")
+    tailer._handle_payload(json.dumps({"e": "candidata:77", "id": 501}))
+    tailer._handle_payload("no-json")
+    assert sub.wait(timeout=0.1) is True
+    assert sub.max_id == 501
+    assert tailer.stats["notifications"] == 2
+
+
+def test_pg_notify_is_skipped_outside_postgres():
+    with flask_app.app_context():
+        tailer = AuditLogTailer()
+        tailer.start_listener(db.engine)
+        assert tailer.mode == "poll"
+        with db.engine.begin() as conn:
+            notify_audit_log_inserted(conn, entity_type="candidata", entity_id=1, log_id=1)
+
+
+def test_failed_pg_notify_is_rolled_back_to_a_savepoint():
+    calls: list[str] = []
+
+    class _Savepoint:
+        def __enter__(self):
+            calls.append("savepoint")
+            return self
+
+        def __exit__(self, exc_type, *_exc):
+            calls.append("rollback" if exc_type else "release")
+            return False
+
+    class _Conn:
+        dialect = type("D", (), {"name": "postgresql"})()
+
+        def begin_nested(self):
+            return _Savepoint()
+
+        def execute(self, *_args, **_kwargs):
+            calls.append("notify")
+            raise RuntimeError("payload too long")
+
+    notify_audit_log_inserted(_Conn(), entity_type="candidata", entity_id=5, log_id=9)
+    assert calls == ["savepoint", "notify", "rollback"]
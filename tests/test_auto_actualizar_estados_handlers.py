@@ -12,6 +12,13 @@ def _login_secretaria(client):
     return client.post("/admin/login", data={"usuario": "Karla", "clave": "9989"}, follow_redirects=False)
 
 
+def _fake_query(rows):
+    # filter_by(...).options(...).all(): la vista puede pedir los blobs en la misma query.
+    filtered = SimpleNamespace(all=lambda: list(rows))
+    filtered.options = lambda *_a: filtered
+    return SimpleNamespace(filter_by=lambda **_k: filtered)
+
+
 def test_auto_actualizar_estados_endpoint_contract():
     with flask_app.app_context():
         with flask_app.test_request_context():
@@ -42,7 +49,7 @@ def test_auto_actualizar_estados_sin_cambios_contrato_json():
         cedula2=b"x",
         depuracion=b"x",
     )
-    q = SimpleNamespace(filter_by=lambda **_k: SimpleNamespace(all=lambda: [c1]))
+    q = _fake_query([c1])
     fake_candidata = SimpleNamespace(query=q)
     state = {"commits": 0, "rollbacks": 0}
     fake_session = SimpleNamespace(
@@ -97,7 +104,7 @@ def test_auto_actualizar_estados_con_actualizaciones_preserva_side_effects():
         fecha_cambio_estado=None,
         usuario_cambio_estado=None,
     )
-    q = SimpleNamespace(filter_by=lambda **_k: SimpleNamespace(all=lambda: [c_ok, c_no]))
+    q = _fake_query([c_ok, c_no])
     fake_candidata = SimpleNamespace(query=q)
     state = {"commits": 0}
     fake_session = SimpleNamespace(commit=lambda: state.__setitem__("commits", state["commits"] + 1), rollback=lambda: None)
@@ -4,7 +4,10 @@ from __future__ import annotations
 import os
 from unittest.mock import patch
 
+import pytest
+
 from app import app as flask_app
+from core.services.search import search_candidatas_limited, search_norm_columns_enabled
 from config_app import db
 from models import BotCandidateDraft, BotContactIdentity, BotConversation, BotDecisionLog, BotEscalation, BotMessage, BotSetting, StaffAuditLog
 from sqlalchemy import inspect as sa_inspect
@@ -16,6 +19,7 @@ from services.bot_candidate_creation_service import (
     validate_candidate_creation,
 )
 from services.bot_candidate_draft_service import create_candidate_draft
+from utils.runtime_config import reset_schema_cache
 
 
 def _ensure_bot_tables() -> None:
@@ -126,6 +130,35 @@ def test_creation_success_and_draft_reference_and_state():
         assert int((same_draft.metadata_json or {}).get("created_candidate_id") or 0) == int(cand.fila)
 
 
+def test_created_candidate_is_found_by_search():
+    flask_app.config["TESTING"] = True
+    with flask_app.test_request_context("/"):
+        _ensure_bot_tables()
+        _reset_bot_tables()
+        conv = _make_conv(phone="+18095550091", name="Ána Bot Búsqueda")
+        draft = create_candidate_draft(conv, actor_id=1)
+        draft.draft_status = "approved_for_creation"
+        db.session.commit()
+        with patch.dict(os.environ, {"BOT_ALLOW_REAL_CANDIDATE_CREATION_LOCAL": "true"}, clear=False):
+            cand = create_candidate_from_draft(draft, actor_id=1)
+        db.session.commit()
+        if not {"nombre_norm", "cedula_digits", "telefono_digits"}.issubset(_candidate_columns()):
+            pytest.skip("search norm columns not migrated")
+        stored = db.session.execute(
+            text("SELECT nombre_norm, cedula_digits, telefono_digits FROM candidatas WHERE fila = :id"),
+            {"id": int(cand.fila)},
+        ).one()
+        assert stored.nombre_norm == "ana bot busqueda"
+        assert stored.cedula_digits == "40212345678"
+        assert stored.telefono_digits
+        reset_schema_cache()
+        assert search_norm_columns_enabled() is True
+        by_name = search_candidatas_limited("busqueda ANA", limit=10, use_index=False)
+        assert [int(c.fila) for c in by_name] == [int(cand.fila)]
+        by_cedula = search_candidatas_limited("402-1234", limit=10, use_index=False)
+        assert [int(c.fila) for c in by_cedula] == [int(cand.fila)]
+
+
 def test_rollback_safe_on_failure():
     flask_app.config["TESTING"] = True
     with flask_app.app_context():
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from app import app as flask_app
+from config_app import db
+from models import BotContactIdentity, BotConversation, BotMessage
+from services.bot_constants import MESSAGE_DIRECTION_INBOUND, MESSAGE_DIRECTION_OUTBOUND, MESSAGE_SOURCE_BOT_AUTO, MESSAGE_SOURCE_WHATSAPP_USER
+from services.bot_conversation_state_cache import (
+    history_rows,
+    protocol_context,
+    protocol_state,
+    reset_conversation_state_cache,
+)
+from services.bot_observability_service import cache_metrics_snapshot
+from utils.timezone import utc_now_naive
+
+
+def _ensure_tables() -> None:
+    db.session.remove()
+    with db.engine.begin() as conn:
+        BotContactIdentity.__table__.create(bind=conn, checkfirst=True)
+        BotConversation.__table__.create(bind=conn, checkfirst=True)
+        BotMessage.__table__.create(bind=conn, checkfirst=True)
+    db.session.query(BotMessage).delete()
+    db.session.query(BotConversation).delete()
+    db.session.commit()
+
+
+class _MessageQueries:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM bot_messages" in statement:
+            self.count += 1
+
+
+def _counting():
+    counter = _MessageQueries()
+    event.listen(db.engine, "before_cursor_execute", counter)
+    return counter
+
+
+def _inbound(conv: BotConversation, text: str, *, created_at=None) -> BotMessage:
+    """Como el webhook: inserta el mensaje y toca la conversación."""
+    msg = BotMessage(
+        conversation_id=conv.id,
+        direction=MESSAGE_DIRECTION_INBOUND,
+        source=MESSAGE_SOURCE_WHATSAPP_USER,
+        message_type="text",
+        text_body=text,
+        status="received",
+    )
+    if created_at is not None:
+        msg.created_at = created_at
+    db.session.add(msg)
+    db.session.flush()
+    conv.last_message_at = msg.created_at
+    conv.unread_count_admin = int(conv.unread_count_admin or 0) + 1
+    return msg
+
+
+def _reply(conv: BotConversation, text: str) -> BotMessage:
+    """Como la auto-respuesta del pipeline: inserta sin tocar la conversación."""
+    msg = BotMessage(
+        conversation_id=conv.id,
+        direction=MESSAGE_DIRECTION_OUTBOUND,
+        source=MESSAGE_SOURCE_BOT_AUTO,
+        message_type="text",
+        text_body=text,
+        status="sent",
+    )
+    db.session.add(msg)
+    db.session.flush()
+    return msg
+
+
+def _texts(rows):
+    return [r["text"] for r in rows]
+
+
+def _db_window(conv_id: int):
+    rows = (
+        BotMessage.query.filter_by(conversation_id=conv_id)
+        .order_by(BotMessage.created_at.desc(), BotMessage.id.desc())
+        .limit(8)
+        .all()
+    )
+    return [r.text_body for r in reversed(rows)]
+
+
+def test_history_window_is_updated_incrementally_without_queries():
+    with flask_app.app_context():
+        _ensure_tables()
+        conv = BotConversation(channel="whatsapp", phone_e164="+18095550001", status="open")
+        db.session.add(conv)
+        db.session.commit()
+        for i in range(10):
+            _inbound(conv, f"m{i}")
+            db.session.commit()
+
+        counter = _counting()
+        try:
+            assert _texts(history_rows(conv)) == [f"m{i}" for i in range(2, 10)]
+            db.session.commit()
+            assert counter.count == 1
+
+            _reply(conv, "r9")
+            db.session.commit()
+            # Mensaje con timestamp de Meta más viejo que el resto: fuera de la ventana.
+            _inbound(conv, "late", created_at=utc_now_naive() - timedelta(hours=1))
+            db.session.commit()
+            current = _inbound(conv, "m10")
+            db.session.commit()
+            loaded = db.session.get(BotConversation, conv.id)
+            rows = history_rows(loaded)
+            assert counter.count == 1
+        finally:
+            event.remove(db.engine, "before_cursor_execute", counter)
+
+        assert rows[-1]["id"] == current.id
+        assert _texts(rows) == _db_window(conv.id)
+        assert "late" not in _texts(rows)
+
+        stats = cache_metrics_snapshot()["caches"]["bot_conversation_state"]
+        assert (stats["miss"], stats["lru"]) == (1, 1)
+        assert stats["hit_rate"] == 0.5
+
+
+def test_backplane_tier_pending_rows_rollback_and_stale_versions():
+    with flask_app.app_context():
+        _ensure_tables()
+        conv = BotConversation(channel="whatsapp", phone_e164="+18095550002", status="open")
+        db.session.add(conv)
+        db.session.commit()
+        _inbound(conv, "hola")
+        db.session.commit()
+        history_rows(conv)
+        db.session.commit()
+
+        # Otro proceso: LRU vacío, la entrada sale del backplane.
+        reset_conversation_state_cache()
+        _inbound(conv, "segundo")
+        assert _texts(history_rows(conv)) == ["hola", "segundo"]
+        db.session.rollback()
+        assert _texts(history_rows(db.session.get(BotConversation, conv.id))) == ["hola"]
+        db.session.commit()
+
+        # Cambio fuera del ORM: la versión ya no coincide y se vuelve a consultar.
+        BotConversation.query.filter_by(id=conv.id).update({"unread_count_admin": 0})
+        db.session.add(
+            BotMessage(
+                conversation_id=conv.id,
+                direction=MESSAGE_DIRECTION_INBOUND,
+                source=MESSAGE_SOURCE_WHATSAPP_USER,
+                message_type="text",
+                text_body="bulk",
+                status="received",
+            )
+        )
+        db.session.commit()
+        db.session.expire_all()
+        assert _texts(history_rows(db.session.get(BotConversation, conv.id))) == ["hola", "bulk"]
+
+        stats = cache_metrics_snapshot()["caches"]["bot_conversation_state"]
+        assert stats["backplane"] == 1
+        assert stats["lru"] == 1
+        assert stats["miss"] == 2
+
+
+def test_protocol_context_is_built_once_per_step():
+    with flask_app.app_context():
+        _ensure_tables()
+        conv = BotConversation(channel="whatsapp", phone_e164="+18095550003", status="open", metadata_json={"current_step_code": "WELCOME"})
+        db.session.add(conv)
+        db.session.commit()
+        builds = []
+
+        def _build(state):
+            builds.append(state["current_step_code"])
+            return {"current_step_code": state["current_step_code"], "expected_answers": ["si"]}
+
+        first = protocol_context(conv, _build)
+        first["expected_answers"].append("mutado")
+        assert protocol_context(conv, _build)["expected_answers"] == ["si"]
+        assert builds == ["WELCOME"]
+
+        conv.metadata_json = {"current_step_code": "BASIC_INFO", "last_completed_step": "WELCOME"}
+        protocol_context(conv, _build)
+        assert len(builds) == 2
+        assert protocol_state(conv)["last_completed_step"] == "WELCOME"
+        protocol_cache = cache_metrics_snapshot()["caches"]["bot_conversation_state.protocol"]
+        assert (protocol_cache["lru"], protocol_cache["miss"]) == (1, 2)
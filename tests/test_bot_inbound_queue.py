@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+
+from app import app as flask_app
+from config_app import db
+from models import (
+    BotContactIdentity,
+    BotConversation,
+    BotDecisionLog,
+    BotEscalation,
+    BotInboundJob,
+    BotMessage,
+    BotSandboxOutbound,
+    BotSandboxReviewQueue,
+    BotSetting,
+)
+import services.bot_inbound_queue_service as inbound_queue
+from utils.runtime_config import reset_schema_cache
+from utils.timezone import utc_now_naive
+
+
+@pytest.fixture(autouse=True)
+def _safe_bot_flags(monkeypatch):
+    monkeypatch.setenv("BOT_AI_ENABLED", "false")
+    monkeypatch.setenv("BOT_AUTOREPLY_ENABLED", "false")
+    monkeypatch.setenv("BOT_DRY_RUN", "true")
+    monkeypatch.setenv("WHATSAPP_ENABLED", "false")
+    monkeypatch.setenv("WHATSAPP_VALIDATE_SIGNATURE", "false")
+    monkeypatch.setenv("APP_ENV", "test")
+    monkeypatch.setenv("BOT_INBOUND_ASYNC", "true")
+    reset_schema_cache()
+
+
+def _rebuild_tables() -> None:
+    models = (
+        BotContactIdentity,
+        BotConversation,
+        BotMessage,
+        BotInboundJob,
+        BotSandboxReviewQueue,
+        BotSandboxOutbound,
+        BotDecisionLog,
+        BotSetting,
+        BotEscalation,
+    )
+    for model in reversed(models):
+        model.__table__.drop(bind=db.engine, checkfirst=True)
+    for model in models:
+        model.__table__.create(bind=db.engine, checkfirst=True)
+
+
+def _payload(*messages: tuple[str, str, str]) -> dict:
+    return {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": phone, "profile": {"name": "Cola"}} for _, phone, _ in messages],
+                            "messages": [
+                                {"id": wamid, "from": phone, "timestamp": "1715000021", "type": "text", "text": {"body": body}}
+                                for wamid, phone, body in messages
+                            ],
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def _post_burst(*messages: tuple[str, str, str]) -> None:
+    flask_app.config["TESTING"] = True
+    resp = flask_app.test_client().post("/bot/whatsapp/webhook", json=_payload(*messages))
+    assert resp.status_code == 200
+    assert resp.get_json() == {"ok": True}
+
+
+def test_webhook_async_persists_message_and_enqueues_without_running_pipeline(monkeypatch):
+    calls = []
+    monkeypatch.setattr(inbound_queue, "process_inbound_message", lambda **kw: calls.append(kw))
+    with flask_app.app_context():
+        _rebuild_tables()
+    _post_burst(("wamid-q-1", "18095550071", "hola"), ("wamid-q-1", "18095550071", "hola"))
+
+    with flask_app.app_context():
+        assert calls == []
+        inbound = BotMessage.query.filter_by(wa_message_id="wamid-q-1").one()
+        job = BotInboundJob.query.one()
+        assert job.inbound_message_id == inbound.id
+        assert job.status == "queued"
+        assert job.payload_json["phone_e164"] == "+18095550071"
+        assert BotDecisionLog.query.count() == 1
+
+
+def test_worker_processes_jobs_in_order_per_conversation(monkeypatch):
+    seen: list[tuple[int, str]] = []
+
+    def _fake_process(**kwargs):
+        seen.append((int(kwargs["conversation"].id), str(kwargs["inbound"].text_body)))
+        return None
+
+    monkeypatch.setattr(inbound_queue, "process_inbound_message", _fake_process)
+    with flask_app.app_context():
+        _rebuild_tables()
+    _post_burst(
+        ("wamid-o-1", "18095550072", "uno"),
+        ("wamid-o-2", "18095550073", "a"),
+        ("wamid-o-3", "18095550072", "dos"),
+        ("wamid-o-4", "18095550072", "tres"),
+    )
+
+    with flask_app.app_context():
+        # Un claim solo toma la cabeza de cada conversación.
+        first = inbound_queue.claim_jobs(batch_size=10)
+        assert len(first) == 2
+        BotInboundJob.query.filter(BotInboundJob.id.in_(first)).update({"status": "queued"}, synchronize_session=False)
+        db.session.commit()
+
+        summary = inbound_queue.run_inbound_loop(batch_size=10, until_empty=True)
+        assert summary["done"] == 4
+        by_conv: dict[int, list[str]] = {}
+        for conv_id, text in seen:
+            by_conv.setdefault(conv_id, []).append(text)
+        assert sorted(by_conv.values()) == [["a"], ["uno", "dos", "tres"]]
+        assert {j.status for j in BotInboundJob.query.all()} == {"done"}
+
+
+def test_worker_retries_without_autoreply_and_marks_dead(monkeypatch):
+    flags: list[bool] = []
+
+    def _boom(**kwargs):
+        flags.append(bool(kwargs["allow_autoreply_send"]))
+        raise RuntimeError("graph timeout")
+
+    monkeypatch.setattr(inbound_queue, "process_inbound_message", _boom)
+    with flask_app.app_context():
+        _rebuild_tables()
+    _post_burst(("wamid-r-1", "18095550074", "hola"), ("wamid-r-2", "18095550074", "sigo"))
+
+    with flask_app.app_context():
+        for _ in range(3):
+            stats = inbound_queue.run_inbound_once(batch_size=5, max_attempts=3)
+            assert stats["picked"] == 1
+            BotInboundJob.query.filter_by(status="queued").update({"available_at": utc_now_naive()}, synchronize_session=False)
+            db.session.commit()
+
+        jobs = BotInboundJob.query.order_by(BotInboundJob.id.asc()).all()
+        assert [j.status for j in jobs] == ["dead", "queued"]
+        assert jobs[0].attempts == 3
+        assert "graph timeout" in jobs[0].last_error
+        # El primer intento puede auto-responder; los reintentos nunca.
+        assert flags == [True, False, False]
+
+        # Con la cabeza muerta, la conversación sigue con el siguiente mensaje.
+        assert inbound_queue.claim_jobs(batch_size=5) == [jobs[1].id]
+        assert inbound_queue.requeue_jobs(all_dead=True) == 1
+
+
+def test_requeued_job_keeps_history_and_never_autoreplies(monkeypatch):
+    flags: list[bool] = []
+
+    def _boom(**kwargs):
+        flags.append(bool(kwargs["allow_autoreply_send"]))
+        raise RuntimeError("graph timeout")
+
+    monkeypatch.setattr(inbound_queue, "process_inbound_message", _boom)
+    with flask_app.app_context():
+        _rebuild_tables()
+    _post_burst(("wamid-rq-1", "18095550076", "hola"))
+
+    with flask_app.app_context():
+        assert inbound_queue.run_inbound_once(batch_size=5, max_attempts=1)["dead"] == 1
+        job = BotInboundJob.query.one()
+        assert inbound_queue.requeue_jobs(job_id=job.id) == 1
+
+        job = BotInboundJob.query.one()
+        assert job.status == "queued" and job.attempts == 0
+        assert job.payload_json["requeued"] is True
+        assert job.payload_json["requeue_count"] == 1
+        assert job.payload_json["attempts_before_requeue"] == 1
+        assert "graph timeout" in job.payload_json["last_error_before_requeue"]
+        assert job.payload_json["phone_e164"] == "+18095550076"
+
+        monkeypatch.setattr(inbound_queue, "process_inbound_message", lambda **kw: flags.append(bool(kw["allow_autoreply_send"])))
+        assert inbound_queue.run_inbound_once(batch_size=5, max_attempts=3)["done"] == 1
+        # Primer intento real: podía responder. Tras re-encolar a mano, aunque sea su intento 1, no.
+        assert flags == [True, False]
+
+
+def test_stale_job_sheds_autoreply_and_expired_lease_is_reaped(monkeypatch):
+    flags: list[bool] = []
+    monkeypatch.setattr(inbound_queue, "process_inbound_message", lambda **kw: flags.append(bool(kw["allow_autoreply_send"])))
+    monkeypatch.setenv("BOT_INBOUND_AUTOREPLY_MAX_AGE_SECONDS", "60")
+    with flask_app.app_context():
+        _rebuild_tables()
+    _post_burst(("wamid-s-1", "18095550075", "hola"))
+
+    with flask_app.app_context():
+        job = BotInboundJob.query.one()
+        job.created_at = utc_now_naive() - timedelta(minutes=10)
+        job.status = "running"
+        job.attempts = 0
+        job.locked_at = utc_now_naive() - timedelta(minutes=10)
+        db.session.commit()
+
+        stats = inbound_queue.run_inbound_once(batch_size=5)
+        assert stats["reaped"] == 1
+        assert stats["done"] == 1
+        assert flags == [False]
+        assert inbound_queue.inbound_queue_stats()["counts"] == {"done": 1}
+
+
+def test_slow_job_renews_lease_and_reaped_job_is_fenced(monkeypatch):
+    import time
+
+    with flask_app.app_context():
+        _rebuild_tables()
+    _post_burst(("wamid-f-1", "18095550074", "hola"))
+
+    with flask_app.app_context():
+        (job_id,) = inbound_queue.claim_jobs(worker_id="w:1")
+        seen = {}
+
+        def _slow(**_kwargs):
+            started = db.session.get(BotInboundJob, job_id).locked_at
+            time.sleep(0.5)
+            db.session.expire_all()
+            seen["renewed"] = db.session.get(BotInboundJob, job_id).locked_at > started
+            return None
+
+        monkeypatch.setattr(inbound_queue, "process_inbound_message", _slow)
+        assert inbound_queue._process_job(job_id, max_attempts=3, max_backoff_seconds=5, lease_seconds=0.3) == "done"
+        assert seen["renewed"] is True
+
+        job = db.session.get(BotInboundJob, job_id)
+        job.status = "queued"
+        db.session.commit()
+        assert inbound_queue.claim_jobs(worker_id="w:1") == [job_id]
+        replies: list[dict] = []
+
+        def _reaped_meanwhile(**_kwargs):
+            BotInboundJob.query.filter_by(id=job_id).update(
+                {"status": "running", "locked_by": "w:2", "attempts": BotInboundJob.attempts + 1}
+            )
+            db.session.commit()
+            return {"reply": "hola"}
+
+        monkeypatch.setattr(inbound_queue, "process_inbound_message", _reaped_meanwhile)
+        monkeypatch.setattr(inbound_queue, "run_sandbox_auto_replies", lambda items: replies.extend(items))
+        assert inbound_queue._process_job(job_id, max_attempts=3, max_backoff_seconds=5) == "fenced"
+        # El desenlace y la auto-respuesta quedan para el nuevo dueño.
+        assert replies == []
+        job = db.session.get(BotInboundJob, job_id)
+        db.session.refresh(job)
+        assert job.status == "running" and job.locked_by == "w:2"
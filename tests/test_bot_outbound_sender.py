@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from app import app as flask_app
+from config_app import db
+from models import (
+    BotContactIdentity,
+    BotConversation,
+    BotDecisionLog,
+    BotEscalation,
+    BotMessage,
+    BotSandboxOutbound,
+    BotSandboxReviewQueue,
+    BotSetting,
+)
+from services.bot_constants import MESSAGE_DIRECTION_INBOUND, MESSAGE_SOURCE_WHATSAPP_USER, MESSAGE_STATUS_INBOUND_RECEIVED
+from services.bot_outbound_sender_service import TokenBucket, reset_buckets, run_outbound_sender_once
+from services.bot_sandbox_review_service import approve_review
+from services.bot_sandbox_service import apply_delivery_webhook_update, sandbox_metrics_snapshot
+import services.bot_outbound_sender_service as sender
+
+
+def _ensure_tables() -> None:
+    db.session.remove()
+    with db.engine.begin() as conn:
+        BotSandboxReviewQueue.__table__.drop(bind=conn, checkfirst=True)
+        BotSandboxOutbound.__table__.drop(bind=conn, checkfirst=True)
+        BotContactIdentity.__table__.create(bind=conn, checkfirst=True)
+        BotConversation.__table__.create(bind=conn, checkfirst=True)
+        BotMessage.__table__.create(bind=conn, checkfirst=True)
+        BotDecisionLog.__table__.create(bind=conn, checkfirst=True)
+        BotSetting.__table__.create(bind=conn, checkfirst=True)
+        BotEscalation.__table__.create(bind=conn, checkfirst=True)
+        BotSandboxOutbound.__table__.create(bind=conn, checkfirst=True)
+        BotSandboxReviewQueue.__table__.create(bind=conn, checkfirst=True)
+    db.session.query(BotEscalation).delete()
+    db.session.query(BotDecisionLog).delete()
+    db.session.query(BotMessage).delete()
+    db.session.query(BotConversation).delete()
+    db.session.query(BotContactIdentity).delete()
+    db.session.query(BotSetting).delete()
+    db.session.commit()
+
+
+def _base_env(monkeypatch):
+    monkeypatch.setenv("APP_ENV", "test")
+    monkeypatch.setenv("BOT_STAGING_MODE", "false")
+    monkeypatch.setenv("BOT_SANDBOX_MODE", "false")
+    monkeypatch.setenv("WHATSAPP_ENABLED", "false")
+    monkeypatch.setenv("BOT_DRY_RUN", "true")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_SANDBOX_ENABLED", "true")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_MANUAL_REVIEW_REQUIRED", "true")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_OWNER_ONLY", "true")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_PROVIDER", "meta_sandbox")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_ALLOWED_NUMBERS", "+18095550111,+18095550112")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_SIMULATE", "true")
+    monkeypatch.setenv("BOT_REAL_WHATSAPP_MAX_PER_MIN", "20")
+    monkeypatch.setenv("WHATSAPP_PHONE_NUMBER_ID", "pnid-1")
+    reset_buckets()
+
+
+def _conversation(phone: str) -> BotConversation:
+    conv = BotConversation(channel="whatsapp", phone_e164=phone, contact_name="Owner", status="open", metadata_json={"sandbox_conversation": True})
+    db.session.add(conv)
+    db.session.flush()
+    return conv
+
+
+def _approved(conv: BotConversation, text: str) -> BotSandboxOutbound:
+    inbound = BotMessage(
+        conversation_id=int(conv.id),
+        direction=MESSAGE_DIRECTION_INBOUND,
+        source=MESSAGE_SOURCE_WHATSAPP_USER,
+        message_type="text",
+        text_body="hola",
+        status=MESSAGE_STATUS_INBOUND_RECEIVED,
+        wa_message_id=f"wa-{conv.id}-{BotMessage.query.count()}",
+    )
+    db.session.add(inbound)
+    db.session.flush()
+    review = BotSandboxReviewQueue(
+        conversation_id=int(conv.id),
+        inbound_message_id=int(inbound.id),
+        final_suggested_reply=text,
+        base_suggested_reply=text,
+        ai_suggested_reply="",
+        status="pending_review",
+        safety_status="ok",
+        metadata_json={"requires_human": True, "current_step": "WELCOME"},
+    )
+    db.session.add(review)
+    db.session.flush()
+    _, outbound = approve_review(review=review, reviewer_id=1)
+    db.session.commit()
+    return BotSandboxOutbound.query.filter_by(bot_message_id=int(outbound.id)).one()
+
+
+def _slow_provider(calls: list, delay: float):
+    lock = threading.Lock()
+
+    def _send(provider, *, to_phone, text, timeout_seconds):
+        time.sleep(delay)
+        with lock:
+            calls.append((to_phone, text))
+        return {"ok": True, "status": "sent", "provider_message_id": f"wamid-{to_phone}-{len(text)}", "raw": {"http_status": 200}}
+
+    return _send
+
+
+def test_token_bucket_refill_and_penalize():
+    now = [0.0]
+    bucket = TokenBucket(2, 2, clock=lambda: now[0])
+    assert bucket.try_take() and bucket.try_take()
+    assert not bucket.try_take()
+    now[0] = 0.5
+    assert bucket.try_take()
+    bucket.penalize(1.0)
+    now[0] = 1.4
+    assert not bucket.try_take()
+    now[0] = 2.0
+    assert bucket.try_take()
+
+
+def test_sender_batches_in_parallel_keeps_per_phone_order_and_coalesces(monkeypatch):
+    _base_env(monkeypatch)
+    calls: list = []
+    monkeypatch.setattr(sender, "_provider_send", _slow_provider(calls, 0.2))
+    with flask_app.app_context():
+        _ensure_tables()
+        conv_a = _conversation("+18095550111")
+        conv_b = _conversation("+18095550112")
+        first_a = _approved(conv_a, "Hola A")
+        second_a = _approved(conv_a, "Segunda A")
+        first_b = _approved(conv_b, "Hola B")
+
+        started = time.perf_counter()
+        stats = run_outbound_sender_once(batch_size=10)
+        elapsed = time.perf_counter() - started
+        assert stats["sent"] == 2
+        # Solo se reclama la fila más vieja de cada número: "Segunda A" espera sin ocupar lote.
+        assert stats["picked"] == 2
+        assert stats["deferred"] == 0
+        assert elapsed < 0.4
+        assert sorted(calls) == [("+18095550111", "Hola A"), ("+18095550112", "Hola B")]
+
+        dup_a = _approved(conv_a, "Hola A")
+        stats = run_outbound_sender_once(batch_size=10)
+        assert stats["sent"] == 1
+        assert calls[-1] == ("+18095550111", "Segunda A")
+        stats = run_outbound_sender_once(batch_size=10)
+        assert stats["coalesced"] == 1
+        assert stats["sent"] == 0
+
+        for row in (first_a, second_a, first_b, dup_a):
+            db.session.refresh(row)
+        assert [first_a.state, second_a.state, first_b.state] == ["simulated_sent"] * 3
+        assert dup_a.state == "blocked"
+        assert dup_a.failure_reason == f"coalesced_duplicate:{first_a.id}"
+
+        assert apply_delivery_webhook_update(provider_message_id="wamid-+18095550111-6", delivery_status="delivered")["updated"] == 1
+        db.session.commit()
+        latency = sandbox_metrics_snapshot()["delivery_latency"]
+        assert latency["samples"] == 3
+        assert latency["queue_to_sent_ms"]["p95"] is not None
+        assert latency["sent_to_delivered_ms"]["samples"] == 1
+
+
+def test_sender_honors_rate_limit_and_backs_off_on_throttle(monkeypatch):
+    _base_env(monkeypatch)
+    monkeypatch.setenv("BOT_OUTBOUND_RATE_PER_SECOND", "1")
+    monkeypatch.setenv("BOT_OUTBOUND_RATE_BURST", "1")
+    monkeypatch.setenv("BOT_SANDBOX_RETRY_BACKOFF_SECONDS", "0")
+
+    def _throttled(provider, *, to_phone, text, timeout_seconds):
+        return {"ok": False, "status": "failed", "error_code": "130429", "error_message": "rate limit", "raw": {"http_status": 400}}
+
+    monkeypatch.setattr(sender, "_provider_send", _throttled)
+    with flask_app.app_context():
+        _ensure_tables()
+        _approved(_conversation("+18095550111"), "Hola A")
+        _approved(_conversation("+18095550112"), "Hola B")
+
+        stats = run_outbound_sender_once(batch_size=10)
+        assert (stats["failed"], stats["deferred"], stats["throttled"]) == (1, 1, 1)
+        assert sender.get_bucket("pnid-1").tokens < 0
+
+        stats = run_outbound_sender_once(batch_size=10)
+        assert stats["deferred"] == 2
+        assert stats["sent"] == stats["failed"] == 0
+
+
+def test_sender_claims_one_row_per_phone_so_a_busy_number_does_not_starve_others(monkeypatch):
+    _base_env(monkeypatch)
+    calls: list = []
+    monkeypatch.setattr(sender, "_provider_send", _slow_provider(calls, 0))
+    with flask_app.app_context():
+        _ensure_tables()
+        conv_a = _conversation("+18095550111")
+        conv_b = _conversation("+18095550112")
+        for idx in range(4):
+            _approved(conv_a, f"A {idx}")
+        _approved(conv_b, "Hola B")
+
+        stats = run_outbound_sender_once(batch_size=2)
+        assert stats["picked"] == 2
+        assert sorted(calls) == [("+18095550111", "A 0"), ("+18095550112", "Hola B")]
+
+
+def test_sender_takes_rate_token_only_after_the_guards(monkeypatch):
+    _base_env(monkeypatch)
+    monkeypatch.setenv("BOT_OUTBOUND_RATE_PER_SECOND", "0.001")
+    monkeypatch.setenv("BOT_OUTBOUND_RATE_BURST", "1")
+    calls: list = []
+    monkeypatch.setattr(sender, "_provider_send", _slow_provider(calls, 0))
+    original_prepare = sender.prepare_outbox_row
+
+    def _prepare(row, stats, *, max_retries):
+        if row.phone_e164 == "+18095550111":
+            # Guarda que bloquea la fila (p. ej. duplicado o revisión vencida).
+            stats["blocked"] += 1
+            return False
+        return original_prepare(row, stats, max_retries=max_retries)
+
+    monkeypatch.setattr(sender, "prepare_outbox_row", _prepare)
+    with flask_app.app_context():
+        _ensure_tables()
+        _approved(_conversation("+18095550111"), "Hola A")
+        _approved(_conversation("+18095550112"), "Hola B")
+
+        stats = run_outbound_sender_once(batch_size=10)
+        assert stats["blocked"] == 1
+        assert stats["deferred"] == 0
+        assert calls == [("+18095550112", "Hola B")]
+
+
+def test_admin_worker_claims_with_skip_locked(monkeypatch):
+    import services.bot_sandbox_service as sandbox
+
+    _base_env(monkeypatch)
+    seen: list = []
+    original_claim = sandbox.claim_due_outbox_rows
+
+    def _claim(**kwargs):
+        seen.append(kwargs)
+        return original_claim(**kwargs)
+
+    monkeypatch.setattr(sandbox, "claim_due_outbox_rows", _claim)
+    monkeypatch.setattr(sandbox, "_provider_send", _slow_provider([], 0))
+    with flask_app.app_context():
+        _ensure_tables()
+        _approved(_conversation("+18095550111"), "Hola A")
+        stats = sandbox.run_sandbox_worker_once(batch_size=5)
+        assert stats["sent"] == 1
+        assert seen and seen[0]["skip_locked"] is True
@@ -419,7 +419,7 @@ def test_webhook_partial_failure_does_not_rollback_previous_valid_message(monkey
 def test_cloud_service_disabled_and_dry_run_do_not_call_api(monkeypatch):
     monkeypatch.setenv("WHATSAPP_ENABLED", "false")
     monkeypatch.setenv("BOT_DRY_RUN", "true")
-    with patch("services.whatsapp_cloud_service.requests.post") as post_mock:
+    with patch("requests.Session.post") as post_mock:
         result = send_text_message("+18095550003", "hola")
     assert result.get("skipped") is True
     post_mock.assert_not_called()
@@ -449,12 +449,12 @@ def test_cloud_service_success_and_error_with_mocks(monkeypatch):
         def json():
             return {"error": {"code": 100, "message": "Bad request"}}
 
-    with patch("services.whatsapp_cloud_service.requests.post", return_value=_RespOk()):
+    with patch("requests.Session.post", return_value=_RespOk()):
         ok = send_text_message("+18095550004", "hola")
     assert ok.get("ok") is True
     assert ok.get("wa_message_id") == "wamid-ok-1"
 
-    with patch("services.whatsapp_cloud_service.requests.post", return_value=_RespFail()):
+    with patch("requests.Session.post", return_value=_RespFail()):
         bad = send_text_message("+18095550004", "hola")
     assert bad.get("ok") is False
     assert bad.get("status") == "failed"
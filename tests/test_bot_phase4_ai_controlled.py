@@ -125,7 +125,7 @@ def test_invalid_json_in_ai_response_escalates(monkeypatch):
         def json():
             return {"choices": [{"message": {"content": "NOT-JSON"}}]}
 
-    with patch("services.bot_ai_service.requests.post", return_value=_Resp()):
+    with patch("requests.Session.post", return_value=_Resp()):
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "json_parse_error"
@@ -147,7 +147,7 @@ def test_invalid_api_key_maps_safe_error(monkeypatch):
     err = requests.HTTPError("401 unauthorized")
     err.response = _Resp401()
 
-    with patch("services.bot_ai_service.requests.post", side_effect=err):
+    with patch("requests.Session.post", side_effect=err):
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "invalid_api_key"
@@ -157,7 +157,7 @@ def test_timeout_maps_safe_error(monkeypatch):
     monkeypatch.setenv("BOT_AI_ENABLED", "true")
     monkeypatch.setenv("BOT_AI_PROVIDER", "openai")
     monkeypatch.setenv("BOT_AI_API_KEY", "fake-key")
-    with patch("services.bot_ai_service.requests.post", side_effect=requests.Timeout("timeout")):
+    with patch("requests.Session.post", side_effect=requests.Timeout("timeout")):
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "timeout"
@@ -167,7 +167,7 @@ def test_network_error_maps_safe_error(monkeypatch):
     monkeypatch.setenv("BOT_AI_ENABLED", "true")
     monkeypatch.setenv("BOT_AI_PROVIDER", "openai")
     monkeypatch.setenv("BOT_AI_API_KEY", "fake-key")
-    with patch("services.bot_ai_service.requests.post", side_effect=requests.ConnectionError("down")):
+    with patch("requests.Session.post", side_effect=requests.ConnectionError("down")):
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "network_error"
@@ -188,7 +188,7 @@ def test_provider_bad_response_maps_safe_error(monkeypatch):
     err = requests.HTTPError("500")
     err.response = _Resp500()
 
-    with patch("services.bot_ai_service.requests.post", side_effect=err):
+    with patch("requests.Session.post", side_effect=err):
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "provider_bad_response"
@@ -217,7 +217,7 @@ def test_low_confidence_escalates(monkeypatch):
                 ]
             }
 
-    with patch("services.bot_ai_service.requests.post", return_value=_Resp()):
+    with patch("requests.Session.post", return_value=_Resp()):
         out = classify_intent("horario", {})
     assert out["ok"] is True
     assert out["requires_human"] is True
@@ -561,7 +561,7 @@ def test_provider_not_supported_scales_without_network(monkeypatch):
     monkeypatch.setenv("BOT_AI_ENABLED", "true")
     monkeypatch.setenv("BOT_AI_PROVIDER", "other")
     monkeypatch.setenv("BOT_AI_API_KEY", "fake")
-    with patch("services.bot_ai_service.requests.post") as post_mock:
+    with patch("requests.Session.post") as post_mock:
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "provider_not_supported"
@@ -572,7 +572,7 @@ def test_api_key_missing_scales_without_network(monkeypatch):
     monkeypatch.setenv("BOT_AI_ENABLED", "true")
     monkeypatch.setenv("BOT_AI_PROVIDER", "openai")
     monkeypatch.delenv("BOT_AI_API_KEY", raising=False)
-    with patch("services.bot_ai_service.requests.post") as post_mock:
+    with patch("requests.Session.post") as post_mock:
         out = classify_intent("hola", {})
     assert out["ok"] is False
     assert out["error_code"] == "api_key_missing"
@@ -642,7 +642,7 @@ def test_ai_context_redacts_cedula_and_address_before_provider_call(monkeypatch)
         captured["payload"] = json
         return _Resp()
 
-    with patch("services.bot_ai_service.requests.post", side_effect=_fake_post):
+    with patch("requests.Session.post", side_effect=_fake_post):
         out = classify_intent("Mi cedula 001-1234567-8, direccion calle 8 sector C", {"history": []})
     assert out["ok"] is True
     body = captured["payload"]
@@ -688,7 +688,7 @@ def test_ai_context_prioritizes_latest_and_truncates_history(monkeypatch):
             {"role": "user", "text": "hola 3"},
         ]
     }
-    with patch("services.bot_ai_service.requests.post", side_effect=_fake_post):
+    with patch("requests.Session.post", side_effect=_fake_post):
         out = classify_intent("¿Dónde están ubicados?", ctx)
     assert out["ok"] is True
     safe = out["safe_context"]
@@ -728,7 +728,7 @@ def test_ai_input_and_output_char_limits(monkeypatch):
         return _Resp()
 
     long_text = "x" * 100
-    with patch("services.bot_ai_service.requests.post", side_effect=_fake_post):
+    with patch("requests.Session.post", side_effect=_fake_post):
         out = classify_intent(long_text, {"history": [{"role": "user", "text": long_text}]})
     assert out["ok"] is True
     assert len(out["answer_text"]) == 15
@@ -259,6 +259,46 @@ def test_protocol_missing_or_invalid_file_raises(tmp_path, monkeypatch):
     protocol_service.load_protocol.cache_clear()
 
 
+def test_protocol_hot_reload_recompiles_only_on_file_change(tmp_path, monkeypatch):
+    def _protocol(title: str, extra_steps: int = 0) -> str:
+        steps = [
+            {
+                "step_code": code,
+                "title": title,
+                "messages": {"primary": [f"{title} {code}"], "secondary": [], "warnings": []},
+                "validations": ["non_empty"],
+                "expected_answers": [],
+                "fallback": "x",
+            }
+            for code in ["A", "B"] + [f"X{i}" for i in range(extra_steps)]
+        ]
+        return json.dumps({"protocol_code": "x", "steps": steps})
+
+    path = tmp_path / "protocol.json"
+    path.write_text(_protocol("uno"), encoding="utf-8")
+    protocol_service.load_protocol.cache_clear()
+    monkeypatch.setattr(protocol_service, "DATA_PATH", path)
+    monkeypatch.setattr(protocol_service, "PROTOCOL_RELOAD_CHECK_SECONDS", 0.0)
+    try:
+        first = protocol_service.compiled_protocol()
+        assert get_next_step("a")["step_code"] == "B"
+        assert build_step_prompt("B") == "uno B"
+        assert protocol_service.compiled_protocol() is first
+
+        path.write_text(_protocol("dos", extra_steps=1), encoding="utf-8")
+        second = protocol_service.compiled_protocol()
+        assert second is not first
+        assert build_step_prompt("B") == "dos B"
+        assert get_next_step("B")["step_code"] == "X0"
+
+        # Una edición inválida no tumba al bot: se sigue sirviendo la última versión buena.
+        path.write_text("{roto", encoding="utf-8")
+        assert protocol_service.compiled_protocol() is second
+        assert get_step("X0") is not None
+    finally:
+        protocol_service.load_protocol.cache_clear()
+
+
 def test_percentage_acceptance_variants():
     ok_1 = detect_expected_answer("PERCENTAGE_ACCEPTANCE", "Sí, acepto 25 por ciento.")
     assert ok_1["matched"] is True
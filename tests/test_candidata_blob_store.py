@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from app import app as flask_app
+from config_app import db
+from core.services.candidata_documentos import (
+    backfill_candidata_documentos,
+    candidata_document_mimes,
+    load_candidata_document,
+    verify_candidata_documentos,
+)
+from models import Candidata, CandidataDocumento
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.blob_store import BlobStore, BlobStoreError, LocalFilesystemBlobStore, sha256_hex
+from utils.runtime_config import reset_schema_cache
+
+
+_BASE_FILA = 950000
+_PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+_JPEG = b"\xFF\xD8\xFF\xE0" + b"\x01" * 64
+
+
+@pytest.fixture
+def blob_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("BLOB_STORE_BACKEND", "local")
+    monkeypatch.setenv("BLOB_STORE_LOCAL_ROOT", str(tmp_path / "blobs"))
+    reset_schema_cache()
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata, CandidataDocumento], reset=False)
+        _purge()
+        yield tmp_path / "blobs"
+        _purge()
+    reset_schema_cache()
+
+
+def _purge() -> None:
+    db.session.query(CandidataDocumento).filter(CandidataDocumento.candidata_id >= _BASE_FILA).delete(
+        synchronize_session=False
+    )
+    db.session.query(Candidata).filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def _add(offset: int, **blobs) -> Candidata:
+    cand = Candidata(
+        fila=_BASE_FILA + offset,
+        nombre_completo=f"Blob Test {offset}",
+        cedula=f"950-000000{offset}-1",
+        codigo=f"BLB-{offset:06d}",
+        **blobs,
+    )
+    db.session.add(cand)
+    db.session.commit()
+    return cand
+
+
+def test_local_store_is_content_addressed_and_supports_ranges(tmp_path):
+    store = LocalFilesystemBlobStore(tmp_path)
+    ref = store.put(_PNG)
+    assert ref.sha256 == sha256_hex(_PNG)
+    assert ref.mime_type == "image/png"
+    assert store.put(_PNG) == ref
+    assert store.get(ref.sha256) == _PNG
+    assert b"".join(store.iter_chunks(ref.sha256, start=1, end=3, chunk_size=1)) == _PNG[1:4]
+    with pytest.raises(BlobStoreError):
+        store.get("../etc/passwd")
+
+
+def test_blob_store_backends_must_implement_the_whole_interface():
+    with pytest.raises(TypeError):
+        BlobStore()
+
+    class _PutOnly(BlobStore):
+        def put(self, data, *, mime_type=None):
+            raise AssertionError
+
+    with pytest.raises(TypeError):
+        _PutOnly()
+
+
+def test_misconfigured_store_does_not_break_the_flush(blob_env, monkeypatch):
+    monkeypatch.setenv("BLOB_STORE_BACKEND", "ftp")
+    _add(2, perfil=_PNG)
+    row = CandidataDocumento.query.filter_by(candidata_id=_BASE_FILA + 2, kind="perfil").one()
+    assert row.storage_backend == "db"
+    assert row.sha256 == sha256_hex(_PNG)
+
+
+def test_writes_are_mirrored_to_store_and_reads_skip_the_row(blob_env):
+    _add(1, perfil=_PNG, cedula1=_JPEG)
+    db.session.expunge_all()
+
+    meta = {d.kind: d for d in CandidataDocumento.query.filter_by(candidata_id=_BASE_FILA + 1)}
+    assert set(meta) == {"perfil", "cedula1"}
+    assert meta["perfil"].sha256 == sha256_hex(_PNG)
+    assert meta["cedula1"].mime_type == "image/jpeg"
+
+    cand = db.session.get(Candidata, _BASE_FILA + 1)
+    assert "perfil" not in cand.__dict__
+    assert candidata_document_mimes([_BASE_FILA + 1], "perfil") == {_BASE_FILA + 1: "image/png"}
+    doc = load_candidata_document(_BASE_FILA + 1, "perfil")
+    assert doc.source == "store" and doc.data == _PNG
+
+    cand.perfil = None
+    db.session.commit()
+    assert CandidataDocumento.query.filter_by(candidata_id=_BASE_FILA + 1, kind="perfil").count() == 0
+    assert load_candidata_document(_BASE_FILA + 1, "perfil") is None
+
+
+def test_unrelated_updates_never_load_blobs_and_puts_run_before_the_flush(blob_env, monkeypatch):
+    _add(3, perfil=_PNG)
+    db.session.expunge_all()
+    trace: list[str] = []
+    original_put = LocalFilesystemBlobStore.put
+
+    def _put(self, data, **kwargs):
+        trace.append("PUT")
+        return original_put(self, data, **kwargs)
+
+    def _record(_conn, _cursor, statement, *_args):
+        trace.append(statement)
+
+    monkeypatch.setattr(LocalFilesystemBlobStore, "put", _put)
+    cand = db.session.get(Candidata, _BASE_FILA + 3)
+    event.listen(db.engine, "before_cursor_execute", _record)
+    try:
+        cand.nombre_completo = "Blob Test 3 renombrada"
+        db.session.commit()
+        blob_selects = [
+            s for s in trace
+            if s.lstrip().upper().startswith("SELECT") and any(f"candidatas.{k} " in s for k in ("perfil", "cedula1"))
+        ]
+        assert blob_selects == []
+        assert "PUT" not in trace
+
+        trace.clear()
+        cand.cedula1 = _JPEG
+        db.session.commit()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record)
+
+    # La subida al store ocurre antes de cualquier sentencia del flush.
+    assert trace[0] == "PUT" and trace.count("PUT") == 1
+    row = CandidataDocumento.query.filter_by(candidata_id=_BASE_FILA + 3, kind="cedula1").one()
+    assert row.storage_backend == "local" and row.sha256 == sha256_hex(_JPEG)
+
+
+def test_backfill_copies_legacy_blobs_in_batches(blob_env, monkeypatch):
+    monkeypatch.setenv("BLOB_STORE_BACKEND", "off")
+    for i in range(3):
+        _add(10 + i, depuracion=_JPEG + bytes([i]))
+    backends = {
+        d.storage_backend for d in CandidataDocumento.query.filter(CandidataDocumento.candidata_id >= _BASE_FILA)
+    }
+    assert backends == {"db"}
+    doc = load_candidata_document(_BASE_FILA + 10, "depuracion")
+    assert doc.source == "db"
+    assert candidata_document_mimes([_BASE_FILA + 10, _BASE_FILA + 11], "depuracion") == {
+        _BASE_FILA + 10: "image/jpeg",
+        _BASE_FILA + 11: "image/jpeg",
+    }
+
+    monkeypatch.setenv("BLOB_STORE_BACKEND", "local")
+    stats = backfill_candidata_documentos(kinds=["depuracion"], batch_size=2)
+    # La BD de tests es compartida: otros módulos pueden dejar depuraciones propias.
+    assert stats["copied"] >= 3
+    assert {
+        d.storage_backend
+        for d in CandidataDocumento.query.filter(
+            CandidataDocumento.candidata_id.in_([_BASE_FILA + 10 + i for i in range(3)]),
+            CandidataDocumento.kind == "depuracion",
+        )
+    } == {"local"}
+    assert backfill_candidata_documentos(kinds=["depuracion"], batch_size=2)["copied"] == 0
+    assert load_candidata_document(_BASE_FILA + 12, "depuracion").source == "store"
+    out = verify_candidata_documentos(sample=50)
+    assert out["missing"] == 0 and out["mismatch"] == 0
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import inspect as sa_inspect
+
+from app import app as flask_app
+from config_app import db
+from core.services.candidata_documentos import backfill_candidata_document_facts
+from models import Candidata
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils import matching_service
+
+
+_BASE_FILA = 960000
+
+
+def _purge() -> None:
+    Candidata.query.filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+@pytest.fixture
+def app_ctx():
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata], reset=False)
+        _purge()
+        yield
+        _purge()
+
+
+def _add(offset: int, **blobs) -> Candidata:
+    fila = _BASE_FILA + offset
+    cand = Candidata(
+        fila=fila,
+        nombre_completo=f"Facts {offset}",
+        cedula=f"{fila:011d}",
+        codigo=f"FAC-{offset:06d}",
+        estado="lista_para_trabajar",
+        **blobs,
+    )
+    db.session.add(cand)
+    db.session.commit()
+    return cand
+
+
+def test_facts_follow_blob_writes(app_ctx):
+    cand = _add(1, perfil=b"x" * 300, cedula1=b"c1")
+    assert (cand.has_perfil, cand.perfil_size_bytes) == (True, 300)
+    assert (cand.has_cedula1, cand.has_cedula2, cand.cedula2_size_bytes) == (True, False, 0)
+
+    db.session.expire_all()
+    cand = db.session.get(Candidata, _BASE_FILA + 1)
+    cand.nombre_completo = "Facts renamed"
+    db.session.commit()
+    # Un update que no toca blobs no los carga ni cambia los hechos.
+    assert "perfil" not in cand.__dict__
+    assert cand.has_perfil is True
+
+    cand.perfil = None
+    cand.cedula2 = b"c2c2"
+    db.session.commit()
+    assert (cand.has_perfil, cand.perfil_size_bytes) == (False, 0)
+    assert (cand.has_cedula2, cand.cedula2_size_bytes) == (True, 4)
+
+
+def test_backfill_and_prefilter_never_load_blobs(app_ctx):
+    _add(2, depuracion=b"d", perfil=b"p", cedula1=b"c1", cedula2=b"c2", entrevista="ok")
+    _add(3, depuracion=b"d", perfil=b"p", cedula1=b"c1", entrevista="ok")
+    table = Candidata.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.fila.in_([_BASE_FILA + 2, _BASE_FILA + 3]))
+        .values(has_depuracion=None, has_perfil=None, has_cedula1=None, has_cedula2=None)
+    )
+    db.session.commit()
+
+    # Sin backfill: el prefiltro completa los hechos con length() en la BD.
+    db.session.expire_all()
+    pool = matching_service._build_base_query().filter(Candidata.fila >= _BASE_FILA).all()
+    matching_service.fill_missing_document_facts(pool)
+    by_id = {c.fila: c for c in pool}
+    for cand in pool:
+        assert not {"depuracion", "perfil", "cedula1", "cedula2"} & set(cand.__dict__)
+    assert by_id[_BASE_FILA + 2].has_cedula2 is True
+    assert by_id[_BASE_FILA + 3].has_cedula2 is False
+    assert not sa_inspect(by_id[_BASE_FILA + 3]).modified
+
+    stats = backfill_candidata_document_facts(batch_size=1)
+    assert stats["updated"] >= 2
+    db.session.expire_all()
+    row = db.session.get(Candidata, _BASE_FILA + 3)
+    assert (row.has_perfil, row.perfil_size_bytes, row.has_cedula2) == (True, 1, False)
+
+
+def test_auto_actualizar_estados_reads_facts_not_blobs(app_ctx, monkeypatch):
+    from sqlalchemy import event
+
+    flask_app.config["TESTING"] = True
+    monkeypatch.setitem(flask_app.config, "WTF_CSRF_ENABLED", False)
+    for offset in (20, 21, 22):
+        _add(
+            offset,
+            depuracion=b"d",
+            perfil=b"p",
+            cedula1=b"c1",
+            cedula2=b"c2" if offset != 22 else None,
+            entrevista="ok",
+            referencias_laboral="ok",
+            referencias_familiares="ok",
+        )
+    table = Candidata.__table__
+    db.session.execute(
+        table.update().where(table.c.fila.in_([_BASE_FILA + 20, _BASE_FILA + 21, _BASE_FILA + 22]))
+        .values(estado="inscrita_incompleta")
+    )
+    # Una fila sin backfill: su hecho se completa con length() en lote.
+    db.session.execute(table.update().where(table.c.fila == _BASE_FILA + 21).values(has_cedula2=None))
+    db.session.commit()
+
+    statements: list[str] = []
+
+    def _record(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    client = flask_app.test_client()
+    assert client.post("/admin/login", data={"usuario": "Karla", "clave": "9989"}).status_code in (302, 303)
+    event.listen(db.engine, "before_cursor_execute", _record)
+    try:
+        resp = client.get("/auto_actualizar_estados")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record)
+
+    assert resp.status_code == 200
+    assert {_BASE_FILA + 20, _BASE_FILA + 21} <= set(resp.get_json()["filas_actualizadas"])
+    assert _BASE_FILA + 22 not in resp.get_json()["filas_actualizadas"]
+    blob_selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "candidatas.perfil AS " in s]
+    assert blob_selects == []
+
+
+def test_missing_fact_columns_are_rechecked_after_retry_window(app_ctx, monkeypatch):
+    import utils.runtime_config as runtime_config
+
+    class _NoFactColumns:
+        def get_columns(self, _table):
+            return [{"name": "fila"}]
+
+    now = [1000.0]
+    runtime_config.reset_schema_cache()
+    monkeypatch.setattr(runtime_config, "monotonic", lambda: now[0])
+    monkeypatch.setattr(runtime_config, "sa_inspect", lambda _bind: _NoFactColumns())
+    assert matching_service.document_facts_enabled() is False
+
+    # Antes el ``False`` quedaba cacheado para siempre; ahora la migración se detecta sin reiniciar.
+    monkeypatch.setattr(runtime_config, "sa_inspect", sa_inspect)
+    assert matching_service.document_facts_enabled() is False
+    now[0] += runtime_config.SCHEMA_RETRY_SECONDS + 1
+    assert matching_service.document_facts_enabled() is True
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import load_only
+
+import utils.candidata_match_profiles as profiles_mod
+from app import app as flask_app
+from config_app import db
+from models import Candidata, CandidataMatchProfile
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.candidata_match_profiles import (
+    features_to_dict,
+    load_match_profiles,
+    rebuild_match_profiles,
+)
+from utils.compat_engine import compute_match, load_candidata_profile
+from utils.matching_batch import EncodedPool, candidate_features, encode_pool, score_pool
+from utils.runtime_config import reset_schema_cache
+
+
+_BASE_FILA = 953000
+_CAND_TEST = {
+    "version": "v2.0",
+    "profile": {
+        "ritmo": "tranquilo",
+        "estilo": "toma_iniciativa",
+        "relacion_ninos": "comoda",
+        "limites_no_negociables": ["no mascotas"],
+        "disponibilidad_horarios": ["8am-5pm"],
+        "fortalezas": ["cocina", "limpieza"],
+    },
+}
+
+
+@pytest.fixture
+def app_ctx():
+    reset_schema_cache()
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata, CandidataMatchProfile], reset=False)
+        _purge()
+        yield
+        _purge()
+    reset_schema_cache()
+
+
+def _purge() -> None:
+    db.session.query(CandidataMatchProfile).filter(CandidataMatchProfile.candidata_id >= _BASE_FILA).delete(
+        synchronize_session=False
+    )
+    db.session.query(Candidata).filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def _add(offset: int, **fields) -> Candidata:
+    values = dict(
+        direccion_completa="Villa Maria, Santiago",
+        rutas_cercanas="Cienfuegos",
+        areas_experiencia="limpieza, cocina",
+        modalidad_trabajo_preferida="salida diaria",
+        compat_disponibilidad_horario="8am-5pm",
+        edad="32",
+        anos_experiencia="4",
+    )
+    values.update(fields)
+    cand = Candidata(
+        fila=_BASE_FILA + offset,
+        nombre_completo=f"Perfil {offset}",
+        cedula=f"{_BASE_FILA + offset:011d}",
+        codigo=f"MPR-{offset:05d}",
+        **values,
+    )
+    db.session.add(cand)
+    db.session.commit()
+    return cand
+
+
+def _stored(fila: int) -> CandidataMatchProfile | None:
+    db.session.expire_all()
+    return db.session.get(CandidataMatchProfile, fila)
+
+
+def test_profile_follows_candidata_writes_and_rebuild_fills_gaps(app_ctx):
+    cand = _add(1, compat_test_candidata_json=_CAND_TEST)
+    row = _stored(cand.fila)
+    assert row is not None and row.profile_version == profiles_mod.MATCH_PROFILE_VERSION
+    cand = db.session.get(Candidata, cand.fila)
+    assert row.features == features_to_dict(candidate_features(cand))
+    assert row.features["age"] == 32 and row.features["city"] == "santiago"
+    assert row.compat_profile == load_candidata_profile(cand)
+
+    # Cambio de un campo fuente con la instancia cargada: la fila se recalcula en el mismo flush.
+    cand.areas_experiencia = "enfermería"
+    cand.edad = "51"
+    db.session.commit()
+    row = _stored(cand.fila)
+    assert row.features["age"] == 51
+    assert "enfermeria" in row.features["skill_tokens"]
+
+    # Instancia con campos fuente sin cargar: se borra y la lectura la calcula en memoria.
+    db.session.expunge_all()
+    cand = Candidata.query.options(load_only(Candidata.fila, Candidata.edad)).filter_by(fila=_BASE_FILA + 1).one()
+    cand.edad = "29"
+    db.session.commit()
+    assert _stored(cand.fila) is None
+    cand = db.session.get(Candidata, cand.fila)
+    features_by_id, compat_by_id = load_match_profiles([cand])
+    assert features_by_id[cand.fila].age == 29
+    assert compat_by_id == {}
+
+    # Versión vieja = ausente.
+    other = _add(2)
+    db.session.query(CandidataMatchProfile).filter_by(candidata_id=other.fila).update({"profile_version": 0})
+    db.session.commit()
+    stats = rebuild_match_profiles(batch_size=1, only_missing=True)
+    assert stats["written"] >= 2
+    assert _stored(_BASE_FILA + 1).features["age"] == 29
+    assert _stored(_BASE_FILA + 2).profile_version == profiles_mod.MATCH_PROFILE_VERSION
+
+
+def test_stored_profiles_score_like_live_instances(app_ctx):
+    pool = [
+        _add(10, compat_test_candidata_json=_CAND_TEST),
+        _add(11, direccion_completa="Los Alcarrizos", areas_experiencia="niños", edad="45 años"),
+        _add(12, compat_test_candidata_json=_CAND_TEST, compat_disponibilidad_horario="medio_tiempo", anos_experiencia=""),
+    ]
+    pool = [db.session.get(Candidata, cand.fila) for cand in pool]
+    solicitud = SimpleNamespace(
+        id=0,
+        cliente_id=0,
+        horario="8:00 a.m. - 5:00 p.m.",
+        modalidad_trabajo="salida diaria",
+        ciudad_sector="Villa Maria, Santiago",
+        rutas_cercanas="Cienfuegos",
+        funciones=["limpieza", "cocina", "cuidar_ninos"],
+        funciones_otro="",
+        tipo_servicio="DOMESTICA_LIMPIEZA",
+        detalles_servicio={},
+        experiencia="Minimo 2 anos",
+        edad_requerida=["25 a 45 años"],
+        edad_otro=None,
+        mascota="si, un perro",
+        ninos=2,
+        compat_test_cliente_json={"profile": {"ritmo_hogar": "tranquilo", "ninos": 2, "mascotas": "perro"}},
+    )
+
+    features_by_id, compat_by_id = load_match_profiles(pool)
+    assert set(compat_by_id) == {pool[0].fila, pool[2].fila}
+    for cand in pool:
+        if cand.fila in compat_by_id:
+            stored = compute_match(solicitud, cand, candidata_profile=compat_by_id[cand.fila])
+            live = compute_match(solicitud, cand)
+            assert stored["score"] == live["score"] and stored["breakdown"] == live["breakdown"]
+
+    stored_scores = score_pool(
+        solicitud,
+        EncodedPool(
+            pool,
+            features=[features_by_id[c.fila] for c in pool],
+            compat_profiles=[compat_by_id.get(c.fila) for c in pool],
+        ),
+    )
+    live_scores = score_pool(solicitud, encode_pool(pool))
+    assert np.array_equal(stored_scores.final, live_scores.final)
+    assert np.array_equal(stored_scores.bonus, live_scores.bonus)
+    assert stored_scores.bonus.any()
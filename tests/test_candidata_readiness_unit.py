@@ -66,6 +66,18 @@ class CandidataReadinessUnitTest(unittest.TestCase):
         self.assertFalse(ready)
         self.assertTrue(any("cedula2" in r for r in reasons))
 
+    def test_docs_usan_hechos_persistidos_sin_blob(self):
+        c = _build_candidata(
+            depuracion=None, perfil=None, cedula1=None, cedula2=None,
+            has_depuracion=True, has_perfil=True, has_cedula1=True, has_cedula2=False,
+        )
+        docs = candidata_docs_complete(c)
+        self.assertEqual(docs["missing_required"], ["cedula2"])
+
+        # Hecho sin calcular (None): se mira el blob como antes.
+        c = _build_candidata(has_cedula2=None)
+        self.assertTrue(candidata_docs_complete(c)["complete"])
+
     def test_codigo_vacio_falla(self):
         c = _build_candidata(codigo="", entrevista="ok")
         ready, reasons = candidata_is_ready_to_send(c)
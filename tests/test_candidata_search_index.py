@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+import core.services.candidata_search_index as index_mod
+from app import app as flask_app
+from config_app import db
+from core.services.candidata_search_index import (
+    TIER_EXACT,
+    TIER_TYPO,
+    CandidataSearchIndex,
+    build_index_from_db,
+    check_index_consistency,
+    sync_index_with_db,
+)
+from core.services.search import search_candidatas_limited
+from models import Candidata
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.audit_log_tail import publish_local
+
+
+_BASE_FILA = 940000
+_ROWS = [
+    ("María José Pérez", "402-1234567-8", "(809) 555-0101", "IDX-000001"),
+    ("Ana Núñez", "001-7654321-0", "829.555.0202", "IDX-000002"),
+    ("Josefina Marte", "031-1111111-1", "849 555 0303", "IDX-000003"),
+    ("Rosa Martínez", "031-2222222-2", "809 555 0404", "IDX-000004"),
+]
+
+
+def _purge() -> None:
+    db.session.query(Candidata).filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+@pytest.fixture(autouse=True)
+def _cleanup_rows():
+    yield
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata], reset=False)
+        _purge()
+
+
+def _seed() -> None:
+    ensure_sqlite_compat_tables([Candidata], reset=False)
+    _purge()
+    for i, (nombre, cedula, tel, codigo) in enumerate(_ROWS):
+        db.session.add(
+            Candidata(fila=_BASE_FILA + i, nombre_completo=nombre, cedula=cedula, numero_telefono=tel, codigo=codigo)
+        )
+    db.session.commit()
+
+
+def _index_from_rows() -> CandidataSearchIndex:
+    index = CandidataSearchIndex(max_docs=1000)
+    index.load(
+        CandidataSearchIndex.make_doc(_BASE_FILA + i, *row) for i, row in enumerate(_ROWS)
+    )
+    return index
+
+
+def test_index_matches_prefix_substring_digits_and_code():
+    index = _index_from_rows()
+    assert index.search("mart").exact_ids() == [_BASE_FILA + 2, _BASE_FILA + 3]
+    assert index.search("NUÑEZ ana").ids == [_BASE_FILA + 1]
+    assert index.search("555-0303").ids == [_BASE_FILA + 2]
+    assert index.search("4021234").ids == [_BASE_FILA]
+    assert index.search("idx-000004").ids == [_BASE_FILA + 3]
+    assert index.search("ma").exact_ids() == [_BASE_FILA + 2, _BASE_FILA, _BASE_FILA + 3]
+    assert index.search("%%") is None
+
+
+def test_index_typo_matches_rank_after_exact_matches():
+    index = _index_from_rows()
+    hits = index.search("josefna")
+    assert hits.ids == [_BASE_FILA + 2]
+    assert hits.tiers[_BASE_FILA + 2] == TIER_TYPO
+
+    hits = index.search("marte")
+    assert hits.tiers[_BASE_FILA + 2] == TIER_EXACT
+    assert index.search("josefna", typo_tolerant=False).ids == []
+
+
+def test_index_incremental_updates_from_dirty_marks():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _seed()
+        index = CandidataSearchIndex(max_docs=1_000_000)
+        assert build_index_from_db(index) is True
+        assert index.search("rosa").exact_ids() == [_BASE_FILA + 3]
+
+        cand = db.session.get(Candidata, _BASE_FILA + 3)
+        cand.nombre_completo = "Rosalba Martínez"
+        db.session.commit()
+        index.mark_dirty(_BASE_FILA + 3)
+        db.session.add(
+            Candidata(fila=_BASE_FILA + 10, nombre_completo="Zunilda Nueva", cedula="999-0000000-1", codigo="IDX-000010")
+        )
+        db.session.commit()
+        sync_index_with_db(index, force_tail=True)
+
+        assert index.search("rosalba").ids == [_BASE_FILA + 3]
+        assert index.search("zunilda").ids == [_BASE_FILA + 10]
+
+
+def test_audit_log_notification_marks_candidata_dirty(monkeypatch):
+    index = _index_from_rows()
+    monkeypatch.setattr(index_mod, "_INDEX", index)
+    from utils.audit_log_tail import register_audit_log_listener, unregister_audit_log_listener
+
+    register_audit_log_listener(index_mod._mark_from_audit)
+    try:
+        publish_local(entity_type="Candidata", entity_id=_BASE_FILA + 1, log_id=10)
+    finally:
+        unregister_audit_log_listener(index_mod._mark_from_audit)
+    assert index.pop_dirty() == [_BASE_FILA + 1]
+
+
+def test_search_service_uses_index_and_agrees_with_sql(monkeypatch):
+    flask_app.config["TESTING"] = True
+    monkeypatch.setenv("CANDIDATA_SEARCH_INDEX_ENABLED", "1")
+    index_mod.reset_candidata_search_index()
+    try:
+        with flask_app.test_request_context("/"):
+            _seed()
+            index = index_mod.get_candidata_search_index(wait=True)
+            assert index is not None and index.state == "ready"
+
+            rows = search_candidatas_limited("josefina marte", limit=10, minimal_fields=True)
+            assert [c.fila for c in rows if c.fila >= _BASE_FILA] == [_BASE_FILA + 2]
+            narrowed = search_candidatas_limited(
+                "mart", limit=10, base_query=Candidata.query.filter(Candidata.codigo == "IDX-000004")
+            )
+            assert [c.fila for c in narrowed] == [_BASE_FILA + 3]
+
+            out = check_index_consistency(index, ["mart", "ana", "555", "4021234", "idx-000002", "809 555"])
+            assert out["mismatches"] == []
+            assert out["compared"] >= 5
+    finally:
+        index_mod.reset_candidata_search_index()
+
+
+def test_remove_drops_empty_buckets():
+    index = _index_from_rows()
+    for i in range(len(_ROWS)):
+        index.remove(_BASE_FILA + i)
+    snap = index.snapshot()
+    assert snap["docs"] == 0
+    assert snap["vocab"] == 0
+    assert snap["digit_grams"] == 0
+    assert snap["raw_grams"] == 0
+    assert index._vocab_grams == {}
+
+
+def test_match_all_tokens_requires_every_word_in_some_raw_field():
+    index = _index_from_rows()
+    assert index.match_all_tokens("pérez 809") == [_BASE_FILA]
+    assert index.match_all_tokens("maria 809") == []
+    assert index.match_all_tokens("idx-00000") == [_BASE_FILA + i for i in range(len(_ROWS))]
+    assert index.match_all_tokens("mart 0404") == [_BASE_FILA + 3]
+    assert index.match_all_tokens("ana 809") == []
+    # La cédula cruda lleva guiones: sin ellos ILIKE no coincide.
+    assert index.match_all_tokens("4021234") == []
+    assert index.match_all_tokens("ma") is None
+    assert index.match_all_tokens("50%") is None
+    assert index.match_all_tokens("idx", max_ids=2) is None
+
+
+def test_api_candidatas_index_path_matches_sql(monkeypatch):
+    flask_app.config["TESTING"] = True
+    monkeypatch.setitem(flask_app.config, "WTF_CSRF_ENABLED", False)
+    queries = ["idx-0000", "maria 809", "pérez 809", "mart 555", "0303", "IDX-000004", "pérez 402", "ana 809", "jos ma", "555-0"]
+    index_mod.reset_candidata_search_index()
+    try:
+        with flask_app.app_context():
+            _seed()
+        client = flask_app.test_client()
+        login = client.post("/admin/login", data={"usuario": "Owner", "clave": "admin123"}, follow_redirects=False)
+        assert login.status_code in (302, 303)
+
+        monkeypatch.delenv("CANDIDATA_SEARCH_INDEX_ENABLED", raising=False)
+        by_sql = {q: client.get("/admin/api/candidatas", query_string={"q": q}).get_json()["results"] for q in queries}
+
+        monkeypatch.setenv("CANDIDATA_SEARCH_INDEX_ENABLED", "1")
+        with flask_app.test_request_context("/"):
+            index = index_mod.get_candidata_search_index(wait=True)
+            assert index is not None and index.state == "ready"
+        calls = {"n": 0}
+        original = CandidataSearchIndex.match_all_tokens
+
+        def _spy(self, term, **kwargs):
+            calls["n"] += 1
+            return original(self, term, **kwargs)
+
+        monkeypatch.setattr(CandidataSearchIndex, "match_all_tokens", _spy)
+        for q in queries:
+            assert client.get("/admin/api/candidatas", query_string={"q": q}).get_json()["results"] == by_sql[q], q
+        assert calls["n"] == len(queries)
+        assert [r["id"] for r in by_sql["pérez 809"]] == [_BASE_FILA]
+        assert {r["id"] for r in by_sql["idx-0000"]} >= {_BASE_FILA + i for i in range(len(_ROWS))}
+    finally:
+        index_mod.reset_candidata_search_index()
+
+
+def test_periodic_rebuild_picks_up_writes_outside_the_orm(monkeypatch):
+    flask_app.config["TESTING"] = True
+    monkeypatch.setenv("CANDIDATA_SEARCH_INDEX_ENABLED", "1")
+    index_mod.reset_candidata_search_index()
+    try:
+        with flask_app.test_request_context("/"):
+            _seed()
+            old = index_mod.get_candidata_search_index(wait=True)
+            assert old is not None
+            db.session.execute(
+                Candidata.__table__.update()
+                .where(Candidata.fila == _BASE_FILA + 1)
+                .values(nombre_completo="Anabel Sinaviso")
+            )
+            db.session.commit()
+            old.mark_dirty(_BASE_FILA + 2)
+            old.pop_dirty()
+            old.mark_dirty(_BASE_FILA + 3)
+            assert old.search("sinaviso").ids == []
+
+            old.built_at -= index_mod._rebuild_seconds() + 1
+            scheduled = []
+            monkeypatch.setattr(
+                index_mod.threading,
+                "Thread",
+                lambda target, args, **_kw: type("T", (), {"start": lambda _self: scheduled.append((target, args))})(),
+            )
+            index_mod._maybe_schedule_rebuild(old)
+            index_mod._maybe_schedule_rebuild(old)
+            assert len(scheduled) == 1 and old.rebuilding is True
+            target, args = scheduled[0]
+            target(*args)
+
+            fresh = index_mod._INDEX
+            assert fresh is not old and old.rebuilding is False
+            assert fresh.search("sinaviso").ids == [_BASE_FILA + 1]
+            assert fresh.pop_dirty() == [_BASE_FILA + 3]
+    finally:
+        index_mod.reset_candidata_search_index()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from sqlalchemy import inspect as sa_inspect
+
+from app import app as flask_app
+from config_app import db
+from core.services.search import search_candidatas_limited, search_norm_columns_enabled
+from models import Candidata
+from tests.t1_testkit import ensure_sqlite_compat_tables
+import utils.runtime_config as runtime_config
+from utils.runtime_config import reset_schema_cache
+
+
+_BASE_FILA = 930000
+
+
+def _seed() -> None:
+    ensure_sqlite_compat_tables([Candidata], reset=False)
+    db.session.query(Candidata).filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    rows = [
+        ("María José Pérez", "402-1234567-8", "(809) 555-0101", "NRM-000001"),
+        ("Ana Núñez", "001-7654321-0", "829.555.0202", "NRM-000002"),
+        ("Josefina Marte", "031-1111111-1", "849 555 0303", "NRM-000003"),
+    ]
+    for i, (nombre, cedula, tel, codigo) in enumerate(rows):
+        db.session.add(
+            Candidata(
+                fila=_BASE_FILA + i,
+                nombre_completo=nombre,
+                cedula=cedula,
+                numero_telefono=tel,
+                codigo=codigo,
+            )
+        )
+    db.session.commit()
+
+
+def test_model_events_maintain_normalized_search_columns():
+    with flask_app.app_context():
+        _seed()
+        cand = db.session.get(Candidata, _BASE_FILA)
+        assert cand.nombre_norm == "maria jose perez"
+        assert cand.cedula_digits == "40212345678"
+        assert cand.telefono_digits == "8095550101"
+
+        cand.nombre_completo = "María-José Pérez Ñ."
+        cand.numero_telefono = None
+        db.session.commit()
+        db.session.refresh(cand)
+        assert cand.nombre_norm == "maria-jose perez n"
+        assert cand.telefono_digits is None
+
+
+def test_search_uses_normalized_columns_when_available():
+    flask_app.config["TESTING"] = True
+    with flask_app.test_request_context("/"):
+        _seed()
+        reset_schema_cache()
+        assert search_norm_columns_enabled() is True
+
+        by_name = search_candidatas_limited("NUÑEZ ana", limit=10, minimal_fields=True)
+        assert [c.fila for c in by_name] == [_BASE_FILA + 1]
+
+        by_partial_phone = search_candidatas_limited("555-0303", limit=10)
+        assert [c.fila for c in by_partial_phone] == [_BASE_FILA + 2]
+
+        by_cedula = search_candidatas_limited("4021234", limit=10)
+        assert [c.fila for c in by_cedula] == [_BASE_FILA]
+
+        strict_code = search_candidatas_limited("nrm-000003", limit=10)
+        assert [c.fila for c in strict_code] == [_BASE_FILA + 2]
+
+
+def test_search_falls_back_without_normalized_columns(monkeypatch):
+    monkeypatch.setenv("CANDIDATA_SEARCH_NORM_COLUMNS", "0")
+    flask_app.config["TESTING"] = True
+    with flask_app.test_request_context("/"):
+        _seed()
+        assert search_norm_columns_enabled() is False
+        rows = search_candidatas_limited("josefina", limit=10)
+        assert [c.fila for c in rows] == [_BASE_FILA + 2]
+
+
+def test_missing_columns_are_rechecked_after_retry_window(monkeypatch):
+    calls = {"n": 0}
+
+    class _NoNormColumns:
+        def get_columns(self, _table):
+            calls["n"] += 1
+            return [{"name": "fila"}, {"name": "nombre_completo"}]
+
+    now = [1000.0]
+    with flask_app.app_context():
+        reset_schema_cache()
+        monkeypatch.setattr(runtime_config, "monotonic", lambda: now[0])
+        monkeypatch.setattr(runtime_config, "sa_inspect", lambda _bind: _NoNormColumns())
+        assert search_norm_columns_enabled() is False
+        assert search_norm_columns_enabled() is False
+        assert calls["n"] == 1
+
+        # La migración se aplica con el proceso vivo: pasado el intervalo se detecta.
+        monkeypatch.setattr(runtime_config, "sa_inspect", sa_inspect)
+        now[0] += runtime_config.SCHEMA_RETRY_SECONDS + 1
+        assert search_norm_columns_enabled() is True
+        now[0] += runtime_config.SCHEMA_RETRY_SECONDS + 1
+        monkeypatch.setattr(runtime_config, "sa_inspect", lambda _bind: _NoNormColumns())
+        assert search_norm_columns_enabled() is True
+        assert calls["n"] == 1
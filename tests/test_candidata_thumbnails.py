@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+import core.services.candidata_thumbnails as thumbs_mod
+from app import app as flask_app
+from config_app import db
+from models import Candidata, CandidataDocumento, CandidataFotoDerivada
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.blob_store import sha256_hex
+from utils.image_thumbnails import VARIANTS, render_thumbnails
+from utils.media_serving import media_version
+from utils.runtime_config import reset_schema_cache
+
+
+_FILA = 970001
+
+
+def _photo(width: int, height: int, *, mode: str = "RGB", fmt: str = "JPEG") -> bytes:
+    color = (200, 120, 40, 128) if mode == "RGBA" else (200, 120, 40)
+    buf = io.BytesIO()
+    Image.new(mode, (width, height), color).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _purge() -> None:
+    CandidataFotoDerivada.query.filter_by(candidata_id=_FILA).delete()
+    CandidataDocumento.query.filter_by(candidata_id=_FILA).delete()
+    Candidata.query.filter_by(fila=_FILA).delete()
+    db.session.commit()
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    monkeypatch.delenv("BLOB_STORE_BACKEND", raising=False)
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    reset_schema_cache()
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata, CandidataDocumento, CandidataFotoDerivada], reset=False)
+        # Las tablas compat no traen restricciones; el upsert necesita la única de la migración.
+        db.session.execute(
+            db.text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_candidata_fotos_derivadas_variant "
+                "ON candidata_fotos_derivadas (candidata_id, source_kind, variant, format)"
+            )
+        )
+        _purge()
+        db.session.add(
+            Candidata(
+                fila=_FILA,
+                nombre_completo="Thumb Test",
+                cedula="970-0000001-1",
+                codigo="THB-000001",
+                perfil=_photo(1600, 1200),
+            )
+        )
+        db.session.commit()
+    client = flask_app.test_client()
+    resp = client.post("/admin/login", data={"usuario": "Cruz", "clave": "8998"}, follow_redirects=False)
+    assert resp.status_code in (302, 303)
+    yield client
+    with flask_app.app_context():
+        _purge()
+    reset_schema_cache()
+
+
+def test_render_thumbnails_sizes_formats_and_alpha():
+    out = render_thumbnails(_photo(1600, 1200, mode="RGBA", fmt="PNG"))
+    assert {(t.variant, t.format) for t in out} == {(v, f) for v in VARIANTS for f in ("webp", "jpeg")}
+    card = next(t for t in out if t.variant == "card" and t.format == "webp")
+    assert (card.width, card.height) == (400, 300)
+    with Image.open(io.BytesIO(card.data)) as im:
+        assert im.format == "WEBP" and im.mode == "RGB"
+
+    small = render_thumbnails(_photo(120, 90), variants={"card": 400}, formats=("jpeg",))
+    assert (small[0].width, small[0].height) == (120, 90)
+
+
+def _wait_for_renders() -> None:
+    pool = thumbs_mod._RENDER_POOL
+    if pool is not None:
+        pool.shutdown(wait=True)
+        thumbs_mod._RENDER_POOL = None
+    assert thumbs_mod._RENDER_PENDING == set()
+
+
+def test_missing_variant_serves_original_and_renders_in_background(admin_client):
+    url = f"/subir_fotos/imagen/{_FILA}/perfil?size=card"
+    original = admin_client.get(f"/subir_fotos/imagen/{_FILA}/perfil").data
+    first = admin_client.get(url, headers={"Accept": "image/webp,image/*"})
+    assert first.status_code == 200
+    assert first.data == original
+    _wait_for_renders()
+
+    webp = admin_client.get(url, headers={"Accept": "image/webp,image/*"})
+    assert webp.status_code == 200
+    assert webp.mimetype == "image/webp"
+    assert "Accept" in webp.headers["Vary"]
+    with Image.open(io.BytesIO(webp.data)) as im:
+        assert im.size == (400, 300)
+
+    jpeg = admin_client.get(url, headers={"Accept": "image/jpeg"})
+    assert jpeg.mimetype == "image/jpeg"
+    assert len(jpeg.data) < len(original)
+
+    with flask_app.app_context():
+        rows = CandidataFotoDerivada.query.filter_by(candidata_id=_FILA, source_kind="perfil").count()
+        source_sha = CandidataDocumento.query.filter_by(candidata_id=_FILA, kind="perfil").one().sha256
+    assert rows == len(VARIANTS) * 2
+
+    versioned = admin_client.get(f"{url}&v={media_version(source_sha)}", headers={"Accept": "image/webp"})
+    assert "immutable" in versioned.headers["Cache-Control"]
+
+
+def test_changed_photo_regenerates_stale_thumbnails(admin_client):
+    admin_client.get(f"/subir_fotos/imagen/{_FILA}/perfil?size=thumb", headers={"Accept": "image/webp"})
+    _wait_for_renders()
+    new_photo = _photo(600, 900)
+    with flask_app.app_context():
+        cand = db.session.get(Candidata, _FILA)
+        cand.perfil = new_photo
+        db.session.commit()
+
+    stale = admin_client.get(f"/subir_fotos/imagen/{_FILA}/perfil?size=thumb", headers={"Accept": "image/webp"})
+    assert stale.data == new_photo
+    _wait_for_renders()
+    resp = admin_client.get(f"/subir_fotos/imagen/{_FILA}/perfil?size=thumb", headers={"Accept": "image/webp"})
+    with Image.open(io.BytesIO(resp.data)) as im:
+        assert im.height == 160 and im.width in (106, 107)
+    with flask_app.app_context():
+        shas = {r.source_sha256 for r in CandidataFotoDerivada.query.filter_by(candidata_id=_FILA)}
+    assert shas == {sha256_hex(new_photo)}
+
+
+def test_repeated_generation_upserts_and_enqueue_dedupes(admin_client, monkeypatch):
+    submitted = []
+
+    class _HeldPool:
+        def submit(self, fn, *args):
+            submitted.append((fn, args))
+
+    monkeypatch.setattr(thumbs_mod, "_RENDER_POOL", _HeldPool())
+    with flask_app.app_context():
+        photo = _photo(800, 600)
+        assert thumbs_mod.store_candidata_thumbnails(_FILA, "perfil", photo) == len(VARIANTS) * 2
+        # Una segunda escritura (p. ej. otro proceso) actualiza en sitio en vez de chocar.
+        assert thumbs_mod.store_candidata_thumbnails(_FILA, "perfil", photo) == len(VARIANTS) * 2
+        assert CandidataFotoDerivada.query.filter_by(candidata_id=_FILA).count() == len(VARIANTS) * 2
+
+        assert thumbs_mod.enqueue_candidata_thumbnails(_FILA, "perfil") is True
+        assert thumbs_mod.enqueue_candidata_thumbnails(_FILA, "perfil") is False
+        assert len(submitted) == 1
+        fn, args = submitted[0]
+        fn(*args)
+    assert thumbs_mod._RENDER_PENDING == set()
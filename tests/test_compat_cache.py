@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+import utils.compat_cache as compat_cache
+from app import app as flask_app
+from tests.test_compat_engine import _DummyCandidata, _DummySolicitud
+from utils.compat_engine import compute_match, load_candidata_profile
+
+
+def _without_generated_at(result):
+    out = dict(result)
+    out["meta"] = {k: v for k, v in (result.get("meta") or {}).items() if k != "generated_at"}
+    return out
+
+
+def _candidata(fila: int, ritmo: str = "activo", mascotas: str = "si"):
+    cand = _DummyCandidata()
+    cand.fila = fila
+    cand.compat_test_candidata_json = dict(cand.compat_test_candidata_json)
+    cand.compat_test_candidata_json["profile"] = dict(
+        cand.compat_test_candidata_json["profile"], ritmo=ritmo, mascotas=mascotas
+    )
+    return cand
+
+
+class CompatCacheTest(unittest.TestCase):
+    def setUp(self):
+        compat_cache._LRU_CACHE.clear()
+
+    def tearDown(self):
+        compat_cache._LRU_CACHE.clear()
+
+    def test_cached_result_equals_engine_and_second_call_skips_engine(self):
+        solicitud = _DummySolicitud()
+        cand = _candidata(201)
+        with flask_app.app_context():
+            with patch.object(compat_cache, "compute_match", wraps=compute_match) as engine:
+                first = compat_cache.compute_match_cached(solicitud, cand)
+                first["risks"].append("mutado por el llamador")
+                second = compat_cache.compute_match_cached(solicitud, cand)
+
+        self.assertEqual(engine.call_count, 1)
+        self.assertEqual(_without_generated_at(second), _without_generated_at(compute_match(solicitud, cand)))
+        self.assertEqual(compat_cache.compat_cache_stats()["hits"], 1)
+
+    def test_profile_edit_changes_key_and_invalidation_evicts_entity(self):
+        solicitud = _DummySolicitud()
+        cand = _candidata(202)
+        before = compat_cache.compute_match_cached(solicitud, cand)
+
+        cand.compat_test_candidata_json = dict(cand.compat_test_candidata_json)
+        cand.compat_test_candidata_json["profile"] = dict(
+            cand.compat_test_candidata_json["profile"], mascotas="no"
+        )
+        after = compat_cache.compute_match_cached(solicitud, cand)
+        self.assertEqual(_without_generated_at(after), _without_generated_at(compute_match(solicitud, cand)))
+        self.assertNotEqual(before["mascotas_context"], after["mascotas_context"])
+
+        self.assertEqual(compat_cache.invalidate_compat_cache(candidata_id=202), 2)
+        self.assertEqual(compat_cache.compat_cache_stats()["entries"], 0)
+
+    def test_compute_match_many_mixes_hits_misses_and_failures(self):
+        solicitud = _DummySolicitud()
+        cands = [_candidata(301), _candidata(302, ritmo="tranquilo"), _candidata(303, mascotas="no")]
+        profiles = [load_candidata_profile(c) for c in cands]
+        compat_cache.compute_match_cached(solicitud, cands[0], candidata_profile=profiles[0])
+
+        real = compute_match
+
+        def _engine(s, c, **kwargs):
+            if getattr(c, "fila", None) == 303:
+                raise ValueError("perfil roto")
+            return real(s, c, **kwargs)
+
+        with flask_app.app_context():
+            with patch.object(compat_cache, "compute_match", side_effect=_engine) as engine:
+                out = compat_cache.compute_match_many(solicitud, cands, candidata_profiles=profiles)
+
+        self.assertEqual(engine.call_count, 2)
+        self.assertIsNone(out[2])
+        for cand, result in zip(cands[:2], out[:2]):
+            self.assertEqual(_without_generated_at(result), _without_generated_at(compute_match(solicitud, cand)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -25,5 +25,5 @@ def test_admin_chat_runtimes_share_sse_cooldown_key():
 
 def test_live_stream_redis_warning_dedupe_not_keyed_by_message_text():
     txt = _read("admin/routes.py")
-    assert 'dedupe_key = f"f4_live_warn_boot:{type(exc).__name__}"' in txt
-    assert 'dedupe_key = f"f4_live_warn_read:{type(exc).__name__}"' in txt
+    assert 'dedupe_key = "f4_live_warn_boot:shared_reader_unavailable"' in txt
+    assert 'dedupe_key = "f4_live_warn_read:shared_reader_unhealthy"' in txt
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+from app import app as flask_app
+from utils.live_sse_gateway import (
+    ADMIN_STREAM_PATH,
+    AUDIENCE_CLIENTE,
+    AUDIENCE_STAFF,
+    AUDIENCE_MONITOREO,
+    CLIENTES_STREAM_PATH,
+    MONITOREO_CANDIDATA_STREAM_PATH,
+    MONITOREO_STREAM_PATH,
+    GatewayGrant,
+    LiveSseGateway,
+    LiveSseHub,
+    authorize_admin_stream,
+    authorize_clientes_stream,
+    authorize_monitoreo_candidata_stream,
+    authorize_monitoreo_stream,
+    normalize_envelope_for_gateway,
+)
+from utils.live_stream_reader import SharedStreamReader, stream_id_key
+
+
+def _login(client, usuario: str = "Cruz", clave: str = "8998"):
+    return client.post("/admin/login", data={"usuario": usuario, "clave": clave}, follow_redirects=False)
+
+
+def _session_headers(client) -> dict[str, str]:
+    name = str(flask_app.config.get("SESSION_COOKIE_NAME") or "session")
+    cookie = client.get_cookie(name)
+    return {"Cookie": f"{name}={cookie.value}"} if cookie is not None else {}
+
+
+def test_hub_fans_out_by_audience_and_cliente():
+    async def _scenario():
+        hub = LiveSseHub(queue_size=8)
+        staff_a = hub.subscribe(audience=AUDIENCE_STAFF)
+        staff_b = hub.subscribe(audience=AUDIENCE_STAFF)
+        cliente_7 = hub.subscribe(audience=AUDIENCE_CLIENTE, cliente_id=7)
+        cliente_8 = hub.subscribe(audience=AUDIENCE_CLIENTE, cliente_id=8)
+
+        assert hub.dispatch("invalidation", {"n": 1}, audience=AUDIENCE_STAFF) == 2
+        assert hub.dispatch("invalidation", {"n": 2}, audience=AUDIENCE_CLIENTE, cliente_id=7) == 1
+
+        assert staff_a.queue.qsize() == 1
+        assert staff_b.queue.qsize() == 1
+        assert cliente_7.queue.qsize() == 1
+        assert cliente_8.queue.qsize() == 0
+        frame = cliente_7.queue.get_nowait().decode("utf-8")
+        assert frame.startswith("event: invalidation\ndata: ")
+        assert json.loads(frame.split("data: ", 1)[1]) == {"n": 2}
+
+        hub.unsubscribe(staff_b)
+        snap = hub.snapshot()
+        assert snap["connections"] == 3
+        assert snap["by_audience"] == {AUDIENCE_STAFF: 1, AUDIENCE_CLIENTE: 2}
+
+    asyncio.run(_scenario())
+
+
+def test_hub_marks_slow_consumer_overflowed_without_blocking_others():
+    async def _scenario():
+        hub = LiveSseHub(queue_size=8)
+        slow = hub.subscribe(audience=AUDIENCE_STAFF)
+        fast = hub.subscribe(audience=AUDIENCE_STAFF)
+        for i in range(8):
+            hub.dispatch("invalidation", {"n": i}, audience=AUDIENCE_STAFF)
+            fast.queue.get_nowait()
+        hub.dispatch("invalidation", {"n": 99}, audience=AUDIENCE_STAFF)
+        assert slow.overflowed is True
+        assert fast.overflowed is False
+        assert fast.queue.qsize() == 1
+        assert hub.stats["dropped_slow"] == 1
+
+    asyncio.run(_scenario())
+
+
+def test_normalize_envelope_reuses_admin_normalizer():
+    envelope = {
+        "event_id": "evt-gw-1",
+        "event_type": "SOLICITUD_ESTADO_CAMBIADO",
+        "occurred_at": "2026-01-01T00:00:00Z",
+        "aggregate": {"type": "Solicitud", "id": "0", "version": 1},
+        "payload": {"solicitud_id": 0},
+    }
+    with flask_app.app_context():
+        assert normalize_envelope_for_gateway(envelope, stream_id="1-0") == []
+
+        envelope["payload"] = {"solicitud_id": 0, "cliente_id": 0}
+        envelope["aggregate"]["id"] = "901"
+        out = normalize_envelope_for_gateway(envelope, stream_id="2-0")
+    staff = [item for item in out if item[2] == AUDIENCE_STAFF]
+    assert len(staff) == 1
+    event, payload, _audience, _cid = staff[0]
+    assert event == "invalidation"
+    assert payload["stream_id"] == "2-0"
+    assert payload["target"]["solicitud_id"] == 901
+
+
+def test_authorize_admin_stream_uses_staff_session():
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    client = flask_app.test_client()
+    assert _login(client).status_code in (302, 303)
+
+    grant = authorize_admin_stream(
+        flask_app,
+        path=ADMIN_STREAM_PATH,
+        query_string="",
+        headers=_session_headers(client),
+        remote_addr="127.0.0.1",
+    )
+    assert grant.ok is True
+    assert grant.audience == AUDIENCE_STAFF
+    assert grant.on_close is not None
+    grant.on_close()
+
+
+def test_authorize_streams_reject_anonymous_and_wrong_role():
+    flask_app.config["TESTING"] = True
+    anon_admin = authorize_admin_stream(
+        flask_app, path=ADMIN_STREAM_PATH, query_string="", headers={}, remote_addr="127.0.0.1"
+    )
+    assert anon_admin.ok is False
+    assert anon_admin.status in (302, 401)
+
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    client = flask_app.test_client()
+    assert _login(client).status_code in (302, 303)
+    staff_on_clientes = authorize_clientes_stream(
+        flask_app,
+        path=CLIENTES_STREAM_PATH,
+        query_string="",
+        headers=_session_headers(client),
+        remote_addr="127.0.0.1",
+    )
+    assert staff_on_clientes.ok is False
+    assert staff_on_clientes.status in (302, 403)
+
+
+def test_authorize_monitoreo_streams_are_admin_only():
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    for authorize, path in (
+        (authorize_monitoreo_stream, MONITOREO_STREAM_PATH),
+        (authorize_monitoreo_candidata_stream, "/admin/monitoreo/candidatas/123/stream"),
+    ):
+        secretaria = flask_app.test_client()
+        assert _login(secretaria, "Karla", "9989").status_code in (302, 303)
+        denied = authorize(flask_app, path=path, query_string="", headers=_session_headers(secretaria), remote_addr="127.0.0.1")
+        assert denied.ok is False
+        assert denied.status == 403
+
+        admin = flask_app.test_client()
+        assert _login(admin).status_code in (302, 303)
+        grant = authorize(flask_app, path=path, query_string="last_id=1", headers=_session_headers(admin), remote_addr="127.0.0.1")
+        assert grant.ok is True
+        assert grant.audience == AUDIENCE_MONITOREO
+        assert grant.poll is not None
+        grant.on_close()
+
+
+def test_gateway_serves_monitoreo_streams_by_polling_between_ticks():
+    polls = []
+    wakers = []
+
+    def _monitoreo(app_obj, **_kwargs):
+        return GatewayGrant(
+            ok=True,
+            audience=AUDIENCE_MONITOREO,
+            poll=lambda: polls.append(1) or ([("presence", {"n": len(polls)})] if len(polls) == 1 else []),
+            poll_seconds=60.0,
+        )
+
+    def _candidata(app_obj, *, path, **_kwargs):
+        assert path == "/admin/monitoreo/candidatas/77/stream"
+        return GatewayGrant(
+            ok=True,
+            audience=AUDIENCE_MONITOREO,
+            poll=lambda: [("candidatelog", {"id": 9})] if wakers and wakers[-1][1] else [],
+            poll_seconds=60.0,
+            bind_wakeup=lambda wake: wakers.append([wake, False]),
+        )
+
+    async def _scenario():
+        gateway = LiveSseGateway(
+            app_obj=flask_app,
+            authorizers={MONITOREO_STREAM_PATH: _monitoreo, MONITOREO_CANDIDATA_STREAM_PATH: _candidata},
+            heartbeat_seconds=60,
+        )
+        server = await asyncio.start_server(gateway.handle_connection, host="127.0.0.1", port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            r1, w1 = await asyncio.open_connection("127.0.0.1", port)
+            w1.write(f"GET {MONITOREO_STREAM_PATH} HTTP/1.1\r\nHost: x\r\n\r\n".encode("latin-1"))
+            await w1.drain()
+            head = await asyncio.wait_for(r1.readuntil(b"\r\n\r\n"), timeout=3)
+            assert b"text/event-stream" in head
+            heartbeat = await asyncio.wait_for(r1.readuntil(b"\n\n"), timeout=3)
+            assert heartbeat.startswith(b"event: heartbeat")
+            first = await asyncio.wait_for(r1.readuntil(b"\n\n"), timeout=3)
+            assert first.startswith(b"event: presence")
+
+            r2, w2 = await asyncio.open_connection("127.0.0.1", port)
+            w2.write(b"GET /admin/monitoreo/candidatas/77/stream HTTP/1.1\r\nHost: x\r\n\r\n")
+            await w2.drain()
+            await asyncio.wait_for(r2.readuntil(b"\r\n\r\n"), timeout=3)
+            assert (await asyncio.wait_for(r2.readuntil(b"\n\n"), timeout=3)).startswith(b"event: heartbeat")
+            assert gateway.hub.snapshot()["by_audience"] == {AUDIENCE_MONITOREO: 2}
+
+            # Un aviso del tailer despierta al viewer sin esperar a ``poll_seconds``.
+            wakers[-1][1] = True
+            wakers[-1][0]()
+            frame = await asyncio.wait_for(r2.readuntil(b"\n\n"), timeout=3)
+            assert frame.startswith(b"event: candidatelog")
+            assert polls == [1]
+            w1.close()
+            w2.close()
+
+    asyncio.run(_scenario())
+
+
+def test_gateway_streams_dispatched_events_over_http():
+    def _allow(app_obj, **_kwargs):
+        return GatewayGrant(ok=True, audience=AUDIENCE_STAFF)
+
+    async def _scenario():
+        gateway = LiveSseGateway(app_obj=flask_app, authorizers={ADMIN_STREAM_PATH: _allow}, heartbeat_seconds=5)
+        server = await asyncio.start_server(gateway.handle_connection, host="127.0.0.1", port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {ADMIN_STREAM_PATH} HTTP/1.1\r\nHost: x\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=3)
+            assert b"200 OK" in head
+            assert b"text/event-stream" in head
+            first = await asyncio.wait_for(reader.readuntil(b"\n\n"), timeout=3)
+            assert first.startswith(b"event: heartbeat")
+
+            for _ in range(50):
+                if gateway.hub.subscribers:
+                    break
+                await asyncio.sleep(0.01)
+            gateway.hub.dispatch("invalidation", {"event_id": "e1"}, audience=AUDIENCE_STAFF)
+            frame = await asyncio.wait_for(reader.readuntil(b"\n\n"), timeout=3)
+            assert frame.startswith(b"event: invalidation")
+            assert b'"e1"' in frame
+            writer.close()
+
+            r2, w2 = await asyncio.open_connection("127.0.0.1", port)
+            w2.write(b"GET /nope HTTP/1.1\r\nHost: x\r\n\r\n")
+            await w2.drain()
+            head2 = await asyncio.wait_for(r2.readuntil(b"\r\n\r\n"), timeout=3)
+            assert b"404" in head2
+            w2.close()
+
+    asyncio.run(_scenario())
+
+
+class _FakeStreamRedis:
+    def __init__(self, ids: list[str]):
+        self.rows = [(sid, {"event": json.dumps(_staff_envelope(sid))}) for sid in ids]
+
+    def xrevrange(self, _key, count=None):
+        rows = list(reversed(self.rows))
+        return rows[: int(count)] if count else rows
+
+    def xrange(self, _key, min="-", max="+", count=None):
+        lo = min[1:] if min.startswith("(") else min
+        rows = [r for r in self.rows if min == "-" or stream_id_key(r[0]) > stream_id_key(lo)]
+        return rows[: int(count)] if count else rows
+
+
+def _staff_envelope(stream_id: str) -> dict:
+    return {
+        "event_id": f"evt-{stream_id}",
+        "event_type": "SOLICITUD_ESTADO_CAMBIADO",
+        "occurred_at": "2026-01-01T00:00:00Z",
+        "aggregate": {"type": "Solicitud", "id": str(900 + int(stream_id.split("-")[0])), "version": 1},
+        "payload": {"solicitud_id": 0, "cliente_id": 0},
+    }
+
+
+def test_gateway_replays_from_last_stream_id_and_resyncs_when_trimmed():
+    def _allow(app_obj, **_kwargs):
+        return GatewayGrant(ok=True, audience=AUDIENCE_STAFF)
+
+    reader = SharedStreamReader(app_obj=flask_app, redis_client=_FakeStreamRedis(["2-0", "3-0", "4-0", "5-0"]), stream_key="s")
+    reader.bootstrap()
+    reader.healthy = True
+
+    async def _read_events(reader_io, count: int) -> list[tuple[str, dict]]:
+        out = []
+        while len(out) < count:
+            frame = (await asyncio.wait_for(reader_io.readuntil(b"\n\n"), timeout=3)).decode("utf-8")
+            event = frame.split("\n", 1)[0].split(": ", 1)[1]
+            out.append((event, json.loads(frame.split("data: ", 1)[1])))
+        return out
+
+    async def _scenario():
+        gateway = LiveSseGateway(app_obj=flask_app, authorizers={ADMIN_STREAM_PATH: _allow}, heartbeat_seconds=5, reader=reader)
+        loop = asyncio.get_running_loop()
+        replay = gateway._replay
+
+        def _replay_racing_live_events(sub, last_stream_id):
+            # Eventos en vivo que llegan mientras se arma el replay: 5-0 se duplica, 6-0 no.
+            for sid in ("5-0", "6-0"):
+                loop.call_soon_threadsafe(
+                    lambda s=sid: gateway.hub.dispatch("invalidation", {"stream_id": s}, audience=AUDIENCE_STAFF, stream_id=s)
+                )
+            time.sleep(0.05)
+            return replay(sub, last_stream_id)
+
+        gateway._replay = _replay_racing_live_events
+        server = await asyncio.start_server(gateway.handle_connection, host="127.0.0.1", port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            r1, w1 = await asyncio.open_connection("127.0.0.1", port)
+            w1.write(f"GET {ADMIN_STREAM_PATH}?last_stream_id=3-0 HTTP/1.1\r\nHost: x\r\n\r\n".encode("latin-1"))
+            await w1.drain()
+            await asyncio.wait_for(r1.readuntil(b"\r\n\r\n"), timeout=3)
+            events = await _read_events(r1, 4)
+            assert [e for e, _ in events] == ["heartbeat", "invalidation", "invalidation", "invalidation"]
+            assert [p["stream_id"] for _, p in events[1:]] == ["4-0", "5-0", "6-0"]
+            w1.close()
+
+            gateway._replay = replay
+            r2, w2 = await asyncio.open_connection("127.0.0.1", port)
+            w2.write(f"GET {ADMIN_STREAM_PATH}?last_stream_id=1-0 HTTP/1.1\r\nHost: x\r\n\r\n".encode("latin-1"))
+            await w2.drain()
+            await asyncio.wait_for(r2.readuntil(b"\r\n\r\n"), timeout=3)
+            events = await _read_events(r2, 2)
+            assert events[1] == ("resync", {"reason": "cursor_expired", "last_stream_id": "5-0"})
+            w2.close()
+        assert gateway.hub.stats["replayed"] == 2
+        assert gateway.hub.stats["resyncs"] == 1
+
+    asyncio.run(_scenario())
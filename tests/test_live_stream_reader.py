@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import utils.live_stream_reader as live_stream_reader
+from app import app as flask_app
+from config_app import db
+from models import DomainOutbox
+from utils.live_stream_reader import LiveStreamBuffer, SharedStreamReader, build_stream_entry, stream_id_key
+from utils.timezone import utc_now_naive
+
+
+def _login(client, usuario: str = "Cruz", clave: str = "8998"):
+    return client.post("/admin/login", data={"usuario": usuario, "clave": clave}, follow_redirects=False)
+
+
+def _envelope(solicitud_id: int, *, event_id: str) -> dict:
+    return {
+        "event_id": event_id,
+        "event_type": "SOLICITUD_ESTADO_CAMBIADO",
+        "occurred_at": "2026-01-01T00:00:00Z",
+        "aggregate": {"type": "Solicitud", "id": str(solicitud_id), "version": 1},
+        "payload": {"solicitud_id": solicitud_id, "from": "proceso", "to": "activa"},
+    }
+
+
+class _FakeStreamRedis:
+    """Stream en memoria con la semántica mínima de XREVRANGE/XREAD que usa el lector."""
+
+    def __init__(self, rows: list[tuple[str, dict]] | None = None):
+        self.rows = list(rows or [])
+        self.xread_calls = 0
+        self._cond = threading.Condition()
+
+    def add(self, stream_id: str, envelope: dict) -> None:
+        with self._cond:
+            self.rows.append((stream_id, {"event": json.dumps(envelope)}))
+            self._cond.notify_all()
+
+    def xrevrange(self, _key, count=None):
+        rows = list(reversed(self.rows))
+        return rows[: int(count)] if count else rows
+
+    def xrange(self, _key, min="-", max="+", count=None):
+        lo = stream_id_key(min[1:]) if min.startswith("(") else (-1, -1)
+        rows = [r for r in self.rows if stream_id_key(r[0]) > lo]
+        return rows[: int(count)] if count else rows
+
+    def xread(self, streams, count=None, block=None):
+        self.xread_calls += 1
+        after = stream_id_key(list(streams.values())[0])
+        with self._cond:
+            pending = [r for r in self.rows if stream_id_key(r[0]) > after]
+            if not pending:
+                self._cond.wait(timeout=min(0.05, (block or 0) / 1000.0))
+                pending = [r for r in self.rows if stream_id_key(r[0]) > after]
+        if not pending:
+            return []
+        return [("stream", pending[: int(count or len(pending))])]
+
+
+def _entry(stream_id: str) -> object:
+    return build_stream_entry(stream_id, _envelope(1, event_id=f"e-{stream_id}"))
+
+
+def test_buffer_read_after_and_gap_detection():
+    buf = LiveStreamBuffer(maxlen=3)
+    buf.append_many([_entry(f"{i}-0") for i in range(1, 6)])
+
+    assert len(buf) == 3
+    assert buf.floor_id == "2-0"
+    assert buf.last_stream_id == "5-0"
+
+    entries, cursor = buf.read_after("3-0", limit=10)
+    assert [e.stream_id for e in entries] == ["4-0", "5-0"]
+    assert cursor == "5-0"
+
+    entries, cursor = buf.read_after("2-0", limit=1)
+    assert [e.stream_id for e in entries] == ["3-0"]
+    assert cursor == "3-0"
+
+    assert buf.read_after("1-0") is None
+    assert buf.read_after("basura") is None
+    assert buf.read_after("$") == ([], "5-0")
+
+
+def test_buffer_cursor_advances_on_entries_without_event_and_wakes_waiters():
+    buf = LiveStreamBuffer(maxlen=10)
+    buf.append_many([], last_stream_id="7-0")
+    assert buf.read_after("0-0") == ([], "7-0")
+
+    assert buf.wait_after("7-0", timeout=0.01) is False
+    threading.Timer(0.05, lambda: buf.append_many([_entry("8-0")])).start()
+    assert buf.wait_after("7-0", timeout=2.0) is True
+
+
+def test_shared_reader_bootstraps_tail_and_reads_new_entries_once():
+    fake = _FakeStreamRedis([(f"{i}-0", {"event": json.dumps(_envelope(i, event_id=f"b{i}"))}) for i in range(1, 6)])
+    reader = SharedStreamReader(
+        app_obj=flask_app,
+        redis_client=fake,
+        stream_key="k",
+        buffer=LiveStreamBuffer(maxlen=3),
+    )
+    reader.bootstrap()
+    assert reader.buffer.floor_id == "2-0"
+    assert [e.stream_id for e in reader.buffer.read_after("2-0", limit=10)[0]] == ["3-0", "4-0", "5-0"]
+
+    seen: list[str] = []
+    listener = lambda entries: seen.extend(e.stream_id for e in entries)  # noqa: E731
+    live_stream_reader.register_stream_listener(listener)
+    try:
+        fake.add("6-0", _envelope(6, event_id="b6"))
+        entries = reader.read_once()
+    finally:
+        live_stream_reader.unregister_stream_listener(listener)
+    assert [e.stream_id for e in entries] == ["6-0"]
+    assert seen == ["6-0"]
+    assert reader.buffer.last_stream_id == "6-0"
+    staff = entries[0].normalized.get("staff")
+    assert staff is not None
+    assert staff["stream_id"] == "6-0"
+    assert staff["target"]["solicitud_id"] == 6
+
+
+def test_replay_after_uses_buffer_then_xrange_and_detects_trimmed_cursor():
+    fake = _FakeStreamRedis([(f"{i}-0", {"event": json.dumps(_envelope(i, event_id=f"r{i}"))}) for i in range(2, 8)])
+    reader = SharedStreamReader(app_obj=flask_app, redis_client=fake, stream_key="k", buffer=LiveStreamBuffer(maxlen=3))
+    reader.bootstrap()
+    reader.healthy = True
+    assert reader.buffer.floor_id == "4-0"
+
+    assert [e.stream_id for e in reader.replay_after("5-0")] == ["6-0", "7-0"]
+    # Fuera del buffer pero aún en Redis: XRANGE, con tope.
+    assert [e.stream_id for e in reader.replay_after("2-0", limit=10)] == ["3-0", "4-0", "5-0", "6-0", "7-0"]
+    assert reader.replay_after("2-0") is None
+    # Anterior al primer id que queda en el stream: eventos recortados.
+    assert reader.replay_after("1-0", limit=10) is None
+
+    whole = SharedStreamReader(app_obj=flask_app, redis_client=fake, stream_key="k", buffer=LiveStreamBuffer(maxlen=50))
+    whole.bootstrap()
+    whole.healthy = True
+    assert whole.buffer.floor_id == "0-0"
+    assert [e.stream_id for e in whole.replay_after("6-0")] == ["7-0"]
+    assert whole.buffer.retains("1-0") is False
+    assert whole.replay_after("1-0") is None
+
+
+def test_reconnect_resumes_from_last_delivered_id_and_fans_out_the_gap():
+    fake = _FakeStreamRedis([(f"{i}-0", {"event": json.dumps(_envelope(i, event_id=f"g{i}"))}) for i in range(1, 4)])
+    reader = SharedStreamReader(app_obj=flask_app, redis_client=fake, stream_key="k", buffer=LiveStreamBuffer(maxlen=3))
+    reader.bootstrap()
+
+    seen: list[str] = []
+    listener = lambda entries: seen.extend(e.stream_id for e in entries)  # noqa: E731
+    live_stream_reader.register_stream_listener(listener)
+    try:
+        # Escrito mientras Redis no respondía: el XREVRANGE del bootstrap lo saltaría.
+        fake.add("4-0", _envelope(4, event_id="g4"))
+        fake.add("5-0", _envelope(5, event_id="g5"))
+        assert reader.resume() is True
+        assert seen == ["4-0", "5-0"]
+        assert reader.buffer.last_stream_id == "5-0"
+
+        # Hueco más largo que el buffer: no se puede reanudar, toca bootstrap.
+        for i in range(6, 10):
+            fake.add(f"{i}-0", _envelope(i, event_id=f"g{i}"))
+        assert reader.resume() is False
+        # Cursor ya recortado del stream.
+        fake.rows = fake.rows[-2:]
+        assert reader.resume() is False
+    finally:
+        live_stream_reader.unregister_stream_listener(listener)
+    assert seen == ["4-0", "5-0"]
+
+
+def test_live_poll_answers_from_memory_when_cursor_is_buffered(monkeypatch):
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    monkeypatch.setitem(flask_app.config, "ADMIN_LIVE_SSE_ENABLED", True)
+    with flask_app.app_context():
+        DomainOutbox.__table__.create(bind=db.engine, checkfirst=True)
+
+    fake = _FakeStreamRedis([("10-0", {"event": json.dumps(_envelope(501, event_id="m1"))})])
+    reader = SharedStreamReader(app_obj=flask_app, redis_client=fake, stream_key="k", buffer=LiveStreamBuffer(maxlen=50))
+    reader.start()
+    assert reader.wait_ready(2.0) is True
+    monkeypatch.setattr(live_stream_reader, "_READER", reader)
+    try:
+        client = flask_app.test_client()
+        assert _login(client).status_code in (302, 303)
+
+        fake.add("11-0", _envelope(502, event_id="m2"))
+        deadline = time.time() + 2.0
+        while reader.buffer.last_stream_id != "11-0" and time.time() < deadline:
+            time.sleep(0.01)
+
+        resp = client.get("/admin/live/invalidation/poll?after_id=0&after_stream_id=10-0&limit=25")
+        assert resp.status_code == 200
+        assert (resp.headers.get("X-Live-Invalidation-Source") or "") == "memory"
+        payload = resp.get_json() or {}
+        assert payload.get("next_after_stream_id") == "11-0"
+        assert [item.get("event_id") for item in payload.get("items") or []] == ["m2"]
+
+        gap = client.get("/admin/live/invalidation/poll?after_id=0&after_stream_id=bad&limit=25")
+        assert gap.status_code == 200
+        assert (gap.headers.get("X-Live-Invalidation-Source") or "") != "memory"
+        assert (gap.get_json() or {}).get("next_after_stream_id") == "11-0"
+    finally:
+        reader.stop_event.set()
+
+
+def test_live_poll_stream_cursor_never_skips_unreturned_outbox_rows(monkeypatch):
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    monkeypatch.setitem(flask_app.config, "ADMIN_LIVE_SSE_ENABLED", True)
+    now_ms = int(time.time() * 1000)
+    with flask_app.app_context():
+        DomainOutbox.__table__.create(bind=db.engine, checkfirst=True)
+        base_id = 9_700_000
+        DomainOutbox.query.filter(DomainOutbox.id >= base_id).delete()
+        rows = []
+        for idx, published in enumerate((True, True, False), start=1):
+            env = _envelope(600 + idx, event_id=f"cur-{now_ms}-{idx}")
+            rows.append(
+                DomainOutbox(
+                    id=base_id + idx,
+                    event_id=env["event_id"],
+                    event_type=env["event_type"],
+                    aggregate_type="Solicitud",
+                    aggregate_id=str(600 + idx),
+                    payload=env["payload"],
+                    published_at=utc_now_naive() if published else None,
+                )
+            )
+        db.session.add_all(rows)
+        db.session.commit()
+        ids = [int(r.id) for r in rows]
+        event_ids = [r.event_id for r in rows]
+
+    # Los tres ya están en el stream; el tercero aún no tiene published_at (XADD antes del UPDATE).
+    fake = _FakeStreamRedis(
+        [
+            (f"{now_ms - 3000 + i}-0", {"event": json.dumps(_envelope(601 + i, event_id=event_ids[i]))})
+            for i in range(3)
+        ]
+    )
+    reader = SharedStreamReader(app_obj=flask_app, redis_client=fake, stream_key="k", buffer=LiveStreamBuffer(maxlen=50))
+    reader.start()
+    assert reader.wait_ready(2.0) is True
+    monkeypatch.setattr(live_stream_reader, "_READER", reader)
+    try:
+        client = flask_app.test_client()
+        assert _login(client).status_code in (302, 303)
+
+        truncated = client.get(f"/admin/live/invalidation/poll?after_id={ids[0] - 1}&limit=1").get_json()
+        assert [item["event_id"] for item in truncated["items"]] == [event_ids[0]]
+        assert "next_after_stream_id" not in truncated
+
+        page = client.get(f"/admin/live/invalidation/poll?after_id={ids[0]}&limit=25").get_json()
+        assert [item["event_id"] for item in page["items"]] == [event_ids[1]]
+        assert page["next_after_stream_id"] == f"{now_ms - 2999}-0"
+
+        memory = client.get(
+            f"/admin/live/invalidation/poll?after_id={page['next_after_id']}&after_stream_id={page['next_after_stream_id']}"
+        ).get_json()
+        assert [item["event_id"] for item in memory["items"]] == [event_ids[2]]
+    finally:
+        reader.stop_event.set()
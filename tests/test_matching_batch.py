@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+
+from utils import matching_service
+from utils.matching_batch import encode_pool, rank_order, score_candidates_batch, score_pool
+
+
+_DIRECCIONES = [
+    "Avenida Nueva Stgo Villa Maria",
+    "Cienfuegos, Santiago",
+    "Los Alcarrizos, Santo Domingo",
+    "Centro, La Vega",
+    "Moca, Espaillat",
+    "Puerto Plata, Costambar",
+    "",
+    "Gurabo",
+]
+_RUTAS = ["Cienfuegos", "Gurabo / Villa Maria", "Los Alcarrizos", "", "Ruta K", "Pueblo Nuevo"]
+_MODALIDADES = ["salida diaria", "dormida", "con dormida lunes a viernes", "medio tiempo", "", "fin de semana", "xx"]
+_HORARIOS = ["8am-5pm", "9am-6pm", "medio_tiempo", "", "noche", ["8am-5pm", "medio_tiempo"], "fin de semana"]
+_AREAS = ["limpieza, cocina", "niños", "cuidado de ancianos", "enfermería", "todas las anteriores", "", "lavar y planchar"]
+_FORTALEZAS = [[], ["cocinar"], ["cuidar niños", "limpiar"], ["enfermeria"]]
+_LIMITES = [[], ["no mascotas"], ["no_mascotas"], ["no fumar"]]
+_EDADES = ["32", "19", "45 años", "", "60", "veinte", "28"]
+_ANOS = ["4", "1", "", "10 años", "mas de 2", "ninguno"]
+
+
+def _solicitudes():
+    base = dict(
+        funciones_otro="",
+        tipo_servicio="DOMESTICA_LIMPIEZA",
+        detalles_servicio={},
+        compat_test_cliente_json=None,
+        edad_otro=None,
+        id=0,
+        cliente_id=0,
+    )
+    return [
+        SimpleNamespace(
+            **base,
+            horario="8:00 a.m. - 5:00 p.m.",
+            modalidad_trabajo="salida diaria - lunes a viernes",
+            ciudad_sector="Villa Maria, Santiago",
+            rutas_cercanas="Cienfuegos",
+            funciones=["limpieza", "cocina", "cuidar_ninos"],
+            experiencia="Minimo 2 anos",
+            edad_requerida=["25 a 45 años"],
+            mascota="si, un perro",
+        ),
+        SimpleNamespace(
+            **base,
+            horario="medio_tiempo",
+            modalidad_trabajo="con dormida",
+            ciudad_sector="",
+            rutas_cercanas="Gurabo Villa Maria Cienfuegos",
+            funciones=["enfermeria"],
+            experiencia="",
+            edad_requerida=[],
+            mascota="no",
+        ),
+        SimpleNamespace(
+            **base,
+            horario="",
+            modalidad_trabajo="",
+            ciudad_sector="Los Alcarrizos",
+            rutas_cercanas="",
+            funciones=[],
+            experiencia="",
+            edad_requerida=["mayor de 30"],
+            mascota="gato",
+        ),
+    ]
+
+
+def _candidates(count: int, seed: int):
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        out.append(
+            SimpleNamespace(
+                fila=1000 + i,
+                nombre_completo=f"Cand {rng.randrange(40)}",
+                codigo=f"C-{i}",
+                direccion_completa=rng.choice(_DIRECCIONES),
+                rutas_cercanas=rng.choice(_RUTAS),
+                modalidad_trabajo_preferida=rng.choice(_MODALIDADES),
+                compat_disponibilidad_horario=rng.choice(_HORARIOS),
+                areas_experiencia=rng.choice(_AREAS),
+                compat_fortalezas=rng.choice(_FORTALEZAS),
+                sabe_planchar=rng.random() < 0.3,
+                compat_limites_no_negociables=rng.choice(_LIMITES),
+                edad=rng.choice(_EDADES),
+                anos_experiencia=rng.choice(_ANOS),
+                compat_test_candidata_json=None,
+            )
+        )
+    return out
+
+
+def _context(pool):
+    readiness = {"ready": True, "reasons": [], "docs": {}, "referencias": {}, "has_interview": True}
+    return {
+        "readiness_by_id": {int(c.fila): dict(readiness) for c in pool},
+        "history_by_id": {
+            int(c.fila): {"blocked_other_client": c.fila % 7 == 0, "rejected_same_client": c.fila % 11 == 0}
+            for c in pool
+        },
+    }
+
+
+def test_batch_rows_match_score_candidate_exactly():
+    pool = _candidates(300, seed=14)
+    context = _context(pool)
+    for solicitud in _solicitudes():
+        profile = matching_service.build_solicitud_profile(solicitud)
+        expected = [
+            matching_service._score_candidate(solicitud, cand, sol_profile=profile, scoring_context=context)
+            for cand in pool
+        ]
+        got = score_candidates_batch(solicitud, pool, sol_profile=profile, scoring_context=context)
+        assert len(got) == len(expected)
+        for want, row in zip(expected, got):
+            assert row == want
+
+
+def test_rank_order_matches_sorted_scalar_rows():
+    pool = _candidates(120, seed=7)
+    solicitud = _solicitudes()[0]
+    encoded = encode_pool(pool)
+    scores = score_pool(solicitud, encoded)
+    expected = sorted(
+        (matching_service._score_candidate(solicitud, cand, scoring_context=_context(pool)) for cand in pool),
+        key=lambda item: (item["score"], item["operational_score"], (item["candidate"].nombre_completo or "").lower()),
+        reverse=True,
+    )
+    assert [pool[i].fila for i in rank_order(encoded, scores)] == [row["candidate"].fila for row in expected]
@@ -405,5 +405,67 @@ class MatchingServiceTest(unittest.TestCase):
         self.assertTrue(row["breakdown_snapshot"]["edad_match"])
 
 
+
+class MatchingServiceBatchTest(unittest.TestCase):
+    def _solicitudes(self):
+        santiago = _DummySolicitud()
+        santiago.id, santiago.cliente_id = 11, 1
+        santiago_otro = _DummySolicitud()
+        santiago_otro.id, santiago_otro.cliente_id = 12, 2
+        santiago_otro.modalidad_trabajo = "con dormida lunes a viernes"
+        santiago_otro.edad_requerida = ["{31-45}"]
+        sin_ciudad = _DummySolicitud()
+        sin_ciudad.id, sin_ciudad.cliente_id = 13, 3
+        sin_ciudad.ciudad_sector = ""
+        sin_ciudad.rutas_cercanas = "Gurabo"
+        return [santiago, santiago_otro, sin_ciudad]
+
+    def _pools(self):
+        cands = [_DummyCandidate(300 - i, f"Cand {i}") for i in range(12)]
+        for i, cand in enumerate(cands):
+            cand.modalidad_trabajo_preferida = ("salida diaria", "dormida", "")[i % 3]
+            cand.edad = str(22 + 3 * i)
+            cand.rutas_cercanas = ("Cienfuegos", "Gurabo", "")[i % 3]
+        cands[4].codigo = ""
+        return {"santiago": cands[:8], "": cands[3:]}
+
+    def test_rank_batch_igual_a_rank_por_solicitud(self):
+        solicitudes = self._solicitudes()
+        pools = self._pools()
+
+        def _prefilter(sol):
+            return list(pools[matching_service.build_solicitud_profile(sol).get("city") or ""])
+
+        with patch("utils.matching_service.candidate_query_prefilter", side_effect=_prefilter) as prefilter_mock:
+            batch = matching_service.rank_candidates_batch(solicitudes, top_k=5)
+        self.assertEqual(prefilter_mock.call_count, 2)
+
+        for sol in solicitudes:
+            with patch("utils.matching_service.candidate_query_prefilter", side_effect=_prefilter):
+                single = matching_service.rank_candidates(sol, top_k=5)
+            self.assertEqual(
+                [(row["candidate"].fila, row["score"], row["breakdown_snapshot"]) for row in batch[sol.id]],
+                [(row["candidate"].fila, row["score"], row["breakdown_snapshot"]) for row in single],
+            )
+            self.assertNotIn(296, [row["candidate"].fila for row in batch[sol.id]])
+
+    def test_history_flags_from_rows_por_solicitud(self):
+        santiago, santiago_otro, _ = self._solicitudes()
+        rows = [
+            (1, 11, 1, "enviada"),
+            (2, 99, 2, "vista"),
+            (3, 98, 1, "descartada"),
+            (4, 97, None, "seleccionada"),
+        ]
+        self.assertEqual(
+            matching_service._history_flags_from_rows(santiago, rows),
+            ({2}, {3}, {2, 4}),
+        )
+        self.assertEqual(
+            matching_service._history_flags_from_rows(santiago_otro, rows),
+            ({1}, set(), {1, 2, 4}),
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+import core.services.candidata_documentos as docs_mod
+from app import app as flask_app
+from config_app import db
+from models import Candidata, CandidataDocumento
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.blob_store import sha256_hex
+from utils.media_serving import media_version, parse_byte_range
+from utils.runtime_config import reset_schema_cache
+
+
+_FILA = 960001
+_PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(200))
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    monkeypatch.delenv("BLOB_STORE_BACKEND", raising=False)
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    reset_schema_cache()
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata, CandidataDocumento], reset=False)
+        CandidataDocumento.query.filter_by(candidata_id=_FILA).delete()
+        Candidata.query.filter_by(fila=_FILA).delete()
+        db.session.commit()
+        db.session.add(
+            Candidata(fila=_FILA, nombre_completo="Media Test", cedula="960-0000001-1", codigo="MED-000001", perfil=_PNG)
+        )
+        db.session.commit()
+    client = flask_app.test_client()
+    resp = client.post("/admin/login", data={"usuario": "Cruz", "clave": "8998"}, follow_redirects=False)
+    assert resp.status_code in (302, 303)
+    yield client
+    with flask_app.app_context():
+        CandidataDocumento.query.filter_by(candidata_id=_FILA).delete()
+        Candidata.query.filter_by(fila=_FILA).delete()
+        db.session.commit()
+    reset_schema_cache()
+
+
+def test_parse_byte_range():
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+    assert parse_byte_range("bytes=0-1,5-6", 100) is None
+    assert parse_byte_range("bytes=100-", 100) == "invalid"
+
+
+def test_image_etag_revalidation_skips_blob(admin_client, monkeypatch):
+    url = f"/subir_fotos/imagen/{_FILA}/perfil"
+    first = admin_client.get(url)
+    assert first.status_code == 200
+    assert first.data == _PNG
+    assert first.headers["ETag"] == f'"{sha256_hex(_PNG)}"'
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    def _no_blob(*_a, **_k):
+        raise AssertionError("304 no debe leer el blob")
+
+    monkeypatch.setattr(docs_mod, "iter_candidata_document", _no_blob)
+    monkeypatch.setattr(docs_mod, "load_candidata_document", _no_blob)
+    again = admin_client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    versioned = admin_client.get(
+        f"{url}?v={media_version(sha256_hex(_PNG))}", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert versioned.status_code == 304
+    assert "immutable" in versioned.headers["Cache-Control"]
+
+
+def test_download_supports_range_requests(admin_client):
+    url = f"/gestionar_archivos/descargar_uno?id={_FILA}&doc=perfil"
+    part = admin_client.get(url, headers={"Range": "bytes=4-11"})
+    assert part.status_code == 206
+    assert part.data == _PNG[4:12]
+    assert part.headers["Content-Range"] == f"bytes 4-11/{len(_PNG)}"
+    assert part.headers["Content-Disposition"].startswith("attachment;")
+
+    bad = admin_client.get(url, headers={"Range": f"bytes={len(_PNG) + 5}-"})
+    assert bad.status_code == 416
+    assert bad.headers["Content-Range"] == f"bytes */{len(_PNG)}"
+
+    stale = admin_client.get(url, headers={"Range": "bytes=0-3", "If-Range": '"otro"'})
+    assert stale.status_code == 200
+    assert stale.data == _PNG
+
+
+def test_large_documents_are_streamed_in_chunks(admin_client, monkeypatch):
+    import utils.media_serving as media_mod
+
+    monkeypatch.setattr(media_mod, "STREAM_THRESHOLD", 16)
+    resp = admin_client.get(f"/gestionar_archivos/descargar_uno?id={_FILA}&doc=perfil")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.get_data() == _PNG
+    assert resp.headers["Content-Length"] == str(len(_PNG))
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import time
+
+from sqlalchemy import text
+
+from app import app as flask_app
+from config_app import db
+import utils.monitoreo_aggregator as monitoreo_aggregator
+from utils.monitoreo_aggregator import MonitoreoAggregator, MonitoreoChannel
+
+
+def _login(client, usuario: str = "Cruz", clave: str = "8998"):
+    return client.post("/admin/login", data={"usuario": usuario, "clave": clave}, follow_redirects=False)
+
+
+def test_channel_is_computed_once_per_interval_for_all_viewers(monkeypatch):
+    monkeypatch.setenv("MONITOREO_AGGREGATOR_CLUSTER", "0")
+    calls = {"n": 0}
+
+    def _compute():
+        calls["n"] += 1
+        return {"value": calls["n"] // 2}
+
+    agg = MonitoreoAggregator([MonitoreoChannel("presence", 1.0, _compute)])
+    viewers = [{} for _ in range(25)]
+
+    first = [agg.changes_since(seen, ["presence"], now=100.0) for seen in viewers]
+    assert calls["n"] == 1
+    assert all(out == [("presence", {"value": 0})] for out in first)
+
+    # Mismo tick: nadie recalcula ni recibe nada nuevo.
+    assert all(agg.changes_since(seen, ["presence"], now=100.5) == [] for seen in viewers)
+    assert calls["n"] == 1
+
+    # Nuevo tick con contenido distinto: una sola recomputación y versión nueva para todos.
+    second = [agg.changes_since(seen, ["presence"], now=101.1) for seen in viewers]
+    assert calls["n"] == 2
+    assert all(out == [("presence", {"value": 1})] for out in second)
+    assert agg.snapshot()["versions"] == {"presence": 2}
+
+    # Nuevo tick con el mismo contenido: se recalcula pero la versión no cambia y no se emite.
+    assert all(agg.changes_since(seen, ["presence"], now=102.2) == [] for seen in viewers)
+    assert calls["n"] == 3
+    assert agg.snapshot()["versions"] == {"presence": 2}
+
+
+def test_volatile_keys_do_not_bump_version(monkeypatch):
+    monkeypatch.setenv("MONITOREO_AGGREGATOR_CLUSTER", "0")
+    ticks = iter(range(100))
+    agg = MonitoreoAggregator(
+        [MonitoreoChannel("summary", 5.0, lambda: {"total": 3, "ts": next(ticks)}, volatile_keys=("ts",))]
+    )
+    seen: dict[str, int] = {}
+    assert len(agg.changes_since(seen, ["summary"], now=0.0)) == 1
+    assert agg.changes_since(seen, ["summary"], now=6.0) == []
+    assert agg.peek("summary") == {"total": 3, "ts": 1}
+
+
+def test_log_tail_is_shared_and_falls_back_for_old_cursors(monkeypatch):
+    monkeypatch.setenv("MONITOREO_AGGREGATOR_CLUSTER", "0")
+    fetches: list[int] = []
+    rows = {"data": [(11, "a"), (12, "b")]}
+
+    def _fetch(after_id: int):
+        fetches.append(after_id)
+        return [r for r in rows["data"] if r[0] > after_id]
+
+    agg = MonitoreoAggregator(log_buffer_size=10)
+    assert agg.logs_after(10, fetch_after=_fetch, now=1.0) == [(11, "a"), (12, "b")]
+    assert agg.logs_after(11, fetch_after=_fetch, now=1.2) == [(12, "b")]
+    assert fetches == [10]
+
+    rows["data"].append((13, "c"))
+    assert agg.logs_after(12, fetch_after=_fetch, now=2.5) == [(13, "c")]
+    assert fetches == [10, 12]
+    assert agg.logs_after(5, fetch_after=_fetch, now=2.6) is None
+
+
+def test_snapshot_reports_queries_per_viewer_against_legacy_estimate(monkeypatch):
+    monkeypatch.setenv("MONITOREO_AGGREGATOR_CLUSTER", "0")
+
+    def _compute():
+        db.session.execute(text("SELECT 1")).scalar()
+        db.session.execute(text("SELECT 2")).scalar()
+        return {"ok": True}
+
+    agg = MonitoreoAggregator([MonitoreoChannel("operations", 2.0, _compute)])
+    with flask_app.app_context():
+        for _ in range(4):
+            agg.viewer_opened()
+        for _ in range(4):
+            agg.refresh("operations", now=50.0)
+    snap = agg.snapshot()
+    assert snap["viewers"] == 4
+    assert snap["computes"] == 1
+    assert snap["cache_hits"] == 3
+    assert snap["db_queries"] == 2
+    assert snap["queries_per_compute"] == {"operations": 2.0}
+    assert snap["legacy_db_queries_per_min_per_viewer"] == 60.0
+
+    # Fuera del cálculo no se cuenta nada.
+    with flask_app.app_context():
+        db.session.execute(text("SELECT 3")).scalar()
+    assert agg.snapshot()["db_queries"] == 2
+
+
+def test_lease_held_by_another_process_is_not_released(monkeypatch):
+    monkeypatch.setenv("MONITOREO_AGGREGATOR_CLUSTER", "1")
+    store: dict[str, object] = {"monitoreo:agg:v1:presence:lease": 4242}
+
+    def _bp_add(key, value, timeout=None, context=None):
+        if key in store:
+            return False
+        store[key] = value
+        return True
+
+    monkeypatch.setattr(monitoreo_aggregator, "bp_add", _bp_add)
+    monkeypatch.setattr(monitoreo_aggregator, "bp_get", lambda key, default=None, context=None: store.get(key, default))
+    monkeypatch.setattr(monitoreo_aggregator, "bp_set", lambda key, value, timeout=None, context=None: store.__setitem__(key, value))
+    monkeypatch.setattr(monitoreo_aggregator, "bp_delete", lambda key, context=None: store.pop(key, None))
+
+    agg = MonitoreoAggregator([MonitoreoChannel("presence", 1.0, lambda: {"n": 1})])
+    assert agg.refresh("presence", now=10.0).payload == {"n": 1}
+    assert store["monitoreo:agg:v1:presence:lease"] == 4242
+
+    del store["monitoreo:agg:v1:presence:lease"]
+    agg.refresh("presence", now=20.0)
+    assert "monitoreo:agg:v1:presence:lease" not in store
+
+
+def test_cluster_mode_reuses_payload_published_by_another_process(monkeypatch):
+    monkeypatch.setenv("MONITOREO_AGGREGATOR_CLUSTER", "1")
+    calls = {"a": 0, "b": 0}
+
+    def _make(key):
+        def _compute():
+            calls[key] += 1
+            return {"from": key}
+        return _compute
+
+    name = "cluster_test_channel"
+    with flask_app.app_context():
+        proc_a = MonitoreoAggregator([MonitoreoChannel(name, 30.0, _make("a"))])
+        proc_b = MonitoreoAggregator([MonitoreoChannel(name, 30.0, _make("b"))])
+        now = time.time()
+        assert proc_a.changes_since({}, [name], now=now) == [(name, {"from": "a"})]
+        out_b = proc_b.changes_since({}, [name], now=now + 0.1)
+    if proc_b.snapshot()["backplane_hits"]:
+        assert out_b == [(name, {"from": "a"})]
+        assert calls == {"a": 1, "b": 0}
+    else:
+        # Sin backplane compartido (cache nula) cada proceso calcula por su cuenta.
+        assert out_b == [(name, {"from": "b"})]
+
+
+def test_monitoreo_stream_stats_endpoint_is_admin_json():
+    flask_app.config["TESTING"] = True
+    flask_app.config["WTF_CSRF_ENABLED"] = False
+    client = flask_app.test_client()
+    assert _login(client).status_code in (302, 303)
+
+    resp = client.get("/admin/monitoreo/stream/stats.json")
+    assert resp.status_code == 200
+    payload = resp.get_json() or {}
+    assert set(payload["versions"]) == {"presence", "summary", "operations", "activity"}
+    assert "db_queries_per_min_per_viewer" in payload
+    assert "legacy_db_queries_per_min_per_viewer" in payload
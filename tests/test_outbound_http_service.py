@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import app as flask_app
+import services.outbound_http_service as outbound_http
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    peers: set = set()
+    status = 200
+    delay = 0.0
+    calls = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        return
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        with self.lock:
+            type(self).calls += 1
+            type(self).peers.add(self.client_address)
+        if self.delay:
+            time.sleep(self.delay)
+        raw = json.dumps({"echo": body}).encode("utf-8")
+        self.send_response(self.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+@pytest.fixture
+def stub_url(monkeypatch):
+    _StubHandler.peers = set()
+    _StubHandler.status = 200
+    _StubHandler.delay = 0.0
+    _StubHandler.calls = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    outbound_http.reset_clients()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    outbound_http.reset_clients()
+    server.shutdown()
+    server.server_close()
+
+
+def test_keep_alive_reuses_connection_and_records_latency(stub_url):
+    with flask_app.app_context():
+        for i in range(5):
+            resp = outbound_http.post("openai", f"{stub_url}/v1/chat/completions", endpoint="chat_completions", json={"n": i}, timeout=2)
+            assert resp.json() == {"echo": {"n": i}}
+        metrics = outbound_http.outbound_http_metrics()
+
+    assert _StubHandler.calls == 5
+    assert len(_StubHandler.peers) == 1
+    hist = metrics["providers"]["openai"]["endpoints"]["chat_completions"]
+    assert hist["total"] == 5
+    assert sum(hist["counts"]) == 5
+    assert hist["errors"] == 0
+
+
+def test_breaker_opens_on_5xx_fails_fast_and_recovers(stub_url, monkeypatch):
+    monkeypatch.setenv("OUTBOUND_HTTP_BREAKER_FAILURES", "3")
+    monkeypatch.setenv("OUTBOUND_HTTP_BREAKER_COOLDOWN_SECONDS", "0.2")
+    _StubHandler.status = 503
+    url = f"{stub_url}/v23.0/123/messages"
+    for _ in range(3):
+        assert outbound_http.post("whatsapp", url, endpoint="messages", json={}, timeout=2).status_code == 503
+
+    with pytest.raises(outbound_http.CircuitOpenError):
+        outbound_http.post("whatsapp", url, endpoint="messages", json={}, timeout=2)
+    assert _StubHandler.calls == 3
+    client = outbound_http.get_client("whatsapp")
+    assert client.breaker.state == "open"
+    # Los errores propios son errores de red para quien ya los mapea.
+    assert issubclass(outbound_http.CircuitOpenError, outbound_http.requests.ConnectionError)
+
+    time.sleep(0.25)
+    _StubHandler.status = 200
+    assert outbound_http.post("whatsapp", url, endpoint="messages", json={}, timeout=2).status_code == 200
+    assert client.breaker.state == "closed"
+    snap = client.snapshot()
+    assert snap["breaker_opened_total"] == 1
+    assert snap["breaker_rejected_total"] == 1
+    assert snap["endpoints"]["messages"]["errors"] == 3
+
+
+def test_concurrency_cap_and_post_concurrently(stub_url, monkeypatch):
+    monkeypatch.setenv("OUTBOUND_HTTP_WHATSAPP_MAX_CONCURRENCY", "2")
+    url = f"{stub_url}/v23.0/123/messages"
+    client = outbound_http.get_client("whatsapp")
+
+    # Con los 2 cupos ocupados y 50 ms de espera por cupo, la llamada no entra.
+    assert client.slots.acquire(timeout=1) and client.slots.acquire(timeout=1)
+    try:
+        results = outbound_http.post_concurrently("whatsapp", [{"url": url, "endpoint": "messages", "json": {}, "timeout": 0.05}])
+    finally:
+        client.slots.release()
+        client.slots.release()
+    assert isinstance(results[0], outbound_http.ProviderBusyError)
+    assert _StubHandler.calls == 0
+    assert client.breaker.state == "closed"
+
+    _StubHandler.delay = 0.05
+    calls = [{"url": url, "endpoint": "messages", "json": {"n": i}, "timeout": 2} for i in range(6)]
+    started = time.perf_counter()
+    results = outbound_http.post_concurrently("whatsapp", calls)
+    elapsed = time.perf_counter() - started
+    assert [r.json()["echo"]["n"] for r in results] == list(range(6))
+    assert elapsed < 6 * 0.05
+
+
+def test_slot_wait_has_its_own_budget_and_comes_out_of_the_request_timeout(stub_url, monkeypatch):
+    monkeypatch.setenv("OUTBOUND_HTTP_WHATSAPP_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("OUTBOUND_HTTP_WHATSAPP_QUEUE_WAIT_SECONDS", "0.1")
+    url = f"{stub_url}/v23.0/123/messages"
+    client = outbound_http.get_client("whatsapp")
+
+    # Sin cupo: falla al agotar la espera corta, no el timeout de 5 s de la petición.
+    assert client.slots.acquire(timeout=1)
+    started = time.perf_counter()
+    try:
+        with pytest.raises(outbound_http.ProviderBusyError):
+            client.post(url, endpoint="messages", json={}, timeout=5)
+    finally:
+        client.slots.release()
+    assert time.perf_counter() - started < 1.0
+
+    seen = []
+    real_post = client.session.post
+    monkeypatch.setattr(client.session, "post", lambda u, timeout, **kw: seen.append(timeout) or real_post(u, timeout=timeout, **kw))
+    assert client.slots.acquire(timeout=1)
+    threading.Timer(0.05, client.slots.release).start()
+    assert client.post(url, endpoint="messages", json={}, timeout=2).status_code == 200
+    assert 1.8 < seen[0] < 1.96
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+
+from app import app as flask_app
+from config_app import cache, db
+from models import DomainOutbox, DomainOutboxArchive, OutboxConsumerReceipt
+from utils.enterprise_layer import operational_semaphore_payload
+from utils.outbox_retention import (
+    archive_published_outbox,
+    load_archived_record,
+    outbox_status_counters,
+    prune_consumer_receipts,
+    refresh_outbox_status_counters,
+)
+from utils.timezone import utc_now_naive
+
+
+def _rebuild_tables():
+    for model in (DomainOutbox, DomainOutboxArchive, OutboxConsumerReceipt):
+        model.__table__.drop(bind=db.engine, checkfirst=True)
+        model.__table__.create(bind=db.engine, checkfirst=True)
+    cache.clear()
+
+
+def _new_outbox(*, row_id: int, relay_status: str = "published", published_days_ago: int | None = 10) -> None:
+    now = utc_now_naive()
+    published_at = now - timedelta(days=published_days_ago) if published_days_ago is not None else None
+    db.session.add(
+        DomainOutbox(
+            id=int(row_id),
+            event_id=f"evt_ret_{row_id}",
+            event_type="SOLICITUD_ESTADO_CAMBIADO",
+            aggregate_type="Solicitud",
+            aggregate_id=str(7000 + int(row_id)),
+            aggregate_version=1,
+            occurred_at=now,
+            actor_id="staff:1",
+            region="admin",
+            payload={"solicitud_id": 7000 + int(row_id), "to": "activa"},
+            schema_version=1,
+            published_attempts=1,
+            relay_status=relay_status,
+            created_at=(published_at or now),
+            published_at=published_at,
+        )
+    )
+    db.session.commit()
+
+
+def test_archive_moves_old_published_rows_and_keeps_full_record():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _rebuild_tables()
+        for rid in (1, 2, 3):
+            _new_outbox(row_id=rid, published_days_ago=10)
+        _new_outbox(row_id=4, published_days_ago=1)
+        _new_outbox(row_id=5, relay_status="pending", published_days_ago=None)
+
+        stats = archive_published_outbox(older_than_days=7, batch_size=2)
+
+        assert stats["archived"] == 3
+        assert stats["batches"] == 2
+        assert sorted(r.id for r in DomainOutbox.query.all()) == [4, 5]
+        archived = DomainOutboxArchive.query.order_by(DomainOutboxArchive.id.asc()).all()
+        assert [r.event_id for r in archived] == ["evt_ret_1", "evt_ret_2", "evt_ret_3"]
+        record = load_archived_record(archived[0].record_gz)
+        assert record["event_id"] == "evt_ret_1"
+        assert record["payload"] == {"solicitud_id": 7001, "to": "activa"}
+        assert record["relay_status"] == "published"
+
+
+def test_prune_consumer_receipts_only_removes_expired():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _rebuild_tables()
+        now = utc_now_naive()
+        for idx, days in enumerate((40, 35, 2)):
+            db.session.add(
+                OutboxConsumerReceipt(
+                    id=idx + 1,
+                    consumer_name="internal_operational_notifications",
+                    event_id=f"evt_rcpt_{idx}",
+                    processed_at=now - timedelta(days=days),
+                )
+            )
+        db.session.commit()
+
+        assert prune_consumer_receipts(older_than_days=30) == 2
+        assert [r.event_id for r in OutboxConsumerReceipt.query.all()] == ["evt_rcpt_2"]
+
+
+def test_status_counters_snapshot_feeds_semaphore():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _rebuild_tables()
+        _new_outbox(row_id=1, relay_status="pending", published_days_ago=None)
+        _new_outbox(row_id=2, relay_status="retrying", published_days_ago=None)
+        _new_outbox(row_id=3, relay_status="quarantined", published_days_ago=None)
+        _new_outbox(row_id=4, published_days_ago=1)
+        assert outbox_status_counters() is None
+
+        counters = refresh_outbox_status_counters()
+        assert {k: counters[k] for k in ("backlog", "pending", "retrying", "quarantined")} == {
+            "backlog": 3,
+            "pending": 1,
+            "retrying": 1,
+            "quarantined": 1,
+        }
+        assert outbox_status_counters()["backlog"] == 3
+
+        # El semáforo usa el snapshot (no la tabla) mientras está fresco.
+        _new_outbox(row_id=5, relay_status="pending", published_days_ago=None)
+        payload = operational_semaphore_payload(include_trends=False)
+        metrics = payload.get("metrics") or {}
+        assert metrics["outbox_backlog_pending"] == 3
+        cache.clear()
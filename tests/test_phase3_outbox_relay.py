@@ -1,15 +1,28 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import json
 from datetime import timedelta
+from unittest.mock import patch
 
+import utils.outbox_relay as outbox_relay_mod
 from app import app as flask_app
 from config_app import db
-from models import DomainOutbox, OutboxConsumerReceipt, StaffNotificacion
+from models import (
+    DOMAIN_OUTBOX_PARTITIONS,
+    DomainOutbox,
+    OutboxConsumerReceipt,
+    StaffNotificacion,
+    domain_outbox_partition,
+)
 from utils.outbox_relay import (
+    OutboxRelayWakeup,
+    RelayPartitionCoordinator,
     _consume_internal_operational_notification,
     _event_envelope,
+    partition_owner,
     relay_pending_once,
+    run_relay_loop,
 )
 from utils.timezone import utc_now_naive
 
@@ -28,6 +41,42 @@ class _RedisFailStub:
         raise RuntimeError("redis_down")
 
 
+class _PipelineStub:
+    def __init__(self, owner):
+        self.owner = owner
+        self.queued = []
+
+    def xadd(self, stream, fields):
+        self.queued.append((stream, fields))
+        return self
+
+    def execute(self, raise_on_error=True):
+        self.owner.executes += 1
+        out = []
+        for stream, fields in self.queued:
+            if self.owner.fail_event_type and self.owner.fail_event_type in fields["event"]:
+                out.append(RuntimeError("xadd_rejected"))
+            else:
+                self.owner.calls.append((stream, fields))
+                out.append(f"{len(self.owner.calls)}-0")
+        self.queued = []
+        return out
+
+
+class _RedisPipelineStub:
+    def __init__(self, fail_event_type: str = ""):
+        self.calls = []
+        self.executes = 0
+        self.fail_event_type = fail_event_type
+
+    def pipeline(self, transaction=True):
+        assert transaction is False
+        return _PipelineStub(self)
+
+    def xadd(self, stream, fields):
+        raise AssertionError("el relay debe publicar por pipeline")
+
+
 def _ensure_tables():
     DomainOutbox.__table__.drop(bind=db.engine, checkfirst=True)
     DomainOutbox.__table__.create(bind=db.engine, checkfirst=True)
@@ -46,7 +95,7 @@ def _new_outbox(event_type: str, payload: dict | None = None) -> DomainOutbox:
     next_id = int(db.session.query(db.func.max(DomainOutbox.id)).scalar() or 0) + 1
     row = DomainOutbox(
         id=next_id,
-        event_id=f"evt_{event_type}_{utc_now_naive().timestamp()}",
+        event_id=f"evt_{event_type}_{next_id}_{utc_now_naive().timestamp()}",
         event_type=event_type,
         aggregate_type="Solicitud",
         aggregate_id="101",
@@ -244,3 +293,385 @@ def test_relay_excludes_events_outside_initial_catalog():
         assert m.published_at is None
         assert c.published_at is None
         assert len(redis_stub.calls) == 1
+
+
+def test_relay_batch_publishes_through_one_pipeline_and_marks_all_rows():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        rows = [_new_aggregate_outbox(str(100 + i)) for i in range(5)]
+        redis_stub = _RedisPipelineStub()
+
+        stats = relay_pending_once(redis_client=redis_stub, stream_key="sys:test:v1")
+
+        assert stats["picked"] == 5
+        assert stats["published"] == 5
+        assert stats["failed"] == 0
+        assert stats["lag_ms_max"] >= 0
+        assert redis_stub.executes == 1
+        published_ids = [json.loads(fields["event"])["event_id"] for _stream, fields in redis_stub.calls]
+        assert published_ids == [row.event_id for row in rows]
+        for row in rows:
+            refreshed = db.session.get(DomainOutbox, row.id)
+            assert refreshed.published_at is not None
+            assert refreshed.relay_status == "published"
+            assert int(refreshed.published_attempts or 0) == 1
+        assert db.session.query(StaffNotificacion).count() == 5
+
+
+def test_relay_batch_retries_only_rows_rejected_by_pipeline():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        ok_row = _new_outbox("SOLICITUD_ESTADO_CAMBIADO")
+        bad_row = _new_outbox("REEMPLAZO_ABIERTO", {"solicitud_id": 101, "reemplazo_id": 9})
+
+        stats = relay_pending_once(
+            redis_client=_RedisPipelineStub(fail_event_type="REEMPLAZO_ABIERTO"),
+            stream_key="sys:test:v1",
+        )
+
+        assert stats["published"] == 1
+        assert stats["failed"] == 1
+        ok = db.session.get(DomainOutbox, ok_row.id)
+        bad = db.session.get(DomainOutbox, bad_row.id)
+        assert ok.relay_status == "published"
+        assert bad.published_at is None
+        assert bad.relay_status == "retrying"
+        assert "xadd_rejected" in str(bad.last_error or "")
+        assert bad.next_retry_at is not None
+
+
+def test_relay_batch_falls_back_per_row_when_consumer_fails():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        ok_row = _new_outbox("SOLICITUD_ESTADO_CAMBIADO")
+        bad_row = _new_outbox("REEMPLAZO_CANCELADO", {"solicitud_id": 101, "reemplazo_id": 55})
+        real_consumer = _consume_internal_operational_notification
+
+        def _consumer(event, row):
+            if event["event_type"] == "REEMPLAZO_CANCELADO":
+                raise RuntimeError("consumer_down")
+            return real_consumer(event, row)
+
+        with patch.object(
+            outbox_relay_mod,
+            "_consume_internal_operational_notifications",
+            side_effect=RuntimeError("batch_consumer_down"),
+        ), patch.object(outbox_relay_mod, "_consume_internal_operational_notification", side_effect=_consumer):
+            stats = relay_pending_once(redis_client=_RedisPipelineStub(), stream_key="sys:test:v1")
+
+        assert stats["published"] == 1
+        assert stats["failed"] == 1
+        assert db.session.get(DomainOutbox, ok_row.id).relay_status == "published"
+        bad = db.session.get(DomainOutbox, bad_row.id)
+        assert bad.relay_status == "retrying"
+        assert "consumer_down" in str(bad.last_error or "")
+        assert db.session.query(OutboxConsumerReceipt).count() == 1
+
+
+def test_run_relay_loop_reports_throughput_and_lag():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        _new_outbox("SOLICITUD_ESTADO_CAMBIADO")
+        _new_outbox("SOLICITUD_PAGO_REGISTRADO", {"solicitud_id": 101, "estado": "pagada"})
+
+        with patch.object(outbox_relay_mod, "_redis_client", return_value=_RedisPipelineStub()):
+            summary = run_relay_loop(once=True, stream_key="sys:test:v1")
+
+        assert summary["cycles"] == 1
+        assert summary["published"] == 2
+        assert summary["mode"] == "poll"
+        assert summary["events_per_sec"] > 0
+        assert summary["lag_ms_avg"] >= 0
+        assert summary["lag_ms_max"] >= summary["lag_ms_avg"]
+
+
+def test_relay_wakeup_without_postgres_falls_back_to_polling():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        wakeup = OutboxRelayWakeup(db.engine)
+        assert wakeup.start() == "poll"
+        assert wakeup.wait(0.0) is False
+        wakeup.close()
+
+
+def test_batch_consumer_skips_events_with_existing_receipt():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        seen_row = _new_outbox("SOLICITUD_ESTADO_CAMBIADO")
+        new_row = _new_outbox("SOLICITUD_PAGO_REGISTRADO", {"solicitud_id": 102, "estado": "pagada"})
+        _consume_internal_operational_notification(_event_envelope(seen_row), seen_row)
+        db.session.commit()
+
+        stats = relay_pending_once(redis_client=_RedisPipelineStub(), stream_key="sys:test:v1")
+
+        assert stats["published"] == 2
+        assert db.session.query(OutboxConsumerReceipt).count() == 2
+        assert db.session.query(StaffNotificacion).count() == 2
+        assert db.session.get(DomainOutbox, new_row.id).relay_status == "published"
+
+
+def _new_aggregate_outbox(aggregate_id: str, **overrides) -> DomainOutbox:
+    next_id = int(db.session.query(db.func.max(DomainOutbox.id)).scalar() or 0) + 1
+    values = dict(
+        id=next_id,
+        event_id=f"evt_part_{next_id}",
+        event_type="SOLICITUD_ESTADO_CAMBIADO",
+        aggregate_type="Solicitud",
+        aggregate_id=aggregate_id,
+        aggregate_version=next_id,
+        occurred_at=utc_now_naive(),
+        payload={"solicitud_id": int(aggregate_id)},
+        schema_version=1,
+        created_at=utc_now_naive() + timedelta(microseconds=next_id),
+    )
+    values.update(overrides)
+    row = DomainOutbox(**values)
+    db.session.add(row)
+    db.session.commit()
+    return row
+
+
+def test_outbox_rows_get_stable_partition_and_relay_claims_only_owned_partitions():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        rows = [_new_aggregate_outbox(str(200 + i)) for i in range(12)]
+        for row in rows:
+            assert row.relay_partition == domain_outbox_partition("Solicitud", row.aggregate_id)
+        owned = {rows[0].relay_partition, rows[1].relay_partition}
+        redis_stub = _RedisPipelineStub()
+
+        stats = relay_pending_once(redis_client=redis_stub, stream_key="sys:test:v1", partitions=owned)
+
+        expected = {r.id for r in rows if r.relay_partition in owned}
+        published = {
+            r.id for r in DomainOutbox.query.filter(DomainOutbox.published_at.isnot(None)).all()
+        }
+        assert stats["published"] == len(expected)
+        assert published == expected
+        assert relay_pending_once(redis_client=redis_stub, stream_key="sys:test:v1", partitions=set())["picked"] == 0
+
+
+def test_relay_keeps_per_aggregate_order_behind_event_in_backoff():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        now = utc_now_naive()
+        first = _new_aggregate_outbox(
+            "301", relay_status="retrying", published_attempts=1, next_retry_at=now + timedelta(minutes=5)
+        )
+        second = _new_aggregate_outbox("301")
+        other = _new_aggregate_outbox("302")
+        poisoned = _new_aggregate_outbox("303", relay_status="quarantined", quarantined_at=now)
+        after_poison = _new_aggregate_outbox("303")
+
+        stats = relay_pending_once(redis_client=_RedisPipelineStub(), stream_key="sys:test:v1")
+
+        assert stats["published"] == 2
+        assert db.session.get(DomainOutbox, second.id).published_at is None
+        assert db.session.get(DomainOutbox, other.id).published_at is not None
+        assert db.session.get(DomainOutbox, after_poison.id).published_at is not None
+        assert db.session.get(DomainOutbox, poisoned.id).published_at is None
+
+        db.session.get(DomainOutbox, first.id).next_retry_at = now - timedelta(seconds=1)
+        db.session.commit()
+        redis_stub = _RedisPipelineStub()
+        relay_pending_once(redis_client=redis_stub, stream_key="sys:test:v1")
+        order = [json.loads(fields["event"])["event_id"] for _stream, fields in redis_stub.calls]
+        assert order == [first.event_id, second.event_id]
+
+
+def test_relay_defers_rest_of_aggregate_after_middle_xadd_fails():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        before = _new_aggregate_outbox("501")
+        failing = _new_aggregate_outbox("501", event_type="REEMPLAZO_ABIERTO", payload={"solicitud_id": 501, "reemplazo_id": 1})
+        after = _new_aggregate_outbox("501")
+        other = _new_aggregate_outbox("502")
+
+        redis_stub = _RedisPipelineStub(fail_event_type="REEMPLAZO_ABIERTO")
+        stats = relay_pending_once(redis_client=redis_stub, stream_key="sys:test:v1")
+
+        assert stats["published"] == 2
+        assert stats["failed"] == 1
+        assert stats["deferred"] == 1
+        # Una oleada por posición dentro del agregado; el siguiente al fallido nunca llega al stream.
+        assert redis_stub.executes == 2
+        order = [json.loads(fields["event"])["event_id"] for _stream, fields in redis_stub.calls]
+        assert order == [before.event_id, other.event_id]
+        assert db.session.get(DomainOutbox, before.id).published_at is not None
+        assert db.session.get(DomainOutbox, other.id).published_at is not None
+        assert db.session.get(DomainOutbox, failing.id).relay_status == "retrying"
+        # El siguiente del agregado sigue pendiente (sin error propio) detrás del que falló.
+        deferred = db.session.get(DomainOutbox, after.id)
+        assert deferred.published_at is None
+        assert deferred.last_error is None
+
+        db.session.get(DomainOutbox, failing.id).next_retry_at = utc_now_naive() - timedelta(seconds=1)
+        db.session.commit()
+        redis_stub = _RedisPipelineStub()
+        relay_pending_once(redis_client=redis_stub, stream_key="sys:test:v1")
+        order = [json.loads(fields["event"])["event_id"] for _stream, fields in redis_stub.calls]
+        assert order == [failing.event_id, after.event_id]
+
+
+def test_relay_renews_partition_lease_and_stops_if_it_was_lost():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        from config_app import cache
+
+        _ensure_tables()
+        _reset_tables()
+        cache.clear()
+        row = _new_aggregate_outbox("601")
+        coordinator = RelayPartitionCoordinator(worker_id="relay-a")
+        coordinator.heartbeat()
+        assert row.relay_partition in coordinator.owned
+
+        calls = []
+        stats = relay_pending_once(
+            redis_client=_RedisPipelineStub(),
+            stream_key="sys:test:v1",
+            partitions=coordinator.owned,
+            renew_lease=lambda: calls.append(1) or coordinator.renew(),
+        )
+        assert stats["published"] == 1
+        assert calls and coordinator.stats["renewals"] == 1
+
+        # Otro worker se quedó con la partición: el lote se suelta sin publicar.
+        row = _new_aggregate_outbox("601")
+        cache.set(outbox_relay_mod._lease_key(row.relay_partition), "relay-b", timeout=60)
+        coordinator._next_renew = 0.0
+        redis_stub = _RedisPipelineStub()
+        stats = relay_pending_once(
+            redis_client=redis_stub,
+            stream_key="sys:test:v1",
+            partitions=coordinator.owned,
+            renew_lease=coordinator.renew,
+        )
+        assert stats["picked"] == 1 and stats["deferred"] == 1 and stats["published"] == 0
+        assert redis_stub.calls == []
+        assert row.relay_partition not in coordinator.owned
+        assert db.session.get(DomainOutbox, row.id).published_at is None
+        coordinator.leave()
+        cache.clear()
+
+
+def test_partition_coordinators_split_partitions_and_rebalance_on_leave():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        from config_app import cache
+
+        cache.clear()
+        a = RelayPartitionCoordinator(worker_id="relay-a")
+        b = RelayPartitionCoordinator(worker_id="relay-b")
+        a.heartbeat()
+        b.heartbeat()
+        # a soltó lo que ahora le toca a b; b lo toma en su siguiente latido.
+        a.heartbeat()
+        b.heartbeat()
+
+        assert a.owned and b.owned
+        assert not (a.owned & b.owned)
+        assert a.owned | b.owned == set(range(DOMAIN_OUTBOX_PARTITIONS))
+        assert all(partition_owner(p, ["relay-a", "relay-b"]) == "relay-a" for p in a.owned)
+
+        b.leave()
+        a.heartbeat()
+        assert a.owned == set(range(DOMAIN_OUTBOX_PARTITIONS))
+        a.leave()
+        cache.clear()
+
+
+def test_stalled_coordinator_never_overwrites_a_lease_taken_by_another_worker(monkeypatch):
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        from config_app import cache
+
+        cache.clear()
+        a = RelayPartitionCoordinator(worker_id="relay-a")
+        a.heartbeat()
+        assert a.owned == set(range(DOMAIN_OUTBOX_PARTITIONS))
+
+        # a se colgó más que el TTL: b tomó una partición, pero a aún la ve como suya.
+        stale = {p: "relay-a" for p in range(DOMAIN_OUTBOX_PARTITIONS)}
+        monkeypatch.setattr(outbox_relay_mod, "relay_partition_leases", lambda: dict(stale))
+        cache.set(outbox_relay_mod._lease_key(0), "relay-b", timeout=60)
+        a.heartbeat()
+
+        assert cache.get(outbox_relay_mod._lease_key(0)) == "relay-b"
+        assert 0 not in a.owned
+        assert a.owned == set(range(1, DOMAIN_OUTBOX_PARTITIONS))
+        monkeypatch.undo()
+        a.leave()
+        cache.clear()
+
+
+def test_partitions_cli_reports_backlog_per_partition():
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        _reset_tables()
+        row = _new_aggregate_outbox("401")
+        partition = row.relay_partition
+
+    result = flask_app.test_cli_runner().invoke(args=["outbox-relay", "partitions"])
+
+    assert result.exit_code == 0
+    assert f"partitions={DOMAIN_OUTBOX_PARTITIONS}" in result.output
+    assert f"partition={partition} owner=- pending=1 retrying=0" in result.output
+
+
+def test_outbox_insert_notify_runs_once_per_transaction_in_a_savepoint():
+    calls: list[str] = []
+    txn = type("Txn", (), {})()
+
+    class _Savepoint:
+        def __enter__(self):
+            calls.append("savepoint")
+            return self
+
+        def __exit__(self, exc_type, *_exc):
+            calls.append("rollback" if exc_type else "release")
+            return False
+
+    class _Conn:
+        dialect = type("D", (), {"name": "postgresql"})()
+        info: dict = {}
+
+        def __init__(self, fail: bool):
+            self.fail = fail
+
+        def get_transaction(self):
+            return txn
+
+        def begin_nested(self):
+            return _Savepoint()
+
+        def execute(self, *_args, **_kwargs):
+            calls.append("notify")
+            if self.fail:
+                raise RuntimeError("notify failed")
+
+    outbox_relay_mod._notify_outbox_inserted(None, _Conn(fail=True), None)
+    assert calls == ["savepoint", "notify", "rollback"]
+
+    calls.clear()
+    conn = _Conn(fail=False)
+    for _ in range(3):
+        outbox_relay_mod._notify_outbox_inserted(None, conn, None)
+    assert calls == ["savepoint", "notify", "release"]
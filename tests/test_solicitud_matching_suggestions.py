@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import services.solicitud_matching_suggestions as suggestions_mod
+from app import app as flask_app
+from config_app import db
+from models import Candidata, SolicitudMatchingSuggestion
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.runtime_config import reset_schema_cache
+from utils.timezone import utc_now_naive
+
+
+_BASE_FILA = 954000
+_SOLICITUD_ID = 954001
+
+
+@pytest.fixture
+def app_ctx():
+    reset_schema_cache()
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata, SolicitudMatchingSuggestion], reset=False)
+        _purge()
+        yield
+        _purge()
+    reset_schema_cache()
+
+
+def _purge() -> None:
+    db.session.query(SolicitudMatchingSuggestion).filter(
+        SolicitudMatchingSuggestion.solicitud_id == _SOLICITUD_ID
+    ).delete(synchronize_session=False)
+    db.session.query(Candidata).filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def _solicitud(**overrides):
+    values = dict(
+        id=_SOLICITUD_ID,
+        cliente_id=7,
+        horario="8:00 a.m. - 5:00 p.m.",
+        modalidad_trabajo="salida diaria",
+        ciudad_sector="Villa Maria, Santiago",
+        rutas_cercanas="Cienfuegos",
+        funciones=["limpieza"],
+        funciones_otro="",
+        tipo_servicio="DOMESTICA_LIMPIEZA",
+        detalles_servicio={},
+        experiencia="",
+        edad_requerida=[],
+        mascota="no",
+        compat_test_cliente_json=None,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _add(offset: int) -> Candidata:
+    cand = Candidata(
+        fila=_BASE_FILA + offset,
+        nombre_completo=f"Sugerida {offset}",
+        cedula=f"{_BASE_FILA + offset:011d}",
+        codigo=f"SUG-{offset:05d}",
+        direccion_completa="Villa Maria, Santiago",
+    )
+    db.session.add(cand)
+    db.session.commit()
+    return cand
+
+
+def _ranked(cands):
+    return [
+        {
+            "candidate": cand,
+            "score": 90 - i,
+            "operational_score": 90 - i,
+            "bonus_test": 0,
+            "level": "alta",
+            "summary": "Matching operativo (BD): 90%",
+            "risks": [],
+            "breakdown": [{"title": "Ubicacion", "score": 30, "notes": "ok"}],
+            "reasons": ["Ciudad detectada: santiago"],
+            "breakdown_snapshot": {"city_detectada": "santiago", "components": {"final_score": 90 - i}},
+            "meta": {"dt_ms": 1, "pool_size": 2, "prefilter_limit": 250},
+        }
+        for i, cand in enumerate(cands)
+    ]
+
+
+def _store(solicitud, cands, *, version=5, top_k=30):
+    bucket = suggestions_mod._solicitud_bucket(solicitud)
+    suggestions_mod._store_suggestions(
+        [solicitud],
+        {solicitud.id: _ranked(cands)},
+        versions={bucket: version},
+        top_k=top_k,
+    )
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def test_materialized_suggestions_round_trip_with_candidates(app_ctx):
+    cands = [_add(1), _add(2)]
+    solicitud = _solicitud()
+    _store(solicitud, cands)
+
+    with patch.object(suggestions_mod, "current_pool_version", return_value=5):
+        rows = suggestions_mod.load_matching_suggestions(solicitud, top_k=30)
+
+    assert [row["candidate"].fila for row in rows] == [_BASE_FILA + 1, _BASE_FILA + 2]
+    assert rows[0]["score"] == 90
+    assert rows[0]["breakdown_snapshot"]["city_detectada"] == "santiago"
+    assert rows[1]["meta"]["pool_size"] == 2
+
+
+def test_materialized_suggestions_are_not_served_when_stale(app_ctx):
+    cands = [_add(1), _add(2)]
+    solicitud = _solicitud()
+    _store(solicitud, cands, top_k=2)
+
+    with patch.object(suggestions_mod, "current_pool_version", return_value=6):
+        assert suggestions_mod.load_matching_suggestions(solicitud, top_k=2) is None
+    with patch.object(suggestions_mod, "current_pool_version", return_value=None):
+        assert suggestions_mod.load_matching_suggestions(solicitud, top_k=2) is None
+    with patch.object(suggestions_mod, "current_pool_version", return_value=5):
+        assert suggestions_mod.load_matching_suggestions(_solicitud(horario="medio_tiempo"), top_k=2) is None
+        # Se guardó un top-2 con el pool lleno: no alcanza para pedir 10.
+        assert suggestions_mod.load_matching_suggestions(solicitud, top_k=10) is None
+        assert len(suggestions_mod.load_matching_suggestions(solicitud, top_k=1)) == 1
+
+        db.session.query(SolicitudMatchingSuggestion).filter_by(solicitud_id=_SOLICITUD_ID).update(
+            {"computed_at": utc_now_naive() - timedelta(days=3)}
+        )
+        db.session.commit()
+        assert suggestions_mod.load_matching_suggestions(solicitud, top_k=2) is None
+
+
+def test_materialized_suggestions_drop_when_candidate_is_gone(app_ctx):
+    cands = [_add(1), _add(2)]
+    solicitud = _solicitud()
+    _store(solicitud, cands)
+    db.session.query(Candidata).filter_by(fila=_BASE_FILA + 2).delete(synchronize_session=False)
+    db.session.commit()
+
+    with patch.object(suggestions_mod, "current_pool_version", return_value=5):
+        assert suggestions_mod.load_matching_suggestions(solicitud, top_k=30) is None
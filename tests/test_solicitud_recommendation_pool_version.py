@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+import services.solicitud_recommendation_pool_version as pool_mod
+from app import app as flask_app
+from config_app import db
+from models import Candidata, Cliente, Entrevista, Solicitud, SolicitudCandidata
+from tests.t1_testkit import ensure_sqlite_compat_tables
+
+
+_BASE_FILA = 950000
+
+
+def _purge() -> None:
+    SolicitudCandidata.query.filter(
+        SolicitudCandidata.candidata_id >= _BASE_FILA, SolicitudCandidata.candidata_id < _BASE_FILA + 100
+    ).delete(synchronize_session=False)
+    Entrevista.query.filter(Entrevista.candidata_id >= _BASE_FILA, Entrevista.candidata_id < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    Candidata.query.filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+@pytest.fixture
+def app_ctx():
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Cliente, Solicitud, Candidata, Entrevista, SolicitudCandidata], reset=False)
+        _purge()
+        yield
+        _purge()
+
+
+def _versions() -> dict[str, int | None]:
+    return {b: pool_mod.current_pool_version(b) for b in ("*", "santiago", "moca")}
+
+
+def _add(offset: int, *, estado: str, direccion: str) -> Candidata:
+    fila = _BASE_FILA + offset
+    cand = Candidata(
+        fila=fila,
+        nombre_completo=f"Pool {offset}",
+        cedula=f"{fila:011d}",
+        codigo=f"POOL-{offset:05d}",
+        estado=estado,
+        direccion_completa=direccion,
+    )
+    db.session.add(cand)
+    db.session.commit()
+    return cand
+
+
+def test_versions_move_only_for_touched_city_and_pool_states(app_ctx):
+    before = _versions()
+    cand = _add(1, estado="lista_para_trabajar", direccion="Santiago, Cienfuegos")
+    after = _versions()
+    assert after["*"] > before["*"] and after["santiago"] > before["santiago"]
+    assert after["moca"] == before["moca"]
+
+    # Fuera de los estados del pool no mueve nada.
+    _add(2, estado="en_proceso", direccion="Moca")
+    assert _versions() == after
+
+    # Mudanza: se mueven el bucket viejo y el nuevo.
+    cand.direccion_completa = "Moca centro"
+    db.session.commit()
+    moved = _versions()
+    assert moved["santiago"] > after["santiago"] and moved["moca"] > after["moca"]
+
+    db.session.add(Entrevista(candidata_id=cand.fila))
+    db.session.commit()
+    assert _versions()["moca"] > moved["moca"]
+
+
+def test_rollback_discards_pending_bumps(app_ctx):
+    before = _versions()
+    db.session.add(
+        Candidata(
+            fila=_BASE_FILA + 3,
+            nombre_completo="Pool rollback",
+            cedula=f"{_BASE_FILA + 3:011d}",
+            codigo="POOL-00003",
+            estado="inscrita",
+        )
+    )
+    db.session.flush()
+    db.session.rollback()
+    assert _versions() == before
+
+
+def test_solicitud_candidata_writes_move_the_candidata_buckets(app_ctx):
+    cand = _add(4, estado="lista_para_trabajar", direccion="Moca")
+    before = _versions()
+    # Enviar la candidata a otra solicitud cambia blocked_other_client/asignación activa del top-k materializado.
+    link = SolicitudCandidata(solicitud_id=1, candidata_id=cand.fila, status="enviada")
+    db.session.add(link)
+    db.session.commit()
+    sent = _versions()
+    assert sent["moca"] > before["moca"] and sent["*"] > before["*"]
+    assert sent["santiago"] == before["santiago"]
+
+    link.status = "descartada"
+    db.session.commit()
+    rejected = _versions()
+    assert rejected["moca"] > sent["moca"]
+
+    # Un UPDATE masivo no trae filas: se mueven todos los buckets.
+    SolicitudCandidata.query.filter_by(id=link.id).update({"status": "liberada"}, synchronize_session=False)
+    db.session.commit()
+    bulk = _versions()
+    assert bulk["santiago"] > rejected["santiago"] and bulk["moca"] > rejected["moca"]
+
+    db.session.delete(db.session.get(SolicitudCandidata, link.id))
+    db.session.commit()
+    assert _versions()["moca"] > bulk["moca"]
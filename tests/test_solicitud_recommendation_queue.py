@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from app import app as flask_app
+from config_app import db
+from models import (
+    Candidata,
+    Cliente,
+    Solicitud,
+    SolicitudRecommendationItem,
+    SolicitudRecommendationJob,
+    SolicitudRecommendationRun,
+    SolicitudRecommendationSelection,
+)
+from services import solicitud_recommendation_queue as queue_mod
+from services.solicitud_recommendation_service import SolicitudRecommendationService
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.runtime_config import reset_schema_cache
+from utils.timezone import utc_now_naive
+
+
+def _ensure_tables() -> None:
+    ensure_sqlite_compat_tables(
+        [
+            Cliente,
+            Solicitud,
+            Candidata,
+            SolicitudRecommendationRun,
+            SolicitudRecommendationItem,
+            SolicitudRecommendationSelection,
+            SolicitudRecommendationJob,
+        ],
+        reset=True,
+    )
+    reset_schema_cache()
+
+
+def _seed_solicitudes(count: int) -> list[int]:
+    cliente = Cliente(
+        codigo="CL-RQ-01",
+        nombre_completo="Cliente Cola",
+        email="cliente_cola@example.com",
+        telefono="8095552000",
+    )
+    db.session.add(cliente)
+    db.session.flush()
+    ids = []
+    for i in range(count):
+        solicitud = Solicitud(
+            cliente_id=int(cliente.id),
+            codigo_solicitud=f"SOL-RQ-{i:02d}",
+            estado="proceso",
+            modalidad_trabajo="salida diaria",
+            horario="8am-5pm",
+        )
+        db.session.add(solicitud)
+        db.session.flush()
+        ids.append(int(solicitud.id))
+    db.session.commit()
+    return ids
+
+
+def _request_async(solicitud_id: int, trigger_source: str) -> int:
+    run = SolicitudRecommendationService().request_generation(
+        solicitud_id,
+        trigger_source=trigger_source,
+        requested_by="pytest",
+        synchronous=False,
+        commit=True,
+        dispatch_async=True,
+    )
+    return int(run.id)
+
+
+def test_async_request_enqueues_once_and_worker_prefers_interactive_lane(monkeypatch):
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        monkeypatch.setattr("services.solicitud_recommendation_service.candidate_query_prefilter", lambda _s: [])
+        sol_backfill, sol_portal = _seed_solicitudes(2)
+
+        backfill_run = _request_async(sol_backfill, "nightly_precompute")
+        portal_run = _request_async(sol_portal, "cliente_portal_create")
+        # Dedupe por run: re-despachar un job vivo no crea otro.
+        assert SolicitudRecommendationService._dispatch_async_run(portal_run) is True
+
+        jobs = {job.run_id: job for job in SolicitudRecommendationJob.query.all()}
+        assert set(jobs) == {backfill_run, portal_run}
+        assert jobs[backfill_run].lane == "backfill"
+        assert jobs[portal_run].lane == "interactive"
+        assert db.session.get(SolicitudRecommendationRun, portal_run).status == "pending"
+
+        stats = queue_mod.run_queue_once(batch_size=1)
+        assert stats["picked"] == 1 and stats["done"] == 1
+        assert db.session.get(SolicitudRecommendationRun, portal_run).status == "completed"
+        assert db.session.get(SolicitudRecommendationRun, backfill_run).status == "pending"
+
+        summary = queue_mod.run_queue_loop(batch_size=5, until_empty=True)
+        assert summary["done"] == 1
+        assert db.session.get(SolicitudRecommendationRun, backfill_run).status == "completed"
+        assert {job.status for job in SolicitudRecommendationJob.query.all()} == {"done"}
+
+        stats = queue_mod.queue_stats()
+        assert stats["counts"]["interactive"].get("done") == 1
+        assert stats["counts"]["backfill"].get("done") == 1
+
+
+def test_failed_job_retries_with_backoff_then_dies_and_expired_lease_is_reaped(monkeypatch):
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        (solicitud_id,) = _seed_solicitudes(1)
+        run_id = _request_async(solicitud_id, "admin_create")
+
+        def _boom(self, **_kwargs):
+            raise RuntimeError("db_gone")
+
+        monkeypatch.setattr(SolicitudRecommendationService, "generate_snapshot", _boom)
+
+        stats = queue_mod.run_queue_once(max_attempts=2)
+        assert stats["retried"] == 1
+        job = SolicitudRecommendationJob.query.filter_by(run_id=run_id).one()
+        assert job.status == "queued" and job.attempts == 1
+        assert job.available_at > utc_now_naive()
+        assert "db_gone" in (job.last_error or "")
+        assert queue_mod.run_queue_once(max_attempts=2)["picked"] == 0
+
+        job.available_at = utc_now_naive() - timedelta(seconds=1)
+        db.session.commit()
+        assert queue_mod.run_queue_once(max_attempts=2)["dead"] == 1
+        assert SolicitudRecommendationJob.query.filter_by(run_id=run_id).one().status == "dead"
+
+        assert queue_mod.requeue_jobs(all_dead=True) == 1
+        job = SolicitudRecommendationJob.query.filter_by(run_id=run_id).one()
+        job.status = "running"
+        job.attempts = 1
+        job.locked_by = "muerto:1"
+        job.locked_at = utc_now_naive() - timedelta(hours=1)
+        db.session.commit()
+
+        assert queue_mod.reap_expired_leases(lease_seconds=60, max_attempts=3) == 1
+        job = SolicitudRecommendationJob.query.filter_by(run_id=run_id).one()
+        assert job.status == "queued" and job.locked_by is None
+
+
+def test_enqueue_only_flushes_and_lost_race_keeps_caller_transaction(monkeypatch):
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        db.session.execute(
+            db.text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_solicitud_recommendation_jobs_run "
+                "ON solicitud_recommendation_jobs (run_id)"
+            )
+        )
+        sol_a, sol_b = _seed_solicitudes(2)
+        service = SolicitudRecommendationService()
+        run = service.request_generation(
+            sol_a, trigger_source="admin_create", requested_by="pytest", synchronous=False, commit=False, dispatch_async=False
+        )
+        run_id = int(run.id)
+        commits = []
+        monkeypatch.setattr(db.session, "commit", lambda: commits.append(1))
+        assert queue_mod.enqueue_recommendation_run(run_id) is True
+        monkeypatch.undo()
+        assert commits == []
+        assert SolicitudRecommendationJob.query.filter_by(run_id=run_id).count() == 1
+
+        # Otro proceso ya encoló el mismo run: falla solo el savepoint, el run del llamador sigue en su transacción.
+        other = service.request_generation(
+            sol_b, trigger_source="admin_create", requested_by="pytest", synchronous=False, commit=False, dispatch_async=False
+        )
+        other_id = int(other.id)
+        # El SELECT previo "no ve" el job, como si el otro INSERT hubiera llegado justo después.
+        monkeypatch.setattr(type(SolicitudRecommendationJob.query), "first", lambda _self: None)
+        assert queue_mod.enqueue_recommendation_run(run_id) is True
+        monkeypatch.undo()
+        db.session.commit()
+        assert SolicitudRecommendationJob.query.filter_by(run_id=run_id).count() == 1
+        assert db.session.get(SolicitudRecommendationRun, other_id) is not None
+
+
+def test_long_generation_renews_lease_and_reaped_job_is_fenced(monkeypatch):
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        _ensure_tables()
+        (solicitud_id,) = _seed_solicitudes(1)
+        run_id = _request_async(solicitud_id, "admin_create")
+        (job_id,) = queue_mod.claim_jobs(worker_id="w:1")
+        seen = {}
+
+        def _slow(self, **_kwargs):
+            started = db.session.get(SolicitudRecommendationJob, job_id).locked_at
+            time.sleep(0.5)
+            db.session.expire_all()
+            seen["renewed"] = db.session.get(SolicitudRecommendationJob, job_id).locked_at > started
+
+        monkeypatch.setattr(SolicitudRecommendationService, "generate_snapshot", _slow)
+        outcome = queue_mod._process_job(job_id, max_attempts=3, max_backoff_seconds=5, lease_seconds=0.3)
+        assert seen["renewed"] is True
+        assert outcome == "done"
+
+        # Un worker que perdió el lease (reaped y re-reclamado por otro) no pisa el desenlace del nuevo dueño.
+        job = db.session.get(SolicitudRecommendationJob, job_id)
+        job.status = "queued"
+        job.available_at = utc_now_naive() - timedelta(seconds=1)
+        db.session.commit()
+        assert queue_mod.claim_jobs(worker_id="w:1") == [job_id]
+
+        def _reaped_meanwhile(self, **_kwargs):
+            SolicitudRecommendationJob.query.filter_by(id=job_id).update(
+                {"status": "running", "locked_by": "w:2", "attempts": SolicitudRecommendationJob.attempts + 1}
+            )
+            db.session.commit()
+
+        monkeypatch.setattr(SolicitudRecommendationService, "generate_snapshot", _reaped_meanwhile)
+        assert queue_mod._process_job(job_id, max_attempts=3, max_backoff_seconds=5) == "fenced"
+        job = SolicitudRecommendationJob.query.filter_by(run_id=run_id).one()
+        assert job.status == "running" and job.locked_by == "w:2"
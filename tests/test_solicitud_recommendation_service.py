@@ -246,6 +246,12 @@ def test_get_active_shortlist_marks_stale_when_pool_guard_changes(monkeypatch):
             rec_mod.SolicitudRecommendationService._live_pool_guard_snapshot = staticmethod(
                 lambda *, solicitud: ("hash_drift_forzado", expected_count)
             )
+            # Sin cambio de versión del pool ni siquiera se recalcula el hash.
+            fresh_payload = service.get_active_shortlist(int(solicitud.id))
+            assert (fresh_payload.get("state") or {}).get("code") != "stale"
+
+            c1.estado = "inscrita"
+            db.session.commit()
             stale_payload = service.get_active_shortlist(int(solicitud.id))
             assert (stale_payload.get("state") or {}).get("code") == "stale"
         finally:
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import core.services.store_facets as facets_mod
+import public.routes as public_routes
+from app import app as flask_app
+from config_app import db
+from models import Candidata, CandidataWeb
+from tests.t1_testkit import ensure_sqlite_compat_tables
+from utils.store_facets import StoreFacetRow, StoreFilters, compute_store_listing
+
+
+_BASE_FILA = 980000
+_CIUDAD = "Facetopolis"
+
+
+def _row(fila, ciudad, modalidad, tags="", disponible=False, orden=None, ts=0.0):
+    return StoreFacetRow(
+        fila=fila,
+        nombre=f"N{fila}",
+        ciudad=ciudad,
+        sector="",
+        modalidad=modalidad,
+        tags_raw=tags,
+        disponible_inmediato=disponible,
+        orden_lista=orden,
+        actualizado_ts=ts,
+    )
+
+
+def test_listing_orders_pages_and_counts_disjunctive_facets():
+    rows = [
+        _row(1, "Santiago", "Dormida", "cocina, niños", disponible=True, ts=10.0),
+        _row(2, "Santiago", "Salida diaria", "Cocina", ts=30.0),
+        _row(3, "Moca", "Dormida", "limpieza", orden=1, ts=5.0),
+        _row(4, "Moca", "Dormida", "", disponible=True, ts=20.0),
+    ]
+    listing = compute_store_listing(rows, StoreFilters(), page=1, per_page=3)
+    assert listing.total == 4
+    assert listing.page_ids == [3, 2, 4]
+    assert listing.ciudades == [("Moca", 2), ("Santiago", 2)]
+    assert (listing.tags[0][0].casefold(), listing.tags[0][1]) == ("cocina", 2)
+    assert listing.opciones_modalidades == ["Dormida", "Salida diaria"]
+
+    filtered = compute_store_listing(rows, StoreFilters(ciudad="santiago", modalidad="dormida"))
+    assert filtered.total == 1 and filtered.page_ids == [1]
+    # La faceta de ciudad ignora su propio filtro; la de modalidad ignora el suyo.
+    assert dict(filtered.ciudades) == {"Moca": 2, "Santiago": 1}
+    assert dict(filtered.modalidades) == {"Dormida": 1, "Salida diaria": 1}
+    assert filtered.disponible_inmediato == 1
+
+
+@pytest.fixture
+def seeded():
+    with flask_app.app_context():
+        ensure_sqlite_compat_tables([Candidata, CandidataWeb], reset=False)
+        _purge()
+        base = datetime(2026, 1, 1)
+        for i in range(6):
+            fila = _BASE_FILA + i
+            db.session.add(Candidata(fila=fila, nombre_completo=f"Facet {i}", cedula=f"{fila:011d}", codigo=f"FCT-{i}"))
+            db.session.flush()
+            db.session.add(
+                CandidataWeb(
+                    candidata_id=fila,
+                    visible=True,
+                    estado_publico="disponible",
+                    nombre_publico=f"Facet {i}",
+                    ciudad_publica=_CIUDAD,
+                    modalidad_publica="Dormida" if i % 2 else "Salida diaria",
+                    tags_publicos="cocina" if i < 3 else "limpieza",
+                    disponible_inmediato=bool(i % 3 == 0),
+                    fecha_ultima_actualizacion=base + timedelta(hours=i),
+                )
+            )
+        db.session.commit()
+        facets_mod.reset_store_facets_cache()
+        yield
+        _purge()
+        facets_mod.reset_store_facets_cache()
+
+
+def _purge() -> None:
+    CandidataWeb.query.filter(CandidataWeb.candidata_id >= _BASE_FILA, CandidataWeb.candidata_id < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    Candidata.query.filter(Candidata.fila >= _BASE_FILA, Candidata.fila < _BASE_FILA + 100).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+
+
+def test_snapshot_matches_sql_and_is_invalidated_on_commit(seeded):
+    with flask_app.app_context():
+        listing = facets_mod.store_listing(StoreFilters(ciudad=_CIUDAD), per_page=10)
+        assert listing.total == 6
+        assert listing.page_ids == [_BASE_FILA + i for i in range(5, -1, -1)]
+        assert dict(listing.modalidades) == {"Dormida": 3, "Salida diaria": 3}
+
+        version = facets_mod.store_facets_version()
+        ficha = CandidataWeb.query.filter_by(candidata_id=_BASE_FILA + 5).one()
+        ficha.visible = False
+        db.session.commit()
+        assert facets_mod.store_facets_version() > version
+
+        listing = facets_mod.store_listing(StoreFilters(ciudad=_CIUDAD), per_page=10)
+        assert listing.total == 5 and _BASE_FILA + 5 not in listing.page_ids
+
+        # Cambios ajenos a la tienda no invalidan el snapshot.
+        version = facets_mod.store_facets_version()
+        ficha = CandidataWeb.query.filter_by(candidata_id=_BASE_FILA + 1).one()
+        ficha.frase_destacada = "Hola"
+        db.session.commit()
+        assert facets_mod.store_facets_version() == version
+
+
+def test_store_list_route_uses_snapshot_without_full_scans(seeded, monkeypatch):
+    captured = {}
+
+    def _render(template, **ctx):
+        captured.update(ctx, template=template)
+        return "ok"
+
+    monkeypatch.setattr(public_routes, "render_template", _render)
+    client = flask_app.test_client()
+    resp = client.get(f"/domesticas?ciudad={_CIUDAD}&modalidad=Dormida&per_page=12")
+    assert resp.status_code == 200
+    assert captured["total"] == 3
+    assert [c["id"] for c in captured["cards"]] == [_BASE_FILA + 5, _BASE_FILA + 3, _BASE_FILA + 1]
+    assert _CIUDAD in captured["ciudades"]
+    assert dict(captured["facetas"]["modalidades"]) == {"Dormida": 3, "Salida diaria": 3}
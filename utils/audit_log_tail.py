@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Tailing incremental de ``staff_audit_logs`` por entidad.
+
+``log_action`` publica una notificación ligera por cada log insertado
+(``pg_notify`` dentro de la misma transacción en Postgres, más un aviso
+en memoria para los suscriptores del mismo proceso). Los streams de
+monitoreo se suscriben a su entidad y solo consultan la tabla cuando llega
+un aviso para ella: un stream inactivo no ejecuta queries.
+
+Sin Postgres (SQLite en tests/local) no hay ``LISTEN`` entre procesos; el
+tailer queda en modo ``poll`` y las suscripciones despiertan cada
+``poll_interval`` segundos, igual que el polling anterior.
+"""
+from __future__ import annotations
+
+import json
+import os
+import select
+import threading
+from typing import Any
+
+from sqlalchemy import text
+
+
+AUDIT_LOG_NOTIFY_CHANNEL = "staff_audit_log"
+_POLL_INTERVAL_SEC = 2.0
+
+_TAILER_LOCK = threading.Lock()
+_TAILER: "AuditLogTailer | None" = None
+_GLOBAL_LISTENERS: list = []
+
+
+def entity_key(entity_type: str | None, entity_id: str | int | None) -> str:
+    etype = str(entity_type or "").strip().lower()
+    eid = str(entity_id if entity_id is not None else "").strip()
+    if not etype or not eid:
+        return ""
+    return f"{etype}:{eid}"
+
+
+def notify_audit_log_inserted(conn, *, entity_type: str | None, entity_id: str | int | None, log_id: int | None) -> None:
+    """Encola el aviso en la transacción de ``conn`` (Postgres lo entrega al hacer commit).
+
+    Va en un savepoint: en Postgres un statement fallido aborta la transacción
+    y se perdería el log de auditoría que la comparte.
+    """
+    key = entity_key(entity_type, entity_id)
+    if not key:
+        return
+    try:
+        if conn.dialect.name != "postgresql":
+            return
+        payload = json.dumps({"e": key, "id": int(log_id or 0)}, separators=(",", ":"))
+        with conn.begin_nested():
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": AUDIT_LOG_NOTIFY_CHANNEL, "payload": payload})
+    except Exception:
+        return
+
+
+def register_audit_log_listener(fn) -> None:
+    """``fn(key, log_id)`` para todo log notificado (cualquier entidad), local o vía LISTEN."""
+    if fn not in _GLOBAL_LISTENERS:
+        _GLOBAL_LISTENERS.append(fn)
+
+
+def unregister_audit_log_listener(fn) -> None:
+    if fn in _GLOBAL_LISTENERS:
+        _GLOBAL_LISTENERS.remove(fn)
+
+
+def _notify_global_listeners(key: str, log_id: int) -> None:
+    for fn in list(_GLOBAL_LISTENERS):
+        try:
+            fn(key, log_id)
+        except Exception:
+            continue
+
+
+def publish_local(*, entity_type: str | None, entity_id: str | int | None, log_id: int | None) -> None:
+    """Despierta a los suscriptores de este proceso tras el commit del log."""
+    key = entity_key(entity_type, entity_id)
+    if not key:
+        return
+    tailer = _TAILER
+    if tailer is None:
+        _notify_global_listeners(key, int(log_id or 0))
+        return
+    tailer.dispatch(key, int(log_id or 0))
+
+
+class AuditLogSubscription:
+    def __init__(self, tailer: "AuditLogTailer", key: str, *, on_notify=None):
+        self.tailer = tailer
+        self.key = key
+        self.max_id = 0
+        # Despertador extra para quien no bloquea en ``wait`` (ej. el gateway asyncio).
+        self.on_notify = on_notify
+        self._event = threading.Event()
+
+    def notify(self, log_id: int) -> None:
+        self.max_id = max(self.max_id, int(log_id or 0))
+        self._event.set()
+        if self.on_notify is not None:
+            try:
+                self.on_notify()
+            except Exception:
+                pass
+
+    def pending(self) -> bool:
+        """Como ``wait`` sin bloquear: consume el aviso si lo hay (en modo poll siempre ``True``)."""
+        got = self._event.is_set()
+        self._event.clear()
+        return got or self.tailer.mode == "poll"
+
+    def wait(self, timeout: float) -> bool:
+        """``True`` si hay que consultar la tabla (aviso recibido o tick del modo poll)."""
+        if self.tailer.mode == "poll":
+            self._event.wait(timeout=max(0.0, min(float(timeout), self.tailer.poll_interval)))
+            self._event.clear()
+            return True
+        got = self._event.wait(timeout=max(0.0, float(timeout)))
+        self._event.clear()
+        return bool(got)
+
+    def close(self) -> None:
+        self.tailer.unsubscribe(self)
+
+
+class AuditLogTailer:
+    """Registro de suscripciones por entidad y (en Postgres) hilo ``LISTEN`` dedicado."""
+
+    def __init__(self, *, app_obj=None, poll_interval: float = _POLL_INTERVAL_SEC):
+        self.app_obj = app_obj
+        self.poll_interval = float(poll_interval)
+        self.pid = os.getpid()
+        self.mode = "poll"
+        self.stats = {"notifications": 0, "dispatched": 0, "listen_errors": 0}
+        self._subs: dict[str, set[AuditLogSubscription]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, key: str, *, on_notify=None) -> AuditLogSubscription:
+        sub = AuditLogSubscription(self, key, on_notify=on_notify)
+        with self._lock:
+            self._subs.setdefault(key, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: AuditLogSubscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.key)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    self._subs.pop(sub.key, None)
+
+    def dispatch(self, key: str, log_id: int) -> int:
+        with self._lock:
+            subs = list(self._subs.get(key) or ())
+        for sub in subs:
+            sub.notify(log_id)
+        self.stats["dispatched"] += len(subs)
+        _notify_global_listeners(key, log_id)
+        return len(subs)
+
+    def _handle_payload(self, raw: str) -> None:
+        self.stats["notifications"] += 1
+        try:
+            data = json.loads(raw or "{}")
+        except Exception:
+            return
+        key = str(data.get("e") or "")
+        if key:
+            self.dispatch(key, int(data.get("id") or 0))
+
+    def start_listener(self, engine) -> None:
+        if engine.dialect.name != "postgresql":
+            self.mode = "poll"
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.mode = "notify"
+        self._thread = threading.Thread(target=self._listen_loop, args=(engine,), name="audit-log-listen", daemon=True)
+        self._thread.start()
+
+    def _listen_loop(self, engine) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            raw_conn = None
+            try:
+                raw_conn = engine.raw_connection()
+                # Conexión dedicada: no vuelve al pool mientras escucha.
+                raw_conn.detach()
+                dbapi_conn = raw_conn.driver_connection
+                dbapi_conn.autocommit = True
+                cur = dbapi_conn.cursor()
+                cur.execute(f"LISTEN {AUDIT_LOG_NOTIFY_CHANNEL}")
+                self.mode = "notify"
+                backoff = 1.0
+                while not self._stop.is_set():
+                    ready, _, _ = select.select([dbapi_conn], [], [], 5.0)
+                    if not ready:
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        note = dbapi_conn.notifies.pop(0)
+                        self._handle_payload(getattr(note, "payload", ""))
+            except Exception:
+                # Sin LISTEN los suscriptores vuelven a consultar por intervalo hasta reconectar.
+                self.stats["listen_errors"] += 1
+                self.mode = "poll"
+                self._stop.wait(backoff)
+                backoff = min(30.0, backoff * 2)
+            finally:
+                if raw_conn is not None:
+                    try:
+                        raw_conn.close()
+                    except Exception:
+                        pass
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            subscriptions = sum(len(v) for v in self._subs.values())
+            entities = len(self._subs)
+        return {"mode": self.mode, "subscriptions": subscriptions, "entities": entities, **self.stats}
+
+
+def audit_log_tailer(app_obj=None, *, engine=None) -> AuditLogTailer:
+    """Tailer del proceso actual; arranca el ``LISTEN`` la primera vez si el motor es Postgres."""
+    global _TAILER
+    tailer = _TAILER
+    if tailer is not None and tailer.pid == os.getpid():
+        return tailer
+    with _TAILER_LOCK:
+        tailer = _TAILER
+        if tailer is None or tailer.pid != os.getpid():
+            tailer = AuditLogTailer(app_obj=app_obj)
+            if engine is not None:
+                tailer.start_listener(engine)
+            _TAILER = tailer
+    return tailer
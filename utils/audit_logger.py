@@ -13,6 +13,7 @@ from flask_login import current_user
 
 from config_app import db
 from models import StaffAuditLog, StaffUser
+from utils.audit_log_tail import notify_audit_log_inserted, publish_local
 from utils.timezone import utc_now_naive
 
 
@@ -223,7 +224,15 @@ def log_action(
 
     try:
         with db.engine.begin() as conn:
-            conn.execute(StaffAuditLog.__table__.insert().values(**payload))
+            result = conn.execute(StaffAuditLog.__table__.insert().values(**payload))
+            inserted_id = (result.inserted_primary_key or [None])[0]
+            notify_audit_log_inserted(
+                conn,
+                entity_type=payload.get("entity_type"),
+                entity_id=payload.get("entity_id"),
+                log_id=inserted_id,
+            )
+        publish_local(entity_type=payload.get("entity_type"), entity_id=payload.get("entity_id"), log_id=inserted_id)
         if has_request_context():
             g._staff_audit_logged = True
         try:
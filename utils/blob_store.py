@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Almacén de blobs direccionado por contenido (sha256).
+
+Backends:
+- ``local``: árbol ``<root>/ab/cd/<sha256>`` en disco (``BLOB_STORE_LOCAL_ROOT``,
+  default ``instance/blobs``). Escritura atómica vía archivo temporal + rename.
+- ``s3``: cualquier API compatible S3 (``BLOB_STORE_S3_BUCKET``,
+  ``BLOB_STORE_S3_PREFIX``, ``BLOB_STORE_S3_ENDPOINT_URL``); requiere boto3.
+
+``BLOB_STORE_BACKEND`` vacío/``off`` deja el subsistema apagado y todo sigue
+leyendo de las columnas ``LargeBinary`` legadas.
+"""
+from __future__ import annotations
+
+import abc
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class BlobStoreError(RuntimeError):
+    pass
+
+
+class BlobNotFoundError(BlobStoreError):
+    pass
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    sha256: str
+    size_bytes: int
+    mime_type: str
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sniff_mime(head: bytes | None) -> str:
+    """MIME por firma de los primeros bytes; ``application/octet-stream`` si no se reconoce."""
+    h = bytes(head or b"")[:16]
+    if h.startswith(b"\x89PNG"):
+        return "image/png"
+    if h.startswith(b"\xFF\xD8\xFF"):
+        return "image/jpeg"
+    if h.startswith(b"GIF87a") or h.startswith(b"GIF89a"):
+        return "image/gif"
+    if h[:4] == b"RIFF" and h[8:12] == b"WEBP":
+        return "image/webp"
+    if h.startswith(b"BM"):
+        return "image/bmp"
+    if h.startswith(b"%PDF"):
+        return "application/pdf"
+    return "application/octet-stream"
+
+
+def to_bytes(value) -> bytes:
+    if value is None:
+        return b""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    try:
+        return bytes(value)
+    except Exception:
+        return b""
+
+
+def _valid_key(key: str) -> str:
+    k = str(key or "").strip().lower()
+    if len(k) != 64 or any(c not in "0123456789abcdef" for c in k):
+        raise BlobStoreError(f"Clave de blob inválida: {key!r}")
+    return k
+
+
+class BlobStore(abc.ABC):
+    backend = "base"
+
+    @abc.abstractmethod
+    def put(self, data: bytes, *, mime_type: str | None = None) -> BlobRef:
+        ...
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    def get(self, key: str) -> bytes:
+        return b"".join(self.iter_chunks(key))
+
+    @abc.abstractmethod
+    def iter_chunks(self, key: str, *, start: int = 0, end: int | None = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class LocalFilesystemBlobStore(BlobStore):
+    backend = "local"
+
+    def __init__(self, root: Path | str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        k = _valid_key(key)
+        return self.root / k[:2] / k[2:4] / k
+
+    def put(self, data: bytes, *, mime_type: str | None = None) -> BlobRef:
+        payload = to_bytes(data)
+        key = sha256_hex(payload)
+        target = self.path_for(key)
+        if not (target.exists() and target.stat().st_size == len(payload)):
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".blob_", dir=str(target.parent))
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(payload)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp, target)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return BlobRef(sha256=key, size_bytes=len(payload), mime_type=mime_type or sniff_mime(payload[:16]))
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).exists()
+
+    def iter_chunks(self, key: str, *, start: int = 0, end: int | None = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        path = self.path_for(key)
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError as exc:
+            raise BlobNotFoundError(key) from exc
+        with fh:
+            fh.seek(max(0, int(start)))
+            remaining = None if end is None else max(0, int(end) - int(start) + 1)
+            while remaining is None or remaining > 0:
+                n = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = fh.read(n)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        try:
+            self.path_for(key).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BlobStore):
+    backend = "s3"
+
+    def __init__(self, bucket: str, *, prefix: str = "", endpoint_url: str = ""):
+        if not bucket:
+            raise BlobStoreError("BLOB_STORE_S3_BUCKET es obligatorio para el backend s3.")
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except Exception as exc:
+            raise BlobStoreError("Falta dependencia boto3 para usar el backend s3.") from exc
+
+        self._ClientError = ClientError
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self.bucket = bucket
+        self.prefix = (prefix or "").strip("/")
+
+    def object_key(self, key: str) -> str:
+        k = _valid_key(key)
+        rel = f"{k[:2]}/{k[2:4]}/{k}"
+        return f"{self.prefix}/{rel}" if self.prefix else rel
+
+    def _missing(self, exc) -> bool:
+        code = str(getattr(exc, "response", {}).get("Error", {}).get("Code", ""))
+        return code in {"404", "NoSuchKey", "NotFound"}
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except self._ClientError as exc:
+            if self._missing(exc):
+                return False
+            raise
+
+    def put(self, data: bytes, *, mime_type: str | None = None) -> BlobRef:
+        payload = to_bytes(data)
+        key = sha256_hex(payload)
+        mime = mime_type or sniff_mime(payload[:16])
+        if not self.exists(key):
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self.object_key(key),
+                Body=payload,
+                ContentType=mime,
+            )
+        return BlobRef(sha256=key, size_bytes=len(payload), mime_type=mime)
+
+    def iter_chunks(self, key: str, *, start: int = 0, end: int | None = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        kwargs = {"Bucket": self.bucket, "Key": self.object_key(key)}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={int(start)}-{'' if end is None else int(end)}"
+        try:
+            obj = self.client.get_object(**kwargs)
+        except self._ClientError as exc:
+            if self._missing(exc):
+                raise BlobNotFoundError(key) from exc
+            raise
+        body = obj["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size=chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+
+_STORE_LOCK = threading.Lock()
+_STORE: Optional[BlobStore] = None
+_STORE_SIG: tuple = ()
+
+
+def blob_store_backend() -> str:
+    raw = (os.getenv("BLOB_STORE_BACKEND") or "").strip().lower()
+    return "" if raw in {"", "off", "none", "0"} else raw
+
+
+def _default_local_root() -> Path:
+    return Path(__file__).resolve().parents[1] / "instance" / "blobs"
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Store configurado del proceso o ``None`` si el subsistema está apagado."""
+    global _STORE, _STORE_SIG
+    backend = blob_store_backend()
+    if not backend:
+        return None
+    sig = (
+        backend,
+        os.getenv("BLOB_STORE_LOCAL_ROOT") or "",
+        os.getenv("BLOB_STORE_S3_BUCKET") or "",
+        os.getenv("BLOB_STORE_S3_PREFIX") or "",
+        os.getenv("BLOB_STORE_S3_ENDPOINT_URL") or "",
+    )
+    with _STORE_LOCK:
+        if _STORE is not None and _STORE_SIG == sig:
+            return _STORE
+        if backend == "local":
+            store: BlobStore = LocalFilesystemBlobStore(sig[1] or _default_local_root())
+        elif backend == "s3":
+            store = S3BlobStore(sig[2], prefix=sig[3], endpoint_url=sig[4])
+        else:
+            raise BlobStoreError(f"BLOB_STORE_BACKEND desconocido: {backend}")
+        _STORE, _STORE_SIG = store, sig
+        return store
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""Perfiles de matching precalculados por candidata (``candidata_match_profiles``).
+
+``build_scoring_context`` / ``compute_match`` re-tokenizaban dirección, rutas,
+funciones y horario, parseaban edad/años y re-leían el JSON del test de cada
+candidata en cada ranking. Aquí esos rasgos se guardan ya listos:
+
+- ``features``: lo mismo que ``utils.matching_batch.candidate_features``
+  (tokens de ubicación/horario/funciones, ciudad, modalidad, edad, años).
+- ``compat_profile``: ``load_candidata_profile`` del motor de compatibilidad,
+  solo si la candidata tiene test.
+- Escritura: cualquier flush que cambie un campo fuente recalcula la fila en la
+  misma transacción (si la instancia no tiene cargados todos los campos fuente
+  la fila se borra y se recalcula luego); borrar la candidata borra su fila.
+  ``profile_version`` distinta de ``MATCH_PROFILE_VERSION`` cuenta como
+  ausente: subirla al cambiar la tokenización invalida todo sin migración.
+- Lectura: ``load_match_profiles`` trae las filas del pool en un SELECT; las
+  que falten se calculan en memoria (no se escriben desde la lectura; eso es
+  tarea de ``flask candidatas-match-profiles rebuild``).
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, Sequence
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, event, func, select
+from sqlalchemy.orm import attributes, load_only
+
+from config_app import db
+from models import Candidata, CandidataMatchProfile
+from utils.compat_engine import CANDIDATA_PROFILE_FIELDS, load_candidata_profile
+from utils.matching_batch import CandidateFeatures, candidate_features
+from utils.runtime_config import table_ready
+from utils.timezone import utc_now_naive
+
+
+logger = logging.getLogger(__name__)
+
+MATCH_PROFILE_VERSION = 1
+
+FEATURE_SOURCE_FIELDS = (
+    "direccion_completa",
+    "rutas_cercanas",
+    "compat_disponibilidad_horario",
+    "areas_experiencia",
+    "compat_fortalezas",
+    "sabe_planchar",
+    "modalidad_trabajo_preferida",
+    "edad",
+    "anos_experiencia",
+    "compat_limites_no_negociables",
+    "compat_test_candidata_json",
+)
+# ``load_candidata_profile`` lee varios ``compat_*`` con getattr; solo cuentan los que son columna.
+COMPAT_SOURCE_FIELDS = tuple(name for name in CANDIDATA_PROFILE_FIELDS if name in Candidata.__table__.c)
+SOURCE_FIELDS = tuple(dict.fromkeys(FEATURE_SOURCE_FIELDS + COMPAT_SOURCE_FIELDS))
+
+_SET_FIELDS = ("location_tokens", "horario_tokens", "skill_tokens")
+_LOOKUP_CHUNK = 1000
+
+
+def _profiles_table_ready(bind) -> bool:
+    return table_ready(CandidataMatchProfile.__tablename__, bind=bind)
+
+
+def features_to_dict(feat: CandidateFeatures) -> Dict[str, Any]:
+    out = feat._asdict()
+    for name in _SET_FIELDS:
+        out[name] = sorted(out[name])
+    return out
+
+
+def features_from_dict(data: Dict[str, Any]) -> CandidateFeatures:
+    values = dict(data or {})
+    for name in _SET_FIELDS:
+        values[name] = frozenset(values.get(name) or ())
+    return CandidateFeatures(**{name: values.get(name) for name in CandidateFeatures._fields})
+
+
+def build_profile_values(cand) -> Dict[str, Any]:
+    """Valores de la fila de ``candidata_match_profiles`` para una candidata (o vista de sus campos)."""
+    feat = candidate_features(cand)
+    return {
+        "candidata_id": int(getattr(cand, "fila", 0) or 0),
+        "profile_version": MATCH_PROFILE_VERSION,
+        "features": features_to_dict(feat),
+        "compat_profile": load_candidata_profile(cand) if feat.has_test else None,
+        "updated_at": utc_now_naive(),
+    }
+
+
+def _upsert_profiles(connection, rows: Sequence[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    table = CandidataMatchProfile.__table__
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(list(rows))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.candidata_id],
+            set_={
+                "profile_version": stmt.excluded.profile_version,
+                "features": stmt.excluded.features,
+                "compat_profile": stmt.excluded.compat_profile,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        connection.execute(stmt)
+        return
+    connection.execute(table.delete().where(table.c.candidata_id.in_([r["candidata_id"] for r in rows])))
+    connection.execute(table.insert(), list(rows))
+
+
+def _delete_profile(connection, candidata_id: int) -> None:
+    table = CandidataMatchProfile.__table__
+    connection.execute(table.delete().where(table.c.candidata_id == int(candidata_id)))
+
+
+class _SourceView:
+    """Campos fuente tomados del ``__dict__`` de la instancia (sin cargas perezosas dentro del flush)."""
+
+    def __init__(self, target) -> None:
+        state = target.__dict__
+        self.fila = state.get("fila")
+        for name in SOURCE_FIELDS:
+            setattr(self, name, state.get(name))
+
+
+def _refresh_profile(connection, target, *, inserting: bool) -> None:
+    fila = int(target.__dict__.get("fila") or 0)
+    if fila <= 0 or not _profiles_table_ready(connection):
+        return
+    if not inserting:
+        changed = any(
+            attributes.get_history(target, name, passive=attributes.PASSIVE_NO_INITIALIZE).has_changes()
+            for name in SOURCE_FIELDS
+        )
+        if not changed:
+            return
+        if any(name not in target.__dict__ for name in SOURCE_FIELDS):
+            # Campo fuente sin cargar: no se conoce el valor completo, que lo recalcule el rebuild/lectura.
+            _delete_profile(connection, fila)
+            return
+    # En un insert, la columna nunca asignada es NULL.
+    _upsert_profiles(connection, [build_profile_values(_SourceView(target))])
+
+
+@event.listens_for(Candidata, "after_insert")
+def _match_profile_candidata_inserted(_mapper, connection, target):
+    _refresh_profile(connection, target, inserting=True)
+
+
+@event.listens_for(Candidata, "after_update")
+def _match_profile_candidata_updated(_mapper, connection, target):
+    _refresh_profile(connection, target, inserting=False)
+
+
+@event.listens_for(Candidata, "after_delete")
+def _match_profile_candidata_deleted(_mapper, connection, target):
+    fila = int(target.__dict__.get("fila") or 0)
+    if fila > 0 and _profiles_table_ready(connection):
+        _delete_profile(connection, fila)
+
+
+def load_match_profiles(
+    candidates: Iterable[Any],
+) -> tuple[dict[int, CandidateFeatures], dict[int, Dict[str, Any]]]:
+    """Rasgos de matching del pool: ``(features_by_id, compat_profiles_by_id)``.
+
+    ``features_by_id`` cubre todas las candidatas con ``fila`` (las que no tienen
+    fila vigente se calculan aquí). ``compat_profiles_by_id`` solo trae los
+    perfiles guardados; sin entrada, ``compute_match`` lo arma como siempre.
+    """
+    by_id: dict[int, Any] = {}
+    for cand in candidates or ():
+        cand_id = int(getattr(cand, "fila", 0) or 0)
+        if cand_id > 0:
+            by_id[cand_id] = cand
+
+    features_by_id: dict[int, CandidateFeatures] = {}
+    compat_by_id: dict[int, Dict[str, Any]] = {}
+    try:
+        table_ready = bool(by_id) and _profiles_table_ready(db.session.get_bind())
+    except Exception:
+        # Sin app/BD (scripts, tests con dobles): todo en memoria.
+        table_ready = False
+    if table_ready:
+        table = CandidataMatchProfile.__table__
+        ids = list(by_id)
+        try:
+            for start in range(0, len(ids), _LOOKUP_CHUNK):
+                rows = db.session.execute(
+                    select(table.c.candidata_id, table.c.features, table.c.compat_profile).where(
+                        table.c.candidata_id.in_(ids[start:start + _LOOKUP_CHUNK]),
+                        table.c.profile_version == MATCH_PROFILE_VERSION,
+                    )
+                )
+                for cand_id, features, compat_profile in rows:
+                    feat = features_from_dict(features)
+                    features_by_id[int(cand_id)] = feat
+                    if feat.has_test and isinstance(compat_profile, dict):
+                        compat_by_id[int(cand_id)] = compat_profile
+        except Exception:
+            logger.warning("matching.match_profiles lookup failed; computing in memory", exc_info=True)
+            features_by_id.clear()
+            compat_by_id.clear()
+
+    missing = [cand_id for cand_id in by_id if cand_id not in features_by_id]
+    for cand_id in missing:
+        features_by_id[cand_id] = candidate_features(by_id[cand_id])
+    if missing:
+        logger.info("matching.match_profiles stored=%s computed=%s", len(by_id) - len(missing), len(missing))
+    return features_by_id, compat_by_id
+
+
+def rebuild_match_profiles(*, batch_size: int = 500, only_missing: bool = False) -> dict[str, int]:
+    """Recalcula ``candidata_match_profiles`` por lotes de ``fila``.
+
+    ``only_missing`` salta las candidatas que ya tienen fila en la versión actual
+    (útil tras el primer deploy); sin él repasa todas (p. ej. tras cambios hechos
+    por SQL directo que no pasan por los eventos).
+    """
+    if not _profiles_table_ready(db.session.get_bind()):
+        raise click.ClickException("La tabla candidata_match_profiles no existe (falta migrar).")
+    profiles = CandidataMatchProfile.__table__
+    stats = {"written": 0, "batches": 0}
+    batch = max(1, min(int(batch_size or 500), 5000))
+    last_fila = 0
+    while True:
+        q = (
+            Candidata.query
+            .options(load_only(Candidata.fila, *[getattr(Candidata, name) for name in SOURCE_FIELDS]))
+            .filter(Candidata.fila > last_fila)
+        )
+        if only_missing:
+            q = q.outerjoin(
+                profiles,
+                and_(
+                    profiles.c.candidata_id == Candidata.fila,
+                    profiles.c.profile_version == MATCH_PROFILE_VERSION,
+                ),
+            ).filter(profiles.c.candidata_id.is_(None))
+        rows = q.order_by(Candidata.fila.asc()).limit(batch).all()
+        if not rows:
+            break
+        _upsert_profiles(db.session.connection(), [build_profile_values(cand) for cand in rows])
+        db.session.commit()
+        stats["written"] += len(rows)
+        stats["batches"] += 1
+        last_fila = int(rows[-1].fila)
+        db.session.expunge_all()
+    return stats
+
+
+def match_profile_stats() -> dict[str, int]:
+    profiles = CandidataMatchProfile.__table__
+    total = int(db.session.execute(select(func.count()).select_from(Candidata.__table__)).scalar() or 0)
+    current = int(
+        db.session.execute(
+            select(func.count()).where(profiles.c.profile_version == MATCH_PROFILE_VERSION)
+        ).scalar()
+        or 0
+    )
+    stored = int(db.session.execute(select(func.count()).select_from(profiles)).scalar() or 0)
+    return {
+        "candidatas": total,
+        "current": current,
+        "stale": stored - current,
+        "missing": max(0, total - current),
+    }
+
+
+@click.group("candidatas-match-profiles")
+def candidata_match_profiles_cli():
+    """Perfiles de matching precalculados de candidatas."""
+
+
+@candidata_match_profiles_cli.command("rebuild")
+@click.option("--batch-size", default=500, show_default=True, type=int, help="Candidatas por lote/commit.")
+@click.option("--only-missing", is_flag=True, default=False, help="Solo candidatas sin perfil en la versión actual.")
+@with_appcontext
+def candidata_match_profiles_rebuild_command(batch_size: int, only_missing: bool):
+    """Recalcula los rasgos de matching guardados de las candidatas."""
+    stats = rebuild_match_profiles(batch_size=batch_size, only_missing=only_missing)
+    click.echo(f"written={stats['written']} batches={stats['batches']}")
+
+
+@candidata_match_profiles_cli.command("stats")
+@with_appcontext
+def candidata_match_profiles_stats_command():
+    """Cobertura de perfiles en la versión actual."""
+    out = match_profile_stats()
+    click.echo(
+        f"version={MATCH_PROFILE_VERSION} candidatas={out['candidatas']} current={out['current']} "
+        f"stale={out['stale']} missing={out['missing']}"
+    )
@@ -12,6 +12,10 @@ _READY_BASE_STATES = {"lista_para_trabajar", "inscrita"}
 _NOT_READY_STATES = {"en_proceso", "proceso_inscripcion", "inscrita_incompleta"}
 
 
+# Documentos requeridos con hecho persistido (``Candidata.has_<kind>`` / ``<kind>_size_bytes``).
+DOCUMENT_FACT_KINDS = ("depuracion", "perfil", "cedula1", "cedula2")
+
+
 def _has_blob(value: Any) -> bool:
     if value is None:
         return False
@@ -28,6 +32,27 @@ def _has_blob(value: Any) -> bool:
         return False
 
 
+def blob_size(value: Any) -> int:
+    """Tamaño en bytes de un blob legado (0 si está vacío); misma noción de "presente" que ``_has_blob``."""
+    if value is None:
+        return 0
+    if isinstance(value, memoryview):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return 1 if _has_blob(value) else 0
+
+
+def candidata_document_present(candidata, kind: str) -> bool:
+    """Lee ``has_<kind>``; solo si aún no se calculó (NULL) cae al blob."""
+    fact = getattr(candidata, f"has_{kind}", None)
+    if fact is not None:
+        return bool(fact)
+    return _has_blob(getattr(candidata, kind, None))
+
+
 def candidata_has_interview(candidata) -> bool:
     legacy = (getattr(candidata, "entrevista", None) or "").strip()
     entrevistas_rel = getattr(candidata, "entrevistas_nuevas", None)
@@ -66,10 +91,10 @@ def candidata_referencias_complete(candidata) -> Dict[str, bool]:
 
 
 def candidata_docs_complete(candidata) -> Dict[str, Any]:
-    depuracion = _has_blob(getattr(candidata, "depuracion", None))
-    perfil = _has_blob(getattr(candidata, "perfil", None))
-    cedula1 = _has_blob(getattr(candidata, "cedula1", None))
-    cedula2 = _has_blob(getattr(candidata, "cedula2", None))
+    depuracion = candidata_document_present(candidata, "depuracion")
+    perfil = candidata_document_present(candidata, "perfil")
+    cedula1 = candidata_document_present(candidata, "cedula1")
+    cedula2 = candidata_document_present(candidata, "cedula2")
 
     required = {
         "depuracion": True,
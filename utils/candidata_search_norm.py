@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Normalización compartida para las columnas de búsqueda de candidatas.
+
+Los mismos helpers los usan los eventos del modelo (``nombre_norm``,
+``cedula_digits``, ``telefono_digits``), la migración de backfill y la
+búsqueda en ``core/services/search.py``; así el texto buscado y el
+persistido siempre se normalizan igual.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+
+def strip_accents(value: str) -> str:
+    if not value:
+        return ""
+    nfkd = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in nfkd if unicodedata.category(c) != "Mn")
+
+
+def normalize_search_text(raw: str | None) -> str:
+    """Minúsculas, sin acentos ni puntuación y con espacios colapsados."""
+    s = (raw or "").strip()
+    if not s:
+        return ""
+    s = s.replace(",", " ").replace(".", " ").replace(";", " ").replace(":", " ")
+    s = s.replace("\n", " ").replace("\t", " ")
+    s = strip_accents(s).lower()
+    s = re.sub(r"[^a-z0-9\s\-]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def digits_only(raw: str | None) -> str:
+    return re.sub(r"\D", "", raw or "").strip()
+
+
+def nullable_search_text(raw: str | None, *, max_len: int = 200) -> str | None:
+    out = normalize_search_text(raw)[:max_len]
+    return out or None
+
+
+def nullable_digits(raw: str | None, *, max_len: int = 50) -> str | None:
+    out = digits_only(raw)[:max_len]
+    return out or None
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Caché de resultados de ``compute_match`` por huella de perfiles.
+
+``/admin/compatibilidad/<cliente>/<candidata>`` (HTML y PDF), el detalle de la
+solicitud del cliente y el bonus del ranking re-normalizaban ambos perfiles y
+recalculaban horario/ritmo/cuidados/límites/mascotas en cada llamada.
+
+- Clave: ``(huella cliente, huella candidata, ENGINE_VERSION)``. La huella sale
+  de los campos fuente del perfil (``CLIENTE_PROFILE_FIELDS`` /
+  ``CANDIDATA_PROFILE_FIELDS``) o, si el llamador ya trae el perfil
+  normalizado, de ese perfil. Editar un perfil cambia la clave: nunca se sirve
+  un resultado viejo, y subir ``ENGINE_VERSION`` invalida todo.
+- Niveles: LRU en proceso (``COMPAT_CACHE_LRU_SIZE``) y backplane
+  (``COMPAT_CACHE_TTL_SECONDS``); ``compute_match_many`` lee el backplane con
+  un solo ``get_many``.
+- Invalidación explícita: un flush que cambia campos fuente de ``Candidata`` o
+  ``Solicitud`` saca del LRU las entradas de esa entidad. Las copias del
+  backplane quedan inalcanzables (la huella cambió) y vencen por TTL.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+
+from models import Candidata, Solicitud
+from utils.compat_engine import (
+    CANDIDATA_PROFILE_FIELDS,
+    CLIENTE_PROFILE_FIELDS,
+    ENGINE_VERSION,
+    compute_match,
+    load_cliente_profile,
+)
+from utils.distributed_backplane import bp_get, bp_get_many, bp_set, bp_set_many
+from utils.runtime_config import env_int
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "compat:match:v1:"
+
+
+def _ttl_seconds() -> int:
+    return env_int("COMPAT_CACHE_TTL_SECONDS", 7 * 24 * 3600, min_value=60)
+
+
+class _LRU:
+    """LRU acotado con índice por entidad para poder desalojar al editar un perfil."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._entities_by_key: dict[str, tuple] = {}
+        self._keys_by_entity: dict[tuple, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any], entities: Iterable[tuple] = ()) -> None:
+        with self._lock:
+            self._drop(key)
+            self._data[key] = value
+            ents = tuple(e for e in entities if e[1])
+            self._entities_by_key[key] = ents
+            for ent in ents:
+                self._keys_by_entity.setdefault(ent, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def evict_entity(self, kind: str, entity_id: int) -> int:
+        with self._lock:
+            keys = list(self._keys_by_entity.get((kind, int(entity_id)), ()))
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._entities_by_key.clear()
+            self._keys_by_entity.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _drop(self, key: str) -> None:
+        self._data.pop(key, None)
+        for ent in self._entities_by_key.pop(key, ()):
+            keys = self._keys_by_entity.get(ent)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._keys_by_entity.pop(ent, None)
+
+
+_LRU_CACHE = _LRU(env_int("COMPAT_CACHE_LRU_SIZE", 4096))
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=True, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def cliente_profile_hash(s, profile: Optional[Dict[str, Any]] = None) -> str:
+    if profile is not None:
+        return "n" + _digest(profile)
+    return "s" + _digest({name: getattr(s, name, None) for name in CLIENTE_PROFILE_FIELDS})
+
+
+def candidata_profile_hash(c, profile: Optional[Dict[str, Any]] = None) -> str:
+    if profile is not None:
+        return "n" + _digest(profile)
+    return "s" + _digest({name: getattr(c, name, None) for name in CANDIDATA_PROFILE_FIELDS})
+
+
+def _cache_key(cliente_hash: str, candidata_hash: str) -> str:
+    return f"{KEY_PREFIX}{ENGINE_VERSION}:{cliente_hash}:{candidata_hash}"
+
+
+def _entities(s, c) -> tuple:
+    return (
+        ("solicitud", int(getattr(s, "id", 0) or 0)),
+        ("candidata", int(getattr(c, "fila", 0) or 0)),
+    )
+
+
+def compute_match_cached(
+    s,
+    c,
+    *,
+    candidata_profile: Optional[Dict[str, Any]] = None,
+    cliente_profile: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """``compute_match`` con caché LRU + backplane; mismo resultado y misma firma."""
+    key = _cache_key(cliente_profile_hash(s, cliente_profile), candidata_profile_hash(c, candidata_profile))
+    cached = _LRU_CACHE.get(key)
+    if cached is None and has_app_context():
+        cached = bp_get(key, default=None, context="compat_cache_get")
+        if isinstance(cached, dict):
+            _LRU_CACHE.put(key, cached, _entities(s, c))
+        else:
+            cached = None
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    result = compute_match(s, c, candidata_profile=candidata_profile, cliente_profile=cliente_profile)
+    _LRU_CACHE.put(key, copy.deepcopy(result), _entities(s, c))
+    if has_app_context():
+        bp_set(key, result, timeout=_ttl_seconds(), context="compat_cache_set")
+    return result
+
+
+def compute_match_many(
+    s,
+    candidatas: Sequence[Any],
+    *,
+    candidata_profiles: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+    cliente_profile: Optional[Dict[str, Any]] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """Una solicitud contra varias candidatas, en el orden recibido.
+
+    El perfil del cliente se arma una sola vez y solo si hay fallos de caché; el
+    backplane se lee y escribe con una operación por lote. Un par cuyo cálculo
+    falla devuelve ``None`` (no se cachea).
+    """
+    cands = list(candidatas or [])
+    profiles = list(candidata_profiles) if candidata_profiles is not None else [None] * len(cands)
+    cliente_hash = cliente_profile_hash(s, cliente_profile)
+    keys = [_cache_key(cliente_hash, candidata_profile_hash(c, p)) for c, p in zip(cands, profiles)]
+
+    out: List[Optional[Dict[str, Any]]] = [None] * len(cands)
+    pending: list[int] = []
+    for pos, key in enumerate(keys):
+        cached = _LRU_CACHE.get(key)
+        if cached is not None:
+            out[pos] = copy.deepcopy(cached)
+        else:
+            pending.append(pos)
+
+    if pending and has_app_context():
+        remote = bp_get_many([keys[pos] for pos in pending], context="compat_cache_get_many")
+        still_pending = []
+        for pos, cached in zip(pending, remote):
+            if isinstance(cached, dict):
+                _LRU_CACHE.put(keys[pos], cached, _entities(s, cands[pos]))
+                out[pos] = copy.deepcopy(cached)
+            else:
+                still_pending.append(pos)
+        pending = still_pending
+
+    if not pending:
+        return out
+
+    if cliente_profile is None:
+        cliente_profile = load_cliente_profile(s)
+    fresh: dict[str, Dict[str, Any]] = {}
+    for pos in pending:
+        try:
+            result = compute_match(s, cands[pos], candidata_profile=profiles[pos], cliente_profile=cliente_profile)
+        except Exception:
+            logger.warning("compat_cache.compute_failed candidata_id=%s", getattr(cands[pos], "fila", None), exc_info=True)
+            continue
+        _LRU_CACHE.put(keys[pos], copy.deepcopy(result), _entities(s, cands[pos]))
+        fresh[keys[pos]] = result
+        out[pos] = result
+    if fresh and has_app_context():
+        bp_set_many(fresh, timeout=_ttl_seconds(), context="compat_cache_set_many")
+    return out
+
+
+def invalidate_compat_cache(*, solicitud_id: int | None = None, candidata_id: int | None = None) -> int:
+    """Saca del LRU de este proceso los resultados de la solicitud y/o candidata."""
+    evicted = 0
+    if solicitud_id:
+        evicted += _LRU_CACHE.evict_entity("solicitud", int(solicitud_id))
+    if candidata_id:
+        evicted += _LRU_CACHE.evict_entity("candidata", int(candidata_id))
+    return evicted
+
+
+def compat_cache_stats() -> dict[str, int]:
+    return {
+        "entries": len(_LRU_CACHE),
+        "maxsize": _LRU_CACHE.maxsize,
+        "hits": _LRU_CACHE.hits,
+        "misses": _LRU_CACHE.misses,
+    }
+
+
+def _profile_changed(target, fields: Sequence[str]) -> bool:
+    mapped = attributes.instance_state(target).mapper.attrs
+    return any(
+        attributes.get_history(target, name, passive=attributes.PASSIVE_NO_INITIALIZE).has_changes()
+        for name in fields
+        if name in mapped
+    )
+
+
+@event.listens_for(Candidata, "after_update")
+def _compat_cache_candidata_updated(_mapper, _connection, target):
+    if _profile_changed(target, CANDIDATA_PROFILE_FIELDS):
+        invalidate_compat_cache(candidata_id=int(target.__dict__.get("fila") or 0))
+
+
+@event.listens_for(Solicitud, "after_update")
+def _compat_cache_solicitud_updated(_mapper, _connection, target):
+    if _profile_changed(target, CLIENTE_PROFILE_FIELDS):
+        invalidate_compat_cache(solicitud_id=int(target.__dict__.get("id") or 0))
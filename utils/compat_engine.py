@@ -37,6 +37,39 @@ MASCOTAS_IMPORTANCIA_CHOICES = [
     ("alta", "Alta"),
 ]
 
+# Atributos que leen ``load_candidata_profile`` / ``load_cliente_profile`` (con getattr:
+# no todos son columna en todos los modelos). Cambiar cualquiera cambia el perfil.
+CANDIDATA_PROFILE_FIELDS = (
+    "compat_test_candidata_json",
+    "compat_fortalezas",
+    "compat_habilidades_fuertes",
+    "compat_habilidades_evitar",
+    "compat_tareas_evitar",
+    "compat_limites_no_negociables",
+    "compat_disponibilidad_dias",
+    "compat_disponibilidad_horario",
+    "compat_disponibilidad_horarios",
+    "compat_mascotas",
+    "compat_mascotas_ok",
+    "compat_puntualidad_1a5",
+    "compat_ritmo_preferido",
+    "compat_estilo_trabajo",
+    "compat_comunicacion",
+    "compat_relacion_ninos",
+    "compat_experiencia_nivel",
+    "compat_observaciones",
+)
+CLIENTE_PROFILE_FIELDS = (
+    "compat_test_cliente_json",
+    "compat_test_cliente",
+    "compat_test_cliente_version",
+    "compat_test_cliente_at",
+    "horario",
+    "mascota",
+    "ninos",
+    "funciones",
+)
+
 
 def _now_iso() -> str:
     return utc_now_naive().isoformat()
@@ -765,9 +798,20 @@ def _summary_for(score: int, level: str, breakdown: List[Dict[str, Any]], risks:
     return f"Compatibilidad baja ({score}/100). Hay información incompleta para recomendar una asignación segura."
 
 
-def compute_match(s, c) -> Dict[str, Any]:
-    cliente = load_cliente_profile(s)
-    candidata = load_candidata_profile(c)
+def compute_match(
+    s,
+    c,
+    *,
+    candidata_profile: Optional[Dict[str, Any]] = None,
+    cliente_profile: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Compatibilidad cliente/candidata por test.
+
+    Los perfiles ya normalizados (``candidata_match_profiles`` o el de la
+    solicitud calculado una vez por ranking) se pueden pasar para no re-leer el JSON.
+    """
+    cliente = cliente_profile if cliente_profile is not None else load_cliente_profile(s)
+    candidata = candidata_profile if candidata_profile is not None else load_candidata_profile(c)
 
     breakdown: List[Dict[str, Any]] = []
     all_risks: List[str] = []
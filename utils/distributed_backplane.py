@@ -142,6 +142,39 @@ def bp_set(key: str, value: Any, *, timeout: int, strict: bool = False, context:
         return bool(_handle_unavailable(context=context, strict=strict, fallback=False, exc=exc))
 
 
+def bp_get_many(keys: list[str], *, strict: bool = False, context: str = "get_many") -> list[Any]:
+    """Varias claves en un solo viaje; ``None`` en las ausentes (y en todas si no hay backplane)."""
+    keys = list(keys or [])
+    if not keys:
+        return []
+    status = backplane_status()
+    using_redis = _is_redis_cache_type(status)
+    if using_redis and not status.configured:
+        return _fallback_without_cache(status=status, strict=strict, fallback=[None] * len(keys), context=context)
+    if using_redis and _temporarily_unavailable():
+        return _fallback_without_cache(status=status, strict=strict, fallback=[None] * len(keys), context=context)
+    try:
+        return list(cache.get_many(*keys))
+    except Exception as exc:
+        return _handle_unavailable(context=context, strict=strict, fallback=[None] * len(keys), exc=exc)
+
+
+def bp_set_many(mapping: dict[str, Any], *, timeout: int, strict: bool = False, context: str = "set_many") -> bool:
+    if not mapping:
+        return True
+    status = backplane_status()
+    using_redis = _is_redis_cache_type(status)
+    if using_redis and not status.configured:
+        return bool(_fallback_without_cache(status=status, strict=strict, fallback=False, context=context))
+    if using_redis and _temporarily_unavailable():
+        return bool(_fallback_without_cache(status=status, strict=strict, fallback=False, context=context))
+    try:
+        cache.set_many(dict(mapping), timeout=max(1, int(timeout)))
+        return True
+    except Exception as exc:
+        return bool(_handle_unavailable(context=context, strict=strict, fallback=False, exc=exc))
+
+
 def bp_delete(key: str, *, strict: bool = False, context: str = "delete") -> bool:
     status = backplane_status()
     using_redis = _is_redis_cache_type(status)
@@ -174,6 +207,48 @@ def bp_add(key: str, value: Any, *, timeout: int, strict: bool = False, context:
         return bool(_handle_unavailable(context=context, strict=strict, fallback=False, exc=exc))
 
 
+_REFRESH_IF_VALUE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def bp_refresh_if_value(key: str, expected: Any, *, timeout: int, strict: bool = False, context: str = "refresh_if_value") -> bool:
+    """Extiende el TTL de ``key`` solo si todavía vale ``expected`` (compare-and-set).
+
+    En Redis es atómico (script Lua sobre el valor serializado); en los demás
+    backends se compara y reescribe. ``False`` si la clave ya no es de ``expected``.
+    """
+    status = backplane_status()
+    using_redis = _is_redis_cache_type(status)
+    if using_redis and not status.configured:
+        return bool(_fallback_without_cache(status=status, strict=strict, fallback=False, context=context))
+    if using_redis and _temporarily_unavailable():
+        return bool(_fallback_without_cache(status=status, strict=strict, fallback=False, context=context))
+    try:
+        backend = getattr(cache, "cache", None)
+        client = getattr(backend, "_write_client", None)
+        if client is not None and hasattr(backend, "serializer"):
+            prefix = backend._get_prefix() if hasattr(backend, "_get_prefix") else (backend.key_prefix or "")
+            return bool(
+                client.eval(
+                    _REFRESH_IF_VALUE_LUA,
+                    1,
+                    f"{prefix}{key}",
+                    backend.serializer.dumps(expected),
+                    max(1, int(timeout)) * 1000,
+                )
+            )
+        if cache.get(key) != expected:
+            return False
+        cache.set(key, expected, timeout=max(1, int(timeout)))
+        return True
+    except Exception as exc:
+        return bool(_handle_unavailable(context=context, strict=strict, fallback=False, exc=exc))
+
+
 def bp_incr(key: str, *, delta: int = 1, timeout: int, strict: bool = False, context: str = "incr") -> int:
     status = backplane_status()
     using_redis = _is_redis_cache_type(status)
@@ -35,6 +35,7 @@ from utils.distributed_backplane import (
     bp_set,
 )
 from utils.matching_service import rank_candidates
+from utils.outbox_retention import outbox_status_counters
 from utils.secrets_manager import get_secret
 from utils.ssrf_guard import OutboundURLBlocked, validate_external_url, build_no_redirect_opener
 from utils.timezone import iso_utc_z, parse_iso_utc, utc_now_naive
@@ -1423,47 +1424,57 @@ def operational_semaphore_payload(*, window_minutes: int = O1_WINDOW_MINUTES_DEF
     window_m = max(5, min(int(window_minutes or O1_WINDOW_MINUTES_DEFAULT), 120))
     since = now - timedelta(minutes=window_m)
 
-    try:
-        backlog_pending = int(
-            DomainOutbox.query
-            .filter(DomainOutbox.published_at.is_(None))
-            .count()
-        )
-    except Exception:
-        backlog_pending = 0
-    try:
-        quarantined_total = int(
-            DomainOutbox.query
-            .filter(DomainOutbox.relay_status == "quarantined")
-            .count()
-        )
-    except Exception:
-        quarantined_total = 0
+    # Conteos de estado: snapshot del relay (solo filas sin publicar) si está fresco.
+    counters = outbox_status_counters()
+    if counters is not None:
+        backlog_pending = int(counters.get("backlog") or 0)
+        quarantined_total = int(counters.get("quarantined") or 0)
+        retrying_total = int(counters.get("retrying") or 0)
+        oldest_pending = parse_iso_utc(counters.get("oldest_pending_created_at"))
+        oldest_pending = oldest_pending.replace(tzinfo=None) if oldest_pending is not None else None
+    else:
+        try:
+            backlog_pending = int(
+                DomainOutbox.query
+                .filter(DomainOutbox.published_at.is_(None))
+                .count()
+            )
+        except Exception:
+            backlog_pending = 0
+        try:
+            quarantined_total = int(
+                DomainOutbox.query
+                .filter(DomainOutbox.published_at.is_(None), DomainOutbox.relay_status == "quarantined")
+                .count()
+            )
+        except Exception:
+            quarantined_total = 0
+        try:
+            retrying_total = int(
+                DomainOutbox.query
+                .filter(DomainOutbox.published_at.is_(None), DomainOutbox.relay_status == "retrying")
+                .count()
+            )
+        except Exception:
+            retrying_total = 0
+        try:
+            oldest_pending = (
+                DomainOutbox.query
+                .with_entities(func.min(DomainOutbox.created_at))
+                .filter(DomainOutbox.published_at.is_(None))
+                .scalar()
+            )
+        except Exception:
+            oldest_pending = None
     try:
         quarantined_last_15m = int(
             DomainOutbox.query
+            .filter(DomainOutbox.published_at.is_(None))
             .filter(DomainOutbox.relay_status == "quarantined", DomainOutbox.quarantined_at.isnot(None), DomainOutbox.quarantined_at >= since)
             .count()
         )
     except Exception:
         quarantined_last_15m = 0
-    try:
-        retrying_total = int(
-            DomainOutbox.query
-            .filter(DomainOutbox.relay_status == "retrying")
-            .count()
-        )
-    except Exception:
-        retrying_total = 0
-    try:
-        oldest_pending = (
-            DomainOutbox.query
-            .with_entities(func.min(DomainOutbox.created_at))
-            .filter(DomainOutbox.published_at.is_(None))
-            .scalar()
-        )
-    except Exception:
-        oldest_pending = None
     oldest_pending_age_seconds = 0
     if oldest_pending is not None:
         try:
@@ -1491,6 +1502,7 @@ def operational_semaphore_payload(*, window_minutes: int = O1_WINDOW_MINUTES_DEF
     try:
         relay_retried = int(
             DomainOutbox.query
+            .filter(or_(DomainOutbox.published_at.is_(None), DomainOutbox.published_at >= since))
             .filter(DomainOutbox.last_attempt_at.isnot(None), DomainOutbox.last_attempt_at >= since)
             .filter(DomainOutbox.published_attempts > 1)
             .count()
@@ -1501,6 +1513,9 @@ def operational_semaphore_payload(*, window_minutes: int = O1_WINDOW_MINUTES_DEF
     relay_fail_rate_pct = round((relay_failed / relay_attempted_total) * 100.0, 2) if relay_attempted_total > 0 else 0.0
     relay_retry_rate_pct = round((relay_retried / relay_attempted_total) * 100.0, 2) if relay_attempted_total > 0 else 0.0
     relay_throughput_per_min = round(relay_published / float(window_m), 2)
+    relay_counter_published = _safe_bp_get_counter("relay:published_count", default=0)
+    relay_counter_lag_sum_ms = _safe_bp_get_counter("relay:lag_sum_ms", default=0)
+    relay_lag_avg_ms = round(relay_counter_lag_sum_ms / relay_counter_published, 1) if relay_counter_published > 0 else None
 
     sse_open_count = _safe_bp_get_counter("live:sse_open_count", default=0)
     fallback_count = _safe_bp_get_counter("live:fallback_entered_count", default=0)
@@ -1565,6 +1580,7 @@ def operational_semaphore_payload(*, window_minutes: int = O1_WINDOW_MINUTES_DEF
         "relay_retry_rate_pct_15m": relay_retry_rate_pct,
         "relay_throughput_per_min_15m": relay_throughput_per_min,
         "relay_published_15m": relay_published,
+        "relay_lag_avg_ms": relay_lag_avg_ms,
         "relay_failed_15m": relay_failed,
         "live_polling_fallback_pct_15m": fallback_pct,
         "live_sse_open_count_15m": int(sse_open_count),
@@ -1763,7 +1779,15 @@ def deterministic_decision_score(base_score: int, reasons: list[str], weights: d
 
 
 def intelligent_suggestions_for_solicitud(solicitud: Solicitud, top_k: int = 10) -> list[dict[str, Any]]:
-    ranked = rank_candidates(solicitud, top_k=max(20, top_k))
+    from services.solicitud_matching_suggestions import load_matching_suggestions
+
+    ranked = None
+    try:
+        ranked = load_matching_suggestions(solicitud, top_k=max(20, top_k))
+    except Exception:
+        ranked = None
+    if ranked is None:
+        ranked = rank_candidates(solicitud, top_k=max(20, top_k))
     locks = {f"candidata:{x.get('entity_id')}": x for x in list_active_locks() if x.get("entity_type") == "candidata" and x.get("active")}
 
     out: list[dict[str, Any]] = []
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Miniaturas WebP/JPEG de fotos (Pillow), sin dependencias de la app.
+
+Lo usan ``core.services.candidata_thumbnails`` y el benchmark de
+``scripts/local``; por eso no importa Flask ni modelos.
+"""
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from typing import Iterable
+
+
+VARIANTS = {"thumb": 160, "card": 400, "detail": 800}
+FORMATS = ("webp", "jpeg")
+# Fotos más grandes que esto (en píxeles) no se decodifican: protección contra
+# imágenes "bomba" y contra tumbar el worker con una panorámica de 100 MP.
+MAX_SOURCE_PIXELS = 40_000_000
+
+_MIME_BY_FORMAT = {"webp": "image/webp", "jpeg": "image/jpeg"}
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 78, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 80, "optimize": True, "progressive": True},
+}
+
+
+class ThumbnailError(Exception):
+    """La foto no se pudo convertir (formato no soportado, corrupta o demasiado grande)."""
+
+
+@dataclass(frozen=True)
+class RenderedThumbnail:
+    variant: str
+    format: str
+    width: int
+    height: int
+    data: bytes
+
+    @property
+    def mime_type(self) -> str:
+        return _MIME_BY_FORMAT[self.format]
+
+
+def render_thumbnails(
+    data: bytes,
+    *,
+    variants: dict[str, int] | None = None,
+    formats: Iterable[str] = FORMATS,
+) -> list[RenderedThumbnail]:
+    """Decodifica una vez y reduce de mayor a menor; nunca amplía una foto pequeña."""
+    try:
+        from PIL import Image, ImageOps
+    except Exception as exc:  # pragma: no cover - Pillow viene en requirements.txt
+        raise ThumbnailError("Pillow no está disponible.") from exc
+
+    sizes = dict(variants or VARIANTS)
+    if not data or not sizes:
+        return []
+    largest = max(sizes.values())
+    try:
+        with Image.open(io.BytesIO(data)) as opened:
+            if opened.width * opened.height > MAX_SOURCE_PIXELS:
+                raise ThumbnailError(f"Foto demasiado grande ({opened.width}x{opened.height}).")
+            # En JPEG decodifica directo a una escala reducida (mucho más rápido en fotos de teléfono).
+            opened.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(opened)
+            if image.mode in ("RGBA", "LA", "P"):
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            image.load()
+    except ThumbnailError:
+        raise
+    except Exception as exc:
+        raise ThumbnailError(f"No se pudo leer la foto ({type(exc).__name__}).") from exc
+
+    out: list[RenderedThumbnail] = []
+    current = image
+    for variant, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        resized = current.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        for fmt in formats:
+            buf = io.BytesIO()
+            resized.save(buf, **_SAVE_OPTIONS[fmt])
+            out.append(
+                RenderedThumbnail(
+                    variant=variant,
+                    format=fmt,
+                    width=resized.width,
+                    height=resized.height,
+                    data=buf.getvalue(),
+                )
+            )
+        current = resized
+    return out
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Lease de jobs en las colas durables (``*_jobs`` con ``locked_by``/``locked_at``/``attempts``).
+
+- ``owned_job_clauses``: condiciones para escribir solo si el job sigue
+  ``running`` con el mismo dueño e intento que lo reclamó.
+- ``LeaseHeartbeat``: renueva ``locked_at`` en su propia conexión cada
+  ``interval_seconds`` mientras corre el handler; si el job dejó de ser suyo
+  (reaped y re-reclamado) marca ``lost`` y deja de renovar.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+
+from utils.timezone import utc_now_naive
+
+
+logger = logging.getLogger(__name__)
+
+
+def owned_job_clauses(table, *, job_id: int, owner: str, attempt: int, running_status: str = "running") -> tuple:
+    return (
+        table.c.id == int(job_id),
+        table.c.status == running_status,
+        table.c.locked_by == owner,
+        table.c.attempts == int(attempt),
+    )
+
+
+class LeaseHeartbeat:
+    """Context manager que mantiene vivo el lease de un job reclamado."""
+
+    def __init__(
+        self,
+        engine,
+        table,
+        *,
+        job_id: int,
+        owner: str,
+        attempt: int,
+        interval_seconds: float,
+        running_status: str = "running",
+    ):
+        self.engine = engine
+        self.table = table
+        self.job_id = int(job_id)
+        self.owner = owner
+        self.attempt = int(attempt)
+        self.running_status = running_status
+        self.interval_seconds = max(0.05, float(interval_seconds))
+        self.renewals = 0
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{table.name}-lease-{self.job_id}", daemon=True)
+
+    def _renew(self) -> bool:
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                self.table.update()
+                .where(
+                    *owned_job_clauses(
+                        self.table,
+                        job_id=self.job_id,
+                        owner=self.owner,
+                        attempt=self.attempt,
+                        running_status=self.running_status,
+                    )
+                )
+                .values(locked_at=utc_now_naive())
+            )
+        return int(result.rowcount or 0) > 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                if not self._renew():
+                    self.lost = True
+                    return
+                self.renewals += 1
+            except Exception:
+                logger.warning("job_lease.renew_failed table=%s job_id=%s", self.table.name, self.job_id, exc_info=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc):
+        self._stop.set()
+        self._thread.join(timeout=max(1.0, self.interval_seconds * 2))
+        return False
@@ -0,0 +1,719 @@
+# -*- coding: utf-8 -*-
+"""Gateway SSE asíncrono para los streams live de admin, clientes y monitoreo.
+
+Los generadores SSE de Flask bloquean un worker sync de gunicorn por cada
+pestaña abierta. Este proceso (entrada ``sse`` del Procfile) acepta todas las
+conexiones largas en un único event loop asyncio, lee el Redis Stream del relay
+una sola vez por proceso (``utils.live_stream_reader``) y reparte cada evento
+normalizado a todos los suscriptores. Una reconexión con ``last_stream_id``
+recibe primero lo publicado mientras estuvo desconectada; si ese id ya fue
+recortado del stream recibe ``resync``. La autorización reutiliza los mismos
+decoradores y chequeos de rol de las rutas Flask originales, ejecutados dentro
+de un request context.
+
+Los streams de monitoreo son por viewer (cursor de logs propio): el gateway
+llama al ``poll`` del viewer en el executor en cada tick y entre ticks no
+ocupa ningún hilo. El dashboard lee del agregador compartido
+(``utils.monitoreo_aggregator``); el historial de una candidata solo consulta
+la tabla cuando el tailer de auditoría avisa de un log suyo.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.exceptions import HTTPException
+
+from utils.live_stream_reader import (
+    LiveStreamEntry,
+    SharedStreamReader,
+    register_stream_listener,
+    shared_stream_reader,
+    stream_id_key,
+    unregister_stream_listener,
+)
+from utils.runtime_config import env_int
+from utils.timezone import iso_utc_z, parse_iso_utc
+
+
+ADMIN_STREAM_PATH = "/admin/live/invalidation/stream"
+CLIENTES_STREAM_PATH = "/clientes/live/invalidation/stream"
+MONITOREO_STREAM_PATH = "/admin/monitoreo/stream"
+MONITOREO_CANDIDATA_STREAM_PATH = "/admin/monitoreo/candidatas/<candidata_entity_id>/stream"
+GATEWAY_STATUS_PATH = "/live/gateway/status"
+
+AUDIENCE_STAFF = "staff"
+AUDIENCE_CLIENTE = "cliente"
+AUDIENCE_MONITOREO = "monitoreo"
+
+_HEARTBEAT_SECONDS = 15.0
+_MAX_HEADER_BYTES = 16384
+_CANDIDATA_STREAM_RE = re.compile(r"^/admin/monitoreo/candidatas/([^/]+)/stream$")
+
+
+def _subscriber_queue_size() -> int:
+    return env_int("LIVE_SSE_GATEWAY_QUEUE_SIZE", 256, min_value=8, max_value=10000)
+
+
+def _max_connections() -> int:
+    return env_int("LIVE_SSE_GATEWAY_MAX_CONNECTIONS", 5000, min_value=1, max_value=100000)
+
+
+def sse_frame(event: str, payload: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+@dataclass
+class GatewayGrant:
+    """Resultado de autorizar una conexión entrante."""
+
+    ok: bool
+    status: int = 200
+    audience: str = ""
+    cliente_id: int = 0
+    body: dict | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+    on_heartbeat: Callable[[], None] | None = None
+    on_close: Callable[[], None] | None = None
+    # Streams por viewer (monitoreo): ``poll`` devuelve los frames ``(evento, payload)``
+    # nuevos; se llama cada ``poll_seconds`` o antes si se llama al despertador
+    # que recibe ``bind_wakeup``.
+    poll: Callable[[], list[tuple[str, dict]]] | None = None
+    poll_seconds: float = 1.0
+    bind_wakeup: Callable[[Callable[[], None]], None] | None = None
+
+
+@dataclass(eq=False)
+class GatewaySubscriber:
+    audience: str
+    cliente_id: int = 0
+    queue: asyncio.Queue | None = None
+    overflowed: bool = False
+    # Mientras se reenvía lo perdido, lo nuevo espera en ``held`` con su stream id.
+    replaying: bool = False
+    held: list[tuple[str, bytes]] = field(default_factory=list)
+    opened_at: float = field(default_factory=time.monotonic)
+
+    def matches(self, audience: str, cliente_id: int = 0) -> bool:
+        if audience != self.audience:
+            return False
+        if audience == AUDIENCE_CLIENTE:
+            return int(cliente_id or 0) > 0 and int(cliente_id) == int(self.cliente_id or 0)
+        return True
+
+
+class LiveSseHub:
+    """Fan-out en memoria: un evento entrante se copia a la cola de cada suscriptor.
+
+    Solo debe usarse desde el hilo del event loop; los productores en otros
+    hilos entregan eventos vía ``loop.call_soon_threadsafe(hub.dispatch, ...)``.
+    """
+
+    def __init__(self, *, queue_size: int | None = None):
+        self.queue_size = int(queue_size or _subscriber_queue_size())
+        self.subscribers: set[GatewaySubscriber] = set()
+        self.stats = {"dispatched": 0, "delivered": 0, "dropped_slow": 0, "opened": 0, "closed": 0, "replayed": 0, "resyncs": 0}
+
+    def subscribe(self, *, audience: str, cliente_id: int = 0, replaying: bool = False) -> GatewaySubscriber:
+        sub = GatewaySubscriber(audience=audience, cliente_id=int(cliente_id or 0), replaying=bool(replaying))
+        sub.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(sub)
+        self.stats["opened"] += 1
+        return sub
+
+    def unsubscribe(self, sub: GatewaySubscriber) -> None:
+        if sub in self.subscribers:
+            self.subscribers.discard(sub)
+            self.stats["closed"] += 1
+
+    def release(self, sub: GatewaySubscriber) -> list[tuple[str, bytes]]:
+        """Termina el replay de ``sub`` y devuelve lo retenido mientras tanto."""
+        held, sub.held = sub.held, []
+        sub.replaying = False
+        return held
+
+    def dispatch(self, event: str, payload: dict, *, audience: str, cliente_id: int = 0, stream_id: str = "") -> int:
+        frame = sse_frame(event, payload)
+        delivered = 0
+        self.stats["dispatched"] += 1
+        for sub in list(self.subscribers):
+            if sub.overflowed or not sub.matches(audience, cliente_id):
+                continue
+            if sub.replaying:
+                if len(sub.held) >= self.queue_size:
+                    sub.overflowed = True
+                    self.stats["dropped_slow"] += 1
+                    continue
+                sub.held.append((str(stream_id or ""), frame))
+                delivered += 1
+                continue
+            try:
+                sub.queue.put_nowait(frame)
+                delivered += 1
+            except asyncio.QueueFull:
+                # Cliente lento: se cierra para que reconecte con last_stream_id
+                # en lugar de retener memoria del proceso indefinidamente.
+                sub.overflowed = True
+                self.stats["dropped_slow"] += 1
+        self.stats["delivered"] += delivered
+        return delivered
+
+    def snapshot(self) -> dict[str, Any]:
+        by_audience: dict[str, int] = {}
+        for sub in self.subscribers:
+            by_audience[sub.audience] = by_audience.get(sub.audience, 0) + 1
+        return {"connections": len(self.subscribers), "by_audience": by_audience, **self.stats}
+
+
+def _row_from_envelope(envelope: dict):
+    aggregate = dict((envelope or {}).get("aggregate") or {})
+    return SimpleNamespace(
+        id=0,
+        event_id=str((envelope or {}).get("event_id") or ""),
+        event_type=str((envelope or {}).get("event_type") or ""),
+        aggregate_type=str(aggregate.get("type") or ""),
+        aggregate_id=str(aggregate.get("id") or ""),
+        aggregate_version=aggregate.get("version"),
+        payload=dict((envelope or {}).get("payload") or {}),
+        occurred_at=parse_iso_utc((envelope or {}).get("occurred_at")),
+        created_at=parse_iso_utc((envelope or {}).get("recorded_at")),
+    )
+
+
+def normalize_envelope_for_gateway(envelope: dict, *, stream_id: str) -> list[tuple[str, dict, str, int]]:
+    """Convierte un sobre del relay en entregas ``(evento, payload, audiencia, cliente_id)``.
+
+    Requiere app context: la normalización de clientes resuelve el dueño de la
+    solicitud/conversación una vez por evento, no una vez por conexión.
+    """
+    from admin.routes import _normalize_live_invalidation_event
+    from clientes.routes import (
+        _CLIENTE_LIVE_EVENT_TYPES,
+        _cliente_live_resolve_target,
+        _normalize_cliente_live_event_from_outbox,
+    )
+
+    out: list[tuple[str, dict, str, int]] = []
+    staff_item = _normalize_live_invalidation_event(envelope, stream_id=stream_id)
+    if staff_item is not None:
+        out.append(("invalidation", staff_item, AUDIENCE_STAFF, 0))
+
+    event_type = str((envelope or {}).get("event_type") or "").strip().upper()
+    if event_type in _CLIENTE_LIVE_EVENT_TYPES:
+        row = _row_from_envelope(envelope)
+        owner_id, _sid = _cliente_live_resolve_target(row, cache={})
+        if int(owner_id or 0) > 0:
+            cliente_item = _normalize_cliente_live_event_from_outbox(row, current_cliente_id=int(owner_id))
+            if cliente_item is not None:
+                cliente_item["stream_id"] = str(stream_id or "") or None
+                out.append(("invalidation", cliente_item, AUDIENCE_CLIENTE, int(owner_id)))
+    return out
+
+
+def gateway_deliveries(app_obj, entries: list[LiveStreamEntry]) -> list[tuple[str, str, dict, str, int]]:
+    """Entregas ``(stream_id, evento, payload, audiencia, cliente_id)`` de un lote del lector compartido."""
+    out: list[tuple[str, str, dict, str, int]] = []
+    with app_obj.app_context():
+        for entry in entries:
+            try:
+                deliveries = normalize_envelope_for_gateway(entry.envelope, stream_id=entry.stream_id)
+            except Exception:
+                continue
+            out.extend((entry.stream_id, *delivery) for delivery in deliveries)
+    return out
+
+
+def _run_in_request_context(app_obj, *, path: str, query_string: str, headers: dict[str, str], remote_addr: str, fn):
+    with app_obj.test_request_context(
+        path,
+        query_string=query_string,
+        headers=headers,
+        environ_base={"REMOTE_ADDR": remote_addr or "0.0.0.0"},
+    ):
+        return fn()
+
+
+def _grant_from_view_result(result) -> GatewayGrant | None:
+    if result is None:
+        return None
+    status = int(getattr(result, "status_code", 0) or 0)
+    headers = {}
+    location = getattr(result, "headers", {}).get("Location") if hasattr(result, "headers") else None
+    if location:
+        headers["Location"] = str(location)
+    body = None
+    try:
+        body = result.get_json(silent=True)
+    except Exception:
+        body = None
+    return GatewayGrant(ok=False, status=status or 403, body=body, headers=headers)
+
+
+def _evaluate_probe(probe) -> GatewayGrant:
+    try:
+        result = probe()
+    except HTTPException as exc:
+        return GatewayGrant(ok=False, status=int(exc.code or 403), body={"ok": False, "error": exc.name})
+    if isinstance(result, GatewayGrant):
+        return result
+    return _grant_from_view_result(result) or GatewayGrant(ok=False, status=403)
+
+
+def _route_template(path: str) -> str:
+    """Ruta registrada que atiende ``path`` (las de candidata llevan el id en el path)."""
+    if _CANDIDATA_STREAM_RE.match(path or ""):
+        return MONITOREO_CANDIDATA_STREAM_PATH
+    return path
+
+
+def authorize_admin_stream(app_obj, *, path: str, query_string: str, headers: dict[str, str], remote_addr: str) -> GatewayGrant:
+    """Mismas reglas que ``admin.live_invalidation_stream`` antes de abrir el generador."""
+    from flask_login import current_user, login_required
+
+    from admin.routes import (
+        _audit_live_security_block,
+        _enforce_live_rate_limit,
+        _live_access_allowed,
+        _live_invalidation_stream_enabled,
+        _live_stream_refresh,
+        _live_stream_register,
+        _live_stream_release,
+    )
+    from admin.decorators import staff_required
+    from utils.rbac import role_for_user
+
+    import secrets
+
+    slot_id = secrets.token_hex(12)
+
+    def _in_ctx(fn):
+        return _run_in_request_context(
+            app_obj, path=path, query_string=query_string, headers=headers, remote_addr=remote_addr, fn=fn
+        )
+
+    @login_required
+    @staff_required
+    def _probe():
+        if not _live_access_allowed("invalidation_stream"):
+            _audit_live_security_block(
+                action_type="LIVE_ACCESS_DENIED",
+                summary="Acceso denegado a live invalidation stream",
+                reason="live_stream_role_forbidden",
+                metadata={"path": path, "role": role_for_user(current_user), "capability": "invalidation_stream"},
+            )
+            return GatewayGrant(ok=False, status=403, body={"ok": False, "error": "forbidden"})
+        if not _live_invalidation_stream_enabled():
+            return GatewayGrant(
+                ok=False,
+                status=200,
+                body={"ok": True, "mode": "poll_only", "reason": "sse_disabled"},
+                headers={"X-Live-Invalidation-Mode": "poll_only"},
+            )
+        rl = _enforce_live_rate_limit("stream_open")
+        if rl:
+            retry = int(rl.get("retry_after_sec") or 1)
+            return GatewayGrant(
+                ok=False,
+                status=429,
+                body={"ok": False, "error": "rate_limited", "scope": rl.get("scope"), "retry_after_sec": retry},
+                headers={"Retry-After": str(retry)},
+            )
+        slot = _live_stream_register(slot_id)
+        if not bool(slot.get("ok")):
+            return GatewayGrant(
+                ok=False,
+                status=429,
+                body={"ok": False, "error": "concurrency_limit", "scope": slot.get("scope")},
+            )
+        return GatewayGrant(
+            ok=True,
+            audience=AUDIENCE_STAFF,
+            on_heartbeat=lambda: _in_ctx(lambda: _live_stream_refresh(slot_id)),
+            on_close=lambda: _in_ctx(lambda: _live_stream_release(slot_id)),
+        )
+
+    return _in_ctx(lambda: _evaluate_probe(_probe))
+
+
+def authorize_clientes_stream(app_obj, *, path: str, query_string: str, headers: dict[str, str], remote_addr: str) -> GatewayGrant:
+    """Mismas reglas que ``clientes.clientes_live_invalidation_stream``."""
+    from flask_login import current_user, login_required
+
+    from clientes.routes import _clientes_live_sse_enabled, _safe_int
+    from decorators import cliente_required
+
+    @login_required
+    @cliente_required
+    def _probe():
+        if not _clientes_live_sse_enabled():
+            return GatewayGrant(
+                ok=False,
+                status=200,
+                body={"ok": True, "mode": "poll_only", "reason": "sse_disabled"},
+                headers={"X-Realtime-Mode": "poll_only"},
+            )
+        cliente_id = _safe_int(getattr(current_user, "id", 0), default=0)
+        if cliente_id <= 0:
+            return GatewayGrant(ok=False, status=403, body={"ok": False, "error": "unauthorized"})
+        return GatewayGrant(ok=True, audience=AUDIENCE_CLIENTE, cliente_id=cliente_id)
+
+    return _run_in_request_context(
+        app_obj, path=path, query_string=query_string, headers=headers, remote_addr=remote_addr, fn=lambda: _evaluate_probe(_probe)
+    )
+
+
+def _in_app_context(app_obj, fn):
+    with app_obj.app_context():
+        return fn()
+
+
+def authorize_monitoreo_stream(app_obj, *, path: str, query_string: str, headers: dict[str, str], remote_addr: str) -> GatewayGrant:
+    """Mismas reglas que ``admin.monitoreo_stream``; los payloads salen del agregador compartido."""
+    from flask import request
+    from flask_login import login_required
+
+    from admin.decorators import admin_required
+    from admin.routes import _MonitoreoStreamViewer, _monitoreo_aggregator
+
+    @login_required
+    @admin_required
+    def _probe():
+        viewer = _MonitoreoStreamViewer(request.args.get("last_id", type=int) or 0)
+        aggregator = _monitoreo_aggregator()
+        aggregator.viewer_opened()
+        opened_at = time.time()
+        return GatewayGrant(
+            ok=True,
+            audience=AUDIENCE_MONITOREO,
+            poll=lambda: _in_app_context(app_obj, viewer.poll),
+            poll_seconds=1.0,
+            on_close=lambda: aggregator.viewer_closed(connected_seconds=time.time() - opened_at),
+        )
+
+    return _run_in_request_context(
+        app_obj, path=path, query_string=query_string, headers=headers, remote_addr=remote_addr, fn=lambda: _evaluate_probe(_probe)
+    )
+
+
+def authorize_monitoreo_candidata_stream(app_obj, *, path: str, query_string: str, headers: dict[str, str], remote_addr: str) -> GatewayGrant:
+    """Mismas reglas que ``admin.monitoreo_candidata_stream``; consulta solo tras un aviso del tailer."""
+    from flask import request
+    from flask_login import login_required
+
+    from admin.decorators import admin_required
+    from admin.routes import _MonitoreoCandidataStreamViewer
+    from config_app import db
+    from utils.audit_log_tail import audit_log_tailer, entity_key
+
+    match = _CANDIDATA_STREAM_RE.match(path or "")
+    if match is None:
+        return GatewayGrant(ok=False, status=404, body={"ok": False, "error": "not_found"})
+    candidata_entity_id = unquote(match.group(1))
+
+    @login_required
+    @admin_required
+    def _probe():
+        viewer = _MonitoreoCandidataStreamViewer(candidata_entity_id, request.args.get("last_id", type=int) or 0)
+        tailer = audit_log_tailer(app_obj, engine=db.engine)
+        subscription = tailer.subscribe(entity_key("candidata", candidata_entity_id))
+
+        def _poll() -> list[tuple[str, dict]]:
+            if not subscription.pending():
+                return []
+            frames: list[tuple[str, dict]] = []
+            while True:
+                batch = viewer.poll()
+                frames.extend(batch)
+                if len(batch) < viewer.batch_size:
+                    return frames
+
+        def _bind_wakeup(wake: Callable[[], None]) -> None:
+            subscription.on_notify = wake
+
+        return GatewayGrant(
+            ok=True,
+            audience=AUDIENCE_MONITOREO,
+            poll=lambda: _in_app_context(app_obj, _poll),
+            poll_seconds=tailer.poll_interval,
+            bind_wakeup=_bind_wakeup,
+            on_close=subscription.close,
+        )
+
+    return _run_in_request_context(
+        app_obj, path=path, query_string=query_string, headers=headers, remote_addr=remote_addr, fn=lambda: _evaluate_probe(_probe)
+    )
+
+
+_ROUTE_AUTHORIZERS = {
+    ADMIN_STREAM_PATH: authorize_admin_stream,
+    CLIENTES_STREAM_PATH: authorize_clientes_stream,
+    MONITOREO_STREAM_PATH: authorize_monitoreo_stream,
+    MONITOREO_CANDIDATA_STREAM_PATH: authorize_monitoreo_candidata_stream,
+}
+
+_STATUS_TEXT = {200: "OK", 302: "Found", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+class LiveSseGateway:
+    """Servidor HTTP/1.1 mínimo (solo GET) que atiende las rutas SSE en asyncio."""
+
+    def __init__(
+        self,
+        *,
+        app_obj,
+        hub: LiveSseHub | None = None,
+        authorizers: dict | None = None,
+        heartbeat_seconds: float = _HEARTBEAT_SECONDS,
+        reader: SharedStreamReader | None = None,
+    ):
+        self.app_obj = app_obj
+        self.hub = hub or LiveSseHub()
+        self.reader = reader
+        self.authorizers = dict(authorizers or _ROUTE_AUTHORIZERS)
+        self.heartbeat_seconds = float(heartbeat_seconds)
+        self.max_connections = _max_connections()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, str, dict[str, str]] | None:
+        try:
+            raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10.0)
+        except Exception:
+            return None
+        if len(raw) > _MAX_HEADER_BYTES:
+            return None
+        lines = raw.decode("latin-1").split("\r\n")
+        parts = (lines[0] or "").split(" ")
+        if len(parts) < 3:
+            return None
+        method, target = parts[0].upper(), parts[1]
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            headers[key.strip()] = value.strip()
+        split = urlsplit(target)
+        return method, split.path, split.query, headers
+
+    @staticmethod
+    async def _write_plain(writer: asyncio.StreamWriter, status: int, body: dict | None, headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(body or {"ok": False}, ensure_ascii=False).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {int(status)} {_STATUS_TEXT.get(int(status), 'Error')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(data)}",
+            "Cache-Control: no-cache",
+            "Connection: close",
+        ]
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            parsed = await self._read_request(reader)
+            if parsed is None:
+                await self._write_plain(writer, 400, {"ok": False, "error": "bad_request"})
+                return
+            method, path, query_string, headers = parsed
+            if method != "GET":
+                await self._write_plain(writer, 400, {"ok": False, "error": "method_not_allowed"})
+                return
+            if path == GATEWAY_STATUS_PATH:
+                await self._write_plain(writer, 200, {"ok": True, **self.hub.snapshot()})
+                return
+            authorizer = self.authorizers.get(_route_template(path))
+            if authorizer is None:
+                await self._write_plain(writer, 404, {"ok": False, "error": "not_found"})
+                return
+            if len(self.hub.subscribers) >= self.max_connections:
+                await self._write_plain(writer, 503, {"ok": False, "error": "gateway_full"}, {"Retry-After": "5"})
+                return
+
+            peer = writer.get_extra_info("peername") or ("0.0.0.0", 0)
+            loop = asyncio.get_running_loop()
+            grant: GatewayGrant = await loop.run_in_executor(
+                None,
+                lambda: authorizer(
+                    self.app_obj,
+                    path=path,
+                    query_string=query_string,
+                    headers=headers,
+                    remote_addr=str(peer[0] or ""),
+                ),
+            )
+            if not grant.ok:
+                await self._write_plain(writer, grant.status, grant.body, grant.headers)
+                return
+            if grant.poll is not None:
+                await self._poll_stream(writer, grant)
+                return
+            await self._stream(writer, grant, last_stream_id=(parse_qs(query_string).get("last_stream_id") or [""])[0])
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def _replay(self, sub: GatewaySubscriber, last_stream_id: str) -> tuple[list[bytes], str] | None:
+        """Frames publicados después de ``last_stream_id`` para ``sub``; ``None`` si hay que resincronizar."""
+        entries = self.reader.replay_after(last_stream_id) if self.reader is not None else None
+        if entries is None:
+            return None
+        frames = [
+            sse_frame(event, payload)
+            for _sid, event, payload, audience, cliente_id in gateway_deliveries(self.app_obj, entries)
+            if sub.matches(audience, cliente_id)
+        ]
+        return frames, (entries[-1].stream_id if entries else last_stream_id)
+
+    async def _catch_up(self, writer: asyncio.StreamWriter, sub: GatewaySubscriber, last_stream_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            replayed = await loop.run_in_executor(None, self._replay, sub, last_stream_id)
+        except Exception:
+            replayed = None
+        if replayed is None:
+            self.hub.stats["resyncs"] += 1
+            cursor = self.reader.buffer.last_stream_id if self.reader is not None else ""
+            writer.write(sse_frame("resync", {"reason": "cursor_expired", "last_stream_id": cursor or None}))
+            replayed_until = (-1, -1)
+        else:
+            frames, last = replayed
+            self.hub.stats["replayed"] += len(frames)
+            for frame in frames:
+                writer.write(frame)
+            replayed_until = stream_id_key(last)
+        for stream_id, frame in self.hub.release(sub):
+            if stream_id_key(stream_id) > replayed_until:
+                writer.write(frame)
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, grant: GatewayGrant, *, last_stream_id: str = "") -> None:
+        loop = asyncio.get_running_loop()
+        sub = self.hub.subscribe(audience=grant.audience, cliente_id=grant.cliente_id, replaying=bool(last_stream_id))
+        try:
+            writer.write(
+                (
+                    "HTTP/1.1 200 OK\r\n"
+                    "Content-Type: text/event-stream; charset=utf-8\r\n"
+                    "Cache-Control: no-cache\r\n"
+                    "Connection: keep-alive\r\n"
+                    "X-Accel-Buffering: no\r\n"
+                    "X-Live-Gateway: asyncio\r\n\r\n"
+                ).encode("latin-1")
+            )
+            writer.write(sse_frame("heartbeat", {"ts": iso_utc_z(), "mode": "gateway", "last_stream_id": last_stream_id or None}))
+            await writer.drain()
+            if last_stream_id:
+                await self._catch_up(writer, sub, last_stream_id)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    frame = sse_frame("heartbeat", {"ts": iso_utc_z(), "mode": "gateway"})
+                    if grant.on_heartbeat is not None:
+                        loop.run_in_executor(None, grant.on_heartbeat)
+                if sub.overflowed:
+                    writer.write(sse_frame("reconnect", {"reason": "slow_consumer"}))
+                    await writer.drain()
+                    return
+                writer.write(frame)
+                await writer.drain()
+        finally:
+            self.hub.unsubscribe(sub)
+            if grant.on_close is not None:
+                loop.run_in_executor(None, grant.on_close)
+
+    async def _poll_stream(self, writer: asyncio.StreamWriter, grant: GatewayGrant) -> None:
+        """Stream por viewer: ``grant.poll`` corre en el executor solo durante cada tick."""
+        loop = asyncio.get_running_loop()
+        sub = self.hub.subscribe(audience=grant.audience)
+        wake = asyncio.Event()
+        if grant.bind_wakeup is not None:
+            grant.bind_wakeup(lambda: loop.call_soon_threadsafe(wake.set))
+        try:
+            writer.write(
+                (
+                    "HTTP/1.1 200 OK\r\n"
+                    "Content-Type: text/event-stream; charset=utf-8\r\n"
+                    "Cache-Control: no-cache\r\n"
+                    "Connection: keep-alive\r\n"
+                    "X-Accel-Buffering: no\r\n"
+                    "X-Live-Gateway: asyncio\r\n\r\n"
+                ).encode("latin-1")
+            )
+            writer.write(sse_frame("heartbeat", {"ts": iso_utc_z(), "mode": "gateway"}))
+            last_heartbeat = time.monotonic()
+            while True:
+                wake.clear()
+                for event, payload in await loop.run_in_executor(None, grant.poll):
+                    writer.write(sse_frame(event, payload))
+                now = time.monotonic()
+                if now - last_heartbeat >= self.heartbeat_seconds:
+                    writer.write(sse_frame("heartbeat", {"ts": iso_utc_z(), "mode": "gateway"}))
+                    last_heartbeat = now
+                await writer.drain()
+                timeout = min(float(grant.poll_seconds), max(0.0, self.heartbeat_seconds - (time.monotonic() - last_heartbeat)))
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.hub.unsubscribe(sub)
+            if grant.on_close is not None:
+                loop.run_in_executor(None, grant.on_close)
+
+    def _fan_out(self, loop: asyncio.AbstractEventLoop):
+        """Listener del lector compartido: normaliza en su hilo y despacha en el event loop."""
+
+        def _on_entries(entries: list[LiveStreamEntry]) -> None:
+            for stream_id, event, payload, audience, cliente_id in gateway_deliveries(self.app_obj, entries):
+                loop.call_soon_threadsafe(
+                    lambda s=stream_id, e=event, p=payload, a=audience, c=cliente_id: self.hub.dispatch(
+                        e, p, audience=a, cliente_id=c, stream_id=s
+                    )
+                )
+
+        return _on_entries
+
+    async def serve(self, *, host: str, port: int):
+        loop = asyncio.get_running_loop()
+        listener = self._fan_out(loop)
+        register_stream_listener(listener)
+        if self.reader is None:
+            self.reader = shared_stream_reader(self.app_obj)
+        server = await asyncio.start_server(self.handle_connection, host=host, port=int(port), backlog=2048)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            unregister_stream_listener(listener)
+
+
+@click.group("live-sse-gateway")
+def live_sse_gateway_cli():
+    """Gateway SSE asíncrono para streams live (admin/clientes/monitoreo)."""
+
+
+@live_sse_gateway_cli.command("run")
+@click.option("--host", default="0.0.0.0", show_default=True, help="Interfaz de escucha.")
+@click.option("--port", default=0, type=int, help="Puerto; si se omite usa LIVE_SSE_GATEWAY_PORT, PORT o 8090.")
+@with_appcontext
+def live_sse_gateway_run_command(host: str, port: int):
+    resolved_port = int(port or 0) or env_int("LIVE_SSE_GATEWAY_PORT", 0, min_value=0, max_value=65535) or env_int("PORT", 8090, min_value=1, max_value=65535)
+    app_obj = current_app._get_current_object()
+    gateway = LiveSseGateway(app_obj=app_obj)
+    click.echo(f"live_sse_gateway host={host} port={resolved_port} max_connections={gateway.max_connections}")
+    asyncio.run(gateway.serve(host=host, port=resolved_port))
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""Lector compartido del Redis Stream del relay con ring buffer en memoria.
+
+Un único hilo por proceso hace ``XREAD`` sobre ``_redis_stream_key()`` y guarda
+los últimos eventos (sobre + versiones normalizadas) indexados por stream id.
+Las conexiones SSE y el poll live reanudan desde ``last_stream_id`` leyendo el
+buffer, así las lecturas a Redis pasan de O(clientes) a O(procesos).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from utils.runtime_config import env_int
+
+
+_READ_BLOCK_MS = 1500
+_READ_COUNT = 100
+
+_NORMALIZERS: dict[str, Callable[..., dict | None]] = {}
+_LISTENERS: list[Callable[[list["LiveStreamEntry"]], None]] = []
+_READER_LOCK = threading.Lock()
+_READER: "SharedStreamReader | None" = None
+
+
+def _buffer_size() -> int:
+    return env_int("LIVE_STREAM_BUFFER_SIZE", 2000, min_value=50, max_value=50000)
+
+
+def stream_id_key(stream_id: str | None) -> tuple[int, int]:
+    """Orden total de ids ``<ms>-<seq>`` de Redis Streams; inválidos quedan al inicio."""
+    txt = str(stream_id or "").strip()
+    if not txt:
+        return (-1, -1)
+    ms, _, seq = txt.partition("-")
+    try:
+        return (int(ms), int(seq or 0))
+    except Exception:
+        return (-1, -1)
+
+
+def register_stream_normalizer(name: str, fn: Callable[..., dict | None]) -> None:
+    """Registra ``fn(envelope, stream_id=...)``; se aplica una vez por evento al ingresar al buffer."""
+    _NORMALIZERS[str(name)] = fn
+
+
+def register_stream_listener(fn: Callable[[list["LiveStreamEntry"]], None]) -> None:
+    """Callback invocado desde el hilo lector con cada lote nuevo de entradas."""
+    if fn not in _LISTENERS:
+        _LISTENERS.append(fn)
+
+
+def unregister_stream_listener(fn: Callable[[list["LiveStreamEntry"]], None]) -> None:
+    if fn in _LISTENERS:
+        _LISTENERS.remove(fn)
+
+
+@dataclass(frozen=True)
+class LiveStreamEntry:
+    stream_id: str
+    envelope: dict
+    normalized: dict[str, dict | None] = field(default_factory=dict)
+
+
+def build_stream_entry(stream_id: str, envelope: dict) -> LiveStreamEntry:
+    normalized: dict[str, dict | None] = {}
+    for name, fn in list(_NORMALIZERS.items()):
+        try:
+            normalized[name] = fn(envelope, stream_id=stream_id)
+        except Exception:
+            normalized[name] = None
+    return LiveStreamEntry(stream_id=str(stream_id), envelope=envelope, normalized=normalized)
+
+
+class LiveStreamBuffer:
+    """Ring buffer acotado de entradas ordenadas por stream id.
+
+    ``floor_id`` es el id más reciente que ya NO está en el buffer (evictado o
+    anterior al arranque): cualquier cursor ``>= floor_id`` se puede servir
+    completo desde memoria.
+    """
+
+    def __init__(self, maxlen: int | None = None):
+        self.maxlen = int(maxlen or _buffer_size())
+        self._entries: deque[LiveStreamEntry] = deque()
+        self._cond = threading.Condition()
+        self.floor_id = "0-0"
+        self.last_stream_id = "0-0"
+        self.head_id = ""
+
+    def reset(self, *, floor_id: str, entries: list[LiveStreamEntry] | None = None, head_id: str = "") -> None:
+        with self._cond:
+            self._entries.clear()
+            self.floor_id = str(floor_id or "0-0")
+            self.last_stream_id = self.floor_id
+            self.head_id = str(head_id or "")
+            for entry in (entries or []):
+                self._append_locked(entry)
+            self._cond.notify_all()
+
+    def _append_locked(self, entry: LiveStreamEntry) -> None:
+        if stream_id_key(entry.stream_id) <= stream_id_key(self.last_stream_id):
+            return
+        self._entries.append(entry)
+        self.last_stream_id = entry.stream_id
+        while len(self._entries) > self.maxlen:
+            evicted = self._entries.popleft()
+            self.floor_id = evicted.stream_id
+
+    def append_many(self, entries: list[LiveStreamEntry], *, last_stream_id: str | None = None) -> None:
+        with self._cond:
+            for entry in entries:
+                self._append_locked(entry)
+            if last_stream_id and stream_id_key(last_stream_id) > stream_id_key(self.last_stream_id):
+                # Entradas sin evento válido también avanzan el cursor.
+                self.last_stream_id = str(last_stream_id)
+            self._cond.notify_all()
+
+    def resolve_cursor(self, after_stream_id: str | None) -> str:
+        txt = str(after_stream_id or "").strip()
+        if not txt or txt == "$":
+            return self.last_stream_id
+        return txt
+
+    def covers(self, after_stream_id: str | None) -> bool:
+        cursor = self.resolve_cursor(after_stream_id)
+        if stream_id_key(cursor) == (-1, -1):
+            return False
+        return stream_id_key(cursor) >= stream_id_key(self.floor_id)
+
+    def retains(self, after_stream_id: str | None) -> bool:
+        """Como ``covers``, pero falso si el cursor es anterior al primer id del stream al arrancar.
+
+        Con ``floor_id == "0-0"`` el buffer tiene todo lo que quedaba en Redis; un
+        cursor más viejo que eso apunta a eventos que el relay ya recortó.
+        """
+        if not self.covers(after_stream_id):
+            return False
+        if self.floor_id != "0-0" or not self.head_id:
+            return True
+        return stream_id_key(self.resolve_cursor(after_stream_id)) >= stream_id_key(self.head_id)
+
+    def read_after(self, after_stream_id: str | None, *, limit: int = 25) -> tuple[list[LiveStreamEntry], str] | None:
+        """Entradas posteriores al cursor y nuevo cursor; ``None`` si el buffer ya no lo cubre."""
+        with self._cond:
+            cursor = self.resolve_cursor(after_stream_id)
+            if not self.covers(cursor):
+                return None
+            cursor_key = stream_id_key(cursor)
+            out: list[LiveStreamEntry] = []
+            for entry in self._entries:
+                if stream_id_key(entry.stream_id) <= cursor_key:
+                    continue
+                out.append(entry)
+                if len(out) >= max(1, int(limit)):
+                    break
+            if out:
+                return out, out[-1].stream_id
+            if stream_id_key(self.last_stream_id) > cursor_key:
+                cursor = self.last_stream_id
+            return [], cursor
+
+    def wait_after(self, after_stream_id: str | None, *, timeout: float) -> bool:
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        with self._cond:
+            cursor_key = stream_id_key(self.resolve_cursor(after_stream_id))
+            while stream_id_key(self.last_stream_id) <= cursor_key:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(timeout=left)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _decode_entry(entry_id: Any, fields: Any) -> LiveStreamEntry | None:
+    raw = fields.get("event") if isinstance(fields, dict) else None
+    if not raw:
+        return None
+    try:
+        envelope = json.loads(raw)
+    except Exception:
+        return None
+    if not isinstance(envelope, dict):
+        return None
+    return build_stream_entry(str(entry_id), envelope)
+
+
+class SharedStreamReader(threading.Thread):
+    """Hilo lector único por proceso (se recrea tras ``fork`` de gunicorn)."""
+
+    def __init__(self, *, app_obj, redis_client=None, stream_key: str = "", buffer: LiveStreamBuffer | None = None):
+        super().__init__(name="live-stream-reader", daemon=True)
+        self.app_obj = app_obj
+        self.redis_client = redis_client
+        self.stream_key = stream_key
+        self.buffer = buffer if buffer is not None else LiveStreamBuffer()
+        self.pid = os.getpid()
+        self.stop_event = threading.Event()
+        self.ready_event = threading.Event()
+        self.healthy = False
+        self.last_error = ""
+        self.stats = {"reads": 0, "entries": 0, "errors": 0, "bootstraps": 0, "resumes": 0}
+
+    def _connect(self) -> None:
+        from utils.outbox_relay import _redis_client, _redis_stream_key
+
+        if self.redis_client is None or not self.stream_key:
+            with self.app_obj.app_context():
+                self.redis_client = self.redis_client or _redis_client()
+                self.stream_key = self.stream_key or _redis_stream_key()
+
+    def bootstrap(self) -> None:
+        """Precarga el buffer con la cola reciente del stream para permitir resumes tras reinicio."""
+        self._connect()
+        rows = self.redis_client.xrevrange(self.stream_key, count=self.buffer.maxlen + 1) or []
+        rows = list(reversed(rows))
+        if len(rows) > self.buffer.maxlen:
+            floor_id = str(rows[0][0])
+            rows = rows[1:]
+        else:
+            floor_id = "0-0"
+        entries = [e for e in (_decode_entry(eid, fields) for eid, fields in rows) if e is not None]
+        self.buffer.reset(floor_id=floor_id, entries=entries, head_id=str(rows[0][0]) if rows and floor_id == "0-0" else "")
+        if rows:
+            self.buffer.append_many([], last_stream_id=str(rows[-1][0]))
+        self.stats["bootstraps"] += 1
+
+    def read_once(self) -> list[LiveStreamEntry]:
+        messages = self.redis_client.xread(
+            {self.stream_key: self.buffer.last_stream_id},
+            count=_READ_COUNT,
+            block=_READ_BLOCK_MS,
+        ) or []
+        self.stats["reads"] += 1
+        entries: list[LiveStreamEntry] = []
+        last_id = None
+        for _stream_name, rows in (messages or []):
+            for entry_id, fields in (rows or []):
+                last_id = str(entry_id)
+                entry = _decode_entry(entry_id, fields)
+                if entry is not None:
+                    entries.append(entry)
+        if last_id is not None:
+            self.buffer.append_many(entries, last_stream_id=last_id)
+            self.stats["entries"] += len(entries)
+        self._dispatch(entries)
+        return entries
+
+    def _dispatch(self, entries: list[LiveStreamEntry]) -> None:
+        if not entries:
+            return
+        for listener in list(_LISTENERS):
+            try:
+                listener(entries)
+            except Exception:
+                self.stats["errors"] += 1
+
+    def resume(self) -> bool:
+        """Tras un error de Redis, entrega lo escrito en el stream durante la caída.
+
+        ``XRANGE`` desde el último id entregado, con tope en el tamaño del buffer,
+        y reparte esas entradas a los listeners antes de volver al ``XREAD``.
+        Falso si el hueco no se puede cubrir (recortado o más largo que el
+        buffer): entonces toca ``bootstrap`` y los clientes resincronizan.
+        """
+        self._connect()
+        cursor = self.buffer.last_stream_id
+        cap = self.buffer.maxlen
+        first = self.redis_client.xrange(self.stream_key, min="-", max="+", count=1) or []
+        # ``0-0``: el stream estaba vacío al arrancar; todo lo que hay ahora es nuevo.
+        if first and cursor != "0-0" and stream_id_key(cursor) < stream_id_key(str(first[0][0])):
+            return False
+        rows = self.redis_client.xrange(self.stream_key, min=f"({cursor}", max="+", count=cap + 1) or []
+        if len(rows) > cap:
+            return False
+        entries = [e for e in (_decode_entry(eid, fields) for eid, fields in rows) if e is not None]
+        if rows:
+            self.buffer.append_many(entries, last_stream_id=str(rows[-1][0]))
+            self.stats["entries"] += len(entries)
+        self.stats["resumes"] += 1
+        self._dispatch(entries)
+        return True
+
+    def run(self) -> None:
+        backoff = 1.0
+        needs_bootstrap = True
+        while not self.stop_event.is_set():
+            try:
+                if needs_bootstrap:
+                    # Reconexión: reanudar desde el cursor; solo se rearranca si hay hueco.
+                    if not (self.stats["bootstraps"] and self.resume()):
+                        self.bootstrap()
+                    needs_bootstrap = False
+                    self.healthy = True
+                    self.ready_event.set()
+                    backoff = 1.0
+                self.read_once()
+            except Exception as exc:
+                if type(exc).__name__ == "TimeoutError" and not needs_bootstrap:
+                    continue
+                self.healthy = False
+                self.last_error = f"{type(exc).__name__}: {exc}"[:300]
+                self.stats["errors"] += 1
+                self.ready_event.set()
+                self.redis_client = None
+                needs_bootstrap = True
+                self.stop_event.wait(backoff)
+                backoff = min(30.0, backoff * 2)
+
+    def replay_after(self, after_stream_id: str | None, *, limit: int | None = None) -> list[LiveStreamEntry] | None:
+        """Entradas posteriores a ``after_stream_id`` para reanudar una conexión.
+
+        Sale del buffer si lo retiene y si no de ``XRANGE`` en Redis. ``None``
+        cuando el cursor es anterior a lo que queda en el stream (recortado),
+        hay más de ``limit`` pendientes o Redis no responde: el cliente debe
+        resincronizar.
+        """
+        cap = max(1, int(limit or self.buffer.maxlen))
+        cursor = str(after_stream_id or "").strip()
+        if stream_id_key(cursor) == (-1, -1):
+            return None
+        if self.healthy and self.buffer.retains(cursor):
+            result = self.buffer.read_after(cursor, limit=cap + 1)
+            if result is not None:
+                entries = result[0]
+                return entries if len(entries) <= cap else None
+        try:
+            self._connect()
+            first = self.redis_client.xrange(self.stream_key, min="-", max="+", count=1) or []
+            if first and stream_id_key(cursor) < stream_id_key(str(first[0][0])):
+                return None
+            rows = self.redis_client.xrange(self.stream_key, min=f"({cursor}", max="+", count=cap + 1) or []
+        except Exception:
+            return None
+        if len(rows) > cap:
+            return None
+        return [e for e in (_decode_entry(eid, fields) for eid, fields in rows) if e is not None]
+
+    def wait_ready(self, timeout: float = 2.0) -> bool:
+        self.ready_event.wait(timeout=max(0.0, float(timeout)))
+        return bool(self.healthy)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "healthy": bool(self.healthy),
+            "buffered": len(self.buffer),
+            "floor_id": self.buffer.floor_id,
+            "last_stream_id": self.buffer.last_stream_id,
+            "last_error": self.last_error or None,
+            **self.stats,
+        }
+
+
+def shared_stream_reader(app_obj) -> SharedStreamReader:
+    """Devuelve (y arranca si hace falta) el lector compartido del proceso actual."""
+    global _READER
+    reader = _READER
+    if reader is not None and reader.pid == os.getpid() and reader.is_alive():
+        return reader
+    with _READER_LOCK:
+        reader = _READER
+        if reader is None or reader.pid != os.getpid() or not reader.is_alive():
+            reader = SharedStreamReader(app_obj=app_obj)
+            reader.start()
+            _READER = reader
+    return reader
+
+
+def stop_shared_stream_reader() -> None:
+    global _READER
+    with _READER_LOCK:
+        reader = _READER
+        _READER = None
+    if reader is not None:
+        reader.stop_event.set()
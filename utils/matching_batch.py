@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""Scoring por lotes del pool de matching (NumPy).
+
+``_score_candidate`` evalúa candidata por candidata: tokeniza dirección,
+funciones y horario, corre regex y arma dicts en cada llamada. Aquí el pool se
+codifica una vez (``encode_pool``):
+
+- tokens de ubicación, funciones y horario como índice invertido
+  token → posiciones (``int32``); la intersección con los tokens de la
+  solicitud es una suma de postings, no un ``set &`` por candidata;
+- ciudad y modalidad como códigos (la modalidad se evalúa una vez por valor
+  distinto), edad y años de experiencia como arrays.
+
+``score_pool`` calcula todos los componentes del pool entero en una pasada y
+``score_rows`` arma el dict explicativo (mismo ensamblado que
+``_score_candidate``) solo para las filas pedidas. La paridad con
+``_score_candidate`` la cubre ``tests/test_matching_batch.py``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from utils.age_normalizer import parse_candidata_age_int
+from utils.compat_cache import compute_match_many
+from utils.compat_engine import load_cliente_profile, normalize_horarios_tokens
+from utils.matching_service import (
+    _as_text,
+    _assemble_score_row,
+    _bonus_from_score,
+    _is_nonempty,
+    _parse_first_int,
+    build_solicitud_profile,
+)
+from utils.modality_normalizer import evaluate_modalidad_match
+from utils.text_normalizer import infer_city, location_tokens, normalize_text, skill_tokens
+
+
+_DIURNOS = frozenset({"8am-5pm", "9am-6pm", "10am-6pm"})
+_MISSING_SKILL_NOTES = (
+    ("cuidar_ninos", "Sin experiencia declarada con niños"),
+    ("cuidar_envejecientes", "Sin experiencia declarada con envejecientes"),
+    ("enfermeria", "Sin experiencia declarada en enfermería"),
+)
+
+
+class CandidateFeatures(NamedTuple):
+    """Lo que el scoring necesita de una candidata, ya tokenizado."""
+
+    city: Optional[str]
+    location_tokens: frozenset
+    horario_tokens: frozenset
+    skill_tokens: frozenset
+    modalidad: Any
+    age: Optional[int]
+    years: Optional[int]
+    anos_nonempty: bool
+    no_pets: bool
+    has_test: bool
+
+
+def candidate_features(cand) -> CandidateFeatures:
+    cand_text = f"{_as_text(getattr(cand, 'direccion_completa', None))} {_as_text(getattr(cand, 'rutas_cercanas', None))}".strip()
+
+    skills = set(skill_tokens(getattr(cand, "areas_experiencia", None)))
+    for val in (getattr(cand, "compat_fortalezas", None) or []):
+        skills |= skill_tokens(val)
+    if getattr(cand, "sabe_planchar", False):
+        skills.add("planchar")
+
+    limits = {normalize_text(x) for x in (getattr(cand, "compat_limites_no_negociables", None) or [])}
+    anos = getattr(cand, "anos_experiencia", None)
+    return CandidateFeatures(
+        city=infer_city(cand_text),
+        location_tokens=frozenset(location_tokens(cand_text)),
+        horario_tokens=frozenset(normalize_horarios_tokens(getattr(cand, "compat_disponibilidad_horario", None))),
+        skill_tokens=frozenset(skills),
+        modalidad=getattr(cand, "modalidad_trabajo_preferida", None),
+        age=parse_candidata_age_int(_as_text(getattr(cand, "edad", None))),
+        years=_parse_first_int(anos),
+        anos_nonempty=_is_nonempty(anos),
+        no_pets=("no mascotas" in limits or "no_mascotas" in limits),
+        has_test=bool(getattr(cand, "compat_test_candidata_json", None)),
+    )
+
+
+class _TokenIndex:
+    """Índice invertido token → posiciones del pool."""
+
+    __slots__ = ("postings", "size")
+
+    def __init__(self, token_sets: Sequence[Iterable[str]]) -> None:
+        buckets: dict[str, list[int]] = {}
+        for pos, toks in enumerate(token_sets):
+            for tok in toks:
+                buckets.setdefault(tok, []).append(pos)
+        self.postings = {tok: np.asarray(positions, dtype=np.int32) for tok, positions in buckets.items()}
+        self.size = len(token_sets)
+
+    def overlap(self, query: Iterable[str]) -> np.ndarray:
+        """``len(query & tokens_i)`` para cada posición ``i``."""
+        counts = np.zeros(self.size, dtype=np.int32)
+        for tok in set(query or ()):
+            positions = self.postings.get(tok)
+            if positions is not None:
+                counts[positions] += 1
+        return counts
+
+
+def _modalidad_key(value: Any):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class EncodedPool:
+    """Pool codificado una vez; se puede puntuar contra varias solicitudes."""
+
+    def __init__(
+        self,
+        candidates: Sequence[Any],
+        features: Sequence[CandidateFeatures] | None = None,
+        compat_profiles: Sequence[Dict[str, Any] | None] | None = None,
+    ) -> None:
+        self.candidates = list(candidates)
+        self.features = list(features) if features is not None else [candidate_features(c) for c in self.candidates]
+        # Perfil del test por posición (``candidata_match_profiles``); ``None`` = lo arma ``compute_match``.
+        self.compat_profiles = list(compat_profiles) if compat_profiles is not None else [None] * len(self.candidates)
+        feats = self.features
+
+        self.location = _TokenIndex([f.location_tokens for f in feats])
+        self.horario = _TokenIndex([f.horario_tokens for f in feats])
+        self.skills = _TokenIndex([f.skill_tokens for f in feats])
+        self.horario_nonempty = np.fromiter((bool(f.horario_tokens) for f in feats), dtype=bool, count=len(feats))
+
+        self.city_codes_by_name: dict[str, int] = {}
+        self.city = np.fromiter(
+            (self.city_codes_by_name.setdefault(f.city, len(self.city_codes_by_name)) if f.city else -1 for f in feats),
+            dtype=np.int32,
+            count=len(feats),
+        )
+
+        self.modalidad_values: list[Any] = []
+        modalidad_codes: dict[Any, int] = {}
+        codes = []
+        for f in feats:
+            key = _modalidad_key(f.modalidad)
+            if key not in modalidad_codes:
+                modalidad_codes[key] = len(self.modalidad_values)
+                self.modalidad_values.append(f.modalidad)
+            codes.append(modalidad_codes[key])
+        self.modalidad = np.asarray(codes, dtype=np.int32)
+
+        self.has_age = np.fromiter((f.age is not None for f in feats), dtype=bool, count=len(feats))
+        self.age = np.fromiter((f.age if f.age is not None else 0 for f in feats), dtype=np.int32, count=len(feats))
+        self.years = np.fromiter((f.years if f.years is not None else -1 for f in feats), dtype=np.int32, count=len(feats))
+        self.anos_nonempty = np.fromiter((f.anos_nonempty for f in feats), dtype=bool, count=len(feats))
+        self.no_pets = np.fromiter((f.no_pets for f in feats), dtype=bool, count=len(feats))
+        self.has_test = np.fromiter((f.has_test for f in feats), dtype=bool, count=len(feats))
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+
+def encode_pool(candidates: Sequence[Any]) -> EncodedPool:
+    return EncodedPool(candidates)
+
+
+@dataclass
+class PoolScores:
+    sol_profile: Dict[str, Any]
+    ubicacion: np.ndarray
+    modalidad: np.ndarray
+    horario: np.ndarray
+    funciones: np.ndarray
+    experiencia: np.ndarray
+    edad: np.ndarray
+    mascota: np.ndarray
+    operational: np.ndarray
+    bonus: np.ndarray
+    final: np.ndarray
+    modalidad_evals: list[Dict[str, Any]] = field(default_factory=list)
+    edad_matched: np.ndarray | None = None
+
+
+def score_pool(solicitud, encoded: EncodedPool, *, sol_profile: Dict[str, Any] | None = None) -> PoolScores:
+    """Puntos de todos los componentes para todo el pool (misma aritmética que ``_score_candidate``)."""
+    sol_profile = sol_profile or build_solicitud_profile(solicitud)
+    n = len(encoded)
+
+    # Ubicación
+    sol_city = sol_profile.get("city")
+    routes = set(sol_profile.get("routes_tokens") or set())
+    sector_query = set(sol_profile.get("city_tokens") or set()) or set(sol_profile.get("location_tokens") or set())
+    route_hit = encoded.location.overlap(routes) > 0
+    if sol_city:
+        code = encoded.city_codes_by_name.get(sol_city, -2)
+        same_city = encoded.city == code
+        sector_hit = encoded.location.overlap(sector_query) > 0
+        ubicacion = np.where(same_city, np.where(sector_hit, 30, 20), 0)
+    else:
+        ratio_query = routes or set(sol_profile.get("location_tokens") or set())
+        if ratio_query:
+            ratio = encoded.location.overlap(ratio_query) / float(max(1, len(ratio_query)))
+        else:
+            ratio = np.zeros(n)
+        ubicacion = np.select([ratio >= 0.6, ratio >= 0.4, ratio >= 0.2], [26, 20, 12], 0)
+    ubicacion = np.clip(ubicacion + np.where(route_hit, 10, 0), 0, 40)
+
+    # Modalidad: una evaluación por valor distinto del pool.
+    modalidad_evals = [
+        evaluate_modalidad_match(sol_profile.get("modalidad_text"), value, max_points=20)
+        for value in encoded.modalidad_values
+    ]
+    modalidad_pts_by_code = np.asarray([int(ev["modalidad_pts"]) for ev in modalidad_evals] or [0], dtype=np.int32)
+    modalidad = modalidad_pts_by_code[encoded.modalidad] if n else np.zeros(0, dtype=np.int32)
+
+    # Horario
+    sol_horario = set(sol_profile.get("horario_tokens") or set())
+    if sol_horario:
+        inter = encoded.horario.overlap(sol_horario)
+        diurno = np.zeros(n, dtype=bool)
+        if "medio_tiempo" in sol_horario:
+            diurno |= encoded.horario.overlap(_DIURNOS) > 0
+        if sol_horario & _DIURNOS:
+            diurno |= encoded.horario.overlap({"medio_tiempo"}) > 0
+        horario = np.select(
+            [~encoded.horario_nonempty, inter == len(sol_horario), inter > 0, diurno],
+            [0, 15, 8, 8],
+            0,
+        )
+    else:
+        horario = np.zeros(n, dtype=np.int32)
+
+    # Funciones
+    skill_overlap = encoded.skills.overlap(set(sol_profile.get("funciones_tokens") or set()))
+    funciones = np.select([skill_overlap >= 3, skill_overlap == 2, skill_overlap == 1], [20, 16, 10], 0)
+
+    # Experiencia
+    sol_exp = _is_nonempty(sol_profile.get("experiencia_text"))
+    experiencia = np.where(encoded.years >= 3, 5, np.where(encoded.anos_nonempty & sol_exp, 3, 0))
+
+    # Edad: una evaluación de reglas por edad distinta.
+    rules = list(sol_profile.get("edad_rules") or [])
+    edad_matched = np.zeros(n, dtype=bool)
+    if rules and n:
+        ages, inverse = np.unique(encoded.age, return_inverse=True)
+        matched_by_age = np.asarray([any(r.matches(int(a)) for r in rules) for a in ages], dtype=bool)
+        edad_matched = matched_by_age[inverse.reshape(-1)]
+        edad = np.where(encoded.has_age, np.where(edad_matched, 5, -5), 0)
+    else:
+        edad = np.zeros(n, dtype=np.int32)
+
+    mascota = np.where(encoded.no_pets & bool(sol_profile.get("pet_required")), -8, 0)
+
+    base = ubicacion + modalidad + horario + funciones + experiencia + edad
+    operational = np.clip(base + mascota, 0, 100)
+
+    # Bonus test: solo candidatas con test y solicitud con test; los pares ya calculados salen de la caché.
+    bonus = np.zeros(n, dtype=np.int32)
+    if getattr(solicitud, "compat_test_cliente_json", None) and encoded.has_test.any():
+        test_positions = [int(pos) for pos in np.flatnonzero(encoded.has_test)]
+        results = compute_match_many(
+            solicitud,
+            [encoded.candidates[pos] for pos in test_positions],
+            candidata_profiles=[encoded.compat_profiles[pos] for pos in test_positions],
+            cliente_profile=load_cliente_profile(solicitud),
+        )
+        for pos, result in zip(test_positions, results):
+            bonus[pos] = _bonus_from_score((result or {}).get("score"))
+    final = np.clip(operational + bonus, 0, 100)
+
+    return PoolScores(
+        sol_profile=sol_profile,
+        ubicacion=ubicacion,
+        modalidad=modalidad,
+        horario=horario,
+        funciones=funciones,
+        experiencia=experiencia,
+        edad=edad,
+        mascota=mascota,
+        operational=operational,
+        bonus=bonus,
+        final=final,
+        modalidad_evals=modalidad_evals,
+        edad_matched=edad_matched,
+    )
+
+
+def _location_notes(sol_profile: Dict[str, Any], feat: CandidateFeatures, pts: int):
+    sol_city = sol_profile.get("city")
+    sector_query = set(sol_profile.get("city_tokens") or set()) or set(sol_profile.get("location_tokens") or set())
+    route_overlap = sorted(set(sol_profile.get("routes_tokens") or set()) & feat.location_tokens)
+    sector_overlap = sorted(sector_query & feat.location_tokens)
+    return pts, {
+        "city_detectada": (
+            f"Ciudad detectada: {sol_city.title()} ✅"
+            if sol_city and feat.city == sol_city
+            else (f"Ciudad detectada solicitud: {sol_city.title()}" if sol_city else "Ciudad no detectada")
+        ),
+        "tokens_match": (
+            "Tokens coinciden: " + ", ".join(sector_overlap[:6])
+            if sector_overlap
+            else "Tokens sin coincidencia fuerte"
+        ),
+        "rutas_match": (
+            "Rutas: " + " / ".join(route_overlap[:4])
+            if route_overlap
+            else "Rutas sin coincidencia fuerte"
+        ),
+    }
+
+
+def _horario_notes(sol_profile: Dict[str, Any], feat: CandidateFeatures, pts: int):
+    sol = set(sol_profile.get("horario_tokens") or set())
+    if not sol or not feat.horario_tokens:
+        return pts, "Horario sin datos suficientes"
+    if pts == 15:
+        return pts, "Horario compatible (exacto)"
+    inter = sol & feat.horario_tokens
+    if inter:
+        return pts, "Horario compatible (solapa): " + ", ".join(sorted(inter))
+    if pts:
+        return pts, "Horario compatible (medio tiempo/diurno)"
+    return pts, "Horario sin coincidencia"
+
+
+def _funciones_notes(sol_profile: Dict[str, Any], feat: CandidateFeatures, pts: int):
+    sol_funcs = set(sol_profile.get("funciones_tokens") or set())
+    overlap = sorted(sol_funcs & feat.skill_tokens)
+    missing = [note for token, note in _MISSING_SKILL_NOTES if token in sol_funcs and token not in feat.skill_tokens]
+    if overlap:
+        note = "Coincidencias por experiencia: " + ", ".join(x.replace("_", " ").title() for x in overlap[:6])
+    else:
+        note = "Funciones sin coincidencia fuerte"
+    return pts, note, overlap, sorted(sol_funcs)[:10], sorted(feat.skill_tokens)[:10], missing
+
+
+def _experience_notes(sol_profile: Dict[str, Any], feat: CandidateFeatures, pts: int):
+    if pts == 5:
+        return pts, f"Experiencia: {feat.years} anos"
+    if pts == 3:
+        return pts, "Experiencia declarada"
+    return pts, "Experiencia sin datos concluyentes"
+
+
+def _edad_notes(sol_profile: Dict[str, Any], feat: CandidateFeatures, pts: int):
+    rules = list(sol_profile.get("edad_rules") or [])
+    if feat.age is None or not rules:
+        return 0, None, feat.age, rules, "Edad no evaluable"
+    if pts > 0:
+        return pts, True, feat.age, rules, "Edad compatible con solicitud"
+    return pts, False, feat.age, rules, "Edad fuera del rango solicitado"
+
+
+def score_rows(
+    solicitud,
+    encoded: EncodedPool,
+    scores: PoolScores,
+    *,
+    indices: Iterable[int] | None = None,
+    scoring_context: dict[str, Any] | None = None,
+) -> List[Dict[str, Any]]:
+    """Filas completas (como ``_score_candidate``) para las posiciones pedidas, en ese orden."""
+    sol_profile = scores.sol_profile
+    out: List[Dict[str, Any]] = []
+    for pos in (range(len(encoded)) if indices is None else indices):
+        pos = int(pos)
+        feat = encoded.features[pos]
+        mascota = int(scores.mascota[pos])
+        bonus = int(scores.bonus[pos])
+        components = {
+            "location": _location_notes(sol_profile, feat, int(scores.ubicacion[pos])),
+            "modalidad": scores.modalidad_evals[int(encoded.modalidad[pos])],
+            "horario": _horario_notes(sol_profile, feat, int(scores.horario[pos])),
+            "funciones": _funciones_notes(sol_profile, feat, int(scores.funciones[pos])),
+            "experiencia": _experience_notes(sol_profile, feat, int(scores.experiencia[pos])),
+            "edad": _edad_notes(sol_profile, feat, int(scores.edad[pos])),
+            "penalties": ({"mascota": mascota}, ["Mascotas: penalizacion por NO mascotas"] if mascota else []),
+            "bonus": (bonus, f"Bonus test: +{bonus}"),
+        }
+        out.append(
+            _assemble_score_row(solicitud, encoded.candidates[pos], components, scoring_context=scoring_context)
+        )
+    return out
+
+
+def score_candidates_batch(
+    solicitud,
+    candidates: Sequence[Any],
+    *,
+    sol_profile: Dict[str, Any] | None = None,
+    scoring_context: dict[str, Any] | None = None,
+) -> List[Dict[str, Any]]:
+    """Equivalente por lotes de ``[_score_candidate(s, c, ...) for c in candidates]``."""
+    encoded = encode_pool(candidates)
+    scores = score_pool(solicitud, encoded, sol_profile=sol_profile)
+    return score_rows(solicitud, encoded, scores, scoring_context=scoring_context)
+
+
+def rank_order(encoded: EncodedPool, scores: PoolScores, positions: Iterable[int] | None = None) -> List[int]:
+    """Posiciones ordenadas como ``rank_candidates`` (score, operativo, nombre; desc y estable).
+
+    ``positions`` limita el orden a un subconjunto del pool (p. ej. solo las listas).
+    """
+    final = scores.final.tolist()
+    operational = scores.operational.tolist()
+    names = [(getattr(c, "nombre_completo", None) or "").lower() for c in encoded.candidates]
+    order = range(len(encoded)) if positions is None else [int(p) for p in positions]
+    return sorted(order, key=lambda i: (final[i], operational[i], names[i]), reverse=True)
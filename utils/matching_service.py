@@ -2,18 +2,21 @@
 from __future__ import annotations
 
 import logging
+import os
 import re
 from time import perf_counter
 from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
-from sqlalchemy import or_
-from sqlalchemy.orm import load_only
+from sqlalchemy import func, or_
+from sqlalchemy.orm import attributes, load_only
 
 from config_app import db
 from models import Candidata, Entrevista, Solicitud, SolicitudCandidata
 from utils.age_normalizer import parse_candidata_age_int, parse_solicitud_age_rules
-from utils.compat_engine import compute_match, normalize_horarios_tokens
+from utils.compat_cache import compute_match_cached
+from utils.compat_engine import normalize_horarios_tokens
 from utils.candidata_readiness import (
+    DOCUMENT_FACT_KINDS,
     candidata_docs_complete,
     candidata_has_interview,
     candidata_is_ready_to_send,
@@ -21,6 +24,7 @@ from utils.candidata_readiness import (
 )
 from utils.guards import candidata_esta_descalificada, candidatas_activas_filter
 from utils.modality_normalizer import evaluate_modalidad_match
+from utils.runtime_config import columns_ready
 from utils.text_normalizer import infer_city, location_tokens, normalize_text, skill_tokens, tokens
 
 DEFAULT_PREFILTER_LIMIT = 250
@@ -154,6 +158,61 @@ def build_solicitud_profile(solicitud) -> Dict[str, Any]:
     }
 
 
+def document_facts_enabled() -> bool:
+    """True si ``candidatas`` ya tiene ``has_<kind>``/``<kind>_size_bytes`` (migración aplicada).
+
+    Mientras falte la migración se reintenta cada ``SCHEMA_RETRY_SECONDS``;
+    ``CANDIDATA_DOCUMENT_FACTS=0`` vuelve a cargar los blobs.
+    """
+    raw = (os.getenv("CANDIDATA_DOCUMENT_FACTS") or "").strip().lower()
+    if raw in {"0", "false", "no", "off"}:
+        return False
+    return columns_ready(Candidata.__tablename__, [f"has_{kind}" for kind in DOCUMENT_FACT_KINDS])
+
+
+def _document_columns() -> tuple:
+    if document_facts_enabled():
+        return tuple(getattr(Candidata, f"has_{kind}") for kind in DOCUMENT_FACT_KINDS)
+    return tuple(getattr(Candidata, kind) for kind in DOCUMENT_FACT_KINDS)
+
+
+def fill_missing_document_facts(pool: Sequence[Candidata]) -> None:
+    """Filas aún sin backfill: un solo ``length()`` por lote en vez de cargar blobs fila a fila.
+
+    El valor queda solo en la instancia (no se marca sucia); persistirlo es tarea de
+    ``flask candidatas-blobs facts-backfill``.
+    """
+    if not document_facts_enabled():
+        return
+    missing: dict[int, Candidata] = {}
+    for cand in pool:
+        state = getattr(cand, "__dict__", {})
+        if any(f"has_{kind}" in state and state[f"has_{kind}"] is None for kind in DOCUMENT_FACT_KINDS):
+            missing[int(getattr(cand, "fila", 0) or 0)] = cand
+    missing.pop(0, None)
+    if not missing:
+        return
+    try:
+        rows = (
+            db.session.query(
+                Candidata.fila,
+                *[func.coalesce(func.length(getattr(Candidata, kind)), 0) for kind in DOCUMENT_FACT_KINDS],
+            )
+            .filter(Candidata.fila.in_(list(missing)))
+            .all()
+        )
+    except Exception:
+        logger.warning("matching.document_facts length() fallback failed", exc_info=True)
+        return
+    for row in rows:
+        cand = missing.get(int(row[0]))
+        if cand is None:
+            continue
+        for kind, size in zip(DOCUMENT_FACT_KINDS, row[1:]):
+            if cand.__dict__.get(f"has_{kind}") is None:
+                attributes.set_committed_value(cand, f"has_{kind}", int(size or 0) > 0)
+
+
 def _build_base_query(base_query=None):
     q = base_query or Candidata.query
     return q.filter(candidatas_activas_filter(Candidata)).options(
@@ -165,10 +224,7 @@ def _build_base_query(base_query=None):
             Candidata.codigo,
             Candidata.estado,
             Candidata.entrevista,
-            Candidata.depuracion,
-            Candidata.perfil,
-            Candidata.cedula1,
-            Candidata.cedula2,
+            *_document_columns(),
             Candidata.contactos_referencias_laborales,
             Candidata.referencias_familiares_detalle,
             Candidata.referencias_laboral,
@@ -220,6 +276,7 @@ def candidate_query_prefilter(solicitud, base_query=None):
 
     primary_rows = q_primary.order_by(Candidata.fila.desc()).limit(DEFAULT_PREFILTER_LIMIT).all()
     if len(primary_rows) >= 60:
+        fill_missing_document_facts(primary_rows)
         logger.info(
             "matching.prefilter pool_size=%s dt_ms=%s city_filter=%s states=lista_para_trabajar",
             len(primary_rows),
@@ -236,6 +293,7 @@ def candidate_query_prefilter(solicitud, base_query=None):
         q_fallback = _apply_city_filter(q_fallback, city)
 
     rows = q_fallback.order_by(Candidata.fila.desc()).limit(DEFAULT_PREFILTER_LIMIT).all()
+    fill_missing_document_facts(rows)
     logger.info(
         "matching.prefilter pool_size=%s dt_ms=%s city_filter=%s states=lista_para_trabajar+inscrita",
         len(rows),
@@ -416,20 +474,36 @@ def _edad_component(sol_profile: Dict[str, Any], cand) -> tuple[int, Optional[bo
     return -5, False, cand_age, rules, "Edad fuera del rango solicitado"
 
 
-def _bonus_from_test(solicitud, cand) -> tuple[int, str]:
+def _bonus_from_test(
+    solicitud,
+    cand,
+    *,
+    candidata_profile: Dict[str, Any] | None = None,
+    cliente_profile: Dict[str, Any] | None = None,
+) -> tuple[int, str]:
     has_client = bool(getattr(solicitud, "compat_test_cliente_json", None))
     has_cand = bool(getattr(cand, "compat_test_candidata_json", None))
     if not (has_client and has_cand):
         return 0, "Bonus test: +0"
 
     try:
-        test_score = int(compute_match(solicitud, cand).get("score") or 0)
-        bonus = min(10, max(0, int(round(test_score / 10.0))))
+        bonus = _bonus_from_score(
+            compute_match_cached(
+                solicitud,
+                cand,
+                candidata_profile=candidata_profile,
+                cliente_profile=cliente_profile,
+            ).get("score")
+        )
         return bonus, f"Bonus test: +{bonus}"
     except Exception:
         return 0, "Bonus test: +0"
 
 
+def _bonus_from_score(test_score: Any) -> int:
+    return min(10, max(0, int(round(int(test_score or 0) / 10.0))))
+
+
 def _candidate_history_flags(solicitud, cand) -> tuple[bool, bool]:
     """
     Retorna (bloqueada_por_otro_cliente, rechazada_por_mismo_cliente).
@@ -494,61 +568,70 @@ def _batch_interview_ids(candidata_ids: list[int]) -> set[int]:
         return set()
 
 
-def _batch_history_flags(solicitud, candidata_ids: list[int]) -> tuple[set[int], set[int], set[int]]:
-    blocked_ids: set[int] = set()
-    rejected_same_client_ids: set[int] = set()
-    active_assignment_ids: set[int] = set()
-    if not solicitud or not candidata_ids:
-        return blocked_ids, rejected_same_client_ids, active_assignment_ids
+def _batch_history_rows(candidata_ids: list[int]) -> list[tuple[int, int, Optional[int], str]]:
+    """Asignaciones del pool que cuentan para el historial: ``(candidata, solicitud, cliente, status)``.
 
+    Una sola consulta sirve a cualquier solicitud; ``_history_flags_from_rows`` aplica
+    las reglas de cada una en memoria.
+    """
+    if not candidata_ids:
+        return []
     try:
-        blocked_rows = (
-            db.session.query(SolicitudCandidata.candidata_id)
-            .join(Solicitud, Solicitud.id == SolicitudCandidata.solicitud_id)
-            .filter(
-                SolicitudCandidata.candidata_id.in_(candidata_ids),
-                SolicitudCandidata.status.in_(_ACTIVE_ASSIGNMENT_STATUS),
-                SolicitudCandidata.solicitud_id != int(getattr(solicitud, "id", 0) or 0),
-                Solicitud.cliente_id != int(getattr(solicitud, "cliente_id", 0) or 0),
+        rows = (
+            db.session.query(
+                SolicitudCandidata.candidata_id,
+                SolicitudCandidata.solicitud_id,
+                Solicitud.cliente_id,
+                SolicitudCandidata.status,
             )
-            .all()
-        )
-        blocked_ids = {int(row[0]) for row in blocked_rows if row and row[0] is not None}
-    except Exception:
-        blocked_ids = set()
-
-    try:
-        rejected_rows = (
-            db.session.query(SolicitudCandidata.candidata_id)
-            .join(Solicitud, Solicitud.id == SolicitudCandidata.solicitud_id)
+            .outerjoin(Solicitud, Solicitud.id == SolicitudCandidata.solicitud_id)
             .filter(
                 SolicitudCandidata.candidata_id.in_(candidata_ids),
-                SolicitudCandidata.status == "descartada",
-                Solicitud.cliente_id == int(getattr(solicitud, "cliente_id", 0) or 0),
+                SolicitudCandidata.status.in_((*_ACTIVE_ASSIGNMENT_STATUS, "descartada")),
             )
             .all()
         )
-        rejected_same_client_ids = {int(row[0]) for row in rejected_rows if row and row[0] is not None}
     except Exception:
-        rejected_same_client_ids = set()
-
-    try:
-        active_rows = (
-            db.session.query(SolicitudCandidata.candidata_id)
-            .filter(
-                SolicitudCandidata.candidata_id.in_(candidata_ids),
-                SolicitudCandidata.status.in_(_ACTIVE_ASSIGNMENT_STATUS),
-                SolicitudCandidata.solicitud_id != int(getattr(solicitud, "id", 0) or 0),
-            )
-            .all()
+        return []
+    return [
+        (
+            int(row[0]),
+            int(row[1] or 0),
+            int(row[2]) if row[2] is not None else None,
+            str(row[3] or ""),
         )
-        active_assignment_ids = {int(row[0]) for row in active_rows if row and row[0] is not None}
-    except Exception:
-        active_assignment_ids = set()
+        for row in rows
+        if row and row[0] is not None
+    ]
+
+
+def _history_flags_from_rows(solicitud, rows) -> tuple[set[int], set[int], set[int]]:
+    blocked_ids: set[int] = set()
+    rejected_same_client_ids: set[int] = set()
+    active_assignment_ids: set[int] = set()
+    if not solicitud:
+        return blocked_ids, rejected_same_client_ids, active_assignment_ids
 
+    solicitud_id = int(getattr(solicitud, "id", 0) or 0)
+    cliente_id = int(getattr(solicitud, "cliente_id", 0) or 0)
+    for cand_id, row_solicitud_id, row_cliente_id, status in rows or ():
+        if status in _ACTIVE_ASSIGNMENT_STATUS:
+            if row_solicitud_id == solicitud_id:
+                continue
+            active_assignment_ids.add(cand_id)
+            if row_cliente_id is not None and row_cliente_id != cliente_id:
+                blocked_ids.add(cand_id)
+        elif status == "descartada" and row_cliente_id == cliente_id:
+            rejected_same_client_ids.add(cand_id)
     return blocked_ids, rejected_same_client_ids, active_assignment_ids
 
 
+def _batch_history_flags(solicitud, candidata_ids: list[int]) -> tuple[set[int], set[int], set[int]]:
+    if not solicitud or not candidata_ids:
+        return set(), set(), set()
+    return _history_flags_from_rows(solicitud, _batch_history_rows(candidata_ids))
+
+
 def _evaluate_readiness_with_overrides(cand, *, has_interview: bool | None = None) -> dict[str, Any]:
     if has_interview is None:
         ready_ok, ready_reasons = candidata_is_ready_to_send(cand)
@@ -607,28 +690,65 @@ def _evaluate_readiness_with_overrides(cand, *, has_interview: bool | None = Non
     }
 
 
-def build_scoring_context(solicitud, candidates: Sequence[Candidata]) -> dict[str, Any]:
+def build_scoring_context(
+    solicitud,
+    candidates: Sequence[Candidata],
+    *,
+    with_scores: bool = False,
+) -> dict[str, Any]:
+    """Readiness, historial y hechos de política del pool en consultas por lote.
+
+    Con ``with_scores`` además puntúa el pool entero de una vez con los rasgos de
+    ``candidata_match_profiles`` (``context["batch"]``); ``_score_candidate`` usa
+    esas filas en vez de recalcular candidata por candidata.
+    """
     pool = [
         cand for cand in (candidates or [])
         if int(getattr(cand, "fila", 0) or 0) > 0
     ]
-    candidata_ids = [
-        int(getattr(cand, "fila", 0) or 0)
-        for cand in pool
-        if int(getattr(cand, "fila", 0) or 0) > 0
-    ]
-    interview_ids = _batch_interview_ids(candidata_ids)
-    blocked_ids, rejected_same_client_ids, active_assignment_ids = _batch_history_flags(solicitud, candidata_ids)
+    candidata_ids = [int(getattr(cand, "fila", 0) or 0) for cand in pool]
+    readiness_by_id = _pool_readiness(pool)
+    context = _solicitud_context(
+        solicitud,
+        pool,
+        readiness_by_id=readiness_by_id,
+        history_flags=_batch_history_flags(solicitud, candidata_ids),
+    )
+    if with_scores:
+        context["batch"] = _score_pool_batch(solicitud, pool)
+    return context
+
 
+def _pool_readiness(pool: Sequence[Candidata]) -> dict[int, dict[str, Any]]:
+    """Readiness por candidata; no depende de la solicitud, así que un lote la comparte."""
+    fill_missing_document_facts(pool)
+    interview_ids = _batch_interview_ids([int(getattr(cand, "fila", 0) or 0) for cand in pool])
     readiness_by_id: dict[int, dict[str, Any]] = {}
+    for cand in pool:
+        cand_id = int(getattr(cand, "fila", 0) or 0)
+        if cand_id <= 0:
+            continue
+        readiness_by_id[cand_id] = _evaluate_readiness_with_overrides(cand, has_interview=(cand_id in interview_ids))
+    return readiness_by_id
+
+
+def _solicitud_context(
+    solicitud,
+    pool: Sequence[Candidata],
+    *,
+    readiness_by_id: dict[int, dict[str, Any]],
+    history_flags: tuple[set[int], set[int], set[int]],
+) -> dict[str, Any]:
+    blocked_ids, rejected_same_client_ids, active_assignment_ids = history_flags
+    pool_readiness: dict[int, dict[str, Any]] = {}
     history_by_id: dict[int, dict[str, bool]] = {}
     policy_facts_by_id: dict[int, dict[str, Any]] = {}
     for cand in pool:
         cand_id = int(getattr(cand, "fila", 0) or 0)
-        if cand_id <= 0:
+        readiness = readiness_by_id.get(cand_id)
+        if readiness is None:
             continue
-        readiness = _evaluate_readiness_with_overrides(cand, has_interview=(cand_id in interview_ids))
-        readiness_by_id[cand_id] = readiness
+        pool_readiness[cand_id] = readiness
         history_row = {
             "blocked_other_client": bool(cand_id in blocked_ids),
             "rejected_same_client": bool(cand_id in rejected_same_client_ids),
@@ -643,12 +763,38 @@ def build_scoring_context(solicitud, candidates: Sequence[Candidata]) -> dict[st
         }
 
     return {
-        "readiness_by_id": readiness_by_id,
+        "readiness_by_id": pool_readiness,
         "history_by_id": history_by_id,
         "policy_facts_by_id": policy_facts_by_id,
     }
 
 
+def _encode_pool_with_profiles(pool: Sequence[Candidata]):
+    from utils.candidata_match_profiles import load_match_profiles
+    from utils.matching_batch import EncodedPool
+
+    features_by_id, compat_profiles_by_id = load_match_profiles(pool)
+    ids = [int(getattr(cand, "fila", 0) or 0) for cand in pool]
+    return EncodedPool(
+        pool,
+        features=[features_by_id[cand_id] for cand_id in ids],
+        compat_profiles=[compat_profiles_by_id.get(cand_id) for cand_id in ids],
+    )
+
+
+def _score_pool_batch(solicitud, pool: Sequence[Candidata], *, encoded=None) -> dict[str, Any]:
+    from utils.matching_batch import score_pool
+
+    if encoded is None:
+        encoded = _encode_pool_with_profiles(pool)
+    return {
+        "solicitud": solicitud,
+        "encoded": encoded,
+        "scores": score_pool(solicitud, encoded, sol_profile=build_solicitud_profile(solicitud)),
+        "positions": {id(cand): pos for pos, cand in enumerate(encoded.candidates)},
+    }
+
+
 def _score_candidate(
     solicitud,
     cand,
@@ -656,7 +802,44 @@ def _score_candidate(
     sol_profile: Dict[str, Any] | None = None,
     scoring_context: dict[str, Any] | None = None,
 ) -> Dict[str, Any]:
+    batch = (scoring_context or {}).get("batch")
+    if batch is not None and batch.get("solicitud") is solicitud:
+        pos = batch["positions"].get(id(cand))
+        if pos is not None:
+            from utils.matching_batch import score_rows
+
+            return score_rows(
+                solicitud,
+                batch["encoded"],
+                batch["scores"],
+                indices=[pos],
+                scoring_context=scoring_context,
+            )[0]
+
     sol_profile = sol_profile or build_solicitud_profile(solicitud)
+    components = {
+        "location": _location_component(sol_profile, cand),
+        "modalidad": _modalidad_component(sol_profile, cand),
+        "horario": _horario_component(sol_profile, cand),
+        "funciones": _funciones_component(sol_profile, cand),
+        "experiencia": _experience_component(sol_profile, cand),
+        "edad": _edad_component(sol_profile, cand),
+        "penalties": _penalties(sol_profile, cand),
+    }
+    return _assemble_score_row(solicitud, cand, components, scoring_context=scoring_context)
+
+
+def _assemble_score_row(
+    solicitud,
+    cand,
+    components: Dict[str, Any],
+    *,
+    scoring_context: dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """Fila de score (puntos, notas y snapshot explicativo) a partir de los componentes.
+
+    Compartido por ``_score_candidate`` y el scorer por lotes de ``utils.matching_batch``.
+    """
     cand_id = int(getattr(cand, "fila", 0) or 0)
 
     cached_readiness = {}
@@ -677,11 +860,11 @@ def _score_candidate(
         has_interview = candidata_has_interview(cand)
         refs = candidata_referencias_complete(cand)
 
-    ubicacion_pts, loc_info = _location_component(sol_profile, cand)
-    modalidad_eval = _modalidad_component(sol_profile, cand)
+    ubicacion_pts, loc_info = components["location"]
+    modalidad_eval = components["modalidad"]
     modalidad_pts = int(modalidad_eval["modalidad_pts"])
     modalidad_note = modalidad_eval["modalidad_reason"]
-    horario_pts, horario_note = _horario_component(sol_profile, cand)
+    horario_pts, horario_note = components["horario"]
     (
         funciones_pts,
         funciones_note,
@@ -689,11 +872,11 @@ def _score_candidate(
         skills_solicitud_tokens,
         skills_candidata_tokens,
         missing_skill_notes,
-    ) = _funciones_component(sol_profile, cand)
-    experiencia_pts, experiencia_note = _experience_component(sol_profile, cand)
-    edad_pts, edad_match, edad_candidate, edad_rules, edad_note = _edad_component(sol_profile, cand)
+    ) = components["funciones"]
+    experiencia_pts, experiencia_note = components["experiencia"]
+    edad_pts, edad_match, edad_candidate, edad_rules, edad_note = components["edad"]
 
-    penalties_dict, penalty_reasons = _penalties(sol_profile, cand)
+    penalties_dict, penalty_reasons = components["penalties"]
     penalties_total = sum(penalties_dict.values())
     if cached_history:
         blocked_other_client = bool(cached_history.get("blocked_other_client"))
@@ -704,7 +887,7 @@ def _score_candidate(
     base_score = ubicacion_pts + modalidad_pts + horario_pts + funciones_pts + experiencia_pts + edad_pts
     operational_score = max(0, min(100, base_score + penalties_total))
 
-    bonus_test, bonus_note = _bonus_from_test(solicitud, cand)
+    bonus_test, bonus_note = components.get("bonus") or _bonus_from_test(solicitud, cand)
     final_score = max(0, min(100, operational_score + bonus_test))
 
     explain = {
@@ -822,11 +1005,98 @@ def rank_candidates(
     if prefilter_limit:
         pool = list(pool)[: max(1, min(int(prefilter_limit), DEFAULT_PREFILTER_LIMIT))]
 
-    scoring_context = build_scoring_context(solicitud, pool)
+    # Puntos de todo el pool en una pasada (rasgos precalculados); el dict explicativo solo para el top_k.
+    scoring_context = build_scoring_context(solicitud, pool, with_scores=True)
+    return _rank_scored_pool(solicitud, pool, scoring_context, top_k=top_k, t0=t0)
+
+
+def rank_candidates_batch(
+    solicitudes: Sequence[Solicitud],
+    *,
+    top_k: int = DEFAULT_TOP_K,
+    prefilter_limit: int = DEFAULT_PREFILTER_LIMIT,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """``rank_candidates`` para muchas solicitudes a la vez: ``{solicitud_id: top_k}``.
+
+    El prefiltro solo depende de la ciudad, así que corre una vez por ciudad; la
+    unión de esos pools se encodea una vez y readiness/entrevistas/historial salen
+    de una consulta cada uno para todo el lote. Por solicitud solo quedan
+    ``score_pool`` (vectorizado) y las filas explicativas del top_k. El orden y
+    las filas son los mismos que daría ``rank_candidates`` solicitud a solicitud.
+    """
+    t0 = perf_counter()
+    limit = max(1, min(int(prefilter_limit), DEFAULT_PREFILTER_LIMIT)) if prefilter_limit else None
+    pools_by_city: Dict[str, List[Candidata]] = {}
+    pool_by_solicitud: Dict[int, List[Candidata]] = {}
+    targets: List[Any] = []
+    for solicitud in solicitudes or ():
+        sol_id = int(getattr(solicitud, "id", 0) or 0)
+        if sol_id <= 0 or sol_id in pool_by_solicitud:
+            continue
+        city = build_solicitud_profile(solicitud).get("city") or ""
+        if city not in pools_by_city:
+            pools_by_city[city] = list(candidate_query_prefilter(solicitud))
+        pool_by_solicitud[sol_id] = pools_by_city[city][:limit] if limit else pools_by_city[city]
+        targets.append(solicitud)
+    if not targets:
+        return {}
+
+    union_by_id: Dict[int, Candidata] = {}
+    for pool in pool_by_solicitud.values():
+        for cand in pool:
+            cand_id = int(getattr(cand, "fila", 0) or 0)
+            if cand_id > 0:
+                union_by_id.setdefault(cand_id, cand)
+    union_pool = list(union_by_id.values())
+    union_ids = list(union_by_id)
+
+    readiness_by_id = _pool_readiness(union_pool)
+    history_rows = _batch_history_rows(union_ids)
+    encoded = _encode_pool_with_profiles(union_pool)
+    logger.info(
+        "matching.rank_batch solicitudes=%s cities=%s union_pool=%s shared_dt_ms=%s",
+        len(targets),
+        len(pools_by_city),
+        len(union_pool),
+        int((perf_counter() - t0) * 1000),
+    )
+
+    out: Dict[int, List[Dict[str, Any]]] = {}
+    for solicitud in targets:
+        sol_id = int(getattr(solicitud, "id", 0) or 0)
+        t_sol = perf_counter()
+        # Los duplicados por ``fila`` se resuelven a la instancia de la unión (la que está encodeada).
+        pool = [
+            union_by_id[int(getattr(cand, "fila", 0) or 0)]
+            for cand in pool_by_solicitud[sol_id]
+            if int(getattr(cand, "fila", 0) or 0) > 0
+        ]
+        scoring_context = _solicitud_context(
+            solicitud,
+            pool,
+            readiness_by_id=readiness_by_id,
+            history_flags=_history_flags_from_rows(solicitud, history_rows),
+        )
+        scoring_context["batch"] = _score_pool_batch(solicitud, union_pool, encoded=encoded)
+        out[sol_id] = _rank_scored_pool(solicitud, pool, scoring_context, top_k=top_k, t0=t_sol)
+    return out
+
+
+def _rank_scored_pool(
+    solicitud,
+    pool: Sequence[Candidata],
+    scoring_context: dict[str, Any],
+    *,
+    top_k: int,
+    t0: float,
+) -> List[Dict[str, Any]]:
     readiness_by_id = scoring_context.get("readiness_by_id") or {}
+    batch = scoring_context["batch"]
+    encoded, scores = batch["encoded"], batch["scores"]
 
     excluded_not_ready: List[Dict[str, Any]] = []
     ready_pool: List[Candidata] = []
+    ready_positions: List[int] = []
     for cand in pool:
         cand_id = int(getattr(cand, "fila", 0) or 0)
         readiness = readiness_by_id.get(cand_id) or {}
@@ -834,6 +1104,7 @@ def rank_candidates(
         reasons = list(readiness.get("reasons") or [])
         if ready_ok:
             ready_pool.append(cand)
+            ready_positions.append(batch["positions"][id(cand)])
             continue
         excluded_not_ready.append(
             {
@@ -845,24 +1116,9 @@ def rank_candidates(
             }
         )
 
-    sol_profile = build_solicitud_profile(solicitud)
-    ranked = [
-        _score_candidate(
-            solicitud,
-            cand,
-            sol_profile=sol_profile,
-            scoring_context=scoring_context,
-        )
-        for cand in ready_pool
-    ]
-    ranked.sort(
-        key=lambda item: (
-            int(item.get("score") or 0),
-            int(item.get("operational_score") or 0),
-            (item["candidate"].nombre_completo or "").lower(),
-        ),
-        reverse=True,
-    )
+    from utils.matching_batch import rank_order, score_rows
+
+    top_positions = rank_order(encoded, scores, positions=ready_positions)[: max(1, int(top_k))]
 
     dt_ms = int((perf_counter() - t0) * 1000)
     logger.info(
@@ -873,7 +1129,7 @@ def rank_candidates(
         dt_ms,
     )
 
-    sliced = ranked[: max(1, int(top_k))]
+    sliced = score_rows(solicitud, encoded, scores, indices=top_positions, scoring_context=scoring_context)
     for row in sliced:
         row["meta"] = {
             "dt_ms": dt_ms,
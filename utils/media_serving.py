@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Respuestas HTTP para archivos/imágenes con ETag, Range y streaming.
+
+- ETag fuerte = sha256 del contenido (ya guardado en metadatos), así un
+  ``If-None-Match`` se responde 304 sin tocar el blob.
+- ``Range: bytes=a-b`` (un solo rango) → 206; rango imposible → 416.
+- URLs con ``?v=<hash>`` que coincide con el contenido actual se marcan
+  ``immutable`` por un año; sin versión se fuerza revalidación (``no-cache``),
+  que con ETag cuesta un 304.
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable, Optional
+
+from flask import Response, request, stream_with_context
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+VERSION_PARAM = "v"
+VERSION_LEN = 16
+# Por debajo de este tamaño se arma el cuerpo en memoria (fotos de perfil,
+# cédulas): evita mantener un generador con contexto abierto por respuesta.
+STREAM_THRESHOLD = 1024 * 1024
+
+_EXT_BY_MIME = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/bmp": "bmp",
+    "application/pdf": "pdf",
+}
+
+
+def media_version(sha256: str | None) -> str:
+    return str(sha256 or "")[:VERSION_LEN]
+
+
+def extension_for_mime(mime_type: str | None) -> str:
+    return _EXT_BY_MIME.get(str(mime_type or "").lower(), "bin")
+
+
+def etag_for(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+def _etag_list_matches(header: str, etag: str) -> bool:
+    raw = (header or "").strip()
+    if not raw:
+        return False
+    if raw == "*":
+        return True
+    for part in raw.split(","):
+        tag = part.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def parse_byte_range(header: str | None, size: int):
+    """``(start, end)`` inclusivo, ``None`` si no aplica (servir completo) o ``"invalid"`` (416)."""
+    raw = (header or "").strip()
+    if not raw or not raw.lower().startswith("bytes="):
+        return None
+    spec = raw[6:].strip()
+    if "," in spec:
+        # Multirango: se permite ignorarlo y responder el recurso completo.
+        return None
+    start_txt, sep, end_txt = spec.partition("-")
+    if not sep:
+        return None
+    try:
+        if start_txt == "":
+            suffix = int(end_txt)
+            if suffix <= 0:
+                return "invalid"
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(start_txt)
+            end = int(end_txt) if end_txt else size - 1
+    except ValueError:
+        return None
+    if start < 0 or start >= size or end < start:
+        return "invalid"
+    return start, min(end, size - 1)
+
+
+def media_response(
+    *,
+    sha256: str,
+    size: int,
+    mime_type: str,
+    read_range: Callable[[int, int], Iterable[bytes]],
+    private: bool = True,
+    download_name: Optional[str] = None,
+    as_attachment: bool = False,
+    version_sha256: Optional[str] = None,
+    vary: Optional[str] = None,
+) -> Response:
+    """Arma la respuesta; ``read_range(start, end)`` solo se invoca si hay cuerpo que enviar.
+
+    ``version_sha256`` es el hash contra el que se compara ``?v=`` cuando la URL
+    se versiona con otro contenido (p. ej. miniaturas: versión = hash del original).
+    """
+    etag = etag_for(sha256)
+    versioned = (request.args.get(VERSION_PARAM) or "").strip()
+    scope = "private" if private else "public"
+    if versioned and versioned == media_version(version_sha256 or sha256):
+        cache_control = f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = f"{scope}, no-cache"
+
+    def _base_headers(resp: Response) -> Response:
+        resp.headers["ETag"] = etag
+        resp.headers["Cache-Control"] = cache_control
+        resp.headers["Accept-Ranges"] = "bytes"
+        resp.headers["X-Content-Type-Options"] = "nosniff"
+        if vary:
+            resp.headers["Vary"] = vary
+        return resp
+
+    if request.method in {"GET", "HEAD"} and _etag_list_matches(request.headers.get("If-None-Match", ""), etag):
+        return _base_headers(Response(status=304))
+
+    total = max(0, int(size))
+    byte_range = None
+    if_range = (request.headers.get("If-Range") or "").strip()
+    if not if_range or if_range == etag:
+        byte_range = parse_byte_range(request.headers.get("Range"), total)
+    if byte_range == "invalid":
+        resp = _base_headers(Response(status=416))
+        resp.headers["Content-Range"] = f"bytes */{total}"
+        return resp
+
+    if byte_range is None:
+        start, end, status = 0, total - 1, 200
+    else:
+        start, end = byte_range
+        status = 206
+
+    length = max(0, end - start + 1)
+    if request.method == "HEAD" or length == 0:
+        body: Iterable[bytes] = []
+    elif length <= STREAM_THRESHOLD:
+        body = [b"".join(read_range(start, end))]
+    else:
+        body = stream_with_context(read_range(start, end))
+    resp = _base_headers(Response(body, status=status, mimetype=mime_type, direct_passthrough=True))
+    resp.headers["Content-Length"] = str(length)
+    if status == 206:
+        resp.headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+    if download_name:
+        disposition = "attachment" if as_attachment else "inline"
+        resp.headers["Content-Disposition"] = f'{disposition}; filename="{download_name}"'
+    return resp
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""Agregador compartido de payloads para ``/admin/monitoreo/stream``.
+
+Cada canal (presencia, resumen, operaciones, actividad) se recalcula como
+máximo una vez por intervalo por proceso, sin importar cuántos viewers haya
+conectados. El resultado se guarda con un número de versión que solo sube
+cuando el contenido cambia; cada viewer recuerda la última versión vista y
+solo recibe el canal cuando esa versión cambia.
+
+Con backplane Redis el cálculo además se coordina entre procesos: quien
+obtiene el lease (``bp_add``) recalcula y publica el payload versionado; el
+resto lo lee del backplane mientras siga fresco.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy import event
+
+from utils.distributed_backplane import bp_add, bp_delete, bp_get, bp_set
+from utils.runtime_config import is_true
+
+
+_BP_PREFIX = "monitoreo:agg:v1"
+
+
+class _QueryCounter:
+    """Cuenta queries de la conexión de ``db.session`` dentro del bloque.
+
+    El listener vive solo en esa conexión y solo mientras dura el cálculo; el
+    resto de la app no paga nada. Sin app context no cuenta.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._conn = None
+
+    def _on_execute(self, *_args) -> None:
+        self.count += 1
+
+    def __enter__(self):
+        try:
+            from config_app import db
+
+            self._conn = db.session.connection()
+            event.listen(self._conn, "before_cursor_execute", self._on_execute)
+        except Exception:
+            self._conn = None
+        return self
+
+    def __exit__(self, *_exc):
+        if self._conn is not None:
+            try:
+                event.remove(self._conn, "before_cursor_execute", self._on_execute)
+            except Exception:
+                pass
+        return False
+
+
+def _cluster_enabled() -> bool:
+    return is_true(os.getenv("MONITOREO_AGGREGATOR_CLUSTER"), default=True)
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=True, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class MonitoreoChannel:
+    name: str
+    interval_sec: float
+    compute: Callable[[], Any]
+    # Campos que cambian en cada cálculo (ej. timestamps) y no deben subir la versión.
+    volatile_keys: tuple[str, ...] = ()
+
+
+@dataclass
+class _ChannelState:
+    version: int = 0
+    digest: str = ""
+    payload: Any = None
+    computed_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class MonitoreoAggregator:
+    def __init__(self, channels: list[MonitoreoChannel] | None = None, *, log_buffer_size: int = 500):
+        self.channels: dict[str, MonitoreoChannel] = {}
+        self.states: dict[str, _ChannelState] = {}
+        self._lock = threading.Lock()
+        self._viewers = 0
+        self._started_at = time.time()
+        self.stats = {
+            "computes": 0,
+            "cache_hits": 0,
+            "backplane_hits": 0,
+            "db_queries": 0,
+            "viewer_seconds": 0.0,
+        }
+        self._queries_per_compute: dict[str, float] = {}
+        self._log_lock = threading.Lock()
+        self._log_items: deque[tuple[int, Any]] = deque(maxlen=max(10, int(log_buffer_size)))
+        self._log_floor_id = -1
+        self._log_last_id = -1
+        self._log_fetched_at = 0.0
+        for channel in (channels or []):
+            self.register(channel)
+
+    def register(self, channel: MonitoreoChannel) -> None:
+        self.channels[channel.name] = channel
+        self.states.setdefault(channel.name, _ChannelState())
+
+    # ── viewers ─────────────────────────────────────────────────────
+    def viewer_opened(self) -> None:
+        with self._lock:
+            self._viewers += 1
+
+    def viewer_closed(self, *, connected_seconds: float) -> None:
+        with self._lock:
+            self._viewers = max(0, self._viewers - 1)
+            self.stats["viewer_seconds"] += max(0.0, float(connected_seconds))
+
+    # ── canales versionados ─────────────────────────────────────────
+    def _count_queries(self, name: str, fn: Callable[[], Any]) -> Any:
+        with _QueryCounter() as qc:
+            out = fn()
+        with self._lock:
+            self.stats["db_queries"] += qc.count
+            prev = self._queries_per_compute.get(name)
+            self._queries_per_compute[name] = float(qc.count) if prev is None else (prev * 0.8 + qc.count * 0.2)
+        return out
+
+    def _publish_local(self, state: _ChannelState, channel: MonitoreoChannel, payload: Any, *, now: float) -> None:
+        if isinstance(payload, dict) and channel.volatile_keys:
+            stable = {k: v for k, v in payload.items() if k not in channel.volatile_keys}
+        else:
+            stable = payload
+        digest = _digest(stable)
+        if digest != state.digest:
+            state.version += 1
+            state.digest = digest
+        state.payload = payload
+        state.computed_at = now
+
+    def refresh(self, name: str, *, now: float | None = None) -> _ChannelState:
+        """Devuelve el estado del canal recalculándolo solo si venció su intervalo."""
+        channel = self.channels[name]
+        state = self.states[name]
+        now = time.time() if now is None else float(now)
+        if state.payload is not None and (now - state.computed_at) < channel.interval_sec:
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return state
+        with state.lock:
+            # Otro viewer pudo recalcular mientras esperábamos el lock.
+            if state.payload is not None and (now - state.computed_at) < channel.interval_sec:
+                with self._lock:
+                    self.stats["cache_hits"] += 1
+                return state
+
+            lease = None
+            if _cluster_enabled():
+                lease = self._refresh_from_backplane(name, state, now=now)
+                if lease == "shared":
+                    return state
+
+            try:
+                payload = self._count_queries(name, channel.compute)
+                self._publish_local(state, channel, payload, now=now)
+                with self._lock:
+                    self.stats["computes"] += 1
+                if _cluster_enabled():
+                    bp_set(
+                        f"{_BP_PREFIX}:{name}",
+                        {"version": state.version, "digest": state.digest, "payload": payload, "at": now},
+                        timeout=max(2, int(channel.interval_sec * 3)),
+                        context="monitoreo_agg_set",
+                    )
+            finally:
+                # Solo se libera el lease propio; si lo tiene otro proceso no se toca.
+                if lease == "acquired":
+                    bp_delete(f"{_BP_PREFIX}:{name}:lease", context="monitoreo_agg_lease_release")
+            return state
+
+    def _refresh_from_backplane(self, name: str, state: _ChannelState, *, now: float) -> str:
+        """``shared`` si el estado salió del backplane; si no hay que calcular:
+        ``acquired`` con el lease propio o ``held_elsewhere`` sin él."""
+        channel = self.channels[name]
+        shared = bp_get(f"{_BP_PREFIX}:{name}", default=None, context="monitoreo_agg_get")
+        fresh = isinstance(shared, dict) and (now - float(shared.get("at") or 0.0)) < channel.interval_sec
+        if not fresh:
+            lease_ttl = max(1, int(channel.interval_sec))
+            if bp_add(f"{_BP_PREFIX}:{name}:lease", os.getpid(), timeout=lease_ttl, context="monitoreo_agg_lease"):
+                return "acquired"
+            # Otro proceso tiene el lease: se reutiliza el último payload publicado aunque sea algo viejo.
+            if not isinstance(shared, dict) or shared.get("payload") is None:
+                return "held_elsewhere"
+        shared_version = int(shared.get("version") or 0)
+        shared_digest = str(shared.get("digest") or "")
+        if shared_digest != state.digest:
+            state.version = max(state.version + 1, shared_version)
+            state.digest = shared_digest
+        state.payload = shared.get("payload")
+        state.computed_at = now if not fresh else float(shared.get("at") or now)
+        with self._lock:
+            self.stats["backplane_hits"] += 1
+        return "shared"
+
+    def changes_since(self, seen: dict[str, int], names: list[str], *, now: float | None = None) -> list[tuple[str, Any]]:
+        """Canales cuya versión cambió respecto a ``seen`` (se actualiza in-place)."""
+        out: list[tuple[str, Any]] = []
+        for name in names:
+            state = self.refresh(name, now=now)
+            if state.payload is None:
+                continue
+            if seen.get(name) == state.version:
+                continue
+            seen[name] = state.version
+            out.append((name, state.payload))
+        return out
+
+    def peek(self, name: str) -> Any:
+        return self.states[name].payload if name in self.states else None
+
+    # ── cola compartida de logs ─────────────────────────────────────
+    def logs_after(
+        self,
+        last_id: int,
+        *,
+        fetch_after: Callable[[int], list[tuple[int, Any]]],
+        interval_sec: float = 1.0,
+        now: float | None = None,
+    ) -> list[tuple[int, Any]] | None:
+        """Logs con id > ``last_id`` desde la cola compartida; una sola query por intervalo.
+
+        Devuelve ``None`` si el cursor es anterior a lo que conserva la cola; en ese caso
+        el viewer consulta directo hasta alcanzarla.
+        """
+        now = time.time() if now is None else float(now)
+        with self._log_lock:
+            if self._log_last_id < 0 or (now - self._log_fetched_at) >= interval_sec:
+                start = self._log_last_id if self._log_last_id >= 0 else int(last_id)
+                rows = self._count_queries("log", lambda: fetch_after(start))
+                if self._log_last_id < 0:
+                    self._log_floor_id = start
+                    self._log_last_id = start
+                for row_id, item in rows:
+                    if int(row_id) > self._log_last_id:
+                        if len(self._log_items) == self._log_items.maxlen:
+                            self._log_floor_id = int(self._log_items[0][0])
+                        self._log_items.append((int(row_id), item))
+                        self._log_last_id = int(row_id)
+                self._log_fetched_at = now
+            if int(last_id) < self._log_floor_id:
+                return None
+            return [(row_id, item) for row_id, item in self._log_items if row_id > int(last_id)]
+
+    # ── instrumentación ─────────────────────────────────────────────
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            elapsed_min = max(1e-6, (time.time() - self._started_at) / 60.0)
+            viewers = int(self._viewers)
+            # Viewers promedio desde el arranque (incluye los que ya cerraron).
+            avg_viewers = max(1.0, float(viewers), self.stats["viewer_seconds"] / 60.0 / elapsed_min)
+            queries_per_min = self.stats["db_queries"] / elapsed_min
+            legacy_per_min = 0.0
+            for name, qpc in self._queries_per_compute.items():
+                channel = self.channels.get(name)
+                interval = channel.interval_sec if channel is not None else 1.0
+                legacy_per_min += float(qpc) * (60.0 / max(0.001, interval))
+            return {
+                "viewers": viewers,
+                "computes": int(self.stats["computes"]),
+                "cache_hits": int(self.stats["cache_hits"]),
+                "backplane_hits": int(self.stats["backplane_hits"]),
+                "db_queries": int(self.stats["db_queries"]),
+                "db_queries_per_min": round(queries_per_min, 2),
+                "db_queries_per_min_per_viewer": round(queries_per_min / avg_viewers, 2),
+                # Costo anterior estimado: cada viewer recalculaba todos los canales en su propio timer.
+                "legacy_db_queries_per_min_per_viewer": round(legacy_per_min, 2),
+                "queries_per_compute": {k: round(v, 2) for k, v in sorted(self._queries_per_compute.items())},
+                "versions": {name: int(state.version) for name, state in sorted(self.states.items())},
+                "cluster": _cluster_enabled(),
+            }
@@ -1,21 +1,37 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import secrets
+import select
+import socket
 import time
+import weakref
 from datetime import timedelta
-from typing import Any
+from typing import Any, Callable, Collection
 
 import click
 from flask import current_app
 from flask.cli import with_appcontext
-from sqlalchemy import or_
+from sqlalchemy import and_, case, event, exists, func, or_, text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 
 from config_app import db
-from models import DomainOutbox, OutboxConsumerReceipt
-from utils.staff_notifications import create_staff_notification
+from models import DOMAIN_OUTBOX_PARTITIONS, DomainOutbox, OutboxConsumerReceipt
+from utils.distributed_backplane import (
+    backplane_status,
+    bp_add,
+    bp_delete,
+    bp_get,
+    bp_get_many,
+    bp_refresh_if_value,
+)
+from utils.enterprise_layer import bump_operational_counter
+from utils.outbox_retention import refresh_outbox_status_counters
+from utils.staff_notifications import build_staff_notification, create_staff_notification
 from utils.sqlite_pk import maybe_assign_sqlite_pk as _shared_maybe_assign_sqlite_pk
 from utils.timezone import iso_utc_z, utc_now_naive
 
@@ -46,6 +62,8 @@ _OUTBOX_RELAY_STATUS_RETRYING = "retrying"
 _OUTBOX_RELAY_STATUS_QUARANTINED = "quarantined"
 _OUTBOX_RELAY_STATUS_PUBLISHED = "published"
 
+OUTBOX_NOTIFY_CHANNEL = "domain_outbox_inserted"
+
 
 def _redis_stream_key() -> str:
     cfg_key = str(current_app.config.get("OUTBOX_RELAY_STREAM_KEY") or "").strip()
@@ -157,16 +175,7 @@ def _register_consumer_receipt(*, consumer_name: str, event_id: str) -> bool:
         return False
 
 
-def _consume_internal_operational_notification(event: dict[str, Any], row: DomainOutbox) -> None:
-    event_type = str(event.get("event_type") or "").strip().upper()
-    if event_type == "CHAT_CONVERSATION_TYPING":
-        return
-    event_id = str(event.get("event_id") or "")
-    if not event_id:
-        raise RuntimeError("Evento sin event_id para consumidor interno.")
-    if not _register_consumer_receipt(consumer_name=_INTERNAL_CONSUMER_NAME, event_id=event_id):
-        return
-
+def _notification_fields(event: dict[str, Any], row: DomainOutbox, event_id: str) -> dict[str, Any]:
     payload = event.get("payload") or {}
     solicitud_id = payload.get("solicitud_id") or event.get("aggregate", {}).get("id")
     entity_id = int(row.id)
@@ -176,24 +185,75 @@ def _consume_internal_operational_notification(event: dict[str, Any], row: Domai
             entity_id = sid
 
     titulo, mensaje = _notification_text(event)
-    notif_ok = create_staff_notification(
-        tipo=(f"relay_{event_id[:40]}"),
-        entity_type="solicitud",
-        entity_id=entity_id,
-        titulo=titulo,
-        mensaje=mensaje,
-        payload={
+    return {
+        "tipo": f"relay_{event_id[:40]}",
+        "entity_type": "solicitud",
+        "entity_id": entity_id,
+        "titulo": titulo,
+        "mensaje": mensaje,
+        "payload": {
             "event_id": event_id,
             "event_type": event.get("event_type"),
             "correlation_id": event.get("correlation_id"),
             "aggregate": event.get("aggregate") or {},
         },
-        session_commit=False,
-    )
+    }
+
+
+def _consume_internal_operational_notification(event: dict[str, Any], row: DomainOutbox) -> None:
+    event_type = str(event.get("event_type") or "").strip().upper()
+    if event_type == "CHAT_CONVERSATION_TYPING":
+        return
+    event_id = str(event.get("event_id") or "")
+    if not event_id:
+        raise RuntimeError("Evento sin event_id para consumidor interno.")
+    if not _register_consumer_receipt(consumer_name=_INTERNAL_CONSUMER_NAME, event_id=event_id):
+        return
+
+    notif_ok = create_staff_notification(**_notification_fields(event, row, event_id), session_commit=False)
     if not notif_ok:
         raise RuntimeError("No se pudo crear notificación interna del relay.")
 
 
+def _consume_internal_operational_notifications(items: list[tuple[dict[str, Any], DomainOutbox]]) -> None:
+    """Consumidor interno para un lote: un SELECT de recibos y un solo flush.
+
+    Un choque de unicidad (recibo o notificación ya existentes por otra vía)
+    propaga el error; ``relay_pending_once`` deshace el lote y vuelve al
+    consumidor fila por fila.
+    """
+    pending: list[tuple[dict[str, Any], DomainOutbox, str]] = []
+    for evt, row in items:
+        if str(evt.get("event_type") or "").strip().upper() == "CHAT_CONVERSATION_TYPING":
+            continue
+        event_id = str(evt.get("event_id") or "")
+        if not event_id:
+            raise RuntimeError("Evento sin event_id para consumidor interno.")
+        pending.append((evt, row, event_id))
+    if not pending:
+        return
+
+    seen = {
+        str(eid)
+        for (eid,) in db.session.query(OutboxConsumerReceipt.event_id)
+        .filter(OutboxConsumerReceipt.consumer_name == _INTERNAL_CONSUMER_NAME)
+        .filter(OutboxConsumerReceipt.event_id.in_([eid[:64] for _e, _r, eid in pending]))
+        .all()
+    }
+    for evt, row, event_id in pending:
+        if event_id[:64] in seen:
+            continue
+        seen.add(event_id[:64])
+        notif = build_staff_notification(**_notification_fields(evt, row, event_id))
+        if notif is None:
+            raise RuntimeError("No se pudo crear notificación interna del relay.")
+        receipt = OutboxConsumerReceipt(consumer_name=_INTERNAL_CONSUMER_NAME[:80], event_id=event_id[:64])
+        _maybe_assign_sqlite_pk(receipt, OutboxConsumerReceipt)
+        db.session.add(receipt)
+        db.session.add(notif)
+    db.session.flush()
+
+
 def _retry_delay_seconds(attempts: int, max_backoff_seconds: int) -> int:
     base = 5
     exp = base * (2 ** max(0, int(attempts) - 1))
@@ -205,29 +265,125 @@ def _quarantine_reason() -> str:
     return "max_attempts_exhausted"
 
 
-def relay_pending_once(
-    *,
-    batch_size: int = 50,
-    max_backoff_seconds: int = 300,
-    max_attempts: int | None = None,
-    redis_client=None,
-    stream_key: str | None = None,
-) -> dict[str, int]:
-    now = utc_now_naive()
-    stream = (stream_key or "").strip() or _redis_stream_key()
-    client = redis_client or _redis_client()
+@event.listens_for(DomainOutbox, "after_insert")
+def _notify_outbox_inserted(_mapper, connection, _target) -> None:
+    """Despierta al relay (``LISTEN``) cuando la transacción que inserta hace commit.
+
+    Una sola vez por transacción (Postgres colapsa los avisos repetidos de
+    todos modos) y en un savepoint: un statement fallido abortaría la
+    transacción y con ella el insert del evento.
+    """
+    try:
+        if connection.dialect.name != "postgresql":
+            return
+        txn = connection.get_transaction()
+        notified = connection.info.get("_outbox_notified_txn")
+        if txn is not None and notified is not None and notified() is txn:
+            return
+        with connection.begin_nested():
+            connection.execute(text("SELECT pg_notify(:channel, '')"), {"channel": OUTBOX_NOTIFY_CHANNEL})
+        if txn is not None:
+            connection.info["_outbox_notified_txn"] = weakref.ref(txn)
+    except Exception:
+        return
+
+
+def _record_relay_metrics(stats: dict[str, Any]) -> None:
+    published = int(stats.get("published", 0) or 0)
+    if published <= 0:
+        return
+    bump_operational_counter("relay:published_count", delta=published)
+    bump_operational_counter("relay:lag_sum_ms", delta=int(stats.get("lag_ms_sum", 0) or 0))
 
-    max_attempts = max(1, int(max_attempts or _max_attempts()))
 
+class _RelayMetricsWindow:
+    """Acumula throughput/lag entre líneas de log ``outbox_relay.metrics``."""
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self.started = time.monotonic()
+        self.cycles = 0
+        self.published = 0
+        self.failed = 0
+        self.lag_ms_sum = 0
+        self.lag_ms_max = 0
+        self.publish_ms = 0
+        self.commit_ms = 0
+
+    def add(self, stats: dict[str, Any]) -> None:
+        self.cycles += 1
+        self.published += int(stats.get("published", 0) or 0)
+        self.failed += int(stats.get("failed", 0) or 0)
+        self.lag_ms_sum += int(stats.get("lag_ms_sum", 0) or 0)
+        self.lag_ms_max = max(self.lag_ms_max, int(stats.get("lag_ms_max", 0) or 0))
+        self.publish_ms += int(stats.get("publish_ms", 0) or 0)
+        self.commit_ms += int(stats.get("commit_ms", 0) or 0)
+
+    def due(self, interval_seconds: float) -> bool:
+        return (time.monotonic() - self.started) >= max(1.0, float(interval_seconds))
+
+    def log(self, *, mode: str) -> None:
+        elapsed = max(1e-6, time.monotonic() - self.started)
+        if self.published or self.failed:
+            current_app.logger.info(
+                "outbox_relay.metrics mode=%s cycles=%s published=%s failed=%s events_per_sec=%.1f "
+                "lag_ms_avg=%s lag_ms_max=%s publish_ms=%s commit_ms=%s",
+                mode,
+                self.cycles,
+                self.published,
+                self.failed,
+                self.published / elapsed,
+                int(self.lag_ms_sum / self.published) if self.published else 0,
+                self.lag_ms_max,
+                self.publish_ms,
+                self.commit_ms,
+            )
+        self._reset()
+
+
+def _aggregate_blocked_clause(now):
+    """Hay un evento anterior del mismo agregado esperando reintento: el siguiente espera.
+
+    Las filas en cuarentena no bloquean (un evento envenenado no frena su
+    agregado para siempre); las de tipos fuera del catálogo nunca se publican.
+    """
+    earlier = aliased(DomainOutbox)
+    return exists().where(
+        earlier.aggregate_type == DomainOutbox.aggregate_type,
+        earlier.aggregate_id == DomainOutbox.aggregate_id,
+        earlier.published_at.is_(None),
+        earlier.event_type.in_(sorted(OUTBOX_RELAY_ALLOWED_EVENT_TYPES)),
+        or_(earlier.relay_status.is_(None), earlier.relay_status != _OUTBOX_RELAY_STATUS_QUARANTINED),
+        earlier.next_retry_at.isnot(None),
+        earlier.next_retry_at > now,
+        or_(
+            earlier.created_at < DomainOutbox.created_at,
+            and_(earlier.created_at == DomainOutbox.created_at, earlier.id < DomainOutbox.id),
+        ),
+    )
+
+
+def _claim_pending_rows(*, now, batch_size: int, partitions: Collection[int] | None = None) -> list[DomainOutbox]:
+    if partitions is not None and not partitions:
+        return []
     pending_query = (
         DomainOutbox.query
         .filter(DomainOutbox.published_at.is_(None))
         .filter(DomainOutbox.event_type.in_(sorted(OUTBOX_RELAY_ALLOWED_EVENT_TYPES)))
         .filter(or_(DomainOutbox.relay_status.is_(None), DomainOutbox.relay_status != _OUTBOX_RELAY_STATUS_QUARANTINED))
         .filter(or_(DomainOutbox.next_retry_at.is_(None), DomainOutbox.next_retry_at <= now))
-        .order_by(DomainOutbox.created_at.asc(), DomainOutbox.id.asc())
-        .limit(max(1, int(batch_size)))
+        .filter(~_aggregate_blocked_clause(now))
     )
+    if partitions is not None:
+        owned = sorted({int(p) for p in partitions})
+        partition_filter = DomainOutbox.relay_partition.in_(owned)
+        if 0 in owned:
+            # Filas sin partición (insertadas fuera del ORM): las toma el dueño de la partición 0.
+            partition_filter = or_(partition_filter, DomainOutbox.relay_partition.is_(None))
+        pending_query = pending_query.filter(partition_filter)
+    pending_query = pending_query.order_by(DomainOutbox.created_at.asc(), DomainOutbox.id.asc()).limit(max(1, int(batch_size)))
 
     # En PostgreSQL, evita que dos workers relay tomen las mismas filas al mismo tiempo.
     try:
@@ -237,90 +393,617 @@ def relay_pending_once(
         dialect = ""
     if dialect == "postgresql":
         pending_query = pending_query.with_for_update(skip_locked=True)
+    return pending_query.all()
+
+
+def _publish_batch(client, stream: str, messages: list[dict[str, str]]) -> list[Exception | None]:
+    """XADD de los mensajes en un pipeline (un round-trip); devuelve el error por mensaje o ``None``."""
+    if not messages:
+        return []
+    pipeline_factory = getattr(client, "pipeline", None)
+    if pipeline_factory is None:
+        out: list[Exception | None] = []
+        for fields in messages:
+            try:
+                client.xadd(stream, fields)
+                out.append(None)
+            except Exception as exc:
+                out.append(exc)
+        return out
+    try:
+        pipe = pipeline_factory(transaction=False)
+        for fields in messages:
+            pipe.xadd(stream, fields)
+        results = list(pipe.execute(raise_on_error=False))
+    except Exception as exc:
+        return [exc] * len(messages)
+    if len(results) != len(messages):
+        err = RuntimeError("Respuesta incompleta del pipeline Redis.")
+        return [err] * len(messages)
+    return [res if isinstance(res, Exception) else None for res in results]
+
+
+def _mark_published(row_ids: list[int], published_at) -> None:
+    if not row_ids:
+        return
+    table = DomainOutbox.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id.in_(row_ids))
+        .values(
+            published_attempts=table.c.published_attempts + 1,
+            relay_status=_OUTBOX_RELAY_STATUS_PUBLISHED,
+            last_attempt_at=published_at,
+            first_failed_at=None,
+            last_error=None,
+            next_retry_at=None,
+            quarantined_at=None,
+            quarantine_reason=None,
+            published_at=published_at,
+        )
+    )
+
+
+def _record_failure(row_id: int, exc: Exception, *, row_now, max_backoff_seconds: int, max_attempts: int) -> bool:
+    """Programa reintento o cuarentena (sin commit). ``True`` si la fila quedó en cuarentena."""
+    fail_row = db.session.get(DomainOutbox, int(row_id))
+    if fail_row is None:
+        return False
+    attempts = int(getattr(fail_row, "published_attempts", 0) or 0) + 1
+    delay = _retry_delay_seconds(attempts, max_backoff_seconds=max_backoff_seconds)
+    fail_row.published_attempts = attempts
+    fail_row.last_attempt_at = row_now
+    if getattr(fail_row, "first_failed_at", None) is None:
+        fail_row.first_failed_at = row_now
+    fail_row.last_error = str(exc)[:500]
+    quarantined = attempts >= max_attempts
+    if quarantined:
+        fail_row.relay_status = _OUTBOX_RELAY_STATUS_QUARANTINED
+        fail_row.quarantined_at = row_now
+        fail_row.quarantine_reason = _quarantine_reason()
+        fail_row.next_retry_at = None
+    else:
+        fail_row.relay_status = _OUTBOX_RELAY_STATUS_RETRYING
+        fail_row.quarantined_at = None
+        fail_row.quarantine_reason = None
+        fail_row.next_retry_at = row_now + timedelta(seconds=delay)
+    db.session.add(fail_row)
+    return quarantined
+
+
+def _lag_ms(row: DomainOutbox, published_at) -> int:
+    created = getattr(row, "created_at", None)
+    if created is None:
+        return 0
+    try:
+        return max(0, int((published_at - created).total_seconds() * 1000))
+    except Exception:
+        return 0
+
+
+def relay_pending_once(
+    *,
+    batch_size: int = 200,
+    max_backoff_seconds: int = 300,
+    max_attempts: int | None = None,
+    redis_client=None,
+    stream_key: str | None = None,
+    partitions: Collection[int] | None = None,
+    renew_lease: Callable[[], bool] | None = None,
+) -> dict[str, int]:
+    """Un ciclo del relay: reclama un lote, lo publica en un pipeline y lo marca en un solo UPDATE.
+
+    El consumidor interno y el UPDATE van en la misma transacción que el
+    reclamo. Si algo de esa transacción falla, se deshace y el lote ya
+    publicado se confirma fila por fila como antes (cada fila con su propio
+    reintento); los consumidores son idempotentes por ``event_id``.
+
+    Con ``partitions`` solo reclama filas de esas particiones (relay
+    particionado). El orden por agregado se respeta: un agregado con un
+    evento anterior en backoff no avanza, y dentro del lote se publica por
+    oleadas con a lo sumo un evento por agregado en cada pipeline, así el
+    XADD de un evento solo sale cuando el anterior de su agregado ya está en
+    el stream. Si un evento no se pudo serializar o publicar, los siguientes
+    de su agregado no se envían y quedan pendientes (``deferred``).
 
-    pending_rows = pending_query.all()
+    ``renew_lease`` (el relay particionado) extiende los leases de las
+    particiones durante el ciclo; si devuelve ``False`` antes de publicar, la
+    partición ya es de otro worker y el lote se suelta sin publicar.
+    """
+    now = utc_now_naive()
+    stream = (stream_key or "").strip() or _redis_stream_key()
+    client = redis_client or _redis_client()
+
+    max_attempts = max(1, int(max_attempts or _max_attempts()))
+
+    pending_rows = _claim_pending_rows(now=now, batch_size=batch_size, partitions=partitions)
 
-    stats = {"picked": len(pending_rows), "published": 0, "failed": 0, "quarantined": 0}
+    stats = {
+        "picked": len(pending_rows),
+        "published": 0,
+        "failed": 0,
+        "quarantined": 0,
+        "publish_ms": 0,
+        "commit_ms": 0,
+        "lag_ms_sum": 0,
+        "lag_ms_max": 0,
+        "deferred": 0,
+    }
+    if not pending_rows:
+        return stats
 
+    failures: list[tuple[int, Exception]] = []
+    # Cola por agregado en orden de reclamo; un fallo de serialización corta
+    # la cola de su agregado (los siguientes nunca se codifican).
+    queues: dict[tuple[str, str], list[tuple[DomainOutbox, dict[str, Any], dict[str, str]]]] = {}
+    halted_aggregates: set[tuple[str, str]] = set()
     for row in pending_rows:
-        row_now = utc_now_naive()
+        aggregate = (str(row.aggregate_type or ""), str(row.aggregate_id or ""))
+        if aggregate in halted_aggregates:
+            stats["deferred"] += 1
+            continue
         try:
             envelope = _event_envelope(row)
-            client.xadd(
-                stream,
-                {"event": json.dumps(envelope, ensure_ascii=True, separators=(",", ":"))},
-            )
-            _consume_internal_operational_notification(envelope, row)
-
-            attempts = int(getattr(row, "published_attempts", 0) or 0) + 1
-            row.published_attempts = attempts
-            row.relay_status = _OUTBOX_RELAY_STATUS_PUBLISHED
-            row.last_attempt_at = row_now
-            row.first_failed_at = None
-            row.last_error = None
-            row.next_retry_at = None
-            row.quarantined_at = None
-            row.quarantine_reason = None
-            row.published_at = row_now
-            db.session.add(row)
-            db.session.commit()
-            stats["published"] += 1
+            fields = {"event": json.dumps(envelope, ensure_ascii=True, separators=(",", ":"))}
         except Exception as exc:
-            db.session.rollback()
-            fail_row = DomainOutbox.query.get(int(row.id))
-            if fail_row is None:
-                stats["failed"] += 1
+            failures.append((int(row.id), exc))
+            halted_aggregates.add(aggregate)
+            continue
+        queues.setdefault(aggregate, []).append((row, envelope, fields))
+
+    if renew_lease is not None and not renew_lease():
+        db.session.rollback()
+        current_app.logger.warning("outbox_relay.lease_lost picked=%s; lote sin publicar", len(pending_rows))
+        stats["deferred"] = len(pending_rows)
+        return stats
+
+    # Oleada ``depth``: el evento ``depth`` de cada agregado cuyo anterior ya
+    # quedó en el stream. Con agregados distintos en el lote es un solo
+    # pipeline; un agregado con k eventos en el lote necesita k oleadas.
+    started = time.perf_counter()
+    published: list[tuple[DomainOutbox, dict[str, Any]]] = []
+    depth = 0
+    while True:
+        wave = [(aggregate, queue[depth]) for aggregate, queue in queues.items() if len(queue) > depth]
+        if not wave:
+            break
+        if depth and renew_lease is not None:
+            renew_lease()
+        publish_errors = _publish_batch(client, stream, [fields for _aggregate, (_row, _envelope, fields) in wave])
+        for (aggregate, (row, envelope, _fields)), err in zip(wave, publish_errors):
+            if err is None:
+                published.append((row, envelope))
                 continue
-            attempts = int(getattr(fail_row, "published_attempts", 0) or 0) + 1
-            delay = _retry_delay_seconds(attempts, max_backoff_seconds=max_backoff_seconds)
-            fail_row.published_attempts = attempts
-            fail_row.last_attempt_at = row_now
-            if getattr(fail_row, "first_failed_at", None) is None:
-                fail_row.first_failed_at = row_now
-            fail_row.last_error = str(exc)[:500]
-            if attempts >= max_attempts:
-                fail_row.relay_status = _OUTBOX_RELAY_STATUS_QUARANTINED
-                fail_row.quarantined_at = row_now
-                fail_row.quarantine_reason = _quarantine_reason()
-                fail_row.next_retry_at = None
+            failures.append((int(row.id), err))
+            stats["deferred"] += len(queues[aggregate]) - depth - 1
+            del queues[aggregate][depth:]
+        depth += 1
+    stats["publish_ms"] = int((time.perf_counter() - started) * 1000)
+    claim_order = {int(row.id): pos for pos, row in enumerate(pending_rows)}
+    published.sort(key=lambda item: claim_order[int(item[0].id)])
+    if renew_lease is not None:
+        renew_lease()
+
+    published_at = utc_now_naive()
+    lags = [_lag_ms(row, published_at) for row, _envelope in published]
+    published_ids = [int(row.id) for row, _envelope in published]
+    started = time.perf_counter()
+    try:
+        _consume_internal_operational_notifications([(envelope, row) for row, envelope in published])
+        _mark_published(published_ids, published_at)
+        for row_id, exc in failures:
+            if _record_failure(row_id, exc, row_now=published_at, max_backoff_seconds=max_backoff_seconds, max_attempts=max_attempts):
+                stats["quarantined"] += 1
+        db.session.commit()
+        stats["published"] = len(published_ids)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.warning(
+            "outbox_relay.batch_commit_failed picked=%s; confirmando fila por fila",
+            len(pending_rows),
+            exc_info=True,
+        )
+        stats["quarantined"] = 0
+        lags = []
+        # Todo lo publicado ya está en el stream en orden; si una confirmación
+        # falla, los siguientes de su agregado quedan pendientes y se
+        # republican detrás (el consumidor descarta el duplicado por ``event_id``).
+        confirm_halted: set[tuple[str, str]] = set()
+        for row_id, (_row, envelope) in zip(published_ids, published):
+            aggregate = (str(envelope["aggregate"]["type"]), str(envelope["aggregate"]["id"]))
+            if aggregate in confirm_halted:
+                stats["deferred"] += 1
+                continue
+            if renew_lease is not None:
+                renew_lease()
+            row_now = utc_now_naive()
+            try:
+                row = db.session.get(DomainOutbox, row_id)
+                if row is None:
+                    continue
+                lag = _lag_ms(row, row_now)
+                _consume_internal_operational_notification(envelope, row)
+                _mark_published([row_id], row_now)
+                db.session.commit()
+                stats["published"] += 1
+                lags.append(lag)
+            except Exception as exc:
+                db.session.rollback()
+                failures.append((row_id, exc))
+                confirm_halted.add(aggregate)
+        for row_id, exc in failures:
+            if _record_failure(row_id, exc, row_now=utc_now_naive(), max_backoff_seconds=max_backoff_seconds, max_attempts=max_attempts):
                 stats["quarantined"] += 1
+        db.session.commit()
+    stats["commit_ms"] = int((time.perf_counter() - started) * 1000)
+    stats["failed"] = len(failures)
+    stats["lag_ms_sum"] = int(sum(lags))
+    stats["lag_ms_max"] = int(max(lags) if lags else 0)
+    return stats
+
+
+class OutboxRelayWakeup:
+    """Espera del relay entre ciclos: ``LISTEN`` en Postgres, pausa fija en el resto.
+
+    En modo ``notify`` el relay duerme hasta que un insert de ``domain_outbox``
+    hace ``pg_notify`` (o vence ``idle_poll_seconds``, el polling de respaldo).
+    Si la conexión ``LISTEN`` se cae, vuelve a modo ``poll`` y reintenta con
+    backoff.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.mode = "poll"
+        self.stats = {"notifications": 0, "listen_errors": 0}
+        self._raw_conn = None
+        self._dbapi_conn = None
+        self._retry_at = 0.0
+        self._backoff = 1.0
+
+    def start(self) -> str:
+        if self.engine is None or getattr(self.engine.dialect, "name", "") != "postgresql":
+            self.mode = "poll"
+            return self.mode
+        try:
+            raw_conn = self.engine.raw_connection()
+            # Conexión dedicada: no vuelve al pool mientras escucha.
+            raw_conn.detach()
+            dbapi_conn = raw_conn.driver_connection
+            dbapi_conn.autocommit = True
+            cur = dbapi_conn.cursor()
+            cur.execute(f"LISTEN {OUTBOX_NOTIFY_CHANNEL}")
+            self._raw_conn = raw_conn
+            self._dbapi_conn = dbapi_conn
+            self.mode = "notify"
+            self._backoff = 1.0
+        except Exception:
+            self._listen_failed()
+        return self.mode
+
+    def _listen_failed(self) -> None:
+        self.stats["listen_errors"] += 1
+        self.close()
+        self.mode = "poll"
+        self._retry_at = time.monotonic() + self._backoff
+        self._backoff = min(30.0, self._backoff * 2)
+
+    def wait(self, timeout: float) -> bool:
+        """``True`` si despertó por un aviso; ``False`` si venció el tiempo."""
+        timeout = max(0.0, float(timeout))
+        if self.mode != "notify":
+            time.sleep(timeout)
+            if self.engine is not None and time.monotonic() >= self._retry_at:
+                self.start()
+            return False
+        conn = self._dbapi_conn
+        try:
+            ready, _, _ = select.select([conn], [], [], timeout)
+            if not ready:
+                return False
+            conn.poll()
+            got = bool(conn.notifies)
+            self.stats["notifications"] += len(conn.notifies)
+            conn.notifies.clear()
+            return got
+        except Exception:
+            self._listen_failed()
+            return False
+
+    def close(self) -> None:
+        raw_conn = self._raw_conn
+        self._raw_conn = None
+        self._dbapi_conn = None
+        if raw_conn is not None:
+            try:
+                raw_conn.close()
+            except Exception:
+                pass
+
+
+_PARTITION_KEY_PREFIX = "outbox:relay:v1"
+_PARTITION_MAX_MEMBERS = 32
+
+
+def _member_key(slot: int) -> str:
+    return f"{_PARTITION_KEY_PREFIX}:member:{int(slot)}"
+
+
+def _lease_key(partition: int) -> str:
+    return f"{_PARTITION_KEY_PREFIX}:lease:{int(partition)}"
+
+
+def partition_owner(partition: int, members: list[str]) -> str | None:
+    """Dueño deseado por rendezvous hashing: al entrar/salir un worker solo se mueven sus particiones."""
+    best = None
+    best_score = -1
+    for member in members:
+        digest = hashlib.blake2b(f"{int(partition)}:{member}".encode("utf-8"), digest_size=8).digest()
+        score = int.from_bytes(digest, "big")
+        if score > best_score:
+            best, best_score = member, score
+    return best
+
+
+def relay_partition_members() -> list[str]:
+    values = bp_get_many([_member_key(slot) for slot in range(_PARTITION_MAX_MEMBERS)], context="outbox_relay_members")
+    return sorted({str(v) for v in values if v})
+
+
+def relay_partition_leases() -> dict[int, str | None]:
+    values = bp_get_many([_lease_key(p) for p in range(DOMAIN_OUTBOX_PARTITIONS)], context="outbox_relay_leases")
+    return {p: (str(v) if v else None) for p, v in enumerate(values)}
+
+
+class RelayPartitionCoordinator:
+    """Membresía y leases de particiones del relay sobre el backplane.
+
+    Cada worker ocupa un slot ``member:<n>`` (``bp_add`` + TTL) y, en cada
+    latido, calcula con rendezvous hashing qué particiones le tocan entre los
+    miembros vivos. Una partición solo se procesa con su lease ``lease:<p>``:
+    el dueño anterior la suelta entre ciclos y el nuevo la toma con
+    ``bp_add``; si un worker muere, su lease vence por TTL. Los leases y el
+    slot se renuevan con compare-and-set: un worker que se colgó más que el
+    TTL no pisa el lease que otro tomó mientras tanto. Así nunca hay dos
+    workers en la misma partición y el orden por agregado se mantiene.
+    """
+
+    def __init__(self, *, worker_id: str | None = None, heartbeat_seconds: float = 2.0, lease_seconds: int = 15):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+        self.heartbeat_seconds = max(0.5, float(heartbeat_seconds))
+        self.lease_seconds = max(int(self.heartbeat_seconds * 3) + 1, int(lease_seconds))
+        self.slot: int | None = None
+        self.owned: frozenset[int] = frozenset()
+        self.members: list[str] = []
+        self.stats = {"heartbeats": 0, "rebalances": 0, "acquired": 0, "released": 0, "renewals": 0}
+        self._next_beat = 0.0
+        self._next_renew = 0.0
+
+    def seconds_to_heartbeat(self) -> float:
+        return max(0.0, self._next_beat - time.monotonic())
+
+    def due(self) -> bool:
+        return time.monotonic() >= self._next_beat
+
+    def _join(self) -> bool:
+        if self.slot is not None:
+            if self._refresh(_member_key(self.slot), context="outbox_relay_member_refresh"):
+                return True
+            self.slot = None
+        for slot in range(_PARTITION_MAX_MEMBERS):
+            if bp_add(_member_key(slot), self.worker_id, timeout=self.lease_seconds, context="outbox_relay_member_join"):
+                self.slot = slot
+                return True
+        return False
+
+    def _refresh(self, key: str, *, context: str) -> bool:
+        """Extiende el TTL de ``key`` solo si su dueño sigue siendo este worker (compare-and-set)."""
+        return bp_refresh_if_value(key, self.worker_id, timeout=self.lease_seconds, context=context)
+
+    def heartbeat(self) -> frozenset[int]:
+        self._next_beat = time.monotonic() + self.heartbeat_seconds
+        self.stats["heartbeats"] += 1
+        if not self._join():
+            # Sin membresía (backplane caído o sin slots) no se procesa nada: no hay cómo excluir a otros.
+            self._set_owned(frozenset())
+            return self.owned
+
+        members = relay_partition_members()
+        if self.worker_id not in members:
+            members = sorted(members + [self.worker_id])
+        desired = {p for p in range(DOMAIN_OUTBOX_PARTITIONS) if partition_owner(p, members) == self.worker_id}
+        holders = relay_partition_leases()
+
+        keep: set[int] = set()
+        for partition, holder in holders.items():
+            if holder != self.worker_id:
+                continue
+            if partition in desired:
+                keep.add(partition)
             else:
-                fail_row.relay_status = _OUTBOX_RELAY_STATUS_RETRYING
-                fail_row.quarantined_at = None
-                fail_row.quarantine_reason = None
-                fail_row.next_retry_at = row_now + timedelta(seconds=delay)
-            db.session.add(fail_row)
-            db.session.commit()
-            stats["failed"] += 1
+                bp_delete(_lease_key(partition), context="outbox_relay_lease_release")
+                self.stats["released"] += 1
+        # Solo se renueva lo que sigue siendo de este worker; un lease perdido se suelta.
+        keep = {p for p in keep if self._refresh(_lease_key(p), context="outbox_relay_lease_refresh")}
+        for partition in sorted(desired - keep):
+            if holders.get(partition) is None and bp_add(
+                _lease_key(partition), self.worker_id, timeout=self.lease_seconds, context="outbox_relay_lease_acquire"
+            ):
+                keep.add(partition)
+                self.stats["acquired"] += 1
+        self.members = members
+        self._set_owned(frozenset(keep))
+        return self.owned
 
-    return stats
+    def renew(self) -> bool:
+        """Extiende los leases propios a mitad de un ciclo largo (sin rebalancear).
+
+        Como mucho una vez por ``heartbeat_seconds``. Devuelve ``False`` si
+        alguna partición ya no es de este worker.
+        """
+        if not self.owned or time.monotonic() < self._next_renew:
+            return True
+        self._next_renew = time.monotonic() + self.heartbeat_seconds
+        owned = sorted(self.owned)
+        mine = {p for p in owned if self._refresh(_lease_key(p), context="outbox_relay_lease_renew")}
+        if self.slot is not None and not self._refresh(_member_key(self.slot), context="outbox_relay_member_refresh"):
+            self.slot = None
+        self.stats["renewals"] += 1
+        if len(mine) != len(owned):
+            self._set_owned(frozenset(mine))
+            return False
+        return True
+
+    def _set_owned(self, owned: frozenset[int]) -> None:
+        if owned != self.owned:
+            self.stats["rebalances"] += 1
+            current_app.logger.info(
+                "outbox_relay.rebalance worker=%s members=%s owned=%s",
+                self.worker_id,
+                len(self.members),
+                len(owned),
+            )
+        self.owned = owned
+
+    def leave(self) -> None:
+        for partition in self.owned:
+            bp_delete(_lease_key(partition), context="outbox_relay_lease_release")
+        if self.slot is not None and bp_get(_member_key(self.slot), context="outbox_relay_member_get") == self.worker_id:
+            bp_delete(_member_key(self.slot), context="outbox_relay_member_leave")
+        self.slot = None
+        self.owned = frozenset()
+
+
+def partition_lag_status(*, now=None) -> list[dict[str, Any]]:
+    """Backlog por partición (pendientes, en reintento, edad del más viejo) con su lease actual."""
+    now = now or utc_now_naive()
+    rows = (
+        db.session.query(
+            DomainOutbox.relay_partition,
+            func.count(DomainOutbox.id),
+            func.sum(case((DomainOutbox.relay_status == _OUTBOX_RELAY_STATUS_RETRYING, 1), else_=0)),
+            func.min(DomainOutbox.created_at),
+        )
+        .filter(DomainOutbox.published_at.is_(None))
+        .filter(DomainOutbox.event_type.in_(sorted(OUTBOX_RELAY_ALLOWED_EVENT_TYPES)))
+        .filter(or_(DomainOutbox.relay_status.is_(None), DomainOutbox.relay_status != _OUTBOX_RELAY_STATUS_QUARANTINED))
+        .group_by(DomainOutbox.relay_partition)
+        .all()
+    )
+    by_partition = {part: (int(count or 0), int(retrying or 0), oldest) for part, count, retrying, oldest in rows}
+    leases = relay_partition_leases()
+    out = []
+    for partition in range(DOMAIN_OUTBOX_PARTITIONS):
+        pending, retrying, oldest = by_partition.get(partition, (0, 0, None))
+        out.append(
+            {
+                "partition": partition,
+                "owner": leases.get(partition),
+                "pending": pending,
+                "retrying": retrying,
+                "oldest_age_seconds": max(0, int((now - oldest).total_seconds())) if oldest is not None else 0,
+            }
+        )
+    if None in by_partition:
+        pending, retrying, oldest = by_partition[None]
+        out.append(
+            {
+                "partition": None,
+                "owner": None,
+                "pending": pending,
+                "retrying": retrying,
+                "oldest_age_seconds": max(0, int((now - oldest).total_seconds())) if oldest is not None else 0,
+            }
+        )
+    return out
 
 
 def run_relay_loop(
     *,
-    batch_size: int = 50,
+    batch_size: int = 200,
     poll_seconds: float = 0.3,
+    idle_poll_seconds: float = 5.0,
+    listen: bool = True,
     max_backoff_seconds: int = 300,
     max_attempts: int | None = None,
     once: bool = False,
     stream_key: str | None = None,
-) -> dict[str, int]:
-    summary = {"cycles": 0, "published": 0, "failed": 0, "picked": 0, "quarantined": 0}
-    while True:
-        stats = relay_pending_once(
-            batch_size=batch_size,
-            max_backoff_seconds=max_backoff_seconds,
-            max_attempts=max_attempts,
-            stream_key=stream_key,
-        )
-        summary["cycles"] += 1
-        summary["published"] += int(stats.get("published", 0) or 0)
-        summary["failed"] += int(stats.get("failed", 0) or 0)
-        summary["picked"] += int(stats.get("picked", 0) or 0)
-        summary["quarantined"] += int(stats.get("quarantined", 0) or 0)
-        if once:
-            return summary
-        time.sleep(max(0.1, float(poll_seconds)))
+    metrics_interval_seconds: float = 60.0,
+    counters_interval_seconds: float = 10.0,
+    coordinator: RelayPartitionCoordinator | None = None,
+) -> dict[str, Any]:
+    """Ciclos de relay; con backlog no espera entre lotes y sin backlog espera aviso o polling.
+
+    Con ``coordinator`` el worker solo procesa las particiones cuyo lease tiene
+    y late entre ciclos; a mitad de un lote solo renueva esos leases.
+    """
+    summary: dict[str, Any] = {
+        "cycles": 0,
+        "published": 0,
+        "failed": 0,
+        "picked": 0,
+        "quarantined": 0,
+        "deferred": 0,
+        "lag_ms_sum": 0,
+        "lag_ms_max": 0,
+        "wakeups_notify": 0,
+        "wakeups_timeout": 0,
+    }
+    wakeup = OutboxRelayWakeup(db.engine if (listen and not once) else None)
+    wakeup.start()
+    started = time.monotonic()
+    window = _RelayMetricsWindow()
+    counters_at = 0.0
+    try:
+        while True:
+            partitions = None
+            if coordinator is not None:
+                if coordinator.due():
+                    coordinator.heartbeat()
+                partitions = coordinator.owned
+            stats = relay_pending_once(
+                batch_size=batch_size,
+                max_backoff_seconds=max_backoff_seconds,
+                max_attempts=max_attempts,
+                stream_key=stream_key,
+                partitions=partitions,
+                renew_lease=coordinator.renew if coordinator is not None else None,
+            )
+            summary["cycles"] += 1
+            for key in ("published", "failed", "picked", "quarantined", "deferred", "lag_ms_sum"):
+                summary[key] += int(stats.get(key, 0) or 0)
+            summary["lag_ms_max"] = max(int(summary["lag_ms_max"]), int(stats.get("lag_ms_max", 0) or 0))
+            _record_relay_metrics(stats)
+            window.add(stats)
+            if window.due(metrics_interval_seconds):
+                window.log(mode=wakeup.mode)
+            if once:
+                break
+            if time.monotonic() - counters_at >= max(1.0, float(counters_interval_seconds)):
+                counters_at = time.monotonic()
+                try:
+                    refresh_outbox_status_counters()
+                except Exception:
+                    db.session.rollback()
+                    current_app.logger.exception("outbox_relay.counters_refresh_failed")
+            if int(stats.get("picked", 0) or 0) >= max(1, int(batch_size)):
+                continue
+            wait_seconds = idle_poll_seconds if wakeup.mode == "notify" else poll_seconds
+            if coordinator is not None:
+                wait_seconds = min(float(wait_seconds), coordinator.seconds_to_heartbeat())
+            if wakeup.wait(max(0.1, float(wait_seconds))):
+                summary["wakeups_notify"] += 1
+            else:
+                summary["wakeups_timeout"] += 1
+    finally:
+        wakeup.close()
+        if coordinator is not None:
+            coordinator.leave()
+    elapsed = max(1e-6, time.monotonic() - started)
+    summary["mode"] = wakeup.mode
+    summary["elapsed_ms"] = int(elapsed * 1000)
+    summary["events_per_sec"] = round(summary["published"] / elapsed, 1)
+    summary["lag_ms_avg"] = int(summary["lag_ms_sum"] / summary["published"]) if summary["published"] else 0
+    return summary
 
 
 def list_quarantined_events(
@@ -380,8 +1063,16 @@ def outbox_relay_cli():
 
 @outbox_relay_cli.command("run")
 @click.option("--once", is_flag=True, default=False, help="Ejecuta un solo ciclo de relay.")
-@click.option("--batch-size", default=50, show_default=True, type=int, help="Cantidad máxima por ciclo.")
-@click.option("--poll-seconds", default=0.3, show_default=True, type=float, help="Pausa entre ciclos.")
+@click.option("--batch-size", default=200, show_default=True, type=int, help="Cantidad máxima por ciclo.")
+@click.option("--poll-seconds", default=0.3, show_default=True, type=float, help="Pausa entre ciclos sin LISTEN.")
+@click.option(
+    "--idle-poll-seconds",
+    default=5.0,
+    show_default=True,
+    type=float,
+    help="Polling de respaldo mientras el relay espera avisos LISTEN/NOTIFY.",
+)
+@click.option("--listen/--no-listen", default=True, show_default=True, help="Despertar con LISTEN/NOTIFY (Postgres).")
 @click.option(
     "--max-backoff-seconds",
     default=300,
@@ -402,32 +1093,81 @@ def outbox_relay_cli():
     show_default=False,
     help="Redis Stream destino. Si se omite usa OUTBOX_RELAY_STREAM_KEY o valor por defecto.",
 )
+@click.option(
+    "--partitioned",
+    is_flag=True,
+    default=False,
+    help="Worker de un relay particionado (N procesos; requiere backplane Redis).",
+)
+@click.option("--heartbeat-seconds", default=2.0, show_default=True, type=float, help="Latido/rebalanceo del modo particionado.")
 @with_appcontext
 def outbox_relay_run_command(
     once: bool,
     batch_size: int,
     poll_seconds: float,
+    idle_poll_seconds: float,
+    listen: bool,
     max_backoff_seconds: int,
     max_attempts: int,
     stream_key: str,
+    partitioned: bool,
+    heartbeat_seconds: float,
 ):
+    coordinator = None
+    if partitioned:
+        status = backplane_status()
+        if "redis" not in str(status.cache_type or "").lower() or not status.configured:
+            raise click.ClickException("--partitioned requiere backplane Redis compartido (CACHE_TYPE=RedisCache).")
+        coordinator = RelayPartitionCoordinator(heartbeat_seconds=heartbeat_seconds)
     stats = run_relay_loop(
         batch_size=max(1, int(batch_size)),
         poll_seconds=max(0.1, float(poll_seconds)),
+        idle_poll_seconds=max(0.1, float(idle_poll_seconds)),
+        listen=bool(listen),
         max_backoff_seconds=max(5, int(max_backoff_seconds)),
         max_attempts=max(1, int(max_attempts)),
         once=bool(once),
         stream_key=(stream_key or "").strip() or None,
+        coordinator=coordinator,
     )
     click.echo(
         f"relay_cycles={int(stats.get('cycles', 0))} "
         f"picked={int(stats.get('picked', 0))} "
         f"published={int(stats.get('published', 0))} "
         f"failed={int(stats.get('failed', 0))} "
-        f"quarantined={int(stats.get('quarantined', 0))}"
+        f"quarantined={int(stats.get('quarantined', 0))} "
+        f"events_per_sec={stats.get('events_per_sec', 0)} "
+        f"lag_ms_avg={int(stats.get('lag_ms_avg', 0))} "
+        f"lag_ms_max={int(stats.get('lag_ms_max', 0))}"
     )
 
 
+@outbox_relay_cli.command("partitions")
+@click.option("--all", "show_all", is_flag=True, default=False, help="Incluye particiones sin backlog.")
+@with_appcontext
+def outbox_relay_partitions_command(show_all: bool):
+    """Workers vivos, dueño y lag por partición del relay."""
+    members = relay_partition_members()
+    rows = partition_lag_status()
+    owners: dict[str, int] = {}
+    for row in rows:
+        if row["owner"]:
+            owners[row["owner"]] = owners.get(row["owner"], 0) + 1
+    click.echo(f"partitions={DOMAIN_OUTBOX_PARTITIONS} workers={len(members)}")
+    for member in members:
+        click.echo(f"worker={member} partitions_owned={owners.get(member, 0)}")
+    unowned = sum(1 for row in rows if row["partition"] is not None and not row["owner"])
+    click.echo(f"unowned_partitions={unowned}")
+    for row in rows:
+        if not show_all and not row["pending"]:
+            continue
+        click.echo(
+            f"partition={'-' if row['partition'] is None else row['partition']} "
+            f"owner={row['owner'] or '-'} pending={row['pending']} retrying={row['retrying']} "
+            f"oldest_age_seconds={row['oldest_age_seconds']}"
+        )
+
+
 @outbox_relay_cli.group("quarantine")
 def outbox_relay_quarantine_group():
     """Operación mínima de cuarentena para domain_outbox."""
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""Retención de ``domain_outbox`` y contadores de estado mantenidos.
+
+``domain_outbox`` y ``outbox_consumer_receipts`` solo crecían, y el semáforo
+operativo contaba pendientes/reintentos/cuarentena sobre la tabla completa
+en cada health check.
+
+- ``archive_published_outbox``: mueve por lotes las filas publicadas hace más
+  de ``OUTBOX_RETENTION_DAYS`` a ``domain_outbox_archive`` (fila completa en
+  JSON gzip) y las borra de la tabla caliente, en la misma transacción.
+  En Postgres el archivo está particionado por mes de ``published_at``; las
+  particiones se crean antes de archivar y la purga del archivo es un DROP.
+- ``prune_consumer_receipts``: borra recibos de consumidor más viejos que
+  ``OUTBOX_RECEIPT_RETENTION_DAYS`` (un evento de esa edad ya no se reentrega).
+- ``refresh_outbox_status_counters``: el relay recalcula cada pocos segundos
+  los conteos por estado leyendo solo las filas sin publicar y los deja en el
+  backplane; ``outbox_status_counters`` los sirve al health check.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from typing import Any
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+
+from config_app import db
+from models import DomainOutbox, DomainOutboxArchive, OutboxConsumerReceipt
+from utils.distributed_backplane import bp_get, bp_set
+from utils.runtime_config import env_int
+from utils.timezone import iso_utc_z, parse_iso_utc, utc_now_naive
+
+
+COUNTERS_KEY = "outbox:status_counters:v1"
+_ARCHIVE_TABLE = "domain_outbox_archive"
+
+
+def _dialect() -> str:
+    try:
+        return str(db.session.get_bind().dialect.name or "").lower()
+    except Exception:
+        return ""
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return iso_utc_z(value, seconds=False)
+    return value
+
+
+def _archive_record(row: DomainOutbox) -> bytes:
+    record = {col.name: _jsonable(getattr(row, col.key)) for col in DomainOutbox.__table__.columns}
+    raw = json.dumps(record, ensure_ascii=True, separators=(",", ":"), sort_keys=True)
+    return gzip.compress(raw.encode("utf-8"), compresslevel=6)
+
+
+def load_archived_record(record_gz: bytes) -> dict[str, Any]:
+    """Fila original de ``domain_outbox`` guardada en el archivo."""
+    return json.loads(gzip.decompress(record_gz).decode("utf-8"))
+
+
+def _month_start(value: datetime | date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + (value.month // 12), (value.month % 12) + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{_ARCHIVE_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def ensure_archive_partitions(first: datetime | date, last: datetime | date) -> int:
+    """Crea (Postgres) las particiones mensuales del archivo entre ``first`` y ``last``."""
+    if _dialect() != "postgresql":
+        return 0
+    created = 0
+    month = _month_start(first)
+    stop = _month_start(last)
+    while month <= stop:
+        name = _partition_name(month)
+        exists = db.session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists is None:
+            db.session.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {_ARCHIVE_TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+                )
+            )
+            created += 1
+        month = _next_month(month)
+    return created
+
+
+def archive_published_outbox(
+    *,
+    older_than_days: int | None = None,
+    batch_size: int = 1000,
+    max_batches: int | None = None,
+) -> dict[str, int]:
+    """Mueve filas publicadas viejas a ``domain_outbox_archive``; un commit por lote."""
+    days = int(older_than_days or env_int("OUTBOX_RETENTION_DAYS", 7))
+    cutoff = utc_now_naive() - timedelta(days=max(1, days))
+    batch = max(1, min(int(batch_size or 1000), 10000))
+    outbox = DomainOutbox.__table__
+    archive = DomainOutboxArchive.__table__
+    stats = {"archived": 0, "batches": 0, "partitions_created": 0}
+    while max_batches is None or stats["batches"] < int(max_batches):
+        q = (
+            DomainOutbox.query
+            .filter(DomainOutbox.published_at.isnot(None))
+            .filter(DomainOutbox.published_at < cutoff)
+            .order_by(DomainOutbox.published_at.asc(), DomainOutbox.id.asc())
+            .limit(batch)
+        )
+        if _dialect() == "postgresql":
+            q = q.with_for_update(skip_locked=True)
+        rows = q.all()
+        if not rows:
+            break
+        stats["partitions_created"] += ensure_archive_partitions(rows[0].published_at, rows[-1].published_at)
+        now_value = utc_now_naive()
+        payload = [
+            {
+                "id": int(row.id),
+                "published_at": row.published_at,
+                "event_id": row.event_id,
+                "event_type": row.event_type,
+                "aggregate_type": row.aggregate_type,
+                "aggregate_id": row.aggregate_id,
+                "created_at": row.created_at,
+                "archived_at": now_value,
+                "record_gz": _archive_record(row),
+            }
+            for row in rows
+        ]
+        ids = [item["id"] for item in payload]
+        db.session.execute(archive.insert(), payload)
+        db.session.execute(outbox.delete().where(outbox.c.id.in_(ids)))
+        db.session.commit()
+        db.session.expunge_all()
+        stats["archived"] += len(ids)
+        stats["batches"] += 1
+    return stats
+
+
+def prune_consumer_receipts(*, older_than_days: int | None = None, batch_size: int = 5000) -> int:
+    days = int(older_than_days or env_int("OUTBOX_RECEIPT_RETENTION_DAYS", 30))
+    cutoff = utc_now_naive() - timedelta(days=max(1, days))
+    table = OutboxConsumerReceipt.__table__
+    batch = max(1, min(int(batch_size or 5000), 50000))
+    deleted = 0
+    while True:
+        ids = [
+            int(rid)
+            for (rid,) in db.session.execute(
+                select(table.c.id).where(table.c.processed_at < cutoff).order_by(table.c.id.asc()).limit(batch)
+            ).all()
+        ]
+        if not ids:
+            break
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+    return deleted
+
+
+def purge_archive(*, older_than_days: int | None = None) -> int:
+    """Borra del archivo lo publicado antes del corte (DROP de particiones completas en Postgres)."""
+    days = int(older_than_days or env_int("OUTBOX_ARCHIVE_RETENTION_DAYS", 365))
+    cutoff = utc_now_naive() - timedelta(days=max(1, days))
+    if _dialect() == "postgresql":
+        names = db.session.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :parent"
+            ),
+            {"parent": _ARCHIVE_TABLE},
+        ).scalars().all()
+        dropped = 0
+        for name in sorted(names):
+            prefix = f"{_ARCHIVE_TABLE}_y"
+            if not name.startswith(prefix):
+                continue
+            try:
+                month = date(int(name[len(prefix):len(prefix) + 4]), int(name[-2:]), 1)
+            except ValueError:
+                continue
+            if _next_month(month) <= cutoff.date():
+                db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped += 1
+        db.session.commit()
+        return dropped
+    table = DomainOutboxArchive.__table__
+    result = db.session.execute(table.delete().where(table.c.published_at < cutoff))
+    db.session.commit()
+    return int(result.rowcount or 0)
+
+
+def compute_outbox_status_counters() -> dict[str, Any]:
+    """Conteos por estado leyendo solo las filas sin publicar (el backlog, no la tabla)."""
+    rows = (
+        db.session.query(DomainOutbox.relay_status, func.count(DomainOutbox.id), func.min(DomainOutbox.created_at))
+        .filter(DomainOutbox.published_at.is_(None))
+        .group_by(DomainOutbox.relay_status)
+        .all()
+    )
+    counters = {"backlog": 0, "pending": 0, "retrying": 0, "quarantined": 0}
+    oldest = None
+    for status, count, first_created in rows:
+        count = int(count or 0)
+        counters["backlog"] += count
+        key = str(status or "pending")
+        counters[key if key in counters else "pending"] += count
+        if first_created is not None and (oldest is None or first_created < oldest):
+            oldest = first_created
+    counters["oldest_pending_created_at"] = iso_utc_z(oldest) if oldest is not None else None
+    counters["computed_at"] = iso_utc_z(utc_now_naive())
+    return counters
+
+
+def refresh_outbox_status_counters() -> dict[str, Any]:
+    counters = compute_outbox_status_counters()
+    ttl = env_int("OUTBOX_COUNTERS_TTL_SECONDS", 120, min_value=10)
+    bp_set(COUNTERS_KEY, counters, timeout=ttl, context="outbox_counters_set")
+    return counters
+
+
+def outbox_status_counters(*, max_age_seconds: int | None = None) -> dict[str, Any] | None:
+    """Últimos conteos publicados por el relay; ``None`` si no hay o están viejos."""
+    counters = bp_get(COUNTERS_KEY, default=None, context="outbox_counters_get")
+    if not isinstance(counters, dict):
+        return None
+    computed = parse_iso_utc(counters.get("computed_at"))
+    computed = computed.replace(tzinfo=None) if computed is not None else None
+    max_age = int(max_age_seconds or env_int("OUTBOX_COUNTERS_MAX_AGE_SECONDS", 60, min_value=5))
+    if computed is None or computed < utc_now_naive() - timedelta(seconds=max_age):
+        return None
+    return counters
+
+
+def outbox_retention_stats() -> dict[str, Any]:
+    hot_total = int(db.session.query(func.count(DomainOutbox.id)).scalar() or 0)
+    archive_total = int(db.session.query(func.count(DomainOutboxArchive.id)).scalar() or 0)
+    oldest_published = db.session.query(func.min(DomainOutbox.published_at)).scalar()
+    receipts = int(db.session.query(func.count(OutboxConsumerReceipt.id)).scalar() or 0)
+    return {
+        "hot_rows": hot_total,
+        "archive_rows": archive_total,
+        "receipts": receipts,
+        "oldest_published_in_hot": oldest_published,
+        **{k: v for k, v in compute_outbox_status_counters().items() if k != "computed_at"},
+    }
+
+
+@click.group("outbox-retention")
+def outbox_retention_cli():
+    """Retención/archivo de domain_outbox y recibos de consumidor."""
+
+
+@outbox_retention_cli.command("run")
+@click.option("--older-than-days", default=0, type=int, help="Publicados hace más de N días (OUTBOX_RETENTION_DAYS, 7).")
+@click.option("--batch-size", default=1000, show_default=True, type=int, help="Filas por lote/commit.")
+@click.option("--max-batches", default=0, type=int, help="Tope de lotes por corrida (0 = sin tope).")
+@click.option("--receipts-days", default=0, type=int, help="Recibos más viejos que N días (OUTBOX_RECEIPT_RETENTION_DAYS, 30).")
+@click.option("--archive-days", default=0, type=int, help="Purga del archivo (OUTBOX_ARCHIVE_RETENTION_DAYS, 365).")
+@with_appcontext
+def outbox_retention_run_command(
+    older_than_days: int,
+    batch_size: int,
+    max_batches: int,
+    receipts_days: int,
+    archive_days: int,
+):
+    """Archiva publicados viejos, poda recibos y purga el archivo vencido (cron diario)."""
+    stats = archive_published_outbox(
+        older_than_days=older_than_days or None,
+        batch_size=batch_size,
+        max_batches=max_batches or None,
+    )
+    receipts = prune_consumer_receipts(older_than_days=receipts_days or None)
+    purged = purge_archive(older_than_days=archive_days or None)
+    refresh_outbox_status_counters()
+    current_app.logger.info(
+        "outbox_retention.run archived=%s batches=%s receipts_pruned=%s archive_purged=%s",
+        stats["archived"],
+        stats["batches"],
+        receipts,
+        purged,
+    )
+    click.echo(
+        f"archived={stats['archived']} batches={stats['batches']} partitions_created={stats['partitions_created']} "
+        f"receipts_pruned={receipts} archive_purged={purged}"
+    )
+
+
+@outbox_retention_cli.command("stats")
+@with_appcontext
+def outbox_retention_stats_command():
+    """Tamaño de la tabla caliente, del archivo y conteos por estado."""
+    out = outbox_retention_stats()
+    click.echo(" ".join(f"{key}={value}" for key, value in out.items()))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Publicación periódica de métricas por proceso en el backplane.
+
+Cada proceso guarda su snapshot en ``<key_prefix><host>:<pid>`` (con TTL) y se
+anota en un índice compartido; el admin lee todos los snapshots y los suma.
+``maybe_publish`` es barato de llamar en caliente: solo escribe cada
+``publish_seconds`` y nunca falla hacia el llamador.
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable
+
+from flask import has_app_context
+
+from utils.distributed_backplane import bp_get, bp_get_many, bp_set
+
+
+_INDEX_MAX_PROCESSES = 64
+_INDEX_TTL_SECONDS = 3600
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"[:80]
+
+
+class ProcessMetricsPublisher:
+    def __init__(
+        self,
+        *,
+        index_key: str,
+        key_prefix: str,
+        collect: Callable[[], Any],
+        context: str,
+        publish_seconds: float = 15.0,
+        ttl_seconds: int = 300,
+    ):
+        self.index_key = index_key
+        self.key_prefix = key_prefix
+        self.collect = collect
+        self.context = context
+        self.publish_seconds = float(publish_seconds)
+        self.ttl_seconds = int(ttl_seconds)
+        self._lock = threading.Lock()
+        self._last_publish_mono = 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._last_publish_mono = 0.0
+
+    def maybe_publish(self, *, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_publish_mono < self.publish_seconds:
+                return
+            if not has_app_context():
+                return
+            self._last_publish_mono = now
+        try:
+            proc = process_id()
+            bp_set(f"{self.key_prefix}{proc}", self.collect(), timeout=self.ttl_seconds, context=self.context)
+            index = list(bp_get(self.index_key, default=[], context=self.context) or [])
+            if proc not in index:
+                bp_set(self.index_key, (index + [proc])[-_INDEX_MAX_PROCESSES:], timeout=_INDEX_TTL_SECONDS, context=self.context)
+        except Exception:
+            return
+
+    def snapshots(self) -> list[Any]:
+        """Snapshots de todos los procesos (el propio recién publicado); sin backplane, solo el local."""
+        self.maybe_publish(force=True)
+        index = list(bp_get(self.index_key, default=[], context=self.context) or [])
+        snapshots = bp_get_many([f"{self.key_prefix}{proc}" for proc in index], context=self.context) if index else []
+        if not any(snapshots):
+            snapshots = [self.collect()]
+        return list(snapshots)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Lectura de variables de entorno y detección de migraciones en caliente.
+
+- ``env_int``/``env_float``/``is_true``: parseo tolerante de variables de
+  entorno; un valor inválido vuelve al default.
+- ``schema_ready``: comprueba una vez por motor si una tabla o columnas nuevas
+  ya existen. El ``True`` se cachea para siempre; mientras falte la migración
+  se vuelve a inspeccionar cada ``SCHEMA_RETRY_SECONDS``, así los procesos
+  vivos la detectan sin reiniciar. ``table_ready``/``columns_ready`` son los
+  casos comunes.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from time import monotonic
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import inspect as sa_inspect
+
+from config_app import db
+
+
+SCHEMA_RETRY_SECONDS = 60.0
+
+_SCHEMA_READY: dict[tuple[str, str], bool] = {}
+_SCHEMA_MISS_AT: dict[tuple[str, str], float] = {}
+_SCHEMA_LOCK = threading.Lock()
+
+
+def is_true(value: str | None, *, default: bool = False) -> bool:
+    raw = (value or "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+def env_int(name: str, default: int, *, min_value: int = 1, max_value: int | None = None) -> int:
+    try:
+        value = max(min_value, int(str(os.getenv(name, default) or default).strip()))
+    except Exception:
+        return int(default)
+    return value if max_value is None else min(max_value, value)
+
+
+def env_float(name: str, default: float, *, min_value: float = 0.0) -> float:
+    try:
+        return max(min_value, float(str(os.getenv(name, default) or default).strip()))
+    except Exception:
+        return float(default)
+
+
+def schema_ready(name: str, probe: Callable[[Any], bool], *, bind=None) -> bool:
+    """``probe(bind)`` cacheado por motor + ``name``; ``bind`` default: el de la sesión.
+
+    Se puede pasar la conexión de un flush para no abrir otra dentro del evento.
+    """
+    try:
+        bind = db.session.get_bind() if bind is None else bind
+        key = (str(bind.engine.url), name)
+    except Exception:
+        return False
+    if _SCHEMA_READY.get(key):
+        return True
+    now = monotonic()
+    if (now - _SCHEMA_MISS_AT.get(key, -SCHEMA_RETRY_SECONDS)) < SCHEMA_RETRY_SECONDS:
+        return False
+    with _SCHEMA_LOCK:
+        try:
+            ready = bool(probe(bind))
+        except Exception:
+            ready = False
+        if ready:
+            _SCHEMA_READY[key] = True
+            _SCHEMA_MISS_AT.pop(key, None)
+        else:
+            _SCHEMA_MISS_AT[key] = now
+    return ready
+
+
+def table_ready(table_name: str, *, bind=None) -> bool:
+    return schema_ready(
+        f"table:{table_name}",
+        lambda b: table_name in sa_inspect(b).get_table_names(),
+        bind=bind,
+    )
+
+
+def columns_ready(table_name: str, columns: Iterable[str], *, bind=None) -> bool:
+    wanted = tuple(columns)
+
+    def _probe(b) -> bool:
+        cols = {c["name"] for c in sa_inspect(b).get_columns(table_name)}
+        return all(name in cols for name in wanted)
+
+    return schema_ready(f"columns:{table_name}:{','.join(wanted)}", _probe, bind=bind)
+
+
+def reset_schema_cache() -> None:
+    """Olvida lo detectado (tests y scripts que crean/borran tablas)."""
+    with _SCHEMA_LOCK:
+        _SCHEMA_READY.clear()
+        _SCHEMA_MISS_AT.clear()
@@ -10,7 +10,7 @@ from config_app import db
 from models import StaffNotificacion
 
 
-def create_staff_notification(
+def build_staff_notification(
     *,
     tipo: str,
     entity_type: str,
@@ -18,22 +18,21 @@ def create_staff_notification(
     titulo: str,
     mensaje: str | None = None,
     payload: dict[str, Any] | None = None,
-    session_commit: bool = True,
-) -> bool:
-    """Crea una notificación interna sin afectar el flujo principal."""
+) -> StaffNotificacion | None:
+    """Valida y arma la fila (sin agregarla a la sesión); ``None`` si los datos no alcanzan."""
     tipo_val = (tipo or "").strip()[:50]
     etype_val = (entity_type or "").strip()[:30]
     title_val = (titulo or "").strip()[:180]
     if not tipo_val or not etype_val or not title_val:
-        return False
+        return None
     try:
         eid = int(entity_id or 0)
     except Exception:
-        return False
+        return None
     if eid <= 0:
-        return False
+        return None
 
-    row = StaffNotificacion(
+    return StaffNotificacion(
         tipo=tipo_val,
         entity_type=etype_val,
         entity_id=eid,
@@ -41,6 +40,29 @@ def create_staff_notification(
         mensaje=(mensaje or "").strip()[:300] or None,
         payload=payload or None,
     )
+
+
+def create_staff_notification(
+    *,
+    tipo: str,
+    entity_type: str,
+    entity_id: int,
+    titulo: str,
+    mensaje: str | None = None,
+    payload: dict[str, Any] | None = None,
+    session_commit: bool = True,
+) -> bool:
+    """Crea una notificación interna sin afectar el flujo principal."""
+    row = build_staff_notification(
+        tipo=tipo,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        titulo=titulo,
+        mensaje=mensaje,
+        payload=payload,
+    )
+    if row is None:
+        return False
     try:
         insp = inspect(db.engine)
         if not insp.has_table("staff_notificaciones"):
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Filtros, facetas y paginación de la tienda pública sobre un snapshot en memoria.
+
+Cálculo puro (sin Flask ni modelos): ``core.services.store_facets`` arma el
+snapshot desde ``candidatas_web`` y lo guarda en el backplane; el benchmark de
+``scripts/local`` lo usa directo.
+
+La semántica replica los filtros SQL de ``domesticas_store_list``
+(``ILIKE '%x%'`` = subcadena sin mayúsculas) y su orden: ``orden_lista`` con
+nulos al final, luego ``fecha_ultima_actualizacion`` desc (nulos primero, como
+PostgreSQL) y ``fila`` desc. Las facetas son disyuntivas: el conteo de cada
+ciudad aplica todos los filtros activos *menos* el de ciudad.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, NamedTuple, Sequence
+
+
+class StoreFacetRow(NamedTuple):
+    """Una fila del snapshot (tupla: se serializa barato en el backplane)."""
+
+    fila: int
+    nombre: str
+    ciudad: str
+    sector: str
+    modalidad: str
+    tags_raw: str
+    disponible_inmediato: bool
+    orden_lista: int | None
+    actualizado_ts: float | None
+
+
+@dataclass(frozen=True)
+class StoreFilters:
+    q: str = ""
+    ciudad: str = ""
+    modalidad: str = ""
+    tag: str = ""
+    disponible_inmediato: bool = False
+
+    def active(self) -> bool:
+        return bool(self.q or self.ciudad or self.modalidad or self.tag or self.disponible_inmediato)
+
+
+@dataclass
+class StoreListing:
+    total: int
+    page_ids: list[int]
+    ciudades: list[tuple[str, int]] = field(default_factory=list)
+    modalidades: list[tuple[str, int]] = field(default_factory=list)
+    tags: list[tuple[str, int]] = field(default_factory=list)
+    disponible_inmediato: int = 0
+    opciones_ciudades: list[str] = field(default_factory=list)
+    opciones_modalidades: list[str] = field(default_factory=list)
+
+
+def sort_key(row: StoreFacetRow):
+    return (
+        row.orden_lista is None,
+        row.orden_lista or 0,
+        row.actualizado_ts is not None,
+        -(row.actualizado_ts or 0.0),
+        -int(row.fila),
+    )
+
+
+def _split_tags(raw: str) -> tuple[str, ...]:
+    seen: dict[str, str] = {}
+    for part in (raw or "").split(","):
+        tag = part.strip()
+        if tag and tag.casefold() not in seen:
+            seen[tag.casefold()] = tag
+    return tuple(seen.values())
+
+
+class _Counter:
+    """Conteo por valor; con ``fold`` agrupa sin mayúsculas y muestra la primera forma vista."""
+
+    __slots__ = ("counts", "labels", "fold")
+
+    def __init__(self, *, fold: bool = False) -> None:
+        self.counts: dict[str, int] = {}
+        self.labels: dict[str, str] = {}
+        self.fold = fold
+
+    def add(self, value: str) -> None:
+        if not value:
+            return
+        key = value.casefold() if self.fold else value
+        if key not in self.labels:
+            self.labels[key] = value
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def items(self, limit: int | None = None) -> list[tuple[str, int]]:
+        out = sorted(
+            ((self.labels[k], n) for k, n in self.counts.items()),
+            key=lambda item: (-item[1], item[0].casefold()),
+        )
+        return out if limit is None else out[: max(0, int(limit))]
+
+
+class StoreFacetIndex:
+    """Snapshot preparado: filas ya ordenadas, campos en minúsculas y conteos globales.
+
+    Se construye una vez por versión del snapshot; cada vista hace una sola
+    pasada por las filas (``listing``).
+    """
+
+    def __init__(self, rows: Iterable[StoreFacetRow], *, tag_limit: int = 30) -> None:
+        ordered = sorted((StoreFacetRow(*r) for r in rows), key=sort_key)
+        self.tag_limit = int(tag_limit)
+        self.ids = [int(r.fila) for r in ordered]
+        self.ciudades = [(r.ciudad or "").strip() for r in ordered]
+        self.modalidades = [(r.modalidad or "").strip() for r in ordered]
+        self.tags = [_split_tags(r.tags_raw) for r in ordered]
+        self.disponible = [bool(r.disponible_inmediato) for r in ordered]
+        self._ciudad_f = [(r.ciudad or "").casefold() for r in ordered]
+        self._modalidad_f = [(r.modalidad or "").casefold() for r in ordered]
+        self._tags_f = [(r.tags_raw or "").casefold() for r in ordered]
+        # Separador que no aparece en una búsqueda: ``q`` no puede "cruzar" de un campo a otro.
+        self._search_f = [
+            "\x1f".join((r.nombre or "", r.tags_raw or "", r.ciudad or "", r.sector or "", r.modalidad or "")).casefold()
+            for r in ordered
+        ]
+        self._unfiltered = self._compute(StoreFilters())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _compute(self, filters: StoreFilters):
+        q = filters.q.casefold()
+        ciudad = filters.ciudad.casefold()
+        modalidad = filters.modalidad.casefold()
+        tag = filters.tag.casefold()
+        solo_disponibles = bool(filters.disponible_inmediato)
+
+        matching: list[int] = []
+        c_ciudad, c_modalidad, c_tag = _Counter(), _Counter(), _Counter(fold=True)
+        disponibles = 0
+        for i in range(len(self.ids)):
+            if q and q not in self._search_f[i]:
+                continue
+            # Faceta disyuntiva: una fila cuenta para la faceta X si pasa todos los
+            # filtros menos (quizá) el de X; con dos o más fallos no cuenta en ninguna.
+            failed = ""
+            misses = 0
+            if ciudad and ciudad not in self._ciudad_f[i]:
+                failed, misses = "ciudad", misses + 1
+            if modalidad and modalidad not in self._modalidad_f[i]:
+                failed, misses = "modalidad", misses + 1
+            if tag and tag not in self._tags_f[i]:
+                failed, misses = "tag", misses + 1
+            if solo_disponibles and not self.disponible[i]:
+                failed, misses = "disponible", misses + 1
+            if misses > 1:
+                continue
+            if misses == 0:
+                matching.append(i)
+            if not misses or failed == "ciudad":
+                c_ciudad.add(self.ciudades[i])
+            if not misses or failed == "modalidad":
+                c_modalidad.add(self.modalidades[i])
+            if not misses or failed == "tag":
+                for value in self.tags[i]:
+                    c_tag.add(value)
+            if (not misses or failed == "disponible") and self.disponible[i]:
+                disponibles += 1
+        return matching, c_ciudad, c_modalidad, c_tag, disponibles
+
+    def listing(self, filters: StoreFilters, *, page: int = 1, per_page: int = 12) -> StoreListing:
+        per_page = max(1, int(per_page))
+        page = max(1, int(page))
+        matching, c_ciudad, c_modalidad, c_tag, disponibles = (
+            self._compute(filters) if filters.active() else self._unfiltered
+        )
+        _all, all_ciudades, all_modalidades, _tags, _disp = self._unfiltered
+        start = (page - 1) * per_page
+        return StoreListing(
+            total=len(matching),
+            page_ids=[self.ids[i] for i in matching[start:start + per_page]],
+            ciudades=c_ciudad.items(),
+            modalidades=c_modalidad.items(),
+            tags=c_tag.items(self.tag_limit),
+            disponible_inmediato=disponibles,
+            opciones_ciudades=sorted(all_ciudades.counts),
+            opciones_modalidades=sorted(all_modalidades.counts),
+        )
+
+
+def compute_store_listing(
+    rows: Sequence[StoreFacetRow],
+    filters: StoreFilters,
+    *,
+    page: int = 1,
+    per_page: int = 12,
+    tag_limit: int = 30,
+) -> StoreListing:
+    """Atajo sin reutilizar índice (tests y cálculos puntuales)."""
+    return StoreFacetIndex(rows, tag_limit=tag_limit).listing(filters, page=page, per_page=per_page)
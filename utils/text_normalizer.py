@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import re
 import unicodedata
+from functools import lru_cache
 from typing import List, Optional, Set
 
 _ALIAS_REPLACEMENTS = {
@@ -123,6 +124,17 @@ def _split_skill_chunks(value) -> List[str]:
     return out
 
 
+@lru_cache(maxsize=1)
+def _skill_synonyms_norm() -> tuple[tuple[str, str], ...]:
+    # Constantes: se normalizan una vez y no en cada chunk de cada candidata.
+    return tuple((normalize_text(raw), canonical) for raw, canonical in _SKILL_SYNONYMS.items())
+
+
+@lru_cache(maxsize=1)
+def _city_patterns_norm() -> tuple[tuple[str, tuple[str, ...]], ...]:
+    return tuple((city, tuple(normalize_text(v) for v in variants)) for city, variants in _CITY_PATTERNS.items())
+
+
 def skill_tokens(value) -> Set[str]:
     out: Set[str] = set()
     chunks = _split_skill_chunks(value)
@@ -137,8 +149,7 @@ def skill_tokens(value) -> Set[str]:
             continue
 
         # Match de sinonimos por presencia parcial
-        for raw, canonical in _SKILL_SYNONYMS.items():
-            raw_norm = normalize_text(raw)
+        for raw_norm, canonical in _skill_synonyms_norm():
             if raw_norm and raw_norm in chunk:
                 out.add(canonical)
                 break
@@ -157,8 +168,8 @@ def infer_city(text) -> Optional[str]:
     if not norm:
         return None
 
-    for city, variants in _CITY_PATTERNS.items():
+    for city, variants in _city_patterns_norm():
         for v in variants:
-            if normalize_text(v) in norm:
+            if v in norm:
                 return city
     return None
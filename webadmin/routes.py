@@ -1,4 +1,4 @@
-from flask import abort, current_app, flash, redirect, render_template, request, url_for, session, send_file
+from flask import abort, current_app, flash, redirect, render_template, request, url_for, session
 from sqlalchemy import or_, and_, func
 from sqlalchemy.orm import load_only
 import re
@@ -142,41 +142,15 @@ def _webadmin_guard():
 @roles_required(*WEBADMIN_ALLOWED_ROLES)
 def candidata_foto_perfil(fila: int):
     """Devuelve la foto_perfil (LargeBinary) como imagen."""
-    from io import BytesIO
-    import imghdr
-
     cand = Candidata.query.filter_by(fila=fila).first_or_404()
     if candidata_esta_descalificada(cand):
         abort(404)
-    blob = cand.foto_perfil
+    from core.services.candidata_documentos import serve_candidata_document
 
-    if not blob:
+    response = serve_candidata_document(cand, 'foto_perfil', download_stem=f"candidata_{fila}_perfil")
+    if response is None:
         abort(404)
-
-    kind = imghdr.what(None, h=blob)
-    if kind == 'jpeg':
-        mimetype = 'image/jpeg'
-        ext = 'jpg'
-    elif kind == 'png':
-        mimetype = 'image/png'
-        ext = 'png'
-    elif kind == 'gif':
-        mimetype = 'image/gif'
-        ext = 'gif'
-    elif kind == 'webp':
-        mimetype = 'image/webp'
-        ext = 'webp'
-    else:
-        mimetype = 'application/octet-stream'
-        ext = 'bin'
-
-    return send_file(
-        BytesIO(blob),
-        mimetype=mimetype,
-        as_attachment=False,
-        download_name=f"candidata_{fila}_perfil.{ext}",
-        max_age=3600,
-    )
+    return response
 
 
 # ─────────────────────────────────────────────────────────────